@@ -15,6 +15,7 @@ from sqlalchemy import and_, or_
 
 from ..src.core.database import get_db
 from ..api.deps.auth import get_current_user, CurrentUser
+from ..services.case_statistics_service import case_statistics_service
 from ..models.case_management import (
     LegalCase as Case, CaseParty as Party, LegalCaseDocument as CaseDocument,
     CaseTimelineEvent as TimelineEvent, CaseFinancialTransaction as FinancialTransaction,
@@ -237,10 +238,8 @@ async def get_case(
                 detail="Case not found"
             )
 
-        # Get related data counts
-        parties_count = db.query(Party).filter(Party.case_id == case_id).count()
-        events_count = db.query(TimelineEvent).filter(TimelineEvent.case_id == case_id).count()
-        assets_count = db.query(Asset).filter(Asset.case_id == case_id).count()
+        # Related data counts are maintained in the case statistics row
+        stats = case_statistics_service.get_statistics(db, case_id)
 
         return {
             "id": case.id,
@@ -259,9 +258,11 @@ async def get_case(
             "notes": case.notes,
             "tags": case.tags,
             "counts": {
-                "parties": parties_count,
-                "events": events_count,
-                "assets": assets_count
+                "parties": stats.parties_count,
+                "events": stats.events_count,
+                "assets": stats.assets_count,
+                "documents": stats.documents_count,
+                "deadlines": stats.deadlines_count
             }
         }
 
@@ -666,7 +667,8 @@ async def get_case_dashboard(
             TimelineEvent.status != EventStatus.COMPLETED
         ).order_by(TimelineEvent.event_date.asc()).limit(10).all()
 
-        # Get at-risk items (deadlines within 7 days)
+        # Get at-risk items (deadlines within 7 days); depends on the current
+        # time, so it stays a bounded range query instead of a stored counter
         at_risk_items = db.query(TimelineEvent).filter(
             TimelineEvent.case_id == case_id,
             TimelineEvent.event_date >= datetime.utcnow(),
@@ -674,17 +676,8 @@ async def get_case_dashboard(
             TimelineEvent.status != EventStatus.COMPLETED
         ).count()
 
-        # Get active assets
-        active_assets = db.query(Asset).filter(
-            Asset.case_id == case_id,
-            Asset.status.in_([AssetStatus.INCLUDED, AssetStatus.PENDING])
-        ).all()
-
-        # Get pending objections
-        pending_objections = db.query(Objection).filter(
-            Objection.case_id == case_id,
-            Objection.status.in_([ObjectionStatus.FILED, ObjectionStatus.PENDING])
-        ).count()
+        # Asset and objection aggregates come from the case statistics row
+        stats = case_statistics_service.get_statistics(db, case_id)
 
         return {
             "case_info": {
@@ -701,14 +694,15 @@ async def get_case_dashboard(
                     "date": d.event_date.isoformat(),
                     "days_until": (d.event_date - datetime.utcnow()).days
                 } for d in upcoming_deadlines],
-                "at_risk_count": at_risk_items
+                "at_risk_count": at_risk_items,
+                "open_count": stats.open_deadlines_count
             },
             "assets": {
-                "count": len(active_assets),
-                "total_value": sum(float(a.estimated_value or 0) for a in active_assets)
+                "count": stats.active_assets_count,
+                "total_value": float(stats.active_assets_value or 0)
             },
             "objections": {
-                "pending_count": pending_objections
+                "pending_count": stats.pending_objections_count
             }
         }
 
@@ -1329,16 +1323,19 @@ async def get_critical_path(
 ) -> Dict[str, Any]:
     """Get critical path analysis for case timeline"""
     try:
-        from ..src.services.case_workflow_service import timeline_workflow_engine
+        from ..src.services.case_workflow_service import timeline_workflow_engine, DependencyCycleError
 
-        # Get all timeline events
-        events_query = db.query(TimelineEvent).filter(TimelineEvent.case_id == case_id).all()
+        # Get all timeline events (stable order so the cached schedule can be reused)
+        events_query = db.query(TimelineEvent).filter(
+            TimelineEvent.case_id == case_id
+        ).order_by(TimelineEvent.id).all()
 
         events = [{
             "id": e.id,
             "title": e.title,
             "event_type": e.event_type.value,
             "event_date": e.event_date,
+            "end_date": e.end_date,
             "status": e.status.value,
             "blocked_by_event_ids": e.blocked_by_event_ids or [],
             "blocks_event_ids": e.blocks_event_ids or [],
@@ -1346,7 +1343,13 @@ async def get_critical_path(
         } for e in events_query]
 
         # Calculate critical path
-        critical_path = timeline_workflow_engine.calculate_critical_path(events)
+        try:
+            critical_path = timeline_workflow_engine.calculate_critical_path(events, case_id=case_id)
+        except DependencyCycleError as e:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail={"message": str(e), "cycle": e.cycle}
+            )
 
         # Calculate parallel opportunities
         parallel_opportunities = timeline_workflow_engine.check_parallel_opportunities(events)
@@ -1359,6 +1362,8 @@ async def get_critical_path(
             "estimated_completion": max([e['event_date'] for e in events]) if events else None
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error calculating critical path: {str(e)}")
         raise HTTPException(
@@ -1371,11 +1376,12 @@ async def get_critical_path(
 async def analyze_event_impact(
     case_id: str,
     event_id: str,
+    new_date: Optional[datetime] = Query(None, description="Simulate moving the event to this date"),
     db: Session = Depends(get_db)
 ) -> Dict[str, Any]:
     """Analyze impact of changing an event's deadline"""
     try:
-        from ..src.services.case_workflow_service import timeline_workflow_engine
+        from ..src.services.case_workflow_service import timeline_workflow_engine, DependencyCycleError
 
         # Get the event
         event = db.query(TimelineEvent).filter(
@@ -1390,12 +1396,15 @@ async def analyze_event_impact(
             )
 
         # Get all events for cascade analysis
-        all_events = db.query(TimelineEvent).filter(TimelineEvent.case_id == case_id).all()
+        all_events = db.query(TimelineEvent).filter(
+            TimelineEvent.case_id == case_id
+        ).order_by(TimelineEvent.id).all()
 
         events_data = [{
             "id": e.id,
             "title": e.title,
             "event_date": e.event_date,
+            "end_date": e.end_date,
             "blocked_by_event_ids": e.blocked_by_event_ids or [],
             "blocks_event_ids": e.blocks_event_ids or []
         } for e in all_events]
@@ -1408,8 +1417,17 @@ async def analyze_event_impact(
             "blocks_event_ids": event.blocks_event_ids or []
         }
 
-        # Identify cascade effects
-        cascade = timeline_workflow_engine.identify_deadline_cascades(event_data, events_data)
+        # Identify cascade effects, and the schedule impact of a proposed date
+        try:
+            cascade = timeline_workflow_engine.identify_deadline_cascades(event_data, events_data, case_id=case_id)
+            what_if = timeline_workflow_engine.simulate_event_change(
+                event.id, new_date, events_data, case_id=case_id
+            ) if new_date else None
+        except DependencyCycleError as e:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail={"message": str(e), "cycle": e.cycle}
+            )
 
         # Suggest buffer time
         buffer = timeline_workflow_engine.suggest_buffer_time(event.event_type.value)
@@ -1423,7 +1441,8 @@ async def analyze_event_impact(
             "affected_events": cascade,
             "total_impacted": len(cascade),
             "suggested_buffer_days": buffer,
-            "risk_level": "HIGH" if len(cascade) > 3 else "MEDIUM" if len(cascade) > 0 else "LOW"
+            "risk_level": "HIGH" if len(cascade) > 3 else "MEDIUM" if len(cascade) > 0 else "LOW",
+            "what_if": what_if
         }
 
     except HTTPException:
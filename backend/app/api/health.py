@@ -158,12 +158,12 @@ async def check_redis() -> tuple[bool, Dict[str, Any]]:
             try:
                 from app.src.core.cache.redis_cache import cache
 
-                if cache.is_available():
+                if await cache.is_available():
                     # Test basic operations
                     test_key = "_health_check_test"
-                    cache.set(test_key, "test", ttl=10)
-                    result = cache.get(test_key)
-                    cache.delete(test_key)
+                    await cache.set(test_key, "test", ttl=10)
+                    result = await cache.get(test_key)
+                    await cache.delete(test_key)
 
                     return True, {
                         "status": "healthy",
@@ -0,0 +1,250 @@
+"""
+CHUNKED STREAMING AEAD CONTAINER (FORMAT v2)
+
+Constant-memory authenticated encryption for large legal documents.
+
+Layout:
+    MAGIC (8) | header length (4, big-endian) | header JSON | header tag (16)
+    chunk 0 ciphertext | chunk 1 ciphertext | ... | final chunk ciphertext
+    trailer ciphertext (64)
+
+Every chunk is AES-256-GCM encrypted on its own with a nonce built from a
+per-file random prefix and the chunk index. Each chunk's AAD binds the
+header digest, the chunk index and a final-chunk flag, so chunks cannot be
+reordered, spliced between files, or dropped from the end. The trailer
+authenticates the plaintext size, chunk count and SHA-256 of the plaintext.
+Plaintext chunks are a fixed size, so any byte range can be decrypted by
+reading only the chunks that cover it.
+"""
+
+import hashlib
+import json
+import os
+import struct
+from dataclasses import dataclass
+from typing import Any, BinaryIO, Dict, Iterator, Optional
+
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+MAGIC = b"LAIENC\x00\x02"
+FORMAT_VERSION = "2.0"
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+TAG_SIZE = 16
+NONCE_PREFIX_SIZE = 4
+TRAILER_PLAINTEXT_SIZE = 8 + 8 + 32
+TRAILER_SIZE = TRAILER_PLAINTEXT_SIZE + TAG_SIZE
+
+_HEADER_INDEX = 2 ** 64 - 2
+_TRAILER_INDEX = 2 ** 64 - 1
+_PREAMBLE = struct.Struct(">8sI")
+_CHUNK_AAD = struct.Struct(">QB")
+_TRAILER = struct.Struct(">QQ32s")
+
+
+class ContainerFormatError(ValueError):
+    """Raised when a v2 container is malformed, truncated or fails authentication"""
+
+
+@dataclass
+class StreamEncryptionResult:
+    plaintext_size: int
+    chunk_count: int
+    sha256: str
+    container_size: int
+
+
+def is_chunked_container(prefix: bytes) -> bool:
+    """True if the leading bytes of a file are a v2 container"""
+    return prefix[:len(MAGIC)] == MAGIC
+
+
+def _nonce(prefix: bytes, index: int) -> bytes:
+    return prefix + index.to_bytes(8, "big")
+
+
+def _read_exact(f: BinaryIO, size: int) -> bytes:
+    data = f.read(size)
+    if len(data) != size:
+        raise ContainerFormatError("Container is truncated")
+    return data
+
+
+def _read_chunk(f: BinaryIO, size: int) -> bytes:
+    """Read up to size bytes, looping over short reads from pipes/sockets"""
+    parts = []
+    remaining = size
+    while remaining:
+        data = f.read(remaining)
+        if not data:
+            break
+        parts.append(data)
+        remaining -= len(data)
+    return b"".join(parts)
+
+
+def encrypt_stream(
+    src: BinaryIO,
+    dst: BinaryIO,
+    key: bytes,
+    header: Dict[str, Any],
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> StreamEncryptionResult:
+    """
+    Encrypt ``src`` into ``dst`` as a v2 container, holding at most two
+    plaintext chunks in memory. ``header`` is stored in clear but
+    authenticated; ``chunk_size`` and the nonce prefix are added to it.
+    """
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be positive")
+
+    aesgcm = AESGCM(key)
+    nonce_prefix = os.urandom(NONCE_PREFIX_SIZE)
+    header = dict(header, format_version=FORMAT_VERSION, chunk_size=chunk_size,
+                  nonce_prefix=nonce_prefix.hex())
+    header_json = json.dumps(header, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    preamble = _PREAMBLE.pack(MAGIC, len(header_json)) + header_json
+    header_digest = hashlib.sha256(preamble).digest()
+
+    dst.write(preamble)
+    dst.write(aesgcm.encrypt(_nonce(nonce_prefix, _HEADER_INDEX), b"", preamble))
+    written = len(preamble) + TAG_SIZE
+
+    plaintext_hash = hashlib.sha256()
+    total = 0
+    index = 0
+    current = _read_chunk(src, chunk_size)
+    while True:
+        # Read ahead one chunk so the last one can be flagged as final
+        following = _read_chunk(src, chunk_size) if len(current) == chunk_size else b""
+        final = not following
+        aad = header_digest + _CHUNK_AAD.pack(index, 1 if final else 0)
+        ciphertext = aesgcm.encrypt(_nonce(nonce_prefix, index), current, aad)
+        dst.write(ciphertext)
+        written += len(ciphertext)
+        plaintext_hash.update(current)
+        total += len(current)
+        index += 1
+        if final:
+            break
+        current = following
+
+    digest = plaintext_hash.digest()
+    trailer = aesgcm.encrypt(
+        _nonce(nonce_prefix, _TRAILER_INDEX),
+        _TRAILER.pack(total, index, digest),
+        header_digest + b"trailer"
+    )
+    dst.write(trailer)
+    written += len(trailer)
+
+    return StreamEncryptionResult(
+        plaintext_size=total,
+        chunk_count=index,
+        sha256=digest.hex(),
+        container_size=written
+    )
+
+
+class ChunkedContainerReader:
+    """
+    Reader for v2 containers over a seekable binary file.
+
+    ``header`` is available immediately (so the caller can derive the key
+    from its salt); nothing is trusted until ``unlock`` authenticates the
+    header and trailer and checks the file length against them.
+    """
+
+    def __init__(self, f: BinaryIO):
+        self._f = f
+        f.seek(0)
+        magic, header_len = _PREAMBLE.unpack(_read_exact(f, _PREAMBLE.size))
+        if magic != MAGIC:
+            raise ContainerFormatError("Not a v2 encrypted container")
+        header_json = _read_exact(f, header_len)
+        self._preamble = _PREAMBLE.pack(magic, header_len) + header_json
+        self._header_tag = _read_exact(f, TAG_SIZE)
+        try:
+            self.header: Dict[str, Any] = json.loads(header_json.decode("utf-8"))
+            self.chunk_size = int(self.header["chunk_size"])
+            self._nonce_prefix = bytes.fromhex(self.header["nonce_prefix"])
+        except (ValueError, KeyError) as e:
+            raise ContainerFormatError(f"Invalid container header: {e}")
+        self._header_digest = hashlib.sha256(self._preamble).digest()
+        self._data_start = len(self._preamble) + TAG_SIZE
+        self._aesgcm: Optional[AESGCM] = None
+        self.plaintext_size = 0
+        self.chunk_count = 0
+        self.sha256 = ""
+
+    def unlock(self, key: bytes) -> "ChunkedContainerReader":
+        """Authenticate header and trailer with the document key"""
+        aesgcm = AESGCM(key)
+        try:
+            aesgcm.decrypt(_nonce(self._nonce_prefix, _HEADER_INDEX), self._header_tag, self._preamble)
+        except InvalidTag:
+            raise ContainerFormatError("Container header authentication failed")
+
+        f = self._f
+        f.seek(0, os.SEEK_END)
+        file_size = f.tell()
+        if file_size < self._data_start + TAG_SIZE + TRAILER_SIZE:
+            raise ContainerFormatError("Container is truncated")
+        f.seek(file_size - TRAILER_SIZE)
+        try:
+            trailer = aesgcm.decrypt(
+                _nonce(self._nonce_prefix, _TRAILER_INDEX),
+                _read_exact(f, TRAILER_SIZE),
+                self._header_digest + b"trailer"
+            )
+        except InvalidTag:
+            raise ContainerFormatError("Container trailer authentication failed (truncated or modified)")
+
+        size, count, digest = _TRAILER.unpack(trailer)
+        expected_count = max(1, -(-size // self.chunk_size))
+        expected_data = size + count * TAG_SIZE
+        if count != expected_count or file_size - self._data_start - TRAILER_SIZE != expected_data:
+            raise ContainerFormatError("Container length does not match its trailer")
+
+        self._aesgcm = aesgcm
+        self.plaintext_size = size
+        self.chunk_count = count
+        self.sha256 = digest.hex()
+        return self
+
+    def _decrypt_chunk(self, index: int) -> bytes:
+        if self._aesgcm is None:
+            raise ContainerFormatError("Container is locked; call unlock() first")
+        stored = self.chunk_size + TAG_SIZE
+        final = index == self.chunk_count - 1
+        length = (self.plaintext_size - index * self.chunk_size + TAG_SIZE) if final else stored
+        self._f.seek(self._data_start + index * stored)
+        ciphertext = _read_exact(self._f, length)
+        aad = self._header_digest + _CHUNK_AAD.pack(index, 1 if final else 0)
+        try:
+            return self._aesgcm.decrypt(_nonce(self._nonce_prefix, index), ciphertext, aad)
+        except InvalidTag:
+            raise ContainerFormatError(f"Chunk {index} failed authentication (modified or reordered)")
+
+    def iter_chunks(self) -> Iterator[bytes]:
+        """Yield plaintext chunks in order, verifying the whole-file digest at the end"""
+        plaintext_hash = hashlib.sha256()
+        for index in range(self.chunk_count):
+            chunk = self._decrypt_chunk(index)
+            plaintext_hash.update(chunk)
+            yield chunk
+        if plaintext_hash.hexdigest() != self.sha256:
+            raise ContainerFormatError("Document integrity verification failed")
+
+    def read_range(self, offset: int, length: int) -> bytes:
+        """Decrypt plaintext bytes [offset, offset + length) touching only the covering chunks"""
+        if offset < 0 or length < 0:
+            raise ValueError("offset and length must be non-negative")
+        end = min(offset + length, self.plaintext_size)
+        if offset >= end:
+            return b""
+        first = offset // self.chunk_size
+        last = (end - 1) // self.chunk_size
+        data = b"".join(self._decrypt_chunk(i) for i in range(first, last + 1))
+        start = offset - first * self.chunk_size
+        return data[start:start + (end - offset)]
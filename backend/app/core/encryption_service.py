@@ -9,8 +9,10 @@ CRITICAL: All legal documents must be encrypted at rest and in transit.
 
 import os
 import logging
+import threading
+from collections import OrderedDict
 from datetime import datetime
-from typing import Dict, List, Any, Optional, Union, Tuple
+from typing import Dict, List, Any, Optional, Union, Tuple, Iterator
 from pathlib import Path
 import base64
 import hashlib
@@ -19,9 +21,14 @@ from dataclasses import dataclass, asdict
 from cryptography.fernet import Fernet
 from cryptography.hazmat.primitives import hashes, serialization
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 import secrets
 
+from .chunked_encryption import (
+    ChunkedContainerReader, ContainerFormatError, encrypt_stream, is_chunked_container, MAGIC
+)
+
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -52,6 +59,11 @@ class EmergencyEncryptionService:
         self._master_key = self._get_or_create_master_key()
         self._encryption_keys = {}
         
+        # Bounded LRU of derived document keys: (format, document_id, salt) -> key
+        self._key_cache: "OrderedDict[Tuple[str, str, bytes], bytes]" = OrderedDict()
+        self._key_cache_lock = threading.Lock()
+        self._root_key: Optional[bytes] = None
+        
         # Supported file types for legal documents
         self.LEGAL_DOCUMENT_EXTENSIONS = {
             '.pdf', '.docx', '.doc', '.txt', '.rtf', '.odt',
@@ -78,6 +90,9 @@ class EmergencyEncryptionService:
             'encryption_algorithm': 'AES-256-GCM',
             'key_derivation': 'PBKDF2',
             'key_iterations': 100000,
+            'container_version': 2,
+            'chunk_size_bytes': 1024 * 1024,
+            'key_cache_size': 256,
             'encrypted_storage_path': 'encrypted_documents',
             'metadata_storage_path': 'encryption_metadata',
             'backup_keys': True,
@@ -104,11 +119,30 @@ class EmergencyEncryptionService:
             logger.critical(f"[ENCRYPTION] New master key generated - SECURE THIS FILE")
             return master_key
     
+    def _cached_key(self, cache_key: Tuple[str, str, bytes]) -> Optional[bytes]:
+        with self._key_cache_lock:
+            key = self._key_cache.get(cache_key)
+            if key is not None:
+                self._key_cache.move_to_end(cache_key)
+            return key
+    
+    def _store_key(self, cache_key: Tuple[str, str, bytes], key: bytes):
+        with self._key_cache_lock:
+            self._key_cache[cache_key] = key
+            self._key_cache.move_to_end(cache_key)
+            while len(self._key_cache) > self.config.get('key_cache_size', 256):
+                self._key_cache.popitem(last=False)
+    
     def _derive_document_key(self, document_id: str, salt: Optional[bytes] = None) -> Tuple[bytes, bytes]:
-        """Derive document-specific encryption key from master key"""
+        """Derive document-specific encryption key from master key (v1 containers: PBKDF2 per document)"""
         if salt is None:
             salt = secrets.token_bytes(16)
         
+        cache_key = ('v1', document_id, salt)
+        cached = self._cached_key(cache_key)
+        if cached is not None:
+            return cached, salt
+        
         kdf = PBKDF2HMAC(
             algorithm=hashes.SHA256(),
             length=32,
@@ -120,6 +154,39 @@ class EmergencyEncryptionService:
         key_material = self._master_key + document_id.encode('utf-8')
         derived_key = kdf.derive(key_material)
         
+        self._store_key(cache_key, derived_key)
+        return derived_key, salt
+    
+    def _get_root_key(self) -> bytes:
+        """PBKDF2-stretched root key, derived once per process for v2 containers"""
+        if self._root_key is None:
+            kdf = PBKDF2HMAC(
+                algorithm=hashes.SHA256(),
+                length=32,
+                salt=b'legal-ai-document-root-key-v2',
+                iterations=self.config['key_iterations'],
+            )
+            self._root_key = kdf.derive(self._master_key)
+        return self._root_key
+    
+    def _derive_document_key_v2(self, document_id: str, salt: Optional[bytes] = None) -> Tuple[bytes, bytes]:
+        """Derive a v2 document key: HKDF over the root key, bound to document ID and salt"""
+        if salt is None:
+            salt = secrets.token_bytes(16)
+        
+        cache_key = ('v2', document_id, salt)
+        cached = self._cached_key(cache_key)
+        if cached is not None:
+            return cached, salt
+        
+        derived_key = HKDF(
+            algorithm=hashes.SHA256(),
+            length=32,
+            salt=salt,
+            info=b'legal-ai-document:' + document_id.encode('utf-8'),
+        ).derive(self._get_root_key())
+        
+        self._store_key(cache_key, derived_key)
         return derived_key, salt
     
     def encrypt_document(self, file_path: Union[str, Path], document_id: str, 
@@ -145,65 +212,48 @@ class EmergencyEncryptionService:
             if file_path.suffix.lower() not in self.LEGAL_DOCUMENT_EXTENSIONS:
                 logger.warning(f"[ENCRYPTION] Non-legal document type: {file_path.suffix}")
             
-            # Read original file
-            with open(file_path, 'rb') as f:
-                file_data = f.read()
-            
-            # Calculate file hash for integrity verification
-            file_hash = hashlib.sha256(file_data).hexdigest()
-            
             # Generate document-specific encryption key
-            doc_key, salt = self._derive_document_key(document_id)
-            
-            # Encrypt using AES-GCM for authenticated encryption
-            aesgcm = AESGCM(doc_key)
-            nonce = secrets.token_bytes(12)  # 96-bit nonce for GCM
+            doc_key, salt = self._derive_document_key_v2(document_id)
+            key_id = hashlib.sha256(doc_key).hexdigest()[:16]
             
-            # Additional authenticated data (AAD)
-            aad = json.dumps({
-                'document_id': document_id,
-                'compliance_level': compliance_level,
-                'encrypted_at': datetime.utcnow().isoformat(),
-                'original_filename': file_path.name
-            }).encode('utf-8')
-            
-            # Perform encryption
-            encrypted_data = aesgcm.encrypt(nonce, file_data, aad)
-            
-            # Create encrypted file structure
-            encrypted_container = {
-                'version': '1.0',
-                'algorithm': 'AES-256-GCM',
+            header = {
+                'version': '2.0',
+                'algorithm': 'AES-256-GCM-CHUNKED',
+                'kdf': 'PBKDF2-SHA256+HKDF-SHA256',
                 'document_id': document_id,
                 'compliance_level': compliance_level,
+                'original_filename': file_path.name,
                 'salt': base64.b64encode(salt).decode('utf-8'),
-                'nonce': base64.b64encode(nonce).decode('utf-8'),
-                'aad': base64.b64encode(aad).decode('utf-8'),
-                'encrypted_data': base64.b64encode(encrypted_data).decode('utf-8'),
-                'original_hash': file_hash,
                 'encrypted_at': datetime.utcnow().isoformat(),
-                'key_id': hashlib.sha256(doc_key).hexdigest()[:16]
+                'key_id': key_id
             }
             
-            # Write encrypted file
+            # Stream the file through fixed-size AES-GCM chunks; memory stays constant
             encrypted_filename = f"{document_id}.encrypted"
             encrypted_file_path = self.encrypted_storage_path / encrypted_filename
+            temp_path = encrypted_file_path.with_name(encrypted_filename + '.tmp')
+            
+            with open(file_path, 'rb') as src, open(temp_path, 'wb') as dst:
+                # Set restrictive permissions before any ciphertext is written
+                os.chmod(temp_path, 0o600)
+                stream_result = encrypt_stream(
+                    src, dst, doc_key, header,
+                    chunk_size=self.config.get('chunk_size_bytes', 1024 * 1024)
+                )
+            os.replace(temp_path, encrypted_file_path)
             
-            with open(encrypted_file_path, 'w', encoding='utf-8') as f:
-                json.dump(encrypted_container, f, indent=2)
-            
-            # Set restrictive permissions
-            os.chmod(encrypted_file_path, 0o600)
+            file_hash = stream_result.sha256
+            file_size = stream_result.plaintext_size
             
             # Create encryption metadata
             metadata = EncryptionMetadata(
                 document_id=document_id,
                 encrypted=True,
                 encryption_algorithm='AES-256-GCM',
-                key_id=encrypted_container['key_id'],
+                key_id=key_id,
                 encrypted_at=datetime.utcnow(),
                 file_hash_sha256=file_hash,
-                file_size_bytes=len(file_data),
+                file_size_bytes=file_size,
                 encryption_status='ENCRYPTED',
                 compliance_level=compliance_level
             )
@@ -217,8 +267,8 @@ class EmergencyEncryptionService:
                 'file_path': str(file_path),
                 'encrypted_path': str(encrypted_file_path),
                 'compliance_level': compliance_level,
-                'file_size': len(file_data),
-                'encryption_algorithm': 'AES-256-GCM'
+                'file_size': file_size,
+                'encryption_algorithm': 'AES-256-GCM-CHUNKED'
             })
             
             logger.info(f"[ENCRYPTION] Document encrypted successfully: {document_id}")
@@ -234,6 +284,11 @@ class EmergencyEncryptionService:
             error_msg = f"Encryption failed for {document_id}: {str(e)}"
             logger.error(f"[ENCRYPTION] {error_msg}", exc_info=True)
             
+            # Never leave a partial container behind
+            partial = self.encrypted_storage_path / f"{document_id}.encrypted.tmp"
+            if partial.exists():
+                partial.unlink()
+            
             # Log encryption failure
             self._log_encryption_event('ENCRYPTION_FAILED', {
                 'document_id': document_id,
@@ -250,45 +305,81 @@ class EmergencyEncryptionService:
                 error_message=error_msg
             )
     
+    def _encrypted_file_path(self, document_id: str) -> Path:
+        encrypted_file_path = self.encrypted_storage_path / f"{document_id}.encrypted"
+        if not encrypted_file_path.exists():
+            raise FileNotFoundError(f"Encrypted document not found: {document_id}")
+        return encrypted_file_path
+    
+    def _is_v2_container(self, encrypted_file_path: Path) -> bool:
+        with open(encrypted_file_path, 'rb') as f:
+            return is_chunked_container(f.read(len(MAGIC)))
+    
+    def _open_v2_reader(self, f, document_id: str) -> ChunkedContainerReader:
+        reader = ChunkedContainerReader(f)
+        if reader.header.get('document_id') != document_id:
+            raise ContainerFormatError("Container belongs to a different document")
+        salt = base64.b64decode(reader.header['salt'])
+        doc_key, _ = self._derive_document_key_v2(document_id, salt)
+        return reader.unlock(doc_key)
+    
+    def _decrypt_v1_container(self, document_id: str, encrypted_file_path: Path) -> Tuple[bytes, Dict[str, Any]]:
+        """Decrypt a legacy single-shot JSON container"""
+        with open(encrypted_file_path, 'r', encoding='utf-8') as f:
+            encrypted_container = json.load(f)
+        
+        # Extract encryption parameters
+        salt = base64.b64decode(encrypted_container['salt'])
+        nonce = base64.b64decode(encrypted_container['nonce'])
+        aad = base64.b64decode(encrypted_container['aad'])
+        encrypted_data = base64.b64decode(encrypted_container['encrypted_data'])
+        
+        # Derive the same document key
+        doc_key, _ = self._derive_document_key(document_id, salt)
+        
+        # Decrypt the data
+        aesgcm = AESGCM(doc_key)
+        decrypted_data = aesgcm.decrypt(nonce, encrypted_data, aad)
+        
+        # Verify integrity
+        decrypted_hash = hashlib.sha256(decrypted_data).hexdigest()
+        if decrypted_hash != encrypted_container['original_hash']:
+            raise ValueError("Document integrity verification failed")
+        
+        return decrypted_data, encrypted_container
+    
+    def iter_decrypted_document(self, document_id: str) -> Iterator[bytes]:
+        """Yield a document's plaintext chunk by chunk (constant memory for v2 containers)"""
+        encrypted_file_path = self._encrypted_file_path(document_id)
+        
+        if not self._is_v2_container(encrypted_file_path):
+            decrypted_data, _ = self._decrypt_v1_container(document_id, encrypted_file_path)
+            yield decrypted_data
+            return
+        
+        with open(encrypted_file_path, 'rb') as f:
+            reader = self._open_v2_reader(f, document_id)
+            yield from reader.iter_chunks()
+    
     def decrypt_document(self, document_id: str, output_path: Optional[Path] = None) -> Tuple[bool, bytes, str]:
         """Decrypt a document (requires proper authorization)"""
         
         logger.info(f"[ENCRYPTION] Decryption requested for document: {document_id}")
         
         try:
-            # Load encrypted file
-            encrypted_filename = f"{document_id}.encrypted"
-            encrypted_file_path = self.encrypted_storage_path / encrypted_filename
+            encrypted_file_path = self._encrypted_file_path(document_id)
             
-            if not encrypted_file_path.exists():
-                raise FileNotFoundError(f"Encrypted document not found: {document_id}")
-            
-            # Load encrypted container
-            with open(encrypted_file_path, 'r', encoding='utf-8') as f:
-                encrypted_container = json.load(f)
-            
-            # Extract encryption parameters
-            salt = base64.b64decode(encrypted_container['salt'])
-            nonce = base64.b64decode(encrypted_container['nonce'])
-            aad = base64.b64decode(encrypted_container['aad'])
-            encrypted_data = base64.b64decode(encrypted_container['encrypted_data'])
-            
-            # Derive the same document key
-            doc_key, _ = self._derive_document_key(document_id, salt)
-            
-            # Decrypt the data
-            aesgcm = AESGCM(doc_key)
-            decrypted_data = aesgcm.decrypt(nonce, encrypted_data, aad)
-            
-            # Verify integrity
-            decrypted_hash = hashlib.sha256(decrypted_data).hexdigest()
-            if decrypted_hash != encrypted_container['original_hash']:
-                raise ValueError("Document integrity verification failed")
+            if self._is_v2_container(encrypted_file_path):
+                decrypted_data = b"".join(self.iter_decrypted_document(document_id))
+                compliance_level = self.read_container_info(document_id).get('compliance_level')
+            else:
+                decrypted_data, encrypted_container = self._decrypt_v1_container(document_id, encrypted_file_path)
+                compliance_level = encrypted_container['compliance_level']
             
             # Log successful decryption
             self._log_encryption_event('DOCUMENT_DECRYPTED', {
                 'document_id': document_id,
-                'compliance_level': encrypted_container['compliance_level'],
+                'compliance_level': compliance_level,
                 'file_size': len(decrypted_data)
             })
             
@@ -314,6 +405,90 @@ class EmergencyEncryptionService:
             
             return False, b"", error_msg
     
+    def decrypt_document_to_file(self, document_id: str, output_path: Union[str, Path]) -> Tuple[bool, int, str]:
+        """Stream-decrypt a document to a file without holding it in memory"""
+        
+        logger.info(f"[ENCRYPTION] Streaming decryption requested for document: {document_id}")
+        output_path = Path(output_path)
+        temp_path = output_path.with_name(output_path.name + '.partial')
+        
+        try:
+            written = 0
+            with open(temp_path, 'wb') as out:
+                os.chmod(temp_path, 0o600)
+                for chunk in self.iter_decrypted_document(document_id):
+                    out.write(chunk)
+                    written += len(chunk)
+            os.replace(temp_path, output_path)
+            
+            self._log_encryption_event('DOCUMENT_DECRYPTED', {
+                'document_id': document_id,
+                'file_size': written,
+                'streaming': True
+            })
+            return True, written, ""
+            
+        except Exception as e:
+            if temp_path.exists():
+                temp_path.unlink()
+            error_msg = f"Decryption failed for {document_id}: {str(e)}"
+            logger.error(f"[ENCRYPTION] {error_msg}", exc_info=True)
+            self._log_encryption_event('DECRYPTION_FAILED', {
+                'document_id': document_id,
+                'error': str(e)
+            })
+            return False, 0, error_msg
+    
+    def decrypt_document_range(self, document_id: str, offset: int, length: int) -> Tuple[bool, bytes, str]:
+        """Decrypt only bytes [offset, offset + length) of a document"""
+        try:
+            encrypted_file_path = self._encrypted_file_path(document_id)
+            
+            if not self._is_v2_container(encrypted_file_path):
+                decrypted_data, _ = self._decrypt_v1_container(document_id, encrypted_file_path)
+                return True, decrypted_data[offset:offset + length], ""
+            
+            with open(encrypted_file_path, 'rb') as f:
+                reader = self._open_v2_reader(f, document_id)
+                return True, reader.read_range(offset, length), ""
+            
+        except Exception as e:
+            error_msg = f"Range decryption failed for {document_id}: {str(e)}"
+            logger.error(f"[ENCRYPTION] {error_msg}")
+            return False, b"", error_msg
+    
+    def verify_document_integrity(self, document_id: str) -> Tuple[bool, str]:
+        """Authenticate every chunk and check the plaintext SHA-256 in one streaming pass"""
+        try:
+            for _ in self.iter_decrypted_document(document_id):
+                pass
+            return True, ""
+        except Exception as e:
+            return False, str(e)
+    
+    def read_container_info(self, document_id: str) -> Dict[str, Any]:
+        """
+        Return container parameters without decrypting the payload.
+        For v2 containers the header and trailer are authenticated first,
+        and 'original_hash' / 'file_size_bytes' come from the trailer.
+        """
+        encrypted_file_path = self._encrypted_file_path(document_id)
+        
+        if not self._is_v2_container(encrypted_file_path):
+            with open(encrypted_file_path, 'r', encoding='utf-8') as f:
+                container = json.load(f)
+            container.pop('encrypted_data', None)
+            return container
+        
+        with open(encrypted_file_path, 'rb') as f:
+            reader = self._open_v2_reader(f, document_id)
+            return {
+                **reader.header,
+                'original_hash': reader.sha256,
+                'file_size_bytes': reader.plaintext_size,
+                'chunk_count': reader.chunk_count
+            }
+    
     def encrypt_directory(self, directory_path: Union[str, Path], 
                          compliance_level: str = 'ATTORNEY_CLIENT') -> List[EncryptionResult]:
         """Encrypt all documents in a directory"""
@@ -6,7 +6,6 @@ Automatically tracks all API requests for metrics collection
 import time
 import logging
 from typing import Callable, Optional
-from datetime import datetime
 from fastapi import Request, Response
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.types import ASGIApp
@@ -15,62 +14,43 @@ import jwt
 import os
 
 from ..src.monitoring.metrics_collector import metrics_collector
-from ..src.core.database import SessionLocal
-from ..models.user import User
+from ..services.activity_tracking_service import activity_tracking_service
+from .token_cache import TokenClaimsCache
 
 logger = logging.getLogger(__name__)
 
 # JWT secret for token decoding
 JWT_SECRET = os.getenv("JWT_SECRET", os.getenv("SECRET_KEY", "your-secret-key"))
 
-# Track when each user was last updated to avoid excessive DB writes
-_last_activity_updates: dict = {}
-_activity_update_interval = 60  # Only update DB once per minute per user
+# Verified claims for recently seen tokens, so repeat requests skip the signature check
+_token_claims_cache = TokenClaimsCache(max_size=10000, max_ttl=300)
 
 
 def decode_user_id_from_token(token: str) -> Optional[int]:
     """Decode user ID from JWT token"""
-    try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
-        return payload.get("user_id") or payload.get("sub")
-    except jwt.ExpiredSignatureError:
-        logger.debug("Token expired")
-        return None
-    except jwt.InvalidTokenError as e:
-        logger.debug(f"Invalid token: {e}")
-        return None
-    except Exception as e:
-        logger.debug(f"Token decode error: {e}")
-        return None
+    payload = _token_claims_cache.get(token)
+    if payload is None:
+        try:
+            payload = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
+        except jwt.ExpiredSignatureError:
+            logger.debug("Token expired")
+            return None
+        except jwt.InvalidTokenError as e:
+            logger.debug(f"Invalid token: {e}")
+            return None
+        except Exception as e:
+            logger.debug(f"Token decode error: {e}")
+            return None
+        _token_claims_cache.put(token, payload)
+    return payload.get("user_id") or payload.get("sub")
 
 
 def update_user_last_activity(user_id: int):
     """
-    Update user's last_active_at timestamp in the database.
-    Uses rate limiting to avoid excessive DB writes.
+    Record the user's activity for the next bulk last_active_at flush.
+    No database work happens on the request path.
     """
-    global _last_activity_updates
-
-    now = time.time()
-    last_update = _last_activity_updates.get(user_id, 0)
-
-    # Only update if enough time has passed since last update
-    if now - last_update < _activity_update_interval:
-        return
-
-    try:
-        db = SessionLocal()
-        try:
-            user = db.query(User).filter(User.id == user_id).first()
-            if user:
-                user.last_active_at = datetime.utcnow()
-                db.commit()
-                _last_activity_updates[user_id] = now
-                logger.debug(f"Updated last_active_at for user {user_id}")
-        finally:
-            db.close()
-    except Exception as e:
-        logger.warning(f"Failed to update user activity: {e}")
+    activity_tracking_service.record_activity(user_id)
 
 
 class MonitoringMiddleware(BaseHTTPMiddleware):
@@ -155,6 +135,10 @@ class MonitoringMiddleware(BaseHTTPMiddleware):
             # Calculate duration
             duration_ms = (time.time() - start_time) * 1000
 
+            # Key metrics by the matched route template, not the raw path
+            route = request.scope.get('route')
+            route_template = getattr(route, 'path', None)
+
             # Record API call
             metrics_collector.record_api_call(
                 endpoint=request.url.path,
@@ -166,7 +150,8 @@ class MonitoringMiddleware(BaseHTTPMiddleware):
                 metadata={
                     'query_params': dict(request.query_params),
                     'content_length': request.headers.get('content-length', 0)
-                }
+                },
+                route=route_template
             )
 
         return response
@@ -645,3 +645,35 @@ class CaseEventParty(Base):
     attendance_status = Column(String(50))  # "attending", "declined", "maybe", "no_response"
 
     created_at = Column(DateTime, default=datetime.utcnow)
+
+
+# ============================================================================
+# SUMMARY TABLES - Maintained Aggregates
+# ============================================================================
+
+class CaseStatistics(Base):
+    """
+    Per-case counters and dashboard aggregates, one row per case.
+    Kept in step with child rows by the case statistics service
+    (app/services/case_statistics_service.py) inside the same transaction.
+    """
+    __tablename__ = "case_statistics"
+
+    case_id = Column(String(36), ForeignKey('legal_cases.id', ondelete='CASCADE'), primary_key=True)
+
+    # Counts shown on the case page
+    parties_count = Column(Integer, default=0, nullable=False)
+    events_count = Column(Integer, default=0, nullable=False)
+    assets_count = Column(Integer, default=0, nullable=False)
+    documents_count = Column(Integer, default=0, nullable=False)
+    deadlines_count = Column(Integer, default=0, nullable=False)
+
+    # Dashboard aggregates
+    open_deadlines_count = Column(Integer, default=0, nullable=False)  # Deadlines not yet completed
+    active_assets_count = Column(Integer, default=0, nullable=False)  # Included or pending
+    active_assets_value = Column(Numeric(15, 2), default=0, nullable=False)
+    pending_objections_count = Column(Integer, default=0, nullable=False)  # Filed or pending
+
+    # Metadata
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    reconciled_at = Column(DateTime)  # Last time the reconciliation job checked this row
@@ -64,8 +64,10 @@ from .sla import SLAEngine, LegalComplianceSLATracker
 from .dashboards import DashboardEngine, DashboardType, WidgetType, websocket_manager
 from .tracing import (
     get_tracer, trace_operation, async_trace_operation, trace_function,
-    document_tracer, ai_tracer, compliance_tracer, TraceAnalyzer
+    document_tracer, ai_tracer, compliance_tracer, TraceAnalyzer,
+    get_span_processor, set_span_processor, shutdown_tracing
 )
+from .span_export import BatchSpanProcessor, FileSpanExporter, SpanExporter, TraceSampler
 from .capacity import (
     CapacityPlanningEngine, LegalWorkloadAnalyzer, ResourceType, 
     CapacityRecommendation, ForecastResult
@@ -135,6 +137,13 @@ __all__ = [
     'ai_tracer',
     'compliance_tracer',
     'TraceAnalyzer',
+    'get_span_processor',
+    'set_span_processor',
+    'shutdown_tracing',
+    'BatchSpanProcessor',
+    'FileSpanExporter',
+    'SpanExporter',
+    'TraceSampler',
     
     # Capacity Planning
     'CapacityPlanningEngine',
@@ -0,0 +1,347 @@
+# =============================================================================
+# Legal AI System - Span Export Pipeline
+# =============================================================================
+# Buffers finished spans in a bounded ring, applies head- and tail-based
+# sampling, and hands them to an exporter in batches from a background task
+# so tracing never costs a database commit per span on the request path.
+# =============================================================================
+
+import asyncio
+import json
+import logging
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# =============================================================================
+# SPAN SERIALIZATION
+# =============================================================================
+
+def span_to_record(span: Any) -> Dict[str, Any]:
+    """Flatten a finished span into a row matching the trace_spans table."""
+    return {
+        "trace_id": span.context.trace_id,
+        "span_id": span.context.span_id,
+        "parent_span_id": span.context.parent_span_id,
+        "operation_name": span.operation_name,
+        "service_name": span.service_name,
+        "component": span.component,
+        "start_time": span.start_time,
+        "end_time": span.end_time,
+        "duration_ms": span.duration_ms(),
+        "status": span.status,
+        "error_message": span.error_message,
+        "tags": span.tags,
+        "logs": span.logs,
+        "client_id": span.client_id,
+        "document_id": span.document_id,
+        "document_type": span.document_type,
+        "contains_pii": span.contains_pii,
+        "compliance_level": span.compliance_level,
+    }
+
+# =============================================================================
+# EXPORTERS
+# =============================================================================
+
+class SpanExporter(ABC):
+    """Base class for span exporters. ``export`` receives one batch of records."""
+
+    @abstractmethod
+    async def export(self, records: List[Dict[str, Any]]):
+        """Write one batch of span records."""
+
+    async def shutdown(self):
+        pass
+
+class FileSpanExporter(SpanExporter):
+    """Appends span records as JSON lines to a local file (tests and local debugging)."""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def _write(self, records: List[Dict[str, Any]]):
+        lines = "".join(json.dumps(r, default=_json_default) + "\n" for r in records)
+        with self.path.open("a", encoding="utf-8") as f:
+            f.write(lines)
+
+    async def export(self, records: List[Dict[str, Any]]):
+        await asyncio.to_thread(self._write, records)
+
+    def read_records(self) -> List[Dict[str, Any]]:
+        if not self.path.exists():
+            return []
+        with self.path.open("r", encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+def _json_default(value: Any):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+# =============================================================================
+# SAMPLING
+# =============================================================================
+
+class TraceSampler:
+    """
+    Head- and tail-based sampling decisions.
+
+    Head sampling is deterministic on the trace id, so every service and span
+    in a trace agrees. Tail sampling runs once the trace's root span ends and
+    always keeps traces that contain an error or whose root exceeded
+    ``slow_threshold_ms``.
+    """
+
+    def __init__(self, head_sample_rate: float = 1.0, slow_threshold_ms: float = 1000.0):
+        self.head_sample_rate = max(0.0, min(1.0, head_sample_rate))
+        self.slow_threshold_ms = slow_threshold_ms
+
+    def head_sampled(self, trace_id: str) -> bool:
+        if self.head_sample_rate >= 1.0:
+            return True
+        if self.head_sample_rate <= 0.0:
+            return False
+        try:
+            bucket = int(trace_id[:8], 16) / 0xFFFFFFFF
+        except ValueError:
+            bucket = zlib.crc32(trace_id.encode("utf-8")) / 0xFFFFFFFF
+        return bucket < self.head_sample_rate
+
+    def keep_trace(self, trace_id: str, spans: List[Any]) -> bool:
+        if self.head_sampled(trace_id):
+            return True
+        for span in spans:
+            if span.status == "error":
+                return True
+            duration = span.duration_ms()
+            if span.context.parent_span_id is None and duration is not None and duration >= self.slow_threshold_ms:
+                return True
+        return False
+
+# =============================================================================
+# BATCH PROCESSOR
+# =============================================================================
+
+class BatchSpanProcessor:
+    """
+    Collects finished spans and exports them in batches.
+
+    ``on_end`` is O(1) and never awaits: spans wait per trace until the root
+    span finishes (or the trace times out), the sampler decides, and kept
+    spans enter a bounded ring buffer. A background task drains the buffer
+    every ``schedule_delay`` seconds, or sooner once a full batch is ready.
+    """
+
+    def __init__(
+        self,
+        exporter: SpanExporter,
+        sampler: Optional[TraceSampler] = None,
+        max_queue_size: int = 8192,
+        max_export_batch_size: int = 512,
+        schedule_delay: float = 2.0,
+        max_pending_traces: int = 10000,
+        trace_timeout: float = 30.0
+    ):
+        self.exporter = exporter
+        self.sampler = sampler or TraceSampler()
+        self.max_queue_size = max_queue_size
+        self.max_export_batch_size = max_export_batch_size
+        self.schedule_delay = schedule_delay
+        self.max_pending_traces = max_pending_traces
+        self.trace_timeout = trace_timeout
+
+        self._queue: Deque[Dict[str, Any]] = deque()
+        self._pending: "OrderedDict[str, List[Any]]" = OrderedDict()
+        self._pending_since: Dict[str, float] = {}
+        self._decisions: "OrderedDict[str, bool]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._batch_ready: Optional[asyncio.Event] = None
+        self._shutdown = False
+
+        self.counters = {
+            "spans_received": 0,
+            "spans_sampled_out": 0,
+            "spans_dropped_queue_full": 0,
+            "spans_dropped_export_error": 0,
+            "spans_exported": 0,
+            "batches_exported": 0,
+            "export_errors": 0,
+        }
+
+    # ------------------------------------------------------------------
+    # Ingest
+    # ------------------------------------------------------------------
+
+    def on_end(self, span: Any):
+        """Accept a finished span. Safe to call from any thread."""
+        if self._shutdown:
+            return
+        trace_id = span.context.trace_id
+        ready = False
+
+        with self._lock:
+            self.counters["spans_received"] += 1
+
+            decision = self._decisions.get(trace_id)
+            if decision is not None:
+                # Late span for a trace that was already decided
+                ready = self._admit([span]) if decision else self._sample_out(1)
+            else:
+                spans = self._pending.get(trace_id)
+                if spans is None:
+                    spans = self._pending[trace_id] = []
+                    self._pending_since[trace_id] = time.monotonic()
+                spans.append(span)
+
+                if span.context.parent_span_id is None:
+                    ready = self._decide(trace_id)
+                while len(self._pending) > self.max_pending_traces:
+                    oldest = next(iter(self._pending))
+                    ready = self._decide(oldest) or ready
+
+        self._ensure_started()
+        if ready:
+            self._signal_batch_ready()
+
+    def _decide(self, trace_id: str) -> bool:
+        spans = self._pending.pop(trace_id, [])
+        self._pending_since.pop(trace_id, None)
+        keep = self.sampler.keep_trace(trace_id, spans)
+
+        self._decisions[trace_id] = keep
+        while len(self._decisions) > self.max_pending_traces:
+            self._decisions.popitem(last=False)
+
+        if keep:
+            return self._admit(spans)
+        return self._sample_out(len(spans))
+
+    def _admit(self, spans: List[Any]) -> bool:
+        for span in spans:
+            if len(self._queue) >= self.max_queue_size:
+                self._queue.popleft()
+                self.counters["spans_dropped_queue_full"] += 1
+            self._queue.append(span_to_record(span))
+        return len(self._queue) >= self.max_export_batch_size
+
+    def _sample_out(self, count: int) -> bool:
+        self.counters["spans_sampled_out"] += count
+        return False
+
+    def _expire_pending_traces(self, now: Optional[float] = None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            expired = [
+                trace_id for trace_id, since in self._pending_since.items()
+                if now - since >= self.trace_timeout
+            ]
+            for trace_id in expired:
+                self._decide(trace_id)
+
+    # ------------------------------------------------------------------
+    # Export
+    # ------------------------------------------------------------------
+
+    def _ensure_started(self):
+        if self._task is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No loop in this thread; spans stay buffered until start()
+            return
+        self.start(loop)
+
+    def start(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        """Start the background export task on the given (or running) loop."""
+        if self._task is not None:
+            return
+        self._loop = loop or asyncio.get_running_loop()
+        self._batch_ready = asyncio.Event()
+        self._task = self._loop.create_task(self._export_loop())
+
+    def _signal_batch_ready(self):
+        if self._batch_ready is None or self._loop is None:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._batch_ready.set()
+        elif not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._batch_ready.set)
+
+    async def _export_loop(self):
+        while not self._shutdown:
+            try:
+                await asyncio.wait_for(self._batch_ready.wait(), timeout=self.schedule_delay)
+            except asyncio.TimeoutError:
+                pass
+            except asyncio.CancelledError:
+                break
+            self._batch_ready.clear()
+            self._expire_pending_traces()
+            await self.force_flush()
+
+    def _take_batch(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            size = min(len(self._queue), self.max_export_batch_size)
+            return [self._queue.popleft() for _ in range(size)]
+
+    async def force_flush(self) -> int:
+        """Export everything currently queued. Returns the number of spans exported."""
+        exported = 0
+        while True:
+            batch = self._take_batch()
+            if not batch:
+                return exported
+            try:
+                await self.exporter.export(batch)
+            except Exception as e:
+                logger.error(f"Failed to export {len(batch)} spans: {e}")
+                self.counters["export_errors"] += 1
+                self.counters["spans_dropped_export_error"] += len(batch)
+                continue
+            exported += len(batch)
+            self.counters["spans_exported"] += len(batch)
+            self.counters["batches_exported"] += 1
+
+    async def shutdown(self):
+        """Decide all pending traces, export what is queued, and stop the task."""
+        self._expire_pending_traces(now=float("inf"))
+        self._shutdown = True
+        if self._task is not None:
+            if self._batch_ready is not None:
+                self._batch_ready.set()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.force_flush()
+        await self.exporter.shutdown()
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._queue)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self.counters,
+                "queue_depth": len(self._queue),
+                "pending_traces": len(self._pending),
+            }
@@ -5,6 +5,7 @@
 # legal document processing services, AI providers, and compliance workflows
 # =============================================================================
 
+import os
 import uuid
 import time
 import json
@@ -20,12 +21,13 @@ from collections import defaultdict
 import functools
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import Column, String, DateTime, Float, Integer, JSON, Boolean, ForeignKey, Text
+from sqlalchemy import Column, String, DateTime, Float, Integer, JSON, Boolean, ForeignKey, Text, insert
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 
 from ..database import get_db
+from .span_export import BatchSpanProcessor, SpanExporter, TraceSampler
 
 logger = logging.getLogger(__name__)
 
@@ -262,56 +264,15 @@ class Tracer:
         self._context_stack.span = span
     
     def finish_span(self, span: Span):
-        """Finish and record a span."""
+        """Finish a span and hand it to the batch export pipeline."""
         span.finish()
         
         # Remove from active spans
         if span.context.span_id in self._active_spans:
             del self._active_spans[span.context.span_id]
         
-        # Send to collector (implementation would vary)
-        asyncio.create_task(self._record_span(span))
-    
-    async def _record_span(self, span: Span):
-        """Record the span to storage."""
-        try:
-            # This would typically send to a tracing backend
-            # For now, we'll store in our database
-            await self._store_span_in_database(span)
-            
-        except Exception as e:
-            logger.error(f"Failed to record span: {e}")
-    
-    async def _store_span_in_database(self, span: Span):
-        """Store span in the database."""
-        try:
-            async with get_db() as db:
-                trace_span = TraceSpan(
-                    trace_id=span.context.trace_id,
-                    span_id=span.context.span_id,
-                    parent_span_id=span.context.parent_span_id,
-                    operation_name=span.operation_name,
-                    service_name=span.service_name,
-                    component=span.component,
-                    start_time=span.start_time,
-                    end_time=span.end_time,
-                    duration_ms=span.duration_ms(),
-                    status=span.status,
-                    error_message=span.error_message,
-                    tags=span.tags,
-                    logs=span.logs,
-                    client_id=span.client_id,
-                    document_id=span.document_id,
-                    document_type=span.document_type,
-                    contains_pii=span.contains_pii,
-                    compliance_level=span.compliance_level
-                )
-                
-                db.add(trace_span)
-                await db.commit()
-                
-        except Exception as e:
-            logger.error(f"Failed to store span in database: {e}")
+        # O(1) enqueue; sampling and the database write happen in batches
+        get_span_processor().on_end(span)
     
     def _generate_trace_id(self) -> str:
         """Generate a unique trace ID."""
@@ -321,6 +282,48 @@ class Tracer:
         """Generate a unique span ID."""
         return uuid.uuid4().hex[:16]
 
+# =============================================================================
+# SPAN EXPORT
+# =============================================================================
+
+class DatabaseSpanExporter(SpanExporter):
+    """Writes each batch of spans to trace_spans with one multi-row INSERT."""
+    
+    async def export(self, records: List[Dict[str, Any]]):
+        if not records:
+            return
+        async with get_db() as db:
+            rows = [{"id": uuid.uuid4(), "created_at": datetime.utcnow(), **r} for r in records]
+            await db.execute(insert(TraceSpan.__table__).values(rows))
+            await db.commit()
+
+_span_processor: Optional[BatchSpanProcessor] = None
+
+def get_span_processor() -> BatchSpanProcessor:
+    """Get the process-wide span processor, creating the default one on first use."""
+    global _span_processor
+    if _span_processor is None:
+        # Every trace is kept unless head sampling is turned on explicitly;
+        # tail sampling still keeps errors and slow traces when it is
+        _span_processor = BatchSpanProcessor(
+            DatabaseSpanExporter(),
+            sampler=TraceSampler(
+                head_sample_rate=float(os.getenv("TRACE_SAMPLE_RATE", "1.0")),
+                slow_threshold_ms=float(os.getenv("TRACE_SLOW_THRESHOLD_MS", "2000"))
+            )
+        )
+    return _span_processor
+
+def set_span_processor(processor: Optional[BatchSpanProcessor]):
+    """Replace the span processor (e.g. with a FileSpanExporter in tests)."""
+    global _span_processor
+    _span_processor = processor
+
+async def shutdown_tracing():
+    """Export all buffered spans and stop the background exporter."""
+    if _span_processor is not None:
+        await _span_processor.shutdown()
+
 # =============================================================================
 # CONTEXT MANAGERS AND DECORATORS
 # =============================================================================
@@ -772,5 +775,9 @@ __all__ = [
     "ai_tracer",
     "compliance_tracer",
     "TraceAnalyzer",
-    "init_tracing"
+    "init_tracing",
+    "DatabaseSpanExporter",
+    "get_span_processor",
+    "set_span_processor",
+    "shutdown_tracing"
 ]
\ No newline at end of file
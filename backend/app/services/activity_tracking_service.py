@@ -0,0 +1,154 @@
+"""
+User Activity Tracking Service
+Coalesces per-user last-seen timestamps in memory and flushes them to the
+database in a single bulk UPDATE on a fixed interval, keeping the writes
+off the request path.
+"""
+import asyncio
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import bindparam
+
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+
+class ActivityTrackingService:
+    """Background service that batches users.last_active_at updates"""
+
+    def __init__(self, flush_interval: int = 30, session_factory: Optional[Callable[[], Any]] = None):
+        self.running = False
+        self.flush_interval = flush_interval
+        self._session_factory = session_factory
+        self._task = None
+        self._pending: Dict[int, datetime] = {}
+        self._lock = threading.Lock()
+        self.stats = {
+            'activities_recorded': 0,
+            'flushes': 0,
+            'rows_written': 0,
+            'failed_flushes': 0,
+        }
+
+    def set_flush_interval(self, seconds: int):
+        """Set how often pending activity is written (in seconds)"""
+        self.flush_interval = max(1, seconds)
+        logger.info(f"Activity flush interval set to {self.flush_interval} seconds")
+
+    def record_activity(self, user_id: int, when: Optional[datetime] = None):
+        """Record that a user was active. Never touches the database."""
+        when = when or datetime.utcnow()
+        with self._lock:
+            previous = self._pending.get(user_id)
+            if previous is None or when > previous:
+                self._pending[user_id] = when
+            self.stats['activities_recorded'] += 1
+
+    @property
+    def pending_count(self) -> int:
+        """Number of users with an unflushed last-seen timestamp"""
+        return len(self._pending)
+
+    def _get_session(self):
+        if self._session_factory is None:
+            from app.src.core.database import SessionLocal
+            self._session_factory = SessionLocal
+        return self._session_factory()
+
+    def flush(self) -> int:
+        """
+        Write all pending timestamps with one bulk UPDATE.
+        Returns the number of users written. On failure the pending
+        timestamps are merged back so the next flush retries them.
+        """
+        with self._lock:
+            if not self._pending:
+                return 0
+            batch, self._pending = self._pending, {}
+
+        rows: List[Dict[str, Any]] = [
+            {'b_user_id': user_id, 'b_last_active_at': seen_at}
+            for user_id, seen_at in batch.items()
+        ]
+        users = User.__table__
+        stmt = (
+            users.update()
+            .where(users.c.id == bindparam('b_user_id'))
+            .values(last_active_at=bindparam('b_last_active_at'))
+        )
+
+        db = None
+        try:
+            db = self._get_session()
+            db.execute(stmt, rows)
+            db.commit()
+        except Exception as e:
+            logger.warning(f"Failed to flush user activity for {len(rows)} users: {e}")
+            if db is not None:
+                try:
+                    db.rollback()
+                except Exception:
+                    pass
+            with self._lock:
+                for user_id, seen_at in batch.items():
+                    newer = self._pending.get(user_id)
+                    if newer is None or seen_at > newer:
+                        self._pending[user_id] = seen_at
+                self.stats['failed_flushes'] += 1
+            return 0
+        finally:
+            if db is not None:
+                try:
+                    db.close()
+                except Exception:
+                    pass
+
+        self.stats['flushes'] += 1
+        self.stats['rows_written'] += len(rows)
+        logger.debug(f"Flushed last_active_at for {len(rows)} users")
+        return len(rows)
+
+    async def flush_loop(self):
+        """Periodically flush pending activity from a worker thread"""
+        logger.info("Activity tracking service started")
+
+        while self.running:
+            try:
+                await asyncio.sleep(self.flush_interval)
+                await asyncio.to_thread(self.flush)
+            except asyncio.CancelledError:
+                logger.info("Activity flush loop cancelled")
+                break
+            except Exception as e:
+                logger.error(f"Error in activity flush loop: {e}")
+
+        logger.info("Activity tracking service stopped")
+
+    def start(self):
+        """Start the periodic flush task"""
+        if self.running:
+            logger.warning("Activity tracking service already running")
+            return
+
+        self.running = True
+        self._task = asyncio.create_task(self.flush_loop())
+        logger.info("Activity tracking service starting...")
+
+    def stop(self):
+        """Stop the flush task and write whatever is still pending"""
+        if not self.running:
+            return
+
+        self.running = False
+        if self._task:
+            self._task.cancel()
+        self.flush()
+        logger.info("Activity tracking service stopping...")
+
+
+# Global instance
+activity_tracking_service = ActivityTrackingService()
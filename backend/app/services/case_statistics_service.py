@@ -0,0 +1,482 @@
+"""
+Case Statistics Service
+Maintains the case_statistics summary table. Child rows (parties, timeline
+events, assets, linked documents, objections) adjust their case's counters
+by delta inside the same flush that writes them, so the case page and
+dashboard read one row instead of running an aggregate per child table.
+A periodic reconciliation job recounts from the child tables and repairs
+drift left by writes that bypass the ORM (bulk UPDATE/DELETE, raw SQL).
+"""
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import case, delete, event, func, insert, inspect, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, object_session
+
+from app.models.case_management import (
+    AssetStatus,
+    CaseAsset,
+    CaseObjection,
+    CaseParty,
+    CaseStatistics,
+    CaseTimelineEvent,
+    EventStatus,
+    EventType,
+    LegalCase,
+    LegalCaseDocument,
+    ObjectionStatus,
+)
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_ASSET_STATUSES = (AssetStatus.INCLUDED, AssetStatus.PENDING)
+PENDING_OBJECTION_STATUSES = (ObjectionStatus.FILED, ObjectionStatus.PENDING)
+
+COUNTER_COLUMNS = (
+    'parties_count',
+    'events_count',
+    'assets_count',
+    'documents_count',
+    'deadlines_count',
+    'open_deadlines_count',
+    'active_assets_count',
+    'active_assets_value',
+    'pending_objections_count',
+)
+
+_PENDING_KEY = 'case_statistics_pending'
+
+
+def _party_contribution(values: Dict[str, Any]) -> Dict[str, Any]:
+    return {'parties_count': 1}
+
+
+def _event_contribution(values: Dict[str, Any]) -> Dict[str, Any]:
+    result = {'events_count': 1}
+    if values['event_type'] == EventType.DEADLINE:
+        result['deadlines_count'] = 1
+        if values['status'] != EventStatus.COMPLETED:
+            result['open_deadlines_count'] = 1
+    return result
+
+
+def _asset_contribution(values: Dict[str, Any]) -> Dict[str, Any]:
+    result = {'assets_count': 1}
+    if values['status'] in ACTIVE_ASSET_STATUSES:
+        result['active_assets_count'] = 1
+        result['active_assets_value'] = Decimal(str(values['estimated_value'] or 0))
+    return result
+
+
+def _document_contribution(values: Dict[str, Any]) -> Dict[str, Any]:
+    return {'documents_count': 1}
+
+
+def _objection_contribution(values: Dict[str, Any]) -> Dict[str, Any]:
+    if values['status'] in PENDING_OBJECTION_STATUSES:
+        return {'pending_objections_count': 1}
+    return {}
+
+
+# Child model -> (attributes the contribution depends on besides case_id, contribution)
+TRACKED_MODELS: Dict[type, Tuple[Tuple[str, ...], Callable[[Dict[str, Any]], Dict[str, Any]]]] = {
+    CaseParty: ((), _party_contribution),
+    CaseTimelineEvent: (('event_type', 'status'), _event_contribution),
+    CaseAsset: (('status', 'estimated_value'), _asset_contribution),
+    LegalCaseDocument: ((), _document_contribution),
+    CaseObjection: (('status',), _objection_contribution),
+}
+
+
+# ============================================================================
+# FLUSH-TIME DELTA TRACKING
+# ============================================================================
+
+def _pending(target) -> Dict[str, Any]:
+    session = object_session(target)
+    return session.info.setdefault(_PENDING_KEY, {
+        'deltas': defaultdict(lambda: defaultdict(int)),
+        'created': set(),
+        'deleted': set(),
+    })
+
+
+def _add(deltas, case_id: Optional[str], contribution: Dict[str, Any], sign: int):
+    if case_id is None:
+        return
+    for column, value in contribution.items():
+        deltas[case_id][column] += sign * value
+
+
+def _fetch_stored(connection, target, names: Iterable[str]) -> Dict[str, Any]:
+    """Read attribute values as they are in the database, before this flush"""
+    mapper = inspect(target).mapper
+    pk = mapper.primary_key[0]
+    columns = [mapper.columns[name] for name in names]
+    row = connection.execute(
+        select(*columns).where(pk == inspect(target).identity[0])
+    ).first()
+    return dict(zip(names, row)) if row is not None else {}
+
+
+def _values_before(connection, target, names: Tuple[str, ...]) -> Dict[str, Any]:
+    """Committed values for names, from attribute history or the database"""
+    state = inspect(target)
+    values, missing = {}, []
+    for name in names:
+        history = state.attrs[name].history
+        if history.deleted:
+            values[name] = history.deleted[0]
+        elif history.unchanged:
+            values[name] = history.unchanged[0]
+        else:
+            missing.append(name)
+    if missing:
+        values.update(_fetch_stored(connection, target, missing))
+    return values
+
+
+def _after_insert(mapper, connection, target):
+    attrs, contribution = TRACKED_MODELS[mapper.class_]
+    values = {name: getattr(target, name) for name in ('case_id',) + attrs}
+    _add(_pending(target)['deltas'], values['case_id'], contribution(values), 1)
+
+
+def _before_update(mapper, connection, target):
+    attrs, contribution = TRACKED_MODELS[mapper.class_]
+    names = ('case_id',) + attrs
+    state = inspect(target)
+    if not any(state.attrs[name].history.has_changes() for name in names):
+        return
+
+    old = _values_before(connection, target, names)
+    new = {name: state.dict.get(name, old.get(name)) for name in names}
+    deltas = _pending(target)['deltas']
+    _add(deltas, old.get('case_id'), contribution(old), -1)
+    _add(deltas, new['case_id'], contribution(new), 1)
+
+
+def _before_delete(mapper, connection, target):
+    attrs, contribution = TRACKED_MODELS[mapper.class_]
+    old = _values_before(connection, target, ('case_id',) + attrs)
+    if old:
+        _add(_pending(target)['deltas'], old.get('case_id'), contribution(old), -1)
+
+
+def _case_inserted(mapper, connection, target):
+    _pending(target)['created'].add(target.id)
+
+
+def _case_deleted(mapper, connection, target):
+    _pending(target)['deleted'].add(target.id)
+
+
+def _before_flush(session, flush_context, instances):
+    # Drop deltas left behind by a flush that failed part way
+    session.info.pop(_PENDING_KEY, None)
+
+
+def _after_flush(session, flush_context):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+
+    connection = session.connection()
+    deltas = pending['deltas']
+    deleted = pending['deleted']
+
+    for case_id in pending['created'] - deleted:
+        row = {column: 0 for column in COUNTER_COLUMNS}
+        row.update(deltas.pop(case_id, {}))
+        connection.execute(insert(CaseStatistics.__table__).values(case_id=case_id, **row))
+
+    if deleted:
+        table = CaseStatistics.__table__
+        connection.execute(delete(table).where(table.c.case_id.in_(deleted)))
+
+    for case_id, changes in deltas.items():
+        if case_id in deleted:
+            continue
+        changes = {column: value for column, value in changes.items() if value}
+        if changes:
+            apply_deltas(connection, case_id, changes)
+
+
+def apply_deltas(connection, case_id: str, changes: Dict[str, Any]):
+    """Add changes to a case's counters, rebuilding the row if it is missing"""
+    table = CaseStatistics.__table__
+    additions = {
+        **{column: table.c[column] + value for column, value in changes.items()},
+        'updated_at': datetime.utcnow(),
+    }
+    result = connection.execute(update(table).where(table.c.case_id == case_id).values(additions))
+    if result.rowcount == 0:
+        # Case predates the summary table: the recount already includes this flush
+        for row in compute_case_statistics(connection, [case_id]).values():
+            _insert_or_add(connection, row, additions)
+
+
+def _insert_or_add(connection, row: Dict[str, Any], additions: Dict[str, Any]):
+    """
+    Insert a recounted row. If a concurrent transaction inserted the row
+    first, its recount lacks this flush, so the changes are added to it
+    instead; the counters never fail the write that triggered them.
+    """
+    table = CaseStatistics.__table__
+    dialect = {'postgresql': postgresql, 'sqlite': sqlite}.get(connection.dialect.name)
+    if dialect is not None:
+        connection.execute(
+            dialect.insert(table).values(**row)
+            .on_conflict_do_update(index_elements=[table.c.case_id], set_=additions)
+        )
+        return
+
+    try:
+        with connection.begin_nested():
+            connection.execute(insert(table).values(**row))
+    except IntegrityError:
+        connection.execute(update(table).where(table.c.case_id == row['case_id']).values(additions))
+
+
+_LISTENERS = [
+    (Session, 'before_flush', _before_flush),
+    (Session, 'after_flush', _after_flush),
+    (LegalCase, 'after_insert', _case_inserted),
+    (LegalCase, 'after_delete', _case_deleted),
+]
+for _model in TRACKED_MODELS:
+    _LISTENERS += [
+        (_model, 'after_insert', _after_insert),
+        (_model, 'before_update', _before_update),
+        (_model, 'before_delete', _before_delete),
+    ]
+
+
+def install_listeners():
+    """Register the flush-time listeners (idempotent)"""
+    for target, name, fn in _LISTENERS:
+        if not event.contains(target, name, fn):
+            event.listen(target, name, fn)
+
+
+def remove_listeners():
+    """Unregister the flush-time listeners"""
+    for target, name, fn in _LISTENERS:
+        if event.contains(target, name, fn):
+            event.remove(target, name, fn)
+
+
+# ============================================================================
+# RECOUNTS
+# ============================================================================
+
+def compute_case_statistics(connection, case_ids: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Recount the summary columns from the child tables, one grouped query per
+    table. Returns {case_id: row} for every case in case_ids (or every case).
+    """
+    def scoped(query, column):
+        return query.where(column.in_(case_ids)) if case_ids is not None else query
+
+    case_query = scoped(select(LegalCase.id), LegalCase.id)
+    rows = {
+        case_id: {'case_id': case_id, **{column: 0 for column in COUNTER_COLUMNS}}
+        for case_id in connection.execute(case_query).scalars()
+    }
+
+    def flag(condition):
+        return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+    is_deadline = CaseTimelineEvent.event_type == EventType.DEADLINE
+    is_active = CaseAsset.status.in_(ACTIVE_ASSET_STATUSES)
+    queries = [
+        (CaseParty, ['parties_count'], [func.count()]),
+        (CaseTimelineEvent, ['events_count', 'deadlines_count', 'open_deadlines_count'], [
+            func.count(),
+            flag(is_deadline),
+            flag(is_deadline & (CaseTimelineEvent.status != EventStatus.COMPLETED)),
+        ]),
+        (CaseAsset, ['assets_count', 'active_assets_count', 'active_assets_value'], [
+            func.count(),
+            flag(is_active),
+            func.coalesce(func.sum(case((is_active, func.coalesce(CaseAsset.estimated_value, 0)), else_=0)), 0),
+        ]),
+        (LegalCaseDocument, ['documents_count'], [func.count()]),
+        (CaseObjection, ['pending_objections_count'], [
+            flag(CaseObjection.status.in_(PENDING_OBJECTION_STATUSES)),
+        ]),
+    ]
+    for model, columns, aggregates in queries:
+        query = scoped(select(model.case_id, *aggregates), model.case_id).group_by(model.case_id)
+        for case_id, *values in connection.execute(query):
+            if case_id in rows:
+                rows[case_id].update(zip(columns, values))
+
+    for row in rows.values():
+        row['active_assets_value'] = Decimal(str(row['active_assets_value'])).quantize(Decimal('0.01'))
+    return rows
+
+
+def _differences(stored: Dict[str, Any], actual: Dict[str, Any]) -> Dict[str, Tuple[Any, Any]]:
+    drift = {}
+    for column in COUNTER_COLUMNS:
+        before, after = stored.get(column), actual[column]
+        if column == 'active_assets_value':
+            same = before is not None and Decimal(str(before)).quantize(Decimal('0.01')) == after
+        else:
+            same = before == after
+        if not same:
+            drift[column] = (before, after)
+    return drift
+
+
+class CaseStatisticsService:
+    """Reads case statistics and runs the periodic reconciliation job"""
+
+    def __init__(self, reconcile_interval: int = 3600, batch_size: int = 500,
+                 session_factory: Optional[Callable[[], Any]] = None):
+        self.running = False
+        self.reconcile_interval = reconcile_interval
+        self.batch_size = batch_size
+        self._session_factory = session_factory
+        self._task = None
+        self.last_report: Optional[Dict[str, Any]] = None
+
+    def _get_session(self):
+        if self._session_factory is None:
+            from app.src.core.database import SessionLocal
+            self._session_factory = SessionLocal
+        return self._session_factory()
+
+    def get_statistics(self, db: Session, case_id: str) -> Optional[CaseStatistics]:
+        """
+        Return the summary row for a case. Cases created before the summary
+        table existed get a recounted row that is not added to the session;
+        it is stored by the next write to the case or by reconciliation, so
+        reads never write or commit the caller's session.
+        """
+        stats = db.get(CaseStatistics, case_id)
+        if stats is not None:
+            return stats
+
+        rows = compute_case_statistics(db.connection(), [case_id])
+        if case_id not in rows:
+            return None
+        return CaseStatistics(**rows[case_id])
+
+    def reconcile(self, db: Session, case_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Recount every case (or case_ids) in batches and repair drifted,
+        missing and orphaned rows. Each batch locks its summary rows first
+        so deltas from concurrent writers are applied after the recount
+        rather than overwritten by it.
+        """
+        table = CaseStatistics.__table__
+        report = {
+            'cases_checked': 0,
+            'rows_inserted': 0,
+            'rows_repaired': 0,
+            'rows_removed': 0,
+            'drift': [],
+            'started_at': datetime.utcnow().isoformat(),
+        }
+
+        if case_ids is None:
+            case_ids = list(db.execute(select(LegalCase.id).order_by(LegalCase.id)).scalars())
+            orphaned = db.execute(
+                delete(table).where(~table.c.case_id.in_(select(LegalCase.id)))
+            ).rowcount
+            report['rows_removed'] = orphaned or 0
+            db.commit()
+
+        for start in range(0, len(case_ids), self.batch_size):
+            batch = case_ids[start:start + self.batch_size]
+            stored = {
+                row.case_id: row._asdict()
+                for row in db.execute(
+                    select(table).where(table.c.case_id.in_(batch)).with_for_update()
+                )
+            }
+            actual = compute_case_statistics(db.connection(), batch)
+            now = datetime.utcnow()
+
+            for case_id, row in actual.items():
+                report['cases_checked'] += 1
+                if case_id not in stored:
+                    db.execute(insert(table).values(**row, reconciled_at=now))
+                    report['rows_inserted'] += 1
+                    continue
+                drift = _differences(stored[case_id], row)
+                values = {'reconciled_at': now}
+                if drift:
+                    values.update({column: row[column] for column in drift}, updated_at=now)
+                    report['rows_repaired'] += 1
+                    report['drift'].append({'case_id': case_id, 'fields': drift})
+                    logger.warning(f"Repaired case statistics drift for case {case_id}: {drift}")
+                db.execute(update(table).where(table.c.case_id == case_id).values(**values))
+            db.commit()
+
+        report['completed_at'] = datetime.utcnow().isoformat()
+        self.last_report = report
+        return report
+
+    def run_reconciliation(self) -> Dict[str, Any]:
+        """Reconcile all cases in a fresh session"""
+        db = self._get_session()
+        try:
+            return self.reconcile(db)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    async def reconcile_loop(self):
+        """Periodically reconcile from a worker thread"""
+        logger.info("Case statistics reconciliation started")
+
+        while self.running:
+            try:
+                await asyncio.sleep(self.reconcile_interval)
+                report = await asyncio.to_thread(self.run_reconciliation)
+                logger.info(
+                    f"Reconciled {report['cases_checked']} cases: {report['rows_repaired']} repaired, "
+                    f"{report['rows_inserted']} inserted, {report['rows_removed']} removed"
+                )
+            except asyncio.CancelledError:
+                logger.info("Case statistics reconciliation cancelled")
+                break
+            except Exception as e:
+                logger.error(f"Error in case statistics reconciliation: {e}")
+
+        logger.info("Case statistics reconciliation stopped")
+
+    def start(self):
+        """Start the periodic reconciliation task"""
+        if self.running:
+            logger.warning("Case statistics reconciliation already running")
+            return
+
+        self.running = True
+        self._task = asyncio.create_task(self.reconcile_loop())
+
+    def stop(self):
+        """Stop the reconciliation task"""
+        if not self.running:
+            return
+
+        self.running = False
+        if self._task:
+            self._task.cancel()
+
+
+install_listeners()
+
+# Global instance
+case_statistics_service = CaseStatisticsService()
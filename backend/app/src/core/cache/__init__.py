@@ -1,21 +1,31 @@
 """
 Cache Module
 
-Provides Redis caching functionality for improved performance.
+Provides async Redis caching functionality for improved performance.
 """
 
 from .redis_cache import (
     CacheService,
+    CacheSerializer,
+    JSONSerializer,
+    MsgpackSerializer,
+    SingleFlight,
     cache,
     cached,
     cache_invalidate,
     get_redis_client,
+    get_async_redis_client,
 )
 
 __all__ = [
     'CacheService',
+    'CacheSerializer',
+    'JSONSerializer',
+    'MsgpackSerializer',
+    'SingleFlight',
     'cache',
     'cached',
     'cache_invalidate',
     'get_redis_client',
+    'get_async_redis_client',
 ]
@@ -1,21 +1,24 @@
 """
 Redis Cache Service
 
-Provides caching functionality using Redis for improved performance.
-Supports TTL, cache invalidation, and common caching patterns.
+Provides non-blocking caching using redis.asyncio for improved performance.
+Supports TTL, batched reads/writes, binary serialization with optional
+compression, SCAN- and tag-based invalidation, and stampede protection.
 """
 
+import asyncio
 import json
 import logging
 import hashlib
-from typing import Any, Optional, Callable, Dict, List
+import zlib
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Union
 from functools import wraps
-from datetime import timedelta
 import os
 
 try:
     import redis
     from redis import Redis, ConnectionPool
+    import redis.asyncio as aioredis
     REDIS_AVAILABLE = True
 
     # Check if we should use fake redis
@@ -33,8 +36,15 @@ try:
 except ImportError:
     REDIS_AVAILABLE = False
     FAKEREDIS_AVAILABLE = False
+    USE_FAKE_REDIS = False
     logging.warning("redis package not installed. Install with: pip install redis")
 
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
 
@@ -46,8 +56,8 @@ class RedisConnectionManager:
     """Manages Redis connection pool and provides singleton access"""
 
     _instance = None
-    _redis_client: Optional[Redis] = None
-    _connection_pool: Optional[ConnectionPool] = None
+    _redis_client: Optional["Redis"] = None
+    _connection_pool: Optional["ConnectionPool"] = None
 
     def __new__(cls):
         if cls._instance is None:
@@ -103,7 +113,7 @@ class RedisConnectionManager:
             self._redis_client = None
             self._connection_pool = None
 
-    def get_client(self) -> Optional[Redis]:
+    def get_client(self) -> Optional["Redis"]:
         """Get Redis client instance"""
         return self._redis_client
 
@@ -129,51 +139,229 @@ class RedisConnectionManager:
 _redis_manager = RedisConnectionManager()
 
 
-def get_redis_client() -> Optional[Redis]:
-    """Get Redis client instance"""
+def get_redis_client() -> Optional["Redis"]:
+    """Get the synchronous Redis client (used by the rate limiter)"""
     return _redis_manager.get_client()
 
 
+_async_redis_client = None
+
+
+def get_async_redis_client():
+    """
+    Get the shared redis.asyncio client for the cache.
+
+    The client returns raw bytes (values are binary-serialized) and opens
+    connections lazily, so it can be created outside a running event loop.
+    """
+    global _async_redis_client
+
+    if not REDIS_AVAILABLE:
+        return None
+
+    if _async_redis_client is None:
+        if USE_FAKE_REDIS and FAKEREDIS_AVAILABLE:
+            import fakeredis
+            _async_redis_client = fakeredis.FakeAsyncRedis()
+        else:
+            _async_redis_client = aioredis.Redis(
+                host=os.getenv('REDIS_HOST', 'localhost'),
+                port=int(os.getenv('REDIS_PORT', 6379)),
+                db=int(os.getenv('REDIS_DB', 0)),
+                password=os.getenv('REDIS_PASSWORD', None),
+                max_connections=int(os.getenv('REDIS_MAX_CONNECTIONS', 50)),
+                socket_connect_timeout=5,
+                socket_timeout=5,
+                retry_on_timeout=True,
+            )
+
+    return _async_redis_client
+
+
+# =============================================================================
+# SERIALIZATION
+# =============================================================================
+
+class CacheSerializer:
+    """Base class for cache value serializers"""
+
+    # Stored in the value header so entries stay readable if the default changes
+    serializer_id: int = 0
+
+    def dumps(self, value: Any) -> bytes:
+        raise NotImplementedError
+
+    def loads(self, data: bytes) -> Any:
+        raise NotImplementedError
+
+
+class JSONSerializer(CacheSerializer):
+    """JSON serialization (unknown types are stored as strings)"""
+
+    serializer_id = 0
+
+    def dumps(self, value: Any) -> bytes:
+        return json.dumps(value, default=str, separators=(",", ":")).encode("utf-8")
+
+    def loads(self, data: bytes) -> Any:
+        return json.loads(data)
+
+
+class MsgpackSerializer(CacheSerializer):
+    """Compact binary serialization via msgpack (unknown types are stored as strings)"""
+
+    serializer_id = 1
+
+    def __init__(self):
+        if not MSGPACK_AVAILABLE:
+            raise RuntimeError("msgpack not installed. Install with: pip install msgpack")
+
+    def dumps(self, value: Any) -> bytes:
+        return msgpack.packb(value, default=str, use_bin_type=True)
+
+    def loads(self, data: bytes) -> Any:
+        return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+
+_SERIALIZERS = {JSONSerializer.serializer_id: JSONSerializer}
+if MSGPACK_AVAILABLE:
+    _SERIALIZERS[MsgpackSerializer.serializer_id] = MsgpackSerializer
+
+# Header byte: 0x80 | serializer_id << 1 | compressed. Plain JSON written by
+# older versions (and INCRBY counters) start below 0x80 and are read as JSON.
+_HEADER_FLAG = 0x80
+_COMPRESSED = 0x01
+
+
+def default_serializer() -> CacheSerializer:
+    """msgpack when installed, otherwise JSON"""
+    return MsgpackSerializer() if MSGPACK_AVAILABLE else JSONSerializer()
+
+
+# =============================================================================
+# SINGLE-FLIGHT
+# =============================================================================
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key: the first caller runs the
+    loader and every caller that arrives while it is in flight awaits the
+    same result instead of hitting the backend again.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def do(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        future = self._inflight.get(key)
+        if future is not None:
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await loader()
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                future.exception()  # Mark retrieved when nobody else is waiting
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._inflight.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+
 # =============================================================================
 # CACHE SERVICE
 # =============================================================================
 
 class CacheService:
     """
-    Redis cache service with common caching operations.
+    Async Redis cache service with common caching operations.
 
     Features:
-    - Set/get with TTL
-    - JSON serialization
-    - Cache invalidation patterns
-    - Bulk operations
+    - Set/get with TTL, never blocking the event loop
+    - Batched get_many/set_many/delete_many (MGET and pipelines)
+    - Pluggable binary serialization with compression above a threshold
+    - SCAN-based pattern invalidation and tag-set invalidation (no KEYS)
     - Cache stats
     """
 
-    def __init__(self):
-        self.redis = get_redis_client()
+    SCAN_COUNT = 500
+    DELETE_BATCH = 500
 
-    def is_available(self) -> bool:
-        """Check if caching is available"""
-        return _redis_manager.is_available()
+    def __init__(
+        self,
+        redis_client=None,
+        serializer: Optional[CacheSerializer] = None,
+        compress_threshold: int = 1024,
+        compression_level: int = 6
+    ):
+        self.redis = redis_client if redis_client is not None else get_async_redis_client()
+        self.serializer = serializer or default_serializer()
+        self.compress_threshold = compress_threshold
+        self.compression_level = compression_level
+
+    def _available(self) -> bool:
+        return self.redis is not None
+
+    async def is_available(self) -> bool:
+        """Check if caching is available (round trip to Redis)"""
+        if not self._available():
+            return False
+
+        try:
+            return bool(await self.redis.ping())
+        except Exception:
+            return False
 
     def _make_key(self, key: str, prefix: str = "cache") -> str:
         """Generate cache key with namespace prefix"""
         return f"{prefix}:{key}"
 
-    def _serialize(self, value: Any) -> str:
-        """Serialize value to JSON string"""
+    def _tag_key(self, tag: str, prefix: str = "cache") -> str:
+        return f"{prefix}:tag:{tag}"
+
+    def _serialize(self, value: Any) -> bytes:
+        """Serialize value to header byte + (optionally compressed) payload"""
         try:
-            return json.dumps(value, default=str)
+            payload = self.serializer.dumps(value)
         except (TypeError, ValueError) as e:
             logger.error(f"Serialization error: {e}")
             raise
 
-    def _deserialize(self, value: str) -> Any:
-        """Deserialize JSON string to Python object"""
+        header = _HEADER_FLAG | (self.serializer.serializer_id << 1)
+        if self.compress_threshold is not None and len(payload) >= self.compress_threshold:
+            compressed = zlib.compress(payload, self.compression_level)
+            if len(compressed) < len(payload):
+                return bytes([header | _COMPRESSED]) + compressed
+        return bytes([header]) + payload
+
+    def _deserialize(self, value: Union[bytes, str]) -> Any:
+        """Deserialize a stored value, accepting legacy plain-JSON entries"""
         try:
-            return json.loads(value)
-        except (TypeError, ValueError) as e:
+            if isinstance(value, str):
+                value = value.encode("utf-8")
+            header = value[0] if value else 0
+            if not header & _HEADER_FLAG:
+                return json.loads(value)
+
+            payload = value[1:]
+            if header & _COMPRESSED:
+                payload = zlib.decompress(payload)
+            serializer_id = (header & ~_HEADER_FLAG) >> 1
+            if serializer_id == self.serializer.serializer_id:
+                return self.serializer.loads(payload)
+            return _SERIALIZERS[serializer_id]().loads(payload)
+
+        except Exception as e:
             logger.error(f"Deserialization error: {e}")
             return None
 
@@ -181,7 +369,7 @@ class CacheService:
     # Basic Operations
     # -------------------------------------------------------------------------
 
-    def get(self, key: str, prefix: str = "cache") -> Optional[Any]:
+    async def get(self, key: str, prefix: str = "cache") -> Optional[Any]:
         """
         Get value from cache.
 
@@ -192,12 +380,11 @@ class CacheService:
         Returns:
             Cached value or None if not found
         """
-        if not self.is_available():
+        if not self._available():
             return None
 
         try:
-            cache_key = self._make_key(key, prefix)
-            value = self.redis.get(cache_key)
+            value = await self.redis.get(self._make_key(key, prefix))
 
             if value is None:
                 return None
@@ -208,12 +395,13 @@ class CacheService:
             logger.error(f"Cache get error: {e}")
             return None
 
-    def set(
+    async def set(
         self,
         key: str,
         value: Any,
         ttl: Optional[int] = None,
-        prefix: str = "cache"
+        prefix: str = "cache",
+        tags: Optional[Iterable[str]] = None
     ) -> bool:
         """
         Set value in cache with optional TTL.
@@ -223,29 +411,14 @@ class CacheService:
             value: Value to cache
             ttl: Time-to-live in seconds (None = no expiration)
             prefix: Key namespace prefix
+            tags: Tags to register the key under for invalidate_tags()
 
         Returns:
             True if successful, False otherwise
         """
-        if not self.is_available():
-            return False
+        return await self.set_many({key: value}, ttl=ttl, prefix=prefix, tags=tags)
 
-        try:
-            cache_key = self._make_key(key, prefix)
-            serialized = self._serialize(value)
-
-            if ttl:
-                self.redis.setex(cache_key, ttl, serialized)
-            else:
-                self.redis.set(cache_key, serialized)
-
-            return True
-
-        except Exception as e:
-            logger.error(f"Cache set error: {e}")
-            return False
-
-    def delete(self, key: str, prefix: str = "cache") -> bool:
+    async def delete(self, key: str, prefix: str = "cache") -> bool:
         """
         Delete key from cache.
 
@@ -256,19 +429,18 @@ class CacheService:
         Returns:
             True if deleted, False otherwise
         """
-        if not self.is_available():
+        if not self._available():
             return False
 
         try:
-            cache_key = self._make_key(key, prefix)
-            self.redis.delete(cache_key)
+            await self.redis.delete(self._make_key(key, prefix))
             return True
 
         except Exception as e:
             logger.error(f"Cache delete error: {e}")
             return False
 
-    def exists(self, key: str, prefix: str = "cache") -> bool:
+    async def exists(self, key: str, prefix: str = "cache") -> bool:
         """
         Check if key exists in cache.
 
@@ -279,25 +451,105 @@ class CacheService:
         Returns:
             True if exists, False otherwise
         """
-        if not self.is_available():
+        if not self._available():
             return False
 
         try:
-            cache_key = self._make_key(key, prefix)
-            return bool(self.redis.exists(cache_key))
+            return bool(await self.redis.exists(self._make_key(key, prefix)))
 
         except Exception as e:
             logger.error(f"Cache exists error: {e}")
             return False
 
     # -------------------------------------------------------------------------
-    # Pattern-Based Operations
+    # Batched Operations
+    # -------------------------------------------------------------------------
+
+    async def get_many(self, keys: List[str], prefix: str = "cache") -> Dict[str, Any]:
+        """
+        Get several values in one MGET round trip.
+
+        Returns:
+            Dict of key -> value for the keys that were found
+        """
+        if not self._available() or not keys:
+            return {}
+
+        try:
+            values = await self.redis.mget([self._make_key(k, prefix) for k in keys])
+            return {
+                key: self._deserialize(value)
+                for key, value in zip(keys, values)
+                if value is not None
+            }
+
+        except Exception as e:
+            logger.error(f"Cache get_many error: {e}")
+            return {}
+
+    async def set_many(
+        self,
+        mapping: Dict[str, Any],
+        ttl: Optional[int] = None,
+        prefix: str = "cache",
+        tags: Optional[Iterable[str]] = None
+    ) -> bool:
+        """
+        Set several values in one pipelined round trip.
+
+        Tag sets get the same TTL as the values (extended, never shortened)
+        so they do not outlive what they index by much.
+        """
+        if not self._available() or not mapping:
+            return False
+
+        try:
+            full_keys = [self._make_key(k, prefix) for k in mapping]
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for full_key, value in zip(full_keys, mapping.values()):
+                    pipe.set(full_key, self._serialize(value), ex=ttl)
+                for tag in tags or ():
+                    tag_key = self._tag_key(tag, prefix)
+                    pipe.sadd(tag_key, *full_keys)
+                    if ttl:
+                        pipe.expire(tag_key, ttl, gt=True)
+                        pipe.expire(tag_key, ttl, nx=True)
+                    else:
+                        pipe.persist(tag_key)
+                await pipe.execute()
+            return True
+
+        except Exception as e:
+            logger.error(f"Cache set error: {e}")
+            return False
+
+    async def delete_many(self, keys: List[str], prefix: str = "cache") -> int:
+        """Delete several keys with one UNLINK; returns the number removed"""
+        if not self._available() or not keys:
+            return 0
+
+        try:
+            return await self.redis.unlink(*[self._make_key(k, prefix) for k in keys])
+
+        except Exception as e:
+            logger.error(f"Cache delete_many error: {e}")
+            return 0
+
+    # -------------------------------------------------------------------------
+    # Pattern and Tag Invalidation
     # -------------------------------------------------------------------------
 
-    def delete_pattern(self, pattern: str, prefix: str = "cache") -> int:
+    async def _scan(self, full_pattern: str):
+        async for key in self.redis.scan_iter(match=full_pattern, count=self.SCAN_COUNT):
+            yield key
+
+    async def delete_pattern(self, pattern: str, prefix: str = "cache") -> int:
         """
         Delete all keys matching a pattern.
 
+        Walks the keyspace with cursor-based SCAN and removes keys in UNLINK
+        batches, so Redis is never blocked for the whole keyspace.
+
         Args:
             pattern: Pattern to match (e.g., "user:*")
             prefix: Key namespace prefix
@@ -305,24 +557,28 @@ class CacheService:
         Returns:
             Number of keys deleted
         """
-        if not self.is_available():
+        if not self._available():
             return 0
 
         try:
-            full_pattern = self._make_key(pattern, prefix)
-            keys = self.redis.keys(full_pattern)
-
-            if keys:
-                return self.redis.delete(*keys)
-            return 0
+            deleted = 0
+            batch = []
+            async for key in self._scan(self._make_key(pattern, prefix)):
+                batch.append(key)
+                if len(batch) >= self.DELETE_BATCH:
+                    deleted += await self.redis.unlink(*batch)
+                    batch = []
+            if batch:
+                deleted += await self.redis.unlink(*batch)
+            return deleted
 
         except Exception as e:
             logger.error(f"Cache delete pattern error: {e}")
             return 0
 
-    def get_keys_by_pattern(self, pattern: str, prefix: str = "cache") -> List[str]:
+    async def get_keys_by_pattern(self, pattern: str, prefix: str = "cache") -> List[str]:
         """
-        Get all keys matching a pattern.
+        Get all keys matching a pattern (via SCAN).
 
         Args:
             pattern: Pattern to match (e.g., "user:*")
@@ -331,48 +587,73 @@ class CacheService:
         Returns:
             List of matching keys
         """
-        if not self.is_available():
+        if not self._available():
             return []
 
         try:
-            full_pattern = self._make_key(pattern, prefix)
-            keys = self.redis.keys(full_pattern)
-
-            # Remove prefix from keys
             prefix_len = len(f"{prefix}:")
-            return [key[prefix_len:] for key in keys]
+            keys = []
+            async for key in self._scan(self._make_key(pattern, prefix)):
+                if isinstance(key, bytes):
+                    key = key.decode("utf-8")
+                keys.append(key[prefix_len:])
+            return keys
 
         except Exception as e:
             logger.error(f"Cache get keys error: {e}")
             return []
 
+    async def invalidate_tags(self, *tags: str, prefix: str = "cache") -> int:
+        """
+        Delete every key registered under any of the given tags, plus the
+        tag sets themselves. Cost is proportional to the tagged keys, not the
+        keyspace.
+        """
+        if not self._available() or not tags:
+            return 0
+
+        try:
+            tag_keys = [self._tag_key(tag, prefix) for tag in tags]
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for tag_key in tag_keys:
+                    pipe.smembers(tag_key)
+                members = await pipe.execute()
+
+            keys = list(set().union(*members))
+            deleted = 0
+            for i in range(0, len(keys), self.DELETE_BATCH):
+                deleted += await self.redis.unlink(*keys[i:i + self.DELETE_BATCH])
+            await self.redis.unlink(*tag_keys)
+            return deleted
+
+        except Exception as e:
+            logger.error(f"Cache invalidate tags error: {e}")
+            return 0
+
     # -------------------------------------------------------------------------
     # Hash Operations
     # -------------------------------------------------------------------------
 
-    def hset(self, key: str, field: str, value: Any, prefix: str = "cache") -> bool:
+    async def hset(self, key: str, field: str, value: Any, prefix: str = "cache") -> bool:
         """Set field in hash"""
-        if not self.is_available():
+        if not self._available():
             return False
 
         try:
-            cache_key = self._make_key(key, prefix)
-            serialized = self._serialize(value)
-            self.redis.hset(cache_key, field, serialized)
+            await self.redis.hset(self._make_key(key, prefix), field, self._serialize(value))
             return True
 
         except Exception as e:
             logger.error(f"Cache hset error: {e}")
             return False
 
-    def hget(self, key: str, field: str, prefix: str = "cache") -> Optional[Any]:
+    async def hget(self, key: str, field: str, prefix: str = "cache") -> Optional[Any]:
         """Get field from hash"""
-        if not self.is_available():
+        if not self._available():
             return None
 
         try:
-            cache_key = self._make_key(key, prefix)
-            value = self.redis.hget(cache_key, field)
+            value = await self.redis.hget(self._make_key(key, prefix), field)
 
             if value is None:
                 return None
@@ -383,16 +664,18 @@ class CacheService:
             logger.error(f"Cache hget error: {e}")
             return None
 
-    def hgetall(self, key: str, prefix: str = "cache") -> Dict[str, Any]:
+    async def hgetall(self, key: str, prefix: str = "cache") -> Dict[str, Any]:
         """Get all fields from hash"""
-        if not self.is_available():
+        if not self._available():
             return {}
 
         try:
-            cache_key = self._make_key(key, prefix)
-            data = self.redis.hgetall(cache_key)
+            data = await self.redis.hgetall(self._make_key(key, prefix))
 
-            return {k: self._deserialize(v) for k, v in data.items()}
+            return {
+                (k.decode("utf-8") if isinstance(k, bytes) else k): self._deserialize(v)
+                for k, v in data.items()
+            }
 
         except Exception as e:
             logger.error(f"Cache hgetall error: {e}")
@@ -402,27 +685,25 @@ class CacheService:
     # Increment/Decrement
     # -------------------------------------------------------------------------
 
-    def increment(self, key: str, amount: int = 1, prefix: str = "cache") -> int:
+    async def increment(self, key: str, amount: int = 1, prefix: str = "cache") -> int:
         """Increment numeric value"""
-        if not self.is_available():
+        if not self._available():
             return 0
 
         try:
-            cache_key = self._make_key(key, prefix)
-            return self.redis.incrby(cache_key, amount)
+            return await self.redis.incrby(self._make_key(key, prefix), amount)
 
         except Exception as e:
             logger.error(f"Cache increment error: {e}")
             return 0
 
-    def decrement(self, key: str, amount: int = 1, prefix: str = "cache") -> int:
+    async def decrement(self, key: str, amount: int = 1, prefix: str = "cache") -> int:
         """Decrement numeric value"""
-        if not self.is_available():
+        if not self._available():
             return 0
 
         try:
-            cache_key = self._make_key(key, prefix)
-            return self.redis.decrby(cache_key, amount)
+            return await self.redis.decrby(self._make_key(key, prefix), amount)
 
         except Exception as e:
             logger.error(f"Cache decrement error: {e}")
@@ -432,14 +713,14 @@ class CacheService:
     # Cache Stats
     # -------------------------------------------------------------------------
 
-    def get_stats(self) -> Dict[str, Any]:
+    async def get_stats(self) -> Dict[str, Any]:
         """Get cache statistics"""
-        if not self.is_available():
+        if not self._available():
             return {"available": False}
 
         try:
-            info = self.redis.info("stats")
-            memory = self.redis.info("memory")
+            info = await self.redis.info("stats")
+            memory = await self.redis.info("memory")
 
             return {
                 "available": True,
@@ -453,6 +734,8 @@ class CacheService:
                 ),
                 "used_memory_human": memory.get("used_memory_human", "0B"),
                 "used_memory_peak_human": memory.get("used_memory_peak_human", "0B"),
+                "serializer": type(self.serializer).__name__,
+                "inflight_loads": len(_single_flight),
             }
 
         except Exception as e:
@@ -470,18 +753,18 @@ class CacheService:
     # Utility Methods
     # -------------------------------------------------------------------------
 
-    def flush_all(self) -> bool:
+    async def flush_all(self) -> bool:
         """
         Flush all cache data (USE WITH CAUTION!)
 
         Returns:
             True if successful
         """
-        if not self.is_available():
+        if not self._available():
             return False
 
         try:
-            self.redis.flushdb()
+            await self.redis.flushdb(asynchronous=True)
             logger.warning("⚠️  Cache flushed - all data cleared")
             return True
 
@@ -489,36 +772,60 @@ class CacheService:
             logger.error(f"Cache flush error: {e}")
             return False
 
+    async def close(self):
+        """Close the async Redis connection pool"""
+        if self._available():
+            await self.redis.aclose()
+
 
 # Global cache service instance
 cache = CacheService()
 
+# Shared by every @cached function so identical concurrent misses load once
+_single_flight = SingleFlight()
+
 
 # =============================================================================
 # CACHE DECORATORS
 # =============================================================================
 
+def _require_coroutine(func: Callable, decorator_name: str):
+    if not asyncio.iscoroutinefunction(func):
+        raise TypeError(f"@{decorator_name} requires an async function, got {func.__qualname__}")
+
+
 def cached(
     ttl: int = 300,
     prefix: str = "cache",
-    key_func: Optional[Callable] = None
+    key_func: Optional[Callable] = None,
+    tags: Optional[Union[Iterable[str], Callable[..., Iterable[str]]]] = None,
+    cache_service: Optional[CacheService] = None
 ):
     """
-    Decorator for caching function results.
+    Decorator for caching async function results.
+
+    Concurrent misses for the same key are coalesced: one call runs the
+    function and fills the cache, the others await its result.
 
     Args:
         ttl: Time-to-live in seconds (default: 5 minutes)
         prefix: Cache key prefix
         key_func: Custom function to generate cache key from args
+        tags: Tags for invalidate_tags(), or a function of the args returning them
+        cache_service: CacheService to use (default: the global cache)
 
     Example:
-        @cached(ttl=600, prefix="users")
-        def get_user(user_id: int):
-            return db.query(User).filter(User.id == user_id).first()
+        @cached(ttl=600, prefix="users", tags=lambda user_id: [f"user:{user_id}"])
+        async def get_user(user_id: int):
+            return await user_repository.get(user_id)
     """
     def decorator(func: Callable) -> Callable:
+        _require_coroutine(func, "cached")
+
         @wraps(func)
-        def wrapper(*args, **kwargs):
+        async def wrapper(*args, **kwargs):
+            service = cache_service or cache
+
             # Generate cache key
             if key_func:
                 cache_key = key_func(*args, **kwargs)
@@ -526,47 +833,64 @@ def cached(
                 cache_key = _generate_cache_key(func.__name__, args, kwargs)
 
             # Try to get from cache
-            cached_value = cache.get(cache_key, prefix=prefix)
+            cached_value = await service.get(cache_key, prefix=prefix)
             if cached_value is not None:
                 logger.debug(f"Cache HIT: {cache_key}")
                 return cached_value
 
-            # Cache miss - execute function
-            logger.debug(f"Cache MISS: {cache_key}")
-            result = func(*args, **kwargs)
+            async def load():
+                # Cache miss - execute function once for all concurrent callers
+                logger.debug(f"Cache MISS: {cache_key}")
+                result = await func(*args, **kwargs)
+                key_tags = tags(*args, **kwargs) if callable(tags) else tags
+                await service.set(cache_key, result, ttl=ttl, prefix=prefix, tags=key_tags)
+                return result
 
-            # Store in cache
-            cache.set(cache_key, result, ttl=ttl, prefix=prefix)
-
-            return result
+            return await _single_flight.do(service._make_key(cache_key, prefix), load)
 
         return wrapper
     return decorator
 
 
-def cache_invalidate(pattern: str, prefix: str = "cache"):
+def cache_invalidate(
+    pattern: Optional[str] = None,
+    prefix: str = "cache",
+    tags: Optional[Union[Iterable[str], Callable[..., Iterable[str]]]] = None,
+    cache_service: Optional[CacheService] = None
+):
     """
-    Decorator to invalidate cache after function execution.
+    Decorator to invalidate cache after an async function executes.
 
     Args:
-        pattern: Pattern of keys to invalidate (e.g., "user:*")
+        pattern: Pattern of keys to invalidate via SCAN (e.g., "user:*")
         prefix: Cache key prefix
+        tags: Tags to invalidate, or a function of the args returning them
+        cache_service: CacheService to use (default: the global cache)
 
     Example:
-        @cache_invalidate(pattern="user:*", prefix="users")
-        def update_user(user_id: int, data: dict):
+        @cache_invalidate(tags=lambda user_id, data: [f"user:{user_id}"], prefix="users")
+        async def update_user(user_id: int, data: dict):
             # Update user in database
             pass
     """
     def decorator(func: Callable) -> Callable:
+        _require_coroutine(func, "cache_invalidate")
+
         @wraps(func)
-        def wrapper(*args, **kwargs):
+        async def wrapper(*args, **kwargs):
+            service = cache_service or cache
+
             # Execute function
-            result = func(*args, **kwargs)
+            result = await func(*args, **kwargs)
 
             # Invalidate cache
-            deleted = cache.delete_pattern(pattern, prefix=prefix)
-            logger.debug(f"Cache invalidated: {pattern} ({deleted} keys)")
+            deleted = 0
+            if tags is not None:
+                key_tags = tags(*args, **kwargs) if callable(tags) else tags
+                deleted += await service.invalidate_tags(*key_tags, prefix=prefix)
+            if pattern is not None:
+                deleted += await service.delete_pattern(pattern, prefix=prefix)
+            logger.debug(f"Cache invalidated: pattern={pattern} tags={tags} ({deleted} keys)")
 
             return result
 
@@ -596,8 +920,13 @@ def _generate_cache_key(func_name: str, args: tuple, kwargs: dict) -> str:
 
 __all__ = [
     'CacheService',
+    'CacheSerializer',
+    'JSONSerializer',
+    'MsgpackSerializer',
+    'SingleFlight',
     'cache',
     'cached',
     'cache_invalidate',
     'get_redis_client',
+    'get_async_redis_client',
 ]
@@ -5,6 +5,7 @@ Utilities for optimizing database queries, monitoring performance,
 and implementing best practices for SQLAlchemy queries.
 """
 
+import asyncio
 import time
 import logging
 import functools
@@ -316,7 +317,7 @@ def cache_query_result(
     ttl: int = 300
 ):
     """
-    Decorator to cache query results.
+    Decorator to cache query results of an async function.
 
     Args:
         cache_key_fn: Function to generate cache key from function args
@@ -327,37 +328,40 @@ def cache_query_result(
             cache_key_fn=lambda user_id: f"user_docs:{user_id}",
             ttl=300
         )
-        def get_user_documents(user_id: int):
-            return db.query(Document).filter_by(user_id=user_id).all()
+        async def get_user_documents(user_id: int):
+            result = await db.execute(select(Document).filter_by(user_id=user_id))
+            return result.scalars().all()
     """
     def decorator(func: F) -> F:
+        if not asyncio.iscoroutinefunction(func):
+            raise TypeError(f"@cache_query_result requires an async function, got {func.__qualname__}")
+
         @functools.wraps(func)
-        def wrapper(*args, **kwargs):
+        async def wrapper(*args, **kwargs):
             # Try to import cache
             try:
-                from ...cache.redis_cache import cache
-
-                # Generate cache key
-                cache_key = cache_key_fn(*args, **kwargs)
+                from ..cache.redis_cache import cache
+            except ImportError:
+                # Cache not available, execute function directly
+                return await func(*args, **kwargs)
 
-                # Try to get from cache
-                cached_result = cache.get(cache_key)
-                if cached_result is not None:
-                    logger.debug(f"Cache hit for key: {cache_key}")
-                    return cached_result
+            # Generate cache key
+            cache_key = cache_key_fn(*args, **kwargs)
 
-                # Execute function
-                result = func(*args, **kwargs)
+            # Try to get from cache
+            cached_result = await cache.get(cache_key)
+            if cached_result is not None:
+                logger.debug(f"Cache hit for key: {cache_key}")
+                return cached_result
 
-                # Store in cache
-                cache.set(cache_key, result, ttl=ttl)
-                logger.debug(f"Cached result for key: {cache_key}")
+            # Execute function
+            result = await func(*args, **kwargs)
 
-                return result
+            # Store in cache
+            await cache.set(cache_key, result, ttl=ttl)
+            logger.debug(f"Cached result for key: {cache_key}")
 
-            except ImportError:
-                # Cache not available, execute function directly
-                return func(*args, **kwargs)
+            return result
 
         return wrapper
     return decorator
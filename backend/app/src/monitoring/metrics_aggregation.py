@@ -0,0 +1,317 @@
+"""
+Metrics Aggregation Engine
+Fixed-memory, mergeable latency sketches per route template and time bucket.
+
+Recording an API call is O(1): it lands in the current time bucket of its
+route series. Window queries merge the buckets that fall inside the window,
+so their cost is O(buckets) and independent of request volume.
+"""
+
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+
+
+class DDSketch:
+    """
+    Quantile sketch with a relative-error guarantee (DDSketch).
+
+    Values are mapped to logarithmically sized bins so any returned quantile
+    is within ``relative_accuracy`` of the true value. The number of bins is
+    capped; when exceeded, the lowest bins are collapsed together, which keeps
+    the upper quantiles (p95/p99) exact to the guarantee.
+    """
+
+    MIN_INDEXABLE_VALUE = 1e-9
+
+    def __init__(self, relative_accuracy: float = 0.01, max_bins: int = 2048):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float, weight: int = 1):
+        """Add a non-negative value"""
+        if value <= self.MIN_INDEXABLE_VALUE:
+            self.zero_count += weight
+        else:
+            key = math.ceil(math.log(value) / self._log_gamma)
+            self.bins[key] = self.bins.get(key, 0) + weight
+            if len(self.bins) > self.max_bins:
+                self._collapse()
+        self.count += weight
+        self.sum += value * weight
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other: "DDSketch"):
+        """Merge another sketch with the same accuracy into this one"""
+        if other.gamma != self.gamma:
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        if other.count == 0:
+            return
+        for key, count in other.bins.items():
+            self.bins[key] = self.bins.get(key, 0) + count
+        if len(self.bins) > self.max_bins:
+            self._collapse()
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float) -> float:
+        """Value at quantile q (0..1), using the same rank rule as a sorted list lookup"""
+        if self.count == 0:
+            return 0
+        rank = min(int(self.count * q), self.count - 1)
+        if rank < self.zero_count:
+            return 0.0
+
+        cumulative = self.zero_count
+        for key in sorted(self.bins):
+            cumulative += self.bins[key]
+            if cumulative > rank:
+                value = 2 * self.gamma ** key / (self.gamma + 1)
+                return max(self.min, min(value, self.max))
+        return self.max
+
+    def _collapse(self):
+        keys = sorted(self.bins)
+        excess = len(keys) - self.max_bins
+        target = keys[excess]
+        for key in keys[:excess]:
+            self.bins[target] += self.bins.pop(key)
+
+
+@dataclass
+class _Bucket:
+    """Aggregates for one route over one time bucket"""
+    sketch: DDSketch
+    count: int = 0
+    error_count: int = 0
+    duration_sum: float = 0.0
+    cost_sum: float = 0.0
+    last_timestamp: float = 0.0
+
+
+@dataclass
+class RouteSummary:
+    """Merged aggregates for one route over a query window"""
+    route: str
+    sketch: DDSketch
+    count: int = 0
+    error_count: int = 0
+    duration_sum: float = 0.0
+    cost_sum: float = 0.0
+    last_timestamp: float = 0.0
+
+    @property
+    def avg_duration(self) -> float:
+        return self.duration_sum / self.count if self.count else 0
+
+    @property
+    def error_rate(self) -> float:
+        return self.error_count / self.count if self.count else 0
+
+
+@dataclass
+class _RouteSeries:
+    """Time-bucketed aggregates plus lifetime totals for one route"""
+    buckets: "OrderedDict[int, _Bucket]" = field(default_factory=OrderedDict)
+    total_count: int = 0
+    total_errors: int = 0
+    total_duration: float = 0.0
+    total_cost: float = 0.0
+
+
+class MetricsAggregator:
+    """
+    Per-route, per-time-bucket API call aggregates with bounded memory.
+
+    Memory is bounded by ``max_routes`` series, ``retention_seconds /
+    bucket_seconds`` buckets per series, and ``max_bins`` per sketch. Routes
+    beyond ``max_routes`` are folded into a single overflow series.
+    """
+
+    OVERFLOW_ROUTE = "__other__"
+
+    def __init__(
+        self,
+        bucket_seconds: int = 60,
+        retention_seconds: int = 24 * 3600,
+        relative_accuracy: float = 0.01,
+        max_bins: int = 1024,
+        max_routes: int = 1000
+    ):
+        self.bucket_seconds = bucket_seconds
+        self.retention_buckets = max(1, retention_seconds // bucket_seconds)
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self.max_routes = max_routes
+        self.series: Dict[str, _RouteSeries] = {}
+
+    def _new_sketch(self) -> DDSketch:
+        return DDSketch(self.relative_accuracy, self.max_bins)
+
+    def record(
+        self,
+        route: str,
+        duration_ms: float,
+        status_code: int,
+        cost: float = 0.0,
+        timestamp: Optional[float] = None
+    ) -> str:
+        """Record one API call and return the series route it was counted under; O(1)"""
+        timestamp = time.time() if timestamp is None else timestamp
+
+        series = self.series.get(route)
+        if series is None:
+            if len(self.series) >= self.max_routes:
+                route = self.OVERFLOW_ROUTE
+                series = self.series.get(route)
+            if series is None:
+                series = self.series[route] = _RouteSeries()
+
+        index = int(timestamp // self.bucket_seconds)
+        bucket = series.buckets.get(index)
+        if bucket is None:
+            bucket = series.buckets[index] = _Bucket(sketch=self._new_sketch())
+            # Buckets are created in (near) time order, so expired ones sit at the front
+            oldest_allowed = index - self.retention_buckets
+            while series.buckets:
+                first = next(iter(series.buckets))
+                if first > oldest_allowed:
+                    break
+                del series.buckets[first]
+            if index not in series.buckets:
+                return route
+
+        is_error = status_code >= 400
+        bucket.sketch.add(duration_ms)
+        bucket.count += 1
+        bucket.duration_sum += duration_ms
+        bucket.cost_sum += cost
+        if is_error:
+            bucket.error_count += 1
+        if timestamp > bucket.last_timestamp:
+            bucket.last_timestamp = timestamp
+
+        series.total_count += 1
+        series.total_duration += duration_ms
+        series.total_cost += cost
+        if is_error:
+            series.total_errors += 1
+        return route
+
+    def query(self, window_seconds: float, now: Optional[float] = None) -> List[RouteSummary]:
+        """Merge each route's buckets inside the window; O(routes x buckets)"""
+        now = time.time() if now is None else now
+        first_index = int((now - window_seconds) // self.bucket_seconds)
+
+        summaries = []
+        for route, series in self.series.items():
+            summary = None
+            for index, bucket in series.buckets.items():
+                if index < first_index or bucket.count == 0:
+                    continue
+                if summary is None:
+                    summary = RouteSummary(route=route, sketch=self._new_sketch())
+                summary.sketch.merge(bucket.sketch)
+                summary.count += bucket.count
+                summary.error_count += bucket.error_count
+                summary.duration_sum += bucket.duration_sum
+                summary.cost_sum += bucket.cost_sum
+                summary.last_timestamp = max(summary.last_timestamp, bucket.last_timestamp)
+            if summary is not None:
+                summaries.append(summary)
+        return summaries
+
+    def totals(self) -> Dict[str, Dict[str, float]]:
+        """Lifetime totals per route"""
+        return {
+            route: {
+                'count': series.total_count,
+                'errors': series.total_errors,
+                'duration_sum': series.total_duration,
+                'cost': series.total_cost,
+            }
+            for route, series in self.series.items()
+        }
+
+    def reset(self):
+        self.series.clear()
+
+
+class RouteTemplateResolver:
+    """
+    Maps raw request paths to route templates (``/cases/{case_id}``).
+
+    Templates come from the application's routes (anything exposing
+    ``path`` and ``path_regex``, as FastAPI/Starlette routes do). Paths that
+    match no route are normalized by replacing numeric, UUID and long hex
+    segments with ``{id}``, so unmatched traffic cannot grow cardinality.
+    """
+
+    _ID_SEGMENT = re.compile(
+        r"^(\d+|[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}|[0-9a-fA-F]{16,})$"
+    )
+
+    def __init__(self, routes: Optional[Iterable[Any]] = None, cache_size: int = 4096):
+        self._routes: List[Any] = []
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._cache_size = cache_size
+        self._lock = threading.Lock()
+        if routes is not None:
+            self.set_routes(routes)
+
+    def set_routes(self, routes: Iterable[Any]):
+        """Load route templates, e.g. from ``app.routes``"""
+        with self._lock:
+            self._routes = [
+                r for r in routes
+                if getattr(r, 'path_regex', None) is not None and getattr(r, 'path', None)
+            ]
+            self._cache.clear()
+
+    def resolve(self, path: str) -> str:
+        with self._lock:
+            template = self._cache.get(path)
+            if template is not None:
+                self._cache.move_to_end(path)
+                return template
+
+        template = None
+        for route in self._routes:
+            if route.path_regex.match(path):
+                template = route.path
+                break
+        if template is None:
+            template = self.normalize(path)
+
+        with self._lock:
+            self._cache[path] = template
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return template
+
+    @classmethod
+    def normalize(cls, path: str) -> str:
+        return "/".join(
+            "{id}" if cls._ID_SEGMENT.match(segment) else segment
+            for segment in path.split("/")
+        )
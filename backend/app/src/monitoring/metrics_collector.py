@@ -11,6 +11,8 @@ from collections import defaultdict, deque
 import threading
 import logging
 
+from .metrics_aggregation import MetricsAggregator, RouteTemplateResolver
+
 logger = logging.getLogger(__name__)
 
 
@@ -37,7 +39,11 @@ class MetricsCollector:
 
         self._initialized = True
 
-        # Endpoint metrics: endpoint -> list of call records
+        # Endpoint metrics: per-route-template latency sketches in time buckets
+        self.aggregator = MetricsAggregator(bucket_seconds=60, retention_seconds=24 * 3600)
+        self.route_resolver = RouteTemplateResolver()
+
+        # Recent call records (for log views): aggregator series route -> bounded deque
         self.endpoint_calls: Dict[str, deque] = defaultdict(lambda: deque(maxlen=1000))
 
         # Database query metrics
@@ -63,6 +69,10 @@ class MetricsCollector:
 
         logger.info("MetricsCollector initialized")
 
+    def register_routes(self, routes):
+        """Load route templates (e.g. ``app.routes``) used to key endpoint metrics"""
+        self.route_resolver.set_routes(routes)
+
     def record_api_call(
         self,
         endpoint: str,
@@ -71,12 +81,20 @@ class MetricsCollector:
         duration_ms: float,
         user_id: Optional[str] = None,
         error: Optional[str] = None,
-        metadata: Optional[Dict] = None
+        metadata: Optional[Dict] = None,
+        route: Optional[str] = None
     ):
-        """Record an API call with all relevant metrics"""
+        """
+        Record an API call with all relevant metrics.
+        ``route`` is the matched route template; when omitted it is resolved
+        from ``endpoint`` so raw paths never become separate series.
+        """
+        now = time.time()
+        route = route or self.route_resolver.resolve(endpoint)
         record = {
-            'timestamp': datetime.utcnow().isoformat(),
+            'timestamp': datetime.utcfromtimestamp(now).isoformat(),
             'endpoint': endpoint,
+            'route': route,
             'method': method,
             'status_code': status_code,
             'duration_ms': duration_ms,
@@ -87,7 +105,9 @@ class MetricsCollector:
         }
 
         with self.data_lock:
-            self.endpoint_calls[endpoint].append(record)
+            # Keyed like the aggregator so routes past max_routes share __other__
+            series_route = self.aggregator.record(route, duration_ms, status_code, record['cost'], now)
+            self.endpoint_calls[series_route].append(record)
 
             # Track errors
             if status_code >= 400:
@@ -212,40 +232,27 @@ class MetricsCollector:
 
     def get_endpoint_stats(self, time_window_hours: int = 1) -> List[Dict]:
         """Get statistics for all endpoints in the time window"""
-        cutoff_time = datetime.utcnow() - timedelta(hours=time_window_hours)
+        with self.data_lock:
+            summaries = self.aggregator.query(time_window_hours * 3600)
 
         stats = []
-        with self.data_lock:
-            for endpoint, calls in self.endpoint_calls.items():
-                # Filter calls within time window
-                recent_calls = [
-                    c for c in calls
-                    if datetime.fromisoformat(c['timestamp']) > cutoff_time
-                ]
-
-                if not recent_calls:
-                    continue
-
-                # Calculate statistics
-                durations = [c['duration_ms'] for c in recent_calls]
-                errors = [c for c in recent_calls if c['status_code'] >= 400]
-
-                avg_duration = sum(durations) / len(durations)
-                status_info = self._get_endpoint_status(endpoint, durations, errors, recent_calls)
-
-                stats.append({
-                    'endpoint': endpoint,
-                    'last_called': max(c['timestamp'] for c in recent_calls),
-                    'avg_response_time': avg_duration,
-                    'p95_response_time': self._percentile(durations, 95),
-                    'p99_response_time': self._percentile(durations, 99),
-                    'request_count': len(recent_calls),
-                    'error_count': len(errors),
-                    'error_rate': (len(errors) / len(recent_calls)) * 100,
-                    'total_cost': sum(c['cost'] for c in recent_calls),
-                    'status': status_info['status'],
-                    'performance_note': status_info.get('note', None)
-                })
+        for summary in summaries:
+            avg_duration = summary.avg_duration
+            status_info = self._get_endpoint_status(summary.route, avg_duration, summary.error_rate)
+
+            stats.append({
+                'endpoint': summary.route,
+                'last_called': datetime.utcfromtimestamp(summary.last_timestamp).isoformat(),
+                'avg_response_time': avg_duration,
+                'p95_response_time': summary.sketch.quantile(0.95),
+                'p99_response_time': summary.sketch.quantile(0.99),
+                'request_count': summary.count,
+                'error_count': summary.error_count,
+                'error_rate': summary.error_rate * 100,
+                'total_cost': summary.cost_sum,
+                'status': status_info['status'],
+                'performance_note': status_info.get('note', None)
+            })
 
         return sorted(stats, key=lambda x: x['request_count'], reverse=True)
 
@@ -281,15 +288,13 @@ class MetricsCollector:
         uptime_hours = uptime_seconds / 3600
 
         with self.data_lock:
-            total_requests = sum(len(calls) for calls in self.endpoint_calls.values())
+            totals = self.aggregator.totals().values()
+            total_requests = sum(t['count'] for t in totals)
             total_errors = len(self.errors)
 
             # Calculate average response time across all endpoints
-            all_durations = []
-            for calls in self.endpoint_calls.values():
-                all_durations.extend([c['duration_ms'] for c in calls])
-
-            avg_response_time = sum(all_durations) / len(all_durations) if all_durations else 0
+            total_duration = sum(t['duration_sum'] for t in totals)
+            avg_response_time = total_duration / total_requests if total_requests else 0
 
         return {
             'status': 'healthy' if total_errors < 10 else 'degraded',
@@ -318,9 +323,8 @@ class MetricsCollector:
         breakdown = defaultdict(float)
 
         with self.data_lock:
-            for endpoint, calls in self.endpoint_calls.items():
-                for call in calls:
-                    breakdown[endpoint] += call['cost']
+            for route, totals in self.aggregator.totals().items():
+                breakdown[route] += totals['cost']
 
         return dict(breakdown)
 
@@ -393,18 +397,8 @@ class MetricsCollector:
 
         return count
 
-    def _percentile(self, values: List[float], percentile: int) -> float:
-        """Calculate percentile of values"""
-        if not values:
-            return 0
-        sorted_values = sorted(values)
-        index = int(len(sorted_values) * percentile / 100)
-        return sorted_values[min(index, len(sorted_values) - 1)]
-
-    def _get_endpoint_status(self, endpoint: str, durations: List[float], errors: List[Dict], all_calls: List[Dict]) -> dict:
+    def _get_endpoint_status(self, endpoint: str, avg_duration: float, error_rate: float) -> dict:
         """Determine endpoint health status with explanatory notes"""
-        avg_duration = sum(durations) / len(durations) if durations else 0
-        error_rate = len(errors) / len(all_calls) if all_calls else 0
 
         # AI processing endpoints are expected to be slow - use different thresholds
         ai_endpoints = {
@@ -4,11 +4,14 @@ Handles timeline workflow engine, critical path tracking, and business logic
 """
 
 import logging
+from collections import OrderedDict
 from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime, timedelta
 from decimal import Decimal
 from sqlalchemy.orm import Session
 
+from .timeline_schedule import DependencyCycleError, TimelineSchedule
+
 logger = logging.getLogger(__name__)
 
 
@@ -21,8 +24,54 @@ class TimelineWorkflowEngine:
     Manages case timelines, dependencies, and critical path
     """
 
+    def __init__(self, cache_size: int = 128):
+        self.cache_size = cache_size
+        self._schedules: "OrderedDict[str, Tuple[Tuple, TimelineSchedule]]" = OrderedDict()
+
     @staticmethod
-    def calculate_critical_path(events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def _structure(events: List[Dict[str, Any]]) -> Tuple:
+        return tuple(
+            (e['id'], tuple(e.get('blocked_by_event_ids') or ()), tuple(e.get('blocks_event_ids') or ()))
+            for e in events
+        )
+
+    def get_schedule(self, events: List[Dict[str, Any]], case_id: Optional[str] = None) -> TimelineSchedule:
+        """
+        Schedule for a case's events. With a case_id the schedule is cached:
+        if only dates changed since the last call, just the affected events
+        are re-propagated; any change to events or dependencies rebuilds it.
+        Raises DependencyCycleError if the dependencies contain a cycle.
+        """
+        if case_id is None:
+            return TimelineSchedule(events)
+
+        structure = self._structure(events)
+        cached = self._schedules.get(case_id)
+        if cached is None or cached[0] != structure:
+            schedule = TimelineSchedule(events)
+        else:
+            schedule = cached[1]
+            moved = {}
+            for i, event in enumerate(events):
+                current = schedule.events[i]
+                end_date = event.get('end_date')
+                if event['event_date'] != current['event_date'] or end_date != current.get('end_date'):
+                    moved[event['id']] = (event['event_date'], end_date)
+            if moved:
+                schedule.update_events(moved)
+            schedule.events = [dict(event) for event in events]
+
+        self._schedules[case_id] = (structure, schedule)
+        self._schedules.move_to_end(case_id)
+        while len(self._schedules) > self.cache_size:
+            self._schedules.popitem(last=False)
+        return schedule
+
+    def invalidate(self, case_id: str):
+        """Drop the cached schedule for a case"""
+        self._schedules.pop(case_id, None)
+
+    def calculate_critical_path(self, events: List[Dict[str, Any]], case_id: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         Calculate the critical path through timeline events
         Returns events on the critical path with slack time
@@ -30,87 +79,22 @@ class TimelineWorkflowEngine:
         if not events:
             return []
 
-        # Build dependency graph
-        event_map = {e['id']: e for e in events}
+        return self.get_schedule(events, case_id).critical_events()
 
-        # Calculate earliest start times (forward pass)
-        earliest_start = {}
-        for event in events:
-            event_id = event['id']
-            blocked_by = event.get('blocked_by_event_ids', [])
-
-            if not blocked_by:
-                earliest_start[event_id] = event['event_date']
-            else:
-                # Start after all blocking events complete
-                max_predecessor_end = max(
-                    [event_map[dep]['event_date'] for dep in blocked_by if dep in event_map],
-                    default=event['event_date']
-                )
-                earliest_start[event_id] = max(event['event_date'], max_predecessor_end)
-
-        # Calculate latest start times (backward pass)
-        latest_start = {}
-        sorted_events = sorted(events, key=lambda e: e['event_date'], reverse=True)
-
-        for event in sorted_events:
-            event_id = event['id']
-            blocks = event.get('blocks_event_ids', [])
-
-            if not blocks:
-                latest_start[event_id] = earliest_start[event_id]
-            else:
-                # Must complete before earliest successor starts
-                min_successor_start = min(
-                    [latest_start.get(dep, earliest_start[dep]) for dep in blocks if dep in event_map],
-                    default=earliest_start[event_id]
-                )
-                latest_start[event_id] = min_successor_start
-
-        # Identify critical path (events with zero slack)
-        critical_path_events = []
-        for event in events:
-            event_id = event['id']
-            slack = (latest_start[event_id] - earliest_start[event_id]).days if isinstance(earliest_start[event_id], datetime) else 0
-
-            event_analysis = {
-                **event,
-                'earliest_start': earliest_start[event_id],
-                'latest_start': latest_start[event_id],
-                'slack_days': slack,
-                'is_critical': slack == 0
-            }
-
-            if slack == 0:
-                critical_path_events.append(event_analysis)
-
-        return sorted(critical_path_events, key=lambda e: e['event_date'])
-
-    @staticmethod
-    def identify_deadline_cascades(event: Dict[str, Any], all_events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def identify_deadline_cascades(self, event: Dict[str, Any], all_events: List[Dict[str, Any]],
+                                   case_id: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         Identify which events will be affected if this event's deadline changes
         """
-        event_id = event['id']
-        affected_events = []
-
-        # Build dependency chain
-        def find_dependent_events(current_id: str, chain: List[str] = []):
-            for evt in all_events:
-                blocked_by = evt.get('blocked_by_event_ids', [])
-                if current_id in blocked_by and evt['id'] not in chain:
-                    new_chain = chain + [evt['id']]
-                    affected_events.append({
-                        'event': evt,
-                        'dependency_chain': new_chain,
-                        'cascade_level': len(new_chain)
-                    })
-                    # Recursively find dependencies
-                    find_dependent_events(evt['id'], new_chain)
-
-        find_dependent_events(event_id)
-
-        return sorted(affected_events, key=lambda e: e['cascade_level'])
+        return self.get_schedule(all_events, case_id).downstream(event['id'])
+
+    def simulate_event_change(self, event_id: str, new_date: datetime, all_events: List[Dict[str, Any]],
+                              case_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        What-if analysis: schedule impact of moving one event, leaving the
+        stored schedule untouched
+        """
+        return self.get_schedule(all_events, case_id).what_if({event_id: new_date})
 
     @staticmethod
     def suggest_buffer_time(event_type: str, complexity: str = "medium") -> int:
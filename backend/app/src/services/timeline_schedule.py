@@ -0,0 +1,361 @@
+"""
+Timeline Schedule
+Dependency-ordered scheduling for case timeline events: builds the event
+dependency DAG, runs critical path forward/backward passes in topological
+order, re-propagates only the affected cone when an event moves, and
+answers what-if questions on a copy of the schedule state.
+
+Each event starts no earlier than its own event_date and no earlier than
+every blocking event has finished (event_date, or end_date for multi-day
+events). Latest times are measured back from the timeline's end.
+"""
+
+import heapq
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+# Tolerance when comparing times held as float seconds
+_EPSILON = 1e-6
+
+
+class DependencyCycleError(ValueError):
+    """Raised when timeline dependencies do not form a DAG"""
+
+    def __init__(self, cycle: List[str]):
+        self.cycle = cycle
+        super().__init__("Timeline dependencies contain a cycle: " + " -> ".join(cycle))
+
+
+class _Times:
+    """Per-event schedule times in seconds from the schedule's base date"""
+
+    __slots__ = ('start', 'duration', 'es', 'ef', 'ls', 'lf', 'end')
+
+    def __init__(self, n: int):
+        self.start = [0.0] * n
+        self.duration = [0.0] * n
+        self.es = [0.0] * n
+        self.ef = [0.0] * n
+        self.ls = [0.0] * n
+        self.lf = [0.0] * n
+        self.end = 0.0
+
+    def copy(self) -> '_Times':
+        other = _Times(0)
+        for name in ('start', 'duration', 'es', 'ef', 'ls', 'lf'):
+            setattr(other, name, list(getattr(self, name)))
+        other.end = self.end
+        return other
+
+
+class TimelineSchedule:
+    """
+    Critical path schedule over timeline events.
+
+    Events are dicts with 'id' and 'event_date', and optionally 'end_date',
+    'blocked_by_event_ids' and 'blocks_event_ids'. Dependencies on ids that
+    are not in the event list are ignored.
+    """
+
+    def __init__(self, events: Iterable[Dict[str, Any]]):
+        self.events: List[Dict[str, Any]] = list(events)
+        self.ids: List[str] = [e['id'] for e in self.events]
+        self.index: Dict[str, int] = {event_id: i for i, event_id in enumerate(self.ids)}
+        n = len(self.events)
+        self._base: Optional[datetime] = self.events[0]['event_date'] if n else None
+
+        predecessors: List[Set[int]] = [set() for _ in range(n)]
+        for i, event in enumerate(self.events):
+            for dep in event.get('blocked_by_event_ids') or []:
+                j = self.index.get(dep)
+                if j is not None:
+                    predecessors[i].add(j)
+            for dep in event.get('blocks_event_ids') or []:
+                j = self.index.get(dep)
+                if j is not None:
+                    predecessors[j].add(i)
+        self.preds: List[List[int]] = [sorted(p) for p in predecessors]
+        self.succs: List[List[int]] = [[] for _ in range(n)]
+        for i, preds in enumerate(self.preds):
+            for j in preds:
+                self.succs[j].append(i)
+
+        self.order = self._topological_order()
+        self.position = [0] * n
+        for pos, i in enumerate(self.order):
+            self.position[i] = pos
+
+        self.times = _Times(n)
+        for i, event in enumerate(self.events):
+            self._set_dates(self.times, i, event['event_date'], event.get('end_date'))
+        self._forward(self.times)
+        self._backward(self.times)
+
+    # ------------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------------
+
+    def _topological_order(self) -> List[int]:
+        """Kahn's algorithm; raises DependencyCycleError naming one cycle"""
+        indegree = [len(p) for p in self.preds]
+        ready = deque(i for i, d in enumerate(indegree) if d == 0)
+        order = []
+        while ready:
+            i = ready.popleft()
+            order.append(i)
+            for j in self.succs[i]:
+                indegree[j] -= 1
+                if indegree[j] == 0:
+                    ready.append(j)
+
+        if len(order) < len(self.ids):
+            raise DependencyCycleError(self._find_cycle({i for i, d in enumerate(indegree) if d > 0}))
+        return order
+
+    def _find_cycle(self, remaining: Set[int]) -> List[str]:
+        # Every node left by Kahn's algorithm has a predecessor that is also
+        # left, so walking predecessors must revisit a node
+        node = next(iter(remaining))
+        seen: Dict[int, int] = {}
+        path: List[int] = []
+        while node not in seen:
+            seen[node] = len(path)
+            path.append(node)
+            node = next(p for p in self.preds[node] if p in remaining)
+        cycle = path[seen[node]:][::-1]
+        return [self.ids[i] for i in cycle + cycle[:1]]
+
+    def _seconds(self, value: datetime) -> float:
+        return (value - self._base).total_seconds()
+
+    def _datetime(self, seconds: float) -> datetime:
+        return self._base + timedelta(seconds=seconds)
+
+    def _set_dates(self, times: _Times, i: int, event_date: datetime, end_date: Optional[datetime]):
+        times.start[i] = self._seconds(event_date)
+        times.duration[i] = max(0.0, self._seconds(end_date) - times.start[i]) if end_date else 0.0
+
+    # ------------------------------------------------------------------
+    # Passes
+    # ------------------------------------------------------------------
+
+    def _earliest(self, times: _Times, i: int) -> float:
+        es = times.start[i]
+        for p in self.preds[i]:
+            if times.ef[p] > es:
+                es = times.ef[p]
+        return es
+
+    def _latest_finish(self, times: _Times, i: int) -> float:
+        lf = times.end
+        for s in self.succs[i]:
+            if times.ls[s] < lf:
+                lf = times.ls[s]
+        return lf
+
+    def _forward(self, times: _Times):
+        for i in self.order:
+            times.es[i] = self._earliest(times, i)
+            times.ef[i] = times.es[i] + times.duration[i]
+        times.end = max(times.ef, default=0.0)
+
+    def _backward(self, times: _Times):
+        for i in reversed(self.order):
+            times.lf[i] = self._latest_finish(times, i)
+            times.ls[i] = times.lf[i] - times.duration[i]
+
+    def _propagate(self, times: _Times, seeds: Mapping[int, Tuple[datetime, Optional[datetime]]]) -> Set[int]:
+        """
+        Apply new dates to seeds and recompute only what they reach:
+        earliest times over the downstream cone, latest times over the
+        upstream cone of events whose duration changed, or a full backward
+        pass when the timeline's end moves. Returns the indices whose
+        times changed.
+        """
+        resized = []
+        for i, (event_date, end_date) in seeds.items():
+            duration = times.duration[i]
+            self._set_dates(times, i, event_date, end_date)
+            if abs(times.duration[i] - duration) > _EPSILON:
+                resized.append(i)
+
+        changed: Set[int] = set()
+        heap = [(self.position[i], i) for i in seeds]
+        heapq.heapify(heap)
+        queued = set(seeds)
+        old_end = times.end
+        end_may_drop = False
+        while heap:
+            _, i = heapq.heappop(heap)
+            es = self._earliest(times, i)
+            ef = es + times.duration[i]
+            if abs(es - times.es[i]) > _EPSILON:
+                times.es[i] = es
+                changed.add(i)
+            if abs(ef - times.ef[i]) > _EPSILON:
+                if times.ef[i] >= old_end - _EPSILON and ef < times.ef[i]:
+                    end_may_drop = True
+                times.ef[i] = ef
+                changed.add(i)
+                for s in self.succs[i]:
+                    if s not in queued:
+                        queued.add(s)
+                        heapq.heappush(heap, (self.position[s], s))
+
+        new_end = max(old_end, max((times.ef[i] for i in changed), default=old_end))
+        if end_may_drop:
+            new_end = max(times.ef, default=0.0)
+
+        if abs(new_end - old_end) > _EPSILON:
+            times.end = new_end
+            before = list(times.ls)
+            self._backward(times)
+            changed.update(i for i in range(len(before)) if abs(before[i] - times.ls[i]) > _EPSILON)
+            return changed
+
+        heap = [(-self.position[i], i) for i in resized]
+        heapq.heapify(heap)
+        queued = set(resized)
+        while heap:
+            _, i = heapq.heappop(heap)
+            lf = self._latest_finish(times, i)
+            ls = lf - times.duration[i]
+            times.lf[i] = lf
+            if abs(ls - times.ls[i]) > _EPSILON:
+                times.ls[i] = ls
+                changed.add(i)
+                for p in self.preds[i]:
+                    if p not in queued:
+                        queued.add(p)
+                        heapq.heappush(heap, (-self.position[p], p))
+        return changed
+
+    def _seeds(self, changes: Mapping[str, Any]) -> Dict[int, Tuple[datetime, Optional[datetime]]]:
+        """Normalize {event_id: event_date or (event_date, end_date)}"""
+        seeds = {}
+        for event_id, value in changes.items():
+            if event_id not in self.index:
+                raise KeyError(f"Unknown timeline event: {event_id}")
+            i = self.index[event_id]
+            if isinstance(value, tuple):
+                event_date, end_date = value
+            else:
+                # Keep multi-day events the same length when only the start moves
+                event_date = value
+                end_date = (event_date + timedelta(seconds=self.times.duration[i])
+                            if self.times.duration[i] else None)
+            seeds[i] = (event_date, end_date)
+        return seeds
+
+    # ------------------------------------------------------------------
+    # Updates and queries
+    # ------------------------------------------------------------------
+
+    def update_events(self, changes: Mapping[str, Any]) -> List[str]:
+        """
+        Move events, given {event_id: new event_date} or
+        {event_id: (event_date, end_date)}. Returns the ids of events whose
+        schedule times changed.
+        """
+        seeds = self._seeds(changes)
+        for i, (event_date, end_date) in seeds.items():
+            self.events[i] = {**self.events[i], 'event_date': event_date, 'end_date': end_date}
+        changed = self._propagate(self.times, seeds)
+        return [self.ids[i] for i in sorted(changed, key=self.position.__getitem__)]
+
+    def what_if(self, changes: Mapping[str, Any]) -> Dict[str, Any]:
+        """
+        Schedule impact of moving events, without changing this schedule.
+        Returns the new timeline end, and the events whose earliest start or
+        slack would change.
+        """
+        seeds = self._seeds(changes)
+        times = self.times.copy()
+        changed = self._propagate(times, seeds)
+
+        affected = []
+        for i in sorted(changed, key=self.position.__getitem__):
+            before = self._describe(self.times, i)
+            after = self._describe(times, i)
+            affected.append({
+                'id': self.ids[i],
+                'title': self.events[i].get('title'),
+                'earliest_start_before': before['earliest_start'],
+                'earliest_start_after': after['earliest_start'],
+                'slack_days_before': before['slack_days'],
+                'slack_days_after': after['slack_days'],
+                'is_critical_after': after['is_critical'],
+            })
+
+        return {
+            'completion_before': self._datetime(self.times.end) if self.ids else None,
+            'completion_after': self._datetime(times.end) if self.ids else None,
+            'completion_delay_days': (times.end - self.times.end) / 86400,
+            'affected_events': affected,
+            'newly_critical': [a['id'] for a in affected
+                               if a['is_critical_after'] and a['slack_days_before'] > 0],
+        }
+
+    def _describe(self, times: _Times, i: int) -> Dict[str, Any]:
+        slack = times.ls[i] - times.es[i]
+        return {
+            'earliest_start': self._datetime(times.es[i]),
+            'earliest_finish': self._datetime(times.ef[i]),
+            'latest_start': self._datetime(times.ls[i]),
+            'latest_finish': self._datetime(times.lf[i]),
+            'slack_days': timedelta(seconds=max(0.0, slack)).days,
+            'is_critical': slack <= _EPSILON,
+        }
+
+    def event_times(self, event_id: str) -> Dict[str, Any]:
+        """Earliest/latest start and finish, slack and criticality of one event"""
+        return self._describe(self.times, self.index[event_id])
+
+    @property
+    def completion_date(self) -> Optional[datetime]:
+        """When the last event finishes"""
+        return self._datetime(self.times.end) if self.ids else None
+
+    def analysis(self) -> List[Dict[str, Any]]:
+        """Every event with its schedule times, in the input order"""
+        return [{**event, **self._describe(self.times, i)} for i, event in enumerate(self.events)]
+
+    def critical_events(self) -> List[Dict[str, Any]]:
+        """Events with zero slack, ordered by event date"""
+        return sorted(
+            (entry for entry in self.analysis() if entry['is_critical']),
+            key=lambda e: e['event_date']
+        )
+
+    def downstream(self, event_id: str) -> List[Dict[str, Any]]:
+        """
+        Events that depend on event_id, directly or transitively, each once
+        with its shortest dependency chain, ordered by cascade level
+        """
+        root = self.index[event_id]
+        parent = {root: None}
+        queue = deque([root])
+        reached = []
+        while queue:
+            i = queue.popleft()
+            for s in self.succs[i]:
+                if s not in parent:
+                    parent[s] = i
+                    reached.append(s)
+                    queue.append(s)
+
+        cascades = []
+        for i in reached:
+            chain = []
+            node = i
+            while node != root:
+                chain.append(self.ids[node])
+                node = parent[node]
+            chain.reverse()
+            cascades.append({
+                'event': self.events[i],
+                'dependency_chain': chain,
+                'cascade_level': len(chain),
+            })
+        return cascades
@@ -688,6 +688,32 @@ async def startup_event():
     except Exception as e:
         print(f"ERROR: Failed to start case monitoring service: {e}")
 
+    try:
+        from app.src.monitoring.metrics_collector import metrics_collector
+
+        # Key endpoint metrics by route template rather than raw path
+        metrics_collector.register_routes(app.routes)
+    except Exception as e:
+        print(f"ERROR: Failed to register routes with metrics collector: {e}")
+
+    try:
+        from app.services.activity_tracking_service import activity_tracking_service
+
+        # Batch users.last_active_at writes off the request path
+        activity_tracking_service.start()
+        print("SUCCESS: Activity tracking service started")
+    except Exception as e:
+        print(f"ERROR: Failed to start activity tracking service: {e}")
+
+    try:
+        from app.services.case_statistics_service import case_statistics_service
+
+        # Periodically repair drift in the case_statistics summary table
+        case_statistics_service.start()
+        print("SUCCESS: Case statistics reconciliation started")
+    except Exception as e:
+        print(f"ERROR: Failed to start case statistics reconciliation: {e}")
+
 
 @app.on_event("shutdown")
 async def shutdown_event():
@@ -699,6 +725,29 @@ async def shutdown_event():
     except Exception as e:
         print(f"ERROR: Failed to stop case monitoring service: {e}")
 
+    try:
+        from app.services.activity_tracking_service import activity_tracking_service
+        activity_tracking_service.stop()
+        print("Activity tracking service stopped")
+    except Exception as e:
+        print(f"ERROR: Failed to stop activity tracking service: {e}")
+
+    try:
+        from app.services.case_statistics_service import case_statistics_service
+        case_statistics_service.stop()
+        print("Case statistics reconciliation stopped")
+    except Exception as e:
+        print(f"ERROR: Failed to stop case statistics reconciliation: {e}")
+
+    try:
+        from app.monitoring.tracing import shutdown_tracing
+
+        # Export spans still buffered in the batch processor
+        await shutdown_tracing()
+        print("Span export flushed")
+    except Exception as e:
+        print(f"ERROR: Failed to flush span export: {e}")
+
 
 print("\n" + "="*60)
 print("LEGAL AI SYSTEM - Backend API Ready")
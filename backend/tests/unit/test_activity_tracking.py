@@ -0,0 +1,176 @@
+"""
+Unit tests for off-request-path activity tracking
+
+Covers the verified token claims cache and the coalescing activity tracking
+service.
+"""
+
+import time
+from datetime import datetime, timedelta
+
+import jwt
+import pytest
+from sqlalchemy import create_engine, event, insert, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.middleware import monitoring
+from app.middleware.token_cache import TokenClaimsCache
+from app.models.user import User
+from app.services.activity_tracking_service import ActivityTrackingService
+
+
+@pytest.fixture
+def users_db():
+    """In-memory SQLite database holding only the users table, with a write counter."""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    User.__table__.create(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User.__table__), [
+            {"id": i, "email": f"user{i}@example.com", "hashed_password": "x", "role": "USER"}
+            for i in range(1, 51)
+        ])
+
+    writes = {"count": 0}
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def count_writes(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("UPDATE"):
+            writes["count"] += 1
+
+    yield engine, sessionmaker(bind=engine), writes
+    engine.dispose()
+
+
+def _last_active(engine, user_id):
+    with engine.connect() as conn:
+        return conn.execute(
+            select(User.__table__.c.last_active_at).where(User.__table__.c.id == user_id)
+        ).scalar()
+
+
+@pytest.mark.unit
+class TestTokenClaimsCache:
+    def test_hit_after_put(self):
+        cache = TokenClaimsCache()
+        cache.put("token-a", {"user_id": 7}, now=1000)
+
+        assert cache.get("token-a", now=1001) == {"user_id": 7}
+        assert cache.hits == 1
+
+    def test_respects_exp_claim(self):
+        cache = TokenClaimsCache(max_ttl=300)
+        cache.put("token-a", {"user_id": 7, "exp": 1010}, now=1000)
+
+        assert cache.get("token-a", now=1009) is not None
+        assert cache.get("token-a", now=1010) is None
+        assert len(cache) == 0
+
+    def test_max_ttl_caps_long_lived_tokens(self):
+        cache = TokenClaimsCache(max_ttl=60)
+        cache.put("token-a", {"user_id": 7, "exp": 10_000}, now=1000)
+
+        assert cache.get("token-a", now=1061) is None
+
+    def test_already_expired_claims_are_not_cached(self):
+        cache = TokenClaimsCache()
+        cache.put("token-a", {"user_id": 7, "exp": 999}, now=1000)
+
+        assert len(cache) == 0
+
+    def test_bounded_lru_eviction(self):
+        cache = TokenClaimsCache(max_size=2)
+        cache.put("a", {"user_id": 1}, now=1000)
+        cache.put("b", {"user_id": 2}, now=1000)
+        cache.get("a", now=1000)
+        cache.put("c", {"user_id": 3}, now=1000)
+
+        assert len(cache) == 2
+        assert cache.get("b", now=1000) is None
+        assert cache.get("a", now=1000) is not None
+
+    def test_keys_are_token_hashes(self):
+        cache = TokenClaimsCache()
+        cache.put("secret-token", {"user_id": 1}, now=1000)
+
+        assert all(isinstance(k, bytes) and len(k) == 32 for k in cache._entries)
+
+
+@pytest.mark.unit
+class TestDecodeUserIdFromToken:
+    def test_second_decode_is_served_from_cache(self, monkeypatch):
+        monkeypatch.setattr(monitoring, "_token_claims_cache", TokenClaimsCache())
+        token = jwt.encode(
+            {"user_id": 42, "exp": int(time.time()) + 600},
+            monitoring.JWT_SECRET,
+            algorithm="HS256",
+        )
+        calls = {"count": 0}
+        real_decode = jwt.decode
+
+        def counting_decode(*args, **kwargs):
+            calls["count"] += 1
+            return real_decode(*args, **kwargs)
+
+        monkeypatch.setattr(monitoring.jwt, "decode", counting_decode)
+
+        assert monitoring.decode_user_id_from_token(token) == 42
+        assert monitoring.decode_user_id_from_token(token) == 42
+        assert calls["count"] == 1
+
+    def test_invalid_token_is_not_cached(self, monkeypatch):
+        cache = TokenClaimsCache()
+        monkeypatch.setattr(monitoring, "_token_claims_cache", cache)
+
+        assert monitoring.decode_user_id_from_token("not-a-jwt") is None
+        assert len(cache) == 0
+
+
+@pytest.mark.unit
+class TestActivityTrackingService:
+    def test_coalesces_updates_per_user(self, users_db):
+        engine, session_factory, writes = users_db
+        service = ActivityTrackingService(session_factory=session_factory)
+        base = datetime(2025, 1, 1, 12, 0, 0)
+
+        for i in range(100):
+            service.record_activity(1, base + timedelta(seconds=i))
+            service.record_activity(2, base)
+
+        assert service.pending_count == 2
+        assert writes["count"] == 0
+
+        assert service.flush() == 2
+        assert service.pending_count == 0
+        assert _last_active(engine, 1) == base + timedelta(seconds=99)
+        assert _last_active(engine, 2) == base
+
+    def test_keeps_latest_timestamp_when_recorded_out_of_order(self):
+        service = ActivityTrackingService(session_factory=lambda: None)
+        late = datetime(2025, 1, 1, 12, 0, 5)
+        service.record_activity(1, late)
+        service.record_activity(1, late - timedelta(seconds=5))
+
+        assert service._pending[1] == late
+
+    def test_flush_with_nothing_pending_skips_database(self):
+        def fail():
+            raise AssertionError("session should not be opened")
+
+        service = ActivityTrackingService(session_factory=fail)
+        assert service.flush() == 0
+
+    def test_failed_flush_requeues_pending(self):
+        def broken_session():
+            raise RuntimeError("database unavailable")
+
+        service = ActivityTrackingService(session_factory=broken_session)
+        service.record_activity(5, datetime(2025, 1, 1))
+
+        assert service.flush() == 0
+        assert service.pending_count == 1
+        assert service.stats["failed_flushes"] == 1
@@ -0,0 +1,351 @@
+"""
+Consistency tests for the case statistics summary table
+
+Checks that the flush-time counters always equal a recount from the child
+tables across randomized inserts, updates, moves, deletes and rollbacks,
+and that reconciliation repairs drift from writes that bypass the ORM.
+"""
+
+import asyncio
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import create_engine, event, update
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app.models  # noqa: F401  (the case models share a registry with these)
+import app.models.user  # noqa: F401
+from app.api import case_management_endpoints as endpoints
+from app.models.case_management import (
+    AssetStatus,
+    CaseAsset,
+    CaseBiddingProcess,
+    CaseEventParty,
+    CaseFinancialTransaction,
+    CaseObjection,
+    CaseParty,
+    CaseStatistics,
+    CaseTimelineEvent,
+    CaseType,
+    EventStatus,
+    EventType,
+    LegalCase,
+    LegalCaseDocument,
+    ObjectionStatus,
+    PartyRole,
+)
+from app.services.case_statistics_service import (
+    COUNTER_COLUMNS,
+    CaseStatisticsService,
+    compute_case_statistics,
+)
+from app.src.core.database import Base
+
+TABLES = [
+    LegalCase.__table__,
+    CaseParty.__table__,
+    CaseTimelineEvent.__table__,
+    CaseAsset.__table__,
+    LegalCaseDocument.__table__,
+    CaseObjection.__table__,
+    CaseFinancialTransaction.__table__,
+    CaseBiddingProcess.__table__,
+    CaseEventParty.__table__,
+    CaseStatistics.__table__,
+]
+
+
+def new_id():
+    return str(uuid.uuid4())
+
+
+def make_case(n=0):
+    return LegalCase(id=new_id(), case_number=f"25-{n:05d}-{new_id()[:8]}",
+                     case_name=f"In re Debtor {n}", case_type=CaseType.BANKRUPTCY_CH7)
+
+
+def make_child(kind, case_id, rng):
+    if kind == "party":
+        return CaseParty(id=new_id(), case_id=case_id, role=PartyRole.CREDITOR, name="Creditor")
+    if kind == "event":
+        return CaseTimelineEvent(id=new_id(), case_id=case_id, title="Event",
+                                 event_type=rng.choice([EventType.DEADLINE, EventType.HEARING]),
+                                 status=rng.choice([EventStatus.SCHEDULED, EventStatus.COMPLETED]),
+                                 event_date=datetime.utcnow() + timedelta(days=rng.randint(-30, 30)))
+    if kind == "asset":
+        return CaseAsset(id=new_id(), case_id=case_id, asset_type="vehicle", name="Asset",
+                         status=rng.choice(list(AssetStatus)),
+                         estimated_value=Decimal(rng.randint(0, 100_000)) / 4)
+    if kind == "document":
+        return LegalCaseDocument(id=new_id(), case_id=case_id, document_id=new_id())
+    return CaseObjection(id=new_id(), case_id=case_id, objection_type="claim", title="Objection",
+                         filed_by_party_id=new_id(), filing_date=datetime.utcnow(),
+                         status=rng.choice(list(ObjectionStatus)))
+
+
+@pytest.fixture
+def case_db():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine, tables=TABLES)
+    yield engine, sessionmaker(bind=engine)
+    engine.dispose()
+
+
+def assert_consistent(session):
+    with session.get_bind().connect() as conn:
+        expected = compute_case_statistics(conn)
+    stored = {row.case_id: row for row in session.query(CaseStatistics)}
+
+    assert set(stored) == set(expected)
+    for case_id, actual in expected.items():
+        row = stored[case_id]
+        for column in COUNTER_COLUMNS:
+            value = getattr(row, column)
+            if column == "active_assets_value":
+                value = Decimal(str(value)).quantize(Decimal("0.01"))
+            assert value == actual[column], (case_id, column)
+
+
+@pytest.mark.unit
+class TestFlushTimeCounters:
+    def test_case_and_children_in_one_flush(self, case_db):
+        _, Session = case_db
+        rng = random.Random(0)
+        db = Session()
+        case = make_case()
+        db.add(case)
+        for kind in ["party", "party", "event", "asset", "document", "objection"]:
+            db.add(make_child(kind, case.id, rng))
+        db.commit()
+
+        stats = db.get(CaseStatistics, case.id)
+        assert stats.parties_count == 2
+        assert stats.documents_count == 1
+        assert_consistent(db)
+
+    def test_status_and_value_changes(self, case_db):
+        _, Session = case_db
+        db = Session()
+        case = make_case()
+        asset = CaseAsset(id=new_id(), case_id=case.id, asset_type="real_estate", name="House",
+                          status=AssetStatus.PENDING, estimated_value=Decimal("250000.00"))
+        deadline = CaseTimelineEvent(id=new_id(), case_id=case.id, title="Claims bar date",
+                                     event_type=EventType.DEADLINE, event_date=datetime.utcnow())
+        db.add_all([case, asset, deadline])
+        db.commit()
+
+        stats = db.get(CaseStatistics, case.id)
+        assert (stats.active_assets_count, stats.open_deadlines_count) == (1, 1)
+
+        # Attributes are expired after commit; old values come from the database
+        asset.estimated_value = Decimal("300000.00")
+        deadline.status = EventStatus.COMPLETED
+        db.commit()
+        db.refresh(stats)
+        assert Decimal(str(stats.active_assets_value)) == Decimal("300000.00")
+        assert stats.open_deadlines_count == 0
+        assert stats.deadlines_count == 1
+
+        asset.status = AssetStatus.SOLD
+        db.commit()
+        db.refresh(stats)
+        assert stats.active_assets_count == 0
+        assert_consistent(db)
+
+    def test_rollback_discards_deltas(self, case_db):
+        _, Session = case_db
+        rng = random.Random(1)
+        db = Session()
+        case = make_case()
+        db.add(case)
+        db.commit()
+
+        for _ in range(5):
+            db.add(make_child("party", case.id, rng))
+        db.flush()
+        db.rollback()
+
+        assert db.get(CaseStatistics, case.id).parties_count == 0
+        assert_consistent(db)
+
+    def test_randomized_operations_stay_consistent(self, case_db):
+        _, Session = case_db
+        rng = random.Random(42)
+        db = Session()
+        cases = [make_case(i) for i in range(4)]
+        db.add_all(cases)
+        db.commit()
+        children = []
+
+        for step in range(60):
+            for _ in range(rng.randint(1, 6)):
+                op = rng.random()
+                if op < 0.45 or not children:
+                    child = make_child(rng.choice(["party", "event", "asset", "document", "objection"]),
+                                       rng.choice(cases).id, rng)
+                    db.add(child)
+                    children.append(child)
+                elif op < 0.65:
+                    child = rng.choice(children)
+                    if isinstance(child, CaseTimelineEvent):
+                        child.status = rng.choice(list(EventStatus))
+                        child.event_type = rng.choice([EventType.DEADLINE, EventType.MOTION])
+                    elif isinstance(child, CaseAsset):
+                        child.status = rng.choice(list(AssetStatus))
+                        child.estimated_value = Decimal(rng.randint(0, 10_000))
+                    elif isinstance(child, CaseObjection):
+                        child.status = rng.choice(list(ObjectionStatus))
+                elif op < 0.8:
+                    rng.choice(children).case_id = rng.choice(cases).id
+                else:
+                    child = children.pop(rng.randrange(len(children)))
+                    if child in db.new:
+                        db.expunge(child)
+                    else:
+                        db.delete(child)
+            if step % 10 == 9:
+                db.flush()
+                db.rollback()
+                children = [c for c in children if c in db]
+            else:
+                db.commit()
+            assert_consistent(db)
+
+    def test_case_delete_removes_row(self, case_db):
+        _, Session = case_db
+        rng = random.Random(3)
+        db = Session()
+        case = make_case()
+        db.add(case)
+        db.add_all(make_child("event", case.id, rng) for _ in range(3))
+        db.commit()
+
+        db.delete(case)
+        db.commit()
+
+        assert db.get(CaseStatistics, case.id) is None
+        assert_consistent(db)
+
+
+    def test_concurrently_built_row_does_not_fail_the_flush(self, case_db, monkeypatch):
+        _, Session = case_db
+        rng = random.Random(8)
+        db = Session()
+        case = make_case()
+        db.add(case)
+        db.add_all(make_child("party", case.id, rng) for _ in range(2))
+        db.commit()
+        db.query(CaseStatistics).delete()
+        db.commit()
+
+        # Another transaction builds the row between this flush's UPDATE and
+        # INSERT, from a recount that does not include this flush
+        def recount_after_race(connection, case_ids=None):
+            rows = compute_case_statistics(connection, case_ids)
+            for row in rows.values():
+                connection.execute(CaseStatistics.__table__.insert().values(
+                    **{**row, "parties_count": row["parties_count"] - 1}))
+            return rows
+
+        monkeypatch.setattr("app.services.case_statistics_service.compute_case_statistics",
+                            recount_after_race)
+        db.add(make_child("party", case.id, rng))
+        db.commit()
+        monkeypatch.undo()
+
+        assert db.get(CaseStatistics, case.id).parties_count == 3
+        assert_consistent(db)
+
+
+@pytest.mark.unit
+class TestReconciliation:
+    def test_repairs_drift_from_bulk_writes(self, case_db):
+        _, Session = case_db
+        rng = random.Random(5)
+        db = Session()
+        cases = [make_case(i) for i in range(3)]
+        db.add_all(cases)
+        for c in cases:
+            for _ in range(10):
+                asset = make_child("asset", c.id, rng)
+                asset.status = AssetStatus.PENDING
+                db.add(asset)
+        db.commit()
+
+        # Bulk UPDATE skips the ORM unit of work and therefore the counters
+        db.execute(update(CaseAsset).where(CaseAsset.case_id == cases[0].id)
+                   .values(status=AssetStatus.EXCLUDED).execution_options(synchronize_session=False))
+        db.query(CaseStatistics).filter(CaseStatistics.case_id == cases[1].id).delete()
+        db.add(CaseStatistics(case_id="deleted-case", parties_count=3))
+        db.commit()
+
+        report = CaseStatisticsService(batch_size=2).reconcile(db)
+
+        assert report["cases_checked"] == 3
+        assert report["rows_inserted"] == 1
+        assert report["rows_removed"] == 1
+        assert [d["case_id"] for d in report["drift"]] == [cases[0].id]
+        assert report["drift"][0]["fields"]["active_assets_count"] == (10, 0)
+        assert_consistent(db)
+        assert CaseStatisticsService().reconcile(db)["rows_repaired"] == 0
+
+    def test_get_statistics_builds_missing_row(self, case_db):
+        _, Session = case_db
+        rng = random.Random(6)
+        db = Session()
+        case = make_case()
+        db.add(case)
+        db.add_all(make_child("party", case.id, rng) for _ in range(4))
+        db.commit()
+        db.query(CaseStatistics).delete()
+        db.commit()
+
+        commits = []
+        event.listen(db, "after_commit", lambda session: commits.append(session))
+        stats = CaseStatisticsService().get_statistics(db, case.id)
+        assert stats.parties_count == 4
+        assert CaseStatisticsService().get_statistics(db, "missing") is None
+
+        # Reads never write: the row is stored by the next write or reconciliation
+        assert commits == [] and stats not in db and not db.new
+        db.rollback()
+        assert db.query(CaseStatistics).count() == 0
+
+
+@pytest.mark.unit
+def test_case_page_reads_no_child_aggregates(case_db):
+    engine, Session = case_db
+    rng = random.Random(7)
+    db = Session()
+    case = make_case()
+    db.add(case)
+    db.add_all(make_child(kind, case.id, rng) for kind in ["party", "asset", "asset", "event", "objection"])
+    db.commit()
+    child_tables = {t.name for t in TABLES} - {"legal_cases", "case_statistics"}
+    statements = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    detail = asyncio.run(endpoints.get_case(case.id, db=db))
+    page_statements = list(statements)
+    dashboard = asyncio.run(endpoints.get_case_dashboard(case.id, db=db))
+    event.remove(engine, "before_cursor_execute", record)
+
+    assert detail["counts"]["parties"] == 1
+    assert detail["counts"]["assets"] == 2
+    assert not any(f"FROM {table}" in s for s in page_statements for table in child_tables)
+    with engine.connect() as conn:
+        expected = compute_case_statistics(conn)[case.id]
+    assert dashboard["assets"]["count"] == expected["active_assets_count"]
+    assert dashboard["objections"]["pending_count"] == expected["pending_objections_count"]
@@ -0,0 +1,272 @@
+"""
+Unit tests for the chunked streaming AEAD container (format v2)
+
+Covers round trips across chunk boundaries, random-access range reads,
+truncation/reorder/splice tamper detection, the document encryption
+service's v2 and legacy v1 paths.
+"""
+
+import base64
+import hashlib
+import importlib
+import io
+import json
+import os
+import random
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+from app.core.chunked_encryption import (
+    TAG_SIZE,
+    TRAILER_SIZE,
+    ChunkedContainerReader,
+    ContainerFormatError,
+    encrypt_stream,
+)
+
+CHUNK = 4096
+KEY = bytes(range(32))
+
+
+def encrypt_bytes(data, key=KEY, chunk_size=CHUNK, header=None):
+    out = io.BytesIO()
+    result = encrypt_stream(io.BytesIO(data), out, key, header or {"document_id": "doc-1"}, chunk_size)
+    return out.getvalue(), result
+
+
+def open_reader(container, key=KEY):
+    return ChunkedContainerReader(io.BytesIO(container)).unlock(key)
+
+
+def data_start(container):
+    return len(ChunkedContainerReader(io.BytesIO(container))._preamble) + TAG_SIZE
+
+
+@pytest.fixture
+def encryption_service(tmp_path, monkeypatch):
+    """Service instance whose key and storage live in a temp directory."""
+    monkeypatch.chdir(tmp_path)
+    module = importlib.import_module("app.core.encryption_service")
+    config = module.EmergencyEncryptionService()._default_config()
+    config.update({
+        "encrypted_storage_path": str(tmp_path / "encrypted"),
+        "metadata_storage_path": str(tmp_path / "metadata"),
+        "chunk_size_bytes": CHUNK,
+        "key_iterations": 1000,
+    })
+    return module.EmergencyEncryptionService(config)
+
+
+@pytest.mark.unit
+class TestChunkedContainer:
+    @pytest.mark.parametrize("size", [0, 1, CHUNK - 1, CHUNK, CHUNK + 1, 3 * CHUNK + 7])
+    def test_round_trip_across_chunk_boundaries(self, size):
+        data = os.urandom(size)
+        container, result = encrypt_bytes(data)
+        reader = open_reader(container)
+
+        assert b"".join(reader.iter_chunks()) == data
+        assert reader.plaintext_size == size
+        assert reader.sha256 == hashlib.sha256(data).hexdigest() == result.sha256
+        assert len(container) == result.container_size
+
+    def test_overhead_is_per_chunk_not_proportional(self):
+        data = os.urandom(10 * CHUNK)
+        container, result = encrypt_bytes(data)
+
+        assert result.chunk_count == 10
+        assert len(container) - len(data) == data_start(container) + 10 * TAG_SIZE + TRAILER_SIZE
+
+    def test_random_access_range_reads(self):
+        rng = random.Random(3)
+        data = os.urandom(5 * CHUNK + 123)
+        reader = open_reader(encrypt_bytes(data)[0])
+
+        for _ in range(200):
+            offset = rng.randrange(0, len(data) + 10)
+            length = rng.randrange(0, 3 * CHUNK)
+            assert reader.read_range(offset, length) == data[offset:offset + length]
+
+    def test_range_read_touches_only_covering_chunks(self, monkeypatch):
+        reader = open_reader(encrypt_bytes(os.urandom(8 * CHUNK))[0])
+        touched = []
+        original = reader._decrypt_chunk
+        monkeypatch.setattr(reader, "_decrypt_chunk", lambda i: touched.append(i) or original(i))
+
+        reader.read_range(5 * CHUNK + 10, 100)
+        assert touched == [5]
+
+    def test_wrong_key_is_rejected(self):
+        container, _ = encrypt_bytes(b"privileged")
+        with pytest.raises(ContainerFormatError):
+            open_reader(container, key=bytes(32))
+
+    def test_header_tampering_is_detected(self):
+        container, _ = encrypt_bytes(b"privileged", header={"document_id": "doc-1", "compliance_level": "PUBLIC"})
+        tampered = container.replace(b'"PUBLIC"', b'"SECRET"')
+        with pytest.raises(ContainerFormatError):
+            open_reader(tampered)
+
+
+@pytest.mark.unit
+class TestTamperDetection:
+    @pytest.fixture
+    def container(self):
+        data = os.urandom(4 * CHUNK + 100)
+        return data, encrypt_bytes(data)[0]
+
+    @pytest.mark.parametrize("cut", [1, TRAILER_SIZE, TRAILER_SIZE + 100 + TAG_SIZE, TRAILER_SIZE + 100 + TAG_SIZE + CHUNK + TAG_SIZE])
+    def test_truncation_is_detected(self, container, cut):
+        _, blob = container
+        with pytest.raises(ContainerFormatError):
+            open_reader(blob[:-cut])
+
+    def test_truncation_to_header_only_is_detected(self, container):
+        _, blob = container
+        with pytest.raises(ContainerFormatError):
+            open_reader(blob[:data_start(blob)])
+
+    def test_dropping_a_middle_chunk_is_detected(self, container):
+        _, blob = container
+        start, stored = data_start(blob), CHUNK + TAG_SIZE
+        dropped = blob[:start + stored] + blob[start + 2 * stored:]
+        with pytest.raises(ContainerFormatError):
+            open_reader(dropped)
+
+    def test_reordered_chunks_are_detected(self, container):
+        _, blob = container
+        start, stored = data_start(blob), CHUNK + TAG_SIZE
+        first, second = blob[start:start + stored], blob[start + stored:start + 2 * stored]
+        swapped = blob[:start] + second + first + blob[start + 2 * stored:]
+
+        reader = open_reader(swapped)
+        with pytest.raises(ContainerFormatError, match="Chunk 0"):
+            list(reader.iter_chunks())
+
+    def test_flipped_ciphertext_bit_is_detected(self, container):
+        _, blob = container
+        index = data_start(blob) + CHUNK + TAG_SIZE + 17
+        flipped = blob[:index] + bytes([blob[index] ^ 1]) + blob[index + 1:]
+
+        reader = open_reader(flipped)
+        assert reader.read_range(0, 10)  # chunk 0 untouched
+        with pytest.raises(ContainerFormatError, match="Chunk 1"):
+            reader.read_range(CHUNK, 10)
+
+    def test_chunks_cannot_be_spliced_between_files(self):
+        a, _ = encrypt_bytes(os.urandom(2 * CHUNK + 5))
+        b, _ = encrypt_bytes(os.urandom(2 * CHUNK + 5))
+        start_a, start_b, stored = data_start(a), data_start(b), CHUNK + TAG_SIZE
+        spliced = a[:start_a] + b[start_b:start_b + stored] + a[start_a + stored:]
+
+        with pytest.raises(ContainerFormatError):
+            list(open_reader(spliced).iter_chunks())
+
+
+@pytest.mark.unit
+class TestEncryptionServiceV2:
+    def test_encrypt_writes_v2_and_decrypts(self, encryption_service, tmp_path):
+        data = os.urandom(3 * CHUNK + 11)
+        source = tmp_path / "filing.pdf"
+        source.write_bytes(data)
+
+        result = encryption_service.encrypt_document(source, "case-9-doc-1")
+        assert result.success
+        assert result.metadata.file_hash_sha256 == hashlib.sha256(data).hexdigest()
+        assert result.metadata.file_size_bytes == len(data)
+        # Binary container: no base64 expansion
+        assert os.path.getsize(result.encrypted_file_path) < len(data) + 1024
+
+        ok, plaintext, error = encryption_service.decrypt_document("case-9-doc-1")
+        assert ok, error
+        assert plaintext == data
+
+        out = tmp_path / "restored.pdf"
+        ok, written, error = encryption_service.decrypt_document_to_file("case-9-doc-1", out)
+        assert ok and written == len(data)
+        assert out.read_bytes() == data
+
+        ok, part, _ = encryption_service.decrypt_document_range("case-9-doc-1", CHUNK - 5, 20)
+        assert ok and part == data[CHUNK - 5:CHUNK + 15]
+
+        info = encryption_service.read_container_info("case-9-doc-1")
+        assert info["version"] == "2.0"
+        assert info["original_hash"] == result.metadata.file_hash_sha256
+
+    def test_container_is_bound_to_document_id(self, encryption_service, tmp_path):
+        source = tmp_path / "a.txt"
+        source.write_bytes(b"alpha")
+        encryption_service.encrypt_document(source, "doc-a")
+        storage = encryption_service.encrypted_storage_path
+        os.replace(storage / "doc-a.encrypted", storage / "doc-b.encrypted")
+
+        ok, _, error = encryption_service.decrypt_document("doc-b")
+        assert not ok
+        assert "different document" in error
+
+    def test_integrity_check_detects_tampering(self, encryption_service, tmp_path):
+        source = tmp_path / "a.txt"
+        source.write_bytes(os.urandom(2 * CHUNK))
+        result = encryption_service.encrypt_document(source, "doc-a")
+        assert encryption_service.verify_document_integrity("doc-a") == (True, "")
+
+        path = Path(result.encrypted_file_path)
+        blob = bytearray(path.read_bytes())
+        blob[-TRAILER_SIZE - 30] ^= 0xFF
+        path.write_bytes(bytes(blob))
+
+        ok, error = encryption_service.verify_document_integrity("doc-a")
+        assert not ok
+
+    def test_reads_legacy_v1_containers(self, encryption_service):
+        data = b"legacy privileged memo"
+        doc_key, salt = encryption_service._derive_document_key("legacy-doc")
+        nonce = os.urandom(12)
+        aad = json.dumps({"document_id": "legacy-doc"}).encode("utf-8")
+        container = {
+            "version": "1.0",
+            "algorithm": "AES-256-GCM",
+            "document_id": "legacy-doc",
+            "compliance_level": "ATTORNEY_CLIENT",
+            "salt": base64.b64encode(salt).decode("utf-8"),
+            "nonce": base64.b64encode(nonce).decode("utf-8"),
+            "aad": base64.b64encode(aad).decode("utf-8"),
+            "encrypted_data": base64.b64encode(AESGCM(doc_key).encrypt(nonce, data, aad)).decode("utf-8"),
+            "original_hash": hashlib.sha256(data).hexdigest(),
+            "encrypted_at": datetime.utcnow().isoformat(),
+            "key_id": hashlib.sha256(doc_key).hexdigest()[:16],
+        }
+        (encryption_service.encrypted_storage_path / "legacy-doc.encrypted").write_text(json.dumps(container))
+
+        ok, plaintext, error = encryption_service.decrypt_document("legacy-doc")
+        assert ok, error
+        assert plaintext == data
+        assert encryption_service.decrypt_document_range("legacy-doc", 7, 11)[1] == data[7:18]
+        assert encryption_service.verify_document_integrity("legacy-doc") == (True, "")
+
+    def test_derived_keys_are_cached_and_bounded(self, encryption_service, tmp_path, monkeypatch):
+        source = tmp_path / "a.txt"
+        source.write_bytes(b"x")
+        encryption_service.encrypt_document(source, "doc-a")
+
+        calls = {"count": 0}
+        module = sys.modules["app.core.encryption_service"]
+        real_hkdf = module.HKDF
+
+        def counting_hkdf(*args, **kwargs):
+            calls["count"] += 1
+            return real_hkdf(*args, **kwargs)
+
+        monkeypatch.setattr(module, "HKDF", counting_hkdf)
+        for _ in range(5):
+            assert encryption_service.decrypt_document("doc-a")[0]
+        assert calls["count"] == 0
+
+        encryption_service.config["key_cache_size"] = 3
+        for i in range(10):
+            encryption_service._derive_document_key_v2(f"doc-{i}")
+        assert len(encryption_service._key_cache) == 3
@@ -0,0 +1,167 @@
+"""
+Unit tests for the metrics aggregation engine
+
+Covers DDSketch accuracy against exact percentiles, time-bucketed windows
+and route template resolution.
+"""
+
+import random
+from collections import defaultdict, deque
+
+import pytest
+
+from app.src.monitoring.metrics_aggregation import (
+    DDSketch,
+    MetricsAggregator,
+    RouteTemplateResolver,
+)
+from app.src.monitoring.metrics_collector import metrics_collector
+
+
+def exact_percentile(values, percentile):
+    """Reference rule previously used by MetricsCollector._percentile"""
+    sorted_values = sorted(values)
+    index = int(len(sorted_values) * percentile / 100)
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+
+@pytest.fixture
+def fresh_collector(monkeypatch):
+    """The global collector with empty aggregation state"""
+    monkeypatch.setattr(metrics_collector, "aggregator", MetricsAggregator())
+    monkeypatch.setattr(metrics_collector, "route_resolver", RouteTemplateResolver())
+    monkeypatch.setattr(metrics_collector, "endpoint_calls", defaultdict(lambda: deque(maxlen=1000)))
+    monkeypatch.setattr(metrics_collector, "errors", deque(maxlen=500))
+    return metrics_collector
+
+
+@pytest.mark.unit
+class TestDDSketch:
+    @pytest.mark.parametrize("seed", [1, 2, 3])
+    @pytest.mark.parametrize("percentile", [50, 90, 95, 99])
+    def test_accuracy_against_exact_percentiles(self, seed, percentile):
+        rng = random.Random(seed)
+        values = [rng.lognormvariate(4, 1.2) for _ in range(20000)]
+        sketch = DDSketch(relative_accuracy=0.01)
+        for v in values:
+            sketch.add(v)
+
+        expected = exact_percentile(values, percentile)
+        assert sketch.quantile(percentile / 100) == pytest.approx(expected, rel=0.01)
+
+    def test_merge_matches_single_sketch(self):
+        rng = random.Random(7)
+        values = [rng.expovariate(1 / 150) for _ in range(10000)]
+        whole, left, right = DDSketch(), DDSketch(), DDSketch()
+        for i, v in enumerate(values):
+            whole.add(v)
+            (left if i % 2 else right).add(v)
+        left.merge(right)
+
+        assert left.count == whole.count
+        for q in (0.5, 0.95, 0.99):
+            assert left.quantile(q) == whole.quantile(q)
+
+    def test_zero_values_and_bounds(self):
+        sketch = DDSketch()
+        for v in (0, 0, 5, 10):
+            sketch.add(v)
+
+        assert sketch.quantile(0.0) == 0
+        assert sketch.quantile(1.0) == pytest.approx(10, rel=0.01)
+        assert DDSketch().quantile(0.5) == 0
+
+    def test_bin_count_is_bounded(self):
+        sketch = DDSketch(relative_accuracy=0.01, max_bins=64)
+        for i in range(1, 100000, 7):
+            sketch.add(i * 0.01)
+
+        assert len(sketch.bins) <= 64
+        assert sketch.quantile(0.99) == pytest.approx(exact_percentile([i * 0.01 for i in range(1, 100000, 7)], 99), rel=0.01)
+
+    def test_merge_rejects_different_accuracy(self):
+        with pytest.raises(ValueError):
+            DDSketch(0.01).merge(DDSketch(0.02))
+
+
+@pytest.mark.unit
+class TestMetricsAggregator:
+    def test_window_only_includes_recent_buckets(self):
+        agg = MetricsAggregator(bucket_seconds=60)
+        now = 1_000_000.0
+        agg.record("/cases/{case_id}", 100, 200, timestamp=now - 7200)
+        agg.record("/cases/{case_id}", 50, 500, timestamp=now - 30)
+        agg.record("/cases/{case_id}", 70, 200, timestamp=now)
+
+        [summary] = agg.query(3600, now=now)
+        assert summary.count == 2
+        assert summary.error_count == 1
+        assert summary.avg_duration == 60
+        assert agg.totals()["/cases/{case_id}"]["count"] == 3
+
+    def test_expired_buckets_are_dropped(self):
+        agg = MetricsAggregator(bucket_seconds=60, retention_seconds=600)
+        for minute in range(100):
+            agg.record("/health", 1, 200, timestamp=minute * 60.0)
+
+        assert len(agg.series["/health"].buckets) <= 10
+
+    def test_route_cardinality_is_capped(self):
+        agg = MetricsAggregator(max_routes=5)
+        for i in range(50):
+            agg.record(f"/r{i}", 1, 200, timestamp=0)
+
+        assert len(agg.series) == 6
+        assert agg.totals()[MetricsAggregator.OVERFLOW_ROUTE]["count"] == 45
+
+
+@pytest.mark.unit
+class TestRouteTemplateResolver:
+    def test_resolves_from_fastapi_router(self):
+        from fastapi import FastAPI
+
+        app = FastAPI()
+
+        @app.get("/api/v1/cases/{case_id}")
+        async def get_case(case_id: int):
+            return {}
+
+        @app.get("/api/v1/cases/{case_id}/documents/{doc_id}")
+        async def get_doc(case_id: int, doc_id: str):
+            return {}
+
+        resolver = RouteTemplateResolver(app.routes)
+        assert resolver.resolve("/api/v1/cases/123") == "/api/v1/cases/{case_id}"
+        assert resolver.resolve("/api/v1/cases/9/documents/abc") == "/api/v1/cases/{case_id}/documents/{doc_id}"
+
+    def test_unmatched_paths_are_normalized(self):
+        resolver = RouteTemplateResolver()
+        assert resolver.resolve("/files/42/download") == "/files/{id}/download"
+        assert resolver.resolve("/jobs/3f2b8c1e-9a4d-4e2b-8f1a-2b3c4d5e6f70") == "/jobs/{id}"
+        assert resolver.resolve("/static/app.js") == "/static/app.js"
+
+
+@pytest.mark.unit
+def test_collector_keys_stats_by_route_template(fresh_collector):
+    for case_id in range(100):
+        fresh_collector.record_api_call(f"/api/v1/cases/{case_id}", "GET", 200, 10.0 + case_id)
+    fresh_collector.record_api_call("/api/v1/cases/7", "GET", 404, 5.0)
+
+    stats = fresh_collector.get_endpoint_stats()
+    assert len(stats) == 1
+    assert stats[0]["endpoint"] == "/api/v1/cases/{id}"
+    assert stats[0]["request_count"] == 101
+    assert stats[0]["error_count"] == 1
+    assert stats[0]["p95_response_time"] == pytest.approx(104.0, rel=0.01)
+    assert fresh_collector.get_system_health()["total_requests"] == 101
+    assert list(fresh_collector.get_cost_breakdown()) == ["/api/v1/cases/{id}"]
+
+
+@pytest.mark.unit
+def test_call_records_share_the_overflow_route(fresh_collector):
+    fresh_collector.aggregator.max_routes = 3
+    for i in range(20):
+        fresh_collector.record_api_call(f"/static/asset-{i}.js", "GET", 200, 1.0)
+
+    assert len(fresh_collector.endpoint_calls) == 4
+    assert len(fresh_collector.endpoint_calls[MetricsAggregator.OVERFLOW_ROUTE]) == 17
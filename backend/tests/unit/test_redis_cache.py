@@ -0,0 +1,180 @@
+"""
+Unit tests for the async Redis cache service
+
+Runs against fakeredis: serialization and compression, batched operations,
+SCAN and tag invalidation, and single-flight in @cached.
+"""
+
+import asyncio
+import json
+
+import fakeredis
+import pytest
+
+from app.src.core.cache.redis_cache import (
+    CacheService,
+    JSONSerializer,
+    MsgpackSerializer,
+    SingleFlight,
+    cache_invalidate,
+    cached,
+)
+
+
+@pytest.fixture
+def redis_client():
+    return fakeredis.FakeAsyncRedis(server=fakeredis.FakeServer())
+
+
+@pytest.fixture
+def service(redis_client):
+    return CacheService(redis_client=redis_client, compress_threshold=256)
+
+
+@pytest.mark.unit
+class TestSerialization:
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("serializer", [MsgpackSerializer(), JSONSerializer()])
+    async def test_round_trip(self, redis_client, serializer):
+        service = CacheService(redis_client=redis_client, serializer=serializer)
+        value = {"case_id": 42, "parties": ["Smith", "Jones"], "active": True, "score": 0.5}
+
+        assert await service.set("case:42", value, ttl=60)
+        assert await service.get("case:42") == value
+        assert 0 < await redis_client.ttl("cache:case:42") <= 60
+
+    @pytest.mark.asyncio
+    async def test_large_values_are_compressed(self, service, redis_client):
+        document = {"text": "WHEREAS the parties agree " * 500}
+        await service.set("doc", document)
+
+        raw = await redis_client.get("cache:doc")
+        assert raw[0] & 0x01
+        assert len(raw) < len(json.dumps(document)) / 10
+        assert await service.get("doc") == document
+
+    @pytest.mark.asyncio
+    async def test_reads_legacy_json_and_counters(self, service, redis_client):
+        await redis_client.set("cache:legacy", json.dumps({"a": 1}))
+        await service.increment("hits", 5)
+
+        assert await service.get("legacy") == {"a": 1}
+        assert await service.get("hits") == 5
+
+    @pytest.mark.asyncio
+    async def test_entries_stay_readable_across_serializers(self, redis_client):
+        await CacheService(redis_client=redis_client, serializer=JSONSerializer()).set("k", [1, 2])
+        assert await CacheService(redis_client=redis_client, serializer=MsgpackSerializer()).get("k") == [1, 2]
+
+
+@pytest.mark.unit
+class TestBatchedOperations:
+    @pytest.mark.asyncio
+    async def test_get_many_and_set_many(self, service):
+        await service.set_many({f"user:{i}": {"id": i} for i in range(100)}, ttl=30)
+
+        found = await service.get_many([f"user:{i}" for i in range(95, 105)])
+        assert found == {f"user:{i}": {"id": i} for i in range(95, 100)}
+
+    @pytest.mark.asyncio
+    async def test_delete_many(self, service):
+        await service.set_many({"a": 1, "b": 2, "c": 3})
+        assert await service.delete_many(["a", "b", "missing"]) == 2
+        assert await service.get_many(["a", "b", "c"]) == {"c": 3}
+
+
+@pytest.mark.unit
+class TestInvalidation:
+    @pytest.mark.asyncio
+    async def test_delete_pattern_uses_scan_not_keys(self, service, redis_client, monkeypatch):
+        async def forbidden(*args, **kwargs):
+            raise AssertionError("KEYS must not be used")
+
+        monkeypatch.setattr(redis_client, "keys", forbidden)
+        await service.set_many({f"user:{i}": i for i in range(1200)})
+        await service.set_many({f"case:{i}": i for i in range(10)})
+
+        assert await service.delete_pattern("user:*") == 1200
+        assert len(await service.get_keys_by_pattern("*")) == 10
+
+    @pytest.mark.asyncio
+    async def test_invalidate_tags(self, service, redis_client):
+        await service.set("case:1:summary", "s1", ttl=60, tags=["case:1"])
+        await service.set("case:1:docs", ["d1"], ttl=120, tags=["case:1", "docs"])
+        await service.set("case:2:summary", "s2", tags=["case:2"])
+
+        assert 60 < await redis_client.ttl("cache:tag:case:1") <= 120
+        assert await service.invalidate_tags("case:1") == 2
+        assert await service.get("case:1:docs") is None
+        assert await service.get("case:2:summary") == "s2"
+        assert not await redis_client.exists("cache:tag:case:1")
+
+
+@pytest.mark.unit
+class TestCachedDecorator:
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_load_once(self, service):
+        calls = 0
+
+        @cached(ttl=60, prefix="cases", cache_service=service)
+        async def load_case(case_id):
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return {"id": case_id}
+
+        results = await asyncio.gather(*(load_case(7) for _ in range(50)))
+
+        assert calls == 1
+        assert results == [{"id": 7}] * 50
+        assert await load_case(7) == {"id": 7}
+        assert calls == 1
+
+    @pytest.mark.asyncio
+    async def test_failures_reach_all_waiters_and_are_not_cached(self, service):
+        attempts = 0
+
+        @cached(cache_service=service)
+        async def flaky():
+            nonlocal attempts
+            attempts += 1
+            await asyncio.sleep(0.01)
+            if attempts == 1:
+                raise RuntimeError("database unavailable")
+            return "ok"
+
+        results = await asyncio.gather(*(flaky() for _ in range(5)), return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert await flaky() == "ok"
+        assert attempts == 2
+
+    @pytest.mark.asyncio
+    async def test_cache_invalidate_by_tag(self, service):
+        @cached(prefix="users", tags=lambda user_id: [f"user:{user_id}"], cache_service=service)
+        async def get_user(user_id):
+            return {"id": user_id, "name": "before"}
+
+        @cache_invalidate(prefix="users", tags=lambda user_id: [f"user:{user_id}"], cache_service=service)
+        async def rename_user(user_id):
+            return True
+
+        await get_user(1)
+        assert len(await service.get_keys_by_pattern("get_user:*", prefix="users")) == 1
+        await rename_user(1)
+        assert await service.get_keys_by_pattern("get_user:*", prefix="users") == []
+
+    def test_sync_functions_are_rejected(self):
+        with pytest.raises(TypeError):
+            @cached()
+            def not_async():
+                return 1
+
+    @pytest.mark.asyncio
+    async def test_single_flight_clears_after_cancellation(self):
+        flight = SingleFlight()
+        task = asyncio.create_task(flight.do("k", lambda: asyncio.sleep(10)))
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert len(flight) == 0
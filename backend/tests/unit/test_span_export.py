@@ -0,0 +1,198 @@
+"""
+Unit tests for the batched span export pipeline
+
+The span_export module is loaded directly from its file, like health.py in
+conftest, so the tests do not pull in the rest of the app.monitoring package.
+"""
+
+import asyncio
+import importlib.util
+import sys
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+_span_export_path = Path(__file__).resolve().parents[2] / "app" / "monitoring" / "span_export.py"
+_spec = importlib.util.spec_from_file_location("span_export_module", _span_export_path)
+span_export = importlib.util.module_from_spec(_spec)
+sys.modules["span_export_module"] = span_export
+_spec.loader.exec_module(span_export)
+
+BatchSpanProcessor = span_export.BatchSpanProcessor
+FileSpanExporter = span_export.FileSpanExporter
+SpanExporter = span_export.SpanExporter
+TraceSampler = span_export.TraceSampler
+
+
+def make_span(trace_id, parent_span_id=None, duration_ms=5.0, status="ok", operation="op"):
+    """Finished span with the attributes the pipeline reads from tracing.Span."""
+    start = datetime(2025, 1, 1, 12, 0, 0)
+    end = start + timedelta(milliseconds=duration_ms)
+    return SimpleNamespace(
+        context=SimpleNamespace(trace_id=trace_id, span_id=uuid.uuid4().hex[:16], parent_span_id=parent_span_id),
+        operation_name=operation,
+        service_name="legal-ai-system",
+        component="api",
+        start_time=start,
+        end_time=end,
+        duration_ms=lambda: duration_ms,
+        status=status,
+        error_message="boom" if status == "error" else None,
+        tags={},
+        logs=[],
+        client_id=None,
+        document_id=None,
+        document_type=None,
+        contains_pii=False,
+        compliance_level=None,
+    )
+
+
+def make_trace(n_spans=20, **root_kwargs):
+    trace_id = uuid.uuid4().hex
+    children = [make_span(trace_id, parent_span_id="root") for _ in range(n_spans - 1)]
+    return children + [make_span(trace_id, **root_kwargs)]
+
+
+class RecordingExporter(SpanExporter):
+    def __init__(self, fail=False):
+        self.batches = []
+        self.fail = fail
+
+    async def export(self, records):
+        if self.fail:
+            raise RuntimeError("database unavailable")
+        self.batches.append(records)
+
+
+@pytest.mark.unit
+class TestTraceSampler:
+    def test_head_sampling_is_deterministic_per_trace(self):
+        sampler = TraceSampler(head_sample_rate=0.5)
+        trace_ids = [uuid.uuid4().hex for _ in range(2000)]
+
+        first = [sampler.head_sampled(t) for t in trace_ids]
+        assert first == [sampler.head_sampled(t) for t in trace_ids]
+        assert 0.4 < sum(first) / len(first) < 0.6
+
+    def test_tail_sampling_keeps_errors_and_slow_traces(self):
+        sampler = TraceSampler(head_sample_rate=0.0, slow_threshold_ms=500)
+        trace_id = uuid.uuid4().hex
+
+        assert not sampler.keep_trace(trace_id, [make_span(trace_id, duration_ms=10)])
+        assert sampler.keep_trace(trace_id, [make_span(trace_id, duration_ms=600)])
+        assert sampler.keep_trace(trace_id, [make_span(trace_id, "p", status="error"), make_span(trace_id)])
+
+    def test_keeps_every_trace_by_default(self):
+        sampler = TraceSampler()
+        assert all(sampler.head_sampled(uuid.uuid4().hex) for _ in range(100))
+
+
+@pytest.mark.unit
+def test_exporters_must_implement_export():
+    class Incomplete(SpanExporter):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+@pytest.mark.unit
+class TestBatchSpanProcessor:
+    @pytest.mark.asyncio
+    async def test_exports_a_trace_in_one_batch(self):
+        exporter = RecordingExporter()
+        processor = BatchSpanProcessor(exporter, schedule_delay=60)
+        for span in make_trace(20):
+            processor.on_end(span)
+
+        assert processor.queue_depth == 20
+        await processor.shutdown()
+
+        assert len(exporter.batches) == 1
+        assert len(exporter.batches[0]) == 20
+        assert processor.counters["spans_exported"] == 20
+
+    @pytest.mark.asyncio
+    async def test_spans_wait_for_root_before_sampling(self):
+        processor = BatchSpanProcessor(RecordingExporter(), sampler=TraceSampler(head_sample_rate=0.0))
+        trace = make_trace(5, status="error")
+        for span in trace[:-1]:
+            processor.on_end(span)
+
+        assert processor.queue_depth == 0
+        assert processor.get_stats()["pending_traces"] == 1
+
+        processor.on_end(trace[-1])
+        assert processor.queue_depth == 5
+        await processor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_unsampled_fast_traces_are_counted_and_dropped(self):
+        processor = BatchSpanProcessor(RecordingExporter(), sampler=TraceSampler(head_sample_rate=0.0))
+        for span in make_trace(10):
+            processor.on_end(span)
+
+        assert processor.queue_depth == 0
+        assert processor.counters["spans_sampled_out"] == 10
+        await processor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_ring_buffer_drops_oldest_when_full(self):
+        exporter = RecordingExporter()
+        processor = BatchSpanProcessor(exporter, max_queue_size=50, max_export_batch_size=1000, schedule_delay=60)
+        for _ in range(10):
+            for span in make_trace(10):
+                processor.on_end(span)
+
+        assert processor.queue_depth == 50
+        assert processor.counters["spans_dropped_queue_full"] == 50
+        await processor.shutdown()
+        assert sum(len(b) for b in exporter.batches) == 50
+
+    @pytest.mark.asyncio
+    async def test_export_failures_are_counted(self):
+        processor = BatchSpanProcessor(RecordingExporter(fail=True))
+        for span in make_trace(3):
+            processor.on_end(span)
+        await processor.shutdown()
+
+        assert processor.counters["export_errors"] == 1
+        assert processor.counters["spans_dropped_export_error"] == 3
+
+    @pytest.mark.asyncio
+    async def test_orphan_traces_are_decided_after_timeout(self):
+        processor = BatchSpanProcessor(RecordingExporter(), trace_timeout=0)
+        processor.on_end(make_span(uuid.uuid4().hex, parent_span_id="remote-parent"))
+
+        processor._expire_pending_traces()
+        assert processor.queue_depth == 1
+        await processor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_full_batch_triggers_export_before_schedule(self):
+        exporter = RecordingExporter()
+        processor = BatchSpanProcessor(exporter, max_export_batch_size=20, schedule_delay=60)
+        for span in make_trace(20):
+            processor.on_end(span)
+
+        await asyncio.sleep(0.05)
+        assert len(exporter.batches) == 1
+        await processor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_file_exporter_round_trip(self, tmp_path):
+        exporter = FileSpanExporter(tmp_path / "spans.jsonl")
+        processor = BatchSpanProcessor(exporter)
+        trace = make_trace(4, status="error")
+        for span in trace:
+            processor.on_end(span)
+        await processor.shutdown()
+
+        records = exporter.read_records()
+        assert len(records) == 4
+        assert {r["trace_id"] for r in records} == {trace[0].context.trace_id}
+        assert records[-1]["status"] == "error"
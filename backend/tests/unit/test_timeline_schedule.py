@@ -0,0 +1,210 @@
+"""
+Tests for the timeline scheduling engine
+
+Fuzzes earliest/latest times and slack against a brute-force relaxation
+reference, checks incremental updates and what-if queries against full
+rebuilds, cycle detection and deep cascades.
+"""
+
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.src.services.case_workflow_service import TimelineWorkflowEngine
+from app.src.services.timeline_schedule import DependencyCycleError, TimelineSchedule
+
+BASE = datetime(2025, 3, 1, 9, 0)
+
+
+def random_timeline(rng, n, edge_factor=2.0, multi_day=0.3):
+    """Random DAG; each dependency is recorded on one side, as in the database"""
+    order = list(range(n))
+    rng.shuffle(order)
+    events = [{
+        "id": f"E{i}",
+        "title": f"Event {i}",
+        "event_date": BASE + timedelta(days=rng.randint(0, 120), hours=rng.choice([0, 6])),
+        "blocked_by_event_ids": [],
+        "blocks_event_ids": [],
+    } for i in range(n)]
+    for event in events:
+        if rng.random() < multi_day:
+            event["end_date"] = event["event_date"] + timedelta(days=rng.randint(1, 10))
+    for _ in range(int(n * edge_factor)):
+        a, b = sorted(rng.sample(range(n), 2)) if n > 1 else (0, 0)
+        before, after = events[order[a]], events[order[b]]
+        if before is after:
+            continue
+        if rng.random() < 0.5:
+            after["blocked_by_event_ids"].append(before["id"])
+        else:
+            before["blocks_event_ids"].append(after["id"])
+    return events
+
+
+def reference_times(events):
+    """Longest-path times by repeated edge relaxation, independent of ordering"""
+    start = {e["id"]: e["event_date"] for e in events}
+    duration = {e["id"]: (e["end_date"] - e["event_date"]) if e.get("end_date") else timedelta(0)
+                for e in events}
+    edges = {(dep, e["id"]) for e in events for dep in e["blocked_by_event_ids"] if dep in start}
+    edges |= {(e["id"], dep) for e in events for dep in e["blocks_event_ids"] if dep in start}
+
+    es = dict(start)
+    for _ in range(len(events)):
+        for p, v in edges:
+            es[v] = max(es[v], es[p] + duration[p])
+    end = max(es[i] + duration[i] for i in es)
+    lf = {i: end for i in es}
+    for _ in range(len(events)):
+        for p, v in edges:
+            lf[p] = min(lf[p], lf[v] - duration[v])
+    return {i: (es[i], lf[i] - duration[i]) for i in es}, end
+
+
+def assert_matches_reference(schedule, events):
+    expected, end = reference_times(events)
+    assert schedule.completion_date == end
+    for event_id, (es, ls) in expected.items():
+        times = schedule.event_times(event_id)
+        assert times["earliest_start"] == es, event_id
+        assert times["latest_start"] == ls, event_id
+        assert times["is_critical"] == (ls == es), event_id
+
+
+def apply_moves(events, moves):
+    moved = []
+    for event in events:
+        if event["id"] in moves:
+            event_date, end_date = moves[event["id"]]
+            event = {**event, "event_date": event_date, "end_date": end_date}
+        moved.append(event)
+    return moved
+
+
+def random_moves(rng, events, count):
+    moves = {}
+    for event in rng.sample(events, count):
+        event_date = event["event_date"] + timedelta(days=rng.randint(-20, 20))
+        end_date = event_date + timedelta(days=rng.randint(1, 5)) if rng.random() < 0.3 else None
+        moves[event["id"]] = (event_date, end_date)
+    return moves
+
+
+@pytest.mark.unit
+class TestScheduleAgainstReference:
+    def test_random_graphs(self):
+        rng = random.Random(0)
+        for _ in range(300):
+            events = random_timeline(rng, rng.randint(1, 14))
+            assert_matches_reference(TimelineSchedule(events), events)
+
+    def test_incremental_updates_match_rebuild(self):
+        rng = random.Random(1)
+        for _ in range(150):
+            events = random_timeline(rng, rng.randint(2, 14))
+            schedule = TimelineSchedule(events)
+            for _ in range(5):
+                moves = random_moves(rng, events, rng.randint(1, min(3, len(events))))
+                schedule.update_events(moves)
+                events = apply_moves(events, moves)
+                assert_matches_reference(schedule, events)
+
+    def test_update_reports_changed_events(self):
+        events = [
+            {"id": "petition", "event_date": BASE, "end_date": BASE + timedelta(days=2)},
+            {"id": "meeting", "event_date": BASE + timedelta(days=1), "blocked_by_event_ids": ["petition"]},
+            {"id": "unrelated", "event_date": BASE + timedelta(days=30)},
+        ]
+        schedule = TimelineSchedule(events)
+
+        # Old implementation compared against the predecessor's start date, not its finish
+        assert schedule.event_times("meeting")["earliest_start"] == BASE + timedelta(days=2)
+
+        changed = schedule.update_events({"petition": BASE + timedelta(days=3)})
+        assert changed == ["petition", "meeting"]
+        assert schedule.event_times("meeting")["earliest_start"] == BASE + timedelta(days=5)
+        assert schedule.event_times("unrelated")["earliest_start"] == BASE + timedelta(days=30)
+
+    def test_what_if_does_not_mutate(self):
+        rng = random.Random(2)
+        for _ in range(100):
+            events = random_timeline(rng, rng.randint(2, 12))
+            schedule = TimelineSchedule(events)
+            snapshot = {e["id"]: schedule.event_times(e["id"]) for e in events}
+            moves = random_moves(rng, events, 1)
+
+            result = schedule.what_if(moves)
+
+            assert {e["id"]: schedule.event_times(e["id"]) for e in events} == snapshot
+            rebuilt = TimelineSchedule(apply_moves(events, moves))
+            assert result["completion_after"] == rebuilt.completion_date
+            for entry in result["affected_events"]:
+                assert entry["earliest_start_after"] == rebuilt.event_times(entry["id"])["earliest_start"]
+            unaffected = set(snapshot) - {a["id"] for a in result["affected_events"]}
+            for event_id in unaffected:
+                assert rebuilt.event_times(event_id)["earliest_start"] == snapshot[event_id]["earliest_start"]
+
+
+@pytest.mark.unit
+class TestGraphHandling:
+    def test_cycle_is_reported(self):
+        events = [
+            {"id": "a", "event_date": BASE, "blocks_event_ids": ["b"]},
+            {"id": "b", "event_date": BASE, "blocks_event_ids": ["c"]},
+            {"id": "c", "event_date": BASE, "blocked_by_event_ids": []},
+            {"id": "d", "event_date": BASE, "blocked_by_event_ids": ["c"], "blocks_event_ids": ["b"]},
+        ]
+        with pytest.raises(DependencyCycleError) as excinfo:
+            TimelineSchedule(events)
+
+        cycle = excinfo.value.cycle
+        assert cycle[0] == cycle[-1]
+        assert set(cycle) == {"b", "c", "d"}
+
+    def test_unknown_dependencies_are_ignored(self):
+        schedule = TimelineSchedule([{"id": "a", "event_date": BASE, "blocked_by_event_ids": ["gone"]}])
+        assert schedule.event_times("a")["is_critical"]
+
+    def test_deep_cascade_without_recursion(self):
+        n = 5000
+        events = [{"id": f"E{i}", "event_date": BASE + timedelta(hours=i),
+                   "blocked_by_event_ids": [f"E{i - 1}"] if i else []} for i in range(n)]
+        cascade = TimelineSchedule(events).downstream("E0")
+
+        assert len(cascade) == n - 1
+        assert cascade[-1]["cascade_level"] == n - 1
+        assert cascade[2]["dependency_chain"] == ["E1", "E2", "E3"]
+
+    def test_shared_subgraphs_are_listed_once(self):
+        # Diamond ladder: 2^20 paths, 41 downstream events
+        events = [{"id": "root", "event_date": BASE}]
+        previous = ["root"]
+        for level in range(20):
+            pair = [f"L{level}a", f"L{level}b"]
+            events += [{"id": i, "event_date": BASE, "blocked_by_event_ids": previous} for i in pair]
+            previous = pair
+        events.append({"id": "sink", "event_date": BASE, "blocked_by_event_ids": previous})
+
+        cascade = TimelineSchedule(events).downstream("root")
+        assert len(cascade) == 41
+        assert cascade[-1]["event"]["id"] == "sink"
+        assert cascade[-1]["cascade_level"] == 21
+
+
+@pytest.mark.unit
+def test_engine_caches_schedule_per_case():
+    engine = TimelineWorkflowEngine()
+    events = random_timeline(random.Random(3), 50)
+
+    first = engine.get_schedule(events, case_id="case-1")
+    moves = random_moves(random.Random(4), events, 2)
+    moved = apply_moves(events, moves)
+    second = engine.get_schedule(moved, case_id="case-1")
+
+    assert second is first
+    assert_matches_reference(second, moved)
+    assert engine.calculate_critical_path(moved, case_id="case-1") == TimelineSchedule(moved).critical_events()
+
+    assert engine.get_schedule(moved[1:], case_id="case-1") is not first
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+OCR Pipeline Benchmark
+
+Wall time and peak RSS for OCR of a generated image-only (scanned) PDF:
+
+    legacy   every page rasterized up front, then OCR'd one by one (the old
+             TesseractOCREngine.process_document path)
+    cold     the streaming OCRPipeline with an empty encrypted page cache
+    cached   the same pipeline run again over the now-populated cache
+
+Each case runs in its own process so peak RSS is not inflated by the previous
+one; RSS is sampled across that process and its pool workers. Needs the
+tesseract and pdftoppm (poppler) binaries:
+
+    python scripts/benchmark_ocr_pipeline.py --pages 300
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import psutil
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+CASES = ("legacy", "cold", "cached")
+PREPROCESSING = ["grayscale", "contrast_enhancement", "adaptive_threshold"]
+
+
+class PeakRSS:
+    """Samples the RSS of a process plus its children."""
+
+    def __init__(self, pid: int, interval: float = 0.05):
+        self.process = psutil.Process(pid)
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _sample(self):
+        total = 0
+        try:
+            processes = [self.process] + self.process.children(recursive=True)
+        except psutil.Error:
+            return
+        for process in processes:
+            try:
+                total += process.memory_info().rss
+            except psutil.Error:
+                pass
+        self.peak = max(self.peak, total)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._sample()
+            time.sleep(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def write_scanned_pdf(path: Path, pages: int) -> str:
+    """Image-only PDF: each page is a bitmap of typed lines, as a scanner produces."""
+    from PIL import Image, ImageDraw
+
+    def page_images():
+        for n in range(1, pages + 1):
+            image = Image.new("L", (1275, 1650), 255)  # Letter at 150 dpi
+            draw = ImageDraw.Draw(image)
+            for line in range(40):
+                draw.text((100, 80 + line * 36), f"Page {n} line {line}: the witness testified as follows.", fill=0)
+            yield image
+
+    images = page_images()
+    first = next(images)
+    first.save(path, save_all=True, append_images=images, resolution=150)
+    return str(path)
+
+
+def run_legacy(pdf_path: str):
+    import cv2
+    import numpy as np
+    import pdf2image
+
+    from src.document_processor.ocr_pipeline import OCRSettings, preprocess_image, tesseract_recognize
+
+    settings = OCRSettings(preprocessing=PREPROCESSING)
+    images = [cv2.cvtColor(np.array(page), cv2.COLOR_RGB2BGR)
+              for page in pdf2image.convert_from_path(pdf_path, dpi=300, fmt="RGB")]
+    return [tesseract_recognize(preprocess_image(image, settings.preprocessing), settings)["text"]
+            for image in images], ["ocr"] * len(images)
+
+
+def run_pipeline(pdf_path: str, cache_dir: str, cache_key: str, workers: int):
+    from src.core.encrypted_cache import EncryptedCacheConfig
+    from src.document_processor.ocr_pipeline import OCRPipeline, OCRSettings
+
+    pipeline = OCRPipeline(max_workers=workers or None,
+                           cache=EncryptedCacheConfig(root=cache_dir, key=cache_key))
+
+    async def collect():
+        return [page async for page in pipeline.iter_pages(pdf_path, "pdf", OCRSettings(preprocessing=PREPROCESSING))]
+
+    try:
+        pages = asyncio.run(collect())
+    finally:
+        pipeline.close()
+    return [page.get("text") for page in pages], [page["source"] for page in pages]
+
+
+def run_case(args) -> int:
+    """Child process: run one case and write its page texts and sources."""
+    if args.case == "legacy":
+        texts, sources = run_legacy(args.pdf)
+    else:
+        texts, sources = run_pipeline(args.pdf, args.cache_dir, os.environ["BENCHMARK_CACHE_KEY"], args.workers)
+    with open(args.output, "w") as f:
+        json.dump({"texts": texts, "sources": sources}, f)
+    return 0
+
+
+def measure(case: str, pdf_path: str, workdir: Path, cache_dir: str, env: dict, workers: int) -> dict:
+    output = workdir / f"{case}.json"
+    command = [sys.executable, __file__, "--case", case, "--pdf", pdf_path, "--cache-dir", cache_dir,
+               "--output", str(output), "--workers", str(workers)]
+    start = time.perf_counter()
+    process = subprocess.Popen(command, env=env)
+    with PeakRSS(process.pid) as rss:
+        returncode = process.wait()
+    wall = time.perf_counter() - start
+    if returncode:
+        raise SystemExit(f"{case} run failed with exit code {returncode}")
+    result = json.loads(output.read_text())
+    result.update(wall=wall, peak_rss=rss.peak)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the streaming OCR pipeline against rasterize-all/serial OCR")
+    parser.add_argument("--pages", type=int, default=300, help="Pages in the generated scanned PDF (default: 300)")
+    parser.add_argument("--workers", type=int, default=0, help="Pipeline worker processes (default: CPU count)")
+    parser.add_argument("--keep", action="store_true", help="Keep the generated PDF and cache")
+    parser.add_argument("--case", choices=CASES, help=argparse.SUPPRESS)
+    parser.add_argument("--pdf", help=argparse.SUPPRESS)
+    parser.add_argument("--cache-dir", help=argparse.SUPPRESS)
+    parser.add_argument("--output", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        return run_case(args)
+
+    missing = [binary for binary in ("tesseract", "pdftoppm") if not shutil.which(binary)]
+    if missing:
+        print(f"Missing required binaries: {', '.join(missing)}", file=sys.stderr)
+        return 1
+
+    from cryptography.fernet import Fernet
+    import pytesseract
+
+    workdir = Path(tempfile.mkdtemp(prefix="ocr-benchmark-"))
+    try:
+        pdf_path = write_scanned_pdf(workdir / "scanned.pdf", args.pages)
+        cache_dir = str(workdir / "cache")
+        env = dict(os.environ, BENCHMARK_CACHE_KEY=Fernet.generate_key().decode())
+
+        results = {case: measure(case, pdf_path, workdir, cache_dir, env, args.workers) for case in CASES}
+    finally:
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    workers = args.workers or os.cpu_count()
+    print(f"{args.pages}-page scanned PDF, {workers} workers, tesseract {pytesseract.get_tesseract_version()}:")
+    labels = {"legacy": "rasterize-all + serial", "cold": "pipeline, cold cache", "cached": "pipeline, cache re-run"}
+    for case in CASES:
+        result = results[case]
+        print(f"  {labels[case]:<24} {result['wall']:8.1f} s   peak RSS {result['peak_rss'] / 2**20:7.0f} MiB")
+
+    if results["cold"]["texts"] != results["legacy"]["texts"]:
+        print("WARNING: pipeline text differs from the legacy path", file=sys.stderr)
+        return 1
+    if set(results["cached"]["sources"]) != {"cache"}:
+        print("WARNING: re-run was not served entirely from the cache", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
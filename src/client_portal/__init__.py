@@ -29,6 +29,8 @@ from .models import (
 
 from .auth_manager import ClientAuthManager
 from .document_manager import ClientDocumentManager
+from .upload_manager import ChunkedUploadManager
+from .document_search import DocumentSearch, create_search_index
 from .communication_manager import CommunicationManager
 from .notification_manager import NotificationManager
 from .realtime_manager import RealtimeManager
@@ -54,6 +56,9 @@ __all__ = [
     # Managers
     'ClientAuthManager',
     'ClientDocumentManager',
+    'ChunkedUploadManager',
+    'DocumentSearch',
+    'create_search_index',
     'CommunicationManager', 
     'NotificationManager',
     'RealtimeManager',
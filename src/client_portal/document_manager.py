@@ -11,7 +11,7 @@ import magic
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any, List, BinaryIO
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, desc
+from sqlalchemy import and_, desc
 import uuid
 import shutil
 from pathlib import Path
@@ -21,12 +21,46 @@ from .models import (
     DocumentType, ClientAuditLog, AuditAction
 )
 from .audit_manager import ClientAuditManager
+from .upload_manager import ChunkedUploadManager, UploadError, UploadSession
+from .document_search import DocumentSearch, invalidate_search_totals
+
+
+# Allowed file types and their MIME types
+ALLOWED_FILE_TYPES = {
+    'pdf': ['application/pdf'],
+    'doc': ['application/msword', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'],
+    'txt': ['text/plain'],
+    'rtf': ['application/rtf'],
+    'jpg': ['image/jpeg'],
+    'png': ['image/png'],
+    'gif': ['image/gif'],
+    'xlsx': ['application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'],
+    'csv': ['text/csv']
+}
+
+
+def is_allowed_file_type(mime_type: str, filename: str, allowed_types: Dict[str, List[str]] = ALLOWED_FILE_TYPES) -> bool:
+    """Check if file type is allowed."""
+    # Check MIME type
+    for allowed_mimes in allowed_types.values():
+        if mime_type in allowed_mimes:
+            return True
+    
+    # Check file extension as fallback
+    file_ext = Path(filename).suffix.lower().lstrip('.')
+    return file_ext in allowed_types
 
 
 class ClientDocumentManager:
     """Manages client document operations with security and access control."""
     
-    def __init__(self, db_session: Session, storage_path: str, max_file_size: int = 50 * 1024 * 1024):
+    def __init__(
+        self,
+        db_session: Session,
+        storage_path: str,
+        max_file_size: int = 50 * 1024 * 1024,
+        uploads: Optional[ChunkedUploadManager] = None
+    ):
         self.db = db_session
         self.storage_path = Path(storage_path)
         self.max_file_size = max_file_size
@@ -36,17 +70,17 @@ class ClientDocumentManager:
         self.storage_path.mkdir(parents=True, exist_ok=True)
         
         # Allowed file types and their MIME types
-        self.allowed_types = {
-            'pdf': ['application/pdf'],
-            'doc': ['application/msword', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'],
-            'txt': ['text/plain'],
-            'rtf': ['application/rtf'],
-            'jpg': ['image/jpeg'],
-            'png': ['image/png'],
-            'gif': ['image/gif'],
-            'xlsx': ['application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'],
-            'csv': ['text/csv']
-        }
+        self.allowed_types = dict(ALLOWED_FILE_TYPES)
+        
+        # Resumable chunked uploads, also used to stream single-request uploads to disk.
+        # Long-lived callers pass one shared manager so running hashes carry over
+        # between requests.
+        if uploads is None:
+            uploads = ChunkedUploadManager(str(self.storage_path), max_file_size, self._is_allowed_file_type)
+        self.uploads = uploads
+        
+        # Indexed text search with keyset pagination
+        self.document_search = DocumentSearch(db_session)
     
     def upload_document(
         self,
@@ -69,70 +103,202 @@ class ClientDocumentManager:
             if not client:
                 return {'success': False, 'error': 'Client not found'}
             
-            # Read and validate file
-            file_content = file_data.read()
-            file_size = len(file_content)
+            # Stream the file to disk in chunks, hashing as it is written
+            session = self.uploads.start_upload(
+                client_id,
+                original_filename,
+                details=self._upload_details(
+                    document_type, title, description, case_id, tags, is_confidential, uploaded_by
+                )
+            )
+            try:
+                self.uploads.write_stream(session.upload_id, file_data)
+            except Exception:
+                self.uploads.abort_upload(session.upload_id)
+                raise
             
-            if file_size > self.max_file_size:
-                return {'success': False, 'error': f'File too large. Max size: {self.max_file_size // (1024*1024)}MB'}
+            return self._store_upload(session.upload_id, ip_address)
             
-            # Detect MIME type
-            mime_type = magic.from_buffer(file_content, mime=True)
+        except UploadError as e:
+            return {'success': False, 'error': str(e)}
+        except Exception as e:
+            self.db.rollback()
+            return {'success': False, 'error': f'Upload failed: {str(e)}'}
+    
+    def start_chunked_upload(
+        self,
+        client_id: int,
+        original_filename: str,
+        document_type: DocumentType,
+        total_size: Optional[int] = None,
+        title: Optional[str] = None,
+        description: Optional[str] = None,
+        case_id: Optional[int] = None,
+        tags: Optional[List[str]] = None,
+        is_confidential: bool = False,
+        uploaded_by: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Start a resumable upload; chunks are then sent with upload_chunk from offset 0."""
+        try:
+            client = self.db.query(ClientUser).filter(ClientUser.id == client_id).first()
+            if not client:
+                return {'success': False, 'error': 'Client not found'}
+            
+            session = self.uploads.start_upload(
+                client_id,
+                original_filename,
+                total_size=total_size,
+                details=self._upload_details(
+                    document_type, title, description, case_id, tags, is_confidential, uploaded_by
+                )
+            )
             
-            # Validate file type
-            if not self._is_allowed_file_type(mime_type, original_filename):
-                return {'success': False, 'error': 'File type not allowed'}
+            return {
+                'success': True,
+                'upload': session.to_dict(),
+                'chunk_size': self.uploads.chunk_size
+            }
+            
+        except UploadError as e:
+            return {'success': False, 'error': str(e)}
+        except Exception as e:
+            return {'success': False, 'error': f'Upload failed: {str(e)}'}
+    
+    def upload_chunk(self, upload_id: str, client_id: int, offset: int, chunk: bytes) -> Dict[str, Any]:
+        """Append a chunk at the upload's current offset."""
+        try:
+            if not self._get_upload(upload_id, client_id):
+                return {'success': False, 'error': 'Upload not found'}
+            
+            session = self.uploads.append_chunk(upload_id, offset, chunk)
+            return {'success': True, 'upload': session.to_dict()}
+            
+        except UploadError as e:
+            result = {'success': False, 'error': str(e)}
+            if e.offset is not None:
+                result['offset'] = e.offset
+            return result
+        except Exception as e:
+            return {'success': False, 'error': f'Chunk upload failed: {str(e)}'}
+    
+    def get_upload_status(self, upload_id: str, client_id: int) -> Dict[str, Any]:
+        """Get the stored offset of an upload, to resume after a dropped connection."""
+        session = self._get_upload(upload_id, client_id)
+        if not session:
+            return {'success': False, 'error': 'Upload not found'}
+        return {'success': True, 'upload': session.to_dict()}
+    
+    def complete_chunked_upload(
+        self,
+        upload_id: str,
+        client_id: int,
+        ip_address: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Finish a resumable upload and create its document."""
+        try:
+            if not self._get_upload(upload_id, client_id):
+                return {'success': False, 'error': 'Upload not found'}
             
-            # Generate secure filename
-            file_extension = Path(original_filename).suffix.lower()
-            secure_filename = f"{uuid.uuid4().hex}{file_extension}"
+            return self._store_upload(upload_id, ip_address)
             
-            # Create document record
+        except UploadError as e:
+            result = {'success': False, 'error': str(e)}
+            if e.offset is not None:
+                result['offset'] = e.offset
+            return result
+        except Exception as e:
+            return {'success': False, 'error': f'Upload failed: {str(e)}'}
+    
+    def abort_chunked_upload(self, upload_id: str, client_id: int) -> Dict[str, Any]:
+        """Cancel a resumable upload and discard what was received."""
+        if not self._get_upload(upload_id, client_id):
+            return {'success': False, 'error': 'Upload not found'}
+        
+        self.uploads.abort_upload(upload_id)
+        return {'success': True, 'message': 'Upload cancelled'}
+    
+    def _get_upload(self, upload_id: str, client_id: int) -> Optional[UploadSession]:
+        """Get an upload session if it belongs to the client."""
+        session = self.uploads.get_upload(upload_id)
+        if not session or session.client_id != client_id:
+            return None
+        return session
+    
+    def _upload_details(
+        self,
+        document_type: DocumentType,
+        title: Optional[str],
+        description: Optional[str],
+        case_id: Optional[int],
+        tags: Optional[List[str]],
+        is_confidential: bool,
+        uploaded_by: Optional[str]
+    ) -> Dict[str, Any]:
+        """Document fields kept with an upload session until it completes."""
+        return {
+            'document_type': document_type.value,
+            'title': title,
+            'description': description,
+            'case_id': case_id,
+            'tags': tags or [],
+            'is_confidential': is_confidential,
+            'uploaded_by': uploaded_by
+        }
+    
+    def _store_upload(self, upload_id: str, ip_address: Optional[str]) -> Dict[str, Any]:
+        """Move a finished upload into client storage and create its document record."""
+        session = self.uploads.get_upload(upload_id)
+        if not session:
+            raise UploadError('Upload not found')
+        details = session.details
+        document_type = DocumentType(details['document_type'])
+        
+        # Generate secure filename
+        file_extension = Path(session.original_filename).suffix.lower()
+        secure_filename = f"{uuid.uuid4().hex}{file_extension}"
+        
+        # Create client-specific storage directory
+        client_dir = self.storage_path / f"client_{session.client_id}"
+        client_dir.mkdir(exist_ok=True)
+        file_path = client_dir / secure_filename
+        
+        # Hash and size were computed as the chunks arrived
+        session, file_hash = self.uploads.complete_upload(upload_id, file_path)
+        
+        try:
             document = ClientDocument(
-                client_id=client_id,
+                client_id=session.client_id,
                 filename=secure_filename,
-                original_filename=original_filename,
-                file_size=file_size,
-                mime_type=mime_type,
+                original_filename=session.original_filename,
+                file_path=str(file_path),
+                file_size=session.offset,
+                mime_type=session.mime_type,
                 document_type=document_type,
-                title=title or original_filename,
-                description=description,
-                tags=tags or [],
-                case_id=case_id,
-                is_confidential=is_confidential,
+                title=details['title'] or session.original_filename,
+                description=details['description'],
+                tags=details['tags'],
+                case_id=details['case_id'],
+                is_confidential=details['is_confidential'],
                 status=DocumentStatus.UPLOADED,
-                uploaded_by=uploaded_by
+                uploaded_by=details['uploaded_by'],
+                document_metadata={'file_hash': file_hash, 'upload_ip': ip_address}
             )
             
-            # Create client-specific storage directory
-            client_dir = self.storage_path / f"client_{client_id}"
-            client_dir.mkdir(exist_ok=True)
-            
-            # Store file
-            file_path = client_dir / secure_filename
-            document.file_path = str(file_path)
-            
-            with open(file_path, 'wb') as f:
-                f.write(file_content)
-            
-            # Generate file hash for integrity
-            file_hash = hashlib.sha256(file_content).hexdigest()
-            document.metadata = {'file_hash': file_hash, 'upload_ip': ip_address}
-            
             self.db.add(document)
             self.db.commit()
+            invalidate_search_totals(session.client_id)
             
             # Log audit event
             self.audit_manager.log_event(
-                user_id=client_id,
+                user_id=session.client_id,
                 action=AuditAction.DOCUMENT_VIEW,
                 resource_type='document',
                 resource_id=document.document_id,
                 ip_address=ip_address,
                 action_details={
                     'action': 'upload',
-                    'filename': original_filename,
-                    'file_size': file_size,
+                    'filename': session.original_filename,
+                    'file_size': session.offset,
                     'document_type': document_type.value
                 }
             )
@@ -143,15 +309,15 @@ class ClientDocumentManager:
                 'message': 'Document uploaded successfully'
             }
             
-        except Exception as e:
+        except Exception:
             self.db.rollback()
             # Clean up file if it was created
             try:
-                if 'file_path' in locals() and file_path.exists():
+                if file_path.exists():
                     file_path.unlink()
             except:
                 pass
-            return {'success': False, 'error': f'Upload failed: {str(e)}'}
+            raise
     
     def get_client_documents(
         self,
@@ -161,58 +327,31 @@ class ClientDocumentManager:
         status: Optional[DocumentStatus] = None,
         search_query: Optional[str] = None,
         page: int = 1,
-        limit: int = 20
+        limit: int = 20,
+        cursor: Optional[str] = None
     ) -> Dict[str, Any]:
-        """Get documents accessible to client."""
+        """Get documents accessible to client; pass ``next_cursor`` back as ``cursor`` for the next page."""
         try:
-            # Build query
-            query = self.db.query(ClientDocument).filter(
-                ClientDocument.client_id == client_id
+            results = self.document_search.search(
+                client_id,
+                # The whole query is matched as one phrase
+                [search_query] if search_query else [],
+                document_types=[document_type] if document_type else None,
+                case_id=case_id,
+                status=status,
+                cursor=cursor,
+                page=page,
+                limit=limit
             )
             
-            # Apply filters
-            if document_type:
-                query = query.filter(ClientDocument.document_type == document_type)
-            
-            if case_id:
-                query = query.filter(ClientDocument.case_id == case_id)
-            
-            if status:
-                query = query.filter(ClientDocument.status == status)
-            else:
-                # Exclude deleted documents by default
-                query = query.filter(ClientDocument.status != DocumentStatus.DELETED)
-            
-            # Search functionality
-            if search_query:
-                search = f"%{search_query}%"
-                query = query.filter(
-                    or_(
-                        ClientDocument.title.ilike(search),
-                        ClientDocument.description.ilike(search),
-                        ClientDocument.original_filename.ilike(search)
-                    )
-                )
-            
-            # Get total count
-            total_count = query.count()
-            
-            # Apply pagination and ordering
-            documents = query.order_by(desc(ClientDocument.created_at)).offset(
-                (page - 1) * limit
-            ).limit(limit).all()
-            
             return {
                 'success': True,
-                'documents': [doc.to_dict() for doc in documents],
-                'pagination': {
-                    'page': page,
-                    'limit': limit,
-                    'total': total_count,
-                    'pages': (total_count + limit - 1) // limit
-                }
+                'documents': [doc.to_dict() for doc in results.documents],
+                'pagination': self._pagination(results, page, limit, cursor)
             }
             
+        except ValueError as e:
+            return {'success': False, 'error': str(e)}
         except Exception as e:
             return {'success': False, 'error': f'Failed to retrieve documents: {str(e)}'}
     
@@ -367,6 +506,7 @@ class ClientDocumentManager:
             )
             
             self.db.commit()
+            invalidate_search_totals(client_id)
             
             return {
                 'success': True,
@@ -410,6 +550,7 @@ class ClientDocumentManager:
             )
             
             self.db.commit()
+            invalidate_search_totals(client_id)
             
             return {
                 'success': True,
@@ -428,63 +569,48 @@ class ClientDocumentManager:
         date_from: Optional[datetime] = None,
         date_to: Optional[datetime] = None,
         page: int = 1,
-        limit: int = 20
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        sort: str = 'recent'
     ) -> Dict[str, Any]:
-        """Advanced document search for client."""
+        """Advanced document search for client, newest first or by relevance."""
         try:
-            # Build base query
-            base_query = self.db.query(ClientDocument).filter(
-                and_(
-                    ClientDocument.client_id == client_id,
-                    ClientDocument.status != DocumentStatus.DELETED
-                )
+            results = self.document_search.search(
+                client_id,
+                query.lower().split(),
+                document_types=document_types,
+                date_from=date_from,
+                date_to=date_to,
+                sort=sort,
+                cursor=cursor,
+                page=page,
+                limit=limit
             )
             
-            # Text search across multiple fields
-            search_terms = query.lower().split()
-            for term in search_terms:
-                search_pattern = f"%{term}%"
-                base_query = base_query.filter(
-                    or_(
-                        ClientDocument.title.ilike(search_pattern),
-                        ClientDocument.description.ilike(search_pattern),
-                        ClientDocument.original_filename.ilike(search_pattern)
-                    )
-                )
-            
-            # Filter by document types
-            if document_types:
-                base_query = base_query.filter(ClientDocument.document_type.in_(document_types))
-            
-            # Date range filter
-            if date_from:
-                base_query = base_query.filter(ClientDocument.created_at >= date_from)
-            if date_to:
-                base_query = base_query.filter(ClientDocument.created_at <= date_to)
-            
-            # Get total count
-            total_count = base_query.count()
-            
-            # Apply pagination and ordering
-            documents = base_query.order_by(desc(ClientDocument.created_at)).offset(
-                (page - 1) * limit
-            ).limit(limit).all()
-            
             return {
                 'success': True,
-                'documents': [doc.to_dict() for doc in documents],
+                'documents': [doc.to_dict() for doc in results.documents],
                 'search_query': query,
-                'pagination': {
-                    'page': page,
-                    'limit': limit,
-                    'total': total_count,
-                    'pages': (total_count + limit - 1) // limit
-                }
+                'sort': results.sort,
+                'pagination': self._pagination(results, page, limit, cursor)
             }
             
+        except ValueError as e:
+            return {'success': False, 'error': str(e)}
         except Exception as e:
             return {'success': False, 'error': f'Search failed: {str(e)}'}
     
+    def _pagination(self, results, page: int, limit: int, cursor: Optional[str]) -> Dict[str, Any]:
+        """Pagination details; ``page`` is only meaningful when paging by number."""
+        return {
+            'page': None if cursor else page,
+            'limit': limit,
+            'total': results.total,
+            'total_is_estimate': results.total_is_estimate,
+            'pages': (results.total + limit - 1) // limit,
+            'next_cursor': results.next_cursor
+        }
+    
     def get_document_statistics(self, client_id: int) -> Dict[str, Any]:
         """Get document statistics for client dashboard."""
         try:
@@ -543,22 +669,12 @@ class ClientDocumentManager:
     
     def _is_allowed_file_type(self, mime_type: str, filename: str) -> bool:
         """Check if file type is allowed."""
-        # Check MIME type
-        for allowed_mimes in self.allowed_types.values():
-            if mime_type in allowed_mimes:
-                return True
-        
-        # Check file extension as fallback
-        file_ext = Path(filename).suffix.lower().lstrip('.')
-        return file_ext in self.allowed_types
+        return is_allowed_file_type(mime_type, filename, self.allowed_types)
     
     def _calculate_file_hash(self, file_path: Path) -> str:
-        """Calculate SHA-256 hash of file."""
-        hash_sha256 = hashlib.sha256()
+        """Calculate SHA-256 hash of file in one streaming pass."""
         with open(file_path, "rb") as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                hash_sha256.update(chunk)
-        return hash_sha256.hexdigest()
+            return hashlib.file_digest(f, "sha256").hexdigest()
     
     def verify_file_integrity(self, document_id: str, client_id: int) -> Dict[str, Any]:
         """Verify file integrity using stored hash."""
@@ -577,12 +693,17 @@ class ClientDocumentManager:
             if not file_path.exists():
                 return {'success': False, 'error': 'Document file not found'}
             
-            current_hash = self._calculate_file_hash(file_path)
-            stored_hash = document.metadata.get('file_hash') if document.metadata else None
+            stored_hash = document.document_metadata.get('file_hash') if document.document_metadata else None
             
             if not stored_hash:
                 return {'success': False, 'error': 'No stored hash for verification'}
             
+            # A size mismatch settles it without reading the file
+            if file_path.stat().st_size != document.file_size:
+                current_hash = None
+            else:
+                current_hash = self._calculate_file_hash(file_path)
+            
             integrity_valid = current_hash == stored_hash
             
             return {
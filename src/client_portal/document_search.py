@@ -0,0 +1,401 @@
+"""
+Client Portal Document Search
+
+Indexed text search over a client's documents. A document matches when every
+search term appears, case-insensitively, in its title, description or
+original filename. These are the semantics of the previous
+``ilike('%term%')`` filters, but the matching is served by an index. On
+SQLite that is an FTS5 table with the trigram tokenizer, kept in sync by
+triggers. On PostgreSQL it is a set of pg_trgm GIN indexes, which answer the
+ILIKE filters directly. Other databases fall back to plain ILIKE.
+
+The index is created by ``create_search_index`` at startup (or from a
+migration), never inside a request. Searches only detect whether it exists,
+falling back to ILIKE until it does.
+
+Results are listed newest first or by relevance. Pages are fetched with
+keyset cursors over ``(created_at, id)`` instead of OFFSET, so a deep page
+costs the same as the first. Match totals are counted up to a cap and cached
+briefly per client.
+"""
+
+import base64
+import binascii
+import json
+import logging
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple
+
+from sqlalchemy import (
+    String, and_, column, func, literal, literal_column, or_, select, table, text, tuple_, type_coerce
+)
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Query, Session
+
+from .models import ClientDocument, DocumentStatus, DocumentType
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = 'client_documents_fts'
+
+# Relevance weights for title, description and original filename
+FIELD_WEIGHTS = (10.0, 1.0, 5.0)
+
+SEARCH_SORTS = ('recent', 'relevance')
+
+# Trigram indexes cannot match anything shorter than this
+MIN_INDEXED_TERM = 3
+
+SQLITE_INDEX_DDL = (
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, description, original_filename,
+        content='client_documents', content_rowid='id', tokenize='trigram'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON client_documents BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, description, original_filename)
+        VALUES (new.id, new.title, new.description, new.original_filename);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON client_documents BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description, original_filename)
+        VALUES ('delete', old.id, old.title, old.description, old.original_filename);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au
+    AFTER UPDATE OF title, description, original_filename ON client_documents BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description, original_filename)
+        VALUES ('delete', old.id, old.title, old.description, old.original_filename);
+        INSERT INTO {FTS_TABLE}(rowid, title, description, original_filename)
+        VALUES (new.id, new.title, new.description, new.original_filename);
+    END
+    """,
+)
+
+# Index existing documents once, when the table is first created
+SQLITE_REBUILD = f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+
+POSTGRES_INDEX_DDL = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS idx_document_title_trgm "
+    "ON client_documents USING gin (title gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS idx_document_description_trgm "
+    "ON client_documents USING gin (description gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS idx_document_filename_trgm "
+    "ON client_documents USING gin (original_filename gin_trgm_ops)",
+)
+POSTGRES_INDEXES = ('idx_document_title_trgm', 'idx_document_description_trgm', 'idx_document_filename_trgm')
+
+# Search backend found for each database engine: engine -> (backend, recheck_at).
+# Indexed backends are kept; the ILIKE fallback is re-checked after a while
+_backends: 'weakref.WeakKeyDictionary[Any, Tuple[str, Optional[float]]]' = weakref.WeakKeyDictionary()
+_backends_lock = threading.Lock()
+FALLBACK_RECHECK_SECONDS = 60.0
+
+# Cached match totals per database engine: key -> (total, is_estimate, expires_at)
+_totals: 'weakref.WeakKeyDictionary[Any, OrderedDict]' = weakref.WeakKeyDictionary()
+_totals_lock = threading.Lock()
+MAX_CACHED_TOTALS = 4096
+
+
+def create_search_index(bind) -> str:
+    """
+    Create the search index for an engine if it is missing, indexing existing
+    documents, and return the backend it enables. Run at startup or from a
+    migration; safe to run concurrently and repeatedly.
+    """
+    dialect = bind.dialect.name
+    try:
+        with bind.begin() as connection:
+            if dialect == 'sqlite':
+                created = not _index_exists(connection, dialect)
+                for statement in SQLITE_INDEX_DDL:
+                    connection.execute(text(statement))
+                if created:
+                    connection.execute(text(SQLITE_REBUILD))
+            elif dialect == 'postgresql':
+                for statement in POSTGRES_INDEX_DDL:
+                    connection.execute(text(statement))
+    except DBAPIError as e:
+        # e.g. SQLite built without the trigram tokenizer, or no rights to create pg_trgm;
+        # a concurrent worker may still have created it
+        logger.warning(f"Could not create the document search index: {e}")
+
+    with bind.connect() as connection:
+        backend = _detect_backend(connection, dialect)
+    with _backends_lock:
+        _backends.pop(bind, None)
+    return backend
+
+
+def _index_exists(connection, dialect: str) -> bool:
+    if dialect == 'sqlite':
+        return connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE name = :name"), {'name': FTS_TABLE}
+        ).first() is not None
+    if dialect == 'postgresql':
+        found = connection.execute(
+            text("SELECT count(*) FROM pg_indexes WHERE indexname = ANY(:names)"),
+            {'names': list(POSTGRES_INDEXES)}
+        ).scalar()
+        return found == len(POSTGRES_INDEXES)
+    return False
+
+
+def _detect_backend(connection, dialect: str) -> str:
+    if dialect not in ('sqlite', 'postgresql'):
+        return 'like'
+    if not _index_exists(connection, dialect):
+        return 'like'
+    return 'fts5' if dialect == 'sqlite' else 'pg_trgm'
+
+
+def invalidate_search_totals(client_id: int) -> None:
+    """Drop cached search totals for a client after its documents change."""
+    with _totals_lock:
+        for totals in _totals.values():
+            for key in [key for key in totals if key[0] == client_id]:
+                del totals[key]
+
+
+def encode_cursor(sort: str, key: Sequence[Any]) -> str:
+    payload = json.dumps({'s': sort, 'k': list(key)}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str, sort: str) -> List[Any]:
+    """Decode a page cursor; raises ValueError if it is malformed or from another sort."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        key = payload['k']
+        expected = 3 if sort == 'relevance' else 2
+        if payload['s'] != sort or len(key) != expected or not isinstance(key[-1], int):
+            raise ValueError
+        if not isinstance(key[-2], str) or (sort == 'relevance' and not isinstance(key[0], (int, float))):
+            raise ValueError
+        return key
+    except (ValueError, KeyError, TypeError, UnicodeError, binascii.Error):
+        raise ValueError('Invalid cursor')
+
+
+@dataclass
+class SearchPage:
+    """One page of search results."""
+    documents: List[ClientDocument]
+    total: int
+    total_is_estimate: bool
+    next_cursor: Optional[str]
+    sort: str
+
+
+class DocumentSearch:
+    """Indexed, relevance-ranked document search with keyset pagination."""
+
+    def __init__(self, db_session: Session, count_cap: int = 10000, count_ttl: float = 60.0):
+        self.db = db_session
+        self.count_cap = count_cap
+        self.count_ttl = count_ttl
+
+    @property
+    def backend(self) -> str:
+        """``fts5``, ``pg_trgm`` or ``like`` while ``create_search_index`` has not run."""
+        bind = self.db.get_bind()
+        now = time.monotonic()
+        cached = _backends.get(bind)
+        if cached is not None and (cached[1] is None or cached[1] > now):
+            return cached[0]
+
+        with _backends_lock:
+            cached = _backends.get(bind)
+            if cached is not None and (cached[1] is None or cached[1] > now):
+                return cached[0]
+            dialect = bind.dialect.name
+            backend = _detect_backend(self.db.connection(), dialect)
+            if backend == 'like' and dialect in ('sqlite', 'postgresql'):
+                logger.warning(
+                    "Document search index is missing; using unindexed ILIKE search "
+                    "(run create_search_index at startup)"
+                )
+                _backends[bind] = (backend, now + FALLBACK_RECHECK_SECONDS)
+            else:
+                _backends[bind] = (backend, None)
+        return backend
+
+    def search(
+        self,
+        client_id: int,
+        terms: Sequence[str],
+        document_types: Optional[List[DocumentType]] = None,
+        case_id: Optional[int] = None,
+        status: Optional[DocumentStatus] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        sort: str = 'recent',
+        cursor: Optional[str] = None,
+        page: int = 1,
+        limit: int = 20
+    ) -> SearchPage:
+        """
+        Find a client's documents containing every term. Pass the previous
+        page's ``next_cursor`` to continue; ``page`` is only used without a
+        cursor, for clients that still page by number.
+        """
+        if sort not in SEARCH_SORTS:
+            raise ValueError(f"Unknown sort: {sort}")
+        terms = tuple(term for term in terms if term)
+
+        query = self.db.query(ClientDocument).filter(ClientDocument.client_id == client_id)
+        if document_types:
+            query = query.filter(ClientDocument.document_type.in_(document_types))
+        if case_id:
+            query = query.filter(ClientDocument.case_id == case_id)
+        if status:
+            query = query.filter(ClientDocument.status == status)
+        else:
+            # Exclude deleted documents by default
+            query = query.filter(ClientDocument.status != DocumentStatus.DELETED)
+        if date_from:
+            query = query.filter(ClientDocument.created_at >= date_from)
+        if date_to:
+            query = query.filter(ClientDocument.created_at <= date_to)
+
+        query, rank = self._match(query, terms, sort)
+
+        total, total_is_estimate = self._total(
+            query,
+            (client_id, self.backend, terms, tuple(document_types or ()), case_id, status, date_from, date_to)
+        )
+
+        # created_at is compared as stored, so cursors round-trip exactly on every backend
+        created = type_coerce(ClientDocument.created_at, String)
+        if sort == 'relevance':
+            order = (rank.asc(), ClientDocument.created_at.desc(), ClientDocument.id.desc())
+        else:
+            order = (ClientDocument.created_at.desc(), ClientDocument.id.desc())
+
+        page_query = query.add_columns(created, rank).order_by(*order)
+        if cursor:
+            page_query = page_query.filter(self._after(decode_cursor(cursor, sort), created, rank))
+        elif page > 1:
+            page_query = page_query.offset((page - 1) * limit)
+
+        # One extra row tells whether there is a next page
+        rows = page_query.limit(limit + 1).all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last, last_created, last_rank = rows[-1]
+            key = [self._created_key(last_created), last.id]
+            if sort == 'relevance':
+                key.insert(0, float(last_rank))
+            next_cursor = encode_cursor(sort, key)
+
+        return SearchPage(
+            documents=[row[0] for row in rows],
+            total=total,
+            total_is_estimate=total_is_estimate,
+            next_cursor=next_cursor,
+            sort=sort
+        )
+
+    def _match(self, query: Query, terms: Tuple[str, ...], sort: str) -> Tuple[Query, Any]:
+        """Restrict the query to documents containing every term; returns it with a rank (lower is better)."""
+        backend = self.backend
+        rank = literal(0.0)
+        like_terms = list(terms)
+
+        if backend == 'fts5':
+            indexed = [term for term in terms if self._indexable(term)]
+            like_terms = [term for term in terms if not self._indexable(term)]
+            if indexed:
+                fts = table(FTS_TABLE, column('rowid'), column(FTS_TABLE))
+                match = fts.c[FTS_TABLE].match(
+                    ' AND '.join('"' + term.replace('"', '""') + '"' for term in indexed)
+                )
+                # Joining the FTS table directly lets SQLite probe it once per
+                # candidate row, re-running the match each time; a subquery is
+                # evaluated once
+                if sort == 'relevance':
+                    weights = ', '.join(str(weight) for weight in FIELD_WEIGHTS)
+                    matches = select(
+                        fts.c.rowid.label('id'),
+                        func.bm25(literal_column(FTS_TABLE), literal_column(weights)).label('rank')
+                    ).where(match).subquery('fts_matches')
+                    query = query.join(matches, matches.c.id == ClientDocument.id)
+                    rank = matches.c.rank
+                else:
+                    # Newest first walks the (client_id, created_at, id) index instead
+                    query = query.filter(ClientDocument.id.in_(select(fts.c.rowid).where(match)))
+        elif backend == 'pg_trgm' and terms:
+            score = None
+            for term in terms:
+                for field, weight in zip(
+                    (ClientDocument.title, ClientDocument.description, ClientDocument.original_filename),
+                    FIELD_WEIGHTS
+                ):
+                    term_score = func.word_similarity(term, func.coalesce(field, '')) * weight
+                    score = term_score if score is None else score + term_score
+            rank = -score
+
+        # Anything not matched through an index is filtered as before; pg_trgm indexes serve these
+        for term in like_terms:
+            pattern = f"%{term}%"
+            query = query.filter(
+                or_(
+                    ClientDocument.title.ilike(pattern),
+                    ClientDocument.description.ilike(pattern),
+                    ClientDocument.original_filename.ilike(pattern)
+                )
+            )
+        return query, rank.label('search_rank')
+
+    @staticmethod
+    def _indexable(term: str) -> bool:
+        # LIKE wildcards keep their pattern meaning, so those terms stay on ILIKE
+        return len(term) >= MIN_INDEXED_TERM and not any(c in term for c in '%_\\')
+
+    @staticmethod
+    def _after(key: List[Any], created: Any, rank: Any) -> Any:
+        """Rows that sort after the cursor's key."""
+        created_at, document_id = key[-2], key[-1]
+        older = tuple_(created, ClientDocument.id) < tuple_(literal(created_at, String), literal(document_id))
+        if len(key) == 2:
+            return older
+        return or_(rank > key[0], and_(rank == key[0], older))
+
+    @staticmethod
+    def _created_key(value: Any) -> str:
+        # SQLite hands back the stored text; other drivers return a datetime
+        return value.isoformat(sep=' ') if isinstance(value, datetime) else str(value)
+
+    def _total(self, query: Query, key: Tuple) -> Tuple[int, bool]:
+        """Number of matches, counted up to ``count_cap`` and cached for ``count_ttl`` seconds."""
+        now = time.monotonic()
+        with _totals_lock:
+            totals = _totals.setdefault(self.db.get_bind(), OrderedDict())
+            cached = totals.get(key)
+            if cached and cached[2] > now:
+                totals.move_to_end(key)
+                return cached[0], cached[1]
+
+        capped = query.with_entities(ClientDocument.id).limit(self.count_cap + 1).subquery()
+        total = self.db.query(func.count()).select_from(capped).scalar()
+        is_estimate = total > self.count_cap
+        total = min(total, self.count_cap)
+
+        with _totals_lock:
+            totals[key] = (total, is_estimate, now + self.count_ttl)
+            totals.move_to_end(key)
+            while len(totals) > MAX_CACHED_TOTALS:
+                totals.popitem(last=False)
+        return total, is_estimate
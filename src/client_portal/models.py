@@ -272,6 +272,7 @@ class ClientDocument(Base):
         Index('idx_document_status', 'status'),
         Index('idx_document_created', 'created_at'),
         Index('idx_document_case', 'case_id'),
+        Index('idx_document_client_created', 'client_id', 'created_at', 'id'),
     )
     
     def to_dict(self) -> Dict[str, Any]:
@@ -5,13 +5,14 @@ Main API endpoints for client portal functionality including authentication,
 document management, messaging, notifications, and real-time features.
 """
 
-from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, WebSocket, WebSocketDisconnect, Request, Header, Query
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.orm import Session
 from typing import Optional, List, Dict, Any
 from datetime import datetime
+import asyncio
 import redis
 import json
 from pathlib import Path
@@ -19,7 +20,9 @@ import io
 
 from ..core.config import get_database_session, get_redis_client
 from .auth_manager import ClientAuthManager
-from .document_manager import ClientDocumentManager
+from .document_manager import ClientDocumentManager, is_allowed_file_type
+from .document_search import create_search_index
+from .upload_manager import ChunkedUploadManager
 from .communication_manager import CommunicationManager
 from .notification_manager import NotificationManager
 from .realtime_manager import RealtimeManager
@@ -70,6 +73,11 @@ class DocumentUploadMetadata(BaseModel):
     tags: Optional[List[str]] = []
     is_confidential: bool = False
 
+class ChunkedUploadRequest(BaseModel):
+    filename: str
+    total_size: Optional[int] = None
+    metadata: DocumentUploadMetadata
+
 class MessageRequest(BaseModel):
     recipient_type: str
     subject: str
@@ -117,6 +125,13 @@ class ClientPortalAPI:
         # Initialize managers (will be done per request)
         self.realtime_manager = None
         
+        # Shared across requests, so each chunk extends the upload's running
+        # hash instead of rehashing the partial file
+        self.upload_manager = ChunkedUploadManager(storage_path, is_allowed_file_type=is_allowed_file_type)
+        
+        # Search index DDL and the initial index build run once at startup, not in a request
+        self.app.add_event_handler("startup", self._prepare_search_index)
+        
         # Setup routes
         self._setup_routes()
     
@@ -231,7 +246,7 @@ class ClientPortalAPI:
             db: Session = Depends(get_database_session),
             current_user: dict = Depends(self._get_current_user)
         ):
-            doc_manager = ClientDocumentManager(db, self.storage_path)
+            doc_manager = self._document_manager(db)
             
             # Parse metadata
             if metadata:
@@ -243,7 +258,8 @@ class ClientPortalAPI:
             else:
                 doc_metadata = DocumentUploadMetadata(document_type=DocumentType.OTHER)
             
-            result = doc_manager.upload_document(
+            result = await asyncio.to_thread(
+                doc_manager.upload_document,
                 client_id=current_user['user_id'],
                 file_data=file.file,
                 original_filename=file.filename,
@@ -262,6 +278,119 @@ class ClientPortalAPI:
             
             return result
         
+        @self.app.post("/documents/uploads", tags=["Documents"])
+        async def start_chunked_upload(
+            request: ChunkedUploadRequest,
+            db: Session = Depends(get_database_session),
+            current_user: dict = Depends(self._get_current_user)
+        ):
+            doc_manager = self._document_manager(db)
+            
+            result = await asyncio.to_thread(
+                doc_manager.start_chunked_upload,
+                client_id=current_user['user_id'],
+                original_filename=request.filename,
+                document_type=request.metadata.document_type,
+                total_size=request.total_size,
+                title=request.metadata.title,
+                description=request.metadata.description,
+                case_id=request.metadata.case_id,
+                tags=request.metadata.tags,
+                is_confidential=request.metadata.is_confidential,
+                uploaded_by=f"client_{current_user['user_id']}"
+            )
+            
+            if not result['success']:
+                raise HTTPException(status_code=400, detail=result['error'])
+            
+            return result
+        
+        @self.app.put("/documents/uploads/{upload_id}", tags=["Documents"])
+        async def upload_chunk(
+            upload_id: str,
+            request: Request,
+            upload_offset: int = Header(...),
+            db: Session = Depends(get_database_session),
+            current_user: dict = Depends(self._get_current_user)
+        ):
+            doc_manager = self._document_manager(db)
+            
+            # One chunk per request, so the body is bounded by the chunk size
+            chunk = bytearray()
+            async for part in request.stream():
+                chunk += part
+                if len(chunk) > doc_manager.uploads.chunk_size:
+                    raise HTTPException(status_code=413, detail="Chunk too large")
+            
+            result = await asyncio.to_thread(
+                doc_manager.upload_chunk,
+                upload_id=upload_id,
+                client_id=current_user['user_id'],
+                offset=upload_offset,
+                chunk=bytes(chunk)
+            )
+            
+            if not result['success']:
+                if 'offset' in result:
+                    # Client resumes from the stored offset
+                    raise HTTPException(status_code=409, detail=result)
+                raise HTTPException(status_code=400, detail=result['error'])
+            
+            return result
+        
+        @self.app.get("/documents/uploads/{upload_id}", tags=["Documents"])
+        async def get_upload_status(
+            upload_id: str,
+            db: Session = Depends(get_database_session),
+            current_user: dict = Depends(self._get_current_user)
+        ):
+            doc_manager = self._document_manager(db)
+            
+            result = doc_manager.get_upload_status(upload_id, current_user['user_id'])
+            
+            if not result['success']:
+                raise HTTPException(status_code=404, detail=result['error'])
+            
+            return result
+        
+        @self.app.post("/documents/uploads/{upload_id}/complete", tags=["Documents"])
+        async def complete_chunked_upload(
+            upload_id: str,
+            user_ip: str = "0.0.0.0",
+            db: Session = Depends(get_database_session),
+            current_user: dict = Depends(self._get_current_user)
+        ):
+            doc_manager = self._document_manager(db)
+            
+            result = await asyncio.to_thread(
+                doc_manager.complete_chunked_upload,
+                upload_id=upload_id,
+                client_id=current_user['user_id'],
+                ip_address=user_ip
+            )
+            
+            if not result['success']:
+                if 'offset' in result:
+                    raise HTTPException(status_code=409, detail=result)
+                raise HTTPException(status_code=400, detail=result['error'])
+            
+            return result
+        
+        @self.app.delete("/documents/uploads/{upload_id}", tags=["Documents"])
+        async def abort_chunked_upload(
+            upload_id: str,
+            db: Session = Depends(get_database_session),
+            current_user: dict = Depends(self._get_current_user)
+        ):
+            doc_manager = self._document_manager(db)
+            
+            result = await asyncio.to_thread(doc_manager.abort_chunked_upload, upload_id, current_user['user_id'])
+            
+            if not result['success']:
+                raise HTTPException(status_code=404, detail=result['error'])
+            
+            return result
+        
         @self.app.get("/documents", tags=["Documents"])
         async def get_documents(
             document_type: Optional[DocumentType] = None,
@@ -269,10 +398,11 @@ class ClientPortalAPI:
             search: Optional[str] = None,
             page: int = 1,
             limit: int = 20,
+            cursor: Optional[str] = None,
             db: Session = Depends(get_database_session),
             current_user: dict = Depends(self._get_current_user)
         ):
-            doc_manager = ClientDocumentManager(db, self.storage_path)
+            doc_manager = self._document_manager(db)
             
             result = doc_manager.get_client_documents(
                 client_id=current_user['user_id'],
@@ -280,6 +410,37 @@ class ClientPortalAPI:
                 case_id=case_id,
                 search_query=search,
                 page=page,
+                limit=limit,
+                cursor=cursor
+            )
+            
+            if not result['success']:
+                raise HTTPException(status_code=400, detail=result['error'])
+            
+            return result
+        
+        @self.app.get("/documents/search", tags=["Documents"])
+        async def search_documents(
+            q: str,
+            document_type: Optional[List[DocumentType]] = Query(None),
+            date_from: Optional[datetime] = None,
+            date_to: Optional[datetime] = None,
+            sort: str = "recent",
+            cursor: Optional[str] = None,
+            limit: int = 20,
+            db: Session = Depends(get_database_session),
+            current_user: dict = Depends(self._get_current_user)
+        ):
+            doc_manager = self._document_manager(db)
+            
+            result = doc_manager.search_documents(
+                client_id=current_user['user_id'],
+                query=q,
+                document_types=document_type,
+                date_from=date_from,
+                date_to=date_to,
+                sort=sort,
+                cursor=cursor,
                 limit=limit
             )
             
@@ -295,7 +456,7 @@ class ClientPortalAPI:
             db: Session = Depends(get_database_session),
             current_user: dict = Depends(self._get_current_user)
         ):
-            doc_manager = ClientDocumentManager(db, self.storage_path)
+            doc_manager = self._document_manager(db)
             
             result = doc_manager.get_document(
                 document_id=document_id,
@@ -315,7 +476,7 @@ class ClientPortalAPI:
             db: Session = Depends(get_database_session),
             current_user: dict = Depends(self._get_current_user)
         ):
-            doc_manager = ClientDocumentManager(db, self.storage_path)
+            doc_manager = self._document_manager(db)
             
             result = doc_manager.download_document(
                 document_id=document_id,
@@ -482,7 +643,7 @@ class ClientPortalAPI:
             current_user: dict = Depends(self._get_current_user)
         ):
             # Gather dashboard data from various managers
-            doc_manager = ClientDocumentManager(db, self.storage_path)
+            doc_manager = self._document_manager(db)
             notification_manager = NotificationManager(db, redis_client, self.email_config)
             case_manager = ClientCaseManager(db)
             
@@ -550,6 +711,18 @@ class ClientPortalAPI:
             except Exception as e:
                 await websocket.close(code=1008, reason=f"Authentication failed: {str(e)}")
     
+    async def _prepare_search_index(self):
+        sessions = get_database_session()
+        db = next(sessions)
+        try:
+            await asyncio.to_thread(create_search_index, db.get_bind())
+        finally:
+            sessions.close()
+    
+    def _document_manager(self, db: Session) -> ClientDocumentManager:
+        """Document manager for one request, sharing the portal's upload manager."""
+        return ClientDocumentManager(db, self.storage_path, uploads=self.upload_manager)
+    
     async def _get_current_user(
         self,
         credentials: HTTPAuthorizationCredentials = Depends(HTTPBearer()),
@@ -0,0 +1,265 @@
+"""
+Client Portal Chunked Uploads
+
+Resumable document uploads, received in chunks. Each chunk must start at the
+offset the server has stored so far. It is appended to a partial file while
+the SHA-256 and size are updated, so an upload is never held in memory whole.
+A dropped connection resumes from the stored offset. The MIME type is sniffed
+from the first chunk, and disallowed files are rejected before the rest is
+sent. Session state is kept in a JSON file next to the partial upload, so
+uploads can also be resumed after a restart. Writes to an upload are
+serialized with a file lock, so concurrent requests for the same upload are
+safe across threads and worker processes.
+"""
+
+import fcntl
+import hashlib
+import json
+import os
+import uuid
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, Iterator, Optional, Tuple
+
+import magic
+
+
+class UploadError(Exception):
+    """A chunk or upload was rejected; ``offset`` is where the client should resume."""
+
+    def __init__(self, message: str, offset: Optional[int] = None):
+        super().__init__(message)
+        self.offset = offset
+
+
+@dataclass
+class UploadSession:
+    """Server-side state of one resumable upload."""
+    upload_id: str
+    client_id: int
+    original_filename: str
+    total_size: Optional[int] = None
+    offset: int = 0
+    mime_type: Optional[str] = None
+    details: Dict[str, Any] = field(default_factory=dict)
+    created_at: str = field(default_factory=lambda: datetime.utcnow().isoformat())
+    updated_at: str = field(default_factory=lambda: datetime.utcnow().isoformat())
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert upload session to dictionary representation."""
+        return {
+            'upload_id': self.upload_id,
+            'original_filename': self.original_filename,
+            'total_size': self.total_size,
+            'offset': self.offset,
+            'mime_type': self.mime_type,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
+        }
+
+
+class ChunkedUploadManager:
+    """Stores chunked uploads on disk with incremental hashing and offset tracking."""
+
+    def __init__(
+        self,
+        storage_path: str,
+        max_file_size: int = 50 * 1024 * 1024,
+        is_allowed_file_type: Optional[Callable[[str, str], bool]] = None,
+        chunk_size: int = 1024 * 1024,
+        session_ttl: timedelta = timedelta(hours=24)
+    ):
+        self.uploads_path = Path(storage_path) / '.uploads'
+        self.max_file_size = max_file_size
+        self.is_allowed_file_type = is_allowed_file_type
+        self.chunk_size = chunk_size
+        self.session_ttl = session_ttl
+
+        self.uploads_path.mkdir(parents=True, exist_ok=True)
+
+        # Running hashes of uploads in progress with the offset they cover. Rebuilt
+        # from the partial file after a restart, or when another worker process
+        # stored chunks since.
+        self._hashers: Dict[str, Tuple[int, Any]] = {}
+
+    def start_upload(
+        self,
+        client_id: int,
+        original_filename: str,
+        total_size: Optional[int] = None,
+        details: Optional[Dict[str, Any]] = None
+    ) -> UploadSession:
+        """Create an upload session; chunks are then sent from offset 0."""
+        if total_size is not None and total_size > self.max_file_size:
+            raise UploadError(self._too_large_message())
+
+        session = UploadSession(
+            upload_id=uuid.uuid4().hex,
+            client_id=client_id,
+            original_filename=original_filename,
+            total_size=total_size,
+            details=details or {}
+        )
+        self._part_path(session.upload_id).touch()
+        self._hashers[session.upload_id] = (0, hashlib.sha256())
+        self._save(session)
+        return session
+
+    def get_upload(self, upload_id: str) -> Optional[UploadSession]:
+        """Load an upload session, or None if it does not exist."""
+        try:
+            with open(self._session_path(upload_id), 'r', encoding='utf-8') as f:
+                return UploadSession(**json.load(f))
+        except (FileNotFoundError, UploadError, ValueError, TypeError):
+            return None
+
+    def append_chunk(self, upload_id: str, offset: int, data: bytes) -> UploadSession:
+        """Append a chunk that starts at the stored offset."""
+        with self._lock(upload_id):
+            session = self.get_upload(upload_id)
+            if not session:
+                raise UploadError('Upload not found')
+            if offset != session.offset:
+                raise UploadError('Chunk offset does not match upload offset', session.offset)
+
+            end = session.offset + len(data)
+            if end > self.max_file_size or (session.total_size is not None and end > session.total_size):
+                self._discard(upload_id)
+                raise UploadError(self._too_large_message())
+
+            if session.offset == 0 and data:
+                # Sniff the type from the first chunk only
+                self._detect_type(session, bytes(data))
+
+            hasher = self._hasher(session)
+            with open(self._part_path(upload_id), 'r+b') as f:
+                f.seek(session.offset)
+                f.write(data)
+                f.truncate()
+            hasher.update(data)
+            self._hashers[upload_id] = (end, hasher)
+
+            session.offset = end
+            session.updated_at = datetime.utcnow().isoformat()
+            self._save(session)
+            return session
+
+    def write_stream(self, upload_id: str, file_data: BinaryIO) -> UploadSession:
+        """Append everything readable from a file object, one chunk at a time."""
+        session = self.get_upload(upload_id)
+        if not session:
+            raise UploadError('Upload not found')
+        while True:
+            chunk = file_data.read(self.chunk_size)
+            if not chunk:
+                return session
+            session = self.append_chunk(upload_id, session.offset, chunk)
+
+    def complete_upload(self, upload_id: str, destination: Path) -> Tuple[UploadSession, str]:
+        """Move a finished upload to its destination; returns the session and SHA-256."""
+        with self._lock(upload_id):
+            session = self.get_upload(upload_id)
+            if not session:
+                raise UploadError('Upload not found')
+            if session.total_size is not None and session.offset != session.total_size:
+                raise UploadError('Upload is incomplete', session.offset)
+            if session.mime_type is None:
+                # No chunk was ever sent
+                self._detect_type(session, b'')
+
+            file_hash = self._hasher(session).hexdigest()
+            os.replace(self._part_path(upload_id), destination)
+            self._discard(upload_id)
+            return session, file_hash
+
+    def abort_upload(self, upload_id: str) -> bool:
+        """Discard an upload and its partial file."""
+        with self._lock(upload_id):
+            if not self._session_path(upload_id).exists():
+                return False
+            self._discard(upload_id)
+            return True
+
+    def cleanup_expired_uploads(self, now: Optional[datetime] = None) -> int:
+        """Discard uploads not touched within the session TTL."""
+        cutoff = (now or datetime.utcnow()) - self.session_ttl
+        expired = 0
+        for session_path in self.uploads_path.glob('*.json'):
+            session = self.get_upload(session_path.stem)
+            if session and datetime.fromisoformat(session.updated_at) < cutoff:
+                if self.abort_upload(session.upload_id):
+                    expired += 1
+        return expired
+
+    def _detect_type(self, session: UploadSession, head: bytes) -> None:
+        session.mime_type = magic.from_buffer(head, mime=True)
+        if self.is_allowed_file_type and not self.is_allowed_file_type(
+            session.mime_type, session.original_filename
+        ):
+            self._discard(session.upload_id)
+            raise UploadError('File type not allowed')
+
+    def _hasher(self, session: UploadSession):
+        offset, hasher = self._hashers.get(session.upload_id, (None, None))
+        if offset != session.offset:
+            # Resumed after a restart or in another worker: rehash what was
+            # stored, dropping any unrecorded tail
+            hasher = hashlib.sha256()
+            with open(self._part_path(session.upload_id), 'r+b') as f:
+                f.truncate(session.offset)
+                for chunk in iter(lambda: f.read(self.chunk_size), b''):
+                    hasher.update(chunk)
+            self._hashers[session.upload_id] = (session.offset, hasher)
+        return hasher
+
+    def _save(self, session: UploadSession) -> None:
+        tmp_path = self._session_path(session.upload_id).with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(asdict(session), f)
+        os.replace(tmp_path, self._session_path(session.upload_id))
+
+    def _discard(self, upload_id: str) -> None:
+        self._hashers.pop(upload_id, None)
+        for path in (self._part_path(upload_id), self._session_path(upload_id), self._lock_path(upload_id)):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    @contextmanager
+    def _lock(self, upload_id: str) -> Iterator[None]:
+        """Exclusive lock on one upload, held across threads and processes."""
+        lock_path = self._lock_path(upload_id)
+        fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            if not self._session_path(upload_id).exists():
+                # Discarded meanwhile, or never existed: don't leave the lock file behind
+                try:
+                    lock_path.unlink()
+                except FileNotFoundError:
+                    pass
+            yield
+        finally:
+            os.close(fd)
+
+    def _lock_path(self, upload_id: str) -> Path:
+        return self.uploads_path / f'{self._check_id(upload_id)}.lock'
+
+    def _part_path(self, upload_id: str) -> Path:
+        return self.uploads_path / f'{self._check_id(upload_id)}.part'
+
+    def _session_path(self, upload_id: str) -> Path:
+        return self.uploads_path / f'{self._check_id(upload_id)}.json'
+
+    @staticmethod
+    def _check_id(upload_id: str) -> str:
+        # Upload IDs come from clients and become file names
+        if not upload_id or not all(c in '0123456789abcdef' for c in upload_id):
+            raise UploadError('Upload not found')
+        return upload_id
+
+    def _too_large_message(self) -> str:
+        return f'File too large. Max size: {self.max_file_size // (1024*1024)}MB'
@@ -22,6 +22,8 @@ except ImportError:
         def encrypt_data(self, data): return f"encrypted_{data}"
         def hash_data(self, data): return f"hash_{abs(hash(data))}"
 
+from .audit_storage import AuditSegmentStore
+
 
 class LogLevel(Enum):
     """Audit log levels"""
@@ -89,6 +91,8 @@ class AuditSearchQuery:
     category: Optional[EventCategory] = None
     risk_level: Optional[RiskLevel] = None
     outcome: Optional[str] = None
+    action: Optional[str] = None
+    resource: Optional[str] = None
     limit: int = 100
     offset: int = 0
 
@@ -128,11 +132,17 @@ class AuditLogger:
             "real_time_monitoring": True,
             "compliance_validation": True,
             "retention_enforcement": True,
-            "legal_hold_support": True
+            "legal_hold_support": True,
+            "segment_max_events": 100_000,
+            "segment_max_bytes": 64 * 1024 * 1024
         }
 
-        # In-memory log storage (in production, use secure database)
-        self.audit_logs: List[AuditLogEntry] = []
+        # Append-only, hash-chained segment store with per-segment indexes
+        self.store = AuditSegmentStore(
+            self.storage_root / "segments",
+            segment_max_events=self.config["segment_max_events"],
+            segment_max_bytes=self.config["segment_max_bytes"]
+        )
 
         # Compliance requirements
         self.compliance_requirements = self._initialize_compliance_requirements()
@@ -352,7 +362,7 @@ class AuditLogger:
             log_entry.integrity_hash = self.encryption_manager.hash_data(hash_data)
 
         # Store log entry
-        self.audit_logs.append(log_entry)
+        self.store.append(self._entry_to_record(log_entry), log_entry.timestamp)
 
         # Real-time monitoring for high-risk events
         if self.config["real_time_monitoring"] and risk_level in [RiskLevel.HIGH, RiskLevel.CRITICAL]:
@@ -377,71 +387,103 @@ class AuditLogger:
         # In production, this would trigger actual alerting systems
         self._log_system_event("security_alert_triggered", "alert_system", alert_data)
 
-    def search_audit_logs(self, query: AuditSearchQuery) -> List[AuditLogEntry]:
-        """Search audit logs with compliance filtering"""
-        filtered_logs = self.audit_logs.copy()
-
-        # Apply filters
-        if query.start_date:
-            filtered_logs = [log for log in filtered_logs if log.timestamp >= query.start_date]
-
-        if query.end_date:
-            filtered_logs = [log for log in filtered_logs if log.timestamp <= query.end_date]
-
-        if query.user_id:
-            filtered_logs = [log for log in filtered_logs if log.user_id == query.user_id]
-
-        if query.event_type:
-            filtered_logs = [log for log in filtered_logs if log.event_type == query.event_type]
+    def _entry_to_record(self, entry: AuditLogEntry) -> Dict[str, Any]:
+        """Flatten an entry into the JSON record kept in the segment store"""
+        return {
+            "log_id": entry.log_id,
+            "timestamp": entry.timestamp.isoformat(),
+            "level": entry.level.value,
+            "category": entry.category.value,
+            "event_type": entry.event_type,
+            "user_id": entry.user_id,
+            "session_id": entry.session_id,
+            "ip_address": entry.ip_address,
+            "user_agent": entry.user_agent,
+            "resource_accessed": entry.resource_accessed,
+            "action_performed": entry.action_performed,
+            "outcome": entry.outcome,
+            "risk_level": entry.risk_level.value,
+            "details": entry.details,
+            "compliance_flags": entry.compliance_flags,
+            "retention_period_days": entry.retention_period_days,
+            "encrypted_payload": entry.encrypted_payload,
+            "integrity_hash": entry.integrity_hash
+        }
 
-        if query.category:
-            filtered_logs = [log for log in filtered_logs if log.category == query.category]
+    def _entry_from_record(self, record: Dict[str, Any]) -> AuditLogEntry:
+        """Rebuild an entry from a stored record"""
+        return AuditLogEntry(
+            **{
+                **record,
+                "timestamp": datetime.fromisoformat(record["timestamp"]),
+                "level": LogLevel(record["level"]),
+                "category": EventCategory(record["category"]),
+                "risk_level": RiskLevel(record["risk_level"])
+            }
+        )
 
-        if query.risk_level:
-            filtered_logs = [log for log in filtered_logs if log.risk_level == query.risk_level]
+    def search_audit_logs(self, query: AuditSearchQuery) -> List[AuditLogEntry]:
+        """Search audit logs with compliance filtering"""
+        filters = {
+            "user_id": query.user_id,
+            "event_type": query.event_type,
+            "action_performed": query.action,
+            "resource_accessed": query.resource,
+            "category": query.category.value if query.category else None,
+            "risk_level": query.risk_level.value if query.risk_level else None,
+            "outcome": query.outcome
+        }
 
-        if query.outcome:
-            filtered_logs = [log for log in filtered_logs if log.outcome == query.outcome]
+        records = self.store.query(
+            start=query.start_date,
+            end=query.end_date,
+            filters=filters,
+            offset=query.offset,
+            limit=query.limit
+        )
+        return [self._entry_from_record(record) for record in records]
 
-        # Apply pagination
-        start_idx = query.offset
-        end_idx = start_idx + query.limit
-        return filtered_logs[start_idx:end_idx]
+    def verify_audit_chain(self) -> Dict[str, Any]:
+        """Verify the hash chain over every stored audit event"""
+        return self.store.verify_chain()
 
     def generate_compliance_report(self, start_date: datetime, end_date: datetime) -> ComplianceReport:
         """Generate comprehensive compliance audit report"""
-        # Filter logs for date range
-        period_logs = [
-            log for log in self.audit_logs
-            if start_date <= log.timestamp <= end_date
-        ]
-
-        # Analyze events by category
+        # Single pass over the period; segments outside it are never read
+        total_events = 0
         events_by_category = {}
-        for log in period_logs:
-            category = log.category.value
+        security_events = 0
+        failed_events = 0
+        high_risk_events = 0
+        compliance_violations = []
+
+        for record in self.store.query(start=start_date, end=end_date):
+            total_events += 1
+            category = record["category"]
             events_by_category[category] = events_by_category.get(category, 0) + 1
 
-        # Count security and failed events
-        security_events = len([log for log in period_logs if log.category == EventCategory.SECURITY_EVENT])
-        failed_events = len([log for log in period_logs if log.outcome == "failure"])
-        high_risk_events = len([log for log in period_logs if log.risk_level in [RiskLevel.HIGH, RiskLevel.CRITICAL]])
+            if category == EventCategory.SECURITY_EVENT.value:
+                security_events += 1
+            if record["outcome"] == "failure":
+                failed_events += 1
+            if record["risk_level"] in (RiskLevel.HIGH.value, RiskLevel.CRITICAL.value):
+                high_risk_events += 1
 
-        # Identify compliance violations
-        compliance_violations = []
-        for log in period_logs:
-            if log.risk_level == RiskLevel.CRITICAL or "violation" in log.event_type.lower():
+            # Identify compliance violations
+            if record["risk_level"] == RiskLevel.CRITICAL.value or "violation" in record["event_type"].lower():
                 compliance_violations.append({
-                    "log_id": log.log_id,
-                    "timestamp": log.timestamp.isoformat(),
-                    "event_type": log.event_type,
-                    "user_id": log.user_id,
-                    "risk_level": log.risk_level.value,
-                    "compliance_flags": log.compliance_flags
+                    "log_id": record["log_id"],
+                    "timestamp": record["timestamp"],
+                    "event_type": record["event_type"],
+                    "user_id": record["user_id"],
+                    "risk_level": record["risk_level"],
+                    "compliance_flags": record["compliance_flags"]
                 })
 
         # Generate recommendations
-        recommendations = self._generate_compliance_recommendations(period_logs)
+        recommendations = self._generate_compliance_recommendations(
+            failed_events, security_events, high_risk_events
+        )
 
         # Create report
         report = ComplianceReport(
@@ -449,7 +491,7 @@ class AuditLogger:
             generated_at=datetime.now(timezone.utc),
             period_start=start_date,
             period_end=end_date,
-            total_events=len(period_logs),
+            total_events=total_events,
             events_by_category=events_by_category,
             security_events=security_events,
             failed_events=failed_events,
@@ -465,15 +507,11 @@ class AuditLogger:
 
         return report
 
-    def _generate_compliance_recommendations(self, logs: List[AuditLogEntry]) -> List[str]:
+    def _generate_compliance_recommendations(self, failed_attempts: int, security_events: int,
+                                             high_risk_events: int) -> List[str]:
         """Generate compliance recommendations based on audit analysis"""
         recommendations = []
 
-        # Analyze patterns
-        failed_attempts = len([log for log in logs if log.outcome == "failure"])
-        security_events = len([log for log in logs if log.category == EventCategory.SECURITY_EVENT])
-        high_risk_events = len([log for log in logs if log.risk_level in [RiskLevel.HIGH, RiskLevel.CRITICAL]])
-
         if failed_attempts > 10:
             recommendations.append("Consider implementing additional authentication controls to reduce failed login attempts")
 
@@ -496,7 +534,9 @@ class AuditLogger:
 
     def get_audit_statistics(self) -> Dict[str, Any]:
         """Get comprehensive audit system statistics"""
-        total_logs = len(self.audit_logs)
+        # Counts come from segment summaries; no events are read
+        store_stats = self.store.get_statistics()
+        total_logs = store_stats["total_events"]
 
         if total_logs == 0:
             return {
@@ -504,23 +544,9 @@ class AuditLogger:
                 "message": "No audit logs available"
             }
 
-        # Calculate statistics
-        categories = {}
-        risk_levels = {}
-        outcomes = {}
-
-        for log in self.audit_logs:
-            # Count by category
-            cat = log.category.value
-            categories[cat] = categories.get(cat, 0) + 1
-
-            # Count by risk level
-            risk = log.risk_level.value
-            risk_levels[risk] = risk_levels.get(risk, 0) + 1
-
-            # Count by outcome
-            outcome = log.outcome
-            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+        categories = store_stats["counts"]["category"]
+        risk_levels = store_stats["counts"]["risk_level"]
+        outcomes = store_stats["counts"]["outcome"]
 
         return {
             "total_logs": total_logs,
@@ -537,8 +563,12 @@ class AuditLogger:
                 "default_retention_days": 2555,  # 7 years
                 "legal_compliance": "professional_responsibility_compliant"
             },
+            "storage": {
+                "segments": store_stats["segments"],
+                "chain_head_hash": store_stats["head_hash"]
+            },
             "security_status": "operational",
-            "last_log_timestamp": max(log.timestamp for log in self.audit_logs).isoformat() if total_logs > 0 else None
+            "last_log_timestamp": datetime.fromtimestamp(store_stats["last_timestamp"], timezone.utc).isoformat()
         }
 
     def _log_system_event(self, event_type: str, user_id: str, details: Dict[str, Any]):
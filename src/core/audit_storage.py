@@ -0,0 +1,492 @@
+#!/usr/bin/env python3
+"""
+Audit Segment Store
+Append-only, hash-chained, indexed storage for legal audit events
+
+Events are written as lines to rotating segment files. Each line is
+``<sha256> <canonical JSON body>`` where the body carries the sequence
+number, timestamp, the previous event's hash and the event itself, so any
+edit, deletion or reordering breaks the chain. The chain continues across
+segment boundaries.
+
+Every segment keeps a sparse index: events are grouped into fixed-size
+blocks with their byte offset and time range, and posting lists map user,
+event type, action and resource values to the blocks that contain them.
+Sealed segments store the block table and hash-sharded posting lists in
+sidecar files and a summary (time range, counts, last hash) in the store
+manifest, so queries prune whole segments by time, load only the posting
+shards for the values they filter on, and only read the blocks those point at.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple, Union
+
+logger = logging.getLogger('audit_storage')
+
+GENESIS_HASH = "0" * 64
+HASH_LENGTH = 64
+
+MANIFEST_NAME = "manifest.json"
+
+
+def to_epoch(value: Union[datetime, float, int, None]) -> Optional[float]:
+    """Epoch seconds for a datetime (naive values are taken as UTC)"""
+    if value is None or isinstance(value, (int, float)):
+        return value
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def _posting_shard(value: str, shards: int) -> int:
+    return zlib.crc32(value.encode("utf-8")) % shards
+
+
+def _canonical_json(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+
+
+class _SegmentIndex:
+    """Sparse block index and counters for one segment"""
+
+    def __init__(self, segment_id: int, first_seq: int, indexed_fields, counted_fields):
+        self.segment_id = segment_id
+        self.first_seq = first_seq
+        self.count = 0
+        self.size_bytes = 0
+        self.min_ts: Optional[float] = None
+        self.max_ts: Optional[float] = None
+        self.last_hash = ""
+        # [offset, min_ts, max_ts] per block of ``block_size`` events
+        self.blocks: List[List[float]] = []
+        self.postings: Dict[str, Dict[str, List[int]]] = {f: {} for f in indexed_fields}
+        self.counts: Dict[str, Dict[str, int]] = {f: {} for f in counted_fields}
+
+    def add(self, offset: int, length: int, ts: float, event: Dict[str, Any],
+            event_hash: str, block_size: int):
+        block_id = self.count // block_size
+        if block_id == len(self.blocks):
+            self.blocks.append([offset, ts, ts])
+        else:
+            block = self.blocks[block_id]
+            block[1] = min(block[1], ts)
+            block[2] = max(block[2], ts)
+
+        for field, values in self.postings.items():
+            value = event.get(field)
+            if value is None:
+                continue
+            blocks = values.setdefault(str(value), [])
+            if not blocks or blocks[-1] != block_id:
+                blocks.append(block_id)
+
+        for field, counter in self.counts.items():
+            value = str(event.get(field))
+            counter[value] = counter.get(value, 0) + 1
+
+        self.min_ts = ts if self.min_ts is None else min(self.min_ts, ts)
+        self.max_ts = ts if self.max_ts is None else max(self.max_ts, ts)
+        self.count += 1
+        self.size_bytes = offset + length
+        self.last_hash = event_hash
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "segment_id": self.segment_id,
+            "first_seq": self.first_seq,
+            "count": self.count,
+            "size_bytes": self.size_bytes,
+            "min_ts": self.min_ts,
+            "max_ts": self.max_ts,
+            "last_hash": self.last_hash,
+            "counts": self.counts,
+        }
+
+    def sidecars(self, shards: int) -> Dict[str, Any]:
+        """Block table plus each field's postings split into ``shards`` files"""
+        parts: Dict[str, Any] = {"blocks": self.blocks}
+        for field, values in self.postings.items():
+            split: List[Dict[str, List[int]]] = [{} for _ in range(shards)]
+            for value, blocks in values.items():
+                split[_posting_shard(value, shards)][value] = blocks
+            for shard, postings in enumerate(split):
+                parts[f"{field}.{shard}"] = postings
+        return parts
+
+
+class AuditSegmentStore:
+    """
+    Rotating append-only segment files with a cross-segment hash chain.
+
+    ``append`` is the only write; segments are sealed once they reach
+    ``segment_max_events`` or ``segment_max_bytes``. ``query`` returns events
+    in append order, and ``verify_chain`` re-hashes every stored event.
+    """
+
+    INDEXED_FIELDS = ("user_id", "event_type", "action_performed", "resource_accessed")
+    COUNTED_FIELDS = ("category", "risk_level", "outcome")
+
+    def __init__(self, root: Union[str, Path], segment_max_events: int = 100_000,
+                 segment_max_bytes: int = 64 * 1024 * 1024, block_size: int = 256,
+                 posting_shards: int = 8, index_cache_size: int = 256, fsync: bool = False):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.segment_max_events = segment_max_events
+        self.segment_max_bytes = segment_max_bytes
+        self.block_size = block_size
+        self.posting_shards = posting_shards
+        self.index_cache_size = index_cache_size
+        self.fsync = fsync
+
+        self._lock = threading.RLock()
+        self._sealed: List[Dict[str, Any]] = []
+        self._index_cache: "OrderedDict[Tuple[int, str], Any]" = OrderedDict()
+        self._writer = None
+        self._next_seq = 0
+        self._last_hash = GENESIS_HASH
+
+        self._load()
+
+    # ------------------------------------------------------------------
+    # Paths and recovery
+    # ------------------------------------------------------------------
+
+    def _segment_path(self, segment_id: int) -> Path:
+        return self.root / f"segment_{segment_id:08d}.log"
+
+    def _sidecar_path(self, segment_id: int, part: str) -> Path:
+        return self.root / f"segment_{segment_id:08d}.{part}.idx.json"
+
+    def _new_index(self, segment_id: int, first_seq: int) -> _SegmentIndex:
+        return _SegmentIndex(segment_id, first_seq, self.INDEXED_FIELDS, self.COUNTED_FIELDS)
+
+    def _load(self):
+        manifest_path = self.root / MANIFEST_NAME
+        if manifest_path.exists():
+            with manifest_path.open("r", encoding="utf-8") as f:
+                self._sealed = json.load(f)["segments"]
+
+        if self._sealed:
+            last = self._sealed[-1]
+            self._next_seq = last["first_seq"] + last["count"]
+            self._last_hash = last["last_hash"]
+            segment_id = last["segment_id"] + 1
+        else:
+            segment_id = 0
+
+        self._active = self._new_index(segment_id, self._next_seq)
+        path = self._segment_path(segment_id)
+        if path.exists():
+            self._recover_active(path)
+
+    def _recover_active(self, path: Path):
+        """Rebuild the active segment's index, dropping a torn final write"""
+        offset = 0
+        with path.open("rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                parsed = self._parse_line(line)
+                if parsed is None:
+                    # Kept in place so verify_chain reports it
+                    logger.error(f"Unreadable audit record at byte {offset} of {path.name}")
+                    self._active.size_bytes = offset + len(line)
+                else:
+                    event_hash, body = parsed
+                    self._active.add(offset, len(line), body["ts"], body["event"],
+                                     event_hash, self.block_size)
+                    self._next_seq = body["seq"] + 1
+                    self._last_hash = event_hash
+                offset += len(line)
+
+        if path.stat().st_size != offset:
+            logger.warning(f"Truncating torn write at byte {offset} of {path.name}")
+            with path.open("r+b") as f:
+                f.truncate(offset)
+
+    @staticmethod
+    def _parse_line(line: bytes) -> Optional[Tuple[str, Dict[str, Any]]]:
+        try:
+            return line[:HASH_LENGTH].decode("ascii"), json.loads(line[HASH_LENGTH + 1:])
+        except (ValueError, UnicodeDecodeError):
+            return None
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def append(self, event: Dict[str, Any], timestamp: Union[datetime, float]) -> str:
+        """Append an event and return its chain hash"""
+        ts = to_epoch(timestamp)
+        with self._lock:
+            body = _canonical_json({
+                "seq": self._next_seq,
+                "ts": ts,
+                "prev": self._last_hash,
+                "event": event,
+            }).encode("utf-8")
+            event_hash = hashlib.sha256(body).hexdigest()
+            line = event_hash.encode("ascii") + b" " + body + b"\n"
+
+            if self._writer is None:
+                self._writer = self._segment_path(self._active.segment_id).open("ab")
+            offset = self._active.size_bytes
+            self._writer.write(line)
+            self._writer.flush()
+            if self.fsync:
+                os.fsync(self._writer.fileno())
+
+            self._active.add(offset, len(line), ts, event, event_hash, self.block_size)
+            self._next_seq += 1
+            self._last_hash = event_hash
+
+            if (self._active.count >= self.segment_max_events
+                    or self._active.size_bytes >= self.segment_max_bytes):
+                self._seal_active()
+            return event_hash
+
+    def _seal_active(self):
+        if self._writer is not None:
+            os.fsync(self._writer.fileno())
+            self._writer.close()
+            self._writer = None
+
+        active = self._active
+        for part, data in active.sidecars(self.posting_shards).items():
+            self._write_json(self._sidecar_path(active.segment_id, part), data)
+        self._sealed.append(active.summary())
+        self._write_json(self.root / MANIFEST_NAME, {"segments": self._sealed})
+        self._active = self._new_index(active.segment_id + 1, self._next_seq)
+
+    @staticmethod
+    def _write_json(path: Path, data: Any):
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def close(self):
+        with self._lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def _load_sidecar(self, segment_id: int, part: str) -> Any:
+        key = (segment_id, part)
+        with self._lock:
+            cached = self._index_cache.get(key)
+            if cached is not None:
+                self._index_cache.move_to_end(key)
+                return cached
+        with self._sidecar_path(segment_id, part).open("r", encoding="utf-8") as f:
+            sidecar = json.load(f)
+        with self._lock:
+            self._index_cache[key] = sidecar
+            while len(self._index_cache) > self.index_cache_size:
+                self._index_cache.popitem(last=False)
+        return sidecar
+
+    def _snapshot(self, fields) -> List[Tuple[Dict[str, Any], Optional[Dict[str, Any]]]]:
+        """
+        Segments to search: sealed summaries (indexes load lazily), then a
+        consistent copy of the active segment's blocks and the posting lists
+        for ``fields``.
+        """
+        with self._lock:
+            segments: List[Tuple[Dict[str, Any], Optional[Dict[str, Any]]]] = [
+                (summary, None) for summary in self._sealed
+            ]
+            active = self._active
+            if active.count:
+                segments.append((active.summary(), {
+                    "blocks": [list(block) for block in active.blocks],
+                    "postings": {
+                        field: {value: list(active.postings[field].get(value, []))}
+                        for field, value in fields.items()
+                    },
+                }))
+            return segments
+
+    def _candidate_blocks(self, index: Dict[str, Any], start_ts: Optional[float],
+                          end_ts: Optional[float], indexed: Dict[str, str]) -> List[int]:
+        blocks = index["blocks"]
+        candidates: Optional[Set[int]] = None
+        for field, value in indexed.items():
+            posting = index["postings"][field].get(value)
+            if not posting:
+                return []
+            candidates = set(posting) if candidates is None else candidates & set(posting)
+            if not candidates:
+                return []
+
+        block_ids = sorted(candidates) if candidates is not None else range(len(blocks))
+        return [
+            block_id for block_id in block_ids
+            if (start_ts is None or blocks[block_id][2] >= start_ts)
+            and (end_ts is None or blocks[block_id][1] <= end_ts)
+        ]
+
+    def query(self, start: Union[datetime, float, None] = None, end: Union[datetime, float, None] = None,
+              filters: Optional[Dict[str, Any]] = None, offset: int = 0,
+              limit: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Yield events with ``start <= timestamp <= end`` whose fields equal
+        ``filters``, in append order. Filters on indexed fields narrow the
+        blocks read; any other field is checked on the decoded event.
+        """
+        start_ts, end_ts = to_epoch(start), to_epoch(end)
+        filters = {k: str(v) for k, v in (filters or {}).items() if v is not None}
+        indexed = {k: v for k, v in filters.items() if k in self.INDEXED_FIELDS}
+        skipped = 0
+        returned = 0
+        if limit is not None and limit <= 0:
+            return
+
+        for summary, index in self._snapshot(indexed):
+            if not summary["count"]:
+                continue
+            if start_ts is not None and summary["max_ts"] < start_ts:
+                continue
+            if end_ts is not None and summary["min_ts"] > end_ts:
+                continue
+            if any(summary["counts"][f].get(v, 0) == 0 for f, v in filters.items() if f in self.COUNTED_FIELDS):
+                continue
+
+            if index is None:
+                segment_id = summary["segment_id"]
+                index = {
+                    "blocks": self._load_sidecar(segment_id, "blocks"),
+                    "postings": {
+                        field: self._load_sidecar(segment_id, f"{field}.{_posting_shard(value, self.posting_shards)}")
+                        for field, value in indexed.items()
+                    },
+                }
+            blocks = index["blocks"]
+
+            path = self._segment_path(summary["segment_id"])
+            with path.open("rb") as f:
+                for block_id in self._candidate_blocks(index, start_ts, end_ts, indexed):
+                    block_start = int(blocks[block_id][0])
+                    block_end = int(blocks[block_id + 1][0]) if block_id + 1 < len(blocks) else summary["size_bytes"]
+                    f.seek(block_start)
+                    for line in f.read(block_end - block_start).splitlines():
+                        parsed = self._parse_line(line)
+                        if parsed is None:
+                            continue
+                        body = parsed[1]
+                        ts = body["ts"]
+                        if (start_ts is not None and ts < start_ts) or (end_ts is not None and ts > end_ts):
+                            continue
+                        event = body["event"]
+                        if any(str(event.get(k)) != v for k, v in filters.items()):
+                            continue
+                        if skipped < offset:
+                            skipped += 1
+                            continue
+                        yield event
+                        returned += 1
+                        if limit is not None and returned >= limit:
+                            return
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Event totals and per-field counts, read from segment summaries"""
+        with self._lock:
+            summaries = self._sealed + ([self._active.summary()] if self._active.count else [])
+            counts: Dict[str, Dict[str, int]] = {f: {} for f in self.COUNTED_FIELDS}
+            for summary in summaries:
+                for field, values in summary["counts"].items():
+                    for value, n in values.items():
+                        counts[field][value] = counts[field].get(value, 0) + n
+            max_ts = max((s["max_ts"] for s in summaries if s["max_ts"] is not None), default=None)
+            return {
+                "total_events": sum(s["count"] for s in summaries),
+                "segments": len(summaries),
+                "counts": counts,
+                "last_timestamp": max_ts,
+                "head_hash": self._last_hash,
+            }
+
+    @property
+    def head_hash(self) -> str:
+        """Hash of the latest event; anchoring it externally also detects tail truncation"""
+        return self._last_hash
+
+    # ------------------------------------------------------------------
+    # Verification
+    # ------------------------------------------------------------------
+
+    def verify_chain(self, max_errors: int = 100) -> Dict[str, Any]:
+        """
+        Re-hash every stored event and check sequence numbers, chain links and
+        sealed segment summaries. After a break the walk resynchronises on the
+        stored hash so every damaged region is reported.
+        """
+        with self._lock:
+            if self._writer is not None:
+                self._writer.flush()
+            segments = [(s, True) for s in self._sealed]
+            segments.append((self._active.summary(), False))
+
+        errors: List[Dict[str, Any]] = []
+        expected_prev = GENESIS_HASH
+        expected_seq = 0
+        verified = 0
+
+        def fail(segment_id: int, seq: Optional[int], message: str):
+            if len(errors) < max_errors:
+                errors.append({"segment_id": segment_id, "seq": seq, "error": message})
+
+        for summary, sealed in segments:
+            segment_id = summary["segment_id"]
+            path = self._segment_path(segment_id)
+            if not path.exists():
+                if sealed or summary["count"]:
+                    fail(segment_id, None, "segment file is missing")
+                continue
+
+            count = 0
+            with path.open("rb") as f:
+                for line in f:
+                    parsed = self._parse_line(line)
+                    if parsed is None:
+                        fail(segment_id, expected_seq, "unreadable record")
+                        continue
+                    stored_hash, body = parsed
+                    seq = body.get("seq")
+                    actual_hash = hashlib.sha256(line[HASH_LENGTH + 1:].rstrip(b"\n")).hexdigest()
+                    if actual_hash != stored_hash:
+                        fail(segment_id, seq, "record hash mismatch (event modified)")
+                    if body.get("prev") != expected_prev:
+                        fail(segment_id, seq, "chain link broken (event removed, inserted or reordered)")
+                    if seq != expected_seq:
+                        fail(segment_id, seq, f"sequence gap: expected {expected_seq}")
+                    expected_prev = stored_hash
+                    expected_seq = (seq if isinstance(seq, int) else expected_seq) + 1
+                    count += 1
+                    verified += 1
+
+            if sealed and (count != summary["count"] or expected_prev != summary["last_hash"]):
+                fail(segment_id, None, "segment does not match its sealed summary (truncated or rewritten)")
+
+        return {
+            "valid": not errors,
+            "events_verified": verified,
+            "segments_verified": len(segments),
+            "head_hash": expected_prev,
+            "errors": errors,
+            "verified_at": datetime.now(timezone.utc).isoformat(),
+        }
@@ -0,0 +1,453 @@
+#!/usr/bin/env python3
+"""
+Incremental Backup Repository
+Legal AI System - Content-Addressed, Deduplicating Backup Storage
+
+Files are split into content-defined chunks and each chunk is stored once,
+named by its SHA-256, in a shared chunk store. A snapshot is a small
+manifest listing every file with its size, mtime, content hash and chunk
+list. Files whose size and mtime match the previous snapshot of the same
+job are carried forward without being read, so a run only reads, hashes
+and writes what changed. Snapshot runs, pruning and garbage collection take
+an exclusive lock on the repository, so they also exclude each other across
+processes.
+"""
+
+import fcntl
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Union
+
+import numpy as np
+
+logger = logging.getLogger('backup_repository')
+
+MIN_CHUNK_SIZE = 256 * 1024
+AVG_CHUNK_SIZE = 1024 * 1024
+MAX_CHUNK_SIZE = 4 * 1024 * 1024
+READ_SIZE = 4 * 1024 * 1024
+
+_WINDOW = 32
+# Fixed table so chunk boundaries (and therefore dedup) are stable across runs
+_ROLLSUM_TABLE = np.random.default_rng(0x5EED).integers(0, 2 ** 32, 256, dtype=np.uint32)
+
+_RAW = b"r"
+_ZLIB = b"z"
+
+
+class BackupIntegrityError(RuntimeError):
+    """Raised when stored backup data is missing or does not match its hash"""
+
+
+def _window_hashes(data: np.ndarray) -> np.ndarray:
+    """
+    Rolling sum of random per-byte values over the ``_WINDOW`` bytes ending
+    at every position (modulo 2**32), computed from one prefix sum.
+    """
+    prefix = np.cumsum(_ROLLSUM_TABLE[data], dtype=np.uint32)
+    hashes = prefix.copy()
+    hashes[_WINDOW:] -= prefix[:-_WINDOW]
+    return hashes
+
+
+def iter_chunks(stream: BinaryIO, min_size: int = MIN_CHUNK_SIZE, avg_size: int = AVG_CHUNK_SIZE,
+                max_size: int = MAX_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Split a stream into content-defined chunks. A boundary falls after any
+    byte whose window hash has its low bits clear, subject to the min/max
+    sizes. A boundary depends only on bytes inside its own chunk, so chunks
+    do not depend on read sizes and an edit only changes the chunks around it.
+    """
+    mask = np.uint32(avg_size - 1)
+    pending = b""
+    eof = False
+    while not eof:
+        data = stream.read(READ_SIZE)
+        eof = not data
+        buf = pending + data
+        if not buf:
+            return
+
+        # Candidate chunk ends for the whole buffer. ``buf`` always starts at
+        # a chunk start and cuts are never placed within ``min_size`` of one,
+        # so every window that matters lies inside its own chunk.
+        view = np.frombuffer(buf, dtype=np.uint8)
+        ends = np.flatnonzero((_window_hashes(view) & mask) == 0) + 1
+
+        start = 0
+        while True:
+            remaining = len(buf) - start
+            if remaining == 0 or (remaining < max_size and not eof):
+                break
+            i = int(np.searchsorted(ends, start + min_size))
+            if i < len(ends) and ends[i] <= start + max_size:
+                end = int(ends[i])
+            else:
+                end = start + min(remaining, max_size)
+            yield buf[start:end]
+            start = end
+        pending = buf[start:]
+
+
+@dataclass
+class SnapshotStats:
+    """Outcome of one snapshot run"""
+    snapshot_id: str
+    manifest_path: str
+    files: int
+    total_bytes: int
+    files_changed: int
+    files_reused: int
+    chunks_new: int
+    chunks_deduplicated: int
+    bytes_read: int
+    bytes_written: int
+
+
+class BackupRepository:
+    """
+    Chunk store plus snapshot manifests under one directory:
+
+        chunks/<2 hex>/<sha256>        zlib-compressed or raw chunk data
+        snapshots/<snapshot_id>.json.gz
+        snapshots/<snapshot_id>.head.json   manifest without its file list
+        lock
+    """
+
+    def __init__(self, root: Union[str, Path]):
+        self.root = Path(root)
+        self.chunks_dir = self.root / "chunks"
+        self.snapshots_dir = self.root / "snapshots"
+        self.chunks_dir.mkdir(parents=True, exist_ok=True)
+        self.snapshots_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._headers: Dict[str, Dict[str, Any]] = {}
+
+    @contextmanager
+    def _repository_lock(self) -> Iterator[None]:
+        """Exclusive lock on the repository, across threads and processes"""
+        with self._lock:
+            with open(self.root / "lock", "a+b") as f:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+                yield
+
+    # ------------------------------------------------------------------
+    # Chunk store
+    # ------------------------------------------------------------------
+
+    def _chunk_path(self, digest: str) -> Path:
+        return self.chunks_dir / digest[:2] / digest
+
+    def _put_chunk(self, digest: str, data: bytes, compress: bool) -> int:
+        """Store a chunk if it is new; returns bytes written (0 when deduplicated)"""
+        path = self._chunk_path(digest)
+        try:
+            # Refresh the mtime so garbage collection's grace period covers
+            # chunks reused by a run that has not written its manifest yet
+            os.utime(path)
+            return 0
+        except FileNotFoundError:
+            pass
+        payload = _RAW + data
+        if compress:
+            compressed = zlib.compress(data, 1)
+            if len(compressed) < len(data) * 0.95:
+                payload = _ZLIB + compressed
+        path.parent.mkdir(exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+        return len(payload)
+
+    def _get_chunk(self, digest: str) -> bytes:
+        path = self._chunk_path(digest)
+        try:
+            payload = path.read_bytes()
+        except FileNotFoundError:
+            raise BackupIntegrityError(f"Missing chunk {digest}")
+        data = zlib.decompress(payload[1:]) if payload[:1] == _ZLIB else payload[1:]
+        if hashlib.sha256(data).hexdigest() != digest:
+            raise BackupIntegrityError(f"Chunk {digest} does not match its hash")
+        return data
+
+    # ------------------------------------------------------------------
+    # Snapshots
+    # ------------------------------------------------------------------
+
+    def _manifest_path(self, snapshot_id: str) -> Path:
+        return self.snapshots_dir / f"{snapshot_id}.json.gz"
+
+    def load_snapshot(self, snapshot_id: str) -> Dict[str, Any]:
+        path = self._manifest_path(snapshot_id)
+        if not path.exists():
+            raise ValueError(f"Snapshot not found: {snapshot_id}")
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _header_path(self, snapshot_id: str) -> Path:
+        return self.snapshots_dir / f"{snapshot_id}.head.json"
+
+    def _write_header(self, header: Dict[str, Any]):
+        path = self._header_path(header["snapshot_id"])
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(header, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+        self._headers[header["snapshot_id"]] = header
+
+    def _load_header(self, snapshot_id: str) -> Dict[str, Any]:
+        header = self._headers.get(snapshot_id)
+        if header is not None:
+            return header
+        try:
+            with open(self._header_path(snapshot_id), "r", encoding="utf-8") as f:
+                header = json.load(f)
+        except FileNotFoundError:
+            # Written before headers existed: derive it from the manifest once
+            header = self.load_snapshot(snapshot_id)
+            header.pop("files", None)
+            self._write_header(header)
+            return header
+        self._headers[snapshot_id] = header
+        return header
+
+    def list_snapshots(self, job_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Snapshot headers (no file lists), oldest first"""
+        headers = []
+        snapshot_ids = set()
+        for path in self.snapshots_dir.glob("*.json.gz"):
+            snapshot_id = path.name[:-len(".json.gz")]
+            snapshot_ids.add(snapshot_id)
+            header = self._load_header(snapshot_id)
+            if job_id is None or header.get("job_id") == job_id:
+                headers.append(dict(header))
+        # Forget snapshots pruned by another process
+        for snapshot_id in set(self._headers) - snapshot_ids:
+            del self._headers[snapshot_id]
+        return sorted(headers, key=lambda m: (m["created_at"], m["snapshot_id"]))
+
+    def _iter_source_files(self, source_paths: Iterable[str]) -> Iterator[tuple]:
+        """(manifest path, filesystem path) using the same layout as a copytree backup"""
+        for source_path in source_paths:
+            source = Path(source_path)
+            if source.is_file():
+                yield source.name, source
+            elif source.is_dir():
+                for file_path in sorted(source.rglob('*')):
+                    if file_path.is_file() and not file_path.is_symlink():
+                        yield f"{source.name}/{file_path.relative_to(source).as_posix()}", file_path
+
+    def create_snapshot(self, source_paths: List[str], snapshot_id: Optional[str] = None,
+                        job_id: Optional[str] = None, compress: bool = True) -> SnapshotStats:
+        """Back up ``source_paths``, reusing unchanged entries from the job's last snapshot"""
+        snapshot_id = snapshot_id or f"snapshot_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}"
+        with self._repository_lock():
+            if self._manifest_path(snapshot_id).exists():
+                raise ValueError(f"Snapshot already exists: {snapshot_id}")
+
+            previous = self.list_snapshots(job_id)
+            parent_id = previous[-1]["snapshot_id"] if previous else None
+            parent_files = {
+                entry["path"]: entry for entry in self.load_snapshot(parent_id)["files"]
+            } if parent_id else {}
+
+            files = []
+            counters = dict(files_changed=0, files_reused=0, chunks_new=0,
+                            chunks_deduplicated=0, bytes_read=0, bytes_written=0)
+            total_bytes = 0
+
+            for rel_path, file_path in self._iter_source_files(source_paths):
+                stat = file_path.stat()
+                total_bytes += stat.st_size
+                cached = parent_files.get(rel_path)
+                if cached and cached["size"] == stat.st_size and cached["mtime_ns"] == stat.st_mtime_ns:
+                    files.append(cached)
+                    counters["files_reused"] += 1
+                    continue
+
+                file_hash = hashlib.sha256()
+                chunks = []
+                with open(file_path, "rb") as f:
+                    for chunk in iter_chunks(f):
+                        digest = hashlib.sha256(chunk).hexdigest()
+                        written = self._put_chunk(digest, chunk, compress)
+                        counters["chunks_new" if written else "chunks_deduplicated"] += 1
+                        counters["bytes_written"] += written
+                        counters["bytes_read"] += len(chunk)
+                        file_hash.update(chunk)
+                        chunks.append(digest)
+
+                files.append({
+                    "path": rel_path,
+                    "size": stat.st_size,
+                    "mtime_ns": stat.st_mtime_ns,
+                    "mode": stat.st_mode & 0o777,
+                    "sha256": file_hash.hexdigest(),
+                    "chunks": chunks
+                })
+                counters["files_changed"] += 1
+
+            manifest = {
+                "snapshot_id": snapshot_id,
+                "job_id": job_id,
+                "parent": parent_id,
+                "created_at": datetime.now().isoformat(),
+                "sources": list(source_paths),
+                "file_count": len(files),
+                "total_bytes": total_bytes,
+                "files": files
+            }
+            manifest_path = self._manifest_path(snapshot_id)
+            tmp_path = manifest_path.with_name(manifest_path.name + ".tmp")
+            with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+                json.dump(manifest, f, separators=(",", ":"))
+            os.replace(tmp_path, manifest_path)
+            self._write_header({key: value for key, value in manifest.items() if key != "files"})
+
+        return SnapshotStats(
+            snapshot_id=snapshot_id,
+            manifest_path=str(manifest_path),
+            files=len(files),
+            total_bytes=total_bytes,
+            **counters
+        )
+
+    # ------------------------------------------------------------------
+    # Restore and verification
+    # ------------------------------------------------------------------
+
+    def restore_snapshot(self, snapshot_id: str, target_path: Union[str, Path],
+                         paths: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Write a snapshot's files under ``target_path``, checking each file's hash"""
+        manifest = self.load_snapshot(snapshot_id)
+        target = Path(target_path)
+        selected = set(paths) if paths else None
+        restored = 0
+        restored_bytes = 0
+
+        for entry in manifest["files"]:
+            if selected is not None and entry["path"] not in selected:
+                continue
+            dest = target / entry["path"]
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            file_hash = hashlib.sha256()
+            with open(dest, "wb") as f:
+                for digest in entry["chunks"]:
+                    data = self._get_chunk(digest)
+                    file_hash.update(data)
+                    f.write(data)
+            if file_hash.hexdigest() != entry["sha256"]:
+                raise BackupIntegrityError(f"Restored file {entry['path']} does not match its hash")
+            os.chmod(dest, entry["mode"])
+            os.utime(dest, ns=(entry["mtime_ns"], entry["mtime_ns"]))
+            restored += 1
+            restored_bytes += entry["size"]
+
+        return {"snapshot_id": snapshot_id, "files_restored": restored, "bytes_restored": restored_bytes}
+
+    def verify(self, snapshot_id: Optional[str] = None, read_data: bool = True) -> Dict[str, Any]:
+        """
+        Check that every chunk referenced by one snapshot (or all of them)
+        exists and, with ``read_data``, decompresses to its hash. Shared
+        chunks are checked once.
+        """
+        snapshot_ids = [snapshot_id] if snapshot_id else [s["snapshot_id"] for s in self.list_snapshots()]
+        checked = set()
+        missing = []
+        corrupt = []
+        files = 0
+
+        for sid in snapshot_ids:
+            for entry in self.load_snapshot(sid)["files"]:
+                files += 1
+                for digest in entry["chunks"]:
+                    if digest in checked:
+                        continue
+                    checked.add(digest)
+                    if not self._chunk_path(digest).exists():
+                        missing.append(digest)
+                        continue
+                    if read_data:
+                        try:
+                            self._get_chunk(digest)
+                        except (BackupIntegrityError, zlib.error):
+                            corrupt.append(digest)
+
+        return {
+            "valid": not missing and not corrupt,
+            "snapshots_checked": len(snapshot_ids),
+            "files_checked": files,
+            "chunks_checked": len(checked),
+            "missing_chunks": missing,
+            "corrupt_chunks": corrupt
+        }
+
+    # ------------------------------------------------------------------
+    # Retention
+    # ------------------------------------------------------------------
+
+    def prune(self, older_than: datetime, job_id: Optional[str] = None, keep_last: int = 1) -> List[str]:
+        """Delete snapshot manifests created before ``older_than``, always keeping the newest ``keep_last``"""
+        with self._repository_lock():
+            snapshots = self.list_snapshots(job_id)
+            candidates = snapshots[:-keep_last] if keep_last else snapshots
+            removed = []
+            for snapshot in candidates:
+                if datetime.fromisoformat(snapshot["created_at"]) < older_than:
+                    self._manifest_path(snapshot["snapshot_id"]).unlink()
+                    self._header_path(snapshot["snapshot_id"]).unlink(missing_ok=True)
+                    self._headers.pop(snapshot["snapshot_id"], None)
+                    removed.append(snapshot["snapshot_id"])
+            return removed
+
+    def garbage_collect(self, grace_seconds: float = 3600) -> Dict[str, int]:
+        """
+        Delete chunks no remaining snapshot refers to. Runs hold the
+        repository lock, and chunks written or reused within
+        ``grace_seconds`` are also kept, in case the lock is not shared (e.g.
+        on some network filesystems).
+        """
+        with self._repository_lock():
+            referenced = set()
+            for path in self.snapshots_dir.glob("*.json.gz"):
+                for entry in self.load_snapshot(path.name[:-len(".json.gz")])["files"]:
+                    referenced.update(entry["chunks"])
+
+            cutoff = time.time() - grace_seconds
+            deleted = 0
+            freed = 0
+            kept = 0
+            for chunk_path in self.chunks_dir.glob("*/*"):
+                if chunk_path.name in referenced:
+                    kept += 1
+                    continue
+                stat = chunk_path.stat()
+                if stat.st_mtime > cutoff:
+                    kept += 1
+                    continue
+                chunk_path.unlink()
+                deleted += 1
+                freed += stat.st_size
+
+        if deleted:
+            logger.info(f"Garbage collected {deleted} chunks ({freed} bytes) from {self.root}")
+        return {"chunks_deleted": deleted, "bytes_freed": freed, "chunks_kept": kept}
+
+    def get_storage_stats(self) -> Dict[str, int]:
+        chunk_files = list(self.chunks_dir.glob("*/*"))
+        return {
+            "snapshots": len(list(self.snapshots_dir.glob("*.json.gz"))),
+            "chunks": len(chunk_files),
+            "stored_bytes": sum(p.stat().st_size for p in chunk_files)
+        }
@@ -25,6 +25,8 @@ import threading
 import schedule
 import time
 
+from .backup_repository import BackupRepository
+
 # Setup logging
 logger = logging.getLogger('backup_system')
 
@@ -92,6 +94,7 @@ class BackupSystem:
         self.jobs: Dict[str, BackupJob] = {}
         self.backup_history: List[BackupResult] = []
         self.running_backups: Dict[str, threading.Thread] = {}
+        self.repositories: Dict[str, BackupRepository] = {}
 
         # Initialize backup directories
         self._initialize_backup_structure()
@@ -184,7 +187,7 @@ class BackupSystem:
 
     def _execute_backup(self, job: BackupJob) -> BackupResult:
         """Execute the actual backup operation"""
-        backup_id = f"backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        backup_id = f"backup_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}"
         start_time = datetime.now()
 
         try:
@@ -287,46 +290,29 @@ class BackupSystem:
         except Exception as e:
             raise RuntimeError(f"Database backup failed: {e}")
 
+    def _get_repository(self, destination_path: str) -> BackupRepository:
+        """Content-addressed repository shared by all file jobs with this destination"""
+        if destination_path not in self.repositories:
+            self.repositories[destination_path] = BackupRepository(Path(destination_path) / "repository")
+        return self.repositories[destination_path]
+
     def _backup_files(self, job: BackupJob, backup_path: Path, backup_id: str) -> BackupResult:
-        """Backup file system files"""
-        backup_path.mkdir(parents=True, exist_ok=True)
+        """Incremental file backup into the deduplicating chunk repository"""
         start_time = datetime.now()
-        files_backed_up = 0
-        total_size = 0
 
         try:
-            for source_path in job.source_paths:
-                source = Path(source_path)
-
-                if source.is_file():
-                    dest_file = backup_path / source.name
-                    shutil.copy2(source, dest_file)
-                    files_backed_up += 1
-                    total_size += dest_file.stat().st_size
-
-                elif source.is_dir():
-                    dest_dir = backup_path / source.name
-                    shutil.copytree(source, dest_dir)
-
-                    # Count files and calculate size
-                    for file_path in dest_dir.rglob('*'):
-                        if file_path.is_file():
-                            files_backed_up += 1
-                            total_size += file_path.stat().st_size
-
-            # Compress if requested
-            compressed_size = total_size
-            final_path = str(backup_path)
-
-            if job.compression:
-                compressed_path = f"{backup_path}.tar.gz"
-                self._compress_directory(backup_path, compressed_path)
-                shutil.rmtree(backup_path)
-                final_path = compressed_path
-                compressed_size = Path(compressed_path).stat().st_size
+            repository = self._get_repository(job.destination_path)
+            snapshot = repository.create_snapshot(
+                job.source_paths,
+                snapshot_id=backup_id,
+                job_id=job.job_id,
+                compress=job.compression
+            )
 
-            # Calculate checksum
-            checksum = self._calculate_checksum(final_path)
+            self.logger.info(
+                f"Snapshot {backup_id}: {snapshot.files_changed} changed, {snapshot.files_reused} unchanged, "
+                f"{snapshot.chunks_new} new chunks, {snapshot.bytes_written} bytes written"
+            )
 
             return BackupResult(
                 job_id=job.job_id,
@@ -334,16 +320,32 @@ class BackupSystem:
                 start_time=start_time,
                 end_time=datetime.now(),
                 status=BackupStatus.COMPLETED,
-                files_backed_up=files_backed_up,
-                total_size=total_size,
-                compressed_size=compressed_size,
-                backup_path=final_path,
-                checksum=checksum
+                files_backed_up=snapshot.files,
+                total_size=snapshot.total_bytes,
+                compressed_size=snapshot.bytes_written,
+                backup_path=snapshot.manifest_path,
+                checksum=self._calculate_checksum(snapshot.manifest_path)
             )
 
         except Exception as e:
             raise RuntimeError(f"File backup failed: {e}")
 
+    def restore_backup(self, job_id: str, backup_id: str, target_path: str,
+                       paths: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Restore a file backup snapshot (optionally only some paths) to target_path"""
+        if job_id not in self.jobs:
+            raise ValueError(f"Backup job not found: {job_id}")
+        repository = self._get_repository(self.jobs[job_id].destination_path)
+        return repository.restore_snapshot(backup_id, target_path, paths)
+
+    def verify_backup(self, job_id: str, backup_id: Optional[str] = None,
+                      read_data: bool = True) -> Dict[str, Any]:
+        """Verify that the chunks behind one snapshot (or all of them) are present and intact"""
+        if job_id not in self.jobs:
+            raise ValueError(f"Backup job not found: {job_id}")
+        repository = self._get_repository(self.jobs[job_id].destination_path)
+        return repository.verify(backup_id, read_data=read_data)
+
     def _backup_config(self, job: BackupJob, backup_path: Path, backup_id: str) -> BackupResult:
         """Backup configuration files"""
         backup_path.mkdir(parents=True, exist_ok=True)
@@ -430,10 +432,20 @@ class BackupSystem:
         """Apply retention policy to remove old backups"""
         cutoff_date = datetime.now() - timedelta(days=job.retention_days)
 
-        # Remove old backups
+        # Expire this job's snapshots, then drop chunks nothing refers to any more
         backup_dir = Path(job.destination_path)
+        if (backup_dir / "repository").exists():
+            repository = self._get_repository(job.destination_path)
+            removed = repository.prune(cutoff_date, job_id=job.job_id, keep_last=1)
+            if removed:
+                self.logger.info(f"Pruned {len(removed)} snapshots for job {job.job_id}")
+                repository.garbage_collect()
+
+        # Remove old backups
         if backup_dir.exists():
             for backup_item in backup_dir.iterdir():
+                if backup_item.name == "repository":
+                    continue
                 try:
                     # Check if backup is older than retention period
                     if backup_item.stat().st_mtime < cutoff_date.timestamp():
@@ -0,0 +1,134 @@
+"""
+Encrypted, bounded on-disk cache.
+
+Entries are Fernet tokens (the scheme e-filing credentials and migrated
+documents are stored with), one file per key, so cached document content is
+never at rest in plaintext. The cache is bounded two ways: entries older than
+``ttl_seconds`` are never served, and ``evict`` removes them and then the
+oldest remaining entries until the cache fits in ``max_bytes``.
+
+Caching is opt-in: a cache needs both a directory and a key, e.g. from
+``EncryptedCacheConfig.from_env("OCR_CACHE")``.
+"""
+
+import os
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+from cryptography.fernet import Fernet, InvalidToken
+
+ENTRY_SUFFIX = ".bin"
+
+
+@dataclass
+class EncryptedCacheConfig:
+    """Where a cache lives, its Fernet key and its bounds."""
+    root: str
+    key: Union[str, bytes]
+    max_bytes: int = 512 * 1024 * 1024
+    ttl_seconds: float = 7 * 24 * 3600
+    eviction_interval: float = 300.0
+
+    @classmethod
+    def from_env(cls, prefix: str) -> Optional["EncryptedCacheConfig"]:
+        """
+        ``<prefix>_DIR`` and ``<prefix>_KEY`` enable the cache; ``<prefix>_MAX_MB``
+        and ``<prefix>_TTL_HOURS`` override its bounds. None when not enabled.
+        """
+        root = os.getenv(f"{prefix}_DIR")
+        key = os.getenv(f"{prefix}_KEY")
+        if not root or not key:
+            return None
+        config = cls(root=root, key=key)
+        if os.getenv(f"{prefix}_MAX_MB"):
+            config.max_bytes = int(float(os.environ[f"{prefix}_MAX_MB"]) * 1024 * 1024)
+        if os.getenv(f"{prefix}_TTL_HOURS"):
+            config.ttl_seconds = float(os.environ[f"{prefix}_TTL_HOURS"]) * 3600
+        return config
+
+
+class EncryptedFileCache:
+    """Fernet-encrypted byte entries by key, with TTL and size eviction."""
+
+    def __init__(self, config: EncryptedCacheConfig):
+        self.config = config
+        self.root = Path(config.root)
+        self._fernet = Fernet(config.key)
+        self._eviction_lock = threading.Lock()
+        self._last_eviction: Optional[float] = None
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}{ENTRY_SUFFIX}"
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            token = path.read_bytes()
+        except FileNotFoundError:
+            return None
+        try:
+            return self._fernet.decrypt(token, ttl=max(1, int(self.config.ttl_seconds)))
+        except InvalidToken:
+            # Expired, or written under another key
+            self._remove(path)
+            return None
+
+    def put(self, key: str, data: bytes) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Writers may race on the same key; the rename keeps entries whole
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(self._fernet.encrypt(data))
+        os.replace(tmp_path, path)
+
+    def evict(self, now: Optional[float] = None) -> Dict[str, int]:
+        """Remove expired entries, then the oldest until the cache fits in ``max_bytes``."""
+        now = time.time() if now is None else now
+        oldest_allowed = now - self.config.ttl_seconds
+        entries = []
+        expired = 0
+        for path in self.root.glob(f"*/*{ENTRY_SUFFIX}"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            if stat.st_mtime < oldest_allowed:
+                expired += self._remove(path)
+            else:
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.config.max_bytes:
+                break
+            evicted += self._remove(path)
+            total -= size
+        return {"expired": expired, "evicted": evicted, "bytes": total}
+
+    def evict_if_due(self) -> Optional[Dict[str, int]]:
+        """Run ``evict`` at most once per ``eviction_interval``, skipping if one is running."""
+        if not self._eviction_lock.acquire(blocking=False):
+            return None
+        try:
+            now = time.monotonic()
+            if self._last_eviction is not None and now - self._last_eviction < self.config.eviction_interval:
+                return None
+            self._last_eviction = now
+            return self.evict()
+        finally:
+            self._eviction_lock.release()
+
+    @staticmethod
+    def _remove(path: Path) -> int:
+        try:
+            path.unlink()
+            return 1
+        except FileNotFoundError:
+            return 0
@@ -0,0 +1,388 @@
+"""
+Serialize-once WebSocket fan-out hub
+
+Publishers hand a message to the hub once; it is serialized a single time,
+looked up in a topic -> connections index and appended to each subscriber's
+bounded outbound queue. Every connection has its own writer task, so a slow
+client only ever delays itself. When a queue is full the connection's
+slow-consumer policy decides what happens:
+
+- drop: discard the oldest queued message and keep the newest
+- coalesce: replace a queued message with the same coalesce key (e.g. the
+  latest dashboard snapshot supersedes the previous one); otherwise drop
+  the oldest message
+- disconnect: close the connection
+
+The hub is transport-agnostic: a connection is registered with a ``send``
+coroutine function (``websocket.send_text`` for FastAPI, ``websocket.send``
+for the websockets library) and an optional ``close`` coroutine function.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, Iterable, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+class SlowConsumerPolicy(Enum):
+    """What to do when a connection's outbound queue is full."""
+    DROP = "drop"
+    COALESCE = "coalesce"
+    DISCONNECT = "disconnect"
+
+
+@dataclass(frozen=True)
+class _Outbound:
+    payload: Any
+    enqueued_at: float
+    coalesce_key: Optional[str] = None
+
+
+@dataclass
+class FanoutConnection:
+    """Outbound state of one registered connection."""
+    connection_id: Hashable
+    send: Callable[[Any], Awaitable[Any]]
+    close: Optional[Callable[[], Awaitable[Any]]]
+    policy: SlowConsumerPolicy
+    queue_size: int
+    queue: Deque[_Outbound] = field(default_factory=deque)
+    topics: Set[str] = field(default_factory=set)
+    wakeup: asyncio.Event = field(default_factory=asyncio.Event)
+    writer: Optional[asyncio.Task] = None
+    in_flight: bool = False
+
+    # Counters
+    sent: int = 0
+    dropped: int = 0
+    coalesced: int = 0
+    max_depth: int = 0
+    last_lag: float = 0.0
+    max_lag: float = 0.0
+
+
+class FanoutHub:
+    """Topic-indexed broadcast hub with per-connection bounded queues."""
+
+    def __init__(self,
+                 queue_size: int = 100,
+                 policy: SlowConsumerPolicy = SlowConsumerPolicy.DROP,
+                 send_timeout: Optional[float] = None,
+                 serializer: Callable[[Any], str] = json.dumps,
+                 on_disconnect: Optional[Callable[[Hashable], Any]] = None,
+                 lag_window: int = 1024):
+        if queue_size < 1:
+            raise ValueError("queue_size must be at least 1")
+        self.queue_size = queue_size
+        self.policy = SlowConsumerPolicy(policy)
+        self.send_timeout = send_timeout
+        self.serializer = serializer
+        self.on_disconnect = on_disconnect
+
+        self.connections: Dict[Hashable, FanoutConnection] = {}
+        self.subscriptions: Dict[str, Set[Hashable]] = {}  # topic -> connection ids
+
+        # Hub-wide counters
+        self.published = 0
+        self.serialized = 0
+        self.enqueued = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.slow_disconnects = 0
+        self.send_errors = 0
+        self._lags: Deque[float] = deque(maxlen=lag_window)
+
+    def __len__(self) -> int:
+        return len(self.connections)
+
+    def __contains__(self, connection_id: Hashable) -> bool:
+        return connection_id in self.connections
+
+    # Connections and subscriptions
+
+    def register(self,
+                 connection_id: Hashable,
+                 send: Callable[[Any], Awaitable[Any]],
+                 close: Optional[Callable[[], Awaitable[Any]]] = None,
+                 topics: Iterable[str] = (),
+                 policy: Optional[SlowConsumerPolicy] = None,
+                 queue_size: Optional[int] = None) -> FanoutConnection:
+        """Register a connection and start its writer task (needs a running loop)."""
+        if connection_id in self.connections:
+            self.unregister(connection_id)
+
+        connection = FanoutConnection(
+            connection_id=connection_id,
+            send=send,
+            close=close,
+            policy=SlowConsumerPolicy(policy) if policy else self.policy,
+            queue_size=queue_size or self.queue_size
+        )
+        self.connections[connection_id] = connection
+        for topic in topics:
+            self.subscribe(connection_id, topic)
+        connection.writer = asyncio.get_running_loop().create_task(self._writer(connection))
+        return connection
+
+    def unregister(self, connection_id: Hashable) -> bool:
+        """Remove a connection, its subscriptions and its pending messages."""
+        connection = self.connections.pop(connection_id, None)
+        if connection is None:
+            return False
+
+        for topic in connection.topics:
+            subscribers = self.subscriptions.get(topic)
+            if subscribers is not None:
+                subscribers.discard(connection_id)
+                if not subscribers:
+                    del self.subscriptions[topic]
+        connection.queue.clear()
+
+        if connection.writer and connection.writer is not asyncio.current_task():
+            connection.writer.cancel()
+        return True
+
+    def subscribe(self, connection_id: Hashable, topic: str) -> bool:
+        connection = self.connections.get(connection_id)
+        if connection is None:
+            return False
+        connection.topics.add(topic)
+        self.subscriptions.setdefault(topic, set()).add(connection_id)
+        return True
+
+    def unsubscribe(self, connection_id: Hashable, topic: str) -> bool:
+        subscribers = self.subscriptions.get(topic)
+        if not subscribers or connection_id not in subscribers:
+            return False
+        subscribers.discard(connection_id)
+        if not subscribers:
+            del self.subscriptions[topic]
+        connection = self.connections.get(connection_id)
+        if connection:
+            connection.topics.discard(topic)
+        return True
+
+    def set_subscriptions(self, connection_id: Hashable, topics: Iterable[str]) -> bool:
+        """Replace a connection's subscriptions."""
+        connection = self.connections.get(connection_id)
+        if connection is None:
+            return False
+        topics = set(topics)
+        for topic in connection.topics - topics:
+            self.unsubscribe(connection_id, topic)
+        for topic in topics - connection.topics:
+            self.subscribe(connection_id, topic)
+        return True
+
+    def subscribers(self, topic: str) -> Set[Hashable]:
+        return set(self.subscriptions.get(topic, ()))
+
+    # Publishing
+
+    def serialize(self, message: Any) -> Any:
+        """Encode a message once; str and bytes payloads pass through."""
+        if isinstance(message, (str, bytes)):
+            return message
+        self.serialized += 1
+        return self.serializer(message)
+
+    def publish(self,
+                message: Any,
+                topic: Optional[str] = None,
+                exclude: Optional[Iterable[Hashable]] = None,
+                coalesce_key: Optional[str] = None) -> int:
+        """Queue a message for every subscriber of ``topic`` (all connections if None).
+
+        Never waits on a client. Returns the number of connections the
+        message was queued for.
+        """
+        targets = self.subscriptions.get(topic, ()) if topic is not None else self.connections.keys()
+        if not targets:
+            return 0
+
+        self.published += 1
+        # One immutable queue entry shared by every subscriber
+        item = _Outbound(self.serialize(message), time.monotonic(), coalesce_key)
+        excluded = set(exclude) if exclude else ()
+
+        queued = 0
+        for connection_id in list(targets):
+            if connection_id in excluded:
+                continue
+            connection = self.connections.get(connection_id)
+            if connection is not None and self._enqueue(connection, item):
+                queued += 1
+        return queued
+
+    def send_to(self, connection_id: Hashable, message: Any, coalesce_key: Optional[str] = None) -> bool:
+        """Queue a message for one connection."""
+        connection = self.connections.get(connection_id)
+        if connection is None:
+            return False
+        return self._enqueue(connection, _Outbound(self.serialize(message), time.monotonic(), coalesce_key))
+
+    def _enqueue(self, connection: FanoutConnection, item: _Outbound) -> bool:
+        queue = connection.queue
+
+        if item.coalesce_key is not None and connection.policy == SlowConsumerPolicy.COALESCE:
+            for index, pending in enumerate(queue):
+                if pending.coalesce_key == item.coalesce_key:
+                    # Newer snapshot replaces the queued one; it keeps its place
+                    # in line and its age, so lag still reflects the backlog
+                    queue[index] = _Outbound(item.payload, pending.enqueued_at, item.coalesce_key)
+                    connection.coalesced += 1
+                    self.coalesced += 1
+                    return True
+
+        if len(queue) >= connection.queue_size:
+            if connection.policy == SlowConsumerPolicy.DISCONNECT:
+                self._disconnect_slow(connection)
+                return False
+            queue.popleft()
+            connection.dropped += 1
+            self.dropped += 1
+
+        queue.append(item)
+        self.enqueued += 1
+        depth = len(queue)
+        if depth > connection.max_depth:
+            connection.max_depth = depth
+        if depth == 1:
+            # Writer may be idle; a busy writer picks the message up on its own
+            connection.wakeup.set()
+        return True
+
+    def _disconnect_slow(self, connection: FanoutConnection) -> None:
+        self.slow_disconnects += 1
+        logger.warning(f"Disconnecting slow WebSocket consumer {connection.connection_id}: "
+                       f"{len(connection.queue)} messages queued")
+        self.unregister(connection.connection_id)
+        if connection.close is not None:
+            asyncio.get_running_loop().create_task(self._close_quietly(connection))
+        self._notify_disconnect(connection.connection_id)
+
+    async def _close_quietly(self, connection: FanoutConnection) -> None:
+        try:
+            await connection.close()
+        except Exception as e:
+            logger.debug(f"Error closing connection {connection.connection_id}: {e}")
+
+    def _notify_disconnect(self, connection_id: Hashable) -> None:
+        if self.on_disconnect is None:
+            return
+        try:
+            result = self.on_disconnect(connection_id)
+            if asyncio.iscoroutine(result):
+                asyncio.get_running_loop().create_task(result)
+        except Exception as e:
+            logger.error(f"Disconnect callback failed for {connection_id}: {e}")
+
+    async def _writer(self, connection: FanoutConnection) -> None:
+        """Drain one connection's queue in order."""
+        queue = connection.queue
+        try:
+            while True:
+                if not queue:
+                    connection.wakeup.clear()
+                    await connection.wakeup.wait()
+                    continue
+
+                item = queue.popleft()
+                connection.in_flight = True
+                try:
+                    if self.send_timeout:
+                        await asyncio.wait_for(connection.send(item.payload), self.send_timeout)
+                    else:
+                        await connection.send(item.payload)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self.send_errors += 1
+                    logger.info(f"Send to {connection.connection_id} failed, dropping connection: {e!r}")
+                    if self.connections.get(connection.connection_id) is connection:
+                        self.unregister(connection.connection_id)
+                        if connection.close is not None and isinstance(e, asyncio.TimeoutError):
+                            await self._close_quietly(connection)
+                        self._notify_disconnect(connection.connection_id)
+                    return
+
+                finally:
+                    connection.in_flight = False
+
+                lag = time.monotonic() - item.enqueued_at
+                connection.sent += 1
+                connection.last_lag = lag
+                if lag > connection.max_lag:
+                    connection.max_lag = lag
+                self._lags.append(lag)
+        except asyncio.CancelledError:
+            pass
+
+    # Lifecycle and metrics
+
+    async def drain(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queue is empty; returns False on timeout."""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while any(c.queue or c.in_flight for c in self.connections.values()):
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(0.001)
+        return True
+
+    async def close(self) -> None:
+        """Stop every writer task and forget all connections."""
+        writers = [c.writer for c in self.connections.values() if c.writer]
+        for connection_id in list(self.connections):
+            self.unregister(connection_id)
+        if writers:
+            await asyncio.gather(*writers, return_exceptions=True)
+
+    def connection_metrics(self, connection_id: Hashable) -> Optional[Dict[str, Any]]:
+        connection = self.connections.get(connection_id)
+        if connection is None:
+            return None
+        oldest = connection.queue[0].enqueued_at if connection.queue else None
+        return {
+            "queue_depth": len(connection.queue),
+            "max_queue_depth": connection.max_depth,
+            "queue_age_ms": (time.monotonic() - oldest) * 1000 if oldest is not None else 0.0,
+            "sent": connection.sent,
+            "dropped": connection.dropped,
+            "coalesced": connection.coalesced,
+            "last_send_lag_ms": connection.last_lag * 1000,
+            "max_send_lag_ms": connection.max_lag * 1000,
+            "policy": connection.policy.value,
+            "topics": sorted(connection.topics)
+        }
+
+    def metrics(self) -> Dict[str, Any]:
+        """Queue depth and send lag across all connections."""
+        depths = [len(c.queue) for c in self.connections.values()]
+        lags = sorted(self._lags)
+
+        def lag_percentile(p: float) -> float:
+            return lags[min(len(lags) - 1, int(len(lags) * p))] * 1000 if lags else 0.0
+
+        return {
+            "connections": len(self.connections),
+            "topics": len(self.subscriptions),
+            "published": self.published,
+            "serialized": self.serialized,
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "slow_disconnects": self.slow_disconnects,
+            "send_errors": self.send_errors,
+            "queue_depth_total": sum(depths),
+            "queue_depth_max": max(depths, default=0),
+            "backlogged_connections": sum(1 for depth in depths if depth),
+            "send_lag_p50_ms": lag_percentile(0.5),
+            "send_lag_p99_ms": lag_percentile(0.99),
+            "send_lag_max_ms": lags[-1] * 1000 if lags else 0.0
+        }
@@ -6,18 +6,35 @@ import json
 import asyncio
 import time
 from datetime import datetime
-from typing import Dict, List, Set
+from typing import Dict, List, Optional, Set
 from fastapi import WebSocket, WebSocketDisconnect
 from fastapi.routing import APIRouter
 import logging
 
+from .fanout import FanoutHub, SlowConsumerPolicy
+
 logger = logging.getLogger(__name__)
 
+DEFAULT_SUBSCRIPTIONS = ["dashboard", "timeline", "notifications"]
+
+# Every connection is subscribed to this topic; unfiltered broadcasts use it
+ALL_CLIENTS_TOPIC = "*"
+
+
 # Connection manager for WebSocket connections
 class ConnectionManager:
-    def __init__(self):
+    def __init__(self, queue_size: int = 100, slow_consumer_policy: str = "coalesce",
+                 send_timeout: Optional[float] = 10.0):
         self.active_connections: Set[WebSocket] = set()
         self.client_data: Dict[WebSocket, Dict] = {}
+        # Broadcasts are serialized once and queued per client; a slow client
+        # only backs up its own queue
+        self.hub = FanoutHub(
+            queue_size=queue_size,
+            policy=SlowConsumerPolicy(slow_consumer_policy),
+            send_timeout=send_timeout,
+            on_disconnect=self.disconnect
+        )
 
     async def connect(self, websocket: WebSocket, client_id: str = None):
         """Accept a new WebSocket connection"""
@@ -26,49 +43,46 @@ class ConnectionManager:
         self.client_data[websocket] = {
             "client_id": client_id or f"client_{int(time.time())}",
             "connected_at": datetime.utcnow().isoformat(),
-            "subscriptions": ["dashboard", "timeline", "notifications"]
+            "subscriptions": list(DEFAULT_SUBSCRIPTIONS)
         }
+        self.hub.register(
+            websocket,
+            send=websocket.send_text,
+            close=lambda: websocket.close(code=1008),
+            topics=[ALL_CLIENTS_TOPIC, *DEFAULT_SUBSCRIPTIONS]
+        )
         logger.info(f"WebSocket client connected: {self.client_data[websocket]['client_id']}")
 
     def disconnect(self, websocket: WebSocket):
         """Remove a WebSocket connection"""
+        self.hub.unregister(websocket)
         if websocket in self.active_connections:
             self.active_connections.discard(websocket)
             client_info = self.client_data.pop(websocket, {})
             logger.info(f"WebSocket client disconnected: {client_info.get('client_id', 'unknown')}")
 
-    async def send_personal_message(self, message: str, websocket: WebSocket):
-        """Send a message to a specific client"""
+    def set_subscriptions(self, websocket: WebSocket, subscriptions: List[str]):
+        """Replace a client's subscriptions"""
+        if websocket in self.client_data:
+            self.client_data[websocket]["subscriptions"] = subscriptions
+            self.hub.set_subscriptions(websocket, [ALL_CLIENTS_TOPIC, *subscriptions])
+
+    async def send_personal_message(self, message: str, websocket: WebSocket, coalesce_key: str = None):
+        """Queue a message for a specific client"""
         if websocket in self.active_connections:
-            try:
-                await websocket.send_text(message)
-            except Exception as e:
-                logger.error(f"Failed to send message to client: {e}")
-                self.disconnect(websocket)
+            self.hub.send_to(websocket, message, coalesce_key=coalesce_key)
 
-    async def broadcast(self, message: str, subscription_filter: str = None):
-        """Broadcast a message to all connected clients"""
+    async def broadcast(self, message: str, subscription_filter: str = None, coalesce_key: str = None) -> int:
+        """Broadcast a message to all connected clients (or one subscription)"""
         if not self.active_connections:
-            return
-
-        disconnected = set()
+            return 0
 
-        for connection in self.active_connections.copy():
-            try:
-                # Check subscription filter if provided
-                if subscription_filter:
-                    client_subscriptions = self.client_data.get(connection, {}).get("subscriptions", [])
-                    if subscription_filter not in client_subscriptions:
-                        continue
-
-                await connection.send_text(message)
-            except Exception as e:
-                logger.error(f"Failed to broadcast to client: {e}")
-                disconnected.add(connection)
+        return self.hub.publish(message, topic=subscription_filter or ALL_CLIENTS_TOPIC,
+                                coalesce_key=coalesce_key)
 
-        # Clean up disconnected clients
-        for connection in disconnected:
-            self.disconnect(connection)
+    def metrics(self) -> Dict:
+        """Fan-out queue depth and send lag"""
+        return self.hub.metrics()
 
 # Global connection manager instance
 manager = ConnectionManager()
@@ -125,7 +139,8 @@ async def dashboard_websocket(websocket: WebSocket):
 
                 # Send data updates every 30 seconds
                 update_data = generate_dashboard_update()
-                await manager.send_personal_message(json.dumps(update_data), websocket)
+                await manager.send_personal_message(json.dumps(update_data), websocket,
+                                                    coalesce_key="dashboard_update")
 
     except WebSocketDisconnect:
         manager.disconnect(websocket)
@@ -143,8 +158,7 @@ async def handle_client_message(websocket: WebSocket, data: Dict):
     if message_type == "subscribe":
         # Handle subscription updates
         subscriptions = data.get("subscriptions", [])
-        if websocket in manager.client_data:
-            manager.client_data[websocket]["subscriptions"] = subscriptions
+        manager.set_subscriptions(websocket, subscriptions)
 
         response = {
             "type": "subscription_updated",
@@ -230,9 +244,11 @@ async def periodic_dashboard_updates():
 
             if manager.active_connections:
                 update_data = generate_dashboard_update()
+                # Only the latest snapshot matters to a client that is behind
                 await manager.broadcast(
                     json.dumps(update_data),
-                    subscription_filter="dashboard"
+                    subscription_filter="dashboard",
+                    coalesce_key="dashboard_update"
                 )
 
         except Exception as e:
@@ -293,6 +309,11 @@ async def broadcast_qa_update(session_id: str, question: str, answer: str):
 
     await manager.broadcast(json.dumps(message))
 
+@websocket_router.get("/ws/metrics")
+async def websocket_metrics():
+    """Fan-out queue depth, send lag and slow-consumer counters"""
+    return manager.metrics()
+
 # Export the router and utility functions
 __all__ = [
     "websocket_router",
@@ -23,6 +23,8 @@ import cv2
 from PIL import Image
 import imagehash
 
+from .duplicate_index import NearDuplicateIndex
+
 logger = logging.getLogger(__name__)
 
 
@@ -83,15 +85,20 @@ class DuplicateDetector:
     
     def __init__(self, 
                  similarity_threshold: float = 0.8,
-                 semantic_model: str = "sentence-transformers/all-MiniLM-L6-v2"):
+                 semantic_model: str = "sentence-transformers/all-MiniLM-L6-v2",
+                 index_path: Optional[str] = None):
         """Initialize duplicate detector.
         
         Args:
             similarity_threshold: Minimum similarity score for duplicate detection
             semantic_model: Model for semantic similarity comparison
+            index_path: SQLite file for the near-duplicate LSH index. When set,
+                lookups compare only against LSH candidates instead of every
+                fingerprint, and the index persists across sessions.
         """
         self.similarity_threshold = similarity_threshold
         self.semantic_model = semantic_model
+        self.duplicate_index = NearDuplicateIndex(index_path) if index_path else None
         
         # Initialize components
         self.tfidf_vectorizer = TfidfVectorizer(
@@ -176,9 +183,31 @@ class DuplicateDetector:
         
         # Store fingerprint
         self.document_fingerprints[document_id] = fingerprint
+        if self.duplicate_index is not None:
+            self.duplicate_index.add(document_id, content)
         
         return fingerprint
     
+    def remove_document(self, document_id: str) -> bool:
+        """Forget a document's fingerprint, index entry and cached comparisons.
+        
+        Args:
+            document_id: Document to remove
+            
+        Returns:
+            True if the document was known
+        """
+        found = self.document_fingerprints.pop(document_id, None) is not None
+        if self.duplicate_index is not None:
+            found = self.duplicate_index.remove(document_id) or found
+        
+        stale = [key for key in self.similarity_cache
+                 if key.startswith(f"{document_id}_") or key.endswith(f"_{document_id}")]
+        for key in stale:
+            del self.similarity_cache[key]
+        
+        return found
+    
     def find_duplicates(self, document_id: str, 
                        target_ids: List[str] = None) -> List[DuplicateMatch]:
         """Find duplicate documents for a given document.
@@ -195,17 +224,24 @@ class DuplicateDetector:
             return []
         
         source_fp = self.document_fingerprints[document_id]
+        duplicates = []
         
         # Determine comparison targets
         if target_ids:
             targets = {tid: self.document_fingerprints[tid] 
                       for tid in target_ids if tid in self.document_fingerprints}
+        elif self.duplicate_index is not None:
+            targets = {}
+            for candidate in self.duplicate_index.near_duplicates(document_id):
+                if candidate.document_id in self.document_fingerprints:
+                    targets[candidate.document_id] = self.document_fingerprints[candidate.document_id]
+                elif candidate.similarity >= self.similarity_threshold:
+                    # Indexed in an earlier session; no fingerprint to confirm against
+                    duplicates.append(self._index_match(document_id, candidate))
         else:
             targets = {tid: fp for tid, fp in self.document_fingerprints.items() 
                       if tid != document_id}
         
-        duplicates = []
-        
         for target_id, target_fp in targets.items():
             # Check cache first
             cache_key = f"{min(document_id, target_id)}_{max(document_id, target_id)}"
@@ -255,6 +291,20 @@ class DuplicateDetector:
         all_duplicates = []
         processed_pairs = set()
         
+        if self.duplicate_index is not None:
+            # Confirm only the LSH candidate pairs instead of every pair
+            for doc_id_1, fp_1 in fingerprints.items():
+                for candidate in self.duplicate_index.near_duplicates(doc_id_1):
+                    doc_id_2 = candidate.document_id
+                    if doc_id_1 >= doc_id_2 or doc_id_2 not in fingerprints:
+                        continue
+                    
+                    match = self._compare_documents(fp_1, fingerprints[doc_id_2])
+                    if match and match.similarity_score >= self.similarity_threshold:
+                        all_duplicates.append(match)
+            
+            return sorted(all_duplicates, key=lambda x: x.similarity_score, reverse=True)
+        
         for doc_id_1, fp_1 in fingerprints.items():
             for doc_id_2, fp_2 in fingerprints.items():
                 if doc_id_1 >= doc_id_2:  # Avoid duplicate comparisons
@@ -272,6 +322,22 @@ class DuplicateDetector:
         
         return sorted(all_duplicates, key=lambda x: x.similarity_score, reverse=True)
     
+    def _index_match(self, document_id: str, candidate) -> DuplicateMatch:
+        """Match reported from the LSH estimate alone."""
+        return DuplicateMatch(
+            document_id_1=document_id,
+            document_id_2=candidate.document_id,
+            duplicate_type=self._determine_duplicate_type(candidate.similarity, 0.0, 0.0, 0.0, 0.0),
+            similarity_score=candidate.similarity,
+            confidence=0.5,
+            method_used=SimilarityMethod.FUZZY,
+            details={
+                "estimated": True,
+                "simhash_distance": candidate.simhash_distance
+            },
+            detection_timestamp=datetime.utcnow()
+        )
+    
     def _compare_documents(self, fp1: DocumentFingerprint, 
                           fp2: DocumentFingerprint) -> Optional[DuplicateMatch]:
         """Compare two document fingerprints comprehensively.
@@ -715,6 +781,7 @@ class DuplicateDetector:
         return {
             "total_documents": total_docs,
             "cached_comparisons": cache_size,
+            "indexed_documents": len(self.duplicate_index) if self.duplicate_index is not None else 0,
             "similarity_threshold": self.similarity_threshold,
             "fingerprint_creation_times": [
                 fp.creation_time.isoformat() 
@@ -0,0 +1,392 @@
+"""
+Persistent near-duplicate index for legal documents.
+
+Each document is reduced to a MinHash signature over word shingles (plus a
+64-bit SimHash when the text is too short for shingles to be reliable). The
+signatures are split into bands and stored, together with their LSH bucket
+keys, in a local SQLite file. A lookup probes only the buckets the query
+shares with the corpus, so finding near-duplicates of one document costs
+roughly the number of true matches rather than the corpus size.
+
+Candidates are estimates; DuplicateDetector confirms them with its
+exact-similarity comparison before reporting a match.
+"""
+from typing import Dict, List, Optional, Tuple, Iterable
+from collections import Counter
+from dataclasses import dataclass
+import hashlib
+import itertools
+import logging
+import re
+import sqlite3
+import zlib
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+_MAX_HASH = np.uint32((1 << 32) - 1)
+_SHIFT = np.uint64(32)
+_SIGNED_MASK = (1 << 63) - 1
+# Odd multipliers combining word hashes into shingle hashes, one per position
+_SHINGLE_COEFS = np.random.RandomState(0).randint(1, 1 << 63, size=64, dtype=np.uint64) | np.uint64(1)
+# Shingles hashed per numpy pass when building signatures (keeps the
+# num_perm x chunk working set in cache)
+_CHUNK_SHINGLES = 4_000
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased words with punctuation removed (as DuplicateDetector's fuzzy hash)."""
+    return re.sub(r'[^\w\s]', '', text.lower()).split()
+
+
+def batch_shingle_hashes(token_lists: List[List[str]],
+                         shingle_size: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+    """32-bit word ``shingle_size``-gram hashes of many documents at once.
+
+    Each word is hashed once; a shingle's hash is a position-weighted sum of
+    its word hashes, computed for the whole batch with one sliding window, so
+    no shingle strings are built. A document shorter than ``shingle_size``
+    words is a single shingle. Returns the concatenated (not deduplicated)
+    hashes and the number belonging to each document.
+    """
+    lengths = np.fromiter(map(len, token_lists), dtype=np.int64, count=len(token_lists))
+    words = np.fromiter(map(zlib.crc32, map(str.encode, itertools.chain.from_iterable(token_lists))),
+                        dtype=np.uint64, count=int(lengths.sum()))
+    starts = np.cumsum(lengths) - lengths
+    counts = np.maximum(lengths - shingle_size + 1, 0)
+
+    windows = max(len(words) - shingle_size + 1, 0)
+    combined = np.zeros(windows, dtype=np.uint64)
+    for position in range(shingle_size):
+        combined += words[position:position + windows] * _SHINGLE_COEFS[position]
+    # Keep windows that start inside a document and end before the next one
+    offset_in_doc = np.arange(windows) - np.repeat(starts, lengths)[:windows]
+    hashes = (combined >> _SHIFT)[offset_in_doc < np.repeat(counts, lengths)[:windows]]
+
+    short = np.flatnonzero((lengths > 0) & (counts == 0))
+    if len(short):
+        singles = [int((words[starts[d]:starts[d] + lengths[d]] * _SHINGLE_COEFS[:lengths[d]])
+                       .sum(dtype=np.uint64) >> _SHIFT) for d in short]
+        hashes = np.insert(hashes, np.cumsum(counts)[short] - counts[short], np.array(singles, dtype=np.uint64))
+        counts[short] = 1
+    return hashes, counts
+
+
+def shingle_hashes(tokens: List[str], shingle_size: int = 5) -> np.ndarray:
+    """Sorted distinct shingle hashes of one document."""
+    return np.unique(batch_shingle_hashes([tokens], shingle_size)[0])
+
+
+def jaccard(a: np.ndarray, b: np.ndarray) -> float:
+    """Exact Jaccard similarity of two shingle hash sets."""
+    if not len(a) and not len(b):
+        return 1.0
+    shared = len(np.intersect1d(a, b, assume_unique=True))
+    return shared / (len(a) + len(b) - shared)
+
+
+def simhash(tokens: List[str], gram_size: int = 3) -> int:
+    """64-bit SimHash of the document's character n-gram frequencies.
+
+    Character n-grams rather than words: a short text has too few words for
+    a one-word edit to leave most of the bits unchanged.
+    """
+    text = ' '.join(tokens)
+    counts = Counter(text[i:i + gram_size] for i in range(max(1, len(text) - gram_size + 1)))
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(t.encode(), digest_size=8).digest(), 'little') for t in counts),
+        dtype=np.uint64, count=len(counts))
+    weights = np.fromiter(counts.values(), dtype=np.int64, count=len(counts))
+    bits = ((hashes[:, None] >> np.arange(64, dtype=np.uint64)) & np.uint64(1)).astype(np.int64)
+    votes = (weights[:, None] * (2 * bits - 1)).sum(axis=0)
+    return sum(1 << i for i in np.flatnonzero(votes > 0).tolist())
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+
+class MinHasher:
+    """MinHash signatures from multiply-shift hashes ((a*x + b) mod 2^64) >> 32."""
+
+    def __init__(self, num_perm: int = 128, seed: int = 1):
+        rng = np.random.RandomState(seed)
+        self.a = (rng.randint(1, 1 << 63, size=num_perm, dtype=np.uint64) | np.uint64(1))[:, None]
+        self.b = rng.randint(0, 1 << 63, size=num_perm, dtype=np.uint64)[:, None]
+        self.num_perm = num_perm
+
+    def signatures(self, hashes: np.ndarray, counts: np.ndarray) -> np.ndarray:
+        """One uint32 signature row per document from ``batch_shingle_hashes`` output.
+
+        Documents without shingles keep the max hash in every position.
+        """
+        out = np.full((len(counts), self.num_perm), _MAX_HASH, dtype=np.uint32)
+        ends = np.cumsum(counts)
+        first = 0
+        while first < len(counts):
+            # Documents whose shingles fit in one chunk (at least one document)
+            last = max(int(np.searchsorted(ends, ends[first] - counts[first] + _CHUNK_SHINGLES, 'right')), first + 1)
+            rows = first + np.flatnonzero(counts[first:last])
+            if len(rows):
+                values = hashes[ends[first] - counts[first]:ends[last - 1]]
+                offsets = ends[rows] - counts[rows] - (ends[first] - counts[first])
+                # Hash-major layout: the per-document minimum is a contiguous reduceat
+                permuted = ((self.a * values + self.b) >> _SHIFT).astype(np.uint32)
+                out[rows] = np.minimum.reduceat(permuted, offsets, axis=1).T
+            first = last
+        return out
+
+
+@dataclass
+class NearDuplicate:
+    """An indexed document that is probably a near-duplicate of the query."""
+    document_id: str
+    similarity: float                        # Estimated Jaccard of the shingle sets
+    simhash_distance: Optional[int] = None   # Set when both texts are short
+
+
+class NearDuplicateIndex:
+    """Banded MinHash/SimHash LSH index persisted in SQLite.
+
+    With ``bands`` bands of ``num_perm / bands`` rows, two documents with
+    Jaccard similarity s share a bucket with probability 1 - (1 - s^rows)^bands
+    (about 0.99 at s = 0.6 and 0.05 at s = 0.2 for the defaults). Short texts
+    are also bucketed by SimHash blocks, so any pair within ``simhash_distance``
+    bits shares at least one block; unrelated texts differ in about 32 bits.
+
+    The index assumes a single writer process.
+    """
+
+    def __init__(self, path: str = ":memory:",
+                 num_perm: int = 128,
+                 bands: int = 32,
+                 shingle_size: int = 5,
+                 threshold: float = 0.6,
+                 short_text_words: int = 50,
+                 simhash_distance: int = 6,
+                 seed: int = 1):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        if not 0 <= simhash_distance < 64:
+            raise ValueError("simhash_distance must be between 0 and 63")
+
+        self.threshold = threshold
+        self.params = {
+            "num_perm": num_perm, "bands": bands, "shingle_size": shingle_size,
+            "short_text_words": short_text_words, "simhash_distance": simhash_distance, "seed": seed,
+        }
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.short_text_words = short_text_words
+        self.simhash_distance = simhash_distance
+        self.hasher = MinHasher(num_perm, seed)
+
+        rng = np.random.RandomState(seed + 1)
+        self._band_coefs = rng.randint(1, 1 << 63, size=self.rows, dtype=np.uint64) | np.uint64(1)
+        self._band_salts = rng.randint(0, 1 << 63, size=bands, dtype=np.uint64)
+        # simhash_distance + 1 disjoint bit blocks: by pigeonhole, fingerprints
+        # within simhash_distance bits agree exactly on at least one block
+        blocks = simhash_distance + 1
+        widths = [64 // blocks + (1 if i < 64 % blocks else 0) for i in range(blocks)]
+        self._simhash_blocks = [(sum(widths[:i]), (1 << width) - 1) for i, width in enumerate(widths)]
+        self._simhash_salts = [int(s) for s in rng.randint(0, 1 << 62, size=blocks, dtype=np.uint64)]
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("PRAGMA cache_size=-131072")  # 128 MiB: bucket inserts land at random keys
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS index_meta (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS documents (
+                id INTEGER PRIMARY KEY,
+                document_id TEXT NOT NULL UNIQUE,
+                minhash BLOB NOT NULL,
+                simhash INTEGER
+            );
+            CREATE TABLE IF NOT EXISTS lsh_buckets (
+                bucket INTEGER NOT NULL,
+                doc INTEGER NOT NULL,
+                PRIMARY KEY (bucket, doc)
+            ) WITHOUT ROWID;
+            """
+        )
+        self._check_params()
+        self._next_id = (self._conn.execute("SELECT MAX(id) FROM documents").fetchone()[0] or 0) + 1
+
+    def _check_params(self):
+        stored = dict(self._conn.execute("SELECT key, value FROM index_meta"))
+        if not stored:
+            with self._conn:
+                self._conn.executemany("INSERT INTO index_meta (key, value) VALUES (?, ?)", self.params.items())
+        elif stored != self.params:
+            raise ValueError(f"Index was built with {stored}, not {self.params}")
+
+    # Signatures and bucket keys
+
+    def _signatures(self, texts: List[str]) -> Tuple[np.ndarray, List[Optional[int]]]:
+        tokens = [tokenize(text) for text in texts]
+        minhashes = self.hasher.signatures(*batch_shingle_hashes(tokens, self.shingle_size))
+        simhashes = [simhash(t) if 0 < len(t) < self.short_text_words else None for t in tokens]
+        return minhashes, simhashes
+
+    def _band_keys(self, minhashes: np.ndarray) -> np.ndarray:
+        """(n_docs, bands) bucket keys: a multiply-add hash of each band's rows."""
+        banded = minhashes.reshape(len(minhashes), self.bands, self.rows).astype(np.uint64)
+        keys = (banded * self._band_coefs).sum(axis=2, dtype=np.uint64) ^ self._band_salts
+        return (keys >> np.uint64(1)).astype(np.int64)
+
+    def _simhash_keys(self, value: int) -> List[int]:
+        return [((((value >> shift) & mask) + 1) * 0x9E3779B97F4A7C15 ^ salt) & _SIGNED_MASK
+                for (shift, mask), salt in zip(self._simhash_blocks, self._simhash_salts)]
+
+    def _bucket_keys(self, minhash: np.ndarray, band_keys: np.ndarray, simhash_value: Optional[int]) -> List[int]:
+        if minhash[0] == _MAX_HASH and (minhash == _MAX_HASH).all():
+            return []  # No tokens: nothing to match on
+        keys = band_keys.tolist()
+        if simhash_value is not None:
+            keys.extend(self._simhash_keys(simhash_value))
+        return keys
+
+    @staticmethod
+    def _to_signed(value: Optional[int]) -> Optional[int]:
+        return value - (1 << 64) if value is not None and value >= 1 << 63 else value
+
+    @staticmethod
+    def _from_signed(value: Optional[int]) -> Optional[int]:
+        return value + (1 << 64) if value is not None and value < 0 else value
+
+    # Updates
+
+    def add(self, document_id: str, text: str) -> None:
+        """Index (or re-index) a single document."""
+        self.add_many([(document_id, text)])
+
+    def add_many(self, documents: Iterable[Tuple[str, str]], batch_size: int = 1000) -> int:
+        """Index ``(document_id, text)`` pairs in batches; returns the number indexed."""
+        count = 0
+        batch: List[Tuple[str, str]] = []
+        for item in documents:
+            batch.append(item)
+            if len(batch) >= batch_size:
+                count += self._add_batch(batch)
+                batch = []
+        if batch:
+            count += self._add_batch(batch)
+        return count
+
+    def _add_batch(self, batch: List[Tuple[str, str]]) -> int:
+        latest = dict(batch)  # A repeated id within the batch keeps its last text
+        document_ids = list(latest)
+        minhashes, simhashes = self._signatures([latest[d] for d in document_ids])
+        band_keys = self._band_keys(minhashes)
+
+        doc_rows, bucket_rows = [], []
+        for i, document_id in enumerate(document_ids):
+            row_id = self._next_id + i
+            doc_rows.append((row_id, document_id, minhashes[i].tobytes(), self._to_signed(simhashes[i])))
+            bucket_rows.extend((key, row_id) for key in self._bucket_keys(minhashes[i], band_keys[i], simhashes[i]))
+
+        with self._conn:
+            self._delete(document_ids)
+            self._conn.executemany(
+                "INSERT INTO documents (id, document_id, minhash, simhash) VALUES (?, ?, ?, ?)", doc_rows)
+            self._conn.executemany("INSERT OR IGNORE INTO lsh_buckets (bucket, doc) VALUES (?, ?)",
+                                   sorted(bucket_rows))
+        self._next_id += len(document_ids)
+        return len(document_ids)
+
+    def remove(self, document_id: str) -> bool:
+        """Drop a document from the index; returns False if it was not indexed."""
+        with self._conn:
+            return self._delete([document_id]) > 0
+
+    def _delete(self, document_ids: List[str]) -> int:
+        rows = self._stored(document_ids)
+        if not rows:
+            return 0
+        minhashes = np.stack([minhash for _, _, minhash, _ in rows])
+        band_keys = self._band_keys(minhashes)
+        bucket_rows = [(key, row_id)
+                       for i, (row_id, _, minhash, simhash_value) in enumerate(rows)
+                       for key in self._bucket_keys(minhash, band_keys[i], simhash_value)]
+        self._conn.executemany("DELETE FROM lsh_buckets WHERE bucket = ? AND doc = ?", bucket_rows)
+        self._conn.executemany("DELETE FROM documents WHERE id = ?", [(row[0],) for row in rows])
+        return len(rows)
+
+    def _stored(self, document_ids: List[str]) -> List[Tuple[int, str, np.ndarray, Optional[int]]]:
+        rows = []
+        for start in range(0, len(document_ids), 500):
+            chunk = document_ids[start:start + 500]
+            rows.extend(self._conn.execute(
+                f"SELECT id, document_id, minhash, simhash FROM documents "
+                f"WHERE document_id IN ({','.join('?' * len(chunk))})", chunk))
+        return [(row_id, document_id, np.frombuffer(blob, dtype=np.uint32), self._from_signed(value))
+                for row_id, document_id, blob, value in rows]
+
+    # Lookups
+
+    def query(self, text: str, threshold: Optional[float] = None,
+              exclude: Optional[str] = None) -> List[NearDuplicate]:
+        """Indexed documents that are probably near-duplicates of ``text``."""
+        minhashes, simhashes = self._signatures([text])
+        return self._lookup(minhashes[0], simhashes[0], threshold, exclude)
+
+    def near_duplicates(self, document_id: str, threshold: Optional[float] = None) -> List[NearDuplicate]:
+        """Near-duplicates of an indexed document, from its stored signature."""
+        rows = self._stored([document_id])
+        if not rows:
+            raise KeyError(document_id)
+        _, _, minhash, simhash_value = rows[0]
+        return self._lookup(minhash, simhash_value, threshold, document_id)
+
+    def _lookup(self, minhash: np.ndarray, simhash_value: Optional[int],
+                threshold: Optional[float], exclude: Optional[str]) -> List[NearDuplicate]:
+        threshold = self.threshold if threshold is None else threshold
+        keys = self._bucket_keys(minhash, self._band_keys(minhash[None, :])[0], simhash_value)
+        if not keys:
+            return []
+
+        rows = self._conn.execute(
+            f"SELECT d.document_id, d.minhash, d.simhash FROM documents d "
+            f"WHERE d.id IN (SELECT doc FROM lsh_buckets WHERE bucket IN ({','.join('?' * len(keys))}))",
+            keys,
+        ).fetchall()
+
+        matches = []
+        for document_id, blob, value in rows:
+            if document_id == exclude:
+                continue
+            similarity = float(np.mean(np.frombuffer(blob, dtype=np.uint32) == minhash))
+            distance = None
+            value = self._from_signed(value)
+            if simhash_value is not None and value is not None:
+                distance = hamming(simhash_value, value)
+            if similarity >= threshold or (distance is not None and distance <= self.simhash_distance):
+                matches.append(NearDuplicate(document_id, similarity, distance))
+        return sorted(matches, key=lambda m: m.similarity, reverse=True)
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def __contains__(self, document_id: str) -> bool:
+        return self._conn.execute(
+            "SELECT 1 FROM documents WHERE document_id = ?", (document_id,)).fetchone() is not None
+
+    def get_statistics(self) -> Dict[str, int]:
+        return {
+            "documents": len(self),
+            "buckets": self._conn.execute("SELECT COUNT(DISTINCT bucket) FROM lsh_buckets").fetchone()[0],
+            "bucket_entries": self._conn.execute("SELECT COUNT(*) FROM lsh_buckets").fetchone()[0],
+            **self.params,
+        }
+
+    def close(self):
+        self._conn.close()
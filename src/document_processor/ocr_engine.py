@@ -1,7 +1,7 @@
 """
 Advanced OCR engine using Tesseract for handwritten notes and scanned documents with preprocessing and AI enhancement.
 """
-from typing import Dict, List, Optional, Any, Tuple, Union
+from typing import Dict, List, Optional, Any, AsyncIterator, Tuple, Union
 from dataclasses import dataclass, field
 from enum import Enum
 from datetime import datetime
@@ -18,8 +18,12 @@ import asyncio
 from pathlib import Path
 import logging
 
+from ..core.encrypted_cache import EncryptedCacheConfig
 from ..shared.utils.ai_client import AIClient
 from .upload_manager import FileInfo, FileType
+from .ocr_pipeline import (
+    OCRPipeline, OCRSettings, preprocess_image, deskew_image, enhance_contrast, correct_rotation
+)
 
 
 class OCRMode(Enum):
@@ -151,14 +155,28 @@ class OCRResult:
 class TesseractOCREngine:
     """Advanced OCR engine using Tesseract with intelligent preprocessing and AI enhancement."""
     
-    def __init__(self, tesseract_path: Optional[str] = None):
+    def __init__(
+        self,
+        tesseract_path: Optional[str] = None,
+        max_workers: Optional[int] = None,
+        page_window: Optional[int] = None,
+        cache: Optional[EncryptedCacheConfig] = None
+    ):
         # Set Tesseract path if provided
         if tesseract_path:
             pytesseract.pytesseract.tesseract_cmd = tesseract_path
+        self.tesseract_path = tesseract_path
         
         self.ai_client = AIClient()
         self.logger = logging.getLogger(__name__)
         
+        # Pages are OCRed in a process pool sized to the cores, at most
+        # page_window pages in flight; results are cached by page-image hash
+        # only when an encrypted cache is configured (OCR_CACHE_DIR/OCR_CACHE_KEY)
+        if cache is None:
+            cache = EncryptedCacheConfig.from_env("OCR_CACHE")
+        self.pipeline = OCRPipeline(max_workers=max_workers, window=page_window, cache=cache)
+        
         # Default OCR configurations for different modes
         self.mode_configs = {
             OCRMode.PRINTED_TEXT: {
@@ -241,6 +259,10 @@ class TesseractOCREngine:
             self.logger.error(f"Tesseract not found or not properly installed: {e}")
             raise RuntimeError("Tesseract OCR not available")
 
+    def close(self):
+        """Shut down the OCR worker pool."""
+        self.pipeline.close()
+
     async def process_document(
         self, 
         file_info: FileInfo, 
@@ -264,54 +286,34 @@ class TesseractOCREngine:
                 languages = ['eng']
             
             # Get processing configuration
-            config = self.mode_configs.get(ocr_mode, self.mode_configs[OCRMode.MIXED])
+            config = dict(self.mode_configs.get(ocr_mode, self.mode_configs[OCRMode.MIXED]))
             if custom_config:
                 config.update(custom_config)
             
-            # Convert file to images
-            images = await self._convert_to_images(file_info)
-            if not images:
-                raise ValueError("Could not convert file to images for OCR processing")
-            
-            # Process each page/image
+            # Process pages as they stream out of the pipeline
             pages = []
+            errors = []
             total_text = ""
             total_confidence = 0.0
             total_words = 0
             low_confidence_words = 0
             blank_pages = 0
             
-            for i, image in enumerate(images):
-                page_start = datetime.utcnow()
-                
-                # Preprocess image
-                processed_image = await self._preprocess_image(image, config['preprocessing'])
+            async for page_result in self.iter_pages(file_info, ocr_mode, languages, config, errors):
+                pages.append(page_result)
+                total_text += page_result.text + "\n"
+                total_confidence += page_result.confidence
+                total_words += len(page_result.words)
                 
-                # Perform OCR
-                page_result = await self._ocr_image(
-                    processed_image, 
-                    page_num=i + 1,
-                    languages=languages,
-                    psm=config['psm'],
-                    oem=config['oem'],
-                    ocr_mode=ocr_mode
-                )
+                # Count low confidence words
+                low_confidence_words += sum(1 for word in page_result.words if word.confidence < 60)
                 
-                if page_result:
-                    page_result.preprocessing_applied = config['preprocessing']
-                    page_result.processing_time = (datetime.utcnow() - page_start).total_seconds()
-                    
-                    pages.append(page_result)
-                    total_text += page_result.text + "\n"
-                    total_confidence += page_result.confidence
-                    total_words += len(page_result.words)
-                    
-                    # Count low confidence words
-                    low_confidence_words += sum(1 for word in page_result.words if word.confidence < 60)
-                    
-                    # Check for blank pages
-                    if len(page_result.text.strip()) < 10:
-                        blank_pages += 1
+                # Check for blank pages
+                if len(page_result.text.strip()) < 10:
+                    blank_pages += 1
+            
+            if not pages and not errors:
+                raise ValueError("Could not convert file to images for OCR processing")
             
             # Calculate averages
             avg_confidence = total_confidence / len(pages) if pages else 0.0
@@ -335,7 +337,8 @@ class TesseractOCREngine:
                 low_confidence_words=low_confidence_words,
                 blank_pages=blank_pages,
                 tesseract_version=str(pytesseract.get_tesseract_version()),
-                preprocessing_steps=config['preprocessing']
+                preprocessing_steps=config['preprocessing'],
+                errors=errors
             )
             
             # Enhance with AI if requested
@@ -355,6 +358,89 @@ class TesseractOCREngine:
             self.logger.error(f"Error in OCR processing: {e}")
             raise
 
+    async def iter_pages(
+        self,
+        file_info: FileInfo,
+        ocr_mode: OCRMode = OCRMode.MIXED,
+        languages: List[str] = None,
+        config: Optional[Dict[str, Any]] = None,
+        errors: Optional[List[str]] = None
+    ) -> AsyncIterator[OCRPage]:
+        """Stream OCR pages in order as they finish.
+        
+        Pages are rasterized lazily inside the worker pool; PDF pages with a
+        usable text layer are returned without OCR.
+        """
+        config = config or self.mode_configs.get(ocr_mode, self.mode_configs[OCRMode.MIXED])
+        
+        if file_info.file_type == FileType.PDF:
+            kind = "pdf"
+        elif file_info.file_type in [FileType.PNG, FileType.JPG, FileType.JPEG, FileType.TIFF]:
+            kind = "image"
+        else:
+            # Office documents would need a LibreOffice conversion to PDF first
+            self.logger.warning(f"Office document conversion not implemented: {file_info.file_type}")
+            return
+        
+        settings = OCRSettings(
+            languages=languages or ['eng'],
+            psm=config['psm'],
+            oem=config['oem'],
+            ocr_mode=ocr_mode.value,
+            preprocessing=[step.value for step in config['preprocessing']],
+            tesseract_cmd=self.tesseract_path
+        )
+        
+        async for result in self.pipeline.iter_pages(str(file_info.final_path), kind, settings):
+            if result["source"] == "error":
+                if errors is not None:
+                    errors.append(f"Page {result['page_num']}: {result['error']}")
+                continue
+            
+            page = self._page_from_result(result, settings.lang_string)
+            page.preprocessing_applied = [] if result["source"] == "text_layer" else config['preprocessing']
+            yield page
+
+    def _page_from_result(self, result: Dict[str, Any], lang_string: str) -> OCRPage:
+        """Build an OCRPage from a pipeline worker result."""
+        page_num = result['page_num']
+        
+        if result['source'] == "text_layer":
+            # Embedded text is exact; words carry no boxes
+            text = result['text']
+            words = [
+                OCRWord(text=word, confidence=100.0, bbox=(0, 0, 0, 0), line_num=line_num, word_num=word_num)
+                for line_num, line in enumerate(text.splitlines(), 1)
+                for word_num, word in enumerate(line.split(), 1)
+            ]
+            return OCRPage(
+                page_num=page_num,
+                text=text,
+                confidence=100.0 if words else 0.0,
+                width=0,
+                height=0,
+                dpi=result['dpi'],
+                regions=[],
+                lines=[],
+                words=words,
+                preprocessing_applied=[],
+                processing_time=result['processing_time'],
+                metadata={"source": "text_layer"}
+            )
+        
+        page = self._build_ocr_page(
+            result['text'],
+            result['data'],
+            page_num=page_num,
+            width=result['width'],
+            height=result['height'],
+            dpi=result['dpi'],
+            lang_string=lang_string
+        )
+        page.processing_time = result['processing_time']
+        page.metadata["source"] = result['source']
+        return page
+
     async def _convert_to_images(self, file_info: FileInfo) -> List[np.ndarray]:
         """Convert file to images for OCR processing."""
         try:
@@ -398,279 +484,131 @@ class TesseractOCREngine:
         steps: List[PreprocessingStep]
     ) -> np.ndarray:
         """Apply preprocessing steps to improve OCR accuracy."""
-        try:
-            processed = image.copy()
-            
-            for step in steps:
-                if step == PreprocessingStep.GRAYSCALE:
-                    if len(processed.shape) == 3:
-                        processed = cv2.cvtColor(processed, cv2.COLOR_BGR2GRAY)
-                
-                elif step == PreprocessingStep.GAUSSIAN_BLUR:
-                    processed = cv2.GaussianBlur(processed, (5, 5), 0)
-                
-                elif step == PreprocessingStep.THRESHOLD:
-                    if len(processed.shape) == 3:
-                        processed = cv2.cvtColor(processed, cv2.COLOR_BGR2GRAY)
-                    _, processed = cv2.threshold(processed, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-                
-                elif step == PreprocessingStep.ADAPTIVE_THRESHOLD:
-                    if len(processed.shape) == 3:
-                        processed = cv2.cvtColor(processed, cv2.COLOR_BGR2GRAY)
-                    processed = cv2.adaptiveThreshold(
-                        processed, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2
-                    )
-                
-                elif step == PreprocessingStep.MORPHOLOGICAL:
-                    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
-                    processed = cv2.morphologyEx(processed, cv2.MORPH_CLOSE, kernel)
-                
-                elif step == PreprocessingStep.DESKEW:
-                    processed = self._deskew_image(processed)
-                
-                elif step == PreprocessingStep.NOISE_REMOVAL:
-                    processed = cv2.medianBlur(processed, 3)
-                
-                elif step == PreprocessingStep.CONTRAST_ENHANCEMENT:
-                    processed = self._enhance_contrast(processed)
-                
-                elif step == PreprocessingStep.SHARPENING:
-                    kernel = np.array([[-1,-1,-1], [-1,9,-1], [-1,-1,-1]])
-                    processed = cv2.filter2D(processed, -1, kernel)
-                
-                elif step == PreprocessingStep.EDGE_DETECTION:
-                    # Use edge detection to enhance text boundaries
-                    edges = cv2.Canny(processed, 50, 150)
-                    processed = cv2.bitwise_or(processed, edges)
-                
-                elif step == PreprocessingStep.ROTATION_CORRECTION:
-                    processed = self._correct_rotation(processed)
-            
-            return processed
-            
-        except Exception as e:
-            self.logger.error(f"Error in image preprocessing: {e}")
-            return image
+        return preprocess_image(image, [step.value for step in steps])
 
     def _deskew_image(self, image: np.ndarray) -> np.ndarray:
         """Correct skew in scanned documents."""
-        try:
-            # Convert to grayscale if needed
-            if len(image.shape) == 3:
-                gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            else:
-                gray = image.copy()
-            
-            # Apply threshold to get binary image
-            _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
-            
-            # Find all white pixels
-            coords = np.column_stack(np.where(binary > 0))
-            
-            # Calculate the minimum area rectangle
-            angle = cv2.minAreaRect(coords)[-1]
-            
-            # Correct the angle
-            if angle < -45:
-                angle = -(90 + angle)
-            else:
-                angle = -angle
-            
-            # Rotate the image
-            if abs(angle) > 0.5:  # Only rotate if significant skew
-                h, w = image.shape[:2]
-                center = (w // 2, h // 2)
-                M = cv2.getRotationMatrix2D(center, angle, 1.0)
-                rotated = cv2.warpAffine(image, M, (w, h), flags=cv2.INTER_CUBIC, borderMode=cv2.BORDER_REPLICATE)
-                return rotated
-            
-            return image
-            
-        except Exception as e:
-            self.logger.error(f"Error in deskewing: {e}")
-            return image
+        return deskew_image(image)
 
     def _enhance_contrast(self, image: np.ndarray) -> np.ndarray:
         """Enhance image contrast for better OCR."""
-        try:
-            # Convert to PIL for easier enhancement
-            if len(image.shape) == 3:
-                pil_image = Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
-            else:
-                pil_image = Image.fromarray(image)
-            
-            # Enhance contrast
-            enhancer = ImageEnhance.Contrast(pil_image)
-            enhanced = enhancer.enhance(1.5)  # Increase contrast by 50%
-            
-            # Enhance sharpness
-            sharpness_enhancer = ImageEnhance.Sharpness(enhanced)
-            enhanced = sharpness_enhancer.enhance(1.2)
-            
-            # Convert back to OpenCV format
-            if len(image.shape) == 3:
-                return cv2.cvtColor(np.array(enhanced), cv2.COLOR_RGB2BGR)
-            else:
-                return np.array(enhanced)
-                
-        except Exception as e:
-            self.logger.error(f"Error enhancing contrast: {e}")
-            return image
+        return enhance_contrast(image)
 
     def _correct_rotation(self, image: np.ndarray) -> np.ndarray:
         """Detect and correct text rotation."""
-        try:
-            # Use Tesseract's orientation detection
-            osd = pytesseract.image_to_osd(image, output_type=pytesseract.Output.DICT)
-            rotation_angle = osd.get('rotate', 0)
-            
-            if rotation_angle != 0:
-                h, w = image.shape[:2]
-                center = (w // 2, h // 2)
-                M = cv2.getRotationMatrix2D(center, -rotation_angle, 1.0)
-                rotated = cv2.warpAffine(image, M, (w, h), flags=cv2.INTER_CUBIC, borderMode=cv2.BORDER_REPLICATE)
-                return rotated
-            
-            return image
-            
-        except Exception as e:
-            self.logger.error(f"Error in rotation correction: {e}")
-            return image
+        return correct_rotation(image)
 
-    async def _ocr_image(
-        self, 
-        image: np.ndarray, 
+    def _build_ocr_page(
+        self,
+        text: str,
+        data: Dict[str, List[Any]],
         page_num: int,
-        languages: List[str],
-        psm: int,
-        oem: int,
-        ocr_mode: OCRMode
-    ) -> Optional[OCRPage]:
-        """Perform OCR on a single image."""
-        try:
-            # Prepare Tesseract configuration
-            lang_string = '+'.join(languages)
-            custom_config = f'--oem {oem} --psm {psm}'
-            
-            # Add specific configurations for different modes
-            if ocr_mode == OCRMode.HANDWRITTEN:
-                custom_config += ' -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789.,!?;:()\'"- '
-            elif ocr_mode == OCRMode.MATHEMATICAL:
-                custom_config += ' -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+-=*/^()[]{}.,<>≤≥≠∞∑∏∫∂∇'
-            
-            # Get image dimensions
-            height, width = image.shape[:2]
-            dpi = 300  # Default DPI
-            
-            # Extract text
-            text = pytesseract.image_to_string(image, lang=lang_string, config=custom_config)
-            
-            # Get detailed data with bounding boxes and confidence scores
-            data = pytesseract.image_to_data(image, lang=lang_string, config=custom_config, output_type=pytesseract.Output.DICT)
-            
-            # Process word-level data
-            words = []
-            lines = []
-            regions = []
-            
-            current_line = None
-            line_words = []
-            
-            for i in range(len(data['text'])):
-                if int(data['conf'][i]) > 0:  # Only include recognized text
-                    word_text = data['text'][i].strip()
-                    if word_text:
-                        word = OCRWord(
-                            text=word_text,
-                            confidence=float(data['conf'][i]),
-                            bbox=(data['left'][i], data['top'][i], data['width'][i], data['height'][i]),
-                            line_num=data['line_num'][i],
-                            word_num=data['word_num'][i]
-                        )
-                        words.append(word)
-                        
-                        # Group words into lines
-                        if current_line is None or current_line != data['line_num'][i]:
-                            if current_line is not None and line_words:
-                                # Create line from accumulated words
-                                line_text = ' '.join([w.text for w in line_words])
-                                line_confidence = sum([w.confidence for w in line_words]) / len(line_words)
-                                
-                                # Calculate line bounding box
-                                min_x = min([w.bbox[0] for w in line_words])
-                                min_y = min([w.bbox[1] for w in line_words])
-                                max_x = max([w.bbox[0] + w.bbox[2] for w in line_words])
-                                max_y = max([w.bbox[1] + w.bbox[3] for w in line_words])
-                                
-                                line = OCRLine(
-                                    text=line_text,
-                                    confidence=line_confidence,
-                                    bbox=(min_x, min_y, max_x - min_x, max_y - min_y),
-                                    words=line_words.copy(),
-                                    line_num=current_line
-                                )
-                                lines.append(line)
+        width: int,
+        height: int,
+        dpi: int,
+        lang_string: str
+    ) -> OCRPage:
+        """Group Tesseract word data into lines and a page."""
+        # Process word-level data
+        words = []
+        lines = []
+        regions = []
+        
+        current_line = None
+        line_words = []
+        
+        for i in range(len(data['text'])):
+            if float(data['conf'][i]) > 0:  # Only include recognized text
+                word_text = data['text'][i].strip()
+                if word_text:
+                    word = OCRWord(
+                        text=word_text,
+                        confidence=float(data['conf'][i]),
+                        bbox=(data['left'][i], data['top'][i], data['width'][i], data['height'][i]),
+                        line_num=data['line_num'][i],
+                        word_num=data['word_num'][i]
+                    )
+                    words.append(word)
+                    
+                    # Group words into lines
+                    if current_line is None or current_line != data['line_num'][i]:
+                        if current_line is not None and line_words:
+                            # Create line from accumulated words
+                            line_text = ' '.join([w.text for w in line_words])
+                            line_confidence = sum([w.confidence for w in line_words]) / len(line_words)
                             
-                            current_line = data['line_num'][i]
-                            line_words = []
+                            # Calculate line bounding box
+                            min_x = min([w.bbox[0] for w in line_words])
+                            min_y = min([w.bbox[1] for w in line_words])
+                            max_x = max([w.bbox[0] + w.bbox[2] for w in line_words])
+                            max_y = max([w.bbox[1] + w.bbox[3] for w in line_words])
+                            
+                            line = OCRLine(
+                                text=line_text,
+                                confidence=line_confidence,
+                                bbox=(min_x, min_y, max_x - min_x, max_y - min_y),
+                                words=line_words.copy(),
+                                line_num=current_line
+                            )
+                            lines.append(line)
                         
-                        line_words.append(word)
-            
-            # Add last line
-            if line_words:
-                line_text = ' '.join([w.text for w in line_words])
-                line_confidence = sum([w.confidence for w in line_words]) / len(line_words)
-                
-                min_x = min([w.bbox[0] for w in line_words])
-                min_y = min([w.bbox[1] for w in line_words])
-                max_x = max([w.bbox[0] + w.bbox[2] for w in line_words])
-                max_y = max([w.bbox[1] + w.bbox[3] for w in line_words])
-                
-                line = OCRLine(
-                    text=line_text,
-                    confidence=line_confidence,
-                    bbox=(min_x, min_y, max_x - min_x, max_y - min_y),
-                    words=line_words,
-                    line_num=current_line
-                )
-                lines.append(line)
-            
-            # Create main text region
-            if words:
-                main_region = OCRRegion(
-                    x=0,
-                    y=0,
-                    width=width,
-                    height=height,
-                    text=text,
-                    confidence=sum([w.confidence for w in words]) / len(words),
-                    word_count=len(words),
-                    line_count=len(lines),
-                    region_type="text",
-                    language=lang_string
-                )
-                regions.append(main_region)
-            
-            # Calculate page confidence
-            page_confidence = sum([w.confidence for w in words]) / len(words) if words else 0.0
-            
-            return OCRPage(
-                page_num=page_num,
-                text=text,
-                confidence=page_confidence,
+                        current_line = data['line_num'][i]
+                        line_words = []
+                    
+                    line_words.append(word)
+        
+        # Add last line
+        if line_words:
+            line_text = ' '.join([w.text for w in line_words])
+            line_confidence = sum([w.confidence for w in line_words]) / len(line_words)
+            
+            min_x = min([w.bbox[0] for w in line_words])
+            min_y = min([w.bbox[1] for w in line_words])
+            max_x = max([w.bbox[0] + w.bbox[2] for w in line_words])
+            max_y = max([w.bbox[1] + w.bbox[3] for w in line_words])
+            
+            line = OCRLine(
+                text=line_text,
+                confidence=line_confidence,
+                bbox=(min_x, min_y, max_x - min_x, max_y - min_y),
+                words=line_words,
+                line_num=current_line
+            )
+            lines.append(line)
+        
+        # Create main text region
+        if words:
+            main_region = OCRRegion(
+                x=0,
+                y=0,
                 width=width,
                 height=height,
-                dpi=dpi,
-                regions=regions,
-                lines=lines,
-                words=words,
-                preprocessing_applied=[],
-                processing_time=0.0
+                text=text,
+                confidence=sum([w.confidence for w in words]) / len(words),
+                word_count=len(words),
+                line_count=len(lines),
+                region_type="text",
+                language=lang_string
             )
-            
-        except Exception as e:
-            self.logger.error(f"Error in OCR processing for page {page_num}: {e}")
-            return None
+            regions.append(main_region)
+        
+        # Calculate page confidence
+        page_confidence = sum([w.confidence for w in words]) / len(words) if words else 0.0
+        
+        return OCRPage(
+            page_num=page_num,
+            text=text,
+            confidence=page_confidence,
+            width=width,
+            height=height,
+            dpi=dpi,
+            regions=regions,
+            lines=lines,
+            words=words,
+            preprocessing_applied=[],
+            processing_time=0.0
+        )
+        
 
     def _determine_confidence_level(self, confidence: float) -> ConfidenceLevel:
         """Determine confidence level from numeric score."""
@@ -0,0 +1,419 @@
+"""
+Page-parallel, streaming OCR pipeline.
+
+Pages are handed to a process pool one job at a time: each worker loads only
+its own page (a pypdf text layer, a single pdf2image rasterization or one
+TIFF frame), preprocesses it and runs Tesseract. The parent keeps at most
+``window`` pages in flight and yields results in page order as they finish,
+so peak memory is bounded by the window rather than the page count.
+
+Pages whose PDF text layer is already usable are not rasterized at all. When
+a cache is configured, OCR output is kept in an encrypted, size- and
+TTL-bounded disk cache keyed by a hash of the page image and OCR settings.
+"""
+from typing import Dict, List, Optional, Any, AsyncIterator, Callable, Tuple
+from dataclasses import dataclass, field, asdict
+from concurrent.futures import ProcessPoolExecutor
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+
+import cv2
+import numpy as np
+from PIL import Image, ImageEnhance
+import pytesseract
+import pdf2image
+from pypdf import PdfReader
+
+from ..core.encrypted_cache import EncryptedCacheConfig, EncryptedFileCache
+
+
+logger = logging.getLogger(__name__)
+
+# Preprocessing step values (PreprocessingStep enum values in ocr_engine)
+GRAYSCALE = "grayscale"
+GAUSSIAN_BLUR = "gaussian_blur"
+THRESHOLD = "threshold"
+ADAPTIVE_THRESHOLD = "adaptive_threshold"
+MORPHOLOGICAL = "morphological"
+DESKEW = "deskew"
+NOISE_REMOVAL = "noise_removal"
+CONTRAST_ENHANCEMENT = "contrast_enhancement"
+SHARPENING = "sharpening"
+EDGE_DETECTION = "edge_detection"
+ROTATION_CORRECTION = "rotation_correction"
+
+CHAR_WHITELISTS = {
+    "handwritten": "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789.,!?;:()'\"- ",
+    "mathematical": "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+-=*/^()[]{}.,<>≤≥≠∞∑∏∫∂∇",
+}
+
+
+@dataclass
+class OCRSettings:
+    """Everything a worker needs to OCR one page; also the cache key material."""
+    languages: List[str] = field(default_factory=lambda: ["eng"])
+    psm: int = 3
+    oem: int = 3
+    ocr_mode: str = "mixed"
+    preprocessing: List[str] = field(default_factory=list)
+    dpi: int = 300
+    tesseract_cmd: Optional[str] = None
+
+    @property
+    def lang_string(self) -> str:
+        return "+".join(self.languages)
+
+    def tesseract_config(self) -> str:
+        config = f"--oem {self.oem} --psm {self.psm}"
+        whitelist = CHAR_WHITELISTS.get(self.ocr_mode)
+        if whitelist:
+            config += f" -c tessedit_char_whitelist={whitelist}"
+        return config
+
+    def fingerprint(self) -> str:
+        material = {k: v for k, v in asdict(self).items() if k != "tesseract_cmd"}
+        return json.dumps(material, sort_keys=True)
+
+
+@dataclass
+class PageJob:
+    """One page of one source file."""
+    path: str
+    kind: str  # "pdf" or "image"
+    page_index: int  # 0-based
+    settings: OCRSettings
+    cache: Optional[EncryptedCacheConfig] = None
+    min_text_layer_chars: int = 50
+    recognizer: Optional[Callable[[np.ndarray, OCRSettings], Dict[str, Any]]] = None
+
+
+# Image preprocessing (module level so worker processes can run it)
+
+def preprocess_image(image: np.ndarray, steps: List[str]) -> np.ndarray:
+    """Apply preprocessing steps to improve OCR accuracy."""
+    try:
+        processed = image.copy()
+
+        for step in steps:
+            if step == GRAYSCALE:
+                if len(processed.shape) == 3:
+                    processed = cv2.cvtColor(processed, cv2.COLOR_BGR2GRAY)
+
+            elif step == GAUSSIAN_BLUR:
+                processed = cv2.GaussianBlur(processed, (5, 5), 0)
+
+            elif step == THRESHOLD:
+                if len(processed.shape) == 3:
+                    processed = cv2.cvtColor(processed, cv2.COLOR_BGR2GRAY)
+                _, processed = cv2.threshold(processed, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+
+            elif step == ADAPTIVE_THRESHOLD:
+                if len(processed.shape) == 3:
+                    processed = cv2.cvtColor(processed, cv2.COLOR_BGR2GRAY)
+                processed = cv2.adaptiveThreshold(
+                    processed, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2
+                )
+
+            elif step == MORPHOLOGICAL:
+                kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
+                processed = cv2.morphologyEx(processed, cv2.MORPH_CLOSE, kernel)
+
+            elif step == DESKEW:
+                processed = deskew_image(processed)
+
+            elif step == NOISE_REMOVAL:
+                processed = cv2.medianBlur(processed, 3)
+
+            elif step == CONTRAST_ENHANCEMENT:
+                processed = enhance_contrast(processed)
+
+            elif step == SHARPENING:
+                kernel = np.array([[-1,-1,-1], [-1,9,-1], [-1,-1,-1]])
+                processed = cv2.filter2D(processed, -1, kernel)
+
+            elif step == EDGE_DETECTION:
+                # Use edge detection to enhance text boundaries
+                edges = cv2.Canny(processed, 50, 150)
+                processed = cv2.bitwise_or(processed, edges)
+
+            elif step == ROTATION_CORRECTION:
+                processed = correct_rotation(processed)
+
+        return processed
+
+    except Exception as e:
+        logger.error(f"Error in image preprocessing: {e}")
+        return image
+
+
+def deskew_image(image: np.ndarray) -> np.ndarray:
+    """Correct skew in scanned documents."""
+    try:
+        # Convert to grayscale if needed
+        if len(image.shape) == 3:
+            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        else:
+            gray = image.copy()
+
+        # Apply threshold to get binary image
+        _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+
+        # Find all white pixels
+        coords = np.column_stack(np.where(binary > 0))
+        if len(coords) == 0:
+            return image
+
+        # Calculate the minimum area rectangle
+        angle = cv2.minAreaRect(coords)[-1]
+
+        # Correct the angle
+        if angle < -45:
+            angle = -(90 + angle)
+        else:
+            angle = -angle
+
+        # Rotate the image
+        if abs(angle) > 0.5:  # Only rotate if significant skew
+            h, w = image.shape[:2]
+            center = (w // 2, h // 2)
+            M = cv2.getRotationMatrix2D(center, angle, 1.0)
+            return cv2.warpAffine(image, M, (w, h), flags=cv2.INTER_CUBIC, borderMode=cv2.BORDER_REPLICATE)
+
+        return image
+
+    except Exception as e:
+        logger.error(f"Error in deskewing: {e}")
+        return image
+
+
+def enhance_contrast(image: np.ndarray) -> np.ndarray:
+    """Enhance image contrast for better OCR."""
+    try:
+        # Convert to PIL for easier enhancement
+        if len(image.shape) == 3:
+            pil_image = Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+        else:
+            pil_image = Image.fromarray(image)
+
+        # Increase contrast by 50%, then sharpen slightly
+        enhanced = ImageEnhance.Contrast(pil_image).enhance(1.5)
+        enhanced = ImageEnhance.Sharpness(enhanced).enhance(1.2)
+
+        # Convert back to OpenCV format
+        if len(image.shape) == 3:
+            return cv2.cvtColor(np.array(enhanced), cv2.COLOR_RGB2BGR)
+        return np.array(enhanced)
+
+    except Exception as e:
+        logger.error(f"Error enhancing contrast: {e}")
+        return image
+
+
+def correct_rotation(image: np.ndarray) -> np.ndarray:
+    """Detect and correct text rotation."""
+    try:
+        # Use Tesseract's orientation detection
+        osd = pytesseract.image_to_osd(image, output_type=pytesseract.Output.DICT)
+        rotation_angle = osd.get('rotate', 0)
+
+        if rotation_angle != 0:
+            h, w = image.shape[:2]
+            center = (w // 2, h // 2)
+            M = cv2.getRotationMatrix2D(center, -rotation_angle, 1.0)
+            return cv2.warpAffine(image, M, (w, h), flags=cv2.INTER_CUBIC, borderMode=cv2.BORDER_REPLICATE)
+
+        return image
+
+    except Exception as e:
+        logger.error(f"Error in rotation correction: {e}")
+        return image
+
+
+# Page loading
+
+def usable_text_layer(text: Optional[str], min_chars: int = 50) -> bool:
+    """True when an embedded text layer is substantial and mostly readable characters."""
+    if not text:
+        return False
+    stripped = "".join(text.split())
+    if len(stripped) < min_chars:
+        return False
+    readable = sum(1 for ch in stripped if ch.isalnum() or ch in ".,;:!?'\"()-$%&/§")
+    letters = sum(1 for ch in stripped if ch.isalpha())
+    return readable / len(stripped) >= 0.9 and letters / len(stripped) >= 0.5
+
+
+# One open reader per worker process; jobs for the same file reuse it
+_pdf_readers: Dict[str, Tuple[float, PdfReader]] = {}
+
+
+def _pdf_reader(path: str) -> PdfReader:
+    mtime = os.path.getmtime(path)
+    cached = _pdf_readers.get(path)
+    if cached is None or cached[0] != mtime:
+        _pdf_readers.clear()
+        cached = _pdf_readers[path] = (mtime, PdfReader(path))
+    return cached[1]
+
+
+def count_pages(path: str, kind: str) -> int:
+    """Page count without loading page content."""
+    if kind == "pdf":
+        return len(_pdf_reader(path).pages)
+    with Image.open(path) as image:
+        return getattr(image, "n_frames", 1)
+
+
+def load_page_image(job: PageJob) -> np.ndarray:
+    """Rasterize or read exactly one page as a BGR array."""
+    if job.kind == "pdf":
+        pil_pages = pdf2image.convert_from_path(
+            job.path,
+            dpi=job.settings.dpi,
+            fmt='RGB',
+            first_page=job.page_index + 1,
+            last_page=job.page_index + 1
+        )
+        pil_image = pil_pages[0]
+    else:
+        with Image.open(job.path) as image:
+            image.seek(job.page_index)
+            pil_image = image.convert("RGB")
+    return cv2.cvtColor(np.array(pil_image), cv2.COLOR_RGB2BGR)
+
+
+def page_image_hash(image: np.ndarray, settings: OCRSettings) -> str:
+    """Cache key: page pixels plus the OCR settings that shape the output."""
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(str(image.shape).encode())
+    digest.update(np.ascontiguousarray(image).data)
+    digest.update(settings.fingerprint().encode())
+    return digest.hexdigest()
+
+
+class OCRPageCache(EncryptedFileCache):
+    """OCR output per page-image hash, one encrypted JSON entry per file."""
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        data = super().get(key)
+        return json.loads(data) if data is not None else None
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        super().put(key, json.dumps(value).encode())
+
+
+def tesseract_recognize(image: np.ndarray, settings: OCRSettings) -> Dict[str, Any]:
+    """Run Tesseract once for text and once for word boxes and confidences."""
+    if settings.tesseract_cmd:
+        pytesseract.pytesseract.tesseract_cmd = settings.tesseract_cmd
+    config = settings.tesseract_config()
+    text = pytesseract.image_to_string(image, lang=settings.lang_string, config=config)
+    data = pytesseract.image_to_data(
+        image, lang=settings.lang_string, config=config, output_type=pytesseract.Output.DICT
+    )
+    return {"text": text, "data": {key: list(values) for key, values in data.items()}}
+
+
+def ocr_page_worker(job: PageJob) -> Dict[str, Any]:
+    """Process one page in a worker: text layer, cache lookup, or preprocess + OCR."""
+    start = time.perf_counter()
+    result: Dict[str, Any] = {"page_num": job.page_index + 1, "dpi": job.settings.dpi}
+
+    if job.kind == "pdf":
+        text = _pdf_reader(job.path).pages[job.page_index].extract_text() or ""
+        if usable_text_layer(text, job.min_text_layer_chars):
+            result.update(source="text_layer", text=text, data=None, width=0, height=0,
+                          processing_time=time.perf_counter() - start)
+            return result
+
+    image = load_page_image(job)
+    height, width = image.shape[:2]
+    result.update(width=width, height=height)
+
+    cache = OCRPageCache(job.cache) if job.cache else None
+    key = page_image_hash(image, job.settings) if cache else None
+    cached = cache.get(key) if cache else None
+    if cached is not None:
+        result.update(source="cache", processing_time=time.perf_counter() - start, **cached)
+        return result
+
+    processed = preprocess_image(image, job.settings.preprocessing)
+    del image
+    recognized = (job.recognizer or tesseract_recognize)(processed, job.settings)
+    if cache:
+        cache.put(key, recognized)
+
+    result.update(source="ocr", processing_time=time.perf_counter() - start, **recognized)
+    return result
+
+
+class OCRPipeline:
+    """Bounded, in-order streaming of per-page OCR results from a process pool."""
+
+    def __init__(self,
+                 max_workers: Optional[int] = None,
+                 window: Optional[int] = None,
+                 cache: Optional[EncryptedCacheConfig] = None,
+                 min_text_layer_chars: int = 50,
+                 recognizer: Optional[Callable[[np.ndarray, OCRSettings], Dict[str, Any]]] = None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        # Enough pages queued to keep every worker busy, no more
+        self.window = window or self.max_workers * 2
+        # Workers open the cache per page; the parent only evicts
+        self.cache = cache
+        self._evictor = EncryptedFileCache(cache) if cache else None
+        self.min_text_layer_chars = min_text_layer_chars
+        self.recognizer = recognizer
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.max_in_flight = 0
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    async def iter_pages(self, path: str, kind: str, settings: OCRSettings) -> AsyncIterator[Dict[str, Any]]:
+        """Yield per-page worker results in page order as they complete."""
+        loop = asyncio.get_running_loop()
+        page_count = await loop.run_in_executor(None, count_pages, path, kind)
+
+        pending: Dict[int, asyncio.Future] = {}
+        next_to_submit = 0
+        try:
+            for page_index in range(page_count):
+                while next_to_submit < page_count and len(pending) < self.window:
+                    job = PageJob(
+                        path=path,
+                        kind=kind,
+                        page_index=next_to_submit,
+                        settings=settings,
+                        cache=self.cache,
+                        min_text_layer_chars=self.min_text_layer_chars,
+                        recognizer=self.recognizer
+                    )
+                    pending[next_to_submit] = loop.run_in_executor(self.executor, ocr_page_worker, job)
+                    next_to_submit += 1
+                self.max_in_flight = max(self.max_in_flight, len(pending))
+
+                try:
+                    result = await pending.pop(page_index)
+                except Exception as e:
+                    logger.error(f"Error in OCR processing for page {page_index + 1}: {e}")
+                    result = {"page_num": page_index + 1, "source": "error", "error": str(e)}
+                yield result
+        finally:
+            for future in pending.values():
+                future.cancel()
+
+        if self._evictor:
+            await loop.run_in_executor(None, self._evictor.evict_if_due)
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
@@ -5,6 +5,7 @@ Abstract base class for court system adapters providing common
 interface for different e-filing systems.
 """
 
+import asyncio
 from abc import ABC, abstractmethod
 from decimal import Decimal
 from typing import Dict, List, Optional
@@ -28,6 +29,7 @@ class BaseCourtAdapter(ABC):
         self.base_url: Optional[str] = None
         self.timeout_seconds = 30
         self.max_retries = 3
+        self.max_status_concurrency = 10
         
     @abstractmethod
     async def submit_filing(
@@ -52,6 +54,24 @@ class BaseCourtAdapter(ABC):
         """
         pass
     
+    async def check_filing_statuses(
+        self,
+        external_filing_ids: List[str],
+        credentials: EFilingCredentials
+    ) -> Dict[str, FilingResponse]:
+        """
+        Check the status of several filings, keyed by external filing ID.
+        Fans out to check_filing_status, at most max_status_concurrency at
+        once; adapters for systems with a batch query override this.
+        """
+        semaphore = asyncio.Semaphore(self.max_status_concurrency)
+        
+        async def check(external_filing_id: str):
+            async with semaphore:
+                return external_filing_id, await self.check_filing_status(external_filing_id, credentials)
+        
+        return dict(await asyncio.gather(*(check(i) for i in external_filing_ids)))
+    
     @abstractmethod
     async def cancel_filing(
         self,
@@ -183,25 +183,7 @@ class FederalCourtAdapter(BaseCourtAdapter):
                 credentials
             )
             
-            if status_result.get("found"):
-                filing_status = self._map_cmecf_status(status_result.get("status"))
-                
-                return FilingResponse(
-                    filing_id=UUID("00000000-0000-0000-0000-000000000000"),
-                    success=True,
-                    status=filing_status,
-                    message=f"Filing status: {filing_status.value}",
-                    transaction_id=external_filing_id,
-                    service_complete=status_result.get("service_complete", False)
-                )
-            else:
-                return FilingResponse(
-                    filing_id=UUID("00000000-0000-0000-0000-000000000000"),
-                    success=False,
-                    status=FilingStatus.REJECTED,
-                    message="Filing not found in CM/ECF system",
-                    errors=["Filing ID not found"]
-                )
+            return self._status_response(external_filing_id, status_result)
                 
         except Exception as e:
             logger.error(f"Federal status check failed: {str(e)}")
@@ -213,6 +195,44 @@ class FederalCourtAdapter(BaseCourtAdapter):
                 errors=[str(e)]
             )
     
+    async def check_filing_statuses(
+        self,
+        external_filing_ids: List[str],
+        credentials: EFilingCredentials
+    ) -> Dict[str, FilingResponse]:
+        """
+        Check several filings in CM/ECF with a single login
+        """
+        try:
+            auth_result = await self.authenticate(credentials)
+            if not auth_result.get("success"):
+                return {
+                    external_filing_id: FilingResponse(
+                        filing_id=UUID("00000000-0000-0000-0000-000000000000"),
+                        success=False,
+                        status=FilingStatus.REJECTED,
+                        message="Authentication failed for status check",
+                        errors=[auth_result.get("error", "Auth error")]
+                    )
+                    for external_filing_id in external_filing_ids
+                }
+            
+            session_token = auth_result.get("session_token")
+            semaphore = asyncio.Semaphore(self.max_status_concurrency)
+            
+            async def check(external_filing_id: str):
+                async with semaphore:
+                    status_result = await self._query_cmecf_status(
+                        external_filing_id, session_token, credentials
+                    )
+                    return external_filing_id, self._status_response(external_filing_id, status_result)
+            
+            return dict(await asyncio.gather(*(check(i) for i in external_filing_ids)))
+            
+        except Exception as e:
+            logger.error(f"Federal batch status check failed: {str(e)}")
+            return {}
+    
     async def cancel_filing(
         self,
         external_filing_id: str,
@@ -583,6 +603,30 @@ class FederalCourtAdapter(BaseCourtAdapter):
                 "error": str(e)
             }
     
+    def _status_response(self, external_filing_id: str, status_result: Dict) -> FilingResponse:
+        """
+        Build the status response for a CM/ECF status query result
+        """
+        if status_result.get("found"):
+            filing_status = self._map_cmecf_status(status_result.get("status"))
+            
+            return FilingResponse(
+                filing_id=UUID("00000000-0000-0000-0000-000000000000"),
+                success=True,
+                status=filing_status,
+                message=f"Filing status: {filing_status.value}",
+                transaction_id=external_filing_id,
+                service_complete=status_result.get("service_complete", False)
+            )
+        else:
+            return FilingResponse(
+                filing_id=UUID("00000000-0000-0000-0000-000000000000"),
+                success=False,
+                status=FilingStatus.REJECTED,
+                message="Filing not found in CM/ECF system",
+                errors=["Filing ID not found"]
+            )
+    
     def _map_cmecf_status(self, cmecf_status: str) -> FilingStatus:
         """
         Map CM/ECF status to internal filing status
@@ -204,38 +204,7 @@ class StateCourtAdapter(BaseCourtAdapter):
                 credentials
             )
             
-            if status_result.get("found"):
-                filing_status = self._map_state_status(status_result.get("status"))
-                
-                response = FilingResponse(
-                    filing_id=UUID("00000000-0000-0000-0000-000000000000"),
-                    success=True,
-                    status=filing_status,
-                    message=f"Filing status: {filing_status.value}",
-                    transaction_id=external_filing_id,
-                    service_complete=status_result.get("service_complete", False)
-                )
-                
-                # Add state-specific status information
-                if status_result.get("court_response"):
-                    response.next_actions.append("Review court response")
-                
-                if status_result.get("hearing_scheduled"):
-                    response.deadlines.append({
-                        "type": "hearing",
-                        "date": status_result.get("hearing_date"),
-                        "description": "Court hearing scheduled"
-                    })
-                
-                return response
-            else:
-                return FilingResponse(
-                    filing_id=UUID("00000000-0000-0000-0000-000000000000"),
-                    success=False,
-                    status=FilingStatus.REJECTED,
-                    message="Filing not found in state court system",
-                    errors=["Filing ID not found"]
-                )
+            return self._status_response(external_filing_id, status_result)
                 
         except Exception as e:
             logger.error(f"State status check failed: {str(e)}")
@@ -247,6 +216,44 @@ class StateCourtAdapter(BaseCourtAdapter):
                 errors=[str(e)]
             )
     
+    async def check_filing_statuses(
+        self,
+        external_filing_ids: List[str],
+        credentials: EFilingCredentials
+    ) -> Dict[str, FilingResponse]:
+        """
+        Check several filings in the state court system with a single login
+        """
+        try:
+            auth_result = await self.authenticate(credentials)
+            if not auth_result.get("success"):
+                return {
+                    external_filing_id: FilingResponse(
+                        filing_id=UUID("00000000-0000-0000-0000-000000000000"),
+                        success=False,
+                        status=FilingStatus.REJECTED,
+                        message="Authentication failed for status check",
+                        errors=[auth_result.get("error", "Auth error")]
+                    )
+                    for external_filing_id in external_filing_ids
+                }
+            
+            session_token = auth_result.get("session_token")
+            semaphore = asyncio.Semaphore(self.max_status_concurrency)
+            
+            async def check(external_filing_id: str):
+                async with semaphore:
+                    status_result = await self._query_state_status(
+                        external_filing_id, session_token, credentials
+                    )
+                    return external_filing_id, self._status_response(external_filing_id, status_result)
+            
+            return dict(await asyncio.gather(*(check(i) for i in external_filing_ids)))
+            
+        except Exception as e:
+            logger.error(f"State batch status check failed: {str(e)}")
+            return {}
+    
     async def cancel_filing(
         self,
         external_filing_id: str,
@@ -735,6 +742,41 @@ class StateCourtAdapter(BaseCourtAdapter):
         
         return actions
     
+    def _status_response(self, external_filing_id: str, status_result: Dict) -> FilingResponse:
+        """Build the status response for a state system status query result"""
+        if status_result.get("found"):
+            filing_status = self._map_state_status(status_result.get("status"))
+            
+            response = FilingResponse(
+                filing_id=UUID("00000000-0000-0000-0000-000000000000"),
+                success=True,
+                status=filing_status,
+                message=f"Filing status: {filing_status.value}",
+                transaction_id=external_filing_id,
+                service_complete=status_result.get("service_complete", False)
+            )
+            
+            # Add state-specific status information
+            if status_result.get("court_response"):
+                response.next_actions.append("Review court response")
+            
+            if status_result.get("hearing_scheduled"):
+                response.deadlines.append({
+                    "type": "hearing",
+                    "date": status_result.get("hearing_date"),
+                    "description": "Court hearing scheduled"
+                })
+            
+            return response
+        else:
+            return FilingResponse(
+                filing_id=UUID("00000000-0000-0000-0000-000000000000"),
+                success=False,
+                status=FilingStatus.REJECTED,
+                message="Filing not found in state court system",
+                errors=["Filing ID not found"]
+            )
+    
     def _map_state_status(self, state_status: str) -> FilingStatus:
         """Map state system status to internal filing status"""
         status_mapping = {
@@ -6,11 +6,13 @@ validation, conversion, and metadata extraction.
 """
 
 from .document_processor import DocumentProcessor
+from .filing_pipeline import FilingPipeline
 from .pdf_processor import PDFProcessor  
 from .metadata_extractor import MetadataExtractor
 
 __all__ = [
     "DocumentProcessor",
+    "FilingPipeline",
     "PDFProcessor",
     "MetadataExtractor"
 ]
\ No newline at end of file
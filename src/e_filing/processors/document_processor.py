@@ -12,7 +12,17 @@ from datetime import datetime
 from typing import Dict, List, Optional, Tuple
 from uuid import UUID
 
+from ...core.encrypted_cache import EncryptedCacheConfig
 from ..models import CourtDocument, DocumentMetadata, DocumentType
+from .filing_pipeline import (
+    REDACTION_INDICATORS,
+    ContentScan,
+    FilingPipeline,
+    extract_pdf_text,
+    extract_word_text,
+    text_to_pdf,
+    word_to_pdf
+)
 
 logger = logging.getLogger(__name__)
 
@@ -34,6 +44,12 @@ class DocumentProcessor:
         self.max_file_size_bytes = 50 * 1024 * 1024  # 50MB default
         self.max_page_count = 500
         
+        # Batch preparation: documents in flight and the encrypted cache of
+        # conversion/extraction results, off unless EFILING_CACHE_DIR/_KEY are set
+        self.max_concurrent_documents = 8
+        self.preparation_cache = EncryptedCacheConfig.from_env("EFILING_CACHE")
+        self._pipeline: Optional[FilingPipeline] = None
+        
         # Document type detection patterns
         self.type_patterns = {
             DocumentType.COMPLAINT: [
@@ -70,6 +86,17 @@ class DocumentProcessor:
         
         logger.info("Document processor initialized")
     
+    @property
+    def pipeline(self) -> FilingPipeline:
+        """Filing preparation pipeline used for batches, created on first use"""
+        if self._pipeline is None:
+            self._pipeline = FilingPipeline(
+                self,
+                max_concurrency=self.max_concurrent_documents,
+                cache=self.preparation_cache
+            )
+        return self._pipeline
+    
     async def process_document(self, document: CourtDocument) -> CourtDocument:
         """
         Process a court document for e-filing including validation,
@@ -172,9 +199,14 @@ class DocumentProcessor:
             logger.error(f"Document validation error: {str(e)}")
             return [f"Validation error: {str(e)}"]
     
-    async def extract_metadata(self, document: CourtDocument) -> DocumentMetadata:
+    async def extract_metadata(
+        self,
+        document: CourtDocument,
+        scan: Optional[ContentScan] = None
+    ) -> DocumentMetadata:
         """
-        Extract and enhance document metadata
+        Extract and enhance document metadata. Page count and redactions come
+        from ``scan`` when the content has already been scanned.
         """
         try:
             metadata = document.metadata
@@ -194,7 +226,10 @@ class DocumentProcessor:
             if (document.mime_type == "application/pdf" and 
                 not metadata.page_count and 
                 document.file_content):
-                page_count = await self._extract_pdf_page_count(document.file_content)
+                if scan:
+                    page_count = scan.page_count
+                else:
+                    page_count = await self._extract_pdf_page_count(document.file_content)
                 metadata.page_count = page_count
             
             # Generate description if not provided
@@ -204,7 +239,9 @@ class DocumentProcessor:
                 )
             
             # Set redacted flag based on content analysis
-            if document.file_content:
+            if scan:
+                metadata.redacted = scan.redacted
+            elif document.file_content:
                 is_redacted = await self._check_for_redactions(document.file_content)
                 metadata.redacted = is_redacted
             
@@ -352,8 +389,7 @@ class DocumentProcessor:
         try:
             # Simple check for redaction indicators
             content_str = file_content.decode('utf-8', errors='ignore').lower()
-            redaction_indicators = ['[redacted]', '***', 'blacked out', 'redaction']
-            return any(indicator in content_str for indicator in redaction_indicators)
+            return any(indicator in content_str for indicator in REDACTION_INDICATORS)
         except:
             return False
     
@@ -362,18 +398,14 @@ class DocumentProcessor:
         Convert text content to PDF
         In production, would use libraries like reportlab
         """
-        # Placeholder - would implement actual text to PDF conversion
-        logger.info("Converting text to PDF (placeholder)")
-        return text_content  # Placeholder
+        return text_to_pdf(text_content)
     
     async def _word_to_pdf(self, word_content: bytes) -> bytes:
         """
         Convert Word document to PDF
         In production, would use libraries like python-docx + reportlab
         """
-        # Placeholder - would implement actual Word to PDF conversion
-        logger.info("Converting Word document to PDF (placeholder)")
-        return word_content  # Placeholder
+        return word_to_pdf(word_content)
     
     async def _extract_pdf_text(self, pdf_content: bytes) -> str:
         """
@@ -381,18 +413,8 @@ class DocumentProcessor:
         In production, would use PyPDF2, pdfplumber, or similar
         """
         try:
-            # Placeholder for PDF text extraction
-            # In production, would use proper PDF parsing
             content_str = pdf_content.decode('latin-1', errors='ignore')
-            
-            # Extract basic text (very simplified)
-            text_parts = []
-            lines = content_str.split('\n')
-            for line in lines:
-                if line.strip() and not line.startswith('%') and not line.startswith('<<'):
-                    text_parts.append(line.strip())
-            
-            return ' '.join(text_parts[:1000])  # Limit extraction for demo
+            return extract_pdf_text(content_str.split('\n'))
         except:
             return ""
     
@@ -402,29 +424,16 @@ class DocumentProcessor:
         In production, would use python-docx or similar
         """
         try:
-            # Placeholder for Word text extraction
-            logger.info("Extracting text from Word document (placeholder)")
-            return "Word document text extraction placeholder"
+            return extract_word_text(word_content)
         except:
             return ""
     
     async def batch_process_documents(self, documents: List[CourtDocument]) -> List[CourtDocument]:
         """
-        Process multiple documents in batch
+        Process multiple documents in batch, concurrently through the
+        filing preparation pipeline; results keep the input order
         """
-        processed_documents = []
-        
-        for document in documents:
-            try:
-                processed_doc = await self.process_document(document)
-                processed_documents.append(processed_doc)
-            except Exception as e:
-                logger.error(f"Batch processing failed for {document.file_name}: {str(e)}")
-                document.validation_errors.append(f"Batch processing error: {str(e)}")
-                document.status = "processing_failed"
-                processed_documents.append(document)
-        
-        return processed_documents
+        return await self.pipeline.prepare_documents(documents)
     
     def get_processing_stats(self) -> Dict[str, any]:
         """
@@ -434,6 +443,7 @@ class DocumentProcessor:
             "supported_formats": self.supported_formats,
             "max_file_size_mb": self.max_file_size_bytes / (1024 * 1024),
             "max_page_count": self.max_page_count,
+            "max_concurrent_documents": self.max_concurrent_documents,
             "supported_document_types": [dt.value for dt in DocumentType],
             "processor_version": "1.0.0"
         }
\ No newline at end of file
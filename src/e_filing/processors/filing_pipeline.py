@@ -0,0 +1,382 @@
+"""
+Filing Preparation Pipeline
+
+Concurrent preparation of a filing's documents. Each document is spooled to a
+temporary file in fixed-size chunks; the same pass computes its SHA-256, size,
+page markers and redaction indicators, so the bytes are never decoded whole on
+the event loop. PDF conversion and text extraction run in a process pool and
+read from the spooled file. When a cache is configured, their results (and
+the converted PDF) are kept in an encrypted, size- and TTL-bounded disk cache
+by content hash and MIME type, so resubmitting or retrying a filing skips the
+rework.
+
+Conversion and extraction functions live at module level so worker processes
+can run them; DocumentProcessor uses the same functions in-process.
+"""
+
+import asyncio
+import codecs
+import hashlib
+import itertools
+import json
+import logging
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from ...core.encrypted_cache import EncryptedCacheConfig, EncryptedFileCache
+from ..models import CourtDocument
+
+logger = logging.getLogger(__name__)
+
+PDF_MIME_TYPE = "application/pdf"
+WORD_MIME_TYPES = [
+    "application/msword",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+]
+PAGE_MARKER = b"/Type/Page"
+REDACTION_INDICATORS = ['[redacted]', '***', 'blacked out', 'redaction']
+PDF_TEXT_LINE_LIMIT = 1000
+
+# Bump when conversion or extraction output changes, to retire cached results
+PREPARATION_VERSION = "1"
+
+
+# Conversion and extraction (module level so worker processes can run them)
+
+def text_to_pdf(text_content: bytes) -> bytes:
+    """
+    Convert text content to PDF
+    In production, would use libraries like reportlab
+    """
+    # Placeholder - would implement actual text to PDF conversion
+    logger.info("Converting text to PDF (placeholder)")
+    return text_content  # Placeholder
+
+
+def word_to_pdf(word_content: bytes) -> bytes:
+    """
+    Convert Word document to PDF
+    In production, would use libraries like python-docx + reportlab
+    """
+    # Placeholder - would implement actual Word to PDF conversion
+    logger.info("Converting Word document to PDF (placeholder)")
+    return word_content  # Placeholder
+
+
+def extract_pdf_text(lines: Iterable[str]) -> str:
+    """
+    Extract text from the lines of a PDF (decoded as latin-1)
+    In production, would use PyPDF2, pdfplumber, or similar
+    """
+    # Extract basic text (very simplified), stopping at the line limit
+    text_parts = (
+        line.strip() for line in lines
+        if line.strip() and not line.startswith('%') and not line.startswith('<<')
+    )
+    return ' '.join(itertools.islice(text_parts, PDF_TEXT_LINE_LIMIT))
+
+
+def extract_word_text(word_content: bytes) -> str:
+    """
+    Extract text from Word document
+    In production, would use python-docx or similar
+    """
+    # Placeholder for Word text extraction
+    logger.info("Extracting text from Word document (placeholder)")
+    return "Word document text extraction placeholder"
+
+
+def pdf_file_lines(path: str) -> Iterable[str]:
+    """Lines of a file split on newlines and decoded as latin-1, read lazily."""
+    with open(path, 'rb') as f:
+        for raw in f:
+            yield raw[:-1].decode('latin-1') if raw.endswith(b'\n') else raw.decode('latin-1')
+
+
+def extract_text_file(path: str, mime_type: str) -> Optional[str]:
+    """Text of a spooled document, as DocumentProcessor.extract_text_content reads it."""
+    if mime_type == PDF_MIME_TYPE:
+        return extract_pdf_text(pdf_file_lines(path))
+    elif mime_type == "text/plain":
+        return Path(path).read_bytes().decode('utf-8', errors='ignore')
+    elif mime_type in WORD_MIME_TYPES:
+        return extract_word_text(Path(path).read_bytes())
+    return None
+
+
+@dataclass
+class ContentScan:
+    """What one streaming pass over a document's bytes learns about it."""
+    file_hash: str
+    size_bytes: int
+    page_markers: int
+    redacted: bool
+
+    @property
+    def page_count(self) -> int:
+        return max(1, self.page_markers)  # At least 1 page
+
+
+class ContentScanner:
+    """Incremental SHA-256, page-marker count and redaction check over chunks."""
+
+    def __init__(self):
+        self._hash = hashlib.sha256()
+        self._size = 0
+        self._markers = 0
+        self._byte_tail = b""
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='ignore')
+        self._text_tail = ""
+        self._redacted = False
+
+    def update(self, chunk):
+        self._hash.update(chunk)
+        self._size += len(chunk)
+
+        # The carried tail is shorter than a marker, so nothing is counted twice
+        window = self._byte_tail + chunk
+        self._markers += window.count(PAGE_MARKER)
+        self._byte_tail = window[-(len(PAGE_MARKER) - 1):]
+
+        if not self._redacted:
+            text = self._text_tail + self._decoder.decode(chunk).lower()
+            self._redacted = any(indicator in text for indicator in REDACTION_INDICATORS)
+            self._text_tail = text[-(max(map(len, REDACTION_INDICATORS)) - 1):]
+
+    def result(self) -> ContentScan:
+        if not self._redacted:
+            text = self._text_tail + self._decoder.decode(b"", final=True).lower()
+            self._redacted = any(indicator in text for indicator in REDACTION_INDICATORS)
+        return ContentScan(
+            file_hash=self._hash.hexdigest(),
+            size_bytes=self._size,
+            page_markers=self._markers,
+            redacted=self._redacted
+        )
+
+
+def spool_content(content: bytes, directory: str, chunk_size: int) -> Tuple[str, ContentScan]:
+    """Write content to a temp file in chunks, scanning each chunk on the way."""
+    scanner = ContentScanner()
+    view = memoryview(content)
+    fd, path = tempfile.mkstemp(dir=directory, suffix=".spool")
+    with os.fdopen(fd, 'wb') as f:
+        for start in range(0, len(view), chunk_size):
+            chunk = view[start:start + chunk_size]
+            f.write(chunk)
+            scanner.update(chunk)
+    return path, scanner.result()
+
+
+@dataclass
+class PreparationJob:
+    """Conversion and extraction of one spooled document."""
+    path: str
+    mime_type: str
+    output_path: str
+
+
+def prepare_document_worker(job: PreparationJob) -> Dict[str, Any]:
+    """Convert to PDF if needed, then extract text; returns the results, not the text."""
+    path, mime_type, converted = job.path, job.mime_type, False
+
+    if mime_type != PDF_MIME_TYPE:
+        content = Path(path).read_bytes()
+        if mime_type == "text/plain":
+            converted_content = text_to_pdf(content)
+        elif mime_type in WORD_MIME_TYPES:
+            converted_content = word_to_pdf(content)
+        else:
+            converted_content = None
+        del content
+
+        if converted_content:
+            Path(job.output_path).write_bytes(converted_content)
+            path, mime_type, converted = job.output_path, PDF_MIME_TYPE, True
+
+    text = extract_text_file(path, mime_type)
+    return {
+        "converted": converted,
+        "mime_type": mime_type,
+        "word_count": len(text.split()) if text else None
+    }
+
+
+class PreparationCache(EncryptedFileCache):
+    """
+    Worker results by content hash and MIME type: one encrypted entry holding
+    the JSON result and any converted PDF, so neither is visible without the other.
+    """
+
+    @staticmethod
+    def key(file_hash: str, mime_type: str) -> str:
+        return hashlib.sha256(f"{file_hash}:{mime_type}:{PREPARATION_VERSION}".encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[Tuple[Dict[str, Any], Optional[bytes]]]:
+        data = super().get(key)
+        if data is None:
+            return None
+        header, _, converted = data.partition(b"\n")
+        entry = json.loads(header)
+        return entry, converted if entry.get("converted") else None
+
+    def put(self, key: str, entry: Dict[str, Any], converted: Optional[bytes] = None) -> None:
+        super().put(key, json.dumps(entry).encode() + b"\n" + (converted or b""))
+
+
+class FilingPipeline:
+    """Bounded-concurrency preparation of court documents for filing."""
+
+    def __init__(
+        self,
+        processor,
+        max_concurrency: int = 8,
+        max_workers: Optional[int] = None,
+        cache: Optional[EncryptedCacheConfig] = None,
+        spool_dir: Optional[str] = None,
+        chunk_size: int = 256 * 1024
+    ):
+        self.processor = processor
+        self.max_concurrency = max_concurrency
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.cache = PreparationCache(cache) if cache else None
+        self.spool_dir = spool_dir
+        self.chunk_size = chunk_size
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+        self.cache_hits = 0
+        self.worker_jobs = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    async def prepare_documents(self, documents: List[CourtDocument]) -> List[CourtDocument]:
+        """Prepare documents concurrently (at most ``max_concurrency`` at once), in input order."""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def prepare(document: CourtDocument) -> CourtDocument:
+            async with semaphore:
+                try:
+                    return await self.prepare_document(document)
+                except Exception as e:
+                    logger.error(f"Batch processing failed for {document.file_name}: {str(e)}")
+                    document.validation_errors.append(f"Batch processing error: {str(e)}")
+                    document.status = "processing_failed"
+                    return document
+
+        return list(await asyncio.gather(*(prepare(document) for document in documents)))
+
+    async def prepare_document(self, document: CourtDocument) -> CourtDocument:
+        """
+        Same steps and outcome as DocumentProcessor.process_document, with the
+        byte-level work streamed and the CPU-bound steps off the event loop.
+        """
+        if not document.file_content:
+            # Nothing to stream or convert
+            return await self.processor.process_document(document)
+
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        spooled: List[str] = []
+        try:
+            logger.info(f"Processing document: {document.file_name}")
+
+            # Validate document format
+            validation_errors = await self.processor.validate_document(document)
+            if validation_errors:
+                document.validation_errors.extend(validation_errors)
+                document.status = "validation_failed"
+                return document
+
+            # Spool, hash, count pages and check redactions in one pass
+            loop = asyncio.get_running_loop()
+            path, scan = await loop.run_in_executor(
+                None, spool_content, document.file_content, self._spool_dir(), self.chunk_size
+            )
+            spooled.append(path)
+
+            document.metadata = await self.processor.extract_metadata(document, scan)
+            document.metadata.file_hash = scan.file_hash
+            document.metadata.file_size_bytes = scan.size_bytes
+
+            # Convert and extract text in a worker, unless already cached
+            key = PreparationCache.key(scan.file_hash, document.mime_type)
+            cached = await loop.run_in_executor(None, self.cache.get, key) if self.cache else None
+            if cached is not None:
+                self.cache_hits += 1
+                result, converted = cached
+            else:
+                converted_path = path + ".pdf"
+                spooled.append(converted_path)
+                job = PreparationJob(path=path, mime_type=document.mime_type, output_path=converted_path)
+                self.worker_jobs += 1
+                result = await loop.run_in_executor(self.executor, prepare_document_worker, job)
+                converted = None
+                if result["converted"]:
+                    converted = await loop.run_in_executor(None, Path(converted_path).read_bytes)
+                if self.cache:
+                    await loop.run_in_executor(None, self.cache.put, key, result, converted)
+                    await loop.run_in_executor(None, self.cache.evict_if_due)
+
+            if result["converted"]:
+                document.file_content = converted
+                document.mime_type = PDF_MIME_TYPE
+                document.file_name = document.file_name.rsplit('.', 1)[0] + ".pdf"
+                logger.info(f"Document converted to PDF: {document.file_name}")
+
+            if result["word_count"] is not None:
+                document.metadata.word_count = result["word_count"]
+
+            # Validate final document
+            final_validation = await self.processor.validate_processed_document(document)
+            if final_validation:
+                document.validation_errors.extend(final_validation)
+                document.status = "processing_failed"
+            else:
+                document.status = "processed"
+
+            logger.info(f"Document processing completed: {document.file_name}")
+            return document
+
+        except Exception as e:
+            error_msg = f"Document processing failed: {str(e)}"
+            logger.error(error_msg)
+            document.validation_errors.append(error_msg)
+            document.status = "processing_failed"
+            return document
+
+        finally:
+            self.in_flight -= 1
+            for path in spooled:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def _spool_dir(self) -> str:
+        if self.spool_dir is None:
+            self.spool_dir = tempfile.mkdtemp(prefix="efiling-spool-")
+        return self.spool_dir
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_workers": self.max_workers,
+            "cache_hits": self.cache_hits,
+            "worker_jobs": self.worker_jobs,
+            "max_in_flight": self.max_in_flight
+        }
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
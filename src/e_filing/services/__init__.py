@@ -8,10 +8,12 @@ from .filing_service import EFilingService
 from .court_service import CourtService
 from .document_service import DocumentService
 from .authentication_service import AuthenticationService
+from .status_reconciler import StatusReconciler
 
 __all__ = [
     "EFilingService",
     "CourtService", 
     "DocumentService",
-    "AuthenticationService"
+    "AuthenticationService",
+    "StatusReconciler"
 ]
\ No newline at end of file
@@ -25,6 +25,7 @@ from ..adapters.federal_adapter import FederalCourtAdapter
 from ..adapters.state_adapter import StateCourtAdapter
 from ..processors.document_processor import DocumentProcessor
 from ..validators.filing_validator import FilingValidator
+from .status_reconciler import StatusReconciler, StatusTransition
 
 logger = logging.getLogger(__name__)
 
@@ -47,6 +48,11 @@ class EFilingService:
         # Filing queues and tracking
         self.active_filings: Dict[UUID, FilingRequest] = {}
         self.filing_history: List[FilingResponse] = []
+        self.filing_index: Dict[UUID, FilingResponse] = {}  # First history entry per filing
+        
+        # Court-side status of submitted filings, polled in batches per court
+        self.status_reconciler = StatusReconciler(self._get_court_adapter)
+        self.status_reconciler.add_listener(self._on_status_transition)
         
         # Service configuration
         self.max_concurrent_filings = 10
@@ -55,6 +61,20 @@ class EFilingService:
         
         logger.info("E-Filing service initialized")
     
+    async def start(self):
+        """
+        Start background status reconciliation of submitted filings
+        """
+        self.status_reconciler.start()
+        logger.info("Filing status reconciliation started")
+    
+    async def stop(self):
+        """
+        Stop background status reconciliation
+        """
+        await self.status_reconciler.stop()
+        logger.info("Filing status reconciliation stopped")
+    
     async def submit_filing(
         self,
         filing_request: FilingRequest,
@@ -124,8 +144,10 @@ class EFilingService:
                 filing_request, credentials, "submit", submission_result.success
             )
             
-            # Add to history
-            self.filing_history.append(submission_result)
+            # Add to history and follow its status with the court
+            self._record_filing(submission_result)
+            if submission_result.success:
+                self.status_reconciler.track(filing_request, credentials)
             
             processing_time = (datetime.utcnow() - start_time).total_seconds()
             logger.info(f"Filing submission completed in {processing_time:.2f}s")
@@ -164,11 +186,14 @@ class EFilingService:
             filing_request = self.active_filings.get(filing_id)
             
             if not filing_request:
+                # Submitted filings are kept current by the status reconciler,
+                # which checks with the court if the filing is stale
+                tracked_status = await self.status_reconciler.current_status(filing_id)
+                if tracked_status:
+                    return tracked_status
+                
                 # Look for it in filing history
-                historical_filing = next(
-                    (f for f in self.filing_history if f.filing_id == filing_id),
-                    None
-                )
+                historical_filing = self.filing_index.get(filing_id)
                 if not historical_filing:
                     return FilingResponse(
                         filing_id=filing_id,
@@ -396,21 +421,34 @@ class EFilingService:
         """
         Process documents for filing (validation, conversion, etc.)
         """
-        processed_docs = []
-        
-        for doc in documents:
-            try:
-                # Process document
-                processed_doc = await self.document_processor.process_document(doc)
-                processed_docs.append(processed_doc)
-                
-            except Exception as e:
-                logger.error(f"Document processing failed for {doc.file_name}: {str(e)}")
-                doc.status = "processing_failed"
-                doc.validation_errors.append(str(e))
-                processed_docs.append(doc)
-        
-        return processed_docs
+        # Documents are prepared concurrently; per-document failures are
+        # recorded on the document itself
+        return await self.document_processor.batch_process_documents(documents)
+    
+    async def reconcile_filing_statuses(self) -> List[StatusTransition]:
+        """
+        Check every submitted filing that is due for a status check, with one
+        batched query per court; returns the status changes found. Runs on
+        its own once the service is started
+        """
+        return await self.status_reconciler.reconcile()
+    
+    async def _on_status_transition(self, transition: StatusTransition):
+        """
+        Record a court-side status change of a tracked filing
+        """
+        tracked = self.status_reconciler.get(transition.filing_id)
+        if tracked and tracked.filing_request:
+            await self._log_filing_activity(
+                tracked.filing_request, tracked.credentials, "status_update", True
+            )
+    
+    def _record_filing(self, response: FilingResponse):
+        """
+        Add a filing response to history, indexed by filing ID
+        """
+        self.filing_history.append(response)
+        self.filing_index.setdefault(response.filing_id, response)
     
     def _get_court_adapter(self, court_info):
         """
@@ -475,6 +513,7 @@ class EFilingService:
                 "success_rate": round(success_rate, 3),
                 "court_adapters": adapter_status,
                 "max_concurrent_filings": self.max_concurrent_filings,
+                "status_reconciliation": self.status_reconciler.get_stats(),
                 "last_updated": datetime.utcnow().isoformat()
             }
             
@@ -500,7 +539,12 @@ class EFilingService:
                 if f.timestamp > cutoff_date
             ]
             
+            self.filing_index = {}
+            for f in self.filing_history:
+                self.filing_index.setdefault(f.filing_id, f)
+            
             cleaned_count = original_count - len(self.filing_history)
+            cleaned_count += self.status_reconciler.forget_settled(cutoff_date)
             
             if cleaned_count > 0:
                 logger.info(f"Cleaned up {cleaned_count} old filing records")
@@ -518,10 +562,7 @@ class EFilingService:
         """
         try:
             # Find the filing in history
-            original_filing = next(
-                (f for f in self.filing_history if f.filing_id == filing_id),
-                None
-            )
+            original_filing = self.filing_index.get(filing_id)
             
             if not original_filing:
                 return FilingResponse(
@@ -0,0 +1,408 @@
+"""
+Filing Status Reconciler
+
+Keeps the status of submitted filings in step with the court systems.
+Filings are indexed by id and by court, and each filing has a next-check
+time taken from a recheck policy. The policy checks young filings often and
+backs off as a filing ages or keeps reporting the same status. Each
+reconciliation cycle takes the filings that are due and groups them by court
+and credentials. It then sends one batched status query per group, running
+at most ``max_concurrent_courts`` at once. Listeners are notified only when a
+filing's status actually changes.
+
+``start`` runs the cycles in the background, each one when the earliest
+filing falls due. A status lookup for a filing that was never checked, or
+whose check is overdue, queries the court directly.
+"""
+
+import asyncio
+import heapq
+import inspect
+import itertools
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from uuid import UUID
+
+from ..models import (
+    FilingRequest,
+    FilingResponse,
+    FilingStatus,
+    EFilingCredentials
+)
+
+logger = logging.getLogger(__name__)
+
+# No further court-side changes are expected once a filing reaches these
+SETTLED_STATUSES = {FilingStatus.SERVED, FilingStatus.REJECTED, FilingStatus.CANCELLED}
+
+
+@dataclass
+class RecheckPolicy:
+    """
+    How long to wait before checking a filing again. The wait for the
+    filing's status is stretched by ``backoff`` for every check that found
+    no change. It also grows by a factor of ``1 + age / age_step``.
+    Statuses without an interval are not polled.
+    """
+    intervals: Dict[FilingStatus, timedelta] = field(default_factory=lambda: {
+        FilingStatus.SUBMITTED: timedelta(minutes=2),
+        FilingStatus.ACCEPTED: timedelta(minutes=15)
+    })
+    backoff: float = 1.5
+    max_backoff_steps: int = 6
+    age_step: timedelta = timedelta(days=1)
+    max_interval: timedelta = timedelta(hours=6)
+
+    def next_interval(
+        self,
+        status: FilingStatus,
+        age: timedelta,
+        unchanged_checks: int = 0
+    ) -> Optional[timedelta]:
+        base = self.intervals.get(status)
+        if base is None:
+            return None
+        factor = self.backoff ** min(unchanged_checks, self.max_backoff_steps)
+        factor *= 1 + max(age, timedelta(0)) / self.age_step
+        return min(base * factor, self.max_interval)
+
+
+@dataclass
+class TrackedFiling:
+    """A submitted filing whose court-side status is being followed."""
+    filing_id: UUID
+    external_id: str
+    court_id: UUID
+    adapter: Any
+    credentials: EFilingCredentials
+    status: FilingStatus
+    submitted_at: datetime
+    filing_request: Optional[FilingRequest] = None
+    next_check: Optional[datetime] = None
+    last_checked: Optional[datetime] = None
+    last_changed: Optional[datetime] = None
+    unchanged_checks: int = 0
+    consecutive_errors: int = 0
+    last_response: Optional[FilingResponse] = None
+
+    @property
+    def settled(self) -> bool:
+        return self.next_check is None
+
+
+@dataclass
+class StatusTransition:
+    """A filing's court-side status changed between two checks."""
+    filing_id: UUID
+    court_id: UUID
+    previous_status: FilingStatus
+    status: FilingStatus
+    observed_at: datetime
+    response: FilingResponse
+
+
+class StatusReconciler:
+    """Batched, adaptively scheduled status polling for submitted filings."""
+
+    def __init__(
+        self,
+        adapter_for: Callable[[Any], Any],
+        policy: Optional[RecheckPolicy] = None,
+        max_concurrent_courts: int = 10,
+        clock: Callable[[], datetime] = datetime.utcnow
+    ):
+        self.adapter_for = adapter_for
+        self.policy = policy or RecheckPolicy()
+        self.max_concurrent_courts = max_concurrent_courts
+        self.clock = clock
+
+        self.filings: Dict[UUID, TrackedFiling] = {}
+        self.by_court: Dict[UUID, Set[UUID]] = {}
+        self._schedule: List[Tuple[datetime, int, UUID]] = []
+        self._sequence = itertools.count()
+        self._listeners: List[Callable[[StatusTransition], Any]] = []
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+        self.cycles = 0
+        self.batch_queries = 0
+        self.filings_checked = 0
+        self.transitions = 0
+        self.errors = 0
+
+    # Tracking
+
+    def track(
+        self,
+        filing_request: FilingRequest,
+        credentials: EFilingCredentials,
+        submitted_at: Optional[datetime] = None
+    ) -> Optional[TrackedFiling]:
+        """Start following a submitted filing; filings without a court-side id are ignored."""
+        if not filing_request.external_id:
+            return None
+
+        court = filing_request.case_info.court
+        self.untrack(filing_request.id)
+        tracked = TrackedFiling(
+            filing_id=filing_request.id,
+            external_id=filing_request.external_id,
+            court_id=court.id,
+            adapter=self.adapter_for(court),
+            credentials=credentials,
+            status=filing_request.status,
+            submitted_at=submitted_at or filing_request.submission_date or self.clock(),
+            filing_request=filing_request
+        )
+        self.filings[tracked.filing_id] = tracked
+        self.by_court.setdefault(tracked.court_id, set()).add(tracked.filing_id)
+        self._reschedule(tracked, self.clock())
+        self._wakeup.set()
+        return tracked
+
+    def untrack(self, filing_id: UUID) -> Optional[TrackedFiling]:
+        tracked = self.filings.pop(filing_id, None)
+        if tracked:
+            court_filings = self.by_court.get(tracked.court_id)
+            if court_filings is not None:
+                court_filings.discard(filing_id)
+                if not court_filings:
+                    del self.by_court[tracked.court_id]
+            # Its schedule entry is skipped once the filing is gone
+        return tracked
+
+    def get(self, filing_id: UUID) -> Optional[TrackedFiling]:
+        return self.filings.get(filing_id)
+
+    def court_filings(self, court_id: UUID) -> List[TrackedFiling]:
+        return [self.filings[filing_id] for filing_id in self.by_court.get(court_id, ())]
+
+    def forget_settled(self, before: datetime) -> int:
+        """Stop tracking settled filings whose last change is older than ``before``."""
+        stale = [
+            filing_id for filing_id, tracked in self.filings.items()
+            if tracked.settled and (tracked.last_changed or tracked.submitted_at) < before
+        ]
+        for filing_id in stale:
+            self.untrack(filing_id)
+        return len(stale)
+
+    def status_response(self, filing_id: UUID) -> Optional[FilingResponse]:
+        """Latest known status of a tracked filing, without contacting the court."""
+        tracked = self.filings.get(filing_id)
+        if not tracked:
+            return None
+        return FilingResponse(
+            filing_id=filing_id,
+            success=True,
+            status=tracked.status,
+            message=f"Filing status: {tracked.status.value}",
+            confirmation_number=tracked.filing_request.confirmation_number if tracked.filing_request else None,
+            transaction_id=tracked.external_id,
+            timestamp=tracked.last_checked or tracked.submitted_at,
+            service_complete=tracked.last_response.service_complete if tracked.last_response else False
+        )
+
+    def is_stale(self, filing_id: UUID, now: Optional[datetime] = None) -> bool:
+        """Whether a pending filing was never checked or is past its next check."""
+        tracked = self.filings.get(filing_id)
+        if not tracked or tracked.settled:
+            return False
+        return tracked.last_checked is None or tracked.next_check <= (now or self.clock())
+
+    async def current_status(self, filing_id: UUID) -> Optional[FilingResponse]:
+        """Status of a tracked filing, checked with the court first if it is stale."""
+        tracked = self.filings.get(filing_id)
+        if not tracked:
+            return None
+        now = self.clock()
+        if self.is_stale(filing_id, now):
+            for transition in await self._check_batch([tracked], now):
+                await self._notify(transition)
+        return self.status_response(filing_id)
+
+    def add_listener(self, callback: Callable[[StatusTransition], Any]) -> None:
+        """Call ``callback`` (a function or coroutine function) on every status transition."""
+        self._listeners.append(callback)
+
+    # Scheduling
+
+    def next_check_at(self) -> Optional[datetime]:
+        """When the earliest tracked filing is next due, if any are pending."""
+        while self._schedule:
+            due_at, _, filing_id = self._schedule[0]
+            tracked = self.filings.get(filing_id)
+            if tracked and tracked.next_check == due_at:
+                return due_at
+            heapq.heappop(self._schedule)
+        return None
+
+    def _reschedule(self, tracked: TrackedFiling, now: datetime) -> None:
+        interval = self.policy.next_interval(
+            tracked.status,
+            now - tracked.submitted_at,
+            tracked.unchanged_checks + tracked.consecutive_errors
+        )
+        if interval is None:
+            tracked.next_check = None
+            return
+        tracked.next_check = now + interval
+        heapq.heappush(self._schedule, (tracked.next_check, next(self._sequence), tracked.filing_id))
+
+    def _pop_due(self, now: datetime) -> List[TrackedFiling]:
+        due = []
+        while self._schedule and self._schedule[0][0] <= now:
+            due_at, _, filing_id = heapq.heappop(self._schedule)
+            tracked = self.filings.get(filing_id)
+            # Entries left behind by rescheduling or untracking are skipped
+            if tracked and tracked.next_check == due_at:
+                due.append(tracked)
+        return due
+
+    # Reconciliation
+
+    async def reconcile(self, now: Optional[datetime] = None) -> List[StatusTransition]:
+        """Check every due filing, one batched query per court and credentials."""
+        now = now or self.clock()
+        due = self._pop_due(now)
+        self.cycles += 1
+        if not due:
+            return []
+
+        groups: Dict[Tuple[UUID, int, UUID], List[TrackedFiling]] = {}
+        for tracked in due:
+            key = (tracked.court_id, id(tracked.adapter), tracked.credentials.attorney_id)
+            groups.setdefault(key, []).append(tracked)
+
+        semaphore = asyncio.Semaphore(self.max_concurrent_courts)
+
+        async def check(batch: List[TrackedFiling]) -> List[StatusTransition]:
+            async with semaphore:
+                return await self._check_batch(batch, now)
+
+        transitions = []
+        for batch_transitions in await asyncio.gather(*(check(batch) for batch in groups.values())):
+            transitions.extend(batch_transitions)
+
+        for transition in transitions:
+            await self._notify(transition)
+        return transitions
+
+    async def run(self, max_idle: float = 60.0) -> None:
+        """Reconcile each time the earliest filing falls due, until cancelled."""
+        while True:
+            now = self.clock()
+            due_at = self.next_check_at()
+            if due_at is not None and due_at <= now:
+                try:
+                    await self.reconcile(now)
+                except Exception as e:
+                    logger.error(f"Status reconciliation cycle failed: {str(e)}")
+                continue
+
+            delay = max_idle if due_at is None else min((due_at - now).total_seconds(), max_idle)
+            # Newly tracked filings may be due sooner
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self, max_idle: float = 60.0) -> asyncio.Task:
+        """Run reconciliation in the background on the current event loop."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run(max_idle))
+        return self._task
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _check_batch(self, batch: List[TrackedFiling], now: datetime) -> List[StatusTransition]:
+        adapter = batch[0].adapter
+        self.batch_queries += 1
+        try:
+            responses = await adapter.check_filing_statuses(
+                [tracked.external_id for tracked in batch],
+                batch[0].credentials
+            )
+        except Exception as e:
+            logger.error(f"Status query failed for court {batch[0].court_id}: {str(e)}")
+            responses = {}
+
+        transitions = []
+        for tracked in batch:
+            transition = self._apply(tracked, responses.get(tracked.external_id), now)
+            if transition:
+                transitions.append(transition)
+        return transitions
+
+    def _apply(
+        self,
+        tracked: TrackedFiling,
+        response: Optional[FilingResponse],
+        now: datetime
+    ) -> Optional[StatusTransition]:
+        self.filings_checked += 1
+        tracked.last_checked = now
+
+        # An unsuccessful lookup says nothing about the filing's status
+        if response is None or not response.success:
+            self.errors += 1
+            tracked.consecutive_errors += 1
+            self._reschedule(tracked, now)
+            return None
+
+        tracked.consecutive_errors = 0
+        tracked.last_response = response
+        transition = None
+        if response.status != tracked.status:
+            transition = StatusTransition(
+                filing_id=tracked.filing_id,
+                court_id=tracked.court_id,
+                previous_status=tracked.status,
+                status=response.status,
+                observed_at=now,
+                response=response
+            )
+            tracked.status = response.status
+            tracked.last_changed = now
+            tracked.unchanged_checks = 0
+            if tracked.filing_request:
+                tracked.filing_request.status = response.status
+            self.transitions += 1
+        else:
+            tracked.unchanged_checks += 1
+
+        self._reschedule(tracked, now)
+        return transition
+
+    async def _notify(self, transition: StatusTransition) -> None:
+        for callback in self._listeners:
+            try:
+                result = callback(transition)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                logger.error(f"Status transition listener failed: {str(e)}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        pending = sum(1 for tracked in self.filings.values() if not tracked.settled)
+        return {
+            "tracked_filings": len(self.filings),
+            "pending_filings": pending,
+            "courts": len(self.by_court),
+            "cycles": self.cycles,
+            "batch_queries": self.batch_queries,
+            "filings_checked": self.filings_checked,
+            "transitions": self.transitions,
+            "errors": self.errors
+        }
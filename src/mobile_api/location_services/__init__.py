@@ -7,12 +7,15 @@ for mobile legal professionals.
 
 from .gps_detector import CourthouseGPSDetector
 from .courthouse_database import CourthouseDatabase
+from .spatial_index import GeoIndex, GeofenceIndex
 from .location_models import *
 from .brief_generator import QuickBriefGenerator
 
 __all__ = [
     "CourthouseGPSDetector",
     "CourthouseDatabase", 
+    "GeoIndex",
+    "GeofenceIndex",
     "QuickBriefGenerator",
     "LocationCoordinates",
     "CourthouseInfo",
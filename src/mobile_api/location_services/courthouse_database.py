@@ -9,7 +9,7 @@ import json
 import logging
 import math
 from datetime import datetime, time
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 from uuid import UUID, uuid4
 
 from .location_models import (
@@ -18,6 +18,7 @@ from .location_models import (
     LocationCoordinates,
     LocationAccuracy
 )
+from .spatial_index import GeoIndex
 
 logger = logging.getLogger(__name__)
 
@@ -29,7 +30,9 @@ class CourthouseDatabase:
     
     def __init__(self, database_file: Optional[str] = None):
         self.courthouses: Dict[str, CourthouseInfo] = {}
-        self.location_index: Dict[str, List[str]] = {}  # Grid-based spatial index
+        self.spatial_index = GeoIndex()  # Courthouse IDs by location
+        # Called with (courthouse_id, coordinates) on moves, coordinates None on deletes
+        self.location_listeners: List[Callable[[str, Optional[LocationCoordinates]], None]] = []
         self.database_file = database_file
         self.last_updated = datetime.utcnow()
         
@@ -183,16 +186,12 @@ class CourthouseDatabase:
         self.courthouses[courthouse_id] = courthouse
         
         # Add to spatial index
-        grid_key = self._get_grid_key(
+        self.spatial_index.add(
+            courthouse_id,
             courthouse.coordinates.latitude,
             courthouse.coordinates.longitude
         )
         
-        if grid_key not in self.location_index:
-            self.location_index[grid_key] = []
-        
-        self.location_index[grid_key].append(courthouse_id)
-        
         logger.debug(f"Added courthouse: {courthouse.name}")
         return courthouse_id
     
@@ -208,33 +207,11 @@ class CourthouseDatabase:
         max_results: int = 10
     ) -> List[Tuple[CourthouseInfo, float]]:
         """
-        Find courthouses within a specified radius
+        Find the nearest courthouses within a specified radius
         Returns list of (courthouse, distance_km) tuples sorted by distance
         """
-        nearby_courthouses = []
-        
-        # Get grid cells to search
-        grid_keys = self._get_nearby_grid_keys(latitude, longitude, radius_km)
-        
-        # Search in relevant grid cells
-        for grid_key in grid_keys:
-            if grid_key in self.location_index:
-                for courthouse_id in self.location_index[grid_key]:
-                    courthouse = self.courthouses[courthouse_id]
-                    
-                    # Calculate distance
-                    distance_km = self._haversine_distance(
-                        latitude, longitude,
-                        courthouse.coordinates.latitude,
-                        courthouse.coordinates.longitude
-                    )
-                    
-                    if distance_km <= radius_km:
-                        nearby_courthouses.append((courthouse, distance_km))
-        
-        # Sort by distance and limit results
-        nearby_courthouses.sort(key=lambda x: x[1])
-        return nearby_courthouses[:max_results]
+        nearest = self.spatial_index.nearest(latitude, longitude, k=max_results, max_km=radius_km)
+        return [(self.courthouses[courthouse_id], distance_km) for courthouse_id, distance_km in nearest]
     
     def find_courthouse_by_name(self, name: str, fuzzy: bool = True) -> List[CourthouseInfo]:
         """Find courthouse by name with optional fuzzy matching"""
@@ -345,6 +322,14 @@ class CourthouseDatabase:
             if hasattr(courthouse, field):
                 setattr(courthouse, field, value)
         
+        if 'coordinates' in updates:
+            self.spatial_index.add(
+                courthouse_id,
+                courthouse.coordinates.latitude,
+                courthouse.coordinates.longitude
+            )
+            self._notify_location(courthouse_id, courthouse.coordinates)
+        
         courthouse.last_updated = datetime.utcnow()
         return True
     
@@ -353,23 +338,22 @@ class CourthouseDatabase:
         if courthouse_id not in self.courthouses:
             return False
         
-        courthouse = self.courthouses[courthouse_id]
-        
         # Remove from spatial index
-        grid_key = self._get_grid_key(
-            courthouse.coordinates.latitude,
-            courthouse.coordinates.longitude
-        )
-        
-        if grid_key in self.location_index:
-            self.location_index[grid_key].remove(courthouse_id)
-            if not self.location_index[grid_key]:
-                del self.location_index[grid_key]
+        self.spatial_index.remove(courthouse_id)
         
         # Remove from main database
         del self.courthouses[courthouse_id]
+        self._notify_location(courthouse_id, None)
         return True
     
+    def add_location_listener(self, listener: Callable[[str, Optional[LocationCoordinates]], None]):
+        """Register a callback for courthouse moves and deletes, e.g. to re-place geofences"""
+        self.location_listeners.append(listener)
+    
+    def _notify_location(self, courthouse_id: str, coordinates: Optional[LocationCoordinates]):
+        for listener in self.location_listeners:
+            listener(courthouse_id, coordinates)
+    
     def get_statistics(self) -> Dict[str, any]:
         """Get database statistics"""
         stats = {
@@ -377,7 +361,7 @@ class CourthouseDatabase:
             "last_updated": self.last_updated.isoformat(),
             "court_types": {},
             "states": {},
-            "grid_cells": len(self.location_index)
+            "indexed_locations": len(self.spatial_index)
         }
         
         # Count by court type
@@ -390,32 +374,6 @@ class CourthouseDatabase:
         
         return stats
     
-    def _get_grid_key(self, latitude: float, longitude: float, grid_size: float = 0.01) -> str:
-        """Get grid key for spatial indexing"""
-        lat_grid = int(latitude / grid_size)
-        lon_grid = int(longitude / grid_size)
-        return f"{lat_grid}_{lon_grid}"
-    
-    def _get_nearby_grid_keys(self, latitude: float, longitude: float, radius_km: float) -> List[str]:
-        """Get grid keys for nearby cells within radius"""
-        grid_size = 0.01  # Approximately 1.1km at equator
-        
-        # Calculate grid offset for radius
-        lat_offset = int((radius_km / 111.0) / grid_size) + 1  # 111km per degree latitude
-        lon_offset = int((radius_km / (111.0 * math.cos(math.radians(latitude)))) / grid_size) + 1
-        
-        grid_keys = []
-        center_lat_grid = int(latitude / grid_size)
-        center_lon_grid = int(longitude / grid_size)
-        
-        for lat_offset_val in range(-lat_offset, lat_offset + 1):
-            for lon_offset_val in range(-lon_offset, lon_offset + 1):
-                lat_grid = center_lat_grid + lat_offset_val
-                lon_grid = center_lon_grid + lon_offset_val
-                grid_keys.append(f"{lat_grid}_{lon_grid}")
-        
-        return grid_keys
-    
     def _haversine_distance(self, lat1: float, lon1: float, lat2: float, lon2: float) -> float:
         """Calculate distance between two points using Haversine formula"""
         # Convert to radians
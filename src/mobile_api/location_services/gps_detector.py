@@ -21,6 +21,7 @@ from .location_models import (
     LocationServicesConfig
 )
 from .courthouse_database import CourthouseDatabase
+from .spatial_index import GeofenceIndex
 
 logger = logging.getLogger(__name__)
 
@@ -40,6 +41,9 @@ class CourthouseGPSDetector:
         
         # Active geofences and detection cache
         self.active_geofences: Dict[str, GeofenceConfig] = {}
+        self.geofence_index = GeofenceIndex()  # Per-user fences by courthouse location
+        self.courthouse_fences: Dict[str, Dict[str, str]] = {}  # courthouse -> {geofence: user key}
+        courthouse_db.add_location_listener(self._on_courthouse_moved)
         self.detection_cache: Dict[str, CourthouseDetection] = {}
         self.user_locations: Dict[UUID, LocationCoordinates] = {}
         self.location_alerts: Dict[UUID, List[LocationAlert]] = {}
@@ -275,6 +279,14 @@ class CourthouseGPSDetector:
         geofence_id = f"{user_id}_{courthouse_id}"
         self.active_geofences[geofence_id] = config
         
+        # Place the fence at the courthouse for location updates
+        courthouse = self.courthouse_db.get_courthouse(str(config.courthouse_id))
+        if courthouse:
+            self._place_geofence(str(user_id), geofence_id, config, courthouse.coordinates)
+            self.courthouse_fences.setdefault(str(config.courthouse_id), {})[geofence_id] = str(user_id)
+        else:
+            logger.warning(f"Geofence {geofence_id} refers to unknown courthouse {config.courthouse_id}")
+        
         logger.info(f"Geofence setup for user {user_id} at courthouse {courthouse_id}")
         return geofence_id
     
@@ -283,11 +295,45 @@ class CourthouseGPSDetector:
         Remove geofence monitoring
         """
         if geofence_id in self.active_geofences:
-            del self.active_geofences[geofence_id]
+            config = self.active_geofences.pop(geofence_id)
+            self.geofence_index.remove(geofence_id)
+            self.courthouse_fences.get(str(config.courthouse_id), {}).pop(geofence_id, None)
             logger.info(f"Removed geofence {geofence_id}")
             return True
         return False
     
+    def _place_geofence(
+        self,
+        user_key: str,
+        geofence_id: str,
+        config: GeofenceConfig,
+        coordinates: LocationCoordinates
+    ):
+        self.geofence_index.add(
+            user_key,
+            geofence_id,
+            coordinates.latitude,
+            coordinates.longitude,
+            max(config.detection_radius_meters, config.notification_radius_meters) / 1000
+        )
+    
+    def _on_courthouse_moved(self, courthouse_id: str, coordinates: Optional[LocationCoordinates]):
+        """
+        Re-place a courthouse's geofences when its coordinates change, or drop
+        them from the index when it is deleted
+        """
+        fences = self.courthouse_fences.get(courthouse_id, {})
+        for geofence_id, user_key in fences.items():
+            if coordinates is None:
+                self.geofence_index.remove(geofence_id)
+            else:
+                self._place_geofence(user_key, geofence_id, self.active_geofences[geofence_id], coordinates)
+        if coordinates is None:
+            self.courthouse_fences.pop(courthouse_id, None)
+        
+        # Cached detections may place the courthouse at its old location
+        self.detection_cache.clear()
+    
     async def _process_geofence_events(
         self,
         user_id: UUID,
@@ -297,13 +343,15 @@ class CourthouseGPSDetector:
         """
         Process geofence entry/exit events
         """
-        # Find relevant geofences for this user
-        user_geofences = {
-            gf_id: config for gf_id, config in self.active_geofences.items()
-            if gf_id.startswith(str(user_id))
-        }
+        # Find this user's geofences near the location
+        nearby_geofences = self.geofence_index.candidates(
+            str(user_id),
+            current_location.latitude,
+            current_location.longitude
+        )
         
-        for geofence_id, config in user_geofences.items():
+        for geofence_id, _ in nearby_geofences:
+            config = self.active_geofences[geofence_id]
             courthouse = self.courthouse_db.get_courthouse(str(config.courthouse_id))
             if not courthouse:
                 continue
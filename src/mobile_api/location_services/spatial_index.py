@@ -0,0 +1,314 @@
+"""
+Spatial Index Module
+
+Geographic point index for courthouse lookup and per-user geofencing.
+
+Points are stored as unit vectors on the sphere and indexed with a KD-tree
+(scipy's cKDTree). Straight-line (chord) distance between unit vectors grows
+monotonically with great-circle distance, so k-nearest-neighbour and radius
+queries on the tree are exact on the sphere, with no special cases at the
+poles or the antimeridian. Candidates are re-measured with the haversine
+formula before they are returned.
+
+Points added since the last build are scanned with vectorized NumPy until
+enough accumulate to rebuild the tree; removals leave tombstones until the
+next rebuild. Small sets (a user's geofences) never need a tree at all.
+"""
+
+import logging
+from typing import Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def haversine_km(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Great-circle distance in km between broadcastable arrays of degrees."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return EARTH_RADIUS_KM * 2 * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def unit_vectors(latitudes, longitudes) -> np.ndarray:
+    """(n, 3) points on the unit sphere for arrays of degrees."""
+    lat = np.radians(np.asarray(latitudes, dtype=np.float64))
+    lon = np.radians(np.asarray(longitudes, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)], axis=-1)
+
+
+def chord_bound(radius_km: float) -> float:
+    """Chord length covering a great-circle radius, padded for rounding."""
+    angle = min(radius_km / EARTH_RADIUS_KM, np.pi)
+    return 2.0 * np.sin(angle / 2.0) * (1.0 + 1e-9) + 1e-12
+
+
+class GeoIndex:
+    """
+    Mutable index of keyed (latitude, longitude) points with exact
+    k-nearest and radius queries in kilometres.
+    """
+
+    def __init__(
+        self,
+        brute_force_below: int = 256,
+        rebuild_fraction: float = 0.125,
+        max_tombstones: int = 64
+    ):
+        self.brute_force_below = brute_force_below
+        self.rebuild_fraction = rebuild_fraction
+        self.max_tombstones = max_tombstones
+
+        self._keys: List[Optional[Hashable]] = []
+        self._slots: Dict[Hashable, int] = {}
+        self._latlon = np.empty((0, 2))
+        self._xyz = np.empty((0, 3))
+        self._alive = np.zeros(0, dtype=bool)
+        self._size = 0
+
+        self._tree: Optional[cKDTree] = None
+        self._tree_size = 0          # Slots [0, _tree_size) are in the tree
+        self._tree_dead = 0          # Removed slots still in the tree
+        self.rebuilds = 0
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._slots
+
+    def add(self, key: Hashable, latitude: float, longitude: float):
+        """Insert ``key`` at a location, moving it if already present."""
+        if key in self._slots:
+            self.remove(key)
+        if self._size == len(self._alive):
+            self._grow(max(64, 2 * self._size))
+        slot = self._size
+        self._size += 1
+        self._keys.append(key)
+        self._slots[key] = slot
+        self._latlon[slot] = (latitude, longitude)
+        self._xyz[slot] = unit_vectors(latitude, longitude)
+        self._alive[slot] = True
+
+    def remove(self, key: Hashable) -> bool:
+        slot = self._slots.pop(key, None)
+        if slot is None:
+            return False
+        self._alive[slot] = False
+        self._keys[slot] = None
+        if slot < self._tree_size:
+            self._tree_dead += 1
+        return True
+
+    def location(self, key: Hashable) -> Optional[Tuple[float, float]]:
+        slot = self._slots.get(key)
+        return None if slot is None else tuple(self._latlon[slot])
+
+    def nearest(
+        self,
+        latitude: float,
+        longitude: float,
+        k: int = 1,
+        max_km: Optional[float] = None
+    ) -> List[Tuple[Hashable, float]]:
+        """The ``k`` closest keys, optionally within ``max_km``, closest first."""
+        if k <= 0 or not self._slots:
+            return []
+        self._maintain()
+        bound = chord_bound(max_km) if max_km is not None else np.inf
+        query = unit_vectors(latitude, longitude)
+
+        candidates = [self._pending_within(query, bound)]
+        if self._tree is not None:
+            count = min(k + self._tree_dead, self._tree_size)
+            _, slots = self._tree.query(query, count, distance_upper_bound=bound)
+            slots = np.atleast_1d(slots)
+            slots = slots[slots < self._tree_size]
+            candidates.append(slots[self._alive[slots]])
+        return self._measure(np.concatenate(candidates), latitude, longitude, max_km, k)
+
+    def within(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_km: float,
+        limit: Optional[int] = None
+    ) -> List[Tuple[Hashable, float]]:
+        """All keys within ``radius_km``, closest first (at most ``limit``)."""
+        if not self._slots:
+            return []
+        self._maintain()
+        bound = chord_bound(radius_km)
+        query = unit_vectors(latitude, longitude)
+
+        candidates = [self._pending_within(query, bound)]
+        if self._tree is not None:
+            slots = np.asarray(self._tree.query_ball_point(query, bound), dtype=np.int64)
+            candidates.append(slots[self._alive[slots]])
+        return self._measure(np.concatenate(candidates), latitude, longitude, radius_km, limit)
+
+    def nearest_many(
+        self,
+        latitudes,
+        longitudes,
+        k: int = 1,
+        max_km: Optional[float] = None,
+        workers: int = 1
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """k-nearest for a batch of locations in one tree pass.
+
+        Returns ``(slots, distances_km)``, both shaped (n, k) and closest
+        first; missing neighbours are slot -1 at distance ``inf``. Map slots
+        to keys with :meth:`keys_at`; slots are stable until the next add or
+        remove.
+        """
+        latitudes = np.asarray(latitudes, dtype=np.float64)
+        longitudes = np.asarray(longitudes, dtype=np.float64)
+        slots = np.full((len(latitudes), k), -1, dtype=np.int64)
+        distances = np.full((len(latitudes), k), np.inf)
+        if not self._slots or k <= 0 or not len(latitudes):
+            return slots, distances
+
+        self._rebuild()
+        count = min(k, self._tree_size)
+        bound = chord_bound(max_km) if max_km is not None else np.inf
+        _, found = self._tree.query(
+            unit_vectors(latitudes, longitudes), count, distance_upper_bound=bound, workers=workers
+        )
+        found = found.reshape(len(latitudes), count)
+        hit = found < self._tree_size
+        rows, columns = np.nonzero(hit)
+        hits = found[rows, columns]
+        measured = haversine_km(latitudes[rows], longitudes[rows], self._latlon[hits, 0], self._latlon[hits, 1])
+        if max_km is not None:
+            keep = measured <= max_km
+            rows, columns, hits, measured = rows[keep], columns[keep], hits[keep], measured[keep]
+        slots[rows, columns] = hits
+        distances[rows, columns] = measured
+
+        # Chord order and haversine order agree up to rounding; settle near-ties
+        order = np.argsort(distances, axis=1, kind='stable')
+        return np.take_along_axis(slots, order, axis=1), np.take_along_axis(distances, order, axis=1)
+
+    def keys_at(self, slots: np.ndarray) -> List[Optional[Hashable]]:
+        return [self._keys[slot] if slot >= 0 else None for slot in np.asarray(slots).ravel().tolist()]
+
+    def _pending_within(self, query: np.ndarray, bound: float) -> np.ndarray:
+        """Live slots not yet in the tree whose chord distance is within ``bound``."""
+        if self._tree_size == self._size:
+            return np.empty(0, dtype=np.int64)
+        xyz = self._xyz[self._tree_size:self._size]
+        chord = np.sqrt(((xyz - query) ** 2).sum(axis=1))
+        keep = (chord <= bound) & self._alive[self._tree_size:self._size]
+        return np.flatnonzero(keep) + self._tree_size
+
+    def _measure(
+        self,
+        slots: np.ndarray,
+        latitude: float,
+        longitude: float,
+        max_km: Optional[float],
+        limit: Optional[int]
+    ) -> List[Tuple[Hashable, float]]:
+        if not len(slots):
+            return []
+        distances = haversine_km(latitude, longitude, self._latlon[slots, 0], self._latlon[slots, 1])
+        if max_km is not None:
+            keep = distances <= max_km
+            slots, distances = slots[keep], distances[keep]
+        order = np.argsort(distances, kind='stable')[:limit]
+        return [(self._keys[slot], float(distance)) for slot, distance in zip(slots[order].tolist(), distances[order])]
+
+    def _maintain(self):
+        pending = self._size - self._tree_size
+        if self._tree_dead > self.max_tombstones or (
+            pending > self.brute_force_below and pending > self.rebuild_fraction * self._tree_size
+        ):
+            self._rebuild()
+
+    def _rebuild(self):
+        """Compact live points and build the tree over all of them."""
+        if self._tree is not None and self._tree_size == self._size and not self._tree_dead:
+            return
+        live = np.flatnonzero(self._alive[:self._size])
+        self._keys = [self._keys[slot] for slot in live.tolist()]
+        self._slots = {key: slot for slot, key in enumerate(self._keys)}
+        self._size = len(live)
+        capacity = max(64, len(self._alive))
+        self._latlon = np.concatenate([self._latlon[live], np.empty((capacity - self._size, 2))])
+        self._xyz = np.concatenate([self._xyz[live], np.empty((capacity - self._size, 3))])
+        self._alive = np.zeros(capacity, dtype=bool)
+        self._alive[:self._size] = True
+
+        self._tree = cKDTree(self._xyz[:self._size]) if self._size else None
+        self._tree_size = self._size if self._size else 0
+        self._tree_dead = 0
+        self.rebuilds += 1
+        logger.debug(f"Rebuilt spatial index over {self._size} points")
+
+    def _grow(self, capacity: int):
+        self._latlon = np.concatenate([self._latlon, np.empty((capacity - len(self._alive), 2))])
+        self._xyz = np.concatenate([self._xyz, np.empty((capacity - len(self._alive), 3))])
+        self._alive = np.concatenate([self._alive, np.zeros(capacity - len(self._alive), dtype=bool)])
+
+
+class GeofenceIndex:
+    """
+    Geofences grouped by user, each user's fences in their own GeoIndex, so a
+    location update only measures that user's fences near the update.
+    """
+
+    def __init__(self):
+        self._users: Dict[Hashable, GeoIndex] = {}
+        self._radius_km: Dict[Hashable, Dict[Hashable, float]] = {}
+        self._order: Dict[Hashable, Dict[Hashable, int]] = {}
+        self._owner: Dict[Hashable, Hashable] = {}
+        self._sequence = 0
+
+    def __len__(self) -> int:
+        return len(self._owner)
+
+    def add(self, user_key: Hashable, fence_id: Hashable, latitude: float, longitude: float, radius_km: float):
+        """Place (or move) a fence; it reports locations within ``radius_km``."""
+        if fence_id in self._owner and self._owner[fence_id] != user_key:
+            self.remove(fence_id)
+        if user_key not in self._users:
+            self._users[user_key] = GeoIndex()
+            self._radius_km[user_key] = {}
+            self._order[user_key] = {}
+        self._users[user_key].add(fence_id, latitude, longitude)
+        self._radius_km[user_key][fence_id] = radius_km
+        if fence_id not in self._order[user_key]:
+            self._order[user_key][fence_id] = self._sequence
+            self._sequence += 1
+        self._owner[fence_id] = user_key
+
+    def remove(self, fence_id: Hashable) -> bool:
+        user_key = self._owner.pop(fence_id, None)
+        if user_key is None:
+            return False
+        self._users[user_key].remove(fence_id)
+        del self._radius_km[user_key][fence_id]
+        del self._order[user_key][fence_id]
+        if not self._radius_km[user_key]:
+            del self._users[user_key], self._radius_km[user_key], self._order[user_key]
+        return True
+
+    def candidates(self, user_key: Hashable, latitude: float, longitude: float) -> List[Tuple[Hashable, float]]:
+        """A user's fences whose radius contains the location, in the order they were added."""
+        index = self._users.get(user_key)
+        if index is None:
+            return []
+        radius_km = self._radius_km[user_key]
+        hits = [
+            (fence_id, distance)
+            for fence_id, distance in index.within(latitude, longitude, max(radius_km.values()))
+            if distance <= radius_km[fence_id]
+        ]
+        order = self._order[user_key]
+        return sorted(hits, key=lambda hit: order[hit[0]])
@@ -17,9 +17,12 @@ Features:
 
 from .pattern_analyzer import PatternAnalyzer, PatternType, PatternSeverity, DetectedPattern
 from .activity_tracker import ActivityTracker, ActivityType, ActivityEvent, ActivityMetrics
+from .activity_aggregator import ActivityAggregator, ActivitySnapshotStore, SpaceSaving
 from .anomaly_detector import AnomalyDetector, AnomalyType, Anomaly, AnomalyThreshold
+from .streaming_stats import MetricRingBuffer, WindowedMoments, WindowedQuantiles
 from .trend_analyzer import TrendAnalyzer, TrendType, Trend, TrendDirection
 from .predictive_engine import PredictiveEngine, PredictionModel, Prediction, OutcomeType
+from .inference_pipeline import CompiledPipeline, PipelineOutput
 from .workflow_analyzer import WorkflowAnalyzer, WorkflowPattern, ProcessStep, WorkflowMetrics
 from .resource_optimizer import ResourceOptimizer, ResourceAllocation, OptimizationSuggestion
 from .pattern_coordinator import PatternDetectionCoordinator
@@ -41,12 +44,18 @@ __all__ = [
     "ActivityType",
     "ActivityEvent",
     "ActivityMetrics",
+    "ActivityAggregator",
+    "ActivitySnapshotStore",
+    "SpaceSaving",
     
     # Anomaly Detection
     "AnomalyDetector",
     "AnomalyType",
     "Anomaly",
     "AnomalyThreshold",
+    "MetricRingBuffer",
+    "WindowedMoments",
+    "WindowedQuantiles",
     
     # Trend Analysis
     "TrendAnalyzer",
@@ -59,6 +68,8 @@ __all__ = [
     "PredictionModel",
     "Prediction",
     "OutcomeType",
+    "CompiledPipeline",
+    "PipelineOutput",
     
     # Workflow Analysis
     "WorkflowAnalyzer",
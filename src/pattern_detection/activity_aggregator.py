@@ -0,0 +1,435 @@
+"""
+Activity Aggregator Module
+
+Bounded-memory streaming aggregation of activity events. Every event costs a
+constant number of counter updates plus O(log k) heavy-hitter updates, no
+matter how many attorneys or cases have been seen:
+
+- lifetime totals by type, hour of day and (recent) day;
+- a rolling minute-bucketed counter for activity velocity;
+- hour buckets with per-type counts and Space-Saving top-k attorneys/cases,
+  expired after ``retention`` and periodically snapshotted to a local SQLite
+  store so range queries are answered from pre-aggregated rows.
+"""
+
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Any, Tuple, Hashable, Iterable
+from dataclasses import dataclass, field
+from collections import Counter, OrderedDict, deque
+import json
+import logging
+import sqlite3
+
+logger = logging.getLogger(__name__)
+
+
+class SpaceSaving:
+    """Space-Saving top-k heavy hitters (Metwally et al.).
+
+    Monitors at most ``capacity`` keys in an indexed min-heap, so each update
+    is O(log capacity). A key's count overestimates its true count by at most
+    its recorded error, and every key with true count above total / capacity
+    is guaranteed to be monitored.
+    """
+
+    def __init__(self, capacity: int = 100):
+        self.capacity = capacity
+        self.total = 0
+        self._heap: List[List[Any]] = []  # [count, error, key], min count at the root
+        self._index: Dict[Hashable, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def add(self, key: Hashable, count: int = 1) -> None:
+        self.total += count
+        position = self._index.get(key)
+        if position is not None:
+            self._heap[position][0] += count
+            self._sift_down(position)
+        elif len(self._heap) < self.capacity:
+            self._heap.append([count, 0, key])
+            self._index[key] = len(self._heap) - 1
+            self._sift_up(len(self._heap) - 1)
+        else:
+            # Evict the minimum; the newcomer inherits its count as error
+            entry = self._heap[0]
+            del self._index[entry[2]]
+            entry[1] = entry[0]
+            entry[0] += count
+            entry[2] = key
+            self._index[key] = 0
+            self._sift_down(0)
+
+    def estimate(self, key: Hashable) -> int:
+        """Upper bound on the key's count."""
+        position = self._index.get(key)
+        if position is not None:
+            return self._heap[position][0]
+        return self._heap[0][0] if len(self._heap) == self.capacity else 0
+
+    def top(self, n: Optional[int] = None) -> List[Tuple[Hashable, int, int]]:
+        """``(key, count, error)`` for the ``n`` largest monitored keys."""
+        ranked = sorted(((key, count, error) for count, error, key in self._heap),
+                        key=lambda item: item[1], reverse=True)
+        return ranked[:n] if n is not None else ranked
+
+    def items(self) -> List[Tuple[Hashable, int, int]]:
+        return [(key, count, error) for count, error, key in self._heap]
+
+    @classmethod
+    def merged(cls, summaries: Iterable[List[Tuple[Hashable, int, int]]],
+               capacity: int, total: int = 0) -> "SpaceSaving":
+        """Combine ``items()`` of several summaries, keeping the ``capacity`` largest.
+
+        Counts and errors of a key are summed across summaries; a key missing
+        from a full summary may be undercounted by at most that summary's
+        minimum, so merged results are estimates.
+        """
+        counts: Dict[Hashable, List[int]] = {}
+        for items in summaries:
+            for key, count, error in items:
+                entry = counts.setdefault(key, [0, 0])
+                entry[0] += count
+                entry[1] += error
+        summary = cls(capacity)
+        largest = sorted(counts.items(), key=lambda item: item[1][0], reverse=True)[:capacity]
+        for key, (count, error) in largest:
+            summary._heap.append([count, error, key])
+        summary._heap.sort(key=lambda entry: entry[0])  # A sorted list is a valid min-heap
+        summary._index = {entry[2]: i for i, entry in enumerate(summary._heap)}
+        summary.total = total or sum(entry[0] for entry in counts.values())
+        return summary
+
+    def _swap(self, i: int, j: int) -> None:
+        heap = self._heap
+        heap[i], heap[j] = heap[j], heap[i]
+        self._index[heap[i][2]] = i
+        self._index[heap[j][2]] = j
+
+    def _sift_up(self, position: int) -> None:
+        heap = self._heap
+        while position:
+            parent = (position - 1) >> 1
+            if heap[parent][0] <= heap[position][0]:
+                break
+            self._swap(parent, position)
+            position = parent
+
+    def _sift_down(self, position: int) -> None:
+        heap = self._heap
+        size = len(heap)
+        while True:
+            smallest = position
+            left = 2 * position + 1
+            if left < size and heap[left][0] < heap[smallest][0]:
+                smallest = left
+            if left + 1 < size and heap[left + 1][0] < heap[smallest][0]:
+                smallest = left + 1
+            if smallest == position:
+                return
+            self._swap(position, smallest)
+            position = smallest
+
+
+@dataclass
+class HourBucket:
+    """Pre-aggregated activity for one clock hour."""
+    start: datetime
+    total: int = 0
+    errors: int = 0
+    by_type: Counter = field(default_factory=Counter)
+    attorneys: Optional[SpaceSaving] = None
+    cases: Optional[SpaceSaving] = None
+
+
+@dataclass
+class ActivitySummary:
+    """Aggregates over a time range, built from hour buckets."""
+    start: Optional[datetime]
+    end: Optional[datetime]
+    total: int = 0
+    errors: int = 0
+    by_type: Dict[str, int] = field(default_factory=dict)
+    by_hour: Dict[int, int] = field(default_factory=dict)
+    by_day: Dict[str, int] = field(default_factory=dict)
+    top_attorneys: List[Tuple[Hashable, int, int]] = field(default_factory=list)
+    top_cases: List[Tuple[Hashable, int, int]] = field(default_factory=list)
+
+
+class ActivitySnapshotStore:
+    """SQLite table of hour buckets, upserted by ``ActivityAggregator.snapshot``."""
+
+    def __init__(self, path: str = ":memory:"):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS activity_hours (
+                hour_start TEXT PRIMARY KEY,
+                total INTEGER NOT NULL,
+                errors INTEGER NOT NULL,
+                by_type TEXT NOT NULL,
+                attorneys TEXT NOT NULL,
+                cases TEXT NOT NULL
+            )
+            """
+        )
+
+    def save(self, buckets: Iterable[HourBucket]) -> int:
+        rows = [
+            (bucket.start.isoformat(), bucket.total, bucket.errors, json.dumps(bucket.by_type),
+             json.dumps(bucket.attorneys.items()), json.dumps(bucket.cases.items()))
+            for bucket in buckets
+        ]
+        with self._conn:
+            self._conn.executemany(
+                """
+                INSERT INTO activity_hours (hour_start, total, errors, by_type, attorneys, cases)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(hour_start) DO UPDATE SET
+                    total = excluded.total, errors = excluded.errors, by_type = excluded.by_type,
+                    attorneys = excluded.attorneys, cases = excluded.cases
+                """,
+                rows,
+            )
+        return len(rows)
+
+    def load(self, start: Optional[datetime], end: Optional[datetime], capacity: int) -> List[HourBucket]:
+        clauses, params = [], []
+        if start is not None:
+            clauses.append("hour_start >= ?")
+            params.append(_hour(start).isoformat())
+        if end is not None:
+            clauses.append("hour_start <= ?")
+            params.append(end.isoformat())
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        buckets = []
+        for hour_start, total, errors, by_type, attorneys, cases in self._conn.execute(
+            f"SELECT hour_start, total, errors, by_type, attorneys, cases FROM activity_hours {where} "
+            f"ORDER BY hour_start", params
+        ):
+            buckets.append(HourBucket(
+                start=datetime.fromisoformat(hour_start), total=total, errors=errors,
+                by_type=Counter(json.loads(by_type)),
+                attorneys=SpaceSaving.merged([json.loads(attorneys)], capacity),
+                cases=SpaceSaving.merged([json.loads(cases)], capacity),
+            ))
+        return buckets
+
+    def close(self):
+        self._conn.close()
+
+
+def _hour(timestamp: datetime) -> datetime:
+    return timestamp.replace(minute=0, second=0, microsecond=0)
+
+
+class ActivityAggregator:
+    """Streaming, bounded-memory activity counters.
+
+    Memory is O(top_k * retention hours + days_retained) regardless of how
+    many events, attorneys or cases pass through. Time is taken from the
+    events themselves, so replayed or backfilled streams aggregate the same
+    way as live ones.
+    """
+
+    def __init__(self,
+                 top_k: int = 100,
+                 retention: timedelta = timedelta(hours=48),
+                 velocity_window: timedelta = timedelta(hours=1),
+                 days_retained: int = 30,
+                 store: Optional[ActivitySnapshotStore] = None,
+                 snapshot_interval: timedelta = timedelta(minutes=5)):
+        self.top_k = top_k
+        self.retention = retention
+        self.velocity_window = velocity_window
+        self.days_retained = days_retained
+        self.store = store
+        self.snapshot_interval = snapshot_interval
+
+        # Lifetime totals
+        self.total = 0
+        self.errors = 0
+        self.by_type: Counter = Counter()
+        self.by_hour = [0] * 24
+        self.peak_hour: Optional[int] = None
+        self.by_day: "OrderedDict[str, int]" = OrderedDict()
+        self.attorneys = SpaceSaving(top_k)
+        self.cases = SpaceSaving(top_k)
+        self.most_active_attorney: Optional[Hashable] = None
+        self.most_active_case: Optional[Hashable] = None
+        self.first_event: Optional[datetime] = None
+        self.late_events = 0
+
+        # Rolling velocity: [minute start, count] with a running sum
+        self._minutes: deque = deque()
+        self._window_count = 0
+
+        # Hour buckets, oldest first
+        self._hours: "OrderedDict[datetime, HourBucket]" = OrderedDict()
+        self._dirty: set = set()
+        self._latest: Optional[datetime] = None
+        self._last_snapshot: Optional[datetime] = None
+
+    def record(self, timestamp: datetime, activity_type: str,
+               attorney_id: Optional[Hashable] = None,
+               case_id: Optional[Hashable] = None,
+               is_error: bool = False) -> None:
+        """Fold one event into every aggregate."""
+        if self._latest is None or timestamp > self._latest:
+            self._latest = timestamp
+        if self.first_event is None or timestamp < self.first_event:
+            self.first_event = timestamp
+
+        self.total += 1
+        self.errors += is_error
+        self.by_type[activity_type] += 1
+
+        hour_of_day = timestamp.hour
+        self.by_hour[hour_of_day] += 1
+        if self.peak_hour is None or self.by_hour[hour_of_day] > self.by_hour[self.peak_hour]:
+            self.peak_hour = hour_of_day
+
+        day = timestamp.strftime('%Y-%m-%d')
+        if day in self.by_day:
+            self.by_day[day] += 1
+        else:
+            self.by_day[day] = 1
+            while len(self.by_day) > self.days_retained:
+                self.by_day.pop(min(self.by_day))
+
+        # Lifetime counts only grow, so the leader changes only to the key just updated
+        if attorney_id is not None:
+            self.attorneys.add(attorney_id)
+            if (self.most_active_attorney is None or
+                    self.attorneys.estimate(attorney_id) >= self.attorneys.estimate(self.most_active_attorney)):
+                self.most_active_attorney = attorney_id
+        if case_id is not None:
+            self.cases.add(case_id)
+            if (self.most_active_case is None or
+                    self.cases.estimate(case_id) >= self.cases.estimate(self.most_active_case)):
+                self.most_active_case = case_id
+
+        self._count_minute(timestamp)
+
+        bucket = self._bucket(timestamp)
+        if bucket is None:
+            self.late_events += 1
+        else:
+            bucket.total += 1
+            bucket.errors += is_error
+            bucket.by_type[activity_type] += 1
+            if attorney_id is not None:
+                bucket.attorneys.add(attorney_id)
+            if case_id is not None:
+                bucket.cases.add(case_id)
+            self._dirty.add(bucket.start)
+
+        if self.store is not None:
+            if self._last_snapshot is None:
+                self._last_snapshot = timestamp
+            elif self._latest - self._last_snapshot >= self.snapshot_interval:
+                self.snapshot()
+
+    def _count_minute(self, timestamp: datetime) -> None:
+        minute = timestamp.replace(second=0, microsecond=0)
+        cutoff = self._latest - self.velocity_window
+        if minute <= cutoff:
+            return
+        if self._minutes and self._minutes[-1][0] == minute:
+            self._minutes[-1][1] += 1
+        elif not self._minutes or self._minutes[-1][0] < minute:
+            self._minutes.append([minute, 1])
+        else:
+            # Out of order within the window: find (or insert) its minute
+            for position in range(len(self._minutes) - 1, -1, -1):
+                if self._minutes[position][0] == minute:
+                    self._minutes[position][1] += 1
+                    break
+                if self._minutes[position][0] < minute:
+                    self._minutes.insert(position + 1, [minute, 1])
+                    break
+            else:
+                self._minutes.appendleft([minute, 1])
+        self._window_count += 1
+        while self._minutes[0][0] <= cutoff:
+            self._window_count -= self._minutes.popleft()[1]
+
+    def _bucket(self, timestamp: datetime) -> Optional[HourBucket]:
+        start = _hour(timestamp)
+        bucket = self._hours.get(start)
+        if bucket is not None:
+            return bucket
+        if start <= self._latest - self.retention:
+            return None
+        bucket = HourBucket(start, attorneys=SpaceSaving(self.top_k), cases=SpaceSaving(self.top_k))
+        self._hours[start] = bucket
+        if next(reversed(self._hours)) != start:
+            self._hours = OrderedDict(sorted(self._hours.items()))
+        self._expire()
+        return bucket
+
+    def _expire(self) -> None:
+        cutoff = self._latest - self.retention
+        expired = []
+        for start in self._hours:
+            if start + timedelta(hours=1) > cutoff:
+                break
+            expired.append(start)
+        if not expired:
+            return
+        if self.store is not None and self._dirty.intersection(expired):
+            self.snapshot()
+        for start in expired:
+            del self._hours[start]
+            self._dirty.discard(start)
+
+    def velocity(self) -> int:
+        """Events within ``velocity_window`` of the latest event."""
+        return self._window_count
+
+    def snapshot(self) -> int:
+        """Upsert hour buckets changed since the last snapshot into the store."""
+        if self.store is None:
+            return 0
+        buckets = [self._hours[start] for start in sorted(self._dirty) if start in self._hours]
+        saved = self.store.save(buckets)
+        self._dirty.clear()
+        self._last_snapshot = self._latest
+        return saved
+
+    def summarize(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> ActivitySummary:
+        """Aggregate the hour buckets that begin within [hour of start, end].
+
+        Hours still held in memory take precedence over their stored snapshot;
+        older hours come from the store. Resolution is one hour.
+        """
+        buckets: Dict[datetime, HourBucket] = {}
+        if self.store is not None:
+            for bucket in self.store.load(start, end, self.top_k):
+                buckets[bucket.start] = bucket
+        for bucket_start, bucket in self._hours.items():
+            if (start is None or bucket_start >= _hour(start)) and (end is None or bucket_start <= end):
+                buckets[bucket_start] = bucket
+
+        summary = ActivitySummary(start=start, end=end)
+        by_type: Counter = Counter()
+        by_hour: Counter = Counter()
+        by_day: Counter = Counter()
+        for bucket_start, bucket in buckets.items():
+            summary.total += bucket.total
+            summary.errors += bucket.errors
+            by_type.update(bucket.by_type)
+            by_hour[bucket_start.hour] += bucket.total
+            by_day[bucket_start.strftime('%Y-%m-%d')] += bucket.total
+        summary.by_type = dict(by_type)
+        summary.by_hour = dict(by_hour)
+        summary.by_day = dict(sorted(by_day.items()))
+        summary.top_attorneys = SpaceSaving.merged(
+            (bucket.attorneys.items() for bucket in buckets.values()), self.top_k).top()
+        summary.top_cases = SpaceSaving.merged(
+            (bucket.cases.items() for bucket in buckets.values()), self.top_k).top()
+        return summary
@@ -17,6 +17,8 @@ from collections import defaultdict, deque
 import asyncio
 import json
 
+from .activity_aggregator import ActivityAggregator, ActivitySnapshotStore, ActivitySummary
+
 logger = logging.getLogger(__name__)
 
 class ActivityType(Enum):
@@ -98,10 +100,20 @@ class ActivityMetrics:
     last_updated: datetime = field(default_factory=datetime.utcnow)
 
 class ActivityTracker:
-    def __init__(self):
+    def __init__(self, top_k: int = 100, snapshot_path: Optional[str] = None):
+        """
+        Args:
+            top_k: Attorneys/cases tracked by the heavy-hitter summaries
+            snapshot_path: SQLite file for hourly aggregate snapshots; range
+                queries older than the in-memory retention read from it
+        """
         self.activity_buffer: deque = deque(maxlen=10000)
         self.session_tracker: Dict[str, Dict[str, Any]] = {}
-        self.real_time_metrics: ActivityMetrics = ActivityMetrics()
+        self.aggregator = ActivityAggregator(
+            top_k=top_k,
+            store=ActivitySnapshotStore(snapshot_path) if snapshot_path else None
+        )
+        self._velocity_alert_hour: Optional[datetime] = None
         self.activity_patterns: Dict[str, Any] = {}
         self.anomaly_thresholds: Dict[str, float] = {
             'hourly_activity_threshold': 100,
@@ -120,9 +132,11 @@ class ActivityTracker:
         description: str = "",
         metadata: Optional[Dict[str, Any]] = None,
         request_info: Optional[Dict[str, str]] = None,
-        db: Optional[AsyncSession] = None
+        db: Optional[AsyncSession] = None,
+        severity: str = "info",
+        timestamp: Optional[datetime] = None
     ) -> ActivityEvent:
-        """Track a single activity event."""
+        """Track a single activity event (``timestamp`` defaults to now; set it when replaying)."""
         try:
             event = ActivityEvent(
                 activity_type=activity_type,
@@ -134,7 +148,9 @@ class ActivityTracker:
                 metadata=metadata or {},
                 ip_address=request_info.get('ip_address') if request_info else None,
                 user_agent=request_info.get('user_agent') if request_info else None,
-                session_id=request_info.get('session_id') if request_info else None
+                session_id=request_info.get('session_id') if request_info else None,
+                severity=severity,
+                timestamp=timestamp or datetime.utcnow()
             )
             
             # Add to buffer for real-time processing
@@ -154,7 +170,7 @@ class ActivityTracker:
             # Check for anomalies
             await self._check_activity_anomalies(event)
             
-            logger.info(f"Activity tracked: {activity_type.value} for case {case_id}")
+            logger.debug(f"Activity tracked: {activity_type.value} for case {case_id}")
             return event
             
         except Exception as e:
@@ -221,37 +237,36 @@ class ActivityTracker:
         attorney_ids: Optional[List[int]] = None,
         db: Optional[AsyncSession] = None
     ) -> ActivityMetrics:
-        """Get comprehensive activity metrics for specified period."""
+        """Get comprehensive activity metrics for specified period.
+        
+        Without a date range this is the lifetime real-time view. With one,
+        metrics are summed from hourly pre-aggregated buckets (in memory for
+        recent hours, the snapshot store for older ones). case_ids and
+        attorney_ids narrow the per-case/per-attorney breakdowns, which only
+        cover the heavy hitters; totals are not filtered.
+        """
         try:
-            if not db:
-                return self.real_time_metrics
-                
-            # Set default date range
-            if not end_date:
-                end_date = datetime.utcnow()
-            if not start_date:
-                start_date = end_date - timedelta(days=30)
-            
-            # Build query filters
-            filters = [
-                # Assuming ActivityEvent model exists in database
-                # ActivityEvent.timestamp >= start_date,
-                # ActivityEvent.timestamp <= end_date
-            ]
+            if not start_date and not end_date:
+                metrics = self.real_time_metrics
+            else:
+                metrics = self._metrics_from_summary(self.aggregator.summarize(start_date, end_date))
             
-            if case_ids:
-                # filters.append(ActivityEvent.case_id.in_(case_ids))
-                pass
             if attorney_ids:
-                # filters.append(ActivityEvent.attorney_id.in_(attorney_ids))
-                pass
-            
-            metrics = ActivityMetrics()
+                metrics.activities_by_attorney = {
+                    k: v for k, v in metrics.activities_by_attorney.items() if k in attorney_ids
+                }
+                metrics.most_active_attorney = max(
+                    metrics.activities_by_attorney, key=metrics.activities_by_attorney.get, default=None
+                )
+            if case_ids:
+                metrics.activities_by_case = {
+                    k: v for k, v in metrics.activities_by_case.items() if k in case_ids
+                }
+                metrics.most_active_case = max(
+                    metrics.activities_by_case, key=metrics.activities_by_case.get, default=None
+                )
             
-            # Calculate metrics from database
-            # This would require actual database queries
-            # For now, return real-time metrics
-            return self.real_time_metrics
+            return metrics
             
         except Exception as e:
             logger.error(f"Error getting activity metrics: {e}")
@@ -403,54 +418,54 @@ class ActivityTracker:
 
     async def _update_real_time_metrics(self, event: ActivityEvent) -> None:
         """Update real-time metrics with new event."""
-        metrics = self.real_time_metrics
-        metrics.total_activities += 1
-        
-        # Update activity type counts
-        if event.activity_type in metrics.activities_by_type:
-            metrics.activities_by_type[event.activity_type] += 1
-        else:
-            metrics.activities_by_type[event.activity_type] = 1
-        
-        # Update hourly counts
-        hour = event.timestamp.hour
-        if hour in metrics.activities_by_hour:
-            metrics.activities_by_hour[hour] += 1
-        else:
-            metrics.activities_by_hour[hour] = 1
-        
-        # Update daily counts
-        day = event.timestamp.strftime('%Y-%m-%d')
-        if day in metrics.activities_by_day:
-            metrics.activities_by_day[day] += 1
-        else:
-            metrics.activities_by_day[day] = 1
-        
-        # Update attorney counts
-        if event.attorney_id:
-            if event.attorney_id in metrics.activities_by_attorney:
-                metrics.activities_by_attorney[event.attorney_id] += 1
-            else:
-                metrics.activities_by_attorney[event.attorney_id] = 1
-        
-        # Update case counts
-        if event.case_id:
-            if event.case_id in metrics.activities_by_case:
-                metrics.activities_by_case[event.case_id] += 1
-            else:
-                metrics.activities_by_case[event.case_id] = 1
-        
-        # Calculate peak values
-        if metrics.activities_by_hour:
-            metrics.peak_activity_hour = max(metrics.activities_by_hour, key=metrics.activities_by_hour.get)
-        
-        if metrics.activities_by_attorney:
-            metrics.most_active_attorney = max(metrics.activities_by_attorney, key=metrics.activities_by_attorney.get)
-        
-        if metrics.activities_by_case:
-            metrics.most_active_case = max(metrics.activities_by_case, key=metrics.activities_by_case.get)
-        
-        metrics.last_updated = datetime.utcnow()
+        self.aggregator.record(
+            event.timestamp,
+            event.activity_type.value,
+            attorney_id=event.attorney_id or None,
+            case_id=event.case_id or None,
+            is_error=event.activity_type == ActivityType.SYSTEM_ERROR or event.severity in ('error', 'critical')
+        )
+
+    @property
+    def real_time_metrics(self) -> ActivityMetrics:
+        """Lifetime metrics; per-attorney/case counts cover the top-k only."""
+        agg = self.aggregator
+        days = len(agg.by_day)
+        return ActivityMetrics(
+            total_activities=agg.total,
+            activities_by_type={ActivityType(t): n for t, n in agg.by_type.items()},
+            activities_by_hour={hour: n for hour, n in enumerate(agg.by_hour) if n},
+            activities_by_day=dict(agg.by_day),
+            activities_by_attorney={key: count for key, count, _ in agg.attorneys.top()},
+            activities_by_case={key: count for key, count, _ in agg.cases.top()},
+            avg_activities_per_day=sum(agg.by_day.values()) / days if days else 0.0,
+            peak_activity_hour=agg.peak_hour,
+            peak_activity_day=max(agg.by_day, key=agg.by_day.get, default=None),
+            most_active_attorney=agg.most_active_attorney,
+            most_active_case=agg.most_active_case,
+            activity_velocity=float(agg.velocity()),
+            error_rate=agg.errors / agg.total if agg.total else 0.0,
+            last_updated=datetime.utcnow()
+        )
+
+    def _metrics_from_summary(self, summary: ActivitySummary) -> ActivityMetrics:
+        days = len(summary.by_day)
+        return ActivityMetrics(
+            total_activities=summary.total,
+            activities_by_type={ActivityType(t): n for t, n in summary.by_type.items()},
+            activities_by_hour=summary.by_hour,
+            activities_by_day=summary.by_day,
+            activities_by_attorney={key: count for key, count, _ in summary.top_attorneys},
+            activities_by_case={key: count for key, count, _ in summary.top_cases},
+            avg_activities_per_day=summary.total / days if days else 0.0,
+            peak_activity_hour=max(summary.by_hour, key=summary.by_hour.get, default=None),
+            peak_activity_day=max(summary.by_day, key=summary.by_day.get, default=None),
+            most_active_attorney=summary.top_attorneys[0][0] if summary.top_attorneys else None,
+            most_active_case=summary.top_cases[0][0] if summary.top_cases else None,
+            activity_velocity=float(self.aggregator.velocity()),
+            error_rate=summary.errors / summary.total if summary.total else 0.0,
+            last_updated=datetime.utcnow()
+        )
 
     async def _persist_activity(self, event: ActivityEvent, db: AsyncSession) -> None:
         """Persist activity event to database."""
@@ -463,21 +478,24 @@ class ActivityTracker:
 
     async def _check_activity_anomalies(self, event: ActivityEvent) -> None:
         """Check for anomalous activity patterns."""
+        if event.activity_type == ActivityType.SYSTEM_ALERT:
+            return  # Alerts must not trigger further alerts
+        
         try:
-            # Check for unusual activity velocity
-            recent_activities = [
-                e for e in self.activity_buffer
-                if (event.timestamp - e.timestamp).total_seconds() <= 3600  # Last hour
-            ]
-            
-            hourly_velocity = len(recent_activities)
-            if hourly_velocity > self.anomaly_thresholds['hourly_activity_threshold']:
+            # Check for unusual activity velocity (rolling one-hour count),
+            # alerting at most once per clock hour rather than on every event
+            hourly_velocity = self.aggregator.velocity()
+            alert_hour = event.timestamp.replace(minute=0, second=0, microsecond=0)
+            if (hourly_velocity > self.anomaly_thresholds['hourly_activity_threshold'] and
+                    self._velocity_alert_hour != alert_hour):
+                self._velocity_alert_hour = alert_hour
                 await self.track_activity(
                     ActivityType.SYSTEM_ALERT,
                     attorney_id=event.attorney_id,
                     description=f"Unusual activity velocity: {hourly_velocity} activities in last hour",
                     metadata={'velocity': hourly_velocity, 'threshold': self.anomaly_thresholds['hourly_activity_threshold']},
-                    severity='warning'
+                    severity='warning',
+                    timestamp=event.timestamp
                 )
             
             # Check for unusual session duration
@@ -485,13 +503,16 @@ class ActivityTracker:
                 session_data = self.session_tracker[event.session_id]
                 duration = (event.timestamp - session_data['start_time']).total_seconds()
                 
-                if duration > self.anomaly_thresholds['session_duration_threshold']:
+                if (duration > self.anomaly_thresholds['session_duration_threshold'] and
+                        not session_data.get('duration_alerted')):
+                    session_data['duration_alerted'] = True
                     await self.track_activity(
                         ActivityType.SYSTEM_ALERT,
                         attorney_id=event.attorney_id,
                         description=f"Unusually long session: {duration:.0f} seconds",
                         metadata={'duration': duration, 'threshold': self.anomaly_thresholds['session_duration_threshold']},
-                        severity='info'
+                        severity='info',
+                        timestamp=event.timestamp
                     )
             
         except Exception as e:
@@ -6,7 +6,7 @@ in legal case activities, attorney behaviors, and system operations.
 """
 
 from datetime import datetime, timedelta
-from typing import List, Optional, Dict, Any, Tuple
+from typing import List, Optional, Dict, Any, Sequence, Tuple
 from enum import Enum
 from dataclasses import dataclass, field
 import asyncio
@@ -14,10 +14,12 @@ import logging
 import numpy as np
 from scipy import stats
 from collections import defaultdict, deque
+from operator import attrgetter
 from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel, Field
 
 from ..core.database import get_db_session
+from .streaming_stats import MetricRingBuffer, WindowedMoments
 
 
 logger = logging.getLogger(__name__)
@@ -107,6 +109,85 @@ class AnomalyThreshold(BaseModel):
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 
+THRESHOLD_KINDS = ("statistical", "absolute", "percentile")
+
+
+@dataclass
+class ThresholdGroup:
+    """Thresholds sharing one lookback window."""
+    lookback_us: int
+    index: np.ndarray             # Positions in the plan
+    rows: np.ndarray              # Unique ring-buffer rows of their metrics
+    inverse: np.ndarray           # rows[inverse] is the row of each threshold
+    percentile_rows: np.ndarray   # Unique rows of the percentile thresholds
+
+
+@dataclass
+class ThresholdPlan:
+    """Threshold parameters laid out as arrays for vectorized screening.
+
+    Compiled from the detector's threshold list and rebuilt whenever that
+    list changes; thresholds are treated as immutable once added, so replace
+    one (rather than editing its fields) to change its parameters. Only
+    ``is_active`` is re-read on every cycle.
+    """
+    key: Tuple[int, ...]
+    thresholds: List[AnomalyThreshold]
+    metric_names: List[str]
+    kind: np.ndarray              # Index into THRESHOLD_KINDS, -1 for other types
+    lookback_us: np.ndarray
+    min_data_points: np.ndarray
+    deviation_threshold: np.ndarray
+    percentile_threshold: np.ndarray
+    min_value: np.ndarray         # NaN when unset
+    max_value: np.ndarray
+    rows: np.ndarray              # -1 until the metric is first recorded
+    groups: List[ThresholdGroup] = field(default_factory=list)
+    resolved_metrics: int = -1
+
+    @classmethod
+    def compile(cls, thresholds: List[AnomalyThreshold]) -> "ThresholdPlan":
+        def column(values, dtype=np.float64):
+            return np.fromiter(values, dtype=dtype, count=len(thresholds))
+
+        kinds = {kind: i for i, kind in enumerate(THRESHOLD_KINDS)}
+        return cls(
+            key=tuple(map(id, thresholds)),
+            thresholds=list(thresholds),
+            metric_names=[t.metric_name for t in thresholds],
+            kind=column((kinds.get(t.threshold_type, -1) for t in thresholds), np.int64),
+            lookback_us=column((t.lookback_hours * 3_600_000_000 for t in thresholds), np.int64),
+            min_data_points=column((t.min_data_points for t in thresholds), np.int64),
+            deviation_threshold=column(t.deviation_threshold for t in thresholds),
+            percentile_threshold=column(t.percentile_threshold for t in thresholds),
+            min_value=column(np.nan if t.min_value is None else t.min_value for t in thresholds),
+            max_value=column(np.nan if t.max_value is None else t.max_value for t in thresholds),
+            rows=np.full(len(thresholds), -1, dtype=np.int64)
+        )
+
+    def resolve(self, buffer: MetricRingBuffer) -> None:
+        """Map newly recorded metrics to rows and regroup thresholds by lookback."""
+        if self.resolved_metrics == len(buffer):
+            return
+        self.resolved_metrics = len(buffer)
+        resolved = False
+        for i in np.flatnonzero(self.rows < 0).tolist():
+            row = buffer.row(self.metric_names[i])
+            if row is not None:
+                self.rows[i] = row
+                resolved = True
+        if not resolved and self.groups:
+            return
+
+        known = (self.rows >= 0) & (self.kind >= 0)
+        self.groups = []
+        for lookback in np.unique(self.lookback_us[known]).tolist():
+            index = np.flatnonzero(known & (self.lookback_us == lookback))
+            rows, inverse = np.unique(self.rows[index], return_inverse=True)
+            percentile_rows = np.unique(self.rows[index[self.kind[index] == 2]])
+            self.groups.append(ThresholdGroup(lookback, index, rows, inverse, percentile_rows))
+
+
 class AnomalyDetector:
     """
     Advanced anomaly detection system using statistical and ML techniques.
@@ -116,12 +197,15 @@ class AnomalyDetector:
         self.thresholds: List[AnomalyThreshold] = []
         self.detected_anomalies: Dict[str, Anomaly] = {}
         self.historical_baselines: Dict[str, Dict[str, Any]] = {}
-        self.time_series_data: Dict[str, deque] = defaultdict(lambda: deque(maxlen=1000))
+        self.time_series_data = MetricRingBuffer(capacity=1000)
+        self._threshold_plan: Optional[ThresholdPlan] = None
+        self._baselines_updated_at: Optional[datetime] = None
         
         # Configuration
         self.default_confidence_threshold = 0.8
         self.max_anomalies_per_cycle = 50
         self.baseline_update_interval = 3600  # 1 hour
+        self.screening_tolerance = 1e-6  # Relative slack before exact re-evaluation
         
         # Load default thresholds
         self._load_default_thresholds()
@@ -209,25 +293,11 @@ class AnomalyDetector:
         if detection_timestamp is None:
             detection_timestamp = datetime.utcnow()
             
-        detected_anomalies = []
-        
         # Update time series data
         self._update_time_series(data_snapshot, detection_timestamp)
         
-        # Apply each active threshold
-        for threshold in self.thresholds:
-            if not threshold.is_active:
-                continue
-                
-            try:
-                anomalies = await self._apply_threshold(threshold, data_snapshot, detection_timestamp)
-                detected_anomalies.extend(anomalies)
-                
-                if len(detected_anomalies) >= self.max_anomalies_per_cycle:
-                    break
-                    
-            except Exception as e:
-                logger.error(f"Error applying threshold {threshold.threshold_id}: {str(e)}")
+        # Screen every active threshold in one pass
+        detected_anomalies = await self._evaluate_thresholds(data_snapshot, detection_timestamp)
                 
         # Post-process and filter anomalies
         validated_anomalies = await self._validate_anomalies(detected_anomalies)
@@ -237,24 +307,115 @@ class AnomalyDetector:
             self.detected_anomalies[anomaly.id] = anomaly
             
         # Update baselines periodically
-        if self._should_update_baselines():
+        if self._should_update_baselines(detection_timestamp):
             await self._update_baselines(data_snapshot)
+            self._baselines_updated_at = detection_timestamp
             
         logger.info(f"Anomaly detection completed: {len(validated_anomalies)} anomalies detected")
         return validated_anomalies
         
     def _update_time_series(self, data_snapshot: Dict[str, Any], timestamp: datetime):
         """Update time series data with new snapshot."""
-        # Store data points with timestamps
-        for metric_name, value in data_snapshot.items():
-            if isinstance(value, (int, float)):
-                self.time_series_data[metric_name].append({
-                    'timestamp': timestamp,
-                    'value': value
-                })
+        # Ring buffers keep the last 1000 points per metric
+        self.time_series_data.append(data_snapshot, timestamp)
+        
+    async def _evaluate_thresholds(
+        self,
+        data_snapshot: Dict[str, Any],
+        timestamp: datetime
+    ) -> List[Anomaly]:
+        """Evaluate all active thresholds against the streaming windows.
+        
+        Windowed moments and sorted windows screen every threshold with array
+        operations. Only thresholds that may fire are then evaluated on their
+        exact window values by the per-threshold detectors, in threshold order,
+        so the result is the same as applying each threshold from scratch.
+        Metrics with out-of-order samples go through _apply_threshold.
+        """
+        plan = self._compile_thresholds()
+        count = len(plan.thresholds)
+        buffer = self.time_series_data
+        active = np.fromiter(map(attrgetter("is_active"), plan.thresholds), dtype=bool, count=count)
+        candidate = np.zeros(count, dtype=bool)
+        exact = np.zeros(count, dtype=bool)  # Evaluated by _apply_threshold
+        for i in np.flatnonzero(plan.rows < 0).tolist():
+            exact[i] = plan.metric_names[i] in data_snapshot  # Non-numeric snapshot value
+        windows: List[WindowedMoments] = []
+        window_of = np.full(count, -1, dtype=np.int64)
+        tolerance = self.screening_tolerance
+        
+        for group in plan.groups:
+            lookback = timedelta(microseconds=group.lookback_us)
+            moments = buffer.moments(lookback)
+            moments.refresh(group.rows, timestamp)
+            window_of[group.index] = len(windows)
+            windows.append(moments)
+            
+            index, rows, inverse = group.index, group.rows, group.inverse
+            kind = plan.kind[index]
+            valid = moments.valid(rows)[inverse]
+            size = moments.size(rows)[inverse]
+            mean = moments.mean[rows][inverse]
+            variance = moments.variance(rows)[inverse]
+            nonfinite = moments.nonfinite[rows][inverse] > 0
+            current = buffer.last_values(rows)[inverse]
+            enough = valid & (size > 0) & (size >= plan.min_data_points[index])
+            exact[index[~valid]] = True
+            
+            # Statistical: z-score against the window mean; near-constant
+            # windows are left to the exact computation
+            with np.errstate(divide='ignore', invalid='ignore'):
+                z_score = np.abs(current - mean) / np.sqrt(variance)
+            ill_conditioned = (variance <= tolerance * mean ** 2) & ~((variance == 0) & (mean == 0))
+            statistical = (kind == 0) & enough & (
+                nonfinite | ill_conditioned |
+                (z_score >= plan.deviation_threshold[index] * (1 - tolerance)))
+            
+            # Absolute: exact comparisons (NaN bounds never compare true)
+            absolute = (kind == 1) & enough & (
+                (current < plan.min_value[index]) | (current > plan.max_value[index]))
+            
+            # Percentile: the window minus the current value, from the sorted window
+            percentile = (kind == 2) & enough
+            unscreened = percentile & (nonfinite | (size < 2))
+            screen = np.flatnonzero(percentile & ~unscreened)
+            if screen.size:
+                quantiles = buffer.quantiles(lookback)
+                quantiles.refresh(group.percentile_rows, timestamp)
+                cutoff = quantiles.percentile(rows[inverse[screen]],
+                                              plan.percentile_threshold[index[screen]],
+                                              current[screen])
+                slack = tolerance * (np.abs(cutoff) + np.abs(current[screen]))
+                percentile[screen] = current[screen] > cutoff - slack
                 
-        # Clean up old data (keep last 1000 points)
-        # This is automatically handled by deque maxlen
+            candidate[index] = statistical | absolute | percentile
+            
+        detected_anomalies = []
+        for i in np.flatnonzero(active & (candidate | exact)).tolist():
+            threshold = plan.thresholds[i]
+            try:
+                if exact[i]:
+                    anomalies = await self._apply_threshold(threshold, data_snapshot, timestamp)
+                else:
+                    values = windows[window_of[i]].values(int(plan.rows[i]))
+                    anomalies = await self._evaluate_values(threshold, values, timestamp)
+                detected_anomalies.extend(anomalies)
+                
+                if len(detected_anomalies) >= self.max_anomalies_per_cycle:
+                    break
+                    
+            except Exception as e:
+                logger.error(f"Error applying threshold {threshold.threshold_id}: {str(e)}")
+                
+        return detected_anomalies
+        
+    def _compile_thresholds(self) -> ThresholdPlan:
+        """The threshold plan, recompiled when the threshold list has changed."""
+        plan = self._threshold_plan
+        if plan is None or plan.key != tuple(map(id, self.thresholds)):
+            plan = self._threshold_plan = ThresholdPlan.compile(self.thresholds)
+        plan.resolve(self.time_series_data)
+        return plan
         
     async def _apply_threshold(
         self,
@@ -263,20 +424,30 @@ class AnomalyDetector:
         timestamp: datetime
     ) -> List[Anomaly]:
         """Apply a specific threshold to detect anomalies."""
-        anomalies = []
-        
         # Get relevant data for this threshold
         metric_data = self._get_metric_data(threshold, data_snapshot, timestamp)
         
         if not metric_data or len(metric_data) < threshold.min_data_points:
-            return anomalies
+            return []
             
+        values = [point['value'] for point in metric_data]
+        return await self._evaluate_values(threshold, values, timestamp)
+        
+    async def _evaluate_values(
+        self,
+        threshold: AnomalyThreshold,
+        values: Sequence[float],
+        timestamp: datetime
+    ) -> List[Anomaly]:
+        """Apply a threshold to its window values, oldest first."""
+        anomalies = []
+        
         if threshold.threshold_type == "statistical":
-            anomalies.extend(await self._detect_statistical_anomalies(threshold, metric_data, timestamp))
+            anomalies.extend(await self._detect_statistical_anomalies(threshold, values, timestamp))
         elif threshold.threshold_type == "absolute":
-            anomalies.extend(await self._detect_absolute_anomalies(threshold, metric_data, timestamp))
+            anomalies.extend(await self._detect_absolute_anomalies(threshold, values, timestamp))
         elif threshold.threshold_type == "percentile":
-            anomalies.extend(await self._detect_percentile_anomalies(threshold, metric_data, timestamp))
+            anomalies.extend(await self._detect_percentile_anomalies(threshold, values, timestamp))
             
         return anomalies
         
@@ -293,12 +464,7 @@ class AnomalyDetector:
         cutoff_time = timestamp - timedelta(hours=threshold.lookback_hours)
         
         if metric_name in self.time_series_data:
-            time_series = self.time_series_data[metric_name]
-            relevant_data = [
-                point for point in time_series 
-                if point['timestamp'] >= cutoff_time
-            ]
-            return relevant_data
+            return self.time_series_data.points(metric_name, since=cutoff_time)
             
         # If no time series data, try to get from current snapshot
         if metric_name in data_snapshot:
@@ -309,17 +475,15 @@ class AnomalyDetector:
     async def _detect_statistical_anomalies(
         self,
         threshold: AnomalyThreshold,
-        metric_data: List[Dict[str, Any]],
+        values: Sequence[float],
         timestamp: datetime
     ) -> List[Anomaly]:
         """Detect statistical outliers using standard deviation."""
         anomalies = []
         
-        if len(metric_data) < threshold.min_data_points:
+        if len(values) < threshold.min_data_points:
             return anomalies
             
-        values = [point['value'] for point in metric_data]
-        
         # Calculate statistical measures
         mean_value = np.mean(values)
         std_value = np.std(values)
@@ -392,13 +556,13 @@ class AnomalyDetector:
     async def _detect_absolute_anomalies(
         self,
         threshold: AnomalyThreshold,
-        metric_data: List[Dict[str, Any]],
+        values: Sequence[float],
         timestamp: datetime
     ) -> List[Anomaly]:
         """Detect anomalies using absolute thresholds."""
         anomalies = []
         
-        current_value = metric_data[-1]['value']
+        current_value = values[-1]
         violated_threshold = None
         
         if threshold.min_value is not None and current_value < threshold.min_value:
@@ -464,16 +628,15 @@ class AnomalyDetector:
     async def _detect_percentile_anomalies(
         self,
         threshold: AnomalyThreshold,
-        metric_data: List[Dict[str, Any]],
+        values: Sequence[float],
         timestamp: datetime
     ) -> List[Anomaly]:
         """Detect anomalies using percentile-based thresholds."""
         anomalies = []
         
-        if len(metric_data) < threshold.min_data_points:
+        if len(values) < threshold.min_data_points:
             return anomalies
             
-        values = [point['value'] for point in metric_data]
         current_value = values[-1]
         
         # Calculate percentile threshold
@@ -556,30 +719,19 @@ class AnomalyDetector:
                 
         return validated
         
-    def _should_update_baselines(self) -> bool:
+    def _should_update_baselines(self, timestamp: datetime) -> bool:
         """Check if baselines should be updated."""
-        # For simplicity, update baselines every hour
-        # In production, this would be more sophisticated
-        return True
+        # Update baselines every baseline_update_interval seconds of detection time
+        if self._baselines_updated_at is None:
+            return True
+        elapsed = (timestamp - self._baselines_updated_at).total_seconds()
+        return elapsed >= self.baseline_update_interval or elapsed < 0
         
     async def _update_baselines(self, data_snapshot: Dict[str, Any]):
         """Update baseline statistics for comparison."""
-        for metric_name, time_series in self.time_series_data.items():
-            if len(time_series) < 10:
-                continue
-                
-            values = [point['value'] for point in time_series]
-            
-            baseline = {
-                'mean': np.mean(values),
-                'std': np.std(values),
-                'median': np.median(values),
-                'p95': np.percentile(values, 95),
-                'p99': np.percentile(values, 99),
-                'last_updated': datetime.utcnow(),
-                'sample_size': len(values)
-            }
-            
+        last_updated = datetime.utcnow()
+        for metric_name, baseline in self.time_series_data.summary(min_samples=10).items():
+            baseline['last_updated'] = last_updated
             self.historical_baselines[metric_name] = baseline
             
     async def detect_time_series_anomalies(
@@ -594,7 +746,7 @@ class AnomalyDetector:
         if metric_name not in self.time_series_data:
             return anomalies
             
-        time_series = list(self.time_series_data[metric_name])
+        time_series = self.time_series_data.points(metric_name)
         
         if len(time_series) < 20:  # Need sufficient data for time series analysis
             return anomalies
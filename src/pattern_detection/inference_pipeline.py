@@ -0,0 +1,281 @@
+"""
+Inference Pipeline Module
+
+Compiled, batch-oriented inference for PredictiveEngine models. The fitted
+preprocessing (missing-value fill, label encoding, standard scaling and
+feature selection) is frozen into NumPy arrays and lookup tables when a model
+is trained, so a batch of any size is one matrix through the transforms and
+one call into the model:
+
+- categorical columns map through a category -> code table frozen at
+  training time, with a per-column code for categories never seen;
+- predictions and class probabilities come from the same predict_proba pass;
+- per-row feature contributions come from one sparse product of the trees'
+  decision paths (random forest, gradient boosting) or from the coefficients
+  (linear models).
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Union
+import logging
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+logger = logging.getLogger(__name__)
+
+Rows = Union[Sequence[Dict[str, Any]], pd.DataFrame]
+
+
+@dataclass
+class PipelineOutput:
+    """Everything one pass over a batch produces."""
+    predictions: np.ndarray
+    probabilities: Optional[np.ndarray]      # (rows, classes) for classifiers
+    confidence: np.ndarray
+    contributions: Optional[np.ndarray]      # (rows, selected features), toward each prediction
+    feature_names: List[str]                 # Names of the selected features
+
+    def top_contributions(self, k: int = 5) -> List[Dict[str, float]]:
+        """The ``k`` largest contributions (by magnitude) of each row."""
+        if self.contributions is None:
+            return [{} for _ in range(len(self.predictions))]
+        k = min(k, self.contributions.shape[1])
+        order = np.argsort(-np.abs(self.contributions), axis=1, kind='stable')[:, :k]
+        values = np.take_along_axis(self.contributions, order, axis=1)
+        names = np.asarray(self.feature_names, dtype=object)[order]
+        return [dict(zip(row_names, row_values)) for row_names, row_values in zip(names.tolist(), values.tolist())]
+
+
+class TreeContributions:
+    """Per-feature decomposition of a tree ensemble's output (Saabas path attribution).
+
+    Walking a tree from root to leaf, each split moves the node value by
+    ``value[child] - value[parent]``; that change is credited to the parent's
+    split feature. All trees' credits are stacked into one sparse
+    (nodes x features*outputs) matrix, so the contributions of a batch are its
+    decision-path indicator times that matrix. Output plus contributions sum
+    to the ensemble's prediction: probabilities for random forest classifiers,
+    raw scores (log-odds) for gradient boosting, values for regressors.
+    """
+
+    def __init__(self, model: Any, n_features: int):
+        self.n_features = n_features
+        if hasattr(model, 'estimators_') and isinstance(model.estimators_, np.ndarray):
+            # Gradient boosting: estimators_[stage, output], scaled by the learning rate
+            trees = [(tree, k, model.learning_rate) for stage in model.estimators_
+                     for k, tree in enumerate(stage)]
+            self.outputs = model.estimators_.shape[1]
+            self.normalize = False
+            self._forest = None
+        else:
+            trees = [(tree, None, 1.0 / len(model.estimators_)) for tree in model.estimators_]
+            self.outputs = int(getattr(model, 'n_classes_', 1)) if hasattr(model, 'classes_') else 1
+            self.normalize = hasattr(model, 'classes_')
+            self._forest = model
+        self._trees = [tree for tree, _, _ in trees]
+
+        blocks, bias = [], np.zeros(self.outputs)
+        for tree, output, scale in trees:
+            block, root = self._tree_weights(tree.tree_, output, scale)
+            blocks.append(block)
+            bias += root
+        self.weights = sparse.vstack(blocks, format='csr')
+        self.bias = bias
+
+    def _tree_weights(self, tree: Any, output: Optional[int], scale: float):
+        value = tree.value[:, 0, :].astype(np.float64)
+        if self.normalize:
+            value = value / np.maximum(value.sum(axis=1, keepdims=True), 1e-300)
+        if output is not None:
+            # One regression tree per output: place its single value in that output's column
+            placed = np.zeros((tree.node_count, self.outputs))
+            placed[:, output] = value[:, 0]
+            value = placed
+        value *= scale
+
+        parent = np.full(tree.node_count, -1, dtype=np.int64)
+        internal = np.flatnonzero(tree.children_left >= 0)
+        parent[tree.children_left[internal]] = internal
+        parent[tree.children_right[internal]] = internal
+        child = np.flatnonzero(parent >= 0)
+        delta = value[child] - value[parent[child]]
+        feature = tree.feature[parent[child]]
+
+        rows = np.repeat(child, self.outputs)
+        columns = (feature[:, None] * self.outputs + np.arange(self.outputs)).ravel()
+        block = sparse.csr_matrix((delta.ravel(), (rows, columns)),
+                                  shape=(tree.node_count, self.n_features * self.outputs))
+        return block, value[0]
+
+    def decision_paths(self, X: np.ndarray) -> sparse.csr_matrix:
+        if self._forest is not None:
+            return self._forest.decision_path(X)[0].tocsr()
+        return sparse.hstack([tree.decision_path(X) for tree in self._trees], format='csr')
+
+    def __call__(self, X: np.ndarray) -> np.ndarray:
+        """(rows, features, outputs) contributions."""
+        product = (self.decision_paths(X) @ self.weights).toarray()
+        return product.reshape(len(X), self.n_features, self.outputs)
+
+
+class LinearContributions:
+    """``coef * x`` per feature, in the model's decision-function space."""
+
+    def __init__(self, model: Any):
+        coef = np.atleast_2d(model.coef_)
+        self.coef = coef.T[None, :, :]          # (1, features, outputs)
+        self.bias = np.atleast_1d(model.intercept_).astype(np.float64)
+        self.outputs = coef.shape[0]
+
+    def __call__(self, X: np.ndarray) -> np.ndarray:
+        return X[:, :, None] * self.coef
+
+
+class CompiledPipeline:
+    """Frozen preprocessing plus a fitted model, evaluated a whole batch at a time."""
+
+    def __init__(
+        self,
+        model: Any,
+        feature_names: List[str],
+        categories: Dict[str, Dict[str, int]],
+        unseen_codes: Dict[str, int],
+        fill_values: np.ndarray,
+        mean: Optional[np.ndarray],
+        scale: Optional[np.ndarray],
+        support: Optional[np.ndarray]
+    ):
+        self.model = model
+        self.feature_names = feature_names
+        self.categories = categories
+        self.unseen_codes = unseen_codes
+        self.fill_values = fill_values
+        self.mean = mean
+        self.scale = scale
+        self.support = support
+        self.selected_names = [name for name, keep in zip(feature_names, self._support_mask()) if keep]
+        self.classes = getattr(model, 'classes_', None) if hasattr(model, 'predict_proba') else None
+        self.explainer = self._build_explainer()
+
+    @classmethod
+    def compile(
+        cls,
+        model: Any,
+        feature_names: Sequence[str],
+        encoders: Optional[Dict[str, Any]] = None,
+        scaler: Optional[Any] = None,
+        selector: Optional[Any] = None,
+        unseen_code: int = 0
+    ) -> "CompiledPipeline":
+        """Freeze fitted LabelEncoders, StandardScaler and SelectKBest for ``model``.
+
+        Unseen categories encode as ``unseen_code`` (code 0, as the per-row
+        predict path does) and missing numeric values are filled with the
+        scaler's training mean.
+        """
+        feature_names = list(feature_names)
+        categories, unseen_codes = {}, {}
+        for name, encoder in (encoders or {}).items():
+            if name in feature_names:
+                categories[name] = {str(label): code for code, label in enumerate(encoder.classes_)}
+                unseen_codes[name] = unseen_code
+
+        mean = scale = None
+        fill_values = np.zeros(len(feature_names))
+        if scaler is not None:
+            mean = np.asarray(scaler.mean_, dtype=np.float64) if scaler.with_mean else None
+            scale = np.asarray(scaler.scale_, dtype=np.float64) if scaler.with_std else None
+            fill_values = np.asarray(scaler.mean_, dtype=np.float64).copy()
+        support = selector.get_support(indices=True) if selector is not None else None
+        return cls(model, feature_names, categories, unseen_codes, fill_values, mean, scale, support)
+
+    def transform(self, rows: Rows) -> np.ndarray:
+        """Encode, fill, scale and select: the model's input matrix for ``rows``."""
+        count = len(rows)
+        X = np.empty((count, len(self.feature_names)))
+        for j, name in enumerate(self.feature_names):
+            if isinstance(rows, pd.DataFrame):
+                raw = rows[name].to_numpy(dtype=object) if name in rows else np.full(count, None, dtype=object)
+            else:
+                raw = np.fromiter((row.get(name) for row in rows), dtype=object, count=count)
+            if name in self.categories:
+                X[:, j] = self._encode(name, raw)
+            else:
+                X[:, j] = _to_float(raw)
+
+        missing = np.isnan(X)
+        if missing.any():
+            X[missing] = np.broadcast_to(self.fill_values, X.shape)[missing]
+        if self.mean is not None:
+            X -= self.mean
+        if self.scale is not None:
+            X /= self.scale
+        if self.support is not None:
+            X = X[:, self.support]
+        return X
+
+    def run(self, rows: Rows, explain: bool = True) -> PipelineOutput:
+        """Predictions, probabilities and feature contributions for a batch."""
+        X = self.transform(rows)
+        probabilities = None
+        if self.classes is not None:
+            probabilities = self.model.predict_proba(X)
+            winner = np.argmax(probabilities, axis=1)
+            predictions = self.classes[winner]
+            confidence = probabilities[np.arange(len(X)), winner]
+        else:
+            predictions = self.model.predict(X)
+            confidence = np.full(len(X), 0.8)  # Default confidence for regression
+
+        contributions = None
+        if explain and self.explainer is not None and len(X):
+            contributions = self._toward_prediction(self.explainer(X), probabilities)
+        return PipelineOutput(predictions, probabilities, confidence, contributions, self.selected_names)
+
+    def _toward_prediction(self, contributions: np.ndarray, probabilities: Optional[np.ndarray]) -> np.ndarray:
+        """Each row's contributions toward its predicted class (or its value)."""
+        if probabilities is None:
+            return contributions[:, :, 0]
+        winner = np.argmax(probabilities, axis=1)
+        if contributions.shape[2] == 1:
+            # Binary models score the positive class; flip the sign toward class 0
+            return contributions[:, :, 0] * np.where(winner == 1, 1.0, -1.0)[:, None]
+        return np.take_along_axis(contributions, winner[:, None, None], axis=2)[:, :, 0]
+
+    def _encode(self, name: str, raw: np.ndarray) -> np.ndarray:
+        labels, inverse = np.unique(raw.astype(str), return_inverse=True)
+        table, unseen = self.categories[name], self.unseen_codes[name]
+        codes = np.array([table.get(label, unseen) for label in labels.tolist()], dtype=np.float64)
+        return codes[inverse]
+
+    def _support_mask(self) -> np.ndarray:
+        mask = np.zeros(len(self.feature_names), dtype=bool)
+        mask[self.support if self.support is not None else slice(None)] = True
+        return mask
+
+    def _build_explainer(self):
+        n_features = len(self.selected_names)
+        try:
+            if hasattr(self.model, 'estimators_') and hasattr(self.model, 'feature_importances_'):
+                return TreeContributions(self.model, n_features)
+            if hasattr(self.model, 'coef_'):
+                return LinearContributions(self.model)
+        except Exception as e:
+            logger.warning(f"Feature contributions unavailable for {type(self.model).__name__}: {e}")
+        return None
+
+
+def _to_float(raw: np.ndarray) -> np.ndarray:
+    """Object column to float64, with None and unparseable values as NaN."""
+    try:
+        return raw.astype(np.float64)
+    except (TypeError, ValueError):
+        out = np.empty(len(raw))
+        for i, value in enumerate(raw.tolist()):
+            try:
+                out[i] = float(value)
+            except (TypeError, ValueError):
+                out[i] = np.nan
+        return out
@@ -20,6 +20,7 @@ from sklearn.model_selection import train_test_split, cross_val_score
 from sklearn.preprocessing import StandardScaler, LabelEncoder
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, mean_squared_error, r2_score
 from sklearn.feature_selection import SelectKBest, f_classif, f_regression
+from .inference_pipeline import CompiledPipeline
 import pickle
 import asyncio
 import json
@@ -79,6 +80,7 @@ class PredictiveEngine:
         self.encoders: Dict[str, LabelEncoder] = {}
         self.feature_selectors: Dict[str, SelectKBest] = {}
         self.model_performance: Dict[str, Dict[str, float]] = {}
+        self.pipelines: Dict[str, CompiledPipeline] = {}
         self.prediction_cache: Dict[str, List[Prediction]] = {}
         
         # Model configurations
@@ -145,7 +147,7 @@ class PredictiveEngine:
                 return {'error': f'Target variable {config["target"]} not found in training data'}
             
             # Handle missing values
-            X = X.fillna(X.mean() if X.select_dtypes(include=[np.number]).shape[1] > 0 else 0)
+            X = X.fillna(X.mean(numeric_only=True) if X.select_dtypes(include=[np.number]).shape[1] > 0 else 0)
             
             # Encode categorical variables
             categorical_columns = X.select_dtypes(include=['object']).columns
@@ -224,6 +226,13 @@ class PredictiveEngine:
             # Store best model
             self.models[model_type.value] = best_model
             self.model_performance[model_type.value] = model_results
+            self.pipelines[model_type.value] = CompiledPipeline.compile(
+                best_model,
+                feature_columns,
+                encoders={col: self.encoders[col] for col in categorical_columns},
+                scaler=self.scalers[scaler_key],
+                selector=self.feature_selectors[selector_key]
+            )
             
             # Calculate feature importance
             feature_importance = {}
@@ -283,7 +292,7 @@ class PredictiveEngine:
             X = feature_df[required_features].copy()
             
             # Handle missing values
-            X = X.fillna(X.mean() if X.select_dtypes(include=[np.number]).shape[1] > 0 else 0)
+            X = X.fillna(X.mean(numeric_only=True) if X.select_dtypes(include=[np.number]).shape[1] > 0 else 0)
             
             # Encode categorical variables
             categorical_columns = X.select_dtypes(include=['object']).columns
@@ -370,18 +379,60 @@ class PredictiveEngine:
         self,
         model_type: PredictionModel,
         input_data: List[Dict[str, Any]],
-        target_entity_ids: Optional[List[int]] = None
+        target_entity_ids: Optional[List[int]] = None,
+        top_contributions: int = 5
     ) -> List[Prediction]:
-        """Make batch predictions."""
+        """Make batch predictions.
+
+        The whole batch goes through the model's compiled pipeline in one
+        pass; each prediction's ``metadata['feature_contributions']`` holds its
+        ``top_contributions`` largest per-feature contributions.
+        """
         try:
-            predictions = []
+            config = self.model_configs.get(model_type)
+            pipeline = self._get_pipeline(model_type)
+            if not config or pipeline is None or not input_data:
+                return []
             
+            output = pipeline.run(input_data, explain=top_contributions > 0)
+            contributions = output.top_contributions(top_contributions)
+            
+            # Global feature importance, as reported by predict()
+            feature_importance = {}
+            if hasattr(pipeline.model, 'feature_importances_'):
+                for name, importance in zip(output.feature_names, pipeline.model.feature_importances_):
+                    feature_importance[name] = float(importance)
+            
+            predictions = []
             for i, input_features in enumerate(input_data):
                 entity_id = target_entity_ids[i] if target_entity_ids and i < len(target_entity_ids) else None
+                predicted_value = output.predictions[i]
+                confidence_score = float(output.confidence[i])
                 
-                prediction = await self.predict(model_type, input_features, entity_id)
-                if prediction:
-                    predictions.append(prediction)
+                probability_distribution = None
+                if output.probabilities is not None and config['type'] in [OutcomeType.CLASSIFICATION, OutcomeType.PROBABILITY]:
+                    probability_distribution = {
+                        str(cls): float(prob) for cls, prob in zip(pipeline.classes, output.probabilities[i])
+                    }
+                
+                explanation, recommendations, risk_factors = await self._generate_prediction_insights(
+                    model_type, predicted_value, input_features, feature_importance, confidence_score
+                )
+                
+                predictions.append(Prediction(
+                    model_type=model_type,
+                    outcome_type=config['type'],
+                    target_entity_id=entity_id,
+                    predicted_value=predicted_value,
+                    confidence_score=confidence_score,
+                    probability_distribution=probability_distribution,
+                    feature_importance=dict(feature_importance),
+                    input_features=input_features,
+                    explanation=explanation,
+                    recommendations=recommendations,
+                    risk_factors=risk_factors,
+                    metadata={'feature_contributions': contributions[i]}
+                ))
             
             return predictions
             
@@ -389,6 +440,26 @@ class PredictiveEngine:
             logger.error(f"Error making batch predictions: {e}")
             return []
 
+    def _get_pipeline(self, model_type: PredictionModel) -> Optional[CompiledPipeline]:
+        """Compiled pipeline for a trained model, compiled on first use if missing."""
+        pipeline = self.pipelines.get(model_type.value)
+        if pipeline is not None or model_type.value not in self.models:
+            return pipeline
+        
+        scaler = self.scalers.get(f"{model_type.value}_scaler")
+        if scaler is None or not hasattr(scaler, 'feature_names_in_'):
+            return None
+        feature_columns = list(scaler.feature_names_in_)
+        pipeline = CompiledPipeline.compile(
+            self.models[model_type.value],
+            feature_columns,
+            encoders={col: self.encoders[col] for col in feature_columns if col in self.encoders},
+            scaler=scaler,
+            selector=self.feature_selectors.get(f"{model_type.value}_selector")
+        )
+        self.pipelines[model_type.value] = pipeline
+        return pipeline
+
     async def get_model_performance(
         self,
         model_type: Optional[PredictionModel] = None
@@ -456,6 +527,7 @@ class PredictiveEngine:
                 'encoders': self.encoders,
                 'feature_selectors': self.feature_selectors,
                 'model_performance': self.model_performance,
+                'pipelines': self.pipelines,
                 'saved_at': datetime.utcnow()
             }
             
@@ -480,6 +552,7 @@ class PredictiveEngine:
             self.encoders = model_data.get('encoders', {})
             self.feature_selectors = model_data.get('feature_selectors', {})
             self.model_performance = model_data.get('model_performance', {})
+            self.pipelines = model_data.get('pipelines', {})
             
             logger.info(f"Models loaded from {file_path}")
             return True
@@ -0,0 +1,471 @@
+"""
+Streaming Statistics Module
+
+Incremental per-metric statistics for anomaly detection. Samples are kept in
+NumPy ring buffers, one row per metric, and trailing time windows over those
+buffers are maintained as samples arrive and expire instead of being rebuilt
+from the history on every evaluation:
+
+- ``WindowedMoments`` keeps a Welford count/mean/variance per metric, O(1)
+  per sample added or expired;
+- ``WindowedQuantiles`` keeps the window's values in sorted order, so any
+  percentile is an index lookup. A window never holds more than the ring's
+  capacity, so the sorted window is exact rather than an approximate sketch.
+
+Windows assume samples arrive in timestamp order. A metric that receives an
+out-of-order sample is reported as invalid until that sample leaves its ring,
+and callers fall back to an exact scan (``MetricRingBuffer.window``).
+"""
+
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone, tzinfo
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Tuple
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime(1970, 1, 1)
+EPOCH_UTC = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def to_microseconds(timestamp: datetime) -> int:
+    """Exact integer microseconds since the epoch (naive timestamps stay naive)."""
+    epoch = EPOCH if timestamp.tzinfo is None else EPOCH_UTC
+    return (timestamp - epoch) // _MICROSECOND
+
+
+class MetricRingBuffer:
+    """The last ``capacity`` samples of every numeric metric.
+
+    Values and microsecond timestamps are stored in two (metrics x capacity)
+    arrays; ``seq[row]`` counts the samples ever appended to a row, so sample
+    ``s`` lives in slot ``s % capacity`` while ``seq - capacity <= s < seq``.
+    """
+
+    def __init__(self, capacity: int = 1000, initial_rows: int = 64):
+        self.capacity = capacity
+        self.values = np.zeros((initial_rows, capacity))
+        self.timestamps = np.zeros((initial_rows, capacity), dtype=np.int64)
+        self.seq = np.zeros(initial_rows, dtype=np.int64)
+        self.last_timestamp = np.full(initial_rows, np.iinfo(np.int64).min, dtype=np.int64)
+        self.unordered_at = np.full(initial_rows, -1, dtype=np.int64)  # Seq of the last out-of-order sample
+        self._rows: Dict[str, int] = {}
+        self._names: List[str] = []
+        self._tz: Optional[tzinfo] = None
+        self._moments: Dict[int, "WindowedMoments"] = {}
+        self._quantiles: Dict[int, "WindowedQuantiles"] = {}
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __contains__(self, metric_name: object) -> bool:
+        return metric_name in self._rows
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._names)
+
+    def row(self, metric_name: str) -> Optional[int]:
+        return self._rows.get(metric_name)
+
+    def name(self, row: int) -> str:
+        return self._names[row]
+
+    def append(self, data_snapshot: Mapping[str, Any], timestamp: datetime) -> int:
+        """Record every int/float value in the snapshot at ``timestamp``; returns the count."""
+        names, values = [], []
+        for metric_name, value in data_snapshot.items():
+            if isinstance(value, (int, float)):
+                names.append(metric_name)
+                values.append(value)
+        if not names:
+            return 0
+
+        self._tz = timestamp.tzinfo
+        rows = np.fromiter((self._row_for(name) for name in names), dtype=np.int64, count=len(names))
+        x = np.asarray(values, dtype=np.float64)
+        ts = to_microseconds(timestamp)
+
+        unordered = rows[self.last_timestamp[rows] > ts]
+        if unordered.size:
+            self.unordered_at[unordered] = self.seq[unordered]
+            for window in self._windows():
+                window._untrack(unordered)
+
+        seq = self.seq[rows]
+        full = rows[seq >= self.capacity]
+        if full.size:
+            for window in self._windows():
+                window._evict(full, self.seq[full] - self.capacity)
+
+        slots = seq % self.capacity
+        self.values[rows, slots] = x
+        self.timestamps[rows, slots] = ts
+        self.seq[rows] = seq + 1
+        self.last_timestamp[rows] = np.maximum(self.last_timestamp[rows], ts)
+
+        for window in self._windows():
+            window._push(rows, x)
+        return len(names)
+
+    def oldest(self, rows: np.ndarray) -> np.ndarray:
+        """Seq of the oldest sample still held for each row."""
+        return np.maximum(self.seq[rows] - self.capacity, 0)
+
+    def ordered(self, rows: np.ndarray) -> np.ndarray:
+        """Whether each row's held samples are in timestamp order."""
+        return self.unordered_at[rows] <= self.oldest(rows)
+
+    def last_values(self, rows: np.ndarray) -> np.ndarray:
+        return self.values[rows, (self.seq[rows] - 1) % self.capacity]
+
+    def segment(self, row: int, start: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """(timestamps, values) of samples ``start``.. of one row, oldest first."""
+        end = int(self.seq[row])
+        start = max(end - self.capacity, 0 if start is None else int(start))
+        slots = np.arange(start, end) % self.capacity
+        return self.timestamps[row, slots], self.values[row, slots]
+
+    def window(self, metric_name: str, since: Optional[datetime] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """(timestamps, values) at or after ``since``, by scanning the ring (any order)."""
+        row = self._rows.get(metric_name)
+        if row is None:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        timestamps, values = self.segment(row)
+        if since is not None:
+            keep = timestamps >= to_microseconds(since)
+            timestamps, values = timestamps[keep], values[keep]
+        return timestamps, values
+
+    def points(self, metric_name: str, since: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Samples as ``{'timestamp', 'value'}`` dicts, oldest first."""
+        timestamps, values = self.window(metric_name, since)
+        return [{'timestamp': self.to_datetime(ts), 'value': value}
+                for ts, value in zip(timestamps.tolist(), values.tolist())]
+
+    def to_datetime(self, microseconds: int) -> datetime:
+        if self._tz is None:
+            return EPOCH + timedelta(microseconds=microseconds)
+        return (EPOCH_UTC + timedelta(microseconds=microseconds)).astimezone(self._tz)
+
+    def moments(self, lookback: timedelta) -> "WindowedMoments":
+        """The shared moments window for ``lookback``, created on first use."""
+        key = lookback // _MICROSECOND
+        if key not in self._moments:
+            self._moments[key] = WindowedMoments(self, key)
+        return self._moments[key]
+
+    def quantiles(self, lookback: timedelta) -> "WindowedQuantiles":
+        """The shared sorted window for ``lookback``, created on first use."""
+        key = lookback // _MICROSECOND
+        if key not in self._quantiles:
+            self._quantiles[key] = WindowedQuantiles(self, key)
+        return self._quantiles[key]
+
+    def summary(self, min_samples: int = 1) -> Dict[str, Dict[str, Any]]:
+        """Mean, std, median, p95 and p99 over each metric's whole ring.
+
+        Rows are grouped by sample count so each group is one (rows x count)
+        matrix and every statistic is a single axis-1 reduction.
+        """
+        n = len(self._names)
+        sizes = np.minimum(self.seq[:n], self.capacity)
+        summary = {}
+        for size in np.unique(sizes[sizes >= max(min_samples, 1)]):
+            rows = np.flatnonzero(sizes == size)
+            slots = (self.seq[rows, None] - size + np.arange(size)) % self.capacity
+            matrix = self.values[rows[:, None], slots]
+            mean = np.mean(matrix, axis=1)
+            std = np.std(matrix, axis=1)
+            median = np.median(matrix, axis=1)
+            p95, p99 = np.percentile(matrix, [95, 99], axis=1)
+            for i, row in enumerate(rows.tolist()):
+                summary[self._names[row]] = {
+                    'mean': mean[i],
+                    'std': std[i],
+                    'median': median[i],
+                    'p95': p95[i],
+                    'p99': p99[i],
+                    'sample_size': int(size)
+                }
+        return summary
+
+    def _row_for(self, metric_name: str) -> int:
+        row = self._rows.get(metric_name)
+        if row is None:
+            row = len(self._names)
+            if row == len(self.seq):
+                self._grow(2 * row)
+            self._rows[metric_name] = row
+            self._names.append(metric_name)
+        return row
+
+    def _grow(self, rows: int) -> None:
+        extra = rows - len(self.seq)
+        self.values = np.vstack([self.values, np.zeros((extra, self.capacity))])
+        self.timestamps = np.vstack([self.timestamps, np.zeros((extra, self.capacity), dtype=np.int64)])
+        self.seq = np.concatenate([self.seq, np.zeros(extra, dtype=np.int64)])
+        self.last_timestamp = np.concatenate(
+            [self.last_timestamp, np.full(extra, np.iinfo(np.int64).min, dtype=np.int64)])
+        self.unordered_at = np.concatenate([self.unordered_at, np.full(extra, -1, dtype=np.int64)])
+        for window in self._windows():
+            window._grow(rows)
+
+    def _windows(self) -> List["TimeWindow"]:
+        return [*self._moments.values(), *self._quantiles.values()]
+
+
+class TimeWindow(ABC):
+    """Samples of each tracked row no older than a trailing cutoff.
+
+    A row's window is the samples ``start[row]..seq[row]``. New samples are
+    pushed as the buffer appends them and ring evictions are discarded before
+    the slot is overwritten; expiry by time happens in ``refresh``, which also
+    starts tracking rows it has not seen. Subclasses keep their statistic in
+    step through ``_add``, ``_discard`` and ``_reset``.
+    """
+
+    # Rows are rebuilt from the ring after this many expiries, bounding drift
+    resync_after = 1000
+
+    def __init__(self, buffer: MetricRingBuffer, lookback_us: int):
+        self.buffer = buffer
+        self.lookback_us = lookback_us
+        rows = len(buffer.seq)
+        self.tracked = np.zeros(rows, dtype=bool)
+        self.start = np.zeros(rows, dtype=np.int64)
+        self.nonfinite = np.zeros(rows, dtype=np.int64)
+        self.discards = np.zeros(rows, dtype=np.int64)
+        self._cutoff: Optional[int] = None
+
+    def refresh(self, rows: np.ndarray, now: datetime) -> None:
+        """Bring the windows of ``rows`` (unique) up to date for ``now``."""
+        cutoff = to_microseconds(now) - self.lookback_us
+        if self._cutoff is not None and cutoff < self._cutoff:
+            self.tracked[:] = False  # Time went backwards: windows regrow from the ring
+        self._cutoff = cutoff
+
+        rows = rows[self.buffer.ordered(rows)]
+        stale = rows[~self.tracked[rows] | (self.discards[rows] >= self.resync_after)]
+        for row in stale.tolist():
+            self._seed(row, cutoff)
+
+        expiring = rows[self.tracked[rows]]
+        for _ in range(8):
+            expiring = expiring[self.start[expiring] < self.buffer.seq[expiring]]
+            front = self.buffer.timestamps[expiring, self.start[expiring] % self.buffer.capacity]
+            expiring = expiring[front < cutoff]
+            if not expiring.size:
+                return
+            self._drop_front(expiring)
+        for row in expiring.tolist():  # Long idle rows: cheaper to rebuild
+            self._seed(row, cutoff)
+
+    def valid(self, rows: np.ndarray) -> np.ndarray:
+        """Whether each row's window is tracked (its samples are in order)."""
+        return self.tracked[rows]
+
+    def size(self, rows: np.ndarray) -> np.ndarray:
+        """Samples in each window, including non-finite ones."""
+        return self.buffer.seq[rows] - self.start[rows]
+
+    def values(self, row: int) -> np.ndarray:
+        """The window's values in arrival order."""
+        return self.buffer.segment(row, self.start[row])[1]
+
+    def _seed(self, row: int, cutoff: int) -> None:
+        timestamps, values = self.buffer.segment(row)
+        skip = int(np.searchsorted(timestamps, cutoff, side='left'))
+        values = values[skip:]
+        finite = np.isfinite(values)
+        self.start[row] = self.buffer.oldest(row) + skip
+        self.nonfinite[row] = values.size - np.count_nonzero(finite)
+        self.discards[row] = 0
+        self.tracked[row] = True
+        self._reset(row, values[finite])
+
+    def _drop_front(self, rows: np.ndarray) -> None:
+        x = self.buffer.values[rows, self.start[rows] % self.buffer.capacity]
+        self.start[rows] += 1
+        self.discards[rows] += 1
+        finite = np.isfinite(x)
+        self.nonfinite[rows[~finite]] -= 1
+        if finite.any():
+            self._discard(rows[finite], x[finite])
+
+    def _push(self, rows: np.ndarray, x: np.ndarray) -> None:
+        keep = self.tracked[rows]
+        rows, x = rows[keep], x[keep]
+        finite = np.isfinite(x)
+        self.nonfinite[rows[~finite]] += 1
+        if finite.any():
+            self._add(rows[finite], x[finite])
+
+    def _evict(self, rows: np.ndarray, oldest: np.ndarray) -> None:
+        rows = rows[self.tracked[rows] & (self.start[rows] == oldest)]
+        if rows.size:
+            self._drop_front(rows)
+
+    def _untrack(self, rows: np.ndarray) -> None:
+        self.tracked[rows] = False
+
+    def _grow(self, rows: int) -> None:
+        extra = rows - len(self.tracked)
+        self.tracked = np.concatenate([self.tracked, np.zeros(extra, dtype=bool)])
+        self.start = np.concatenate([self.start, np.zeros(extra, dtype=np.int64)])
+        self.nonfinite = np.concatenate([self.nonfinite, np.zeros(extra, dtype=np.int64)])
+        self.discards = np.concatenate([self.discards, np.zeros(extra, dtype=np.int64)])
+
+    @abstractmethod
+    def _add(self, rows: np.ndarray, x: np.ndarray) -> None:
+        """Add finite samples ``x`` to the windows of ``rows``."""
+
+    @abstractmethod
+    def _discard(self, rows: np.ndarray, x: np.ndarray) -> None:
+        """Remove expired finite samples ``x`` from the windows of ``rows``."""
+
+    @abstractmethod
+    def _reset(self, row: int, values: np.ndarray) -> None:
+        """Rebuild a row's statistic from its window's finite ``values``."""
+
+
+class WindowedMoments(TimeWindow):
+    """Welford count, mean and M2 of each window's finite values.
+
+    Adding and expiring a sample are the forward and reverse Welford updates,
+    vectorized over all rows that change together.
+    """
+
+    def __init__(self, buffer: MetricRingBuffer, lookback_us: int):
+        super().__init__(buffer, lookback_us)
+        rows = len(buffer.seq)
+        self.count = np.zeros(rows, dtype=np.int64)
+        self.mean = np.zeros(rows)
+        self.m2 = np.zeros(rows)
+
+    def variance(self, rows: np.ndarray) -> np.ndarray:
+        """Population variance of each window (0 when empty)."""
+        count = self.count[rows]
+        return np.where(count > 0, self.m2[rows] / np.maximum(count, 1), 0.0)
+
+    def _add(self, rows, x):
+        count = self.count[rows] + 1
+        delta = x - self.mean[rows]
+        mean = self.mean[rows] + delta / count
+        self.m2[rows] += delta * (x - mean)
+        self.mean[rows] = mean
+        self.count[rows] = count
+
+    def _discard(self, rows, x):
+        count = self.count[rows] - 1
+        delta = x - self.mean[rows]
+        mean = np.where(count > 0, self.mean[rows] - delta / np.maximum(count, 1), 0.0)
+        m2 = np.where(count > 0, self.m2[rows] - delta * (x - mean), 0.0)
+        self.mean[rows] = mean
+        self.m2[rows] = np.maximum(m2, 0.0)
+        self.count[rows] = count
+
+    def _reset(self, row, values):
+        self.count[row] = values.size
+        self.mean[row] = values.mean() if values.size else 0.0
+        self.m2[row] = np.sum((values - self.mean[row]) ** 2)
+
+    def _grow(self, rows):
+        extra = rows - len(self.count)
+        super()._grow(rows)
+        self.count = np.concatenate([self.count, np.zeros(extra, dtype=np.int64)])
+        self.mean = np.concatenate([self.mean, np.zeros(extra)])
+        self.m2 = np.concatenate([self.m2, np.zeros(extra)])
+
+
+class WindowedQuantiles(TimeWindow):
+    """Each window's finite values kept sorted, one matrix row per tracked metric.
+
+    Samples that arrive or expire together are inserted or removed with one
+    masked shift over the rows involved, and percentiles for many rows are
+    gathered at once.
+    """
+
+    def __init__(self, buffer: MetricRingBuffer, lookback_us: int):
+        super().__init__(buffer, lookback_us)
+        self.slot = np.full(len(buffer.seq), -1, dtype=np.int64)
+        self.sorted = np.empty((0, buffer.capacity))
+        self.length = np.zeros(0, dtype=np.int64)
+
+    def percentile(self, rows: np.ndarray, q: np.ndarray, exclude: np.ndarray) -> np.ndarray:
+        """Linear-interpolated ``q``th percentile of each window minus one ``exclude`` value.
+
+        Matches ``np.percentile(window_without_exclude, q)`` up to rounding;
+        NaN where fewer than one value would remain. ``exclude`` must be a
+        finite member of the window.
+        """
+        slots = self.slot[rows]
+        n = self.length[slots] - 1
+        result = np.full(len(rows), np.nan)
+        ok = n > 0
+        slots, n, q, exclude = slots[ok], n[ok], q[ok], exclude[ok]
+
+        index = (n - 1) * (np.asarray(q, dtype=np.float64) / 100)
+        lo = np.floor(index).astype(np.int64)
+        t = index - lo
+        hi = np.minimum(lo + 1, n - 1)
+
+        def pick(k):
+            # Element k of the window with one copy of ``exclude`` removed
+            value = self.sorted[slots, k]
+            shifted = self.sorted[slots, np.minimum(k + 1, n)]
+            return np.where(value < exclude, value, shifted)
+
+        a, b = pick(lo), pick(hi)
+        diff = b - a
+        result[ok] = np.where(t >= 0.5, b - diff * (1 - t), a + diff * t)
+        return result
+
+    def window_sorted(self, row: int) -> np.ndarray:
+        slot = self.slot[row]
+        return self.sorted[slot, :self.length[slot]]
+
+    def _slot_for(self, row: int) -> int:
+        slot = self.slot[row]
+        if slot < 0:
+            slot = len(self.length)
+            if slot == len(self.sorted):
+                grown = max(16, 2 * slot)
+                self.sorted = np.vstack([self.sorted, np.empty((grown - slot, self.buffer.capacity))])
+            self.length = np.append(self.length, 0)
+            self.slot[row] = slot
+        return slot
+
+    def _add(self, rows, x):
+        slots, lines, length, columns = self._lines(rows, extra=1)
+        position = np.count_nonzero((lines < x[:, None]) & (columns < length[:, None]), axis=1)[:, None]
+        shifted = np.concatenate([lines[:, :1], lines[:, :-1]], axis=1)
+        lines = np.where(columns < position, lines, np.where(columns == position, x[:, None], shifted))
+        self.sorted[slots, :lines.shape[1]] = lines
+        self.length[slots] = length + 1
+
+    def _discard(self, rows, x):
+        slots, lines, length, columns = self._lines(rows)
+        position = np.count_nonzero((lines < x[:, None]) & (columns < length[:, None]), axis=1)[:, None]
+        shifted = np.concatenate([lines[:, 1:], lines[:, -1:]], axis=1)
+        self.sorted[slots, :lines.shape[1]] = np.where(columns < position, lines, shifted)
+        self.length[slots] = length - 1
+
+    def _lines(self, rows, extra=0):
+        """The used prefix of each row's sorted values, for one vectorized insert or delete."""
+        slots = self.slot[rows]
+        length = self.length[slots]
+        width = min(int(length.max()) + extra, self.buffer.capacity)
+        return slots, self.sorted[slots, :width], length, np.arange(width)
+
+    def _reset(self, row, values):
+        slot = self._slot_for(row)
+        self.sorted[slot, :values.size] = np.sort(values)
+        self.length[slot] = values.size
+
+    def _grow(self, rows):
+        extra = rows - len(self.slot)
+        super()._grow(rows)
+        self.slot = np.concatenate([self.slot, np.full(extra, -1, dtype=np.int64)])
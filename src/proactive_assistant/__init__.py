@@ -18,6 +18,7 @@ Features:
 from .case_monitor import CaseMonitor, MonitoringRule, AlertPriority, AlertType
 from .deadline_tracker import DeadlineTracker, DeadlineType, DeadlineAlert, TaskReminder
 from .document_watcher import DocumentWatcher, DocumentChange, ChangeType, DocumentAlert
+from .snapshot_store import DocumentSnapshotStore
 from .intelligent_alerts import IntelligentAlertsEngine, AlertClassification, RiskAssessment
 from .recommendation_engine import RecommendationEngine, RecommendationType, ActionRecommendation
 from .compliance_monitor import ComplianceMonitor, ComplianceRule, ComplianceViolation
@@ -49,6 +50,7 @@ __all__ = [
     "DocumentChange",
     "ChangeType",
     "DocumentAlert",
+    "DocumentSnapshotStore",
     
     # Intelligence & Alerts
     "IntelligentAlertsEngine",
@@ -10,22 +10,27 @@ from typing import List, Optional, Dict, Any, Set, Tuple
 from enum import Enum
 from dataclasses import dataclass, field
 from pathlib import Path
-import hashlib
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+import functools
 import mimetypes
 import asyncio
 import logging
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload, joinedload
 from sqlalchemy import select, and_, or_, func, desc
 from pydantic import BaseModel, Field
 
 from ..core.database import get_db_session
 from ..client_portal.models import Document, DocumentStatus, DocumentType
 from ..trial_prep.models import Case
+from .snapshot_store import DocumentSnapshotStore, hash_file, read_file_states
 
 
 logger = logging.getLogger(__name__)
 
+# Files stat'ed (and re-hashed when changed) per thread-pool task
+FILE_STATE_CHUNK_SIZE = 64
+
 
 class ChangeType(str, Enum):
     """Types of document changes."""
@@ -128,14 +133,22 @@ class DocumentWatcher:
     Intelligent document monitoring with change detection and analysis.
     """
     
-    def __init__(self):
+    def __init__(self, snapshot_db_path: str = "data/document_snapshots.db", hash_workers: int = 4):
         self.watch_rules: List[DocumentWatchRule] = []
-        self.document_snapshots: Dict[int, Dict[str, Any]] = {}
+        self.document_snapshots = DocumentSnapshotStore(snapshot_db_path)
         self.pending_changes: Dict[str, DocumentChange] = {}
         self.active_alerts: Dict[str, DocumentAlert] = {}
         self.content_analysis_cache: Dict[int, DocumentAnalysis] = {}
         self.is_watching = False
         self.scan_interval = 600  # 10 minutes
+        self.last_scan: Optional[datetime] = None
+        
+        # Incremental scanning
+        self.batch_size = 2000  # Changed documents loaded per query
+        self.change_overlap = timedelta(seconds=30)  # Re-read window for late-committing updates
+        self.file_sweep_batch = 5000  # Files re-checked on disk per cycle for out-of-band edits
+        self.executor = ThreadPoolExecutor(max_workers=hash_workers)
+        self._cycle_documents: Dict[int, Document] = {}
         
         # Load default watch rules
         self._load_default_rules()
@@ -229,102 +242,237 @@ class DocumentWatcher:
         logger.info("Stopping document watching service")
         
     async def _initialize_snapshots(self):
-        """Initialize document snapshots for change detection."""
-        async with get_db_session() as db:
-            # Get all active documents
-            query = select(Document).where(
-                Document.status != DocumentStatus.DELETED
-            ).options(selectinload(Document.case))
-            
-            result = await db.execute(query)
-            documents = result.scalars().all()
+        """Build the snapshot store on first run; later runs resume from it."""
+        if self.document_snapshots.high_water_mark is not None:
+            logger.info(f"Resuming document watching with {len(self.document_snapshots)} stored snapshots")
+            return
             
-            for document in documents:
-                snapshot = await self._create_document_snapshot(document, db)
-                self.document_snapshots[document.id] = snapshot
+        high_water_mark = (datetime.min, 0)
+        async with get_db_session() as db:
+            last_id = 0
+            while True:
+                query = select(Document).where(
+                    Document.status != DocumentStatus.DELETED,
+                    Document.id > last_id
+                ).order_by(Document.id).limit(self.batch_size)
+                
+                result = await db.execute(query)
+                documents = result.scalars().all()
+                if not documents:
+                    break
+                    
+                snapshots = await self._create_document_snapshots(documents, {})
+                await self._in_store(self.document_snapshots.apply, list(snapshots.values()))
+                high_water_mark = max([high_water_mark] + [self._change_key(doc) for doc in documents])
+                last_id = documents[-1].id
+                db.expunge_all()
                 
+        await self._in_store(self.document_snapshots.apply, state=self._high_water_mark_state(high_water_mark))
         logger.info(f"Initialized snapshots for {len(self.document_snapshots)} documents")
         
     async def _watching_cycle(self):
-        """Execute one document watching cycle."""
+        """Execute one document watching cycle over what changed since the last one."""
         async with get_db_session() as db:
-            # Get current documents
-            query = select(Document).where(
-                Document.status != DocumentStatus.DELETED
-            ).options(selectinload(Document.case))
-            
-            result = await db.execute(query)
-            current_documents = result.scalars().all()
-            
-            current_doc_ids = {doc.id for doc in current_documents}
-            previous_doc_ids = set(self.document_snapshots.keys())
-            
-            # Detect new documents
-            new_doc_ids = current_doc_ids - previous_doc_ids
-            for doc_id in new_doc_ids:
-                document = next(doc for doc in current_documents if doc.id == doc_id)
-                await self._handle_document_created(document, db)
+            # Documents updated since the high-water mark, including soft deletes
+            changed_count = 0
+            async for documents in self._iter_changed_documents(db):
+                changed_count += len(documents)
+                await self._process_changed_documents(documents, db)
                 
-            # Detect deleted documents
-            deleted_doc_ids = previous_doc_ids - current_doc_ids
-            for doc_id in deleted_doc_ids:
+            # Documents removed outright
+            removed_ids = await self._find_removed_documents(db)
+            for doc_id in removed_ids:
                 await self._handle_document_deleted(doc_id, db)
-                
-            # Check for changes in existing documents
-            for document in current_documents:
-                if document.id in self.document_snapshots:
-                    await self._check_document_changes(document, db)
-                    
-            # Update snapshots
-            for document in current_documents:
-                snapshot = await self._create_document_snapshot(document, db)
-                self.document_snapshots[document.id] = snapshot
-                
+            await self._in_store(self.document_snapshots.apply, deleted_ids=removed_ids)
+            
+            # Files edited on disk without a database update
+            await self._sweep_file_changes()
+            
             # Process pending changes
             await self._process_pending_changes(db)
             
             # Clean up old alerts and changes
             await self._cleanup_old_items()
             
-        logger.debug(f"Document watching cycle completed for {len(current_documents)} documents")
+        self.last_scan = datetime.utcnow()
+        logger.debug(
+            f"Document watching cycle completed: {changed_count} changed, {len(removed_ids)} removed, "
+            f"{len(self.document_snapshots)} monitored"
+        )
+        
+    async def _iter_changed_documents(self, db: AsyncSession):
+        """
+        Yield batches of documents changed at or after the high-water mark, oldest
+        first. Rows never updated (NULL updated_at) are ordered by created_at.
+        """
+        changed_at, _ = self.document_snapshots.high_water_mark or (datetime.min, 0)
+        # Re-read a short window so transactions that committed late aren't missed
+        since = max(changed_at, datetime.min + self.change_overlap) - self.change_overlap
+        
+        change_time = func.coalesce(Document.updated_at, Document.created_at)
+        query = select(Document).order_by(change_time, Document.id).limit(self.batch_size)
+        last_key = None
+        while True:
+            if last_key is None:
+                condition = change_time >= since
+            else:
+                condition = or_(
+                    change_time > last_key[0],
+                    and_(change_time == last_key[0], Document.id > last_key[1])
+                )
+                
+            result = await db.execute(query.where(condition))
+            documents = result.scalars().all()
+            if not documents:
+                return
+                
+            yield documents
+            
+            if len(documents) < self.batch_size:
+                return
+            last_key = self._change_key(documents[-1])
+            
+    async def _process_changed_documents(self, documents: List[Document], db: AsyncSession):
+        """Detect changes in one batch of updated documents and store their snapshots."""
+        previous = await self._in_store(self.document_snapshots.get_many, [doc.id for doc in documents])
+        live_documents = [doc for doc in documents if doc.status != DocumentStatus.DELETED]
+        snapshots = await self._create_document_snapshots(live_documents, previous)
+        
+        deleted_ids = []
+        for document in documents:
+            self._cycle_documents[document.id] = document
+            old_snapshot = previous.get(document.id)
+            
+            if document.status == DocumentStatus.DELETED:
+                if old_snapshot:
+                    await self._handle_document_deleted(document.id, db, old_snapshot)
+                    deleted_ids.append(document.id)
+            elif old_snapshot is None:
+                await self._handle_document_created(document, db)
+            else:
+                await self._check_document_changes(document, old_snapshot, snapshots[document.id])
+                
+        high_water_mark = max(
+            self.document_snapshots.high_water_mark or (datetime.min, 0),
+            self._change_key(documents[-1])
+        )
+        await self._in_store(
+            self.document_snapshots.apply,
+            list(snapshots.values()), deleted_ids, state=self._high_water_mark_state(high_water_mark)
+        )
+        
+        # Alert on this batch while its documents are at hand
+        await self._process_pending_changes(db)
+        self._cycle_documents.clear()
+        
+    async def _find_removed_documents(self, db: AsyncSession) -> List[int]:
+        """Ids of snapshotted documents whose rows no longer exist."""
+        active = Document.status != DocumentStatus.DELETED
+        result = await db.execute(
+            select(func.count(Document.id), func.coalesce(func.sum(Document.id), 0)).where(active)
+        )
+        count, id_sum = result.one()
+        
+        # The snapshot store tracks the same aggregates; only diff ids when they disagree
+        if count == len(self.document_snapshots) and id_sum == self.document_snapshots.id_sum:
+            return []
+            
+        live_ids = array('q')
+        result = await db.stream_scalars(
+            select(Document.id).where(active).order_by(Document.id).execution_options(yield_per=10000)
+        )
+        async for doc_id in result:
+            live_ids.append(doc_id)
+            
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self.executor, self.document_snapshots.ids_missing_from, live_ids)
         
-    async def _create_document_snapshot(self, document: Document, db: AsyncSession) -> Dict[str, Any]:
+    async def _sweep_file_changes(self) -> int:
+        """Re-check a rolling slice of stored files for content edits made outside the system."""
+        if self.file_sweep_batch <= 0:
+            return 0
+            
+        cursor = int(self.document_snapshots.get_state("sweep_cursor", "0"))
+        snapshots = await self._in_store(self.document_snapshots.iter_after, cursor, self.file_sweep_batch)
+        file_states = await self._read_file_states(
+            [(snapshot["file_path"], snapshot) for snapshot in snapshots]
+        )
+        
+        updated = []
+        for snapshot, file_state in zip(snapshots, file_states):
+            if (file_state["disk_size"] == snapshot["disk_size"] and
+                    file_state["file_mtime_ns"] == snapshot["file_mtime_ns"]):
+                continue
+            self._record_content_change(
+                snapshot["id"], snapshot["case_id"], snapshot["content_hash"], file_state["content_hash"]
+            )
+            updated.append({**snapshot, **file_state})
+            
+        # Start over from the lowest id once the whole store has been swept
+        next_cursor = snapshots[-1]["id"] if len(snapshots) == self.file_sweep_batch else 0
+        await self._in_store(self.document_snapshots.apply, updated, state={"sweep_cursor": next_cursor})
+        return len(updated)
+        
+    async def _create_document_snapshots(
+        self,
+        documents: List[Document],
+        previous: Dict[int, Dict[str, Any]]
+    ) -> Dict[int, Dict[str, Any]]:
+        """Snapshots for a batch of documents, reusing content hashes of unchanged files."""
+        file_states = await self._read_file_states(
+            [(document.file_path, previous.get(document.id)) for document in documents]
+        )
+        return {
+            document.id: self._create_document_snapshot(document, file_state)
+            for document, file_state in zip(documents, file_states)
+        }
+        
+    def _create_document_snapshot(self, document: Document, file_state: Dict[str, Any]) -> Dict[str, Any]:
         """Create a snapshot of document state for change detection."""
-        snapshot = {
+        return {
             "id": document.id,
             "name": document.name,
-            "status": document.status,
-            "document_type": document.document_type,
+            "status": getattr(document.status, "value", document.status),
+            "document_type": getattr(document.document_type, "value", document.document_type),
             "file_size": document.file_size,
-            "updated_at": document.updated_at,
             "case_id": document.case_id,
             "client_id": getattr(document, 'client_id', None),
-            "tags": getattr(document, 'tags', []),
-            "metadata": getattr(document, 'metadata', {})
+            "updated_at": document.updated_at.isoformat() if document.updated_at else None,
+            "file_path": document.file_path,
+            **file_state
         }
         
-        # Calculate content hash if possible
-        if document.file_path:
-            content_hash = await self._calculate_file_hash(document.file_path)
-            snapshot["content_hash"] = content_hash
-            
-        return snapshot
+    async def _read_file_states(
+        self,
+        items: List[Tuple[Optional[str], Optional[Dict[str, Any]]]]
+    ) -> List[Dict[str, Any]]:
+        """Stat, and where size or mtime changed re-hash, files in the thread pool."""
+        loop = asyncio.get_event_loop()
+        chunks = [items[i:i + FILE_STATE_CHUNK_SIZE] for i in range(0, len(items), FILE_STATE_CHUNK_SIZE)]
+        results = await asyncio.gather(*[
+            loop.run_in_executor(self.executor, read_file_states, chunk) for chunk in chunks
+        ])
+        return [file_state for chunk_states in results for file_state in chunk_states]
+        
+    async def _in_store(self, method, *args, **kwargs):
+        """Run a snapshot store call (synchronous SQLite IO) in the thread pool."""
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(method, *args, **kwargs))
+        
+    @staticmethod
+    def _change_key(document: Document) -> Tuple[datetime, int]:
+        return document.updated_at or document.created_at or datetime.min, document.id
+        
+    @staticmethod
+    def _high_water_mark_state(high_water_mark: Tuple[datetime, int]) -> Dict[str, Any]:
+        return {"hwm_updated_at": high_water_mark[0], "hwm_id": high_water_mark[1]}
         
     async def _calculate_file_hash(self, file_path: str) -> Optional[str]:
-        """Calculate SHA-256 hash of file content."""
-        try:
-            path = Path(file_path)
-            if not path.exists():
-                return None
-                
-            hash_sha256 = hashlib.sha256()
-            with open(path, "rb") as f:
-                for chunk in iter(lambda: f.read(4096), b""):
-                    hash_sha256.update(chunk)
-            return hash_sha256.hexdigest()
-        except Exception as e:
-            logger.error(f"Error calculating file hash for {file_path}: {str(e)}")
+        """Calculate SHA-256 hash of file content in the thread pool."""
+        if not Path(file_path).exists():
             return None
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self.executor, hash_file, file_path)
             
     async def _handle_document_created(self, document: Document, db: AsyncSession):
         """Handle new document creation."""
@@ -347,12 +495,17 @@ class DocumentWatcher:
         self.pending_changes[change_id] = change
         logger.info(f"Detected new document: {document.name}")
         
-    async def _handle_document_deleted(self, doc_id: int, db: AsyncSession):
-        """Handle document deletion."""
-        if doc_id not in self.document_snapshots:
+    async def _handle_document_deleted(
+        self,
+        doc_id: int,
+        db: AsyncSession,
+        snapshot: Optional[Dict[str, Any]] = None
+    ):
+        """Handle document deletion. The caller drops the snapshot."""
+        snapshot = snapshot or self.document_snapshots.get(doc_id)
+        if not snapshot:
             return
             
-        snapshot = self.document_snapshots[doc_id]
         change_id = f"delete_{doc_id}_{int(datetime.utcnow().timestamp())}"
         
         change = DocumentChange(
@@ -365,17 +518,16 @@ class DocumentWatcher:
         )
         
         self.pending_changes[change_id] = change
-        
-        # Remove from snapshots
-        del self.document_snapshots[doc_id]
         logger.info(f"Detected deleted document: {snapshot.get('name')}")
         
-    async def _check_document_changes(self, document: Document, db: AsyncSession):
+    async def _check_document_changes(
+        self,
+        document: Document,
+        old_snapshot: Dict[str, Any],
+        new_snapshot: Dict[str, Any]
+    ):
         """Check for changes in a document."""
         doc_id = document.id
-        old_snapshot = self.document_snapshots[doc_id]
-        new_snapshot = await self._create_document_snapshot(document, db)
-        
         changes = []
         
         # Check for specific field changes
@@ -402,28 +554,44 @@ class DocumentWatcher:
                 self.pending_changes[change_id] = change
                 
         # Check for content changes
-        old_hash = old_snapshot.get("content_hash")
-        new_hash = new_snapshot.get("content_hash")
-        
-        if old_hash and new_hash and old_hash != new_hash:
-            change_id = f"content_{doc_id}_{int(datetime.utcnow().timestamp())}"
-            change = DocumentChange(
-                id=change_id,
-                document_id=doc_id,
-                case_id=document.case_id,
-                change_type=ChangeType.MODIFIED,
-                old_value=old_hash[:8],  # First 8 chars of hash
-                new_value=new_hash[:8],
-                changed_by=getattr(document, 'updated_by', None),
-                change_details={"content_modified": True}
-            )
-            
+        change = self._record_content_change(
+            doc_id, document.case_id,
+            old_snapshot.get("content_hash"), new_snapshot.get("content_hash"),
+            changed_by=getattr(document, 'updated_by', None)
+        )
+        if change:
             changes.append(change)
-            self.pending_changes[change_id] = change
             
         if changes:
             logger.info(f"Detected {len(changes)} changes in document: {document.name}")
             
+    def _record_content_change(
+        self,
+        doc_id: int,
+        case_id: Optional[int],
+        old_hash: Optional[str],
+        new_hash: Optional[str],
+        changed_by: Optional[int] = None
+    ) -> Optional[DocumentChange]:
+        """Queue a content modification if the file hash changed."""
+        if not (old_hash and new_hash and old_hash != new_hash):
+            return None
+            
+        change_id = f"content_{doc_id}_{int(datetime.utcnow().timestamp())}"
+        change = DocumentChange(
+            id=change_id,
+            document_id=doc_id,
+            case_id=case_id,
+            change_type=ChangeType.MODIFIED,
+            old_value=old_hash[:8],  # First 8 chars of hash
+            new_value=new_hash[:8],
+            changed_by=changed_by,
+            change_details={"content_modified": True}
+        )
+        
+        self.pending_changes[change_id] = change
+        return change
+        
     def _determine_change_type(self, field: str, old_value: Any, new_value: Any) -> ChangeType:
         """Determine the type of change based on field and values."""
         if field == "name":
@@ -469,9 +637,7 @@ class DocumentWatcher:
             return False
             
         # Get document for additional checks
-        doc_query = select(Document).where(Document.id == change.document_id)
-        result = await db.execute(doc_query)
-        document = result.scalar_one_or_none()
+        document = await self._get_document(change.document_id, db)
         
         if not document:
             return False
@@ -506,6 +672,14 @@ class DocumentWatcher:
             
         return True
         
+    async def _get_document(self, doc_id: int, db: AsyncSession) -> Optional[Document]:
+        """Document for a change, from the batch being processed when possible."""
+        document = self._cycle_documents.get(doc_id)
+        if document is None:
+            result = await db.execute(select(Document).where(Document.id == doc_id))
+            document = result.scalar_one_or_none()
+        return document
+        
     async def _is_in_cooldown(self, change: DocumentChange, rule: DocumentWatchRule) -> bool:
         """Check if rule is in cooldown period for this document."""
         if rule.cooldown_minutes <= 0:
@@ -529,12 +703,7 @@ class DocumentWatcher:
     ):
         """Generate an alert for a document change."""
         # Get document details
-        doc_query = select(Document).options(
-            joinedload(Document.case)
-        ).where(Document.id == change.document_id)
-        
-        result = await db.execute(doc_query)
-        document = result.scalar_one_or_none()
+        document = await self._get_document(change.document_id, db)
         
         if not document:
             return
@@ -667,22 +836,9 @@ class DocumentWatcher:
         for alert_id in old_alert_ids:
             del self.active_alerts[alert_id]
             
-        # Clean up very old snapshots for deleted documents
-        old_snapshot_ids = []
-        for doc_id, snapshot in self.document_snapshots.items():
-            if snapshot.get("updated_at", datetime.min) < cutoff_date:
-                # Verify document still exists
-                async with get_db_session() as db:
-                    doc_query = select(Document).where(Document.id == doc_id)
-                    result = await db.execute(doc_query)
-                    if not result.scalar_one_or_none():
-                        old_snapshot_ids.append(doc_id)
-                        
-        for doc_id in old_snapshot_ids:
-            del self.document_snapshots[doc_id]
-            
-        if old_alert_ids or old_snapshot_ids:
-            logger.info(f"Cleaned up {len(old_alert_ids)} old alerts and {len(old_snapshot_ids)} old snapshots")
+        # Snapshots of deleted documents are dropped as the deletions are detected
+        if old_alert_ids:
+            logger.info(f"Cleaned up {len(old_alert_ids)} old alerts")
             
     # Public API methods
     
@@ -846,5 +1002,5 @@ class DocumentWatcher:
             "active_alerts": active_alerts,
             "alert_counts": alert_counts,
             "cached_analyses": len(self.content_analysis_cache),
-            "last_scan": datetime.utcnow()  # Would track actual last scan time
+            "last_scan": self.last_scan
         }
\ No newline at end of file
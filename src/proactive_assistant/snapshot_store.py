@@ -0,0 +1,294 @@
+"""
+Document Snapshot Store
+
+Compact on-disk store for the document watcher's snapshots. One SQLite row per
+document, with content hashes kept as raw digests, plus the watcher's
+high-water mark and running id aggregates. The watcher picks up after a
+restart from where it stopped instead of re-reading and re-hashing the whole
+corpus.
+"""
+
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import hashlib
+import logging
+import os
+import sqlite3
+
+
+logger = logging.getLogger(__name__)
+
+# Read files in large blocks; hashlib releases the GIL on updates this size
+HASH_BUFFER_SIZE = 1024 * 1024
+
+# Stay well under SQLite's bound-parameter limit
+LOOKUP_CHUNK_SIZE = 500
+
+SNAPSHOT_COLUMNS = (
+    "id", "name", "status", "document_type", "file_size", "case_id", "client_id",
+    "updated_at", "file_path", "disk_size", "file_mtime_ns", "content_hash"
+)
+
+
+def hash_file(file_path: str) -> Optional[str]:
+    """SHA-256 of a file's content, or None if it can't be read."""
+    try:
+        digest = hashlib.sha256()
+        buffer = bytearray(HASH_BUFFER_SIZE)
+        view = memoryview(buffer)
+        with open(file_path, "rb", buffering=0) as f:
+            while True:
+                size = f.readinto(buffer)
+                if not size:
+                    break
+                digest.update(view[:size])
+        return digest.hexdigest()
+    except OSError as e:
+        logger.error(f"Error calculating file hash for {file_path}: {str(e)}")
+        return None
+
+
+def read_file_state(file_path: Optional[str],
+                    previous: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Size, modification time and content hash of a file on disk. The file is
+    only re-hashed when its size or modification time differs from the
+    previous snapshot.
+    """
+    state = {"disk_size": None, "file_mtime_ns": None, "content_hash": None}
+    if not file_path:
+        return state
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return state
+
+    state["disk_size"] = stat.st_size
+    state["file_mtime_ns"] = stat.st_mtime_ns
+    if (previous and previous.get("content_hash") and
+            previous.get("file_path") == file_path and
+            previous.get("disk_size") == stat.st_size and
+            previous.get("file_mtime_ns") == stat.st_mtime_ns):
+        state["content_hash"] = previous["content_hash"]
+    else:
+        state["content_hash"] = hash_file(file_path)
+    return state
+
+
+def read_file_states(items: List[Tuple[Optional[str], Optional[Dict[str, Any]]]]) -> List[Dict[str, Any]]:
+    """read_file_state for several (file_path, previous snapshot) pairs."""
+    return [read_file_state(file_path, previous) for file_path, previous in items]
+
+
+class DocumentSnapshotStore:
+    """
+    Document snapshots persisted in a local SQLite file.
+    """
+
+    def __init__(self, db_path: str = "data/document_snapshots.db"):
+        self.db_path = db_path
+        if db_path != ":memory:":
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._init_schema()
+
+        state = self._get_state("count"), self._get_state("id_sum")
+        if None in state:
+            self.count, self.id_sum = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(id), 0) FROM document_snapshots"
+            ).fetchone()
+        else:
+            self.count, self.id_sum = int(state[0]), int(state[1])
+
+    def _init_schema(self):
+        """Create snapshot and watcher state tables."""
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS document_snapshots (
+                id INTEGER PRIMARY KEY,
+                name TEXT,
+                status TEXT,
+                document_type TEXT,
+                file_size INTEGER,
+                case_id INTEGER,
+                client_id INTEGER,
+                updated_at TEXT,
+                file_path TEXT,
+                disk_size INTEGER,
+                file_mtime_ns INTEGER,
+                content_hash BLOB
+            )
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS watcher_state (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            ) WITHOUT ROWID
+        """)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __contains__(self, doc_id: int) -> bool:
+        return self.conn.execute(
+            "SELECT 1 FROM document_snapshots WHERE id = ?", (doc_id,)
+        ).fetchone() is not None
+
+    def get(self, doc_id: int) -> Optional[Dict[str, Any]]:
+        """Snapshot for one document."""
+        return self.get_many([doc_id]).get(doc_id)
+
+    def get_many(self, doc_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        """Snapshots for the given documents that have one."""
+        doc_ids = list(doc_ids)
+        snapshots = {}
+        for start in range(0, len(doc_ids), LOOKUP_CHUNK_SIZE):
+            chunk = doc_ids[start:start + LOOKUP_CHUNK_SIZE]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self.conn.execute(
+                f"SELECT {', '.join(SNAPSHOT_COLUMNS)} FROM document_snapshots WHERE id IN ({placeholders})",
+                chunk
+            )
+            for row in rows:
+                snapshot = self._from_row(row)
+                snapshots[snapshot["id"]] = snapshot
+        return snapshots
+
+    def iter_after(self, doc_id: int, limit: int) -> List[Dict[str, Any]]:
+        """Up to ``limit`` snapshots with a file, in id order after ``doc_id``."""
+        rows = self.conn.execute(
+            f"SELECT {', '.join(SNAPSHOT_COLUMNS)} FROM document_snapshots "
+            "WHERE id > ? AND file_path IS NOT NULL ORDER BY id LIMIT ?",
+            (doc_id, limit)
+        )
+        return [self._from_row(row) for row in rows]
+
+    def iter_ids(self, batch_size: int = 10000) -> Iterator[int]:
+        """Every stored document id, ascending."""
+        last_id = None
+        while True:
+            if last_id is None:
+                rows = self.conn.execute(
+                    "SELECT id FROM document_snapshots ORDER BY id LIMIT ?", (batch_size,)
+                ).fetchall()
+            else:
+                rows = self.conn.execute(
+                    "SELECT id FROM document_snapshots WHERE id > ? ORDER BY id LIMIT ?",
+                    (last_id, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            for (doc_id,) in rows:
+                yield doc_id
+            last_id = rows[-1][0]
+
+    def ids_missing_from(self, live_ids: Iterable[int]) -> List[int]:
+        """
+        Stored ids absent from ``live_ids``, which must be ascending. Both
+        sides are walked in order, so neither is held in memory as a set.
+        """
+        missing = []
+        live = iter(live_ids)
+        current = next(live, None)
+        for doc_id in self.iter_ids():
+            while current is not None and current < doc_id:
+                current = next(live, None)
+            if current != doc_id:
+                missing.append(doc_id)
+        return missing
+
+    def apply(
+        self,
+        snapshots: Iterable[Dict[str, Any]] = (),
+        deleted_ids: Iterable[int] = (),
+        state: Optional[Dict[str, Any]] = None
+    ):
+        """Write snapshots, drop deleted documents and update watcher state in one transaction."""
+        snapshots = list(snapshots)
+        deleted_ids = list(deleted_ids)
+        if not snapshots and not deleted_ids and not state:
+            return
+
+        upsert_ids = [snapshot["id"] for snapshot in snapshots]
+        existing = self._existing_ids(upsert_ids + deleted_ids)
+        added = [doc_id for doc_id in set(upsert_ids) if doc_id not in existing]
+        removed = [doc_id for doc_id in set(deleted_ids) if doc_id in existing]
+
+        self.conn.execute("BEGIN")
+        try:
+            self.conn.executemany(
+                f"INSERT OR REPLACE INTO document_snapshots ({', '.join(SNAPSHOT_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(SNAPSHOT_COLUMNS))})",
+                [self._to_row(snapshot) for snapshot in snapshots]
+            )
+            self.conn.executemany(
+                "DELETE FROM document_snapshots WHERE id = ?", [(doc_id,) for doc_id in removed]
+            )
+            count = self.count + len(added) - len(removed)
+            id_sum = self.id_sum + sum(added) - sum(removed)
+            self._set_state("count", count)
+            self._set_state("id_sum", id_sum)
+            for key, value in (state or {}).items():
+                self._set_state(key, value)
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+        self.count, self.id_sum = count, id_sum
+
+    @property
+    def high_water_mark(self) -> Optional[Tuple[datetime, int]]:
+        """(updated_at, id) of the last document change the watcher has seen."""
+        updated_at = self._get_state("hwm_updated_at")
+        if updated_at is None:
+            return None
+        return datetime.fromisoformat(updated_at), int(self._get_state("hwm_id") or 0)
+
+    def get_state(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        value = self._get_state(key)
+        return default if value is None else value
+
+    def close(self):
+        self.conn.close()
+
+    def _existing_ids(self, doc_ids: List[int]) -> set:
+        existing = set()
+        for start in range(0, len(doc_ids), LOOKUP_CHUNK_SIZE):
+            chunk = doc_ids[start:start + LOOKUP_CHUNK_SIZE]
+            placeholders = ",".join("?" * len(chunk))
+            existing.update(doc_id for (doc_id,) in self.conn.execute(
+                f"SELECT id FROM document_snapshots WHERE id IN ({placeholders})", chunk
+            ))
+        return existing
+
+    def _get_state(self, key: str) -> Optional[str]:
+        row = self.conn.execute("SELECT value FROM watcher_state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_state(self, key: str, value: Any):
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO watcher_state (key, value) VALUES (?, ?)",
+            (key, None if value is None else str(value))
+        )
+
+    @staticmethod
+    def _to_row(snapshot: Dict[str, Any]) -> Tuple:
+        content_hash = snapshot.get("content_hash")
+        return tuple(
+            bytes.fromhex(content_hash) if column == "content_hash" and content_hash else
+            snapshot.get(column)
+            for column in SNAPSHOT_COLUMNS
+        )
+
+    @staticmethod
+    def _from_row(row: Tuple) -> Dict[str, Any]:
+        snapshot = dict(zip(SNAPSHOT_COLUMNS, row))
+        if snapshot["content_hash"] is not None:
+            snapshot["content_hash"] = snapshot["content_hash"].hex()
+        return snapshot
@@ -0,0 +1,375 @@
+"""
+Pluggable full-text search backends for transcript segments.
+
+TranscriptDatabase hands ranking and filtering to a TranscriptSearchBackend.
+PostgreSQL deployments use the tsvector backend in transcript_database; this
+module provides the interface and an embedded SQLite FTS5 backend for
+single-node deployments and tests, with query semantics kept as close as FTS5
+allows to the PostgreSQL 'english' configuration.
+"""
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import re
+import sqlite3
+
+
+# PostgreSQL 'english' text search stop words (snowball english.stop)
+ENGLISH_STOPWORDS = frozenset("""
+i me my myself we our ours ourselves you your yours yourself yourselves he him his himself she
+her hers herself it its itself they them their theirs themselves what which who whom this that
+these those am is are was were be been being have has had having do does did doing a an the and
+but if or because as until while of at by for with about against between into through during
+before after above below to from up down in out on off over under again further then once here
+there when where why how all any both each few more most other some such no nor not only own
+same so than too very s t can will just don should now
+""".split())
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+@dataclass
+class SegmentRecord:
+    """Searchable fields of one transcript segment."""
+    segment_id: str
+    document_id: str
+    text: str
+    speaker: str = "Unknown"
+    case_id: Optional[str] = None
+    session_id: Optional[str] = None
+    segment_number: Optional[int] = None
+    start_time: Optional[float] = None
+    end_time: Optional[float] = None
+    date_proceeding: Optional[datetime] = None
+    legal_significance: Optional[str] = None
+
+
+@dataclass
+class SearchHits:
+    """Ranked page of segment ids returned by a backend."""
+    hits: List[Tuple[str, float]]
+    total: int
+    facets: Dict[str, Dict[str, int]] = field(default_factory=dict)
+
+
+class TranscriptSearchBackend(ABC):
+    """Interface implemented by transcript full-text search backends."""
+
+    @abstractmethod
+    def index_segments(self, segments: Iterable[SegmentRecord]) -> int:
+        """Add or replace segments in the index; returns how many were written."""
+
+    @abstractmethod
+    def remove_segments(self, segment_ids: Iterable[str]) -> int:
+        """Drop segments from the index."""
+
+    @abstractmethod
+    async def search(self, query) -> SearchHits:
+        """Run a SearchQuery and return one ranked page of segment ids."""
+
+
+def _quote(term: str) -> str:
+    return '"' + term.replace('"', '""') + '"'
+
+
+def _content_words(text: str) -> List[str]:
+    return [w for w in _WORD.findall(text.lower()) if w not in ENGLISH_STOPWORDS]
+
+
+def trigram_set(text: str) -> set:
+    """Trigrams as pg_trgm builds them: per word, padded with two leading and one trailing space."""
+    trigrams = set()
+    for word in re.findall(r"[^\W_]+", text.lower()):
+        padded = f"  {word} "
+        trigrams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return trigrams
+
+
+def trigram_similarity(a: str, b: str) -> float:
+    """pg_trgm similarity(): shared trigrams over all distinct trigrams."""
+    ta, tb = trigram_set(a), trigram_set(b)
+    if not ta or not tb:
+        return 0.0
+    return len(ta & tb) / len(ta | tb)
+
+
+def full_text_expression(terms: str) -> Optional[str]:
+    """plainto_tsquery: every non-stop word must occur (AND)."""
+    words = _content_words(terms)
+    return " AND ".join(_quote(w) for w in words) if words else None
+
+
+def phrase_expression(text: str) -> Optional[str]:
+    """phraseto_tsquery: the words in order; leading and trailing stop words are dropped."""
+    words = _WORD.findall(text.lower())
+    while words and words[0] in ENGLISH_STOPWORDS:
+        words.pop(0)
+    while words and words[-1] in ENGLISH_STOPWORDS:
+        words.pop()
+    return _quote(" ".join(words)) if words else None
+
+
+def proximity_expression(text: str, distance: int) -> Optional[str]:
+    """Terms within ``distance`` words of each other (FTS5 NEAR)."""
+    words = _content_words(text)
+    if len(words) < 2:
+        return full_text_expression(text)
+    return f"NEAR({' '.join(_quote(w) for w in words)}, {distance})"
+
+
+_BOOLEAN_OPERATORS = {"AND": "AND", "&": "AND", "OR": "OR", "|": "OR", "NOT": "NOT", "!": "NOT"}
+
+
+def boolean_expression(text: str) -> Optional[str]:
+    """AND / OR / NOT with parentheses, as accepted by _convert_to_tsquery.
+
+    Stop words are dropped the way to_tsquery drops them and adjacent terms
+    without an operator are ANDed. FTS5 NOT is binary, so NOT needs a term
+    on its left ("a NOT b" or "a AND NOT b").
+    """
+    out: List[str] = []
+
+    def after_operand() -> bool:
+        return bool(out) and out[-1] not in ("AND", "OR", "NOT", "(")
+
+    for token in re.findall(r"\(|\)|[^\s()]+", text):
+        op = _BOOLEAN_OPERATORS.get(token.upper())
+        if op == "NOT":
+            if after_operand():
+                out.append("NOT")
+            elif out and out[-1] == "AND":
+                out[-1] = "NOT"
+            else:
+                raise ValueError("NOT needs a term on its left in boolean transcript queries")
+        elif op:
+            if after_operand():
+                out.append(op)
+        elif token == "(":
+            if after_operand():
+                out.append("AND")
+            out.append("(")
+        elif token == ")":
+            while out and out[-1] in ("AND", "OR", "NOT"):
+                out.pop()
+            if out and out[-1] == "(":
+                out.pop()
+            else:
+                out.append(")")
+        else:
+            words = _content_words(token)
+            if words:
+                if after_operand():
+                    out.append("AND")
+                out.append(_quote(" ".join(words)))
+
+    while out and out[-1] in ("AND", "OR", "NOT", "("):
+        out.pop()
+    return " ".join(out) if out else None
+
+
+class SQLiteFTSSearchBackend(TranscriptSearchBackend):
+    """Embedded transcript search on SQLite FTS5.
+
+    Segment metadata lives in ``transcript_search_segments``; an
+    external-content FTS5 table over the same columns the PostgreSQL
+    search_vector covers (speaker, text, legal significance) is kept in sync
+    by triggers, so
+    streaming inserts, edits and deletes update the index incrementally.
+    Ranking is BM25 (reported as a positive score, higher is better).
+    """
+
+    def __init__(self, path: str = ":memory:", prepare_terms: Optional[Callable[[str], str]] = None):
+        self.path = path
+        # Same term clean-up/expansion the PostgreSQL full-text query applies
+        self.prepare_terms = prepare_terms
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS transcript_search_segments (
+                rowid INTEGER PRIMARY KEY,
+                segment_id TEXT NOT NULL UNIQUE,
+                document_id TEXT NOT NULL,
+                case_id TEXT,
+                session_id TEXT,
+                speaker TEXT,
+                segment_number INTEGER,
+                start_time REAL,
+                end_time REAL,
+                date_proceeding TEXT,
+                legal_significance TEXT,
+                text TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_search_segments_speaker ON transcript_search_segments (speaker);
+            CREATE INDEX IF NOT EXISTS idx_search_segments_case ON transcript_search_segments (case_id);
+            CREATE INDEX IF NOT EXISTS idx_search_segments_time ON transcript_search_segments (start_time);
+            CREATE VIRTUAL TABLE IF NOT EXISTS transcript_search_fts USING fts5(
+                speaker,
+                text,
+                legal_significance,
+                content='transcript_search_segments',
+                content_rowid='rowid',
+                tokenize='porter unicode61 remove_diacritics 2'
+            );
+            CREATE TRIGGER IF NOT EXISTS transcript_search_ai AFTER INSERT ON transcript_search_segments BEGIN
+                INSERT INTO transcript_search_fts (rowid, speaker, text, legal_significance)
+                VALUES (new.rowid, new.speaker, new.text, new.legal_significance);
+            END;
+            CREATE TRIGGER IF NOT EXISTS transcript_search_ad AFTER DELETE ON transcript_search_segments BEGIN
+                INSERT INTO transcript_search_fts (transcript_search_fts, rowid, speaker, text, legal_significance)
+                VALUES ('delete', old.rowid, old.speaker, old.text, old.legal_significance);
+            END;
+            CREATE TRIGGER IF NOT EXISTS transcript_search_au
+            AFTER UPDATE OF speaker, text, legal_significance ON transcript_search_segments BEGIN
+                INSERT INTO transcript_search_fts (transcript_search_fts, rowid, speaker, text, legal_significance)
+                VALUES ('delete', old.rowid, old.speaker, old.text, old.legal_significance);
+                INSERT INTO transcript_search_fts (rowid, speaker, text, legal_significance)
+                VALUES (new.rowid, new.speaker, new.text, new.legal_significance);
+            END;
+            """
+        )
+
+    def index_segments(self, segments: Iterable[SegmentRecord]) -> int:
+        rows = [
+            (
+                s.segment_id, s.document_id, s.case_id, s.session_id, s.speaker, s.segment_number,
+                s.start_time, s.end_time,
+                s.date_proceeding.isoformat() if isinstance(s.date_proceeding, datetime) else s.date_proceeding,
+                s.legal_significance, s.text or "",
+            )
+            for s in segments
+        ]
+        if not rows:
+            return 0
+        with self._conn:
+            self._conn.executemany(
+                """
+                INSERT INTO transcript_search_segments (
+                    segment_id, document_id, case_id, session_id, speaker, segment_number,
+                    start_time, end_time, date_proceeding, legal_significance, text
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (segment_id) DO UPDATE SET
+                    document_id = excluded.document_id, case_id = excluded.case_id,
+                    session_id = excluded.session_id, speaker = excluded.speaker,
+                    segment_number = excluded.segment_number, start_time = excluded.start_time,
+                    end_time = excluded.end_time, date_proceeding = excluded.date_proceeding,
+                    legal_significance = excluded.legal_significance, text = excluded.text
+                """,
+                rows,
+            )
+        return len(rows)
+
+    def remove_segments(self, segment_ids: Iterable[str]) -> int:
+        with self._conn:
+            cursor = self._conn.executemany(
+                "DELETE FROM transcript_search_segments WHERE segment_id = ?",
+                [(segment_id,) for segment_id in segment_ids],
+            )
+        return cursor.rowcount
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM transcript_search_segments").fetchone()[0]
+
+    def segment_ids(self) -> List[str]:
+        """Every indexed segment id."""
+        return [row[0] for row in self._conn.execute("SELECT segment_id FROM transcript_search_segments")]
+
+    def optimize(self):
+        """Merge FTS5 index segments; worthwhile after large bulk loads."""
+        with self._conn:
+            self._conn.execute("INSERT INTO transcript_search_fts (transcript_search_fts) VALUES ('optimize')")
+
+    def close(self):
+        self._conn.close()
+
+    def _filters(self, query) -> Tuple[List[str], List[Any]]:
+        clauses, params = [], []
+        for column, values in (("case_id", query.case_ids), ("session_id", query.session_ids),
+                               ("speaker", query.speakers)):
+            if values:
+                clauses.append(f"s.{column} IN ({', '.join('?' * len(values))})")
+                params.extend(values)
+        if query.date_range:
+            start, end = query.date_range
+            clauses.append("s.date_proceeding BETWEEN ? AND ?")
+            params.extend([start.isoformat(), end.isoformat()])
+        time_range = getattr(query, "time_range", None)
+        if time_range:
+            # Segments overlapping [start, end] seconds
+            start, end = time_range
+            clauses.append("s.start_time <= ? AND COALESCE(s.end_time, s.start_time) >= ?")
+            params.extend([end, start])
+        return clauses, params
+
+    def _expression(self, query) -> Optional[str]:
+        search_type = query.search_type.value
+        if search_type == "phrase_exact":
+            return phrase_expression(query.query_text)
+        if search_type == "boolean":
+            return boolean_expression(query.query_text)
+        if search_type == "proximity":
+            return proximity_expression(query.query_text, query.proximity_distance)
+        terms = self.prepare_terms(query.query_text) if self.prepare_terms else query.query_text
+        return full_text_expression(terms)
+
+    async def search(self, query) -> SearchHits:
+        clauses, params = self._filters(query)
+        if query.search_type.value == "fuzzy":
+            return self._fuzzy_search(query, clauses, params)
+
+        expression = self._expression(query)
+        if expression is None:
+            return SearchHits(hits=[], total=0)
+
+        where = " AND ".join(["transcript_search_fts MATCH ?"] + clauses)
+        match_params = [expression] + params
+        from_clause = (
+            "FROM transcript_search_fts JOIN transcript_search_segments s ON s.rowid = transcript_search_fts.rowid"
+        )
+
+        rows = self._conn.execute(
+            f"SELECT s.segment_id, -bm25(transcript_search_fts) AS score {from_clause} WHERE {where}"
+            " ORDER BY bm25(transcript_search_fts), s.rowid LIMIT ? OFFSET ?",
+            match_params + [query.max_results, query.offset],
+        ).fetchall()
+        # Total and all facets from one grouped pass over the matches
+        total = 0
+        facets = {"speakers": {}, "cases": {}, "legal_significance": {}}
+        for speaker, case_id, significance, count in self._conn.execute(
+            f"SELECT s.speaker, s.case_id, s.legal_significance, COUNT(*) {from_clause} WHERE {where}"
+            " GROUP BY s.speaker, s.case_id, s.legal_significance",
+            match_params,
+        ):
+            total += count
+            for name, value in (("speakers", speaker), ("cases", case_id), ("legal_significance", significance)):
+                if value is not None:
+                    facets[name][value] = facets[name].get(value, 0) + count
+
+        return SearchHits(hits=[(segment_id, score) for segment_id, score in rows], total=total, facets=facets)
+
+    def _fuzzy_search(self, query, clauses: List[str], params: List[Any]) -> SearchHits:
+        """similarity(text, query) > threshold, scored exactly as pg_trgm.
+
+        Candidates are segments sharing a word prefix with the query; the
+        trigram similarity itself is computed on those candidates.
+        """
+        prefixes = {w[:3] for w in _WORD.findall(query.query_text.lower()) if len(w) >= 3}
+        if not prefixes:
+            return SearchHits(hits=[], total=0)
+        expression = "text : (" + " OR ".join(f"{_quote(p)}*" for p in sorted(prefixes)) + ")"
+        where = " AND ".join(["transcript_search_fts MATCH ?"] + clauses)
+        rows = self._conn.execute(
+            "SELECT s.segment_id, s.text FROM transcript_search_fts"
+            " JOIN transcript_search_segments s ON s.rowid = transcript_search_fts.rowid"
+            f" WHERE {where}",
+            [expression] + params,
+        ).fetchall()
+
+        scored = [(segment_id, trigram_similarity(text, query.query_text)) for segment_id, text in rows]
+        scored = [hit for hit in scored if hit[1] > query.fuzzy_threshold]
+        scored.sort(key=lambda hit: -hit[1])
+        page = scored[query.offset:query.offset + query.max_results]
+        return SearchHits(hits=page, total=len(scored))
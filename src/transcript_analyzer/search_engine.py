@@ -12,6 +12,7 @@ import math
 
 from ..shared.utils.ai_client import AIClient
 from .transcript_database import TranscriptDatabase, SearchQuery, SearchResults, SearchType, SearchScope
+from .vector_index import TranscriptVectorIndex
 
 
 @dataclass
@@ -49,8 +50,12 @@ class CitationQuery:
 class LegalSearchEngine:
     """Advanced search engine with legal-specific capabilities."""
     
-    def __init__(self, transcript_db: TranscriptDatabase):
+    def __init__(self, transcript_db: TranscriptDatabase, vector_index: Optional[TranscriptVectorIndex] = None):
         self.transcript_db = transcript_db
+        if vector_index is not None and transcript_db.vector_index is None:
+            # Backfill stored segments and keep the index updated on ingest
+            transcript_db.attach_vector_index(vector_index)
+        self.vector_index = vector_index or transcript_db.vector_index
         self.ai_client = AIClient()
         
         # Legal terminology and patterns
@@ -149,6 +154,11 @@ class LegalSearchEngine:
     async def semantic_search(self, semantic_query: SemanticQuery) -> SearchResults:
         """Perform semantic search using AI embeddings."""
         try:
+            # Segments embedded at ingest: nearest-neighbour lookup, nothing re-embedded.
+            # Only once every stored segment has a vector, so none are silently skipped
+            if self.vector_index is not None and self.transcript_db.vector_index_covers_segments(self.vector_index):
+                return await self._indexed_semantic_search(semantic_query)
+            
             # Get semantic embeddings for query
             query_embedding = await self._get_text_embedding(semantic_query.query_text)
             
@@ -214,6 +224,34 @@ class LegalSearchEngine:
                 matches=[]
             )
 
+    async def _indexed_semantic_search(self, semantic_query: SemanticQuery) -> SearchResults:
+        """Semantic search against the persistent transcript vector index."""
+        start_time = datetime.now()
+        
+        hits = self.vector_index.search(
+            semantic_query.query_text,
+            k=semantic_query.max_results,
+            min_score=semantic_query.similarity_threshold
+        )
+        
+        query = SearchQuery(
+            query_text=semantic_query.query_text,
+            search_type=SearchType.SEMANTIC,
+            max_results=semantic_query.max_results
+        )
+        semantic_matches = await self.transcript_db.get_segment_matches(hits, query)
+        
+        if semantic_query.include_related_concepts:
+            semantic_matches = await self._add_related_concepts(semantic_matches, semantic_query)
+        
+        return SearchResults(
+            query=query,
+            total_matches=len(semantic_matches),
+            execution_time=(datetime.now() - start_time).total_seconds(),
+            matches=semantic_matches,
+            related_queries=await self._generate_semantic_related_queries(semantic_query.query_text)
+        )
+
     async def citation_search(self, citation_query: CitationQuery) -> SearchResults:
         """Search for legal citations within transcripts."""
         try:
@@ -556,8 +594,10 @@ class LegalSearchEngine:
     async def _get_text_embedding(self, text: str) -> Optional[List[float]]:
         """Get text embedding using AI service."""
         try:
-            # This would integrate with an embedding service
-            # For now, return None to indicate unavailable
+            if self.vector_index is not None:
+                return self.vector_index.embed_query(text)[0].tolist()
+            
+            # No embedding model configured
             return None
             
         except Exception as e:
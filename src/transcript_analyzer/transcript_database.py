@@ -8,14 +8,16 @@ from datetime import datetime, timedelta
 import uuid
 import re
 import json
-from sqlalchemy import create_engine, Column, String, Text, DateTime, Float, Integer, Boolean, JSON, Index, ForeignKey, func
+from sqlalchemy import create_engine, Column, String, Text, DateTime, Float, Integer, Boolean, JSON, Index, ForeignKey, Uuid, func
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session, relationship
-from sqlalchemy.dialects.postgresql import TSVECTOR, UUID
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy import text
 
 from ..shared.database.models import Case, User, CourtSession
 from ..shared.database.connection import get_db
+from .vector_index import TranscriptVectorIndex
+from .search_backends import SearchHits, SegmentRecord, SQLiteFTSSearchBackend, TranscriptSearchBackend
 
 
 Base = declarative_base()
@@ -46,7 +48,7 @@ class TranscriptDocument(Base):
     """Main transcript document storage with full-text search."""
     __tablename__ = "transcript_documents"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
     session_id = Column(String, nullable=False, index=True)
     case_id = Column(String, nullable=False, index=True)
     
@@ -74,7 +76,7 @@ class TranscriptDocument(Base):
     ai_analysis_complete = Column(Boolean, default=False)
     
     # Full-text search vector
-    search_vector = Column(TSVECTOR)
+    search_vector = Column(TSVECTOR().with_variant(Text(), "sqlite"))
     
     # Relationships
     segments = relationship("TranscriptSegmentDB", back_populates="document")
@@ -92,8 +94,8 @@ class TranscriptSegmentDB(Base):
     """Individual transcript segments with speaker information."""
     __tablename__ = "transcript_segments"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    document_id = Column(UUID(as_uuid=True), ForeignKey('transcript_documents.id'), nullable=False)
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
+    document_id = Column(Uuid, ForeignKey('transcript_documents.id'), nullable=False)
     
     # Segment identification
     segment_number = Column(Integer, nullable=False)
@@ -130,7 +132,7 @@ class TranscriptSegmentDB(Base):
     legal_significance = Column(String)
     
     # Search vector
-    search_vector = Column(TSVECTOR)
+    search_vector = Column(TSVECTOR().with_variant(Text(), "sqlite"))
     
     # Relationships
     document = relationship("TranscriptDocument", back_populates="segments")
@@ -148,8 +150,8 @@ class TranscriptAnnotation(Base):
     """Annotations and metadata for transcript documents."""
     __tablename__ = "transcript_annotations"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    document_id = Column(UUID(as_uuid=True), ForeignKey('transcript_documents.id'), nullable=False)
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
+    document_id = Column(Uuid, ForeignKey('transcript_documents.id'), nullable=False)
     
     # Annotation details
     annotation_type = Column(String, nullable=False)  # legal_event, key_moment, etc.
@@ -162,8 +164,8 @@ class TranscriptAnnotation(Base):
     content = Column(JSON)  # Flexible content storage
     
     # Location in transcript
-    start_segment_id = Column(UUID(as_uuid=True))
-    end_segment_id = Column(UUID(as_uuid=True))
+    start_segment_id = Column(Uuid)
+    end_segment_id = Column(Uuid)
     start_position = Column(Integer)  # Character position
     end_position = Column(Integer)
     
@@ -191,14 +193,15 @@ class SegmentAnnotation(Base):
     """Specific annotations for individual segments."""
     __tablename__ = "segment_annotations"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    segment_id = Column(UUID(as_uuid=True), ForeignKey('transcript_segments.id'), nullable=False)
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
+    segment_id = Column(Uuid, ForeignKey('transcript_segments.id'), nullable=False)
     
     annotation_type = Column(String, nullable=False)
     label = Column(String)
     value = Column(String)
     confidence = Column(Float, default=0.0)
-    metadata = Column(JSON)
+    # 'metadata' is reserved on declarative models
+    annotation_metadata = Column("metadata", JSON)
     
     created_at = Column(DateTime, default=datetime.utcnow)
     created_by = Column(String)
@@ -215,8 +218,8 @@ class SearchResult(Base):
     """Stored search results for caching and analytics."""
     __tablename__ = "search_results"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    document_id = Column(UUID(as_uuid=True), ForeignKey('transcript_documents.id'), nullable=False)
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
+    document_id = Column(Uuid, ForeignKey('transcript_documents.id'), nullable=False)
     
     # Search details
     query_text = Column(Text, nullable=False)
@@ -257,6 +260,7 @@ class SearchQuery:
     session_ids: List[str] = field(default_factory=list)
     speakers: List[str] = field(default_factory=list)
     date_range: Optional[Tuple[datetime, datetime]] = None
+    time_range: Optional[Tuple[float, float]] = None  # Seconds from start; overlapping segments match
     
     # Search options
     include_annotations: bool = True
@@ -300,16 +304,99 @@ class SearchResults:
     related_queries: List[str] = field(default_factory=list)
 
 
+class PostgresSearchBackend(TranscriptSearchBackend):
+    """Search backend on PostgreSQL tsvector columns and pg_trgm similarity."""
+    
+    # Search vectors are maintained inside the storing transaction
+    updates_in_database = True
+    
+    def __init__(self, database: "TranscriptDatabase"):
+        self.database = database
+
+    def index_segments(self, segments) -> int:
+        ids = [uuid.UUID(segment.segment_id) for segment in segments]
+        if not ids:
+            return 0
+        db = self.database.get_session()
+        try:
+            db.query(TranscriptSegmentDB).filter(TranscriptSegmentDB.id.in_(ids)).update(
+                {TranscriptSegmentDB.search_vector: func.to_tsvector(
+                    'english',
+                    func.coalesce(TranscriptSegmentDB.speaker, '') + ' ' +
+                    func.coalesce(TranscriptSegmentDB.text, '') + ' ' +
+                    func.coalesce(TranscriptSegmentDB.speaker_role, '') + ' ' +
+                    func.coalesce(TranscriptSegmentDB.legal_significance, '')
+                )},
+                synchronize_session=False
+            )
+            db.commit()
+            return len(ids)
+        finally:
+            db.close()
+
+    def remove_segments(self, segment_ids) -> int:
+        # Rows leave the index when they are deleted from transcript_segments
+        return 0
+
+    async def search(self, query: SearchQuery) -> SearchHits:
+        db = self.database.get_session()
+        try:
+            base_query = self.database._build_search_query(db, query)
+            filtered_query = self.database._apply_filters(base_query, query)
+            
+            results = filtered_query.offset(query.offset).limit(query.max_results).all()
+            total_count = filtered_query.count()
+            facets = await self.database._calculate_facets(db, query, filtered_query)
+            
+            return SearchHits(
+                hits=[(str(row[0].id), float(row[1] or 0.0)) for row in results],
+                total=total_count,
+                facets=facets
+            )
+        finally:
+            db.close()
+
+
 class TranscriptDatabase:
     """Searchable transcript database with full-text search capabilities."""
     
-    def __init__(self, database_url: str):
+    def __init__(
+        self,
+        database_url: str,
+        vector_index: Optional[TranscriptVectorIndex] = None,
+        search_backend: Optional[TranscriptSearchBackend] = None
+    ):
         self.engine = create_engine(database_url)
-        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        self.vector_index: Optional[TranscriptVectorIndex] = None
         
+        # PostgreSQL searches its own tsvector columns; SQLite (single node,
+        # tests) gets an embedded FTS5 index in the same database file. Other
+        # engines have no durable default and must pass a backend.
+        if search_backend is None:
+            dialect = self.engine.dialect.name
+            if dialect == "postgresql":
+                search_backend = PostgresSearchBackend(self)
+            elif dialect == "sqlite":
+                search_backend = SQLiteFTSSearchBackend(
+                    self.engine.url.database or ":memory:",
+                    prepare_terms=self._prepare_search_terms
+                )
+            else:
+                raise ValueError(
+                    f"No default transcript search backend for the {dialect} dialect; pass search_backend"
+                )
+        self.search_backend = search_backend
+        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+
         # Create tables
         Base.metadata.create_all(bind=self.engine)
-        
+
+        # An external index may be new or behind the stored transcripts
+        if not getattr(self.search_backend, "updates_in_database", False):
+            self.sync_search_index()
+        if vector_index is not None:
+            self.attach_vector_index(vector_index)
+
         # Legal term patterns for enhanced search
         self.legal_patterns = {
             'objections': [
@@ -334,6 +421,109 @@ class TranscriptDatabase:
         """Get database session."""
         return self.SessionLocal()
 
+    def sync_search_index(self, batch_size: int = 1000) -> int:
+        """
+        Index stored segments the search backend is missing and drop ones it
+        still holds for deleted segments. Skipped when the counts already
+        agree. Returns the number of segments indexed.
+        """
+        backend = self.search_backend
+        if not hasattr(backend, "segment_ids"):
+            return 0
+
+        db = self.get_session()
+        try:
+            if db.query(func.count(TranscriptSegmentDB.id)).scalar() == len(backend):
+                return 0
+
+            stale = set(backend.segment_ids())
+            indexed = 0
+            last_id = None
+            while True:
+                page = db.query(TranscriptSegmentDB, TranscriptDocument).join(
+                    TranscriptDocument, TranscriptSegmentDB.document_id == TranscriptDocument.id
+                )
+                if last_id is not None:
+                    page = page.filter(TranscriptSegmentDB.id > last_id)
+                rows = page.order_by(TranscriptSegmentDB.id).limit(batch_size).all()
+                if not rows:
+                    break
+
+                missing = []
+                for segment, document in rows:
+                    segment_id = str(segment.id)
+                    if segment_id in stale:
+                        stale.discard(segment_id)
+                    else:
+                        missing.append(self._segment_record(segment, document))
+                indexed += backend.index_segments(missing)
+                last_id = rows[-1][0].id
+        finally:
+            db.close()
+
+        if stale:
+            backend.remove_segments(stale)
+        return indexed
+
+    def attach_vector_index(self, vector_index: TranscriptVectorIndex) -> int:
+        """
+        Keep ``vector_index`` in step with stored segments from now on, first
+        embedding any stored segments it is missing. Returns how many were embedded.
+        """
+        self.vector_index = vector_index
+        return self.sync_vector_index()
+
+    def sync_vector_index(self, batch_size: int = 1000) -> int:
+        """
+        Embed stored segments the vector index is missing (or holds for other
+        text) and drop vectors of deleted segments, e.g. after the index is
+        attached to a populated database or wiped by a model change. Skipped
+        when the counts already agree. Returns the number of segments embedded.
+        """
+        index = self.vector_index
+        if index is None:
+            return 0
+
+        db = self.get_session()
+        try:
+            if db.query(func.count(TranscriptSegmentDB.id)).scalar() == len(index):
+                return 0
+
+            stale = set(index.segment_ids())
+            embedded = 0
+            last_id = None
+            while True:
+                page = db.query(TranscriptSegmentDB.id, TranscriptSegmentDB.text)
+                if last_id is not None:
+                    page = page.filter(TranscriptSegmentDB.id > last_id)
+                rows = page.order_by(TranscriptSegmentDB.id).limit(batch_size).all()
+                if not rows:
+                    break
+
+                pairs = [(str(segment_id), text) for segment_id, text in rows]
+                stale.difference_update(segment_id for segment_id, _ in pairs)
+                # Unchanged text is recognised by content hash and not re-embedded
+                embedded += index.upsert(pairs)
+                last_id = rows[-1][0]
+        finally:
+            db.close()
+
+        if stale:
+            index.remove(stale)
+        index.flush()
+        return embedded
+
+    def vector_index_covers_segments(self, vector_index: Optional[TranscriptVectorIndex] = None) -> bool:
+        """Whether every stored segment has a vector, so semantic search can rely on the index."""
+        index = vector_index if vector_index is not None else self.vector_index
+        if index is None or not len(index):
+            return False
+        db = self.get_session()
+        try:
+            return len(index) >= db.query(func.count(TranscriptSegmentDB.id)).scalar()
+        finally:
+            db.close()
+
     async def store_transcript(
         self, 
         session_id: str, 
@@ -364,6 +554,7 @@ class TranscriptDatabase:
             db.flush()  # Get document ID
             
             # Store segments if provided
+            stored_segments = []
             if segments:
                 for i, segment_data in enumerate(segments):
                     segment = TranscriptSegmentDB(
@@ -383,12 +574,20 @@ class TranscriptDatabase:
                     )
                     
                     db.add(segment)
+                    stored_segments.append(segment)
             
             # Update search vectors
-            await self._update_search_vectors(db, document.id)
+            vectors_updated = getattr(self.search_backend, "updates_in_database", False)
+            if vectors_updated:
+                await self._update_search_vectors(db, document.id)
             
+            db.flush()
+            records = [self._segment_record(segment, document) for segment in stored_segments]
+            document_id = str(document.id)
             db.commit()
-            return str(document.id)
+            
+            self._index_records(records, search_indexed=vectors_updated)
+            return document_id
             
         except Exception as e:
             db.rollback()
@@ -397,6 +596,184 @@ class TranscriptDatabase:
         finally:
             db.close()
 
+    async def append_segments(self, document_id: str, segments: List[Dict[str, Any]]) -> List[str]:
+        """Store segments as they stream in and index them immediately."""
+        db = self.get_session()
+        try:
+            document = db.query(TranscriptDocument).filter(
+                TranscriptDocument.id == uuid.UUID(str(document_id))
+            ).first()
+            if document is None:
+                raise ValueError(f"Transcript document {document_id} not found")
+            
+            last_number = db.query(func.max(TranscriptSegmentDB.segment_number)).filter(
+                TranscriptSegmentDB.document_id == document.id
+            ).scalar() or 0
+            
+            stored_segments = []
+            for i, segment_data in enumerate(segments):
+                segment = TranscriptSegmentDB(
+                    document_id=document.id,
+                    segment_number=last_number + i + 1,
+                    speaker=segment_data.get('speaker', 'Unknown'),
+                    speaker_role=segment_data.get('speaker_role'),
+                    speaker_party=segment_data.get('speaker_party'),
+                    text=segment_data.get('text', ''),
+                    word_count=len(segment_data.get('text', '').split()),
+                    start_time=segment_data.get('start_time'),
+                    end_time=segment_data.get('end_time'),
+                    duration=segment_data.get('duration'),
+                    confidence=segment_data.get('confidence', 0.0),
+                    page_number=segment_data.get('page_number'),
+                    line_number=segment_data.get('line_number')
+                )
+                db.add(segment)
+                stored_segments.append(segment)
+            
+            db.flush()
+            records = [self._segment_record(segment, document) for segment in stored_segments]
+            db.commit()
+            
+            self._index_records(records)
+            return [record.segment_id for record in records]
+            
+        except Exception as e:
+            db.rollback()
+            print(f"Error appending transcript segments: {e}")
+            raise
+        finally:
+            db.close()
+
+    async def update_segment(self, segment_id: str, updates: Dict[str, Any]) -> bool:
+        """Edit a stored segment and re-index it."""
+        editable = {
+            'speaker', 'speaker_role', 'speaker_party', 'text', 'start_time', 'end_time',
+            'duration', 'confidence', 'page_number', 'line_number', 'legal_significance'
+        }
+        unknown = set(updates) - editable
+        if unknown:
+            raise ValueError(f"Cannot update segment fields: {', '.join(sorted(unknown))}")
+
+        db = self.get_session()
+        try:
+            segment = db.query(TranscriptSegmentDB).filter(
+                TranscriptSegmentDB.id == uuid.UUID(str(segment_id))
+            ).first()
+            if segment is None:
+                return False
+
+            for name, value in updates.items():
+                setattr(segment, name, value)
+            if 'text' in updates:
+                segment.word_count = len((segment.text or '').split())
+
+            db.flush()
+            record = self._segment_record(segment, segment.document)
+            db.commit()
+
+        except Exception as e:
+            db.rollback()
+            print(f"Error updating transcript segment: {e}")
+            raise
+        finally:
+            db.close()
+
+        self._index_records([record])
+        return True
+
+    async def delete_segments(self, segment_ids: List[str]) -> int:
+        """Delete segments and their annotations, and drop them from the indexes."""
+        ids = [uuid.UUID(str(segment_id)) for segment_id in segment_ids]
+        if not ids:
+            return 0
+
+        db = self.get_session()
+        try:
+            db.query(SegmentAnnotation).filter(
+                SegmentAnnotation.segment_id.in_(ids)
+            ).delete(synchronize_session=False)
+            deleted = db.query(TranscriptSegmentDB).filter(
+                TranscriptSegmentDB.id.in_(ids)
+            ).delete(synchronize_session=False)
+            db.commit()
+
+        except Exception as e:
+            db.rollback()
+            print(f"Error deleting transcript segments: {e}")
+            raise
+        finally:
+            db.close()
+
+        self._remove_records([str(segment_id) for segment_id in ids])
+        return deleted
+
+    async def delete_transcript(self, document_id: str) -> bool:
+        """Delete a transcript with its segments, annotations and stored searches."""
+        doc_id = uuid.UUID(str(document_id))
+        db = self.get_session()
+        try:
+            document = db.query(TranscriptDocument).filter(TranscriptDocument.id == doc_id).first()
+            if document is None:
+                return False
+
+            segment_ids = [
+                segment_id for (segment_id,) in
+                db.query(TranscriptSegmentDB.id).filter(TranscriptSegmentDB.document_id == doc_id)
+            ]
+            db.query(SegmentAnnotation).filter(
+                SegmentAnnotation.segment_id.in_(
+                    db.query(TranscriptSegmentDB.id).filter(TranscriptSegmentDB.document_id == doc_id)
+                )
+            ).delete(synchronize_session=False)
+            for model in (TranscriptSegmentDB, TranscriptAnnotation, SearchResult):
+                db.query(model).filter(model.document_id == doc_id).delete(synchronize_session=False)
+            db.delete(document)
+            db.commit()
+
+        except Exception as e:
+            db.rollback()
+            print(f"Error deleting transcript: {e}")
+            raise
+        finally:
+            db.close()
+
+        self._remove_records([str(segment_id) for segment_id in segment_ids])
+        return True
+
+    def _segment_record(self, segment: TranscriptSegmentDB, document: TranscriptDocument) -> SegmentRecord:
+        return SegmentRecord(
+            segment_id=str(segment.id),
+            document_id=str(document.id),
+            text=segment.text,
+            speaker=segment.speaker,
+            case_id=document.case_id,
+            session_id=document.session_id,
+            segment_number=segment.segment_number,
+            start_time=segment.start_time,
+            end_time=segment.end_time,
+            date_proceeding=document.date_proceeding,
+            legal_significance=segment.legal_significance
+        )
+
+    def _index_records(self, records: List[SegmentRecord], search_indexed: bool = False):
+        """Push freshly stored segments into the search backend and vector index."""
+        if not records:
+            return
+        if not search_indexed:
+            self.search_backend.index_segments(records)
+        
+        # Embed segments once at ingest so semantic search never re-embeds them
+        if self.vector_index is not None:
+            self.vector_index.upsert((record.segment_id, record.text) for record in records)
+
+    def _remove_records(self, segment_ids: List[str]):
+        """Drop deleted segments from the search backend and vector index."""
+        if not segment_ids:
+            return
+        self.search_backend.remove_segments(segment_ids)
+        if self.vector_index is not None:
+            self.vector_index.remove(segment_ids)
+
     async def _update_search_vectors(self, db: Session, document_id: str):
         """Update full-text search vectors for document and segments."""
         try:
@@ -432,41 +809,31 @@ class TranscriptDatabase:
         """Perform full-text search across transcripts."""
         try:
             start_time = datetime.now()
-            db = self.get_session()
-            
-            # Build base query based on search type
-            base_query = self._build_search_query(db, query)
             
-            # Apply filters
-            filtered_query = self._apply_filters(base_query, query)
-            
-            # Execute search
-            results = filtered_query.offset(query.offset).limit(query.max_results).all()
-            
-            # Get total count
-            total_count = filtered_query.count()
+            # Ranking and filtering happen in the configured search backend
+            hits = await self.search_backend.search(query)
             
             # Process results
-            matches = []
-            for result in results:
-                match = await self._process_search_result(db, result, query)
-                if match and match.relevance_score >= query.minimum_score:
-                    matches.append(match)
-            
-            # Calculate facets
-            facets = await self._calculate_facets(db, query, filtered_query)
+            matches = [
+                match for match in await self.get_segment_matches(hits.hits, query)
+                if match.relevance_score >= query.minimum_score
+            ]
             
             # Generate suggestions
-            suggestions = await self._generate_suggestions(db, query)
+            db = self.get_session()
+            try:
+                suggestions = await self._generate_suggestions(db, query)
+            finally:
+                db.close()
             
             execution_time = (datetime.now() - start_time).total_seconds()
             
             return SearchResults(
                 query=query,
-                total_matches=total_count,
+                total_matches=hits.total,
                 execution_time=execution_time,
                 matches=matches,
-                facets=facets,
+                facets=hits.facets,
                 suggestions=suggestions
             )
             
@@ -478,8 +845,6 @@ class TranscriptDatabase:
                 execution_time=0.0,
                 matches=[]
             )
-        finally:
-            db.close()
 
     def _build_search_query(self, db: Session, query: SearchQuery):
         """Build the appropriate search query based on search type."""
@@ -604,6 +969,14 @@ class TranscriptDatabase:
                 TranscriptDocument.date_proceeding.between(start_date, end_date)
             )
         
+        # Time-in-proceeding filter: segments overlapping the range
+        if query.time_range:
+            range_start, range_end = query.time_range
+            filtered_query = filtered_query.filter(
+                TranscriptSegmentDB.start_time <= range_end,
+                func.coalesce(TranscriptSegmentDB.end_time, TranscriptSegmentDB.start_time) >= range_start
+            )
+        
         return filtered_query
 
     async def _process_search_result(
@@ -661,6 +1034,35 @@ class TranscriptDatabase:
             print(f"Error processing search result: {e}")
             return None
 
+    async def get_segment_matches(
+        self,
+        scored_segments: List[Tuple[str, float]],
+        query: SearchQuery
+    ) -> List[SearchMatch]:
+        """Build search matches for (segment_id, score) pairs, keeping their order."""
+        if not scored_segments:
+            return []
+        
+        db = self.get_session()
+        try:
+            ids = [uuid.UUID(segment_id) for segment_id, _ in scored_segments]
+            segments = {
+                str(segment.id): segment
+                for segment in db.query(TranscriptSegmentDB).filter(TranscriptSegmentDB.id.in_(ids)).all()
+            }
+            
+            matches = []
+            for segment_id, score in scored_segments:
+                segment = segments.get(segment_id)
+                if segment is None:
+                    continue
+                match = await self._process_search_result(db, (segment, score), query)
+                if match:
+                    matches.append(match)
+            return matches
+        finally:
+            db.close()
+
     def _highlight_matches(self, text: str, query: str) -> str:
         """Highlight search terms in text."""
         try:
@@ -720,7 +1122,7 @@ class TranscriptDatabase:
                     "label": ann.label,
                     "value": ann.value,
                     "confidence": ann.confidence,
-                    "metadata": ann.metadata
+                    "metadata": ann.annotation_metadata
                 }
                 for ann in annotations
             ]
@@ -781,12 +1183,13 @@ class TranscriptDatabase:
         try:
             suggestions = []
             
-            # Find similar queries from search history
-            similar_queries = db.query(SearchResult.query_text).filter(
-                func.similarity(SearchResult.query_text, query.query_text) > 0.6
-            ).distinct().limit(5).all()
-            
-            suggestions.extend([q[0] for q in similar_queries if q[0] != query.query_text])
+            # Find similar queries from search history (pg_trgm)
+            if self.engine.dialect.name == "postgresql":
+                similar_queries = db.query(SearchResult.query_text).filter(
+                    func.similarity(SearchResult.query_text, query.query_text) > 0.6
+                ).distinct().limit(5).all()
+                
+                suggestions.extend([q[0] for q in similar_queries if q[0] != query.query_text])
             
             # Add legal term suggestions
             query_terms = query.query_text.lower().split()
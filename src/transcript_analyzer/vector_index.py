@@ -0,0 +1,357 @@
+"""
+Persistent vector index for transcript semantic search.
+
+Segments are embedded once, in batches, when they are stored. Vectors live in
+a memory-mapped file addressed by slot, with a small SQLite table mapping each
+segment id to its slot and content hash so unchanged segments are never
+re-embedded. Similarity search runs on a FAISS inner-product index that is
+updated incrementally as segments are added, changed or removed.
+"""
+
+import hashlib
+import json
+import logging
+import math
+import re
+import sqlite3
+import zlib
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Protocol, Sequence, Tuple, Union
+
+import faiss
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingModel(Protocol):
+    """Anything that embeds a batch of texts into fixed-size vectors."""
+
+    name: str
+    dimension: int
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        ...
+
+
+class HashingEmbeddingModel:
+    """Deterministic local embedding model.
+
+    Signed feature hashing of lower-cased word unigrams and bigrams, L2
+    normalized. Needs no model download or network access, so it serves as
+    the default when no embedding service is configured.
+    """
+
+    _token_pattern = re.compile(r"[a-z0-9']+")
+
+    def __init__(self, dimension: int = 256):
+        self.dimension = dimension
+        self.name = f"hashing-v1-{dimension}"
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = self._token_pattern.findall(text.lower())
+            features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+            for feature in features:
+                h = zlib.crc32(feature.encode("utf-8"))
+                vectors[row, h % self.dimension] += 1.0 if h & 0x80000000 else -1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        np.divide(vectors, norms, out=vectors, where=norms > 0)
+        return vectors
+
+
+def content_hash(text: str) -> str:
+    """Stable hash of segment text used to detect changed segments."""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class TranscriptVectorIndex:
+    """Memory-mapped segment vectors with an incrementally updated FAISS index.
+
+    Files under ``root``:
+      vectors.f32   float32 [capacity, dimension] memory map, one row per slot
+      segments.db   segment_id -> (slot, content_hash)
+      index.faiss   FAISS index snapshot written by ``flush()``
+      meta.json     model name, dimension and whether the snapshot is current
+
+    Small collections use an exact flat index; once ``ivf_threshold`` vectors
+    are stored the index is retrained as IVF so queries stay sub-linear.
+    """
+
+    def __init__(
+        self,
+        root: Union[str, Path],
+        model: Optional[EmbeddingModel] = None,
+        batch_size: int = 256,
+        ivf_threshold: int = 50_000,
+        nprobe: int = 16,
+    ):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.model = model or HashingEmbeddingModel()
+        self.dimension = self.model.dimension
+        self.batch_size = batch_size
+        self.ivf_threshold = ivf_threshold
+        self.nprobe = nprobe
+
+        self._vectors_path = self.root / "vectors.f32"
+        self._index_path = self.root / "index.faiss"
+        self._meta_path = self.root / "meta.json"
+
+        meta = self._read_meta()
+        if meta and (meta.get("model") != self.model.name or meta.get("dimension") != self.dimension):
+            # Vectors from a different model are useless; start over. The
+            # transcript database re-embeds its segments when the index is attached
+            logger.warning("Embedding model changed from %s to %s; rebuilding transcript vectors",
+                           meta.get("model"), self.model.name)
+            for name in ("vectors.f32", "index.faiss", "segments.db", "segments.db-wal", "segments.db-shm"):
+                (self.root / name).unlink(missing_ok=True)
+            meta = None
+
+        self._db = sqlite3.connect(str(self.root / "segments.db"), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS segments ("
+            " segment_id TEXT PRIMARY KEY, slot INTEGER NOT NULL UNIQUE, content_hash TEXT NOT NULL)"
+        )
+
+        self._slot_of: Dict[str, int] = {}
+        self._hash_of: Dict[str, str] = {}
+        self._segment_at: Dict[int, str] = {}
+        for segment_id, slot, digest in self._db.execute("SELECT segment_id, slot, content_hash FROM segments"):
+            self._slot_of[segment_id] = slot
+            self._hash_of[segment_id] = digest
+            self._segment_at[slot] = segment_id
+        used = set(self._segment_at)
+        self._next_slot = max(used) + 1 if used else 0
+        self._free_slots = sorted(set(range(self._next_slot)) - used, reverse=True)
+
+        self._capacity = 0
+        self._vectors: Optional[np.memmap] = None
+        self._open_vectors(max(1024, self._next_slot))
+
+        self._trained_size = 0
+        self._index = None
+        self._index_current = False
+        if meta and meta.get("index_current") and self._index_path.exists():
+            index = faiss.read_index(str(self._index_path))
+            if index.ntotal == len(self._slot_of):
+                self._index = index
+                self._trained_size = meta.get("trained_size", 0)
+                self._index_current = True
+        if self._index is None:
+            self._rebuild_index()
+            self._write_meta(index_current=False)
+
+    # Storage
+
+    def _read_meta(self) -> Optional[Dict]:
+        if not self._meta_path.exists():
+            return None
+        return json.loads(self._meta_path.read_text())
+
+    def _write_meta(self, index_current: bool):
+        tmp = self._meta_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({
+            "model": self.model.name,
+            "dimension": self.dimension,
+            "index_current": index_current,
+            "trained_size": self._trained_size,
+        }))
+        tmp.replace(self._meta_path)
+
+    def _open_vectors(self, capacity: int):
+        """Map the vector file, growing it to at least ``capacity`` rows."""
+        if self._vectors is not None:
+            self._vectors.flush()
+            del self._vectors
+        row_bytes = self.dimension * 4
+        existing = self._vectors_path.stat().st_size // row_bytes if self._vectors_path.exists() else 0
+        capacity = max(capacity, existing)
+        with open(self._vectors_path, "ab") as f:
+            f.truncate(capacity * row_bytes)
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r+",
+                                  shape=(capacity, self.dimension))
+        self._capacity = capacity
+
+    def _allocate_slot(self) -> int:
+        if self._free_slots:
+            return self._free_slots.pop()
+        slot = self._next_slot
+        self._next_slot += 1
+        if slot >= self._capacity:
+            self._open_vectors(self._capacity * 2)
+        return slot
+
+    # FAISS index
+
+    def _new_index(self, sample: Optional[np.ndarray]):
+        if sample is None or len(sample) < self.ivf_threshold:
+            self._trained_size = 0
+            return faiss.IndexIDMap2(faiss.IndexFlatIP(self.dimension))
+        # sqrt(n) lists keeps k-means training to seconds at 1M vectors;
+        # FAISS wants roughly 40+ training points per list
+        nlist = max(1, min(int(math.sqrt(len(sample))), len(sample) // 40))
+        quantizer = faiss.IndexFlatIP(self.dimension)
+        index = faiss.IndexIVFFlat(quantizer, self.dimension, nlist, faiss.METRIC_INNER_PRODUCT)
+        rng = np.random.default_rng(0)
+        train_size = min(len(sample), 40 * nlist)
+        train_rows = sample if train_size == len(sample) else sample[np.sort(rng.choice(len(sample), train_size, replace=False))]
+        index.train(np.ascontiguousarray(train_rows))
+        index.nprobe = self.nprobe
+        self._trained_size = len(sample)
+        return index
+
+    def _rebuild_index(self):
+        slots = np.fromiter(sorted(self._segment_at), dtype=np.int64, count=len(self._segment_at))
+        vectors = self._vectors[slots] if len(slots) else None
+        self._index = self._new_index(vectors)
+        if len(slots):
+            self._index.add_with_ids(np.ascontiguousarray(vectors), slots)
+
+    def _maybe_retrain(self):
+        count = len(self._slot_of)
+        if count < self.ivf_threshold:
+            return
+        if self._trained_size == 0 or count > 4 * self._trained_size:
+            self._rebuild_index()
+
+    def _mark_dirty(self):
+        if self._index_current:
+            self._index_current = False
+            self._write_meta(index_current=False)
+
+    # Public API
+
+    def __len__(self) -> int:
+        return len(self._slot_of)
+
+    def __contains__(self, segment_id: str) -> bool:
+        return segment_id in self._slot_of
+
+    def segment_ids(self) -> List[str]:
+        return list(self._slot_of)
+
+    def upsert(self, segments: Iterable[Tuple[str, str]]) -> int:
+        """Embed new or changed ``(segment_id, text)`` pairs; returns how many were embedded."""
+        pending: List[Tuple[str, str, str]] = []
+        embedded = 0
+        for segment_id, text in segments:
+            digest = content_hash(text)
+            if self._hash_of.get(segment_id) == digest:
+                continue
+            pending.append((segment_id, text, digest))
+            if len(pending) >= self.batch_size:
+                embedded += self._write_batch(pending)
+                pending = []
+        if pending:
+            embedded += self._write_batch(pending)
+        if embedded:
+            self._maybe_retrain()
+        return embedded
+
+    def _write_batch(self, batch: List[Tuple[str, str, str]]) -> int:
+        # Later duplicates of a segment id in one batch win
+        latest = {segment_id: (text, digest) for segment_id, text, digest in batch}
+        ids = list(latest)
+        vectors = np.asarray(self.model.embed([latest[i][0] for i in ids]), dtype=np.float32)
+        faiss.normalize_L2(vectors)
+        self._mark_dirty()
+
+        replaced = [self._slot_of[i] for i in ids if i in self._slot_of]
+        if replaced:
+            self._index.remove_ids(np.asarray(replaced, dtype=np.int64))
+
+        slots = np.empty(len(ids), dtype=np.int64)
+        for row, segment_id in enumerate(ids):
+            slot = self._slot_of.get(segment_id)
+            if slot is None:
+                slot = self._allocate_slot()
+            slots[row] = slot
+        self._vectors[slots] = vectors
+        self._index.add_with_ids(vectors, slots)
+
+        with self._db:
+            self._db.executemany(
+                "INSERT INTO segments (segment_id, slot, content_hash) VALUES (?, ?, ?)"
+                " ON CONFLICT (segment_id) DO UPDATE SET content_hash = excluded.content_hash",
+                [(segment_id, int(slot), latest[segment_id][1]) for segment_id, slot in zip(ids, slots)],
+            )
+        for segment_id, slot in zip(ids, slots):
+            self._slot_of[segment_id] = int(slot)
+            self._hash_of[segment_id] = latest[segment_id][1]
+            self._segment_at[int(slot)] = segment_id
+        return len(ids)
+
+    def remove(self, segment_ids: Iterable[str]) -> int:
+        """Drop segments from the index; their slots are reused by later inserts."""
+        slots = [self._slot_of[i] for i in set(segment_ids) if i in self._slot_of]
+        if not slots:
+            return 0
+        self._mark_dirty()
+        self._index.remove_ids(np.asarray(slots, dtype=np.int64))
+        with self._db:
+            self._db.executemany("DELETE FROM segments WHERE slot = ?", [(slot,) for slot in slots])
+        for slot in slots:
+            segment_id = self._segment_at.pop(slot)
+            del self._slot_of[segment_id]
+            del self._hash_of[segment_id]
+            self._free_slots.append(slot)
+        self._free_slots.sort(reverse=True)
+        return len(slots)
+
+    def get_vector(self, segment_id: str) -> Optional[np.ndarray]:
+        slot = self._slot_of.get(segment_id)
+        return None if slot is None else np.array(self._vectors[slot])
+
+    def embed_query(self, text: str) -> np.ndarray:
+        vector = np.asarray(self.model.embed([text]), dtype=np.float32).reshape(1, -1)
+        faiss.normalize_L2(vector)
+        return vector
+
+    def search(
+        self,
+        query: Union[str, np.ndarray],
+        k: int = 10,
+        min_score: Optional[float] = None,
+        segment_ids: Optional[Iterable[str]] = None,
+    ) -> List[Tuple[str, float]]:
+        """Top ``k`` segments by cosine similarity to ``query``.
+
+        ``segment_ids`` restricts the search to a candidate set, scored
+        exactly from the stored vectors without re-embedding them.
+        """
+        vector = self.embed_query(query) if isinstance(query, str) else \
+            np.ascontiguousarray(query, dtype=np.float32).reshape(1, -1)
+
+        if segment_ids is not None:
+            candidates = [(i, self._slot_of[i]) for i in dict.fromkeys(segment_ids) if i in self._slot_of]
+            if not candidates:
+                return []
+            scores = self._vectors[np.asarray([slot for _, slot in candidates])] @ vector[0]
+            order = np.argsort(-scores, kind="stable")[:k]
+            hits = [(candidates[i][0], float(scores[i])) for i in order]
+        else:
+            if not self._slot_of:
+                return []
+            scores, slots = self._index.search(vector, min(k, len(self._slot_of)))
+            hits = [(self._segment_at[int(slot)], float(score))
+                    for score, slot in zip(scores[0], slots[0]) if slot >= 0]
+
+        if min_score is not None:
+            hits = [hit for hit in hits if hit[1] >= min_score]
+        return hits
+
+    def flush(self):
+        """Persist vectors and an index snapshot so the next open skips the rebuild."""
+        self._vectors.flush()
+        faiss.write_index(self._index, str(self._index_path))
+        self._index_current = True
+        self._write_meta(index_current=True)
+
+    def close(self):
+        self.flush()
+        self._db.close()
+        del self._vectors
+        self._vectors = None
@@ -23,6 +23,16 @@ from .models import (
 )
 from .auth_middleware import WebSocketAuthMiddleware
 from .session_manager import SessionManager
+from ..core.fanout import FanoutHub, SlowConsumerPolicy
+
+
+# Fan-out topics: every authenticated connection, and per-session subscribers
+AUTHENTICATED_TOPIC = "authenticated"
+SESSION_TOPIC_PREFIX = "session:"
+
+
+def session_topic(session_id: str) -> str:
+    return f"{SESSION_TOPIC_PREFIX}{session_id}"
 
 
 @dataclass
@@ -43,9 +53,13 @@ class WebSocketConfig:
     
     # Message handling
     max_message_size: int = 1024 * 1024  # 1MB
-    message_queue_size: int = 100
+    message_queue_size: int = 100  # Outbound messages buffered per connection
     heartbeat_interval: int = 30  # seconds
     
+    # Slow consumers: "drop" (oldest queued message), "coalesce" or "disconnect"
+    slow_consumer_policy: str = "drop"
+    send_timeout: float = 10.0  # seconds; a send stuck longer closes the connection
+    
     # Authentication
     require_auth: bool = True
     auth_timeout: int = 30  # seconds
@@ -81,7 +95,14 @@ class TranscriptWebSocketServer:
         
         # Message handling
         self.message_handlers: Dict[MessageType, List[Callable]] = {}
-        self.broadcast_subscribers: Dict[str, Set[str]] = {}  # session_id -> connection_ids
+        
+        # Outbound fan-out: messages are serialized once and queued per
+        # connection, each drained by its own writer task
+        self.hub = FanoutHub(
+            queue_size=config.message_queue_size,
+            policy=SlowConsumerPolicy(config.slow_consumer_policy),
+            send_timeout=config.send_timeout
+        )
         
         # Server state
         self.is_running = False
@@ -170,6 +191,7 @@ class TranscriptWebSocketServer:
         
         # Disconnect all clients
         await self._disconnect_all_clients()
+        await self.hub.close()
         
         # Cancel background tasks
         await self._stop_background_tasks()
@@ -194,59 +216,38 @@ class TranscriptWebSocketServer:
     async def broadcast_message(self, 
                               message: TranscriptMessage,
                               session_id: Optional[str] = None,
-                              exclude_connections: Optional[Set[str]] = None) -> int:
+                              exclude_connections: Optional[Set[str]] = None,
+                              coalesce_key: Optional[str] = None) -> int:
         """
         Broadcast message to connected clients.
         
+        The message is serialized once and queued for each target connection;
+        it never waits on a client, so one slow client cannot stall the rest.
+        
         Args:
             message: Message to broadcast
             session_id: Optional session ID to limit broadcast
             exclude_connections: Connection IDs to exclude
+            coalesce_key: Lets a newer message with the same key replace a
+                queued one for connections using the "coalesce" policy
             
         Returns:
-            Number of connections message was sent to
+            Number of connections message was queued for
         """
         if not self.is_running:
             return 0
         
-        exclude_connections = exclude_connections or set()
-        target_connections = set()
-        
-        if session_id:
-            # Broadcast to session subscribers only
-            target_connections = self.broadcast_subscribers.get(session_id, set())
-        else:
-            # Broadcast to all authenticated connections
-            target_connections = {
-                conn_id for conn_id, info in self.connection_info.items()
-                if info.is_authenticated
-            }
-        
-        # Remove excluded connections
-        target_connections -= exclude_connections
-        
-        # Send message to target connections
-        send_tasks = []
-        for conn_id in target_connections:
-            if conn_id in self.connections:
-                task = asyncio.create_task(
-                    self._send_message_to_connection(conn_id, message)
-                )
-                send_tasks.append(task)
-        
-        # Wait for all sends to complete
-        if send_tasks:
-            results = await asyncio.gather(*send_tasks, return_exceptions=True)
-            success_count = sum(1 for result in results if result is True)
-            
-            self.logger.debug(
-                f"Broadcast message {message.message_type.value} to "
-                f"{success_count}/{len(send_tasks)} connections"
-            )
-            
-            return success_count
+        # Broadcast to session subscribers, or to all authenticated connections
+        topic = session_topic(session_id) if session_id else AUTHENTICATED_TOPIC
+        queued = self.hub.publish(
+            json.dumps(message.to_dict()),
+            topic=topic,
+            exclude=exclude_connections,
+            coalesce_key=coalesce_key
+        )
         
-        return 0
+        self.logger.debug(f"Broadcast message {message.message_type.value} to {queued} connections")
+        return queued
     
     async def send_message_to_connection(self, 
                                        connection_id: str, 
@@ -259,28 +260,29 @@ class TranscriptWebSocketServer:
         if connection_id not in self.connection_info:
             return False
         
-        if session_id not in self.broadcast_subscribers:
-            self.broadcast_subscribers[session_id] = set()
-        
-        self.broadcast_subscribers[session_id].add(connection_id)
+        if not self.hub.subscribe(connection_id, session_topic(session_id)):
+            return False
         
         self.logger.debug(f"Connection {connection_id} subscribed to session {session_id}")
         return True
     
     async def unsubscribe_from_session(self, connection_id: str, session_id: str) -> bool:
         """Unsubscribe connection from session broadcasts."""
-        if session_id in self.broadcast_subscribers:
-            self.broadcast_subscribers[session_id].discard(connection_id)
-            
-            # Clean up empty session subscriptions
-            if not self.broadcast_subscribers[session_id]:
-                del self.broadcast_subscribers[session_id]
-            
+        if self.hub.unsubscribe(connection_id, session_topic(session_id)):
             self.logger.debug(f"Connection {connection_id} unsubscribed from session {session_id}")
             return True
         
         return False
     
+    @property
+    def broadcast_subscribers(self) -> Dict[str, Set[str]]:
+        """Session ID -> subscribed connection IDs."""
+        return {
+            topic[len(SESSION_TOPIC_PREFIX):]: set(connection_ids)
+            for topic, connection_ids in self.hub.subscriptions.items()
+            if topic.startswith(SESSION_TOPIC_PREFIX)
+        }
+    
     def get_connection_stats(self) -> Dict[str, Any]:
         """Get server connection statistics."""
         active_connections = len(self.connections)
@@ -298,7 +300,8 @@ class TranscriptWebSocketServer:
             "total_connections": self.total_connections,
             "total_messages": self.total_messages,
             "session_subscriptions": len(self.broadcast_subscribers),
-            "ip_distribution": {ip: len(conns) for ip, conns in self.ip_connections.items()}
+            "ip_distribution": {ip: len(conns) for ip, conns in self.ip_connections.items()},
+            "fanout": self.hub.metrics()
         }
     
     async def _handle_connection(self, websocket: WebSocketServerProtocol, path: str) -> None:
@@ -332,6 +335,12 @@ class TranscriptWebSocketServer:
             self.ip_connections[client_ip] = set()
         self.ip_connections[client_ip].add(connection_id)
         
+        self.hub.register(
+            connection_id,
+            send=websocket.send,
+            close=lambda: websocket.close(code=1008, reason="Slow consumer")
+        )
+        
         self.total_connections += 1
         
         self.logger.info(f"New connection {connection_id} from {client_ip}")
@@ -355,6 +364,9 @@ class TranscriptWebSocketServer:
             else:
                 connection_info.is_authenticated = True
             
+            if connection_info.is_authenticated:
+                self.hub.subscribe(connection_id, AUTHENTICATED_TOPIC)
+            
             # Main message loop
             await self._message_loop(connection_id, websocket)
             
@@ -515,10 +527,13 @@ class TranscriptWebSocketServer:
     async def _send_message_to_connection(self, 
                                         connection_id: str, 
                                         message: TranscriptMessage) -> bool:
-        """Send message to specific connection."""
+        """Queue message for specific connection."""
         if connection_id not in self.connections:
             return False
         
+        if connection_id in self.hub:
+            return self.hub.send_to(connection_id, json.dumps(message.to_dict()))
+        
         websocket = self.connections[connection_id]
         return await self._send_raw_message(websocket, message)
     
@@ -554,11 +569,8 @@ class TranscriptWebSocketServer:
             
             del self.connection_info[connection_id]
         
-        # Remove from session subscriptions
-        for session_id, subscribers in list(self.broadcast_subscribers.items()):
-            subscribers.discard(connection_id)
-            if not subscribers:
-                del self.broadcast_subscribers[session_id]
+        # Remove from fan-out queues and session subscriptions
+        self.hub.unregister(connection_id)
         
         self.logger.debug(f"Cleaned up connection {connection_id}")
     
@@ -579,7 +591,8 @@ class TranscriptWebSocketServer:
         self.connections.clear()
         self.connection_info.clear()
         self.ip_connections.clear()
-        self.broadcast_subscribers.clear()
+        for connection_id in list(self.hub.connections):
+            self.hub.unregister(connection_id)
     
     def _start_background_tasks(self) -> None:
         """Start background maintenance tasks."""
@@ -607,18 +620,16 @@ class TranscriptWebSocketServer:
         """Background task for sending heartbeats."""
         while self.is_running:
             try:
-                # Send heartbeat to all authenticated connections
-                heartbeat_tasks = []
+                # Queue a heartbeat for every authenticated connection; an
+                # unsent one is replaced rather than stacked for coalescing clients
                 for connection_id, info in list(self.connection_info.items()):
                     if info.is_authenticated:
                         heartbeat_msg = create_heartbeat_message(connection_id)
-                        task = asyncio.create_task(
-                            self._send_message_to_connection(connection_id, heartbeat_msg)
+                        self.hub.send_to(
+                            connection_id,
+                            json.dumps(heartbeat_msg.to_dict()),
+                            coalesce_key="heartbeat"
                         )
-                        heartbeat_tasks.append(task)
-                
-                if heartbeat_tasks:
-                    await asyncio.gather(*heartbeat_tasks, return_exceptions=True)
                 
                 await asyncio.sleep(self.config.heartbeat_interval)
                 
@@ -12,6 +12,7 @@ from .document_generator import DocumentGenerator, TrialDocument, DocumentTempla
 from .timeline_builder import TimelineBuilder, TimelineEvent, CaseTimeline
 from .jury_analyzer import JuryAnalyzer, JurorProfile, JurySelection
 from .trial_manager import TrialManager, TrialPlan, TrialStrategy
+from .trial_content_index import TrialContentIndex, ContentHit
 
 __all__ = [
     # Core managers
@@ -22,6 +23,7 @@ __all__ = [
     'DocumentGenerator',
     'TimelineBuilder',
     'JuryAnalyzer',
+    'TrialContentIndex',
     
     # Data models
     'TrialPlan',
@@ -37,7 +39,8 @@ __all__ = [
     'TimelineEvent',
     'CaseTimeline',
     'JurorProfile',
-    'JurySelection'
+    'JurySelection',
+    'ContentHit'
 ]
 
 __version__ = '1.0.0'
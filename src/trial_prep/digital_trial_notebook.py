@@ -16,6 +16,8 @@ import logging
 from pathlib import Path
 from collections import defaultdict
 
+from .trial_content_index import TrialContentIndex
+
 logger = logging.getLogger(__name__)
 
 class TrialDay(Enum):
@@ -644,10 +646,13 @@ class TrialTracker:
 class DigitalTrialNotebook:
     """Main digital trial notebook system."""
     
-    def __init__(self):
+    def __init__(self, content_index: Optional[TrialContentIndex] = None):
         self.trial_notebooks: Dict[str, TrialNotebook] = {}
         self.planner = TrialPlanner()
         self.tracker = TrialTracker()
+        self.content_index = content_index if content_index is not None else TrialContentIndex()
+        # Day notes as last indexed, to pick up notes edited on the plan directly
+        self._indexed_day_notes: Dict[str, Tuple[str, str, str]] = {}
         self.logger = logging.getLogger(__name__ + ".DigitalTrialNotebook")
     
     def create_trial_notebook(self, case_id: str, case_name: str,
@@ -666,10 +671,12 @@ class DigitalTrialNotebook:
             judge=judge
         )
         
+        # Register first; day plans are created against the stored notebook
+        self.trial_notebooks[notebook_id] = notebook
+        
         # Generate initial trial day structure
         self._generate_initial_trial_days(notebook, trial_start_date, estimated_days)
         
-        self.trial_notebooks[notebook_id] = notebook
         self.logger.info(f"Created trial notebook: {notebook_id}")
         return notebook_id
     
@@ -754,6 +761,11 @@ class DigitalTrialNotebook:
             }
         
         notebook.master_witness_list[witness_id]['scheduled_days'].append(day_id)
+        self.content_index.index_item(
+            'trial_witness', f"{notebook_id}:{witness_id}",
+            {'name': witness_name},
+            attributes={'notebook_id': notebook_id, 'witness_id': witness_id}
+        )
         
         self.logger.info(f"Scheduled witness {witness_name} for {trial_day.trial_date}")
         return True
@@ -785,6 +797,11 @@ class DigitalTrialNotebook:
                 'scheduled_day': day_id,
                 'status': 'scheduled'
             }
+            self.content_index.index_item(
+                'trial_exhibit', f"{notebook_id}:{exhibit_id}",
+                {'exhibit_number': exhibit_number},
+                attributes={'notebook_id': notebook_id, 'exhibit_id': exhibit_id}
+            )
         
         self.logger.info(f"Scheduled exhibit {exhibit_number} for {trial_day.trial_date}")
         return True
@@ -959,13 +976,33 @@ class DigitalTrialNotebook:
         
         return dashboard
     
+    def record_day_notes(self, notebook_id: str, day_id: str,
+                         general_notes: Optional[str] = None,
+                         judge_observations: Optional[str] = None,
+                         jury_observations: Optional[str] = None) -> bool:
+        """Update a trial day's notes and observations."""
+        if (notebook_id not in self.trial_notebooks or
+            day_id not in self.trial_notebooks[notebook_id].trial_days):
+            return False
+        
+        trial_day = self.trial_notebooks[notebook_id].trial_days[day_id]
+        if general_notes is not None:
+            trial_day.general_trial_notes = general_notes
+        if judge_observations is not None:
+            trial_day.judge_observations = judge_observations
+        if jury_observations is not None:
+            trial_day.jury_observations = jury_observations
+        trial_day.last_modified = datetime.now()
+        
+        self._index_day_notes(notebook_id, trial_day)
+        return True
+    
     def search_trial_content(self, notebook_id: str, query: str) -> Dict[str, List[Any]]:
-        """Search trial notebook content."""
+        """Search trial notebook content, best matches first; words match by prefix."""
         if notebook_id not in self.trial_notebooks:
             return {'error': 'Trial notebook not found'}
         
         notebook = self.trial_notebooks[notebook_id]
-        query_lower = query.lower()
         
         results = {
             'witnesses': [],
@@ -974,37 +1011,65 @@ class DigitalTrialNotebook:
             'objectives': []
         }
         
-        # Search witness information
-        for witness_id, witness_info in notebook.master_witness_list.items():
-            if query_lower in witness_info['name'].lower():
+        self.refresh_day_notes(notebook_id)
+        
+        hits = self.content_index.search(
+            query,
+            kinds=['trial_witness', 'trial_exhibit', 'trial_day'],
+            filters={'notebook_id': notebook_id}
+        )
+        
+        for hit in hits:
+            if hit.kind == 'trial_witness':
+                witness_id = hit.attributes['witness_id']
+                witness_info = notebook.master_witness_list[witness_id]
                 results['witnesses'].append({
                     'witness_id': witness_id,
                     'name': witness_info['name'],
                     'status': witness_info['testimony_status'],
                     'scheduled_days': len(witness_info['scheduled_days'])
                 })
-        
-        # Search exhibit information
-        for exhibit_id, exhibit_info in notebook.master_exhibit_list.items():
-            if query_lower in exhibit_info['exhibit_number'].lower():
+            elif hit.kind == 'trial_exhibit':
+                exhibit_id = hit.attributes['exhibit_id']
+                exhibit_info = notebook.master_exhibit_list[exhibit_id]
                 results['exhibits'].append({
                     'exhibit_id': exhibit_id,
                     'exhibit_number': exhibit_info['exhibit_number'],
                     'status': exhibit_info['status']
                 })
-        
-        # Search trial day notes
-        for day_id, trial_day in notebook.trial_days.items():
-            day_notes = f"{trial_day.general_trial_notes} {trial_day.judge_observations} {trial_day.jury_observations}"
-            if query_lower in day_notes.lower():
+            else:
+                day_id = hit.attributes['day_id']
+                trial_day = notebook.trial_days[day_id]
+                day_notes = f"{trial_day.general_trial_notes} {trial_day.judge_observations} {trial_day.jury_observations}"
                 results['notes'].append({
                     'day_id': day_id,
                     'date': trial_day.trial_date,
-                    'relevant_content': self._extract_relevant_content(day_notes, query_lower)
+                    'relevant_content': self._extract_relevant_content(day_notes, query.lower())
                 })
         
         return results
     
+    def refresh_day_notes(self, notebook_id: str) -> int:
+        """Re-index day notes that were written on the day plans directly; returns how many changed."""
+        changed = 0
+        for trial_day in self.trial_notebooks[notebook_id].trial_days.values():
+            notes = (trial_day.general_trial_notes, trial_day.judge_observations, trial_day.jury_observations)
+            # Unchanged notes are the same string objects, so this comparison is cheap
+            if self._indexed_day_notes.get(trial_day.day_id) != notes:
+                self._index_day_notes(notebook_id, trial_day)
+                changed += 1
+        return changed
+    
+    def _index_day_notes(self, notebook_id: str, trial_day: TrialDayPlan) -> None:
+        """Update a trial day's notes in the content index."""
+        notes = (trial_day.general_trial_notes, trial_day.judge_observations, trial_day.jury_observations)
+        self.content_index.index_item(
+            'trial_day', f"{notebook_id}:{trial_day.day_id}",
+            {'general_trial_notes': notes[0], 'judge_observations': notes[1], 'jury_observations': notes[2]},
+            attributes={'notebook_id': notebook_id, 'day_id': trial_day.day_id, 'date': trial_day.trial_date}
+        )
+        self._indexed_day_notes[trial_day.day_id] = notes
+    
     def _generate_initial_trial_days(self, notebook: TrialNotebook, 
                                    start_date: date, estimated_days: int) -> None:
         """Generate initial trial day structure."""
@@ -1072,12 +1137,21 @@ class DigitalTrialNotebook:
     
     def _extract_relevant_content(self, text: str, query: str) -> str:
         """Extract relevant content snippet around query match."""
-        index = text.lower().find(query)
+        lowered = text.lower()
+        index = lowered.find(query)
+        match_length = len(query)
+        if index == -1:
+            # Query words can match apart from each other; centre on the first one found
+            for word in query.split():
+                index = lowered.find(word)
+                if index != -1:
+                    match_length = len(word)
+                    break
         if index == -1:
             return ""
         
         start = max(0, index - 50)
-        end = min(len(text), index + len(query) + 50)
+        end = min(len(text), index + match_length + 50)
         snippet = text[start:end]
         
         if start > 0:
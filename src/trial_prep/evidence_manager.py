@@ -16,8 +16,13 @@ import json
 import logging
 from pathlib import Path
 
+from .trial_content_index import TrialContentIndex
+
 logger = logging.getLogger(__name__)
 
+# search_evidence filters answered by the content index
+EVIDENCE_FILTERS = ('evidence_type', 'status', 'relevance_min', 'date_from', 'date_to')
+
 class EvidenceType(Enum):
     """Types of evidence that can be managed."""
     DOCUMENT = "document"
@@ -421,11 +426,12 @@ class ExhibitManager:
 class EvidenceManager:
     """Main evidence management system coordinating all components."""
     
-    def __init__(self):
+    def __init__(self, content_index: Optional[TrialContentIndex] = None):
         self.evidence_items: Dict[str, EvidenceItem] = {}
         self.evidence_chains: Dict[str, EvidenceChain] = {}
         self.analyzer = EvidenceAnalyzer()
         self.exhibit_manager = ExhibitManager()
+        self.content_index = content_index if content_index is not None else TrialContentIndex()
         self.logger = logging.getLogger(__name__ + ".EvidenceManager")
     
     def add_evidence(self, evidence: EvidenceItem) -> str:
@@ -452,9 +458,17 @@ class EvidenceManager:
             evidence.custody_chain.append(initial_custody)
         
         self.evidence_items[evidence.evidence_id] = evidence
+        self._index_evidence(evidence)
         self.logger.info(f"Added evidence item: {evidence.evidence_id}")
         return evidence.evidence_id
     
+    def reindex_evidence(self, evidence_id: str) -> bool:
+        """Refresh an evidence item's search entry after editing its fields directly."""
+        if evidence_id not in self.evidence_items:
+            return False
+        self._index_evidence(self.evidence_items[evidence_id])
+        return True
+    
     def create_evidence_chain(self, title: str, description: str, 
                             evidence_ids: List[str]) -> str:
         """Create new evidence chain linking related items."""
@@ -521,6 +535,7 @@ class EvidenceManager:
         # Add authentication note
         auth_note = f"Authenticated by {authenticator} using {method} on {datetime.now().strftime('%Y-%m-%d')}"
         evidence.notes.append(auth_note)
+        self._index_evidence(evidence)
         
         # Update custody for authentication
         self.update_custody(evidence_id, authenticator, "Authentication", 
@@ -550,6 +565,7 @@ class EvidenceManager:
             if not evidence.exhibit_number:
                 evidence.exhibit_number = f"Plaintiff-{exhibit_counter}"
                 exhibit_counter += 1
+                self._index_evidence(evidence)
             
             # Analyze evidence strength
             strength = self.analyzer.analyze_evidence_strength(evidence)
@@ -585,35 +601,12 @@ class EvidenceManager:
         return preparation_report
     
     def search_evidence(self, query: str, filters: Optional[Dict[str, Any]] = None) -> List[EvidenceItem]:
-        """Search evidence items by various criteria."""
-        results = []
-        query_lower = query.lower()
-        
-        for evidence in self.evidence_items.values():
-            # Text search in title, description, and notes
-            searchable_text = (
-                f"{evidence.title} {evidence.description} " +
-                f"{evidence.source} {evidence.case_relevance} " +
-                f"{' '.join(evidence.notes)} {' '.join(evidence.tags)}"
-            ).lower()
-            
-            if query_lower in searchable_text:
-                # Apply filters if provided
-                if filters:
-                    if 'evidence_type' in filters and evidence.evidence_type != filters['evidence_type']:
-                        continue
-                    if 'status' in filters and evidence.status != filters['status']:
-                        continue
-                    if 'relevance_min' in filters and evidence.relevance_score.value < filters['relevance_min']:
-                        continue
-                    if 'date_from' in filters and evidence.date_created < filters['date_from']:
-                        continue
-                    if 'date_to' in filters and evidence.date_created > filters['date_to']:
-                        continue
-                
-                results.append(evidence)
-        
-        # Sort by relevance score (highest first)
+        """Search evidence items by text, notes and tags; words match by prefix."""
+        index_filters = {name: value for name, value in (filters or {}).items() if name in EVIDENCE_FILTERS}
+        hits = self.content_index.search(query, kinds=['evidence'], filters=index_filters)
+        results = [self.evidence_items[hit.item_id] for hit in hits if hit.item_id in self.evidence_items]
+        
+        # Sort by relevance score (highest first), best text matches first within each
         return sorted(results, key=lambda x: x.relevance_score.value, reverse=True)
     
     def generate_evidence_report(self, chain_id: Optional[str] = None) -> Dict[str, Any]:
@@ -707,6 +700,28 @@ class EvidenceManager:
         
         return report
     
+    def _index_evidence(self, evidence: EvidenceItem) -> None:
+        """Update the evidence item's entry in the content index."""
+        self.content_index.index_item(
+            'evidence',
+            evidence.evidence_id,
+            {
+                'exhibit_number': evidence.exhibit_number,
+                'title': evidence.title,
+                'description': evidence.description,
+                'source': evidence.source,
+                'case_relevance': evidence.case_relevance,
+                'notes': evidence.notes,
+                'tags': sorted(evidence.tags)
+            },
+            attributes={
+                'evidence_type': evidence.evidence_type,
+                'status': evidence.status,
+                'relevance': evidence.relevance_score.value,
+                'date': evidence.date_created
+            }
+        )
+    
     def _generate_file_hash(self, file_path: str) -> str:
         """Generate SHA-256 hash of file for integrity verification."""
         try:
@@ -17,8 +17,13 @@ from pathlib import Path
 import hashlib
 from collections import defaultdict
 
+from .trial_content_index import TrialContentIndex
+
 logger = logging.getLogger(__name__)
 
+# search_exhibits filters answered by the content index
+EXHIBIT_FILTERS = ('exhibit_type', 'status', 'party', 'importance_min')
+
 class ExhibitType(Enum):
     """Types of trial exhibits."""
     DOCUMENT = "document"
@@ -536,13 +541,14 @@ class ExhibitAnalyzer:
 class ExhibitManager:
     """Main exhibit management system."""
     
-    def __init__(self):
+    def __init__(self, content_index: Optional[TrialContentIndex] = None):
         self.exhibits: Dict[str, Exhibit] = {}
         self.exhibit_lists: Dict[str, ExhibitList] = {}
         self.authentications: Dict[str, ExhibitAuthentication] = {}
         self.objections: Dict[str, ExhibitObjection] = {}
         self.presentations: Dict[str, ExhibitPresentation] = {}
         self.analyzer = ExhibitAnalyzer()
+        self.content_index = content_index if content_index is not None else TrialContentIndex()
         self.logger = logging.getLogger(__name__ + ".ExhibitManager")
     
     def add_exhibit(self, exhibit: Exhibit) -> str:
@@ -573,9 +579,17 @@ class ExhibitManager:
             self.presentations[pres_id] = exhibit.presentation
         
         self.exhibits[exhibit.exhibit_id] = exhibit
+        self._index_exhibit(exhibit)
         self.logger.info(f"Added exhibit: {exhibit.exhibit_id} - {exhibit.exhibit_number}")
         return exhibit.exhibit_id
     
+    def reindex_exhibit(self, exhibit_id: str) -> bool:
+        """Refresh an exhibit's search entry after editing its fields directly."""
+        if exhibit_id not in self.exhibits:
+            return False
+        self._index_exhibit(self.exhibits[exhibit_id])
+        return True
+    
     def create_exhibit_list(self, case_id: str, party: ExhibitParty,
                           trial_date: Optional[date] = None) -> str:
         """Create new exhibit list."""
@@ -653,6 +667,7 @@ class ExhibitManager:
                 'details': f'Authenticated by {witness_id} using {authentication_method}',
                 'user': 'system'
             })
+            self._index_exhibit(exhibit)
             
             self.logger.info(f"Authenticated exhibit {exhibit_id}")
             return True
@@ -679,6 +694,7 @@ class ExhibitManager:
             exhibit.objections.append(objection_id)
             exhibit.status = ExhibitStatus.OBJECTED
             exhibit.last_modified = datetime.now()
+            self._index_exhibit(exhibit)
         
         self.logger.info(f"Recorded objection {objection_id} for exhibit {exhibit_id}")
         return objection_id
@@ -749,6 +765,7 @@ class ExhibitManager:
             exhibit.status = ExhibitStatus.PRE_MARKED
         
         exhibit.last_modified = datetime.now()
+        self._index_exhibit(exhibit)
         
         return checklist
     
@@ -792,6 +809,7 @@ class ExhibitManager:
             'details': admission_notes,
             'user': 'court'
         })
+        self._index_exhibit(exhibit)
         
         self.logger.info(f"Admitted exhibit {exhibit_id}")
         return True
@@ -935,32 +953,12 @@ class ExhibitManager:
         return report
     
     def search_exhibits(self, query: str, filters: Optional[Dict[str, Any]] = None) -> List[Exhibit]:
-        """Search exhibits by various criteria."""
-        results = []
-        query_lower = query.lower()
-        
-        for exhibit in self.exhibits.values():
-            # Text search in title, description, and notes
-            searchable_text = (
-                f"{exhibit.title} {exhibit.description} {exhibit.strategic_notes} " +
-                f"{exhibit.attorney_notes} {exhibit.trial_notes}"
-            ).lower()
-            
-            if query_lower in searchable_text:
-                # Apply filters if provided
-                if filters:
-                    if 'exhibit_type' in filters and exhibit.exhibit_type != filters['exhibit_type']:
-                        continue
-                    if 'status' in filters and exhibit.status != filters['status']:
-                        continue
-                    if 'party' in filters and exhibit.party != filters['party']:
-                        continue
-                    if 'importance_min' in filters and exhibit.importance_level < filters['importance_min']:
-                        continue
-                
-                results.append(exhibit)
-        
-        # Sort by importance and strategic value
+        """Search exhibits by number, title, description and notes; words match by prefix."""
+        index_filters = {name: value for name, value in (filters or {}).items() if name in EXHIBIT_FILTERS}
+        hits = self.content_index.search(query, kinds=['exhibit'], filters=index_filters)
+        results = [self.exhibits[hit.item_id] for hit in hits if hit.item_id in self.exhibits]
+        
+        # Sort by importance and strategic value, best text matches first within each
         return sorted(results, key=lambda x: (x.importance_level, x.jury_appeal_factor), reverse=True)
     
     def export_exhibit_list_for_court(self, list_id: str) -> Dict[str, Any]:
@@ -1000,6 +998,25 @@ class ExhibitManager:
         
         return court_list
     
+    def _index_exhibit(self, exhibit: Exhibit) -> None:
+        """Update the exhibit's entry in the content index."""
+        self.content_index.index_item(
+            'exhibit',
+            exhibit.exhibit_id,
+            {
+                'exhibit_number': exhibit.exhibit_number,
+                'title': exhibit.title,
+                'description': exhibit.description,
+                'notes': [exhibit.strategic_notes, exhibit.attorney_notes, exhibit.trial_notes]
+            },
+            attributes={
+                'exhibit_type': exhibit.exhibit_type,
+                'status': exhibit.status,
+                'party': exhibit.party,
+                'importance': exhibit.importance_level
+            }
+        )
+    
     def _generate_exhibit_number(self, party: ExhibitParty) -> str:
         """Generate next exhibit number for party."""
         party_prefix = {
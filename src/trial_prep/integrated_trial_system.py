@@ -29,6 +29,7 @@ from .jury_analyzer import JuryAnalyzer, JurorProfile, JurySelection
 from .exhibit_manager import ExhibitManager, Exhibit, ExhibitList
 from .witness_prep_tracker import WitnessPrepTracker, PrepSession, WitnessReadinessReport
 from .jury_instruction_assistant import JuryInstructionAssistant, JuryInstruction, InstructionSet
+from .trial_content_index import TrialContentIndex
 
 logger = logging.getLogger(__name__)
 
@@ -624,15 +625,18 @@ class IntegratedTrialSystem:
     """Master integration system coordinating all trial preparation components."""
     
     def __init__(self):
+        # One search index shared by the notebook and the exhibit, evidence and witness managers
+        self.content_index = TrialContentIndex()
+        
         # Initialize all trial preparation components
-        self.digital_trial_notebook = DigitalTrialNotebook()
+        self.digital_trial_notebook = DigitalTrialNotebook(self.content_index)
         self.case_analyzer = CaseAnalyzer()
-        self.evidence_manager = EvidenceManager()
-        self.witness_manager = WitnessManager()
+        self.evidence_manager = EvidenceManager(self.content_index)
+        self.witness_manager = WitnessManager(self.content_index)
         self.document_generator = DocumentGenerator()
         self.timeline_builder = TimelineBuilder()
         self.jury_analyzer = JuryAnalyzer()
-        self.exhibit_manager = ExhibitManager()
+        self.exhibit_manager = ExhibitManager(self.content_index)
         self.witness_prep_tracker = WitnessPrepTracker()
         self.jury_instruction_assistant = JuryInstructionAssistant()
         
@@ -840,6 +844,38 @@ class IntegratedTrialSystem:
         
         return status
     
+    def search_trial_content(self, query: str, kinds: Optional[List[str]] = None,
+                             filters: Optional[Dict[str, Any]] = None,
+                             limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        Ranked search across exhibits, evidence, witnesses and trial notebook
+        content. ``kinds`` narrows it to 'exhibit', 'evidence', 'witness',
+        'trial_witness', 'trial_exhibit' or 'trial_day' entries.
+        """
+        # Pick up notes written on trial day plans directly
+        for notebook_id in self.digital_trial_notebook.trial_notebooks:
+            self.digital_trial_notebook.refresh_day_notes(notebook_id)
+        
+        results = []
+        for hit in self.content_index.search(query, kinds=kinds, filters=filters, limit=limit):
+            result = {'kind': hit.kind, 'id': hit.item_id, 'score': round(hit.score, 4)}
+            if hit.kind == 'exhibit':
+                exhibit = self.exhibit_manager.exhibits[hit.item_id]
+                result.update(exhibit_number=exhibit.exhibit_number, title=exhibit.title,
+                              status=exhibit.status.value)
+            elif hit.kind == 'evidence':
+                evidence = self.evidence_manager.evidence_items[hit.item_id]
+                result.update(title=evidence.title, type=evidence.evidence_type.value,
+                              exhibit_number=evidence.exhibit_number)
+            elif hit.kind == 'witness':
+                witness = self.witness_manager.witnesses[hit.item_id]
+                result.update(name=witness.name, type=witness.witness_type.value)
+            else:
+                result.update({name: value for name, value in hit.attributes.items()})
+            results.append(result)
+        
+        return results
+    
     def _process_critical_update(self, update: SystemUpdate) -> bool:
         """Process critical updates immediately."""
         if update.event_type == IntegrationEvent.TRIAL_DAY_STARTED:
@@ -0,0 +1,235 @@
+"""
+Trial Content Index
+
+One in-memory inverted index over trial content: notebook day notes, witness
+names and profiles, exhibit numbers and descriptions, and evidence items.
+Text is split into word tokens. Exhibit numbers such as ``P-12`` are also
+kept whole, alongside their parts. Query tokens match whole tokens or token
+prefixes, so ``depo`` finds ``deposition``. Items are re-indexed one at a
+time as they are added or edited. Queries can be restricted by item kind and
+by attribute filters, and are ranked by weighted term frequency and
+inverse document frequency.
+"""
+
+import bisect
+import heapq
+import logging
+import math
+import re
+from dataclasses import dataclass, field
+from operator import itemgetter
+from typing import Any, Dict, Iterable, List, Optional
+
+# Words, with exhibit-number style joins ("p-12", "ex.4a", "o'brien") kept together
+TOKEN_PATTERN = re.compile(r"[^\W_]+(?:[-./'][^\W_]+)*")
+TOKEN_SPLIT = re.compile(r"[-./']")
+
+# Prefix matches count for less than the whole token
+PREFIX_MATCH_WEIGHT = 0.6
+
+DEFAULT_FIELD_WEIGHTS = {
+    'exhibit_number': 4.0,
+    'name': 3.0,
+    'title': 3.0,
+    'description': 1.5,
+    'tags': 1.5,
+}
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased tokens of ``text``; joined tokens are followed by their parts."""
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        tokens.append(token)
+        if not token.isalnum():
+            tokens.extend(part for part in TOKEN_SPLIT.split(token) if part)
+    return tokens
+
+
+@dataclass
+class IndexedItem:
+    """What the index holds for one item."""
+    kind: str
+    item_id: str
+    term_weights: Dict[str, float]
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    boost: float = 1.0
+
+
+@dataclass
+class ContentHit:
+    """One ranked search result."""
+    kind: str
+    item_id: str
+    score: float
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+
+class TrialContentIndex:
+    """Incrementally maintained inverted index with prefix search and attribute filters."""
+
+    def __init__(self, field_weights: Optional[Dict[str, float]] = None):
+        self.field_weights = dict(DEFAULT_FIELD_WEIGHTS, **(field_weights or {}))
+        # Items and postings are kept per kind so a search only touches the kinds it asks for
+        self.items: Dict[str, Dict[str, IndexedItem]] = {}
+        self.postings: Dict[str, Dict[str, Dict[str, float]]] = {}  # token -> kind -> item_id -> weight
+        self.vocabulary: List[str] = []  # Sorted, for prefix lookups
+        self.logger = logging.getLogger(__name__ + ".TrialContentIndex")
+
+    def __len__(self) -> int:
+        return sum(len(items) for items in self.items.values())
+
+    def index_item(self, kind: str, item_id: str, fields: Dict[str, Any],
+                   attributes: Optional[Dict[str, Any]] = None, boost: float = 1.0) -> None:
+        """Add or replace an item. Field values may be strings or lists of strings."""
+        term_weights: Dict[str, float] = {}
+        for field_name, value in fields.items():
+            if not value:
+                continue
+            if not isinstance(value, str):
+                value = " ".join(str(part) for part in value if part)
+            weight = self.field_weights.get(field_name, 1.0)
+            for token in tokenize(value):
+                term_weights[token] = term_weights.get(token, 0.0) + weight
+
+        items = self.items.setdefault(kind, {})
+        previous = items.get(item_id)
+        if previous:
+            for token in previous.term_weights.keys() - term_weights.keys():
+                self._remove_posting(token, kind, item_id)
+
+        for token, weight in term_weights.items():
+            postings = self.postings.get(token)
+            if postings is None:
+                postings = self.postings[token] = {}
+                bisect.insort(self.vocabulary, token)
+            postings.setdefault(kind, {})[item_id] = weight
+
+        items[item_id] = IndexedItem(kind, item_id, term_weights, dict(attributes or {}), boost)
+
+    def remove_item(self, kind: str, item_id: str) -> bool:
+        """Drop an item from the index."""
+        item = self.items.get(kind, {}).pop(item_id, None)
+        if not item:
+            return False
+        for token in item.term_weights:
+            self._remove_posting(token, kind, item_id)
+        return True
+
+    def contains(self, kind: str, item_id: str) -> bool:
+        return item_id in self.items.get(kind, {})
+
+    def search(self, query: str, kinds: Optional[Iterable[str]] = None,
+               filters: Optional[Dict[str, Any]] = None,
+               limit: Optional[int] = None) -> List[ContentHit]:
+        """
+        Items matching every query token, as a whole token or a prefix, best
+        first. Filter keys ending in ``_min`` or ``_max`` bound the attribute
+        without the suffix, ``date_from`` and ``date_to`` bound ``date``, and
+        other keys must equal the attribute (or be one of a list or set of
+        values). An empty query matches every item of the requested kinds.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        item_count = len(self) or 1
+
+        hits = []
+        for kind in (kinds if kinds is not None else list(self.items)):
+            items = self.items.get(kind)
+            if not items:
+                continue
+            if terms:
+                # Match the rarest term first so later terms only score its candidates
+                term_matches = sorted((self._matches(term, kind, item_count) for term in terms), key=len)
+                scores = term_matches[0]
+                for matches in term_matches[1:]:
+                    if not scores:
+                        break
+                    scores = {item_id: score + matches[item_id]
+                              for item_id, score in scores.items() if item_id in matches}
+            else:
+                scores = dict.fromkeys(items, 0.0)
+
+            for item_id, score in scores.items():
+                item = items[item_id]
+                if filters and not self._passes(item.attributes, filters):
+                    continue
+                hits.append((score * item.boost, item))
+
+        # Rank plain tuples and only build hits for what is returned
+        if limit is not None:
+            ranked = heapq.nlargest(limit, hits, key=itemgetter(0))
+        else:
+            ranked = sorted(hits, key=itemgetter(0), reverse=True)
+        return [ContentHit(item.kind, item.item_id, score, item.attributes) for score, item in ranked]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'items': len(self),
+            'items_by_kind': {kind: len(items) for kind, items in self.items.items() if items},
+            'vocabulary_size': len(self.vocabulary),
+            'postings': sum(len(kind_postings) for postings in self.postings.values()
+                            for kind_postings in postings.values())
+        }
+
+    def _matches(self, term: str, kind: str, item_count: int) -> Dict[str, float]:
+        """Score of every item of ``kind`` containing ``term`` or a token starting with it."""
+        matches: Dict[str, float] = {}
+        start = bisect.bisect_left(self.vocabulary, term)
+        for position in range(start, len(self.vocabulary)):
+            token = self.vocabulary[position]
+            if not token.startswith(term):
+                break
+            postings = self.postings[token]
+            kind_postings = postings.get(kind)
+            if not kind_postings:
+                continue
+            # Document frequency is counted across all kinds so scores compare between them
+            weight = math.log(1 + item_count / sum(len(ids) for ids in postings.values()))
+            if token != term:
+                weight *= PREFIX_MATCH_WEIGHT
+            for item_id, term_weight in kind_postings.items():
+                score = weight * term_weight
+                # An item matching through several tokens scores by its best one
+                if score > matches.get(item_id, 0.0):
+                    matches[item_id] = score
+        return matches
+
+    def _remove_posting(self, token: str, kind: str, item_id: str) -> None:
+        postings = self.postings.get(token)
+        if postings is None:
+            return
+        kind_postings = postings.get(kind)
+        if kind_postings is not None:
+            kind_postings.pop(item_id, None)
+            if not kind_postings:
+                del postings[kind]
+        if not postings:
+            del self.postings[token]
+            position = bisect.bisect_left(self.vocabulary, token)
+            if position < len(self.vocabulary) and self.vocabulary[position] == token:
+                del self.vocabulary[position]
+
+    @staticmethod
+    def _passes(attributes: Dict[str, Any], filters: Dict[str, Any]) -> bool:
+        for name, expected in filters.items():
+            if name == 'date_from':
+                value = attributes.get('date')
+                if value is None or value < expected:
+                    return False
+            elif name == 'date_to':
+                value = attributes.get('date')
+                if value is None or value > expected:
+                    return False
+            elif name.endswith('_min'):
+                value = attributes.get(name[:-4])
+                if value is None or value < expected:
+                    return False
+            elif name.endswith('_max'):
+                value = attributes.get(name[:-4])
+                if value is None or value > expected:
+                    return False
+            elif isinstance(expected, (list, tuple, set, frozenset)):
+                if attributes.get(name) not in expected:
+                    return False
+            elif attributes.get(name) != expected:
+                return False
+        return True
@@ -15,8 +15,13 @@ import json
 import logging
 from pathlib import Path
 
+from .trial_content_index import TrialContentIndex
+
 logger = logging.getLogger(__name__)
 
+# search_witnesses filters answered by the content index
+WITNESS_FILTERS = ('witness_type', 'status', 'credibility_min', 'preparation_status')
+
 class WitnessType(Enum):
     """Types of witnesses in legal proceedings."""
     FACT_WITNESS = "fact_witness"
@@ -793,12 +798,13 @@ class PreparationManager:
 class WitnessManager:
     """Main witness management system coordinating all components."""
     
-    def __init__(self):
+    def __init__(self, content_index: Optional[TrialContentIndex] = None):
         self.witnesses: Dict[str, WitnessProfile] = {}
         self.preparations: Dict[str, WitnessPreparation] = {}
         self.testimony_outlines: Dict[str, TestimonyOutline] = {}
         self.analyzer = WitnessAnalyzer()
         self.preparation_manager = PreparationManager()
+        self.content_index = content_index if content_index is not None else TrialContentIndex()
         self.logger = logging.getLogger(__name__ + ".WitnessManager")
     
     def add_witness(self, witness: WitnessProfile) -> str:
@@ -807,9 +813,17 @@ class WitnessManager:
             witness.witness_id = str(uuid.uuid4())
         
         self.witnesses[witness.witness_id] = witness
+        self._index_witness(witness)
         self.logger.info(f"Added witness: {witness.witness_id} - {witness.name}")
         return witness.witness_id
     
+    def reindex_witness(self, witness_id: str) -> bool:
+        """Refresh a witness's search entry after editing the profile directly."""
+        if witness_id not in self.witnesses:
+            return False
+        self._index_witness(self.witnesses[witness_id])
+        return True
+    
     def create_testimony_outline(self, witness_id: str, testimony_type: TestimonyType,
                                key_points: List[str], supporting_evidence: List[str]) -> str:
         """Create testimony outline for witness."""
@@ -850,6 +864,7 @@ class WitnessManager:
         # Update witness status
         witness.preparation_status = PreparationStatus.IN_PROGRESS
         witness.last_modified = datetime.now()
+        self._index_witness(witness)
         
         self.logger.info(f"Started preparation for witness {witness_id}")
         return preparation.preparation_id
@@ -1006,31 +1021,30 @@ class WitnessManager:
         return report
     
     def search_witnesses(self, query: str, filters: Optional[Dict[str, Any]] = None) -> List[WitnessProfile]:
-        """Search witnesses by various criteria."""
-        results = []
-        query_lower = query.lower()
-        
-        for witness in self.witnesses.values():
-            # Text search in name, occupation, and case relevance
-            searchable_text = (
-                f"{witness.name} {witness.occupation or ''} " +
-                f"{witness.relationship_to_case} {witness.knowledge_of_facts} " +
-                f"{' '.join(witness.notes)}"
-            ).lower()
-            
-            if query_lower in searchable_text:
-                # Apply filters if provided
-                if filters:
-                    if 'witness_type' in filters and witness.witness_type != filters['witness_type']:
-                        continue
-                    if 'status' in filters and witness.status != filters['status']:
-                        continue
-                    if 'credibility_min' in filters and witness.credibility_level.value < filters['credibility_min']:
-                        continue
-                    if 'preparation_status' in filters and witness.preparation_status != filters['preparation_status']:
-                        continue
-                
-                results.append(witness)
-        
-        # Sort by strategic value and credibility
-        return sorted(results, key=lambda x: (x.strategic_value, x.credibility_level.value), reverse=True)
\ No newline at end of file
+        """Search witnesses by name, occupation, case relevance and notes; words match by prefix."""
+        index_filters = {name: value for name, value in (filters or {}).items() if name in WITNESS_FILTERS}
+        hits = self.content_index.search(query, kinds=['witness'], filters=index_filters)
+        results = [self.witnesses[hit.item_id] for hit in hits if hit.item_id in self.witnesses]
+        
+        # Sort by strategic value and credibility, best text matches first within each
+        return sorted(results, key=lambda x: (x.strategic_value, x.credibility_level.value), reverse=True)
+    
+    def _index_witness(self, witness: WitnessProfile) -> None:
+        """Update the witness's entry in the content index."""
+        self.content_index.index_item(
+            'witness',
+            witness.witness_id,
+            {
+                'name': witness.name,
+                'occupation': witness.occupation,
+                'relationship_to_case': witness.relationship_to_case,
+                'knowledge_of_facts': witness.knowledge_of_facts,
+                'notes': witness.notes
+            },
+            attributes={
+                'witness_type': witness.witness_type,
+                'status': witness.status,
+                'credibility': witness.credibility_level.value,
+                'preparation_status': witness.preparation_status
+            }
+        )
@@ -26,6 +26,12 @@ from .builder import (
     get_workflow_endpoints,
     initialize_workflow_system
 )
+from .runtime import (
+    CompiledWorkflow,
+    SQLiteCheckpointStore,
+    WorkflowCycleError,
+    WorkflowRuntime
+)
 
 __all__ = [
     "WorkflowBuilder",
@@ -48,5 +54,9 @@ __all__ = [
     "ApprovalResponseModel",
     "workflow_builder",
     "get_workflow_endpoints",
-    "initialize_workflow_system"
+    "initialize_workflow_system",
+    "CompiledWorkflow",
+    "SQLiteCheckpointStore",
+    "WorkflowCycleError",
+    "WorkflowRuntime"
 ]
\ No newline at end of file
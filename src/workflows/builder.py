@@ -14,6 +14,9 @@ import uuid
 import asyncio
 from collections import defaultdict
 import re
+import os
+
+from .runtime import CompiledWorkflow, SQLiteCheckpointStore, WorkflowRuntime
 
 
 class NodeType(Enum):
@@ -30,6 +33,8 @@ class NodeType(Enum):
     NOTIFICATION = "notification"
     DATA_TRANSFORMATION = "data_transformation"
     INTEGRATION = "integration"
+    PARALLEL = "parallel"
+    JOIN = "join"
 
 
 class WorkflowStatus(Enum):
@@ -110,9 +115,9 @@ class WorkflowTrigger:
 class WorkflowDefinition:
     workflow_id: str
     name: str
-    description: Optional[str] = None
     firm_id: str
     created_by: str
+    description: Optional[str] = None
     status: WorkflowStatus = WorkflowStatus.DRAFT
     version: int = 1
     nodes: Dict[str, WorkflowNode] = field(default_factory=dict)
@@ -157,15 +162,38 @@ class ApprovalRequest:
     response_message: Optional[str] = None
 
 
+# Concurrent nodes allowed per type across all executions; other types use
+# the runtime default
+DEFAULT_CONCURRENCY_LIMITS = {
+    NodeType.WEBHOOK: 8,
+    NodeType.INTEGRATION: 4,
+    NodeType.EMAIL: 8,
+    NodeType.DOCUMENT_GENERATION: 2,
+    NodeType.NOTIFICATION: 16,
+}
+
+
 class WorkflowBuilder:
     """Advanced workflow builder with drag-and-drop capabilities"""
 
-    def __init__(self):
+    def __init__(
+        self,
+        checkpoint_store: Optional[SQLiteCheckpointStore] = None,
+        concurrency_limits: Optional[Dict[NodeType, int]] = None
+    ):
         self.workflows: Dict[str, WorkflowDefinition] = {}
         self.executions: Dict[str, WorkflowExecution] = {}
         self.approval_requests: Dict[str, ApprovalRequest] = {}
         self.node_processors = self._initialize_node_processors()
         self.running_executions: Dict[str, asyncio.Task] = {}
+        self._checkpoint_store = checkpoint_store
+        self._compiled: Dict[str, tuple] = {}
+        self._execution_graphs: Dict[str, CompiledWorkflow] = {}
+        self.runtime = WorkflowRuntime(
+            self._process_node,
+            self._evaluate_condition,
+            concurrency_limits={**DEFAULT_CONCURRENCY_LIMITS, **(concurrency_limits or {})}
+        )
 
     def _initialize_node_processors(self) -> Dict[NodeType, Callable]:
         """Initialize node processing functions"""
@@ -182,9 +210,29 @@ class WorkflowBuilder:
             NodeType.DOCUMENT_GENERATION: self._process_document_generation_node,
             NodeType.NOTIFICATION: self._process_notification_node,
             NodeType.DATA_TRANSFORMATION: self._process_data_transformation_node,
-            NodeType.INTEGRATION: self._process_integration_node
+            NodeType.INTEGRATION: self._process_integration_node,
+            NodeType.PARALLEL: self._process_parallel_node,
+            NodeType.JOIN: self._process_join_node
         }
 
+    @property
+    def checkpoint_store(self) -> SQLiteCheckpointStore:
+        """Checkpoint store, opened on first use"""
+        if self._checkpoint_store is None:
+            self._checkpoint_store = SQLiteCheckpointStore(
+                os.getenv("WORKFLOW_CHECKPOINT_DB", "storage/workflows/checkpoints.db")
+            )
+        return self._checkpoint_store
+
+    def _compile(self, workflow: WorkflowDefinition) -> CompiledWorkflow:
+        """Compiled DAG for the workflow, rebuilt whenever the definition changes"""
+        cached = self._compiled.get(workflow.workflow_id)
+        if cached and cached[0] == (workflow.version, workflow.updated_at):
+            return cached[1]
+        compiled = CompiledWorkflow.compile(workflow)
+        self._compiled[workflow.workflow_id] = ((workflow.version, workflow.updated_at), compiled)
+        return compiled
+
     async def create_workflow(
         self,
         name: str,
@@ -260,6 +308,10 @@ class WorkflowBuilder:
         elif node_type == NodeType.CONDITION:
             node.inputs = ["input"]
             node.outputs = ["true", "false"]
+        elif node_type == NodeType.JOIN:
+            node.inputs = ["input"]
+            node.outputs = ["output"]
+            node.config.setdefault("mode", "all")
         else:
             node.inputs = ["input"]
             node.outputs = ["output"]
@@ -386,30 +438,8 @@ class WorkflowBuilder:
 
     def _check_circular_dependencies(self, workflow: WorkflowDefinition):
         """Check for circular dependencies in workflow"""
-        visited = set()
-        rec_stack = set()
-
-        def has_cycle(node_id):
-            visited.add(node_id)
-            rec_stack.add(node_id)
-
-            # Get connected nodes
-            for conn in workflow.connections.values():
-                if conn.source_node_id == node_id:
-                    target = conn.target_node_id
-                    if target not in visited:
-                        if has_cycle(target):
-                            return True
-                    elif target in rec_stack:
-                        return True
-
-            rec_stack.remove(node_id)
-            return False
-
-        for node_id in workflow.nodes.keys():
-            if node_id not in visited:
-                if has_cycle(node_id):
-                    raise ValueError("Circular dependency detected in workflow")
+        # Compilation orders the graph and raises WorkflowCycleError on a cycle
+        self._compile(workflow)
 
     async def _validate_node_config(self, node: WorkflowNode) -> List[str]:
         """Validate individual node configuration"""
@@ -437,6 +467,10 @@ class WorkflowBuilder:
             if not node.config.get("duration"):
                 errors.append(f"Delay node '{node.name}' missing duration")
 
+        elif node.node_type == NodeType.JOIN:
+            if node.config.get("mode", "all") not in ("all", "any"):
+                errors.append(f"Join node '{node.name}' mode must be 'all' or 'any'")
+
         return errors
 
     async def execute_workflow(
@@ -482,57 +516,172 @@ class WorkflowBuilder:
 
         return execution
 
-    async def _execute_workflow_async(self, execution: WorkflowExecution):
-        """Execute workflow asynchronously"""
+    async def _execute_workflow_async(
+        self,
+        execution: WorkflowExecution,
+        compiled: Optional[CompiledWorkflow] = None,
+        steps: List[Any] = ()
+    ):
+        """Execute workflow asynchronously
+
+        Ready nodes run concurrently and every finished node is checkpointed.
+        `compiled` and `steps` are supplied when resuming from a checkpoint.
+        """
 
+        store = self.checkpoint_store
         try:
             execution.status = ExecutionStatus.IN_PROGRESS
-            execution.started_at = datetime.now()
-
-            workflow = self.workflows[execution.workflow_id]
-
-            # Find start node
-            start_nodes = [n for n in workflow.nodes.values() if n.node_type == NodeType.START]
-            if not start_nodes:
-                raise ValueError("No start node found")
-
-            current_node = start_nodes[0]
-            execution.current_node_id = current_node.node_id
-
-            # Execute nodes
-            while current_node:
-                # Process current node
-                result = await self._process_node(execution, current_node)
-
-                # Record node execution
-                execution.node_executions[current_node.node_id] = {
-                    "status": "completed",
-                    "result": result,
-                    "executed_at": datetime.now().isoformat()
-                }
-
-                # Determine next node
-                next_node = await self._get_next_node(execution, current_node, result)
-
-                if next_node:
-                    execution.current_node_id = next_node.node_id
-                    current_node = next_node
-                else:
-                    break
+            execution.started_at = execution.started_at or datetime.now()
+
+            if compiled is None:
+                workflow = self.workflows[execution.workflow_id]
+                compiled = self._compile(workflow)
+                if not any(n.node_type == NodeType.START for n in compiled.nodes):
+                    raise ValueError("No start node found")
+
+                store.begin(
+                    execution.execution_id,
+                    workflow.workflow_id,
+                    execution.workflow_version,
+                    self._snapshot_workflow(workflow),
+                    {
+                        "triggered_by": execution.triggered_by,
+                        "trigger_data": execution.trigger_data,
+                        "started_at": execution.started_at,
+                        "created_at": execution.created_at
+                    },
+                    execution.context
+                )
+
+            self._execution_graphs[execution.execution_id] = compiled
+            await self.runtime.run(compiled, execution, store, steps)
 
             execution.status = ExecutionStatus.COMPLETED
             execution.completed_at = datetime.now()
 
+        except asyncio.CancelledError:
+            # Checkpoint stays in progress so the run resumes after restart
+            raise
+
         except Exception as e:
             execution.status = ExecutionStatus.FAILED
             execution.errors.append(str(e))
             execution.completed_at = datetime.now()
 
         finally:
+            if execution.status in (ExecutionStatus.COMPLETED, ExecutionStatus.FAILED):
+                store.finish(execution.execution_id, execution.status.value, execution.errors, execution.context)
+
             # Clean up running execution
+            self._execution_graphs.pop(execution.execution_id, None)
             if execution.execution_id in self.running_executions:
                 del self.running_executions[execution.execution_id]
 
+    async def resume_execution(self, execution_id: str) -> WorkflowExecution:
+        """Resume an interrupted execution from its checkpoint
+
+        Runs against the definition snapshot taken when the execution started;
+        nodes that had finished are not executed again.
+        """
+
+        if execution_id in self.running_executions:
+            return self.executions[execution_id]
+
+        checkpoint = self.checkpoint_store.load(execution_id)
+        if checkpoint is None:
+            raise ValueError(f"No checkpoint found for execution {execution_id}")
+        if checkpoint["status"] not in (ExecutionStatus.IN_PROGRESS.value, ExecutionStatus.WAITING_APPROVAL.value):
+            raise ValueError(f"Execution {execution_id} is already {checkpoint['status']}")
+
+        workflow = self._workflow_from_snapshot(checkpoint["definition"])
+        details = checkpoint["execution"]
+
+        execution = self.executions.get(execution_id)
+        if execution is None:
+            execution = WorkflowExecution(
+                execution_id=execution_id,
+                workflow_id=checkpoint["workflow_id"],
+                workflow_version=checkpoint["workflow_version"],
+                triggered_by=details.get("triggered_by"),
+                trigger_data=details.get("trigger_data", {}),
+                started_at=datetime.fromisoformat(details["started_at"]) if details.get("started_at") else None,
+                created_at=datetime.fromisoformat(details["created_at"]) if details.get("created_at") else datetime.now()
+            )
+            self.executions[execution_id] = execution
+
+        execution.context = checkpoint["context"]
+        execution.errors = list(checkpoint["errors"])
+        execution.node_executions = {}
+
+        task = asyncio.create_task(
+            self._execute_workflow_async(execution, CompiledWorkflow.compile(workflow), checkpoint["steps"])
+        )
+        self.running_executions[execution_id] = task
+        return execution
+
+    async def resume_incomplete_executions(self) -> List[str]:
+        """Resume every checkpointed execution left unfinished by a previous process"""
+
+        resumed = []
+        for execution_id in self.checkpoint_store.unfinished():
+            try:
+                await self.resume_execution(execution_id)
+                resumed.append(execution_id)
+            except ValueError as e:
+                print(f"Could not resume workflow execution {execution_id}: {e}")
+        return resumed
+
+    def _snapshot_workflow(self, workflow: WorkflowDefinition) -> Dict[str, Any]:
+        """Serializable copy of the parts of a definition needed to resume a run"""
+        return {
+            "workflow_id": workflow.workflow_id,
+            "name": workflow.name,
+            "firm_id": workflow.firm_id,
+            "created_by": workflow.created_by,
+            "version": workflow.version,
+            "nodes": [
+                {
+                    "node_id": node.node_id,
+                    "node_type": node.node_type.value,
+                    "name": node.name,
+                    "config": node.config
+                }
+                for node in workflow.nodes.values()
+            ],
+            "connections": [
+                {
+                    "connection_id": conn.connection_id,
+                    "source_node_id": conn.source_node_id,
+                    "target_node_id": conn.target_node_id,
+                    "source_output": conn.source_output,
+                    "target_input": conn.target_input,
+                    "condition": conn.condition
+                }
+                for conn in workflow.connections.values()
+            ]
+        }
+
+    def _workflow_from_snapshot(self, snapshot: Dict[str, Any]) -> WorkflowDefinition:
+        """Rebuild a definition from a checkpoint snapshot"""
+        workflow = WorkflowDefinition(
+            workflow_id=snapshot["workflow_id"],
+            name=snapshot["name"],
+            firm_id=snapshot["firm_id"],
+            created_by=snapshot["created_by"],
+            status=WorkflowStatus.ACTIVE,
+            version=snapshot["version"]
+        )
+        for data in snapshot["nodes"]:
+            workflow.nodes[data["node_id"]] = WorkflowNode(
+                node_id=data["node_id"],
+                node_type=NodeType(data["node_type"]),
+                name=data["name"],
+                config=data["config"]
+            )
+        for data in snapshot["connections"]:
+            workflow.connections[data["connection_id"]] = WorkflowConnection(**data)
+        return workflow
+
     async def _process_node(
         self,
         execution: WorkflowExecution,
@@ -546,37 +695,6 @@ class WorkflowBuilder:
 
         return await processor(execution, node)
 
-    async def _get_next_node(
-        self,
-        execution: WorkflowExecution,
-        current_node: WorkflowNode,
-        result: Dict[str, Any]
-    ) -> Optional[WorkflowNode]:
-        """Determine the next node to execute"""
-
-        workflow = self.workflows[execution.workflow_id]
-
-        # Find connections from current node
-        connections = [
-            conn for conn in workflow.connections.values()
-            if conn.source_node_id == current_node.node_id
-        ]
-
-        for connection in connections:
-            # Check connection conditions
-            if connection.condition:
-                if not await self._evaluate_condition(connection.condition, execution.context, result):
-                    continue
-
-            # Check output matching
-            result_output = result.get("output", "output")
-            if connection.source_output != result_output:
-                continue
-
-            return workflow.nodes[connection.target_node_id]
-
-        return None
-
     async def _evaluate_condition(
         self,
         condition: Dict[str, Any],
@@ -893,6 +1011,36 @@ class WorkflowBuilder:
             "integration_type": integration_type
         }
 
+    async def _process_parallel_node(
+        self,
+        execution: WorkflowExecution,
+        node: WorkflowNode
+    ) -> Dict[str, Any]:
+        """Process parallel node; every outgoing connection runs concurrently"""
+        return {"output": "output", "status": "forked"}
+
+    async def _process_join_node(
+        self,
+        execution: WorkflowExecution,
+        node: WorkflowNode
+    ) -> Dict[str, Any]:
+        """Process join node; scheduled once its incoming branches have resolved"""
+
+        graph = self._execution_graphs.get(execution.execution_id)
+        branches = []
+        if graph:
+            branches = [
+                node_id for node_id in graph.predecessors(node.node_id)
+                if node_id in execution.node_executions
+            ]
+
+        return {
+            "output": "output",
+            "status": "joined",
+            "mode": node.config.get("mode", "all"),
+            "branches": branches
+        }
+
     def _process_template(self, template: str, context: Dict[str, Any]) -> str:
         """Process template with context variables"""
         if not template:
@@ -941,9 +1089,7 @@ class WorkflowBuilder:
         if execution_id in self.executions:
             execution = self.executions[execution_id]
             if execution.status == ExecutionStatus.WAITING_APPROVAL:
-                # Resume execution
-                task = asyncio.create_task(self._resume_workflow_execution(execution, approval))
-                self.running_executions[execution_id] = task
+                await self._resume_workflow_execution(execution, approval)
 
     async def _resume_workflow_execution(
         self,
@@ -952,8 +1098,6 @@ class WorkflowBuilder:
     ):
         """Resume workflow execution after approval"""
 
-        execution.status = ExecutionStatus.IN_PROGRESS
-
         # Update node execution result
         if approval.node_id in execution.node_executions:
             execution.node_executions[approval.node_id]["approval_result"] = {
@@ -961,30 +1105,11 @@ class WorkflowBuilder:
                 "message": approval.response_message
             }
 
-        # Continue execution from current node
-        workflow = self.workflows[execution.workflow_id]
-        current_node = workflow.nodes.get(execution.current_node_id)
-
-        if current_node:
-            # Get result from node execution
-            node_result = execution.node_executions.get(current_node.node_id, {}).get("result", {})
-
-            # Find next node
-            next_node = await self._get_next_node(execution, current_node, node_result)
-
-            # Continue execution
-            while next_node:
-                result = await self._process_node(execution, next_node)
-                execution.node_executions[next_node.node_id] = {
-                    "status": "completed",
-                    "result": result,
-                    "executed_at": datetime.now().isoformat()
-                }
-
-                next_node = await self._get_next_node(execution, next_node, result)
-
-        execution.status = ExecutionStatus.COMPLETED
-        execution.completed_at = datetime.now()
+        if execution.execution_id in self.running_executions:
+            # Other branches kept running; the scheduler carries on from here
+            execution.status = ExecutionStatus.IN_PROGRESS
+        else:
+            await self.resume_execution(execution.execution_id)
 
     async def get_workflow_analytics(self, workflow_id: str) -> Dict[str, Any]:
         """Get workflow analytics"""
@@ -1300,5 +1425,9 @@ async def initialize_workflow_system():
     print("✓ Node processors configured")
     print("✓ Execution engine ready")
     print("✓ Approval system active")
+
+    resumed = await workflow_builder.resume_incomplete_executions()
+    if resumed:
+        print(f"✓ Resumed {len(resumed)} interrupted workflow executions")
     print(f"✓ Sample workflow created: {sample_workflow.name}")
     print("🔄 Custom workflow builder system ready!")
\ No newline at end of file
@@ -0,0 +1,362 @@
+"""
+Workflow Runtime
+Executes workflow definitions as compiled DAGs: ready nodes run concurrently
+under per-node-type limits, branches fan out and join, and progress is
+checkpointed after every node so interrupted runs resume where they stopped.
+"""
+
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+from dataclasses import dataclass, field
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+import asyncio
+import json
+import sqlite3
+import time
+
+# Node type values the scheduler treats specially (see NodeType in builder)
+START_NODE = "start"
+JOIN_NODE = "join"
+
+DEFAULT_CONCURRENCY = 64
+
+WAITING, RUNNING, DONE, SKIPPED = range(4)
+
+
+class WorkflowCycleError(ValueError):
+    """Raised when a workflow's connections contain a cycle"""
+
+    def __init__(self, message: str, node_ids: List[str]):
+        super().__init__(message)
+        self.node_ids = node_ids
+
+
+@dataclass
+class CompiledEdge:
+    connection_id: str
+    source: int
+    target: int
+    source_output: str
+    condition: Optional[Dict[str, Any]] = None
+
+
+@dataclass
+class CompiledWorkflow:
+    """Adjacency-indexed form of a workflow definition"""
+
+    workflow_id: str
+    version: int
+    nodes: List[Any]
+    index: Dict[str, int]
+    out_edges: List[List[CompiledEdge]]
+    in_edges: List[List[CompiledEdge]]
+    order: List[int]
+    join_any: List[bool] = field(default_factory=list)
+
+    @classmethod
+    def compile(cls, workflow) -> "CompiledWorkflow":
+        """Index nodes and connections and topologically order them"""
+        nodes = list(workflow.nodes.values())
+        index = {node.node_id: i for i, node in enumerate(nodes)}
+        out_edges: List[List[CompiledEdge]] = [[] for _ in nodes]
+        in_edges: List[List[CompiledEdge]] = [[] for _ in nodes]
+
+        for conn in workflow.connections.values():
+            source = index.get(conn.source_node_id)
+            target = index.get(conn.target_node_id)
+            if source is None or target is None:
+                continue
+            edge = CompiledEdge(conn.connection_id, source, target, conn.source_output, conn.condition)
+            out_edges[source].append(edge)
+            in_edges[target].append(edge)
+
+        # Kahn's algorithm; anything left over sits on or behind a cycle
+        remaining = [len(edges) for edges in in_edges]
+        queue = deque(i for i, count in enumerate(remaining) if count == 0)
+        order = []
+        while queue:
+            i = queue.popleft()
+            order.append(i)
+            for edge in out_edges[i]:
+                remaining[edge.target] -= 1
+                if remaining[edge.target] == 0:
+                    queue.append(edge.target)
+
+        if len(order) < len(nodes):
+            stuck = [nodes[i].node_id for i, count in enumerate(remaining) if count]
+            raise WorkflowCycleError("Circular dependency detected in workflow", stuck)
+
+        join_any = [
+            node.node_type.value == JOIN_NODE and node.config.get("mode", "all") == "any"
+            for node in nodes
+        ]
+        return cls(
+            workflow_id=workflow.workflow_id,
+            version=workflow.version,
+            nodes=nodes,
+            index=index,
+            out_edges=out_edges,
+            in_edges=in_edges,
+            order=order,
+            join_any=join_any,
+        )
+
+    def predecessors(self, node_id: str) -> List[str]:
+        return [self.nodes[edge.source].node_id for edge in self.in_edges[self.index[node_id]]]
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if hasattr(value, "value"):
+        return value.value
+    return str(value)
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, default=_json_default, separators=(",", ":"))
+
+
+class SQLiteCheckpointStore:
+    """Durable execution checkpoints in a local SQLite database
+
+    Each run has one row holding the definition snapshot and latest context,
+    plus an append-only step per finished node recording its result and which
+    outgoing connections it took. Replaying the steps rebuilds the scheduler
+    state, so a resumed run only executes nodes that had not finished.
+    """
+
+    def __init__(self, path: str = "storage/workflows/checkpoints.db", synchronous: str = "NORMAL"):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(f"PRAGMA synchronous={synchronous}")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS workflow_runs (
+                execution_id TEXT PRIMARY KEY,
+                workflow_id TEXT NOT NULL,
+                workflow_version INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                definition TEXT NOT NULL,
+                execution TEXT NOT NULL,
+                context TEXT NOT NULL,
+                errors TEXT NOT NULL DEFAULT '[]',
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS workflow_runs_status ON workflow_runs (status);
+            CREATE TABLE IF NOT EXISTS workflow_run_steps (
+                execution_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                node_id TEXT NOT NULL,
+                entry TEXT NOT NULL,
+                taken TEXT NOT NULL,
+                PRIMARY KEY (execution_id, seq)
+            );
+            """
+        )
+
+    def begin(self, execution_id: str, workflow_id: str, version: int,
+              definition: Dict[str, Any], execution: Dict[str, Any], context: Dict[str, Any]):
+        self._conn.execute(
+            "INSERT INTO workflow_runs (execution_id, workflow_id, workflow_version, status, definition,"
+            " execution, context, updated_at) VALUES (?, ?, ?, 'in_progress', ?, ?, ?, ?)"
+            " ON CONFLICT (execution_id) DO UPDATE SET status = 'in_progress', updated_at = excluded.updated_at",
+            (execution_id, workflow_id, version, _dumps(definition), _dumps(execution),
+             _dumps(context), time.time()),
+        )
+
+    def record_step(self, execution_id: str, node_id: str, entry: Dict[str, Any],
+                    taken: List[str], context: Dict[str, Any]):
+        with self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.execute(
+                "INSERT INTO workflow_run_steps (execution_id, seq, node_id, entry, taken)"
+                " SELECT ?, COALESCE(MAX(seq), 0) + 1, ?, ?, ? FROM workflow_run_steps WHERE execution_id = ?",
+                (execution_id, node_id, _dumps(entry), _dumps(taken), execution_id),
+            )
+            self._conn.execute(
+                "UPDATE workflow_runs SET context = ?, updated_at = ? WHERE execution_id = ?",
+                (_dumps(context), time.time(), execution_id),
+            )
+
+    def finish(self, execution_id: str, status: str, errors: List[str], context: Dict[str, Any]):
+        self._conn.execute(
+            "UPDATE workflow_runs SET status = ?, errors = ?, context = ?, updated_at = ? WHERE execution_id = ?",
+            (status, _dumps(errors), _dumps(context), time.time(), execution_id),
+        )
+
+    def load(self, execution_id: str) -> Optional[Dict[str, Any]]:
+        row = self._conn.execute(
+            "SELECT workflow_id, workflow_version, status, definition, execution, context, errors"
+            " FROM workflow_runs WHERE execution_id = ?", (execution_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        steps = self._conn.execute(
+            "SELECT node_id, entry, taken FROM workflow_run_steps WHERE execution_id = ? ORDER BY seq",
+            (execution_id,),
+        ).fetchall()
+        return {
+            "execution_id": execution_id,
+            "workflow_id": row[0],
+            "workflow_version": row[1],
+            "status": row[2],
+            "definition": json.loads(row[3]),
+            "execution": json.loads(row[4]),
+            "context": json.loads(row[5]),
+            "errors": json.loads(row[6]),
+            "steps": [(node_id, json.loads(entry), json.loads(taken)) for node_id, entry, taken in steps],
+        }
+
+    def unfinished(self) -> List[str]:
+        """Runs that were in progress when the process stopped"""
+        rows = self._conn.execute(
+            "SELECT execution_id FROM workflow_runs WHERE status IN ('in_progress', 'waiting_approval')"
+            " ORDER BY updated_at"
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def close(self):
+        self._conn.close()
+
+
+class WorkflowRuntime:
+    """Concurrent scheduler for compiled workflows
+
+    A node becomes ready once every incoming connection is resolved and at
+    least one was taken (join nodes in "any" mode fire on the first taken
+    connection). Nodes whose incoming connections were all skipped are skipped
+    in turn, so untaken decision branches never block a downstream join.
+    """
+
+    def __init__(
+        self,
+        process_node: Callable[[Any, Any], Awaitable[Dict[str, Any]]],
+        evaluate_condition: Callable[[Dict[str, Any], Dict[str, Any], Dict[str, Any]], Awaitable[bool]],
+        concurrency_limits: Optional[Dict[Any, int]] = None,
+        default_limit: int = DEFAULT_CONCURRENCY,
+    ):
+        self.process_node = process_node
+        self.evaluate_condition = evaluate_condition
+        self.concurrency_limits = {
+            getattr(node_type, "value", node_type): limit
+            for node_type, limit in (concurrency_limits or {}).items()
+        }
+        self.default_limit = default_limit
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def _limiter(self, node_type: str) -> asyncio.Semaphore:
+        semaphore = self._semaphores.get(node_type)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.concurrency_limits.get(node_type, self.default_limit))
+            self._semaphores[node_type] = semaphore
+        return semaphore
+
+    async def _run_limited(self, execution, node) -> Dict[str, Any]:
+        async with self._limiter(node.node_type.value):
+            return await self.process_node(execution, node)
+
+    async def run(
+        self,
+        compiled: CompiledWorkflow,
+        execution,
+        store: Optional[SQLiteCheckpointStore] = None,
+        steps: Iterable[Tuple[str, Dict[str, Any], List[str]]] = (),
+    ) -> None:
+        """Run until every reachable node has finished
+
+        `steps` replays a checkpoint: those nodes are not executed again and
+        their recorded connection choices are applied as-is.
+        """
+        n = len(compiled.nodes)
+        state = [WAITING] * n
+        pending = [len(edges) for edges in compiled.in_edges]
+        arrived = [0] * n
+        ready: List[int] = []
+
+        def resolve(resolutions: List[Tuple[CompiledEdge, bool]]):
+            stack = list(resolutions)
+            while stack:
+                edge, taken = stack.pop()
+                target = edge.target
+                pending[target] -= 1
+                if taken:
+                    arrived[target] += 1
+                if state[target] != WAITING:
+                    continue
+                if arrived[target] and (pending[target] == 0 or compiled.join_any[target]):
+                    state[target] = RUNNING
+                    ready.append(target)
+                elif pending[target] == 0:
+                    state[target] = SKIPPED
+                    stack.extend((out, False) for out in compiled.out_edges[target])
+
+        replay = [(compiled.index[node_id], entry, set(taken))
+                  for node_id, entry, taken in steps if node_id in compiled.index]
+        for i, entry, _ in replay:
+            state[i] = DONE
+            execution.node_executions[compiled.nodes[i].node_id] = entry
+        for i, _, taken in replay:
+            resolve([(edge, edge.connection_id in taken) for edge in compiled.out_edges[i]])
+
+        roots = []
+        for i in compiled.order:
+            if compiled.in_edges[i] or state[i] != WAITING:
+                continue
+            if compiled.nodes[i].node_type.value == START_NODE:
+                state[i] = RUNNING
+                ready.append(i)
+            else:
+                state[i] = SKIPPED
+                roots.extend((edge, False) for edge in compiled.out_edges[i])
+        resolve(roots)
+
+        position = {node: pos for pos, node in enumerate(compiled.order)}
+        running: Dict[asyncio.Task, int] = {}
+        try:
+            while ready or running:
+                # Launch in topological order so ties favour upstream work
+                ready.sort(key=position.__getitem__)
+                for i in ready:
+                    node = compiled.nodes[i]
+                    execution.current_node_id = node.node_id
+                    running[asyncio.create_task(self._run_limited(execution, node))] = i
+                ready.clear()
+
+                finished, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in finished:
+                    i = running.pop(task)
+                    result = task.result()
+                    node = compiled.nodes[i]
+                    entry = {
+                        "status": "completed",
+                        "result": result,
+                        "executed_at": datetime.now().isoformat(),
+                    }
+                    execution.node_executions[node.node_id] = entry
+                    state[i] = DONE
+
+                    output = result.get("output", "output")
+                    resolutions = []
+                    for edge in compiled.out_edges[i]:
+                        taken = edge.source_output == output and (
+                            not edge.condition
+                            or await self.evaluate_condition(edge.condition, execution.context, result)
+                        )
+                        resolutions.append((edge, taken))
+
+                    if store is not None:
+                        store.record_step(
+                            execution.execution_id, node.node_id, entry,
+                            [edge.connection_id for edge, taken in resolutions if taken],
+                            execution.context,
+                        )
+                    resolve(resolutions)
+        finally:
+            if running:
+                for task in running:
+                    task.cancel()
+                await asyncio.gather(*running, return_exceptions=True)
@@ -0,0 +1,293 @@
+"""
+Unit Tests for Client Portal Document Search
+
+Tests that indexed search returns exactly what the previous ILIKE filters
+returned, keyset paging through every match without gaps or repeats, index
+maintenance on insert, update and delete, index creation at startup with an
+ILIKE fallback until then, relevance ranking, and capped and cached totals.
+"""
+
+import logging
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import and_, create_engine, desc, or_, text
+from sqlalchemy.orm import sessionmaker
+
+from src.client_portal.document_manager import ClientDocumentManager
+from src.client_portal import document_search
+from src.client_portal.document_search import (
+    DocumentSearch,
+    create_search_index,
+    decode_cursor,
+    encode_cursor,
+)
+from src.client_portal.models import (
+    Base,
+    ClientDocument,
+    ClientUser,
+    DocumentStatus,
+    DocumentType,
+)
+
+WORDS = ["motion", "retainer", "invoice", "deposition", "exhibit", "settlement", "lease", "discovery"]
+
+
+def legacy_search(db, client_id, query, page=1, limit=20, phrase=False):
+    """The previous search: one ILIKE clause per term, a full count and OFFSET paging."""
+    base_query = db.query(ClientDocument).filter(
+        and_(
+            ClientDocument.client_id == client_id,
+            ClientDocument.status != DocumentStatus.DELETED
+        )
+    )
+    for term in ([query] if phrase else query.lower().split()):
+        search_pattern = f"%{term}%"
+        base_query = base_query.filter(
+            or_(
+                ClientDocument.title.ilike(search_pattern),
+                ClientDocument.description.ilike(search_pattern),
+                ClientDocument.original_filename.ilike(search_pattern)
+            )
+        )
+    total_count = base_query.count()
+    documents = base_query.order_by(desc(ClientDocument.created_at), desc(ClientDocument.id)).offset(
+        (page - 1) * limit
+    ).limit(limit).all()
+    return documents, total_count
+
+
+def make_document(client_id, n, created_at=None, title=None, description=None, filename=None,
+                  status=DocumentStatus.UPLOADED):
+    return ClientDocument(
+        client_id=client_id,
+        filename=f"{n:08x}.pdf",
+        original_filename=filename or f"{WORDS[n % 8]}_{n}.pdf",
+        file_path=f"/storage/client_{client_id}/{n:08x}.pdf",
+        file_size=1024,
+        mime_type="application/pdf",
+        document_type=DocumentType.CONTRACT if n % 3 else DocumentType.INVOICE,
+        title=title if title is not None else f"{WORDS[n % 5].title()} {WORDS[(n * 7) % 8]} no. {n}",
+        description=description if description is not None else (
+            None if n % 4 == 0 else f"Regarding the {WORDS[(n * 3) % 8]} for matter {n % 13}"),
+        status=status,
+        created_at=created_at
+    )
+
+
+def make_session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    session.add_all([
+        ClientUser(id=1, email="client@example.com", password_hash="x", first_name="Ada", last_name="Client"),
+        ClientUser(id=2, email="other@example.com", password_hash="x", first_name="Bo", last_name="Other"),
+    ])
+    session.commit()
+    return session
+
+
+def seed(session):
+    start = datetime(2024, 1, 1, 9, 0)
+    documents = []
+    for n in range(120):
+        # Pairs of documents share a timestamp, and some rely on the server default
+        created_at = None if n % 10 == 9 else start + timedelta(minutes=n // 2)
+        status = DocumentStatus.DELETED if n % 17 == 5 else DocumentStatus.UPLOADED
+        documents.append(make_document(1, n, created_at=created_at, status=status))
+    documents.extend(make_document(2, n, created_at=start) for n in range(120, 140))
+    session.add_all(documents)
+    session.commit()
+    return session
+
+
+@pytest.fixture
+def db():
+    session = seed(make_session())
+    # As the portal does at startup
+    assert create_search_index(session.get_bind()) == "fts5"
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def unindexed_db():
+    session = seed(make_session())
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def manager(db, tmp_path):
+    return ClientDocumentManager(db, str(tmp_path / "storage"))
+
+
+def all_pages(manager, query, sort="recent", limit=7, **filters):
+    ids, cursor = [], None
+    while True:
+        result = manager.search_documents(1, query, sort=sort, cursor=cursor, limit=limit, **filters)
+        assert result['success'], result
+        ids.extend(document['id'] for document in result['documents'])
+        cursor = result['pagination']['next_cursor']
+        if cursor is None:
+            return ids, result
+
+
+QUERIES = ["motion", "MOTION", "no. 1", "retainer lease", "discovery matter", "pdf", "ion",
+           "de", "x", "matter 1", "invoice_4", "exhibit 100%", "nothing-like-this", ""]
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_matches_legacy_search(manager, db, query):
+    assert manager.document_search.backend == "fts5"
+    expected, expected_total = legacy_search(db, 1, query, limit=1000)
+
+    ids, result = all_pages(manager, query)
+
+    assert ids == [document.id for document in expected]
+    assert result['pagination']['total'] == expected_total
+    assert not result['pagination']['total_is_estimate']
+
+
+@pytest.mark.parametrize("query", ["motion", "No. 1", "regarding the lease", "lease_1", "ab"])
+def test_get_client_documents_matches_legacy_phrase(manager, db, query):
+    expected, expected_total = legacy_search(db, 1, query, limit=1000, phrase=True)
+
+    ids, cursor = [], None
+    while True:
+        result = manager.get_client_documents(1, search_query=query, cursor=cursor, limit=9)
+        assert result['success'], result
+        ids.extend(document['id'] for document in result['documents'])
+        cursor = result['pagination']['next_cursor']
+        if cursor is None:
+            break
+
+    assert ids == [document.id for document in expected]
+    assert result['pagination']['total'] == expected_total
+
+
+def test_page_numbers_still_work(manager, db):
+    for page in (1, 2, 5):
+        expected, total = legacy_search(db, 1, "the", page=page, limit=10)
+        result = manager.search_documents(1, "the", page=page, limit=10)
+        assert [document['id'] for document in result['documents']] == [document.id for document in expected]
+        assert result['pagination']['pages'] == (total + 9) // 10
+
+
+def test_relevance_pages_cover_every_match_once(manager, db):
+    expected, _ = legacy_search(db, 1, "motion", limit=1000)
+
+    ids, result = all_pages(manager, "motion", sort="relevance", limit=4)
+
+    assert sorted(ids) == sorted(document.id for document in expected)
+    assert len(ids) == len(set(ids))
+    assert result['sort'] == "relevance"
+
+
+def test_title_matches_rank_first(manager, db):
+    db.add_all([
+        make_document(1, 1000, title="Quarterly report", description="Mentions the zebra crossing"),
+        make_document(1, 1001, title="Zebra crossing claim", description="Accident report"),
+        make_document(1, 1002, title="Notes", description="Nothing relevant", filename="zebra.pdf"),
+    ])
+    db.commit()
+
+    result = manager.search_documents(1, "zebra", sort="relevance")
+
+    assert [document['title'] for document in result['documents']] == [
+        "Zebra crossing claim", "Notes", "Quarterly report"
+    ]
+
+
+def test_index_follows_updates_and_deletes(manager, db):
+    assert manager.search_documents(1, "habeas")['documents'] == []
+    document = db.query(ClientDocument).filter(ClientDocument.client_id == 1).first()
+
+    result = manager.update_document(document.document_id, 1, title="Habeas petition")
+    assert result['success'], result
+    found = manager.search_documents(1, "habeas")
+    assert [d['id'] for d in found['documents']] == [document.id]
+    assert found['pagination']['total'] == 1
+
+    db.delete(document)
+    db.commit()
+    assert manager.search_documents(1, "habeas petition")['documents'] == []
+
+
+def test_search_falls_back_until_the_index_is_created(unindexed_db, caplog):
+    db = unindexed_db
+    search = DocumentSearch(db)
+    with caplog.at_level(logging.WARNING, logger=document_search.__name__):
+        assert search.backend == "like"
+    assert "index is missing" in caplog.text
+    expected, total = legacy_search(db, 2, "motion", limit=1000)
+    assert [document.id for document in search.search(2, ["motion"], limit=1000).documents] == [
+        document.id for document in expected]
+    assert total > 0
+
+    # Searching creates nothing and commits nothing
+    count = db.execute(text("SELECT count(*) FROM sqlite_master WHERE name = 'client_documents_fts'")).scalar()
+    assert count == 0
+    db.rollback()
+
+    # Existing documents are indexed when the index is created, and searches pick it up
+    assert create_search_index(db.get_bind()) == "fts5"
+    assert create_search_index(db.get_bind()) == "fts5"
+    assert search.backend == "fts5"
+    page = search.search(2, ["motion"], limit=1000)
+    assert [document.id for document in page.documents] == [document.id for document in expected]
+
+
+def test_fallback_is_rechecked(unindexed_db, monkeypatch):
+    search = DocumentSearch(unindexed_db)
+    assert search.backend == "like"
+    unindexed_db.rollback()
+
+    # Another worker creates the index; this one notices once the fallback expires
+    with unindexed_db.get_bind().begin() as connection:
+        for statement in document_search.SQLITE_INDEX_DDL:
+            connection.execute(text(statement))
+    assert search.backend == "like"
+    later = document_search.time.monotonic() + document_search.FALLBACK_RECHECK_SECONDS + 1
+    monkeypatch.setattr(document_search.time, "monotonic", lambda: later)
+    assert search.backend == "fts5"
+
+
+def test_totals_are_capped_and_cached(db):
+    search = DocumentSearch(db, count_cap=10)
+    first = search.search(1, ["the"], limit=5)
+    assert first.total == 10 and first.total_is_estimate
+
+    search = DocumentSearch(db, count_cap=1000)
+    cached = search.search(1, ["regarding"], limit=5)
+    db.add(make_document(1, 2000, created_at=datetime(2025, 1, 1), description="Regarding the new lease"))
+    db.commit()
+    assert search.search(1, ["regarding"], limit=5).total == cached.total
+
+
+def test_uploads_invalidate_cached_totals(manager, db):
+    before = manager.search_documents(1, "lease")['pagination']['total']
+    db.add(make_document(1, 3000, created_at=datetime(2025, 1, 1), title="Lease renewal"))
+    db.commit()
+    document = db.query(ClientDocument).filter(ClientDocument.title == "Lease renewal").one()
+
+    manager.update_document(document.document_id, 1, description="Signed lease renewal")
+
+    assert manager.search_documents(1, "lease")['pagination']['total'] == before + 1
+
+
+def test_invalid_cursors_are_rejected(manager):
+    result = manager.search_documents(1, "motion", limit=5)
+    cursor = result['pagination']['next_cursor']
+
+    assert not manager.search_documents(1, "motion", cursor="not a cursor")['success']
+    assert not manager.search_documents(1, "motion", cursor=cursor, sort="relevance")['success']
+    assert not manager.search_documents(1, "motion", sort="alphabetical")['success']
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor("recent", ["2024-01-01 09:00:00", "7"]), "recent")
+
+
+def test_other_clients_documents_are_never_returned(manager, db):
+    ids, _ = all_pages(manager, "pdf", limit=50)
+    owners = {document.client_id for document in db.query(ClientDocument).filter(ClientDocument.id.in_(ids))}
+    assert owners == {1}
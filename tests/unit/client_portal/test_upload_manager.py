@@ -0,0 +1,263 @@
+"""
+Unit Tests for Chunked, Resumable Client Portal Uploads
+
+Tests offset tracking, resuming after a dropped connection and after a
+restart, MIME sniffing from the first chunk, size and type rejection, the
+stored hash used by integrity checks, and uploads shared between worker
+processes or written by concurrent requests.
+"""
+
+import hashlib
+import io
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import magic
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.client_portal.document_manager import ClientDocumentManager
+from src.client_portal.models import Base, ClientDocument, ClientUser, DocumentType
+from src.client_portal.upload_manager import ChunkedUploadManager, UploadError
+
+PDF_HEAD = b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n1 0 obj\n<< /Type /Catalog >>\nendobj\n"
+
+
+def pdf_content(size):
+    body = bytes(range(256)) * (size // 256 + 1)
+    return (PDF_HEAD + body)[:size]
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    session.add_all([
+        ClientUser(id=1, email="client@example.com", password_hash="x", first_name="Ada", last_name="Client"),
+        ClientUser(id=2, email="other@example.com", password_hash="x", first_name="Bo", last_name="Other"),
+    ])
+    session.commit()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def manager(db, tmp_path):
+    manager = ClientDocumentManager(db, str(tmp_path / "storage"), max_file_size=1024 * 1024)
+    manager.uploads.chunk_size = 64 * 1024
+    return manager
+
+
+def send_chunks(manager, upload_id, content, start=0, stop=None, client_id=1):
+    chunk_size = manager.uploads.chunk_size
+    stop = len(content) if stop is None else stop
+    result = None
+    for offset in range(start, stop, chunk_size):
+        result = manager.upload_chunk(upload_id, client_id, offset, content[offset:min(offset + chunk_size, stop)])
+        assert result['success'], result
+    return result
+
+
+def test_upload_document_streams_and_stores_hash(manager, db):
+    content = pdf_content(300 * 1024)
+    result = manager.upload_document(1, io.BytesIO(content), "Retainer.PDF", DocumentType.CONTRACT)
+
+    assert result['success'], result
+    document = db.query(ClientDocument).one()
+    assert document.file_size == len(content)
+    assert document.mime_type == "application/pdf"
+    assert document.document_metadata['file_hash'] == hashlib.sha256(content).hexdigest()
+    assert Path(document.file_path).read_bytes() == content
+    assert Path(document.file_path).suffix == ".pdf"
+    assert not list(manager.uploads.uploads_path.iterdir())
+
+    check = manager.verify_file_integrity(document.document_id, 1)
+    assert check['success'] and check['integrity_valid']
+
+
+def test_integrity_check_detects_changes(manager, db):
+    content = pdf_content(200 * 1024)
+    manager.upload_document(1, io.BytesIO(content), "brief.pdf", DocumentType.COURT_FILING)
+    document = db.query(ClientDocument).one()
+
+    with open(document.file_path, "r+b") as f:
+        f.seek(5000)
+        f.write(b"tampered")
+    assert manager.verify_file_integrity(document.document_id, 1)['integrity_valid'] is False
+
+    with open(document.file_path, "ab") as f:
+        f.write(b"appended")
+    assert manager.verify_file_integrity(document.document_id, 1)['integrity_valid'] is False
+
+
+def test_chunked_upload_with_offsets(manager, db):
+    content = pdf_content(200 * 1024 + 17)
+    started = manager.start_chunked_upload(1, "evidence.pdf", DocumentType.EVIDENCE,
+                                           total_size=len(content), title="Exhibit 4", tags=["exhibit"])
+    upload_id = started['upload']['upload_id']
+    assert started['upload']['offset'] == 0 and started['chunk_size'] == 64 * 1024
+
+    last = send_chunks(manager, upload_id, content)
+    assert last['upload']['offset'] == len(content)
+    assert last['upload']['mime_type'] == "application/pdf"
+
+    result = manager.complete_chunked_upload(upload_id, 1, ip_address="10.0.0.7")
+    assert result['success'], result
+    document = db.query(ClientDocument).one()
+    assert (document.title, document.tags, document.document_type) == ("Exhibit 4", ["exhibit"], DocumentType.EVIDENCE)
+    assert document.document_metadata == {
+        'file_hash': hashlib.sha256(content).hexdigest(), 'upload_ip': "10.0.0.7"
+    }
+    assert manager.get_upload_status(upload_id, 1)['success'] is False
+
+
+def test_mismatched_offset_reports_where_to_resume(manager):
+    content = pdf_content(150 * 1024)
+    upload_id = manager.start_chunked_upload(1, "a.pdf", DocumentType.OTHER)['upload']['upload_id']
+    send_chunks(manager, upload_id, content, stop=64 * 1024)
+
+    # The response to the second chunk was lost and the client sends it again
+    send_chunks(manager, upload_id, content, start=64 * 1024, stop=128 * 1024)
+    retry = manager.upload_chunk(upload_id, 1, 64 * 1024, content[64 * 1024:128 * 1024])
+    assert retry == {'success': False, 'error': 'Chunk offset does not match upload offset', 'offset': 128 * 1024}
+
+    status = manager.get_upload_status(upload_id, 1)
+    send_chunks(manager, upload_id, content, start=status['upload']['offset'])
+    assert manager.complete_chunked_upload(upload_id, 1)['document']['file_size'] == len(content)
+
+
+def test_resume_after_restart(manager, db, tmp_path):
+    content = pdf_content(400 * 1024)
+    upload_id = manager.start_chunked_upload(1, "a.pdf", DocumentType.OTHER,
+                                             total_size=len(content))['upload']['upload_id']
+    send_chunks(manager, upload_id, content, stop=192 * 1024)
+
+    # The server went down mid-write: bytes past the recorded offset are dropped
+    with open(manager.uploads.uploads_path / f"{upload_id}.part", "ab") as f:
+        f.write(b"partial chunk")
+
+    restarted = ClientDocumentManager(db, str(tmp_path / "storage"), max_file_size=1024 * 1024)
+    restarted.uploads.chunk_size = 64 * 1024
+    offset = restarted.get_upload_status(upload_id, 1)['upload']['offset']
+    assert offset == 192 * 1024
+    send_chunks(restarted, upload_id, content, start=offset)
+
+    result = restarted.complete_chunked_upload(upload_id, 1)
+    document = db.query(ClientDocument).one()
+    assert result['success']
+    assert document.document_metadata['file_hash'] == hashlib.sha256(content).hexdigest()
+    assert Path(document.file_path).read_bytes() == content
+
+
+def test_incomplete_upload_cannot_complete(manager):
+    content = pdf_content(100 * 1024)
+    upload_id = manager.start_chunked_upload(1, "a.pdf", DocumentType.OTHER,
+                                             total_size=len(content))['upload']['upload_id']
+    send_chunks(manager, upload_id, content, stop=64 * 1024)
+
+    result = manager.complete_chunked_upload(upload_id, 1)
+    assert result == {'success': False, 'error': 'Upload is incomplete', 'offset': 64 * 1024}
+
+
+def test_type_is_sniffed_from_first_chunk_only(manager, monkeypatch):
+    calls = []
+    from_buffer = magic.from_buffer
+
+    def spy(buffer, mime=False):
+        calls.append(len(buffer))
+        return from_buffer(buffer, mime=mime)
+
+    monkeypatch.setattr(magic, "from_buffer", spy)
+    manager.upload_document(1, io.BytesIO(pdf_content(500 * 1024)), "a.pdf", DocumentType.OTHER)
+    assert calls == [64 * 1024]
+
+
+def test_disallowed_type_is_rejected_on_first_chunk(manager):
+    upload_id = manager.start_chunked_upload(1, "tool.exe", DocumentType.OTHER)['upload']['upload_id']
+    result = manager.upload_chunk(upload_id, 1, 0, b"MZ\x90\x00\x03" + bytes(64 * 1024))
+
+    assert result == {'success': False, 'error': 'File type not allowed'}
+    assert manager.get_upload_status(upload_id, 1)['success'] is False
+    assert not list(manager.uploads.uploads_path.iterdir())
+
+    result = manager.upload_document(1, io.BytesIO(b"MZ\x90\x00\x03" + bytes(1000)), "tool.exe", DocumentType.OTHER)
+    assert result == {'success': False, 'error': 'File type not allowed'}
+
+
+def test_oversized_uploads_are_rejected(manager, db):
+    assert manager.start_chunked_upload(1, "a.pdf", DocumentType.OTHER, total_size=2 * 1024 * 1024) == {
+        'success': False, 'error': 'File too large. Max size: 1MB'
+    }
+
+    result = manager.upload_document(1, io.BytesIO(pdf_content(1024 * 1024 + 1)), "a.pdf", DocumentType.OTHER)
+    assert result == {'success': False, 'error': 'File too large. Max size: 1MB'}
+    assert db.query(ClientDocument).count() == 0
+    assert not list(manager.uploads.uploads_path.iterdir())
+
+
+def test_uploads_belong_to_their_client(manager):
+    upload_id = manager.start_chunked_upload(1, "a.pdf", DocumentType.OTHER)['upload']['upload_id']
+
+    assert manager.upload_chunk(upload_id, 2, 0, PDF_HEAD) == {'success': False, 'error': 'Upload not found'}
+    assert manager.get_upload_status(upload_id, 2)['success'] is False
+    assert manager.abort_chunked_upload(upload_id, 2)['success'] is False
+    assert manager.get_upload_status("../../etc/passwd", 1)['success'] is False
+    assert manager.abort_chunked_upload(upload_id, 1)['success'] is True
+
+
+def test_expired_uploads_are_cleaned_up(tmp_path):
+    uploads = ChunkedUploadManager(str(tmp_path), session_ttl=timedelta(hours=1))
+    stale = uploads.start_upload(1, "a.pdf")
+    uploads.append_chunk(stale.upload_id, 0, PDF_HEAD)
+    uploads.start_upload(1, "b.pdf")
+
+    assert uploads.cleanup_expired_uploads(now=datetime.utcnow() + timedelta(minutes=30)) == 0
+    assert uploads.cleanup_expired_uploads(now=datetime.utcnow() + timedelta(minutes=90)) == 2
+    assert uploads.get_upload(stale.upload_id) is None
+    assert not list(uploads.uploads_path.iterdir())
+
+
+def test_workers_sharing_an_upload_keep_the_hash_right(tmp_path):
+    # Two managers on one storage directory stand in for two worker processes
+    workers = [ChunkedUploadManager(str(tmp_path), chunk_size=1024) for _ in range(2)]
+    content = pdf_content(10 * 1024)
+    session = workers[0].start_upload(1, "a.pdf", total_size=len(content))
+
+    for n, offset in enumerate(range(0, len(content), 1024)):
+        # Alternate in pairs, so each worker's cached hash falls behind
+        workers[n // 2 % 2].append_chunk(session.upload_id, offset, content[offset:offset + 1024])
+
+    _, file_hash = workers[1].complete_upload(session.upload_id, tmp_path / "a.pdf")
+    assert file_hash == hashlib.sha256(content).hexdigest()
+    assert (tmp_path / "a.pdf").read_bytes() == content
+    assert not list(workers[0].uploads_path.iterdir())
+
+
+def test_concurrent_chunks_for_one_upload_are_serialized(tmp_path):
+    uploads = ChunkedUploadManager(str(tmp_path))
+    content = pdf_content(256 * 1024)
+    upload_id = uploads.start_upload(1, "a.pdf").upload_id
+    barrier = threading.Barrier(8)
+    results = []
+
+    def send(chunk):
+        barrier.wait()
+        try:
+            results.append(uploads.append_chunk(upload_id, 0, chunk).offset)
+        except UploadError as e:
+            results.append(e.offset)
+
+    threads = [threading.Thread(target=send, args=(content[:32 * 1024 * (n + 1)],)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # One request wins; the rest are told where it left the upload
+    assert len(set(results)) == 1
+    offset = results[0]
+    _, file_hash = uploads.complete_upload(upload_id, tmp_path / "a.pdf")
+    assert file_hash == hashlib.sha256(content[:offset]).hexdigest()
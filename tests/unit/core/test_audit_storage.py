@@ -0,0 +1,206 @@
+"""
+Unit Tests for the Audit Segment Store
+
+Tests hash chain verification and tamper detection, index-pruned queries
+against a linear scan, crash recovery and the AuditLogger integration.
+"""
+
+import importlib
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from src.core.audit_storage import AuditSegmentStore, to_epoch
+
+BASE_TIME = datetime(2025, 1, 1, tzinfo=timezone.utc)
+USERS = [f"user_{i}" for i in range(20)]
+ACTIONS = ["view", "download", "modify", "authenticate_user"]
+
+
+def make_events(n, seed=0, first_id=0):
+    rng = random.Random(seed)
+    events = []
+    for i in range(n):
+        timestamp = BASE_TIME + timedelta(seconds=i * 10 + rng.randint(0, 5))
+        events.append((timestamp, {
+            "log_id": f"LOG_{first_id + i}",
+            "user_id": rng.choice(USERS),
+            "event_type": rng.choice(["login", "document_view", "document_download"]),
+            "action_performed": rng.choice(ACTIONS),
+            "resource_accessed": f"doc_{rng.randint(0, 50)}",
+            "category": rng.choice(["authentication", "document_access"]),
+            "risk_level": rng.choice(["low", "medium", "high"]),
+            "outcome": rng.choice(["success", "failure"]),
+        }))
+    return events
+
+
+def linear_scan(events, start=None, end=None, filters=None):
+    start_ts, end_ts = to_epoch(start), to_epoch(end)
+    return [
+        event for timestamp, event in events
+        if (start_ts is None or to_epoch(timestamp) >= start_ts)
+        and (end_ts is None or to_epoch(timestamp) <= end_ts)
+        and all(event.get(k) == v for k, v in (filters or {}).items())
+    ]
+
+
+@pytest.fixture
+def populated_store(tmp_path):
+    store = AuditSegmentStore(tmp_path / "segments", segment_max_events=500, block_size=16)
+    events = make_events(2000)
+    for timestamp, event in events:
+        store.append(event, timestamp)
+    yield store, events
+    store.close()
+
+
+class TestAuditSegmentStore:
+    """Test suite for segment storage, indexes and queries"""
+
+    def test_segments_rotate_and_chain_verifies(self, populated_store):
+        store, events = populated_store
+        report = store.verify_chain()
+
+        assert report["valid"] is True
+        assert report["events_verified"] == len(events)
+        assert report["segments_verified"] == 5
+        assert report["head_hash"] == store.head_hash
+        assert len(list(store.root.glob("segment_*.blocks.idx.json"))) == 4
+
+    @pytest.mark.parametrize("filters", [
+        {"user_id": "user_3"},
+        {"user_id": "user_3", "action_performed": "download"},
+        {"resource_accessed": "doc_7"},
+        {"event_type": "login", "outcome": "failure"},
+        {"risk_level": "high", "category": "authentication"},
+        {"user_id": "no_such_user"},
+    ])
+    def test_indexed_query_matches_linear_scan(self, populated_store, filters):
+        store, events = populated_store
+        start = BASE_TIME + timedelta(hours=1)
+        end = BASE_TIME + timedelta(hours=4)
+
+        assert list(store.query(filters=filters)) == linear_scan(events, filters=filters)
+        assert list(store.query(start, end, filters)) == linear_scan(events, start, end, filters)
+
+    def test_offset_and_limit_page_in_append_order(self, populated_store):
+        store, events = populated_store
+        expected = linear_scan(events, filters={"user_id": "user_5"})
+
+        page = list(store.query(filters={"user_id": "user_5"}, offset=10, limit=25))
+        assert page == expected[10:35]
+
+    def test_time_range_prunes_sealed_segments(self, populated_store, monkeypatch):
+        store, events = populated_store
+        loaded = []
+        original = store._load_sidecar
+        monkeypatch.setattr(store, "_load_sidecar", lambda sid, part: loaded.append(sid) or original(sid, part))
+
+        start = BASE_TIME + timedelta(seconds=600 * 10)
+        end = BASE_TIME + timedelta(seconds=700 * 10)
+        results = list(store.query(start, end))
+
+        assert results == linear_scan(events, start, end)
+        assert loaded == [1]
+
+    def test_statistics_come_from_summaries(self, populated_store):
+        store, events = populated_store
+        stats = store.get_statistics()
+
+        assert stats["total_events"] == len(events)
+        assert stats["counts"]["outcome"]["failure"] == len(linear_scan(events, filters={"outcome": "failure"}))
+        assert stats["last_timestamp"] == max(to_epoch(t) for t, _ in events)
+
+    def test_reopen_continues_chain_and_drops_torn_write(self, populated_store):
+        store, events = populated_store
+        extra = make_events(30, seed=1, first_id=len(events))
+        for timestamp, event in extra[:10]:
+            store.append(event, timestamp)
+        store.close()
+
+        active = sorted(store.root.glob("segment_*.log"))[-1]
+        with active.open("ab") as f:
+            f.write(b'{"partial": tr')
+
+        reopened = AuditSegmentStore(store.root, segment_max_events=500, block_size=16)
+        for timestamp, event in extra[10:]:
+            reopened.append(event, timestamp)
+
+        assert reopened.verify_chain()["valid"] is True
+        assert list(reopened.query(filters={"log_id": extra[0][1]["log_id"]})) == [extra[0][1]]
+        assert reopened.get_statistics()["total_events"] == len(events) + len(extra)
+        reopened.close()
+
+    def test_modified_event_is_detected(self, populated_store):
+        store, _ = populated_store
+        segment = store.root / "segment_00000001.log"
+        data = segment.read_bytes()
+        segment.write_bytes(data.replace(b'"outcome":"failure"', b'"outcome":"success"', 1))
+
+        report = store.verify_chain()
+        assert report["valid"] is False
+        assert report["errors"][0]["segment_id"] == 1
+        assert "modified" in report["errors"][0]["error"]
+
+    def test_removed_event_is_detected(self, populated_store):
+        store, _ = populated_store
+        segment = store.root / "segment_00000002.log"
+        lines = segment.read_bytes().splitlines(keepends=True)
+        segment.write_bytes(b"".join(lines[:100] + lines[101:]))
+
+        errors = store.verify_chain()["errors"]
+        assert any("chain link broken" in e["error"] for e in errors)
+        assert any("sealed summary" in e["error"] for e in errors)
+
+    def test_missing_segment_is_detected(self, populated_store):
+        store, _ = populated_store
+        (store.root / "segment_00000000.log").unlink()
+
+        report = store.verify_chain()
+        assert report["valid"] is False
+        assert report["errors"][0]["error"] == "segment file is missing"
+
+
+class TestAuditLoggerStorage:
+    """Test suite for AuditLogger on top of the segment store"""
+
+    @pytest.fixture
+    def logger(self, tmp_path, monkeypatch):
+        # The module builds a global instance under the working directory on import
+        monkeypatch.chdir(tmp_path)
+        module = importlib.import_module("src.core.audit_logger")
+        # type() because the module also defines a simpler AuditLogger later on
+        instance = type(module.audit_logger)(storage_root=str(tmp_path / "audit"))
+        yield module, instance
+        instance.store.close()
+
+    def test_search_uses_store_filters(self, logger):
+        module, audit = logger
+        for i in range(30):
+            audit.log_document_event(user_id=f"u{i % 3}", document_id=f"doc_{i % 5}",
+                                     action="download" if i % 2 else "view", details={"i": i})
+
+        query = module.AuditSearchQuery(user_id="u1", action="download", limit=100)
+        results = audit.search_audit_logs(query)
+
+        assert results and all(r.user_id == "u1" and r.action_performed == "download" for r in results)
+        assert all(isinstance(r.risk_level, module.RiskLevel) for r in results)
+        assert audit.search_audit_logs(module.AuditSearchQuery(resource="doc_2", limit=3))[0].resource_accessed == "doc_2"
+
+    def test_report_and_statistics(self, logger):
+        module, audit = logger
+        for _ in range(12):
+            audit.log_authentication_event(user_id="u1", event_type="login", success=False)
+
+        now = datetime.now(timezone.utc)
+        report = audit.generate_compliance_report(now - timedelta(hours=1), now + timedelta(hours=1))
+        stats = audit.get_audit_statistics()
+
+        assert report.failed_events == 12
+        assert report.high_risk_events == 12
+        assert any("authentication controls" in r for r in report.recommendations)
+        assert stats["outcomes"]["failure"] == 12
+        assert stats["total_logs"] == report.total_events
+        assert audit.verify_audit_chain()["valid"] is True
@@ -0,0 +1,222 @@
+"""
+Unit Tests for the Incremental Backup Repository
+
+Tests content-defined chunking, incremental snapshots, restore, verify,
+retention pruning and garbage collection, and the BackupSystem file backup
+path.
+"""
+
+import importlib
+import io
+import os
+import random
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.core.backup_repository import BackupIntegrityError, BackupRepository, iter_chunks
+
+MB = 1024 * 1024
+
+
+def write_tree(root, n_files, size, seed=0):
+    rng = random.Random(seed)
+    for i in range(n_files):
+        path = root / f"case_{i % 10}" / f"doc_{i}.bin"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(rng.randbytes(size))
+
+
+def touch_edit(path, offset, data):
+    """Overwrite bytes in place and move mtime forward so the change is detected"""
+    with open(path, "r+b") as f:
+        f.seek(offset)
+        f.write(data)
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+@pytest.fixture
+def source_tree(tmp_path):
+    root = tmp_path / "documents"
+    write_tree(root, 20, 3 * MB)
+    return root
+
+
+@pytest.fixture
+def repository(tmp_path):
+    return BackupRepository(tmp_path / "repository")
+
+
+class TestChunking:
+    """Test suite for content-defined chunking"""
+
+    def test_chunks_are_bounded_and_reassemble(self):
+        data = random.Random(1).randbytes(20 * MB)
+        chunks = list(iter_chunks(io.BytesIO(data)))
+
+        assert b"".join(chunks) == data
+        assert all(256 * 1024 <= len(c) <= 4 * MB for c in chunks[:-1])
+
+    def test_insertion_only_changes_nearby_chunks(self):
+        data = random.Random(2).randbytes(20 * MB)
+        edited = data[:9 * MB] + b"inserted clause" + data[9 * MB:]
+
+        before = list(iter_chunks(io.BytesIO(data)))
+        after = list(iter_chunks(io.BytesIO(edited)))
+
+        assert len(set(after) - set(before)) <= 2
+
+    def test_boundaries_do_not_depend_on_read_size(self):
+        class ShortReads(io.BytesIO):
+            def read(self, size=-1):
+                return super().read(min(size, 100_000) if size and size > 0 else size)
+
+        data = random.Random(3).randbytes(12 * MB)
+        assert list(iter_chunks(ShortReads(data))) == list(iter_chunks(io.BytesIO(data)))
+
+
+class TestBackupRepository:
+    """Test suite for snapshots, restore, verify and garbage collection"""
+
+    def test_unchanged_files_are_not_reread(self, repository, source_tree):
+        first = repository.create_snapshot([str(source_tree)], job_id="job")
+        second = repository.create_snapshot([str(source_tree)], job_id="job")
+
+        assert first.files == second.files == 20
+        assert second.files_reused == 20
+        assert second.bytes_read == 0
+        assert second.bytes_written == 0
+
+    def test_edit_writes_only_new_chunks(self, repository, source_tree):
+        repository.create_snapshot([str(source_tree)], job_id="job")
+        touch_edit(source_tree / "case_3" / "doc_3.bin", MB, b"amended" * 100)
+
+        stats = repository.create_snapshot([str(source_tree)], job_id="job")
+
+        assert stats.files_changed == 1
+        assert stats.chunks_new <= 2
+        assert stats.bytes_written < 3 * MB
+
+    def test_restore_any_snapshot(self, repository, source_tree, tmp_path):
+        target = source_tree / "case_1" / "doc_1.bin"
+        original = target.read_bytes()
+        first = repository.create_snapshot([str(source_tree)], job_id="job")
+        touch_edit(target, 0, b"changed")
+        second = repository.create_snapshot([str(source_tree)], job_id="job")
+
+        repository.restore_snapshot(first.snapshot_id, tmp_path / "restore_1")
+        repository.restore_snapshot(second.snapshot_id, tmp_path / "restore_2", paths=["documents/case_1/doc_1.bin"])
+
+        assert (tmp_path / "restore_1" / "documents" / "case_1" / "doc_1.bin").read_bytes() == original
+        assert (tmp_path / "restore_2" / "documents" / "case_1" / "doc_1.bin").read_bytes() == target.read_bytes()
+        assert len(list((tmp_path / "restore_2").rglob("*.bin"))) == 1
+        restored = tmp_path / "restore_1" / "documents" / "case_2" / "doc_2.bin"
+        assert restored.stat().st_mtime_ns == (source_tree / "case_2" / "doc_2.bin").stat().st_mtime_ns
+
+    def test_verify_detects_missing_and_corrupt_chunks(self, repository, source_tree):
+        snapshot = repository.create_snapshot([str(source_tree)], job_id="job")
+        assert repository.verify(snapshot.snapshot_id)["valid"] is True
+
+        entries = repository.load_snapshot(snapshot.snapshot_id)["files"]
+        missing, corrupt = entries[0]["chunks"][0], entries[1]["chunks"][0]
+        repository._chunk_path(missing).unlink()
+        path = repository._chunk_path(corrupt)
+        path.write_bytes(path.read_bytes()[:-10] + b"0123456789")
+
+        report = repository.verify()
+        assert report["valid"] is False
+        assert report["missing_chunks"] == [missing]
+        assert report["corrupt_chunks"] == [corrupt]
+        with pytest.raises(BackupIntegrityError):
+            repository.restore_snapshot(snapshot.snapshot_id, source_tree.parent / "restore")
+
+    def test_prune_and_garbage_collect(self, repository, source_tree):
+        first = repository.create_snapshot([str(source_tree)], job_id="job")
+        target = source_tree / "case_4" / "doc_4.bin"
+        target.write_bytes(random.Random(9).randbytes(3 * MB))
+        second = repository.create_snapshot([str(source_tree)], job_id="job")
+        before = repository.get_storage_stats()
+
+        removed = repository.prune(datetime.now() + timedelta(seconds=1), job_id="job", keep_last=1)
+        gc = repository.garbage_collect(grace_seconds=0)
+
+        assert removed == [first.snapshot_id]
+        assert gc["chunks_deleted"] > 0
+        assert repository.get_storage_stats()["chunks"] == before["chunks"] - gc["chunks_deleted"]
+        assert repository.verify(second.snapshot_id)["valid"] is True
+
+    def test_gc_grace_period_keeps_fresh_chunks(self, repository, source_tree):
+        snapshot = repository.create_snapshot([str(source_tree)], job_id="job")
+        repository._manifest_path(snapshot.snapshot_id).unlink()
+
+        assert repository.garbage_collect()["chunks_deleted"] == 0
+        assert repository.garbage_collect(grace_seconds=0)["chunks_kept"] == 0
+
+    def test_reused_chunks_are_protected_from_gc(self, repository, tmp_path):
+        data = random.Random(3).randbytes(MB)
+        (tmp_path / "a.bin").write_bytes(data)
+        first = repository.create_snapshot([str(tmp_path / "a.bin")], job_id="a")
+        repository._manifest_path(first.snapshot_id).unlink()
+        for chunk_path in repository.chunks_dir.glob("*/*"):
+            os.utime(chunk_path, (0, 0))
+
+        # Another job stores the same content; GC must wait for its manifest
+        (tmp_path / "b.bin").write_bytes(data)
+        original_write = repository._write_header
+        gc = {}
+
+        def collect_meanwhile(header):
+            collector = threading.Thread(
+                target=lambda: gc.update(BackupRepository(repository.root).garbage_collect()))
+            collector.start()
+            collector.join(timeout=0.2)
+            assert collector.is_alive()  # Blocked on the repository lock
+            original_write(header)
+            gc["thread"] = collector
+
+        repository._write_header = collect_meanwhile
+        second = repository.create_snapshot([str(tmp_path / "b.bin")], job_id="b")
+        gc.pop("thread").join()
+
+        assert second.chunks_deduplicated > 0 and gc["chunks_deleted"] == 0
+        # Reused chunks were touched, so even a collector without the lock keeps them
+        assert all(p.stat().st_mtime > 0 for p in repository.chunks_dir.glob("*/*"))
+        assert repository.verify(second.snapshot_id)["valid"] is True
+
+    def test_snapshot_list_reads_headers_not_manifests(self, repository, tmp_path, monkeypatch):
+        (tmp_path / "a.bin").write_bytes(b"retainer agreement")
+        first = repository.create_snapshot([str(tmp_path / "a.bin")], job_id="job")
+        repository._header_path(first.snapshot_id).unlink()  # Written before headers existed
+        repository = BackupRepository(repository.root)
+        second = repository.create_snapshot([str(tmp_path / "a.bin")], job_id="job")
+        assert second.files_reused == 1
+
+        reopened = BackupRepository(repository.root)
+        monkeypatch.setattr(reopened, "load_snapshot", lambda snapshot_id: pytest.fail("manifest read"))
+        headers = reopened.list_snapshots("job")
+        assert [h["snapshot_id"] for h in headers] == [first.snapshot_id, second.snapshot_id]
+        assert headers[1]["parent"] == first.snapshot_id and "files" not in headers[1]
+
+
+def test_backup_system_files_job_is_incremental(tmp_path, monkeypatch, source_tree):
+    # The module creates its global BackupSystem under the working directory
+    monkeypatch.chdir(tmp_path)
+    backup_module = importlib.import_module("src.core.backup_system")
+    system = backup_module.BackupSystem(backup_root=str(tmp_path / "backups"))
+    job_id = system.create_backup_job("Documents", backup_module.BackupType.FILES, [str(source_tree)])
+    job = system.jobs[job_id]
+
+    first = system._execute_backup(job)
+    touch_edit(source_tree / "case_0" / "doc_0.bin", 0, b"x")
+    second = system._execute_backup(job)
+
+    assert first.status == second.status == backup_module.BackupStatus.COMPLETED
+    assert second.files_backed_up == 20
+    assert second.compressed_size < first.compressed_size / 10
+    assert system.verify_backup(job_id)["snapshots_checked"] == 2
+
+    system.restore_backup(job_id, first.backup_id, str(tmp_path / "restored"))
+    assert (tmp_path / "restored" / "documents" / "case_5" / "doc_5.bin").read_bytes() == \
+        (source_tree / "case_5" / "doc_5.bin").read_bytes()
@@ -0,0 +1,90 @@
+"""
+Unit Tests for the Encrypted Disk Cache
+
+Tests that entries are encrypted at rest, expire after the TTL, are evicted
+oldest first to fit the size bound, and that caching stays off unless a
+directory and key are configured.
+"""
+
+import os
+import time
+
+import pytest
+from cryptography.fernet import Fernet
+
+from src.core.encrypted_cache import EncryptedCacheConfig, EncryptedFileCache
+
+
+@pytest.fixture
+def config(tmp_path):
+    return EncryptedCacheConfig(root=str(tmp_path / "cache"), key=Fernet.generate_key())
+
+
+def entry_files(cache):
+    return sorted(cache.root.glob("*/*.bin"))
+
+
+def test_entries_are_encrypted_at_rest(config):
+    cache = EncryptedFileCache(config)
+    assert cache.get("ab12") is None
+
+    cache.put("ab12", b"Social Security No. 123-45-6789")
+    assert cache.get("ab12") == b"Social Security No. 123-45-6789"
+    [path] = entry_files(cache)
+    assert b"123-45-6789" not in path.read_bytes()
+
+    # Another key cannot read the entry, and it is dropped
+    other = EncryptedFileCache(EncryptedCacheConfig(root=config.root, key=Fernet.generate_key()))
+    assert other.get("ab12") is None
+    assert entry_files(cache) == []
+
+
+def test_expired_entries_are_not_served(config, monkeypatch):
+    config.ttl_seconds = 60
+    cache = EncryptedFileCache(config)
+    cache.put("cd34", b"draft")
+
+    later = time.time() + 120
+    monkeypatch.setattr("cryptography.fernet.time.time", lambda: later)
+    assert cache.get("cd34") is None
+
+
+def test_evict_drops_expired_then_oldest(config):
+    config.ttl_seconds = 3600
+    cache = EncryptedFileCache(config)
+    now = time.time()
+    for n in range(6):
+        cache.put(f"{n:02d}ff", os.urandom(600))
+        os.utime(cache._path(f"{n:02d}ff"), (now - 4600 + n * 600, now - 4600 + n * 600))
+    entry_size = cache._path("00ff").stat().st_size
+    config.max_bytes = int(entry_size * 2.5)
+
+    report = cache.evict(now)
+
+    # 00 and 01 are past the TTL; of the rest only the newest two fit
+    assert report == {"expired": 2, "evicted": 2, "bytes": 2 * entry_size}
+    assert [path.name[:2] for path in entry_files(cache)] == ["04", "05"]
+    assert cache.get("05ff") is not None
+
+
+def test_evict_if_due_runs_once_per_interval(config):
+    cache = EncryptedFileCache(config)
+    assert cache.evict_if_due() is not None
+    assert cache.evict_if_due() is None
+
+
+def test_cache_is_opt_in(monkeypatch, tmp_path):
+    monkeypatch.delenv("OCR_CACHE_DIR", raising=False)
+    monkeypatch.delenv("OCR_CACHE_KEY", raising=False)
+    assert EncryptedCacheConfig.from_env("OCR_CACHE") is None
+
+    monkeypatch.setenv("OCR_CACHE_DIR", str(tmp_path))
+    assert EncryptedCacheConfig.from_env("OCR_CACHE") is None
+
+    key = Fernet.generate_key().decode()
+    monkeypatch.setenv("OCR_CACHE_KEY", key)
+    monkeypatch.setenv("OCR_CACHE_MAX_MB", "2")
+    monkeypatch.setenv("OCR_CACHE_TTL_HOURS", "0.5")
+    config = EncryptedCacheConfig.from_env("OCR_CACHE")
+    assert (config.root, config.key, config.max_bytes, config.ttl_seconds) == (
+        str(tmp_path), key, 2 * 1024 * 1024, 1800)
@@ -0,0 +1,353 @@
+"""
+Unit Tests for the WebSocket Fan-out Hub
+
+Tests serialize-once publishing, the topic index, per-connection ordering,
+the drop/coalesce/disconnect slow-consumer policies, send failures, metrics
+and the dashboard ConnectionManager on top of the hub.
+"""
+
+import asyncio
+import json
+import time
+
+import pytest
+
+from src.core.fanout import FanoutHub, SlowConsumerPolicy
+from src.core.websocket import ALL_CLIENTS_TOPIC, ConnectionManager
+
+
+class FakeClient:
+    """Local stand-in for a WebSocket: records what it receives."""
+
+    def __init__(self, delay=0.0, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.received = []
+        self.received_at = []
+        self.closed = False
+        self.gate = None
+
+    async def send(self, payload):
+        if self.gate is not None:
+            await self.gate.wait()
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError("client went away")
+        self.received.append(payload)
+        self.received_at.append(time.perf_counter())
+
+    async def close(self, code=1000):
+        self.closed = True
+
+    # FastAPI WebSocket surface used by ConnectionManager
+    async def accept(self):
+        pass
+
+    async def send_text(self, payload):
+        await self.send(payload)
+
+
+class CountingSerializer:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, message):
+        self.calls += 1
+        return json.dumps(message)
+
+
+def register(hub, clients, **kwargs):
+    for connection_id, client in clients.items():
+        hub.register(connection_id, client.send, client.close, **kwargs)
+
+
+class TestPublishing:
+    """Messages are encoded once and routed through the topic index."""
+
+    def test_serialized_once_and_routed_by_topic(self):
+        async def scenario():
+            serializer = CountingSerializer()
+            hub = FanoutHub(serializer=serializer)
+            clients = {f"c{i}": FakeClient() for i in range(5)}
+            register(hub, clients)
+            for i in range(3):
+                hub.subscribe(f"c{i}", "session:1")
+
+            assert hub.publish({"type": "transcript", "n": 1}, topic="session:1") == 3
+            assert hub.publish({"type": "status"}) == 5
+            assert hub.publish({"type": "ignored"}, topic="session:unknown") == 0
+            await hub.drain()
+
+            assert serializer.calls == 2
+            assert clients["c0"].received == ['{"type": "transcript", "n": 1}', '{"type": "status"}']
+            assert clients["c4"].received == ['{"type": "status"}']
+            await hub.close()
+
+        asyncio.run(scenario())
+
+    def test_exclude_and_unsubscribe(self):
+        async def scenario():
+            hub = FanoutHub()
+            clients = {"a": FakeClient(), "b": FakeClient()}
+            register(hub, clients, topics=["t"])
+
+            assert hub.publish("one", topic="t", exclude={"a"}) == 1
+            assert hub.unsubscribe("b", "t")
+            assert hub.publish("two", topic="t") == 1
+            hub.unregister("a")
+            assert "t" not in hub.subscriptions
+            await hub.drain()
+
+            assert clients["a"].received == []  # Unregistered before its writer ran
+            assert clients["b"].received == ["one"]
+            await hub.close()
+
+        asyncio.run(scenario())
+
+    def test_per_connection_order_is_preserved(self):
+        async def scenario():
+            hub = FanoutHub(queue_size=1_000)
+            client = FakeClient(delay=0.001)
+            register(hub, {"a": client})
+            for i in range(50):
+                hub.send_to("a", str(i))
+            await hub.drain()
+            assert client.received == [str(i) for i in range(50)]
+            await hub.close()
+
+        asyncio.run(scenario())
+
+
+class TestSlowConsumers:
+    """A slow client only affects its own queue, per its policy."""
+
+    def test_slow_client_does_not_delay_others(self):
+        async def scenario():
+            hub = FanoutHub(queue_size=10)
+            slow, fast = FakeClient(), FakeClient()
+            slow.gate = asyncio.Event()
+            register(hub, {"slow": slow, "fast": fast})
+
+            for i in range(5):
+                hub.publish(str(i))
+            await asyncio.sleep(0.01)
+
+            assert fast.received == [str(i) for i in range(5)]
+            assert slow.received == []
+            assert hub.connection_metrics("slow")["queue_depth"] == 4  # One send in flight
+
+            slow.gate.set()
+            await hub.drain()
+            assert slow.received == fast.received
+            await hub.close()
+
+        asyncio.run(scenario())
+
+    def test_drop_policy_keeps_newest(self):
+        async def scenario():
+            hub = FanoutHub(queue_size=3, policy=SlowConsumerPolicy.DROP)
+            client = FakeClient()
+            client.gate = asyncio.Event()
+            register(hub, {"a": client})
+            hub.publish("0")
+            await asyncio.sleep(0)  # Writer takes "0" and blocks
+            for i in range(1, 8):
+                hub.publish(str(i))
+
+            assert hub.connection_metrics("a")["dropped"] == 4
+            client.gate.set()
+            await hub.drain()
+            assert client.received == ["0", "5", "6", "7"]
+            assert hub.metrics()["dropped"] == 4
+            await hub.close()
+
+        asyncio.run(scenario())
+
+    def test_coalesce_policy_replaces_queued_snapshot(self):
+        async def scenario():
+            hub = FanoutHub(queue_size=3, policy=SlowConsumerPolicy.COALESCE)
+            client = FakeClient()
+            client.gate = asyncio.Event()
+            register(hub, {"a": client})
+            hub.publish("first")
+            await asyncio.sleep(0)
+            hub.publish("dashboard v1", coalesce_key="dashboard")
+            hub.publish("transcript 1")
+            hub.publish("dashboard v2", coalesce_key="dashboard")
+            hub.publish("dashboard v3", coalesce_key="dashboard")
+
+            metrics = hub.connection_metrics("a")
+            assert metrics["queue_depth"] == 2
+            assert metrics["coalesced"] == 2
+            client.gate.set()
+            await hub.drain()
+            assert client.received == ["first", "dashboard v3", "transcript 1"]
+            await hub.close()
+
+        asyncio.run(scenario())
+
+    def test_coalesce_key_ignored_under_other_policies(self):
+        async def scenario():
+            hub = FanoutHub(queue_size=10)
+            client = FakeClient()
+            register(hub, {"a": client})
+            hub.publish("v1", coalesce_key="k")
+            hub.publish("v2", coalesce_key="k")
+            await hub.drain()
+            assert client.received == ["v1", "v2"]
+            await hub.close()
+
+        asyncio.run(scenario())
+
+    def test_disconnect_policy_closes_slow_client(self):
+        async def scenario():
+            disconnected = []
+            hub = FanoutHub(queue_size=2, policy=SlowConsumerPolicy.DISCONNECT,
+                            on_disconnect=disconnected.append)
+            slow, fast = FakeClient(), FakeClient()
+            slow.gate = asyncio.Event()
+            register(hub, {"slow": slow, "fast": fast})
+            hub.publish("0")
+            await asyncio.sleep(0)
+
+            for payload in ("1", "2"):
+                assert hub.publish(payload) == 2
+                await asyncio.sleep(0)
+            assert hub.publish("3") == 1  # Slow client's queue is full
+            await asyncio.sleep(0)
+
+            assert disconnected == ["slow"]
+            assert slow.closed
+            assert "slow" not in hub
+            assert hub.metrics()["slow_disconnects"] == 1
+            await hub.drain()
+            assert fast.received == ["0", "1", "2", "3"]
+            await hub.close()
+
+        asyncio.run(scenario())
+
+    def test_per_connection_policy_override(self):
+        async def scenario():
+            hub = FanoutHub(queue_size=1, policy=SlowConsumerPolicy.DISCONNECT)
+            client = FakeClient()
+            client.gate = asyncio.Event()
+            hub.register("a", client.send, client.close, policy=SlowConsumerPolicy.DROP)
+            for i in range(5):
+                hub.publish(str(i))
+                await asyncio.sleep(0)
+            assert "a" in hub
+            await hub.close()
+
+        asyncio.run(scenario())
+
+
+class TestFailuresAndMetrics:
+    """Broken and stuck connections are removed; metrics report backlog and lag."""
+
+    def test_send_failure_unregisters_connection(self):
+        async def scenario():
+            disconnected = []
+            hub = FanoutHub(on_disconnect=disconnected.append)
+            register(hub, {"ok": FakeClient(), "broken": FakeClient(fail=True)}, topics=["t"])
+            hub.publish("x", topic="t")
+            await hub.drain()
+
+            assert disconnected == ["broken"]
+            assert hub.subscribers("t") == {"ok"}
+            assert hub.metrics()["send_errors"] == 1
+            await hub.close()
+
+        asyncio.run(scenario())
+
+    def test_send_timeout_closes_stuck_connection(self):
+        async def scenario():
+            hub = FanoutHub(send_timeout=0.01)
+            stuck = FakeClient()
+            stuck.gate = asyncio.Event()
+            register(hub, {"stuck": stuck})
+            hub.publish("x")
+            await asyncio.sleep(0.05)
+
+            assert "stuck" not in hub
+            assert stuck.closed
+            await hub.close()
+
+        asyncio.run(scenario())
+
+    def test_metrics_report_depth_and_lag(self):
+        async def scenario():
+            hub = FanoutHub(queue_size=100)
+            slow = FakeClient(delay=0.005)
+            register(hub, {"slow": slow, "fast": FakeClient()})
+            for i in range(10):
+                hub.publish(str(i))
+
+            metrics = hub.metrics()
+            assert metrics["queue_depth_total"] == 20
+            assert metrics["queue_depth_max"] == 10
+            assert metrics["backlogged_connections"] == 2
+
+            await hub.drain()
+            metrics = hub.metrics()
+            assert metrics["queue_depth_total"] == 0
+            assert metrics["enqueued"] == 20
+            assert metrics["send_lag_max_ms"] >= 40
+            assert hub.connection_metrics("slow")["max_send_lag_ms"] >= 40
+            assert hub.connection_metrics("slow")["max_queue_depth"] == 10
+            await hub.close()
+
+        asyncio.run(scenario())
+
+    def test_invalid_queue_size(self):
+        with pytest.raises(ValueError):
+            FanoutHub(queue_size=0)
+
+
+class TestConnectionManager:
+    """The dashboard manager publishes through the hub's topic index."""
+
+    def test_subscription_filtered_broadcast(self):
+        async def scenario():
+            manager = ConnectionManager()
+            first, second = FakeClient(), FakeClient()
+            await manager.connect(first, "first")
+            await manager.connect(second, "second")
+            manager.set_subscriptions(second, ["timeline"])
+
+            assert await manager.broadcast("dash", subscription_filter="dashboard") == 1
+            assert await manager.broadcast("everyone") == 2
+            await manager.send_personal_message("hello", second)
+            await manager.hub.drain()
+
+            assert first.received == ["dash", "everyone"]
+            assert second.received == ["everyone", "hello"]
+            assert manager.client_data[second]["subscriptions"] == ["timeline"]
+            assert manager.hub.subscribers(ALL_CLIENTS_TOPIC) == {first, second}
+
+            manager.disconnect(first)
+            assert manager.metrics()["connections"] == 1
+            await manager.hub.close()
+
+        asyncio.run(scenario())
+
+    def test_failed_client_is_disconnected(self):
+        async def scenario():
+            manager = ConnectionManager()
+            broken = FakeClient(fail=True)
+            await manager.connect(broken)
+            await manager.broadcast("x")
+            await manager.hub.drain()
+
+            assert broken not in manager.active_connections
+            assert broken not in manager.client_data
+            await manager.hub.close()
+
+        asyncio.run(scenario())
+
+
+async def legacy_broadcast(clients, message):
+    """Previous ConnectionManager.broadcast: serialize, then await each client in turn."""
+    payload = json.dumps(message)
+    for client in clients:
+        await client.send(payload)
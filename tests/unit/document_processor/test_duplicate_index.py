@@ -0,0 +1,220 @@
+"""
+Unit tests for the persistent near-duplicate index.
+
+Recall and precision are measured against the all-pairs baseline (exact
+Jaccard of every pair of shingle sets) on a corpus of filings and edited
+copies. Other tests cover incremental add/remove, persistence, SimHash
+matching of short texts and DuplicateDetector's use of the index.
+"""
+
+import itertools
+import random
+import statistics
+import string
+
+import numpy as np
+import pytest
+
+from src.document_processor.duplicate_index import (
+    MinHasher,
+    NearDuplicateIndex,
+    batch_shingle_hashes,
+    jaccard,
+    shingle_hashes,
+    tokenize,
+)
+
+VOCABULARY = ["".join(random.Random(i).choices(string.ascii_lowercase, k=2 + i % 9)) for i in range(20_000)]
+ZIPF_WEIGHTS = list(itertools.accumulate(1 / rank for rank in range(1, len(VOCABULARY) + 1)))
+
+
+def random_text(rng, words):
+    return " ".join(rng.choices(VOCABULARY, cum_weights=ZIPF_WEIGHTS, k=words))
+
+
+def edit(rng, text, rate):
+    """Substitute, drop or insert roughly ``rate`` of the words."""
+    out = []
+    for word in text.split():
+        roll = rng.random()
+        if roll < rate / 3:
+            out.append(rng.choice(VOCABULARY))
+        elif roll < 2 * rate / 3:
+            continue
+        elif roll < rate:
+            out.extend([word, rng.choice(VOCABULARY)])
+        else:
+            out.append(word)
+    return " ".join(out)
+
+
+def corpus(seed=7, originals=150, copies=3):
+    """Originals plus edited copies at edit rates that straddle the threshold."""
+    rng = random.Random(seed)
+    documents = {}
+    for i in range(originals):
+        text = random_text(rng, rng.randint(150, 600))
+        documents[f"doc-{i}"] = text
+        for j in range(rng.randint(0, copies)):
+            documents[f"doc-{i}-v{j}"] = edit(rng, text, rng.uniform(0.0, 0.12))
+    return documents
+
+
+def all_pairs_baseline(documents, threshold):
+    shingles = {doc_id: np.unique(shingle_hashes(tokenize(text))) for doc_id, text in documents.items()}
+    return {(a, b) for a, b in itertools.combinations(sorted(shingles), 2)
+            if jaccard(shingles[a], shingles[b]) >= threshold}
+
+
+def index_pairs(index, documents):
+    return {tuple(sorted((doc_id, match.document_id)))
+            for doc_id in documents for match in index.near_duplicates(doc_id)}
+
+
+class TestAccuracy:
+    """LSH lookups against the all-pairs exact Jaccard baseline."""
+
+    @pytest.mark.parametrize("threshold", [0.5, 0.6, 0.8])
+    def test_recall_and_precision(self, threshold):
+        documents = corpus()
+        index = NearDuplicateIndex(threshold=threshold)
+        index.add_many(documents.items())
+
+        truth = all_pairs_baseline(documents, threshold)
+        found = index_pairs(index, documents)
+        recall = len(found & truth) / len(truth)
+        precision = len(found & truth) / len(found)
+
+        assert len(truth) > 50
+        assert recall >= 0.9, (threshold, recall)
+        assert precision >= 0.9, (threshold, precision)
+
+    def test_unrelated_documents_are_not_candidates(self):
+        rng = random.Random(3)
+        index = NearDuplicateIndex()
+        index.add_many((f"doc-{i}", random_text(rng, 300)) for i in range(500))
+
+        assert index.query(random_text(rng, 300)) == []
+        stats = index.get_statistics()
+        assert stats["bucket_entries"] == 500 * stats["bands"]
+
+    def test_estimate_tracks_exact_jaccard(self):
+        rng = random.Random(5)
+        hasher = MinHasher()
+        errors = []
+        for _ in range(30):
+            original = tokenize(random_text(rng, 400))
+            copy = tokenize(edit(rng, " ".join(original), rng.uniform(0.0, 0.15)))
+
+            signatures = hasher.signatures(*batch_shingle_hashes([original, copy]))
+            estimate = np.mean(signatures[0] == signatures[1])
+            errors.append(estimate - jaccard(shingle_hashes(original), shingle_hashes(copy)))
+
+        assert abs(statistics.mean(errors)) < 0.02  # Unbiased
+        assert max(map(abs, errors)) < 0.2          # About 0.04 standard error at 128 permutations
+
+
+class TestUpdates:
+    """Documents are added, replaced and removed as they arrive."""
+
+    def test_add_and_remove(self):
+        rng = random.Random(11)
+        original = random_text(rng, 300)
+        index = NearDuplicateIndex()
+        index.add_many([("a", original), ("b", random_text(rng, 300))])
+
+        index.add("a-copy", edit(rng, original, 0.02))
+        assert [m.document_id for m in index.near_duplicates("a")] == ["a-copy"]
+
+        assert index.remove("a-copy")
+        assert not index.remove("a-copy")
+        assert index.near_duplicates("a") == []
+        assert "a-copy" not in index and len(index) == 2
+        assert index.get_statistics()["bucket_entries"] == 2 * index.bands
+
+    def test_re_adding_replaces_the_signature(self):
+        rng = random.Random(12)
+        first, second = random_text(rng, 300), random_text(rng, 300)
+        index = NearDuplicateIndex()
+        index.add("doc", first)
+        index.add("doc", second)
+
+        assert index.query(first) == []
+        assert [m.document_id for m in index.query(second)] == ["doc"]
+        assert len(index) == 1
+
+    def test_unknown_and_empty_documents(self):
+        index = NearDuplicateIndex()
+        index.add("blank", "   ...  ")
+
+        assert index.query("") == []
+        assert index.near_duplicates("blank") == []
+        with pytest.raises(KeyError):
+            index.near_duplicates("missing")
+
+    def test_short_texts_match_by_simhash(self):
+        index = NearDuplicateIndex()
+        index.add("letter", "Please find enclosed the signed engagement letter for review")
+        index.add("notice", "Notice of deposition of the plaintiff scheduled for next Tuesday")
+
+        [match] = index.query("Please find enclosed the signed engagement letter for your review.")
+        assert match.document_id == "letter"
+        assert match.simhash_distance is not None and match.simhash_distance <= index.simhash_distance
+        assert index.query("Order granting the motion to compel discovery responses") == []
+
+
+class TestPersistence:
+    """The index lives in a local SQLite file."""
+
+    def test_reopen(self, tmp_path):
+        rng = random.Random(21)
+        path = str(tmp_path / "duplicates.db")
+        original = random_text(rng, 300)
+
+        index = NearDuplicateIndex(path)
+        index.add_many([("a", original), ("b", random_text(rng, 300))])
+        index.close()
+
+        index = NearDuplicateIndex(path)
+        assert len(index) == 2
+        assert [m.document_id for m in index.query(edit(rng, original, 0.02))] == ["a"]
+        index.add("c", random_text(rng, 300))
+        index.close()
+
+        with pytest.raises(ValueError):
+            NearDuplicateIndex(path, bands=16)
+
+    def test_invalid_banding(self):
+        with pytest.raises(ValueError):
+            NearDuplicateIndex(num_perm=128, bands=48)
+
+
+class TestDuplicateDetector:
+    """DuplicateDetector confirms LSH candidates with its own comparison."""
+
+    @pytest.fixture
+    def detector(self, tmp_path, monkeypatch):
+        module = pytest.importorskip("src.document_processor.duplicate_detector")
+        monkeypatch.setattr(module.DuplicateDetector, "_initialize_models",
+                            lambda self: setattr(self, "semantic_model_instance", None))
+        return module.DuplicateDetector(index_path=str(tmp_path / "duplicates.db"))
+
+    def test_only_candidates_are_compared(self, detector, monkeypatch):
+        rng = random.Random(31)
+        original = random_text(rng, 400)
+        detector.create_fingerprint("original", original)
+        detector.create_fingerprint("copy", original)
+        for i in range(20):
+            detector.create_fingerprint(f"other-{i}", random_text(rng, 400))
+
+        compared = []
+        compare = detector._compare_documents
+        monkeypatch.setattr(detector, "_compare_documents",
+                            lambda fp1, fp2: compared.append(fp2.document_id) or compare(fp1, fp2))
+
+        matches = detector.find_duplicates("original")
+        assert [m.document_id_2 for m in matches] == ["copy"]
+        assert compared == ["copy"]
+
+        assert detector.remove_document("copy")
+        assert detector.find_duplicates("original") == []
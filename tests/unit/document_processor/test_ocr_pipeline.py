@@ -0,0 +1,193 @@
+"""
+Unit Tests for the Streaming OCR Pipeline
+
+Tests in-order streaming from the worker pool, the bounded page window,
+text-layer detection, the encrypted page-image cache and per-page error reporting.
+"""
+
+import asyncio
+import shutil
+import time
+
+import numpy as np
+import pytest
+from cryptography.fernet import Fernet
+from PIL import Image
+from pypdf import PdfWriter
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+from src.core.encrypted_cache import EncryptedCacheConfig
+from src.document_processor.ocr_pipeline import (
+    OCRPageCache,
+    OCRPipeline,
+    OCRSettings,
+    page_image_hash,
+    usable_text_layer,
+)
+
+
+def fake_recognizer(image, settings):
+    """Stand-in for Tesseract: reads the page number encoded in the pixels."""
+    page_num = int(round(255 - image.mean()))
+    time.sleep(0.05 if page_num % 2 else 0.001)  # Odd pages finish late
+    return {"text": f"page {page_num}", "data": {"text": [f"page {page_num}"], "conf": ["90"]}}
+
+
+def failing_recognizer(image, settings):
+    if int(round(255 - image.mean())) == 2:
+        raise RuntimeError("tesseract crashed")
+    return fake_recognizer(image, settings)
+
+
+def write_tiff(path, pages):
+    """Multi-page TIFF whose page n is a flat image of value 255 - n."""
+    frames = [Image.new("L", (64, 48), 255 - n) for n in range(1, pages + 1)]
+    frames[0].save(path, save_all=True, append_images=frames[1:])
+    return str(path)
+
+
+def write_text_pdf(path, page_texts):
+    """PDF with a real text layer on each page."""
+    writer = PdfWriter()
+    font = writer._add_object(DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"),
+        NameObject("/Subtype"): NameObject("/Type1"),
+        NameObject("/BaseFont"): NameObject("/Helvetica"),
+    }))
+    for text in page_texts:
+        page = writer.add_blank_page(612, 792)
+        page[NameObject("/Resources")] = DictionaryObject({
+            NameObject("/Font"): DictionaryObject({NameObject("/F1"): font})
+        })
+        stream = DecodedStreamObject()
+        stream.set_data(f"BT /F1 10 Tf 72 720 Td ({text}) Tj ET".encode())
+        page[NameObject("/Contents")] = writer._add_object(stream)
+    with open(path, "wb") as f:
+        writer.write(f)
+    return str(path)
+
+
+def collect(pipeline, path, kind, settings=None):
+    async def run():
+        return [page async for page in pipeline.iter_pages(path, kind, settings or OCRSettings())]
+    return asyncio.run(run())
+
+
+@pytest.fixture
+def cache_config(tmp_path):
+    return EncryptedCacheConfig(root=str(tmp_path / "cache"), key=Fernet.generate_key())
+
+
+@pytest.fixture
+def pipeline(cache_config):
+    pipeline = OCRPipeline(max_workers=2, window=3, cache=cache_config, recognizer=fake_recognizer)
+    yield pipeline
+    pipeline.close()
+
+
+class TestStreaming:
+    """Pages come back in order from a bounded window of jobs."""
+
+    def test_pages_stream_in_order_within_window(self, pipeline, tmp_path):
+        pages = collect(pipeline, write_tiff(tmp_path / "scan.tif", 9), "image")
+
+        assert [page["page_num"] for page in pages] == list(range(1, 10))
+        assert [page["text"] for page in pages] == [f"page {n}" for n in range(1, 10)]
+        assert all(page["source"] == "ocr" for page in pages)
+        assert (pages[0]["width"], pages[0]["height"]) == (64, 48)
+        assert pipeline.max_in_flight == 3
+
+    def test_first_page_arrives_before_the_last_is_done(self, tmp_path):
+        pipeline = OCRPipeline(max_workers=1, window=2, recognizer=fake_recognizer)
+        path = write_tiff(tmp_path / "scan.tif", 12)
+
+        async def run():
+            start = time.perf_counter()
+            arrivals = []
+            async for _ in pipeline.iter_pages(path, "image", OCRSettings()):
+                arrivals.append(time.perf_counter() - start)
+            return arrivals
+
+        arrivals = asyncio.run(run())
+        pipeline.close()
+        assert arrivals[0] < arrivals[-1] / 2
+
+    def test_failed_page_is_reported_and_others_continue(self, tmp_path):
+        pipeline = OCRPipeline(max_workers=2, recognizer=failing_recognizer)
+        pages = collect(pipeline, write_tiff(tmp_path / "scan.tif", 4), "image")
+        pipeline.close()
+
+        assert [page["source"] for page in pages] == ["ocr", "error", "ocr", "ocr"]
+        assert "tesseract crashed" in pages[1]["error"]
+
+
+class TestTextLayer:
+    """Pages that already carry text skip rasterization and OCR."""
+
+    def test_usable_text_layer(self):
+        assert usable_text_layer("IN THE UNITED STATES DISTRICT COURT FOR THE DISTRICT OF COLUMBIA, Plaintiff v.")
+        assert not usable_text_layer("Page 3")
+        assert not usable_text_layer("")
+        assert not usable_text_layer("\x01\x02 ### ~~~ ^^^ " * 10)
+
+    def test_text_layer_pages_are_not_rasterized(self, pipeline, tmp_path):
+        body = "The defendant moves to dismiss the complaint for failure to state a claim upon relief."
+        path = write_text_pdf(tmp_path / "filing.pdf", [f"{body} Page {n}" for n in range(1, 6)])
+
+        pages = collect(pipeline, path, "pdf")
+
+        assert [page["source"] for page in pages] == ["text_layer"] * 5
+        assert pages[2]["text"].strip().endswith("Page 3")
+        assert pages[0]["data"] is None
+
+    @pytest.mark.skipif(not shutil.which("pdftoppm"), reason="poppler not installed")
+    def test_short_text_layer_falls_back_to_ocr(self, pipeline, tmp_path):
+        path = write_text_pdf(tmp_path / "cover.pdf", ["Exhibit A"])
+        pages = collect(pipeline, path, "pdf")
+        assert pages[0]["source"] == "ocr"
+
+
+class TestCache:
+    """OCR output is reused for identical page images and settings."""
+
+    def test_second_run_is_served_from_cache(self, pipeline, tmp_path):
+        path = write_tiff(tmp_path / "scan.tif", 4)
+
+        first = collect(pipeline, path, "image")
+        second = collect(pipeline, path, "image")
+        other_settings = collect(pipeline, path, "image", OCRSettings(psm=6))
+
+        assert {page["source"] for page in first} == {"ocr"}
+        assert {page["source"] for page in second} == {"cache"}
+        assert [page["text"] for page in second] == [page["text"] for page in first]
+        assert {page["source"] for page in other_settings} == {"ocr"}
+
+    def test_cache_is_off_unless_configured(self, tmp_path):
+        pipeline = OCRPipeline(max_workers=1, recognizer=fake_recognizer)
+        path = write_tiff(tmp_path / "scan.tif", 2)
+
+        collect(pipeline, path, "image")
+        again = collect(pipeline, path, "image")
+        pipeline.close()
+
+        assert {page["source"] for page in again} == {"ocr"}
+        assert list(tmp_path.iterdir()) == [tmp_path / "scan.tif"]
+
+    def test_page_text_is_encrypted_at_rest(self, pipeline, cache_config, tmp_path):
+        collect(pipeline, write_tiff(tmp_path / "scan.tif", 3), "image")
+
+        entries = list((tmp_path / "cache").glob("*/*.bin"))
+        assert len(entries) == 3
+        assert not any(b"page" in entry.read_bytes() for entry in entries)
+
+    def test_duplicate_pages_share_an_entry(self, cache_config):
+        cache = OCRPageCache(cache_config)
+        page = np.full((10, 10), 200, dtype=np.uint8)
+        key = page_image_hash(page, OCRSettings())
+
+        assert key == page_image_hash(page.copy(), OCRSettings())
+        assert key != page_image_hash(page, OCRSettings(languages=["spa"]))
+        assert key != page_image_hash(page.reshape(5, 20), OCRSettings())
+        assert cache.get(key) is None
+        cache.put(key, {"text": "cached"})
+        assert cache.get(key) == {"text": "cached"}
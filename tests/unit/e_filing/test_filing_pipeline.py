@@ -0,0 +1,230 @@
+"""
+Unit Tests for the Filing Preparation Pipeline
+
+Tests that batch preparation matches DocumentProcessor.process_document
+document for document, the streaming content scan across chunk boundaries,
+the encrypted content-hash cache on resubmission, bounded concurrency and
+per-document error reporting.
+"""
+
+import asyncio
+import copy
+import time
+from uuid import uuid4
+
+import pytest
+from cryptography.fernet import Fernet
+
+from src.core.encrypted_cache import EncryptedCacheConfig
+from src.e_filing.models import CourtDocument, DocumentMetadata, DocumentType
+from src.e_filing.processors.document_processor import DocumentProcessor
+from src.e_filing.processors.filing_pipeline import (
+    PAGE_MARKER,
+    ContentScanner,
+    FilingPipeline,
+    PreparationCache,
+    spool_content,
+)
+
+
+def pdf_bytes(pages, lines_per_page=20, redacted=False):
+    """PDF-like content: a page object and some text lines per page."""
+    parts = [b"%PDF-1.4\n"]
+    for page in range(pages):
+        parts.append(b"<< /Type/Page /Parent 1 0 R >>\n")
+        parts.extend(f"Page {page} line {line} of the motion text\n".encode() for line in range(lines_per_page))
+    if redacted:
+        parts.append(b"Witness address [REDACTED]\n")
+    parts.append(b"%%EOF\n")
+    return b"".join(parts)
+
+
+def make_document(content, title="Motion to Dismiss", mime_type="application/pdf", file_name="motion.pdf"):
+    return CourtDocument(
+        file_name=file_name,
+        file_content=content,
+        mime_type=mime_type,
+        metadata=DocumentMetadata(title=title, document_type=DocumentType.MOTION),
+        case_id=uuid4(),
+        attorney_id=uuid4()
+    )
+
+
+def filing_documents():
+    return [
+        make_document(pdf_bytes(3)),
+        make_document(pdf_bytes(1, redacted=True), title="Exhibit A"),
+        make_document(b"Plain text brief. " * 40, title="Brief", mime_type="text/plain", file_name="brief.pdf"),
+        make_document(b"%PDF tiny", title="Notice"),
+        make_document(pdf_bytes(2), file_name="bad|name.pdf"),
+    ]
+
+
+def outcome(document):
+    return (
+        document.status,
+        document.file_name,
+        document.mime_type,
+        document.file_content,
+        document.validation_errors,
+        document.metadata.file_hash,
+        document.metadata.file_size_bytes,
+        document.metadata.page_count,
+        document.metadata.word_count,
+        document.metadata.redacted,
+        document.metadata.description,
+    )
+
+
+async def legacy_process(processor, documents):
+    """The previous batch behaviour: one document at a time, in the event loop."""
+    return [await processor.process_document(document) for document in documents]
+
+
+@pytest.fixture
+def cache_config(tmp_path):
+    return EncryptedCacheConfig(root=str(tmp_path / "cache"), key=Fernet.generate_key())
+
+
+@pytest.fixture
+def pipeline(tmp_path, cache_config):
+    pipeline = FilingPipeline(
+        DocumentProcessor(),
+        max_concurrency=3,
+        max_workers=2,
+        cache=cache_config,
+        spool_dir=str(tmp_path),
+        chunk_size=64
+    )
+    yield pipeline
+    pipeline.close()
+
+
+def test_matches_process_document(pipeline):
+    documents = filing_documents()
+    expected = asyncio.run(legacy_process(DocumentProcessor(), copy.deepcopy(documents)))
+    prepared = asyncio.run(pipeline.prepare_documents(documents))
+
+    assert [outcome(document) for document in prepared] == [outcome(document) for document in expected]
+    assert prepared[0].status == "processed"
+    assert prepared[0].metadata.page_count == 3
+    assert prepared[1].metadata.redacted
+    assert prepared[4].status == "validation_failed"
+
+
+def test_spool_files_are_removed(pipeline, tmp_path):
+    asyncio.run(pipeline.prepare_documents(filing_documents()))
+    assert not list(tmp_path.glob("*.spool*"))
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, 9, 10, 11, 64, 4096])
+def test_scan_is_independent_of_chunk_size(tmp_path, chunk_size):
+    content = pdf_bytes(5, lines_per_page=2, redacted=True) + "sealed ¶ ***".encode()
+    path, scan = spool_content(content, str(tmp_path), chunk_size)
+
+    with open(path, "rb") as f:
+        assert f.read() == content
+    assert scan.size_bytes == len(content)
+    assert scan.page_markers == content.count(PAGE_MARKER) == 5
+    assert scan.redacted
+
+
+def test_scanner_matches_processor_checks():
+    processor = DocumentProcessor()
+    for content in [pdf_bytes(4), pdf_bytes(0), b"/Type/Pages /Type/Page", b"no markers, blacked\nout"]:
+        scanner = ContentScanner()
+        for start in range(0, len(content), 5):
+            scanner.update(content[start:start + 5])
+        scan = scanner.result()
+        assert scan.file_hash == processor._generate_file_hash(content)
+        assert scan.page_count == asyncio.run(processor._extract_pdf_page_count(content))
+        assert scan.redacted == asyncio.run(processor._check_for_redactions(content))
+
+
+def test_resubmission_is_served_from_cache(pipeline):
+    first = asyncio.run(pipeline.prepare_documents(filing_documents()))
+    jobs = pipeline.worker_jobs
+    assert jobs == 4 and pipeline.cache_hits == 0  # The invalid file name never reaches a worker
+
+    again = asyncio.run(pipeline.prepare_documents(filing_documents()))
+    assert pipeline.worker_jobs == jobs
+    assert pipeline.cache_hits == 4
+    assert [outcome(document) for document in again] == [outcome(document) for document in first]
+
+
+def test_cached_conversion_is_restored(pipeline, tmp_path):
+    content = b"Converted brief text. " * 10
+    first = asyncio.run(pipeline.prepare_document(
+        make_document(content, mime_type="text/plain", file_name="brief.pdf")))
+    again = asyncio.run(pipeline.prepare_document(
+        make_document(content, mime_type="text/plain", file_name="brief.pdf")))
+
+    assert pipeline.cache_hits == 1
+    key = PreparationCache.key(first.metadata.file_hash, "text/plain")
+    assert pipeline.cache.get(key)[1] == content
+    [entry] = (tmp_path / "cache").glob("*/*.bin")
+    assert b"Converted brief" not in entry.read_bytes()
+    assert again.mime_type == "application/pdf"
+    assert again.file_content == first.file_content == content
+    assert again.metadata.word_count == first.metadata.word_count == 30
+
+
+def test_concurrency_is_bounded(tmp_path):
+    processor = DocumentProcessor()
+    pipeline = FilingPipeline(processor, max_concurrency=3, max_workers=2, spool_dir=str(tmp_path))
+    documents = [make_document(pdf_bytes(1, lines_per_page=n + 1)) for n in range(10)]
+    prepared = asyncio.run(pipeline.prepare_documents(documents))
+    pipeline.close()
+
+    assert pipeline.max_in_flight == 3
+    assert pipeline.worker_jobs == 10
+    assert [document.metadata.word_count for document in prepared] == [
+        document.metadata.word_count for document in asyncio.run(legacy_process(processor, copy.deepcopy(documents)))
+    ]
+
+
+def test_errors_stay_with_their_document(pipeline, monkeypatch):
+    extract_metadata = pipeline.processor.extract_metadata
+
+    async def broken_metadata(document, scan=None):
+        if document.metadata.title == "Exhibit A":
+            raise RuntimeError("metadata store unavailable")
+        return await extract_metadata(document, scan)
+
+    monkeypatch.setattr(pipeline.processor, "extract_metadata", broken_metadata)
+    prepared = asyncio.run(pipeline.prepare_documents(filing_documents()))
+
+    assert prepared[1].status == "processing_failed"
+    assert prepared[1].validation_errors == ["Document processing failed: metadata store unavailable"]
+    assert prepared[0].status == "processed"
+
+
+def test_cache_is_off_unless_configured(tmp_path, monkeypatch):
+    monkeypatch.delenv("EFILING_CACHE_DIR", raising=False)
+    processor = DocumentProcessor()
+    assert processor.preparation_cache is None
+    processor.pipeline.spool_dir = str(tmp_path)
+
+    asyncio.run(processor.pipeline.prepare_documents(filing_documents()))
+    asyncio.run(processor.pipeline.prepare_documents(filing_documents()))
+    processor.pipeline.close()
+
+    assert processor.pipeline.cache_hits == 0 and processor.pipeline.worker_jobs == 8
+    assert not list(tmp_path.glob("**/*.bin"))
+
+
+def test_batch_process_documents_uses_pipeline(cache_config):
+    processor = DocumentProcessor()
+    processor.preparation_cache = cache_config
+    prepared = asyncio.run(processor.batch_process_documents(filing_documents()))
+    processor.pipeline.close()
+
+    assert processor.pipeline.worker_jobs == 4
+    assert [document.status for document in prepared] == [
+        "processed", "processed", "processing_failed", "processing_failed", "validation_failed"
+    ]
+
+
+def memory(usage):
+    peak, working = usage
+    return f"parent peak {peak / 2**20:.0f} MiB ({working / 2**20:.0f} MiB working set)"
@@ -0,0 +1,389 @@
+"""
+Unit Tests for the Filing Status Reconciler
+
+Tests the id and court indexes, one batched status query per court and
+credentials, the bounded fan-out fallback for courts without a batch query,
+adaptive recheck intervals, transition-only events and failure handling.
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+from uuid import UUID, uuid4
+
+import pytest
+
+from src.e_filing.adapters.base_adapter import BaseCourtAdapter
+from src.e_filing.models import (
+    Attorney,
+    CaseInfo,
+    ContactInfo,
+    CourtDocument,
+    CourtInfo,
+    CourtType,
+    DocumentMetadata,
+    DocumentType,
+    EFilingCredentials,
+    FilingRequest,
+    FilingResponse,
+    FilingStatus,
+    ServiceInfo,
+    ServiceType,
+)
+from src.e_filing.services.status_reconciler import RecheckPolicy, StatusReconciler
+
+START = datetime(2026, 3, 2, 9, 0)
+
+
+class FakeCourtAdapter(BaseCourtAdapter):
+    """Local court system: statuses by external ID, with a round-trip latency."""
+
+    def __init__(self, latency=0.0, batched=True):
+        super().__init__("fake_court")
+        self.statuses = {}
+        self.latency = latency
+        self.batched = batched
+        self.round_trips = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.fail = False
+
+    def _response(self, external_filing_id):
+        status = self.statuses.get(external_filing_id)
+        if status is None:
+            return FilingResponse(filing_id=UUID(int=0), success=False, status=FilingStatus.REJECTED,
+                                  message="Filing not found", errors=["Filing ID not found"])
+        return FilingResponse(filing_id=UUID(int=0), success=True, status=status,
+                              message=f"Filing status: {status.value}", transaction_id=external_filing_id)
+
+    async def _round_trip(self):
+        self.round_trips += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+            if self.fail:
+                raise ConnectionError("court system unavailable")
+        finally:
+            self.in_flight -= 1
+
+    async def check_filing_status(self, external_filing_id, credentials):
+        await self._round_trip()
+        return self._response(external_filing_id)
+
+    async def check_filing_statuses(self, external_filing_ids, credentials):
+        if not self.batched:
+            return await super().check_filing_statuses(external_filing_ids, credentials)
+        await self._round_trip()
+        return {external_filing_id: self._response(external_filing_id) for external_filing_id in external_filing_ids}
+
+    async def submit_filing(self, filing_request, documents, credentials):
+        raise NotImplementedError
+
+    async def cancel_filing(self, external_filing_id, credentials, reason=None):
+        raise NotImplementedError
+
+    async def validate_filing(self, filing_request):
+        return {"valid": True, "errors": [], "warnings": []}
+
+    async def calculate_fees(self, filing_request):
+        return {}
+
+    async def get_health_status(self):
+        return {"available": True}
+
+    async def authenticate(self, credentials):
+        return {"success": True}
+
+
+class Clock:
+    def __init__(self, now=START):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, **kwargs):
+        self.now += timedelta(**kwargs)
+
+
+def make_court(n):
+    return CourtInfo(name=f"Court {n}", court_type=CourtType.STATE_SUPERIOR, jurisdiction="CA",
+                     address=f"{n} Main St", city="Sacramento", state="CA", zip_code="95814")
+
+
+def make_credentials():
+    return EFilingCredentials(attorney_id=uuid4(), court_system="state_system",
+                              username="counsel", password_hash="x", bar_number="123456")
+
+
+def filing_template(court):
+    document = CourtDocument(
+        file_name="motion.pdf",
+        metadata=DocumentMetadata(title="Motion", document_type=DocumentType.MOTION),
+        case_id=uuid4(),
+        attorney_id=uuid4()
+    )
+    return FilingRequest(
+        case_info=CaseInfo(case_title="Doe v. Roe", case_type="civil", court=court),
+        documents=[document],
+        primary_document=document.id,
+        filing_type="motion",
+        filing_description="Motion to compel",
+        service_info=ServiceInfo(service_type=ServiceType.ELECTRONIC),
+        filing_attorney=Attorney(first_name="Ada", last_name="Counsel", bar_number="123456",
+                                 state_bar="CA", contact_info=ContactInfo()),
+        court_system="state_system"
+    )
+
+
+def make_filing(template, external_id, submitted_at=START, status=FilingStatus.SUBMITTED):
+    return template.model_copy(update={
+        "id": uuid4(),
+        "external_id": external_id,
+        "status": status,
+        "submission_date": submitted_at
+    })
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def courts():
+    return [make_court(n) for n in range(3)]
+
+
+@pytest.fixture
+def adapters(courts):
+    return {court.id: FakeCourtAdapter() for court in courts}
+
+
+@pytest.fixture
+def reconciler(adapters, clock):
+    return StatusReconciler(lambda court: adapters[court.id], clock=clock)
+
+
+def track_filings(reconciler, adapters, courts, per_court, credentials):
+    filings = []
+    for court in courts:
+        template = filing_template(court)
+        for n in range(per_court):
+            external_id = f"{court.name}-{n}"
+            adapters[court.id].statuses[external_id] = FilingStatus.SUBMITTED
+            filing = make_filing(template, external_id)
+            reconciler.track(filing, credentials)
+            filings.append(filing)
+    return filings
+
+
+def test_filings_are_indexed_by_id_and_court(reconciler, adapters, courts):
+    filings = track_filings(reconciler, adapters, courts, 4, make_credentials())
+
+    assert reconciler.get(filings[5].id).external_id == "Court 1-1"
+    assert {tracked.external_id for tracked in reconciler.court_filings(courts[2].id)} == {
+        f"Court 2-{n}" for n in range(4)
+    }
+
+    reconciler.untrack(filings[5].id)
+    assert reconciler.get(filings[5].id) is None
+    assert len(reconciler.court_filings(courts[1].id)) == 3
+    assert reconciler.get_stats()["tracked_filings"] == 11
+
+
+def test_filings_without_court_id_are_not_tracked(reconciler, courts):
+    filing = make_filing(filing_template(courts[0]), None)
+    assert reconciler.track(filing, make_credentials()) is None
+    assert reconciler.get_stats()["tracked_filings"] == 0
+
+
+def test_one_batched_query_per_court_and_credentials(reconciler, adapters, courts, clock):
+    first, second = make_credentials(), make_credentials()
+    track_filings(reconciler, adapters, courts, 4, first)
+    track_filings(reconciler, adapters, courts[:1], 2, second)
+
+    assert asyncio.run(reconciler.reconcile()) == []  # Nothing is due yet
+    clock.advance(minutes=5)
+    asyncio.run(reconciler.reconcile())
+
+    assert [adapters[court.id].round_trips for court in courts] == [2, 1, 1]
+    assert reconciler.batch_queries == 4
+    assert reconciler.filings_checked == 14
+
+
+def test_fan_out_fallback_is_bounded(courts, clock):
+    adapter = FakeCourtAdapter(latency=0.01, batched=False)
+    adapter.max_status_concurrency = 3
+    reconciler = StatusReconciler(lambda court: adapter, clock=clock)
+    track_filings(reconciler, {courts[0].id: adapter}, courts[:1], 10, make_credentials())
+
+    clock.advance(minutes=5)
+    asyncio.run(reconciler.reconcile())
+
+    assert adapter.round_trips == 10
+    assert adapter.max_in_flight == 3
+    assert reconciler.batch_queries == 1
+    assert reconciler.errors == 0
+
+
+def test_only_real_transitions_emit_events(reconciler, adapters, courts, clock):
+    filings = track_filings(reconciler, adapters, courts, 2, make_credentials())
+    seen, seen_async = [], []
+
+    async def record_async(transition):
+        seen_async.append(transition)
+
+    reconciler.add_listener(seen.append)
+    reconciler.add_listener(record_async)
+
+    clock.advance(minutes=5)
+    assert asyncio.run(reconciler.reconcile()) == []
+
+    adapters[courts[1].id].statuses["Court 1-0"] = FilingStatus.ACCEPTED
+    clock.advance(hours=1)
+    transitions = asyncio.run(reconciler.reconcile())
+
+    assert len(transitions) == 1 and seen == transitions and seen_async == transitions
+    transition = transitions[0]
+    assert transition.filing_id == filings[2].id
+    assert (transition.previous_status, transition.status) == (FilingStatus.SUBMITTED, FilingStatus.ACCEPTED)
+    assert filings[2].status == FilingStatus.ACCEPTED
+    assert reconciler.status_response(filings[2].id).status == FilingStatus.ACCEPTED
+
+    clock.advance(hours=6)
+    assert asyncio.run(reconciler.reconcile()) == []
+    assert len(seen) == 1
+
+
+def test_recheck_policy_backs_off_with_age_and_quiet_checks():
+    policy = RecheckPolicy()
+    young = policy.next_interval(FilingStatus.SUBMITTED, timedelta(0))
+    assert young == timedelta(minutes=2)
+    assert policy.next_interval(FilingStatus.SUBMITTED, timedelta(0), 2) == young * 1.5 ** 2
+    assert policy.next_interval(FilingStatus.SUBMITTED, timedelta(days=2)) == young * 3
+    assert policy.next_interval(FilingStatus.ACCEPTED, timedelta(0)) > young
+    assert policy.next_interval(FilingStatus.SUBMITTED, timedelta(days=30), 20) == policy.max_interval
+    assert policy.next_interval(FilingStatus.SERVED, timedelta(0)) is None
+
+
+def test_quiet_filings_are_checked_less_often(reconciler, adapters, courts, clock):
+    filings = track_filings(reconciler, adapters, courts[:1], 1, make_credentials())
+    tracked = reconciler.get(filings[0].id)
+
+    intervals = []
+    for _ in range(4):
+        clock.now = tracked.next_check
+        asyncio.run(reconciler.reconcile())
+        intervals.append(tracked.next_check - clock.now)
+    assert intervals == sorted(intervals) and intervals[0] < intervals[-1]
+
+    adapters[courts[0].id].statuses["Court 0-0"] = FilingStatus.ACCEPTED
+    clock.now = tracked.next_check
+    asyncio.run(reconciler.reconcile())
+    assert tracked.unchanged_checks == 0  # Backoff starts over for the new status
+    assert tracked.next_check - clock.now == reconciler.policy.next_interval(
+        FilingStatus.ACCEPTED, clock.now - tracked.submitted_at)
+
+
+def test_settled_filings_stop_polling(reconciler, adapters, courts, clock):
+    filings = track_filings(reconciler, adapters, courts[:1], 2, make_credentials())
+    adapters[courts[0].id].statuses["Court 0-0"] = FilingStatus.SERVED
+
+    clock.advance(minutes=5)
+    asyncio.run(reconciler.reconcile())
+    assert reconciler.get(filings[0].id).settled
+    assert reconciler.get_stats()["pending_filings"] == 1
+
+    clock.advance(days=1)
+    asyncio.run(reconciler.reconcile())
+    assert reconciler.filings_checked == 3
+
+    assert reconciler.forget_settled(clock.now) == 1
+    assert reconciler.get(filings[0].id) is None
+    assert reconciler.get(filings[1].id) is not None
+
+
+def test_failed_checks_are_not_transitions(reconciler, adapters, courts, clock):
+    filings = track_filings(reconciler, adapters, courts[:2], 1, make_credentials())
+    del adapters[courts[0].id].statuses["Court 0-0"]  # Court reports not found
+    adapters[courts[1].id].fail = True  # Court system down
+
+    clock.advance(minutes=5)
+    assert asyncio.run(reconciler.reconcile()) == []
+
+    assert reconciler.errors == 2
+    for filing in filings:
+        tracked = reconciler.get(filing.id)
+        assert tracked.status == FilingStatus.SUBMITTED
+        assert tracked.consecutive_errors == 1
+        assert tracked.next_check - clock.now > timedelta(minutes=2)
+
+
+def test_service_check_uses_reconciled_status(adapters, courts, clock):
+    from src.e_filing.services.filing_service import EFilingService
+
+    service = EFilingService()
+    service.status_reconciler.adapter_for = lambda court: adapters[court.id]
+    service.status_reconciler.clock = clock
+    filing = track_filings(service.status_reconciler, adapters, courts[:1], 1, make_credentials())[0]
+    service._record_filing(FilingResponse(filing_id=filing.id, success=True,
+                                          status=FilingStatus.SUBMITTED, message="Submitted"))
+
+    adapters[courts[0].id].statuses["Court 0-0"] = FilingStatus.ACCEPTED
+    clock.advance(minutes=5)
+    transitions = asyncio.run(service.reconcile_filing_statuses())
+    response = asyncio.run(service.check_filing_status(filing.id, make_credentials()))
+
+    assert [transition.status for transition in transitions] == [FilingStatus.ACCEPTED]
+    assert response.status == FilingStatus.ACCEPTED
+    assert adapters[courts[0].id].round_trips == 1  # The status check did not call the court
+
+    service.status_reconciler.untrack(filing.id)
+    response = asyncio.run(service.check_filing_status(filing.id, make_credentials()))
+    assert response.status == FilingStatus.SUBMITTED and response.message == "Submitted"
+
+
+def test_stale_filings_are_checked_with_the_court(adapters, courts, clock):
+    from src.e_filing.services.filing_service import EFilingService
+
+    service = EFilingService()
+    service.status_reconciler.adapter_for = lambda court: adapters[court.id]
+    service.status_reconciler.clock = clock
+    filing = track_filings(service.status_reconciler, adapters, courts[:1], 1, make_credentials())[0]
+    adapters[courts[0].id].statuses["Court 0-0"] = FilingStatus.ACCEPTED
+
+    # Never reconciled: the court is asked once, then the fresh status is reused
+    assert asyncio.run(service.check_filing_status(filing.id, make_credentials())).status == FilingStatus.ACCEPTED
+    asyncio.run(service.check_filing_status(filing.id, make_credentials()))
+    assert adapters[courts[0].id].round_trips == 1
+
+    # Overdue because no reconciliation ran
+    adapters[courts[0].id].statuses["Court 0-0"] = FilingStatus.SERVED
+    clock.advance(hours=1)
+    assert asyncio.run(service.check_filing_status(filing.id, make_credentials())).status == FilingStatus.SERVED
+    assert adapters[courts[0].id].round_trips == 2
+
+
+def test_started_service_reconciles_in_the_background(adapters, courts):
+    from src.e_filing.services.filing_service import EFilingService
+
+    async def scenario():
+        service = EFilingService()
+        reconciler = service.status_reconciler
+        reconciler.adapter_for = lambda court: adapters[court.id]
+        # Fixture filings were submitted at START; keep their age from stretching the interval
+        reconciler.policy = RecheckPolicy(intervals={FilingStatus.SUBMITTED: timedelta(milliseconds=20)},
+                                          age_step=timedelta(days=100000))
+        changed = asyncio.Event()
+        reconciler.add_listener(lambda transition: changed.set())
+
+        await service.start()
+        filing = track_filings(reconciler, adapters, courts[:1], 1, make_credentials())[0]
+        adapters[courts[0].id].statuses["Court 0-0"] = FilingStatus.ACCEPTED
+        await asyncio.wait_for(changed.wait(), timeout=5)
+        await service.stop()
+        return filing
+
+    filing = asyncio.run(scenario())
+    assert filing.status == FilingStatus.ACCEPTED
@@ -0,0 +1,274 @@
+"""
+Unit tests for the courthouse spatial index and per-user geofence index.
+
+GeoIndex queries are checked against brute-force haversine over the same
+points, including across the poles and the antimeridian and while points are
+added and removed between tree rebuilds. CourthouseDatabase and the GPS
+detector are checked against the previous 0.01 degree grid and the previous
+scan over every active geofence.
+"""
+
+import asyncio
+import math
+from uuid import uuid4
+
+import numpy as np
+import pytest
+
+from src.mobile_api.location_services.courthouse_database import CourthouseDatabase
+from src.mobile_api.location_services.gps_detector import CourthouseGPSDetector
+from src.mobile_api.location_services.location_models import (
+    CourthouseInfo, CourthouseType, GeofenceConfig, LocationCoordinates
+)
+from src.mobile_api.location_services.spatial_index import GeoIndex, GeofenceIndex, haversine_km
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 6371.0 * 2 * math.asin(math.sqrt(a))
+
+
+class ReferenceGrid:
+    """The previous fixed 0.01 degree grid: every cell in the radius, then haversine per point."""
+
+    def __init__(self, grid_size=0.01):
+        self.grid_size = grid_size
+        self.cells = {}
+        self.points = {}
+
+    def add(self, key, lat, lon):
+        self.points[key] = (lat, lon)
+        self.cells.setdefault(f"{int(lat / self.grid_size)}_{int(lon / self.grid_size)}", []).append(key)
+
+    def nearby(self, lat, lon, radius_km, max_results):
+        lat_offset = int((radius_km / 111.0) / self.grid_size) + 1
+        lon_offset = int((radius_km / (111.0 * math.cos(math.radians(lat)))) / self.grid_size) + 1
+        center_lat, center_lon = int(lat / self.grid_size), int(lon / self.grid_size)
+        found = []
+        for i in range(-lat_offset, lat_offset + 1):
+            for j in range(-lon_offset, lon_offset + 1):
+                for key in self.cells.get(f"{center_lat + i}_{center_lon + j}", ()):
+                    distance = haversine(lat, lon, *self.points[key])
+                    if distance <= radius_km:
+                        found.append((key, distance))
+        found.sort(key=lambda hit: hit[1])
+        return found[:max_results]
+
+
+def brute_force(points, lat, lon, radius_km=None, k=None):
+    hits = [(key, haversine(lat, lon, p_lat, p_lon)) for key, (p_lat, p_lon) in points.items()]
+    if radius_km is not None:
+        hits = [hit for hit in hits if hit[1] <= radius_km]
+    return sorted(hits, key=lambda hit: hit[1])[:k]
+
+
+def assert_same_hits(found, expected):
+    assert [key for key, _ in found] == [key for key, _ in expected]
+    assert [distance for _, distance in found] == pytest.approx([distance for _, distance in expected], abs=1e-9)
+
+
+def random_points(count, seed, lat_range=(-90, 90), lon_range=(-180, 180)):
+    rng = np.random.default_rng(seed)
+    return {
+        f"p{i}": (float(lat), float(lon))
+        for i, (lat, lon) in enumerate(zip(rng.uniform(*lat_range, count), rng.uniform(*lon_range, count)))
+    }
+
+
+def make_courthouse(lat, lon, name="Test Courthouse"):
+    return CourthouseInfo(
+        name=name,
+        court_type=CourthouseType.STATE_SUPERIOR,
+        address="1 Main Street",
+        city="Springfield",
+        state="IL",
+        zip_code="62701",
+        coordinates=LocationCoordinates(latitude=lat, longitude=lon),
+        jurisdiction="Sangamon County"
+    )
+
+
+def test_haversine_matches_scalar_formula():
+    points = random_points(200, seed=1)
+    lats, lons = np.array(list(points.values())).T
+    np.testing.assert_allclose(
+        haversine_km(12.5, -70.25, lats, lons),
+        [haversine(12.5, -70.25, lat, lon) for lat, lon in points.values()],
+        rtol=1e-12
+    )
+
+
+@pytest.mark.parametrize("count", [50, 3000])
+def test_nearest_and_within_match_brute_force(count):
+    points = random_points(count, seed=count)
+    index = GeoIndex()
+    for key, (lat, lon) in points.items():
+        index.add(key, lat, lon)
+
+    rng = np.random.default_rng(5)
+    queries = [(89.99, 10.0), (-89.5, -120.0), (0.0, 179.999), (0.0, -179.999)]
+    queries += list(zip(rng.uniform(-90, 90, 30).tolist(), rng.uniform(-180, 180, 30).tolist()))
+    for lat, lon in queries:
+        assert_same_hits(index.nearest(lat, lon, k=7), brute_force(points, lat, lon, k=7))
+        assert_same_hits(index.nearest(lat, lon, k=7, max_km=900), brute_force(points, lat, lon, 900, k=7))
+        assert_same_hits(index.within(lat, lon, 1500), brute_force(points, lat, lon, 1500))
+        assert_same_hits(index.within(lat, lon, 1500, limit=3), brute_force(points, lat, lon, 1500, k=3))
+
+
+def test_antimeridian_neighbours_are_found():
+    index = GeoIndex()
+    index.add("east", 10.0, 179.995)
+    index.add("far", 10.0, 170.0)
+    hits = index.within(10.0, -179.995, radius_km=5.0)
+    assert [key for key, _ in hits] == ["east"]
+    assert hits[0][1] == pytest.approx(haversine(10.0, -179.995, 10.0, 179.995))
+
+
+def test_mutations_between_rebuilds_match_brute_force():
+    rng = np.random.default_rng(9)
+    index = GeoIndex(brute_force_below=64, rebuild_fraction=0.25, max_tombstones=16)
+    points = {}
+    for step in range(4000):
+        action = rng.random()
+        if action < 0.6 or not points:
+            key = f"p{step}"
+            points[key] = (float(rng.uniform(30, 45)), float(rng.uniform(-100, -80)))
+            index.add(key, *points[key])
+        elif action < 0.8:
+            key = list(points)[rng.integers(len(points))]
+            del points[key]
+            assert index.remove(key)
+        else:
+            key = list(points)[rng.integers(len(points))]
+            points[key] = (float(rng.uniform(30, 45)), float(rng.uniform(-100, -80)))
+            index.add(key, *points[key])
+        if step % 97 == 0:
+            lat, lon = float(rng.uniform(30, 45)), float(rng.uniform(-100, -80))
+            assert_same_hits(index.nearest(lat, lon, k=5, max_km=300), brute_force(points, lat, lon, 300, k=5))
+            assert_same_hits(index.within(lat, lon, 150), brute_force(points, lat, lon, 150))
+
+    assert len(index) == len(points)
+    assert index.rebuilds > 1
+    assert not index.remove("missing")
+
+
+def test_nearest_many_matches_single_queries():
+    points = random_points(2000, seed=4, lat_range=(25, 49), lon_range=(-125, -67))
+    index = GeoIndex()
+    for key, (lat, lon) in points.items():
+        index.add(key, lat, lon)
+    index.remove("p0")
+    del points["p0"]
+
+    rng = np.random.default_rng(8)
+    lats, lons = rng.uniform(25, 49, 300), rng.uniform(-125, -67, 300)
+    slots, distances = index.nearest_many(lats, lons, k=4, max_km=60)
+    assert slots.shape == distances.shape == (300, 4)
+    for i in range(300):
+        expected = brute_force(points, lats[i], lons[i], 60, k=4)
+        found = [(key, d) for key, d in zip(index.keys_at(slots[i]), distances[i]) if key is not None]
+        assert_same_hits(found, expected)
+        assert np.isinf(distances[i, len(expected):]).all()
+
+
+def test_find_nearby_courthouses_matches_previous_grid():
+    db = CourthouseDatabase()
+    grid = ReferenceGrid()
+    for courthouse_id, courthouse in db.courthouses.items():
+        grid.add(courthouse_id, courthouse.coordinates.latitude, courthouse.coordinates.longitude)
+    for lat, lon in random_points(400, seed=2, lat_range=(32, 44), lon_range=(-119, -73)).values():
+        courthouse_id = db.add_courthouse(make_courthouse(lat, lon))
+        grid.add(courthouse_id, lat, lon)
+
+    rng = np.random.default_rng(6)
+    for lat, lon in zip(rng.uniform(33, 43, 40), rng.uniform(-118, -74, 40)):
+        expected = grid.nearby(lat, lon, radius_km=150, max_results=8)
+        found = db.find_nearby_courthouses(lat, lon, radius_km=150, max_results=8)
+        assert_same_hits([(str(c.id), d) for c, d in found], expected)
+
+    hits = db.find_nearby_courthouses(40.7130, -74.0050, radius_km=1.0)
+    assert [c.city for c, _ in hits] == ["New York", "New York"]
+
+
+def test_courthouse_updates_and_deletes_move_the_index():
+    db = CourthouseDatabase()
+    courthouse_id = db.add_courthouse(make_courthouse(39.7817, -89.6501))
+    assert db.find_nearby_courthouses(39.7817, -89.6501, radius_km=1.0)[0][0].id == db.courthouses[courthouse_id].id
+
+    db.update_courthouse(courthouse_id, {"coordinates": LocationCoordinates(latitude=38.6270, longitude=-90.1994)})
+    assert db.find_nearby_courthouses(39.7817, -89.6501, radius_km=1.0) == []
+    assert str(db.find_nearby_courthouses(38.6270, -90.1994, radius_km=1.0)[0][0].id) == courthouse_id
+
+    assert db.delete_courthouse(courthouse_id)
+    assert db.find_nearby_courthouses(38.6270, -90.1994, radius_km=1.0) == []
+    assert db.get_statistics()["indexed_locations"] == len(db.courthouses)
+
+
+def test_geofence_index_filters_by_user_radius_and_keeps_setup_order():
+    fences = GeofenceIndex()
+    fences.add("u1", "u1_b", 40.0005, -75.0, radius_km=0.5)
+    fences.add("u1", "u1_a", 40.0, -75.0, radius_km=0.2)
+    fences.add("u1", "u1_far", 41.0, -75.0, radius_km=0.5)
+    fences.add("u2", "u2_a", 40.0, -75.0, radius_km=5.0)
+
+    assert [fence for fence, _ in fences.candidates("u1", 40.0, -75.0)] == ["u1_b", "u1_a"]
+    assert [fence for fence, _ in fences.candidates("u1", 40.003, -75.0)] == ["u1_b"]
+    assert fences.candidates("u3", 40.0, -75.0) == []
+
+    assert fences.remove("u1_b")
+    assert not fences.remove("u1_b")
+    assert [fence for fence, _ in fences.candidates("u1", 40.0, -75.0)] == ["u1_a"]
+    assert len(fences) == 3
+
+
+def test_detector_geofence_events_match_previous_scan():
+    db = CourthouseDatabase()
+    detector = CourthouseGPSDetector(db)
+    user, other = uuid4(), uuid4()
+    near = db.add_courthouse(make_courthouse(39.7817, -89.6501, "Sangamon County Courthouse"))
+    far = db.add_courthouse(make_courthouse(41.5, -88.0, "Will County Courthouse"))
+
+    for courthouse_id in (near, far):
+        run(detector.setup_geofence(user, courthouse_id, GeofenceConfig(courthouse_id=courthouse_id)))
+    run(detector.setup_geofence(other, near, GeofenceConfig(courthouse_id=near, notification_radius_meters=5000)))
+
+    # 300 m away: proximity for the nearby fence only, and nothing for the other user
+    location = LocationCoordinates(latitude=39.7844, longitude=-89.6501)
+    run(detector._process_geofence_events(user, location, None))
+    alerts = detector.location_alerts[user]
+    assert [alert.alert_type for alert in alerts] == ["courthouse_proximity"]
+    assert alerts[0].title == "Approaching Sangamon County Courthouse"
+    assert other not in detector.location_alerts
+
+    run(detector._process_geofence_events(user, LocationCoordinates(latitude=39.7818, longitude=-89.6501), None))
+    assert [alert.alert_type for alert in detector.location_alerts[user]] == [
+        "courthouse_proximity", "courthouse_arrival"
+    ]
+
+    assert run(detector.remove_geofence(f"{user}_{near}"))
+    detector.location_alerts.clear()
+    run(detector._process_geofence_events(user, location, None))
+    assert user not in detector.location_alerts
+
+
+def test_geofences_follow_courthouse_moves_and_deletes():
+    db = CourthouseDatabase()
+    detector = CourthouseGPSDetector(db)
+    user = uuid4()
+    courthouse_id = db.add_courthouse(make_courthouse(39.7817, -89.6501, "Sangamon County Courthouse"))
+    run(detector.setup_geofence(user, courthouse_id, GeofenceConfig(courthouse_id=courthouse_id)))
+
+    db.update_courthouse(courthouse_id, {"coordinates": LocationCoordinates(latitude=38.6270, longitude=-90.1994)})
+    assert detector.geofence_index.candidates(str(user), 39.7817, -89.6501) == []
+
+    run(detector._process_geofence_events(user, LocationCoordinates(latitude=38.6271, longitude=-90.1994), None))
+    assert [alert.alert_type for alert in detector.location_alerts[user]] == ["courthouse_arrival"]
+
+    assert db.delete_courthouse(courthouse_id)
+    assert detector.geofence_index.candidates(str(user), 38.6270, -90.1994) == []
+    assert len(detector.geofence_index) == 0
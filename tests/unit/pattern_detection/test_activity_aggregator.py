@@ -0,0 +1,238 @@
+"""
+Unit tests for the streaming activity aggregator.
+
+Space-Saving top-k, rolling velocity, hour buckets and snapshot range queries
+are checked against exact counts over the same synthetic event streams.
+ActivityTracker tests cover the metrics it now derives from the aggregator.
+"""
+
+import asyncio
+import itertools
+import random
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.pattern_detection.activity_aggregator import (
+    ActivityAggregator,
+    ActivitySnapshotStore,
+    SpaceSaving,
+)
+from src.pattern_detection.activity_tracker import ActivityTracker, ActivityType
+
+START = datetime(2024, 3, 4, 8, 0, 0)
+TYPES = [t.value for t in ActivityType]
+
+
+def zipf_keys(rng, population, count, exponent=1.1):
+    weights = list(itertools.accumulate(1 / rank ** exponent for rank in range(1, population + 1)))
+    return rng.choices(range(1, population + 1), cum_weights=weights, k=count)
+
+
+def event_stream(count, span, seed=1, attorneys=2_000, cases=20_000):
+    """(timestamp, type, attorney, case, is_error) tuples in time order over ``span``."""
+    rng = random.Random(seed)
+    step = span / count
+    attorney_ids = zipf_keys(rng, attorneys, count)
+    case_ids = zipf_keys(rng, cases, count)
+    for i in range(count):
+        yield (START + step * i, rng.choice(TYPES), attorney_ids[i],
+               case_ids[i] if rng.random() < 0.8 else None, rng.random() < 0.02)
+
+
+def record_all(aggregator, events):
+    for timestamp, activity_type, attorney, case, is_error in events:
+        aggregator.record(timestamp, activity_type, attorney, case, is_error)
+
+
+class TestSpaceSaving:
+    """Heavy hitters against exact counts."""
+
+    def test_top_k_matches_exact_counts(self):
+        rng = random.Random(7)
+        stream = zipf_keys(rng, 10_000, 200_000)
+        exact = Counter(stream)
+        summary = SpaceSaving(100)
+        for key in stream:
+            summary.add(key)
+
+        assert summary.total == len(stream)
+        assert [key for key, _, _ in summary.top(10)] == [key for key, _ in exact.most_common(10)]
+        for key, count, error in summary.top():
+            assert count - error <= exact[key] <= count
+        for key, count in exact.items():
+            if count > len(stream) / summary.capacity:
+                assert key in summary._index
+
+    def test_heap_invariant_and_index(self):
+        rng = random.Random(8)
+        summary = SpaceSaving(16)
+        for key in zipf_keys(rng, 500, 5_000):
+            summary.add(key, rng.randint(1, 3))
+        heap = summary._heap
+        for i in range(1, len(heap)):
+            assert heap[(i - 1) // 2][0] <= heap[i][0]
+        assert all(heap[position][2] == key for key, position in summary._index.items())
+        assert len(summary) == 16
+
+    def test_merge(self):
+        a, b = SpaceSaving(10), SpaceSaving(10)
+        for key in "aaaabbbc":
+            a.add(key)
+        for key in "aabbbbbd":
+            b.add(key)
+        merged = SpaceSaving.merged([a.items(), b.items()], capacity=3)
+        assert merged.top() == [("b", 8, 0), ("a", 6, 0), ("c", 1, 0)] or \
+            merged.top() == [("b", 8, 0), ("a", 6, 0), ("d", 1, 0)]
+        assert merged.total == 16
+
+
+class TestAggregator:
+    """Streaming aggregates against exact counts."""
+
+    def test_lifetime_counts(self):
+        events = list(event_stream(50_000, timedelta(days=3)))
+        aggregator = ActivityAggregator(top_k=50)
+        record_all(aggregator, events)
+
+        assert aggregator.total == len(events)
+        assert aggregator.errors == sum(e[4] for e in events)
+        assert aggregator.by_type == Counter(e[1] for e in events)
+        by_hour = Counter(e[0].hour for e in events)
+        assert aggregator.by_hour == [by_hour[h] for h in range(24)]
+        assert aggregator.peak_hour == max(by_hour, key=by_hour.get)
+        assert dict(aggregator.by_day) == dict(Counter(e[0].strftime('%Y-%m-%d') for e in events))
+
+        attorneys = Counter(e[2] for e in events)
+        cases = Counter(e[3] for e in events if e[3] is not None)
+        assert aggregator.most_active_attorney == attorneys.most_common(1)[0][0]
+        assert aggregator.most_active_case == cases.most_common(1)[0][0]
+        top = {key for key, _, _ in aggregator.attorneys.top(5)}
+        assert top == {key for key, _ in attorneys.most_common(5)}
+
+    def test_rolling_velocity(self):
+        events = list(event_stream(20_000, timedelta(hours=5)))
+        aggregator = ActivityAggregator()
+        for i, event in enumerate(events):
+            aggregator.record(event[0], event[1], event[2], event[3], event[4])
+            if i % 2_500 == 0 or i == len(events) - 1:
+                cutoff = event[0] - timedelta(hours=1)
+                exact = sum(1 for e in events[:i + 1] if e[0].replace(second=0, microsecond=0) > cutoff)
+                assert aggregator.velocity() == exact
+
+    def test_out_of_order_events(self):
+        aggregator = ActivityAggregator(retention=timedelta(hours=2))
+        aggregator.record(START + timedelta(minutes=30), "case_updated")
+        aggregator.record(START + timedelta(minutes=10), "case_updated")
+        aggregator.record(START + timedelta(minutes=20), "case_updated")
+        assert aggregator.velocity() == 3
+        assert [m for m, _ in aggregator._minutes] == sorted(m for m, _ in aggregator._minutes)
+
+        aggregator.record(START + timedelta(hours=5), "case_updated")
+        aggregator.record(START, "case_updated")  # Older than retention
+        assert aggregator.late_events == 1
+        assert aggregator.velocity() == 1
+        assert aggregator.total == 5
+
+    def test_memory_is_bounded(self):
+        aggregator = ActivityAggregator(top_k=20, retention=timedelta(hours=6), days_retained=3)
+        record_all(aggregator, event_stream(30_000, timedelta(days=10)))
+
+        assert len(aggregator._hours) <= 7
+        assert len(aggregator.by_day) == 3
+        assert len(aggregator.attorneys) == 20 and len(aggregator.cases) == 20
+        assert len(aggregator._minutes) <= 60
+
+    def test_range_summary_matches_exact(self):
+        events = list(event_stream(40_000, timedelta(hours=30)))
+        aggregator = ActivityAggregator(top_k=100)
+        record_all(aggregator, events)
+
+        start, end = START + timedelta(hours=3, minutes=20), START + timedelta(hours=17)
+        in_range = [e for e in events if start.replace(minute=0) <= e[0] < end + timedelta(hours=1)]
+        summary = aggregator.summarize(start, end)
+
+        assert summary.total == len(in_range)
+        assert summary.errors == sum(e[4] for e in in_range)
+        assert summary.by_type == dict(Counter(e[1] for e in in_range))
+        assert summary.by_hour == dict(Counter(e[0].hour for e in in_range))
+        exact = Counter(e[2] for e in in_range)
+        assert [key for key, _, _ in summary.top_attorneys[:5]] == [key for key, _ in exact.most_common(5)]
+
+
+class TestSnapshots:
+    """Expired hours are answered from the snapshot store."""
+
+    def test_range_query_after_expiry(self, tmp_path):
+        events = list(event_stream(30_000, timedelta(hours=12)))
+        store = ActivitySnapshotStore(str(tmp_path / "activity.db"))
+        aggregator = ActivityAggregator(retention=timedelta(hours=3), store=store,
+                                        snapshot_interval=timedelta(minutes=15))
+        record_all(aggregator, events)
+        aggregator.snapshot()
+
+        assert min(aggregator._hours) >= START + timedelta(hours=8)
+        start, end = START + timedelta(hours=1), START + timedelta(hours=9)
+        in_range = [e for e in events if start <= e[0] < end + timedelta(hours=1)]
+        summary = aggregator.summarize(start, end)
+        assert summary.total == len(in_range)
+        assert summary.by_type == dict(Counter(e[1] for e in in_range))
+
+        store.close()
+        reopened = ActivityAggregator(store=ActivitySnapshotStore(str(tmp_path / "activity.db")))
+        assert reopened.summarize().total == len(events)
+
+    def test_snapshots_are_periodic(self, tmp_path):
+        store = ActivitySnapshotStore()
+        aggregator = ActivityAggregator(store=store, snapshot_interval=timedelta(minutes=5))
+        aggregator.record(START, "case_updated")
+        aggregator.record(START + timedelta(minutes=4), "case_updated")
+        assert store.load(None, None, 10) == []
+
+        aggregator.record(START + timedelta(minutes=5), "case_updated")
+        [bucket] = store.load(None, None, 10)
+        assert bucket.total == 3 and not aggregator._dirty
+
+
+class TestActivityTracker:
+    """ActivityTracker metrics come from the aggregator."""
+
+    def test_real_time_and_range_metrics(self):
+        tracker = ActivityTracker(top_k=10)
+
+        async def run():
+            for minute in range(120):
+                await tracker.track_activity(
+                    ActivityType.DOCUMENT_ACCESSED, case_id=1 + minute % 3, attorney_id=7 if minute % 4 else 8,
+                    timestamp=START + timedelta(minutes=minute))
+            await tracker.track_activity(ActivityType.SYSTEM_ERROR, attorney_id=9,
+                                         timestamp=START + timedelta(minutes=120))
+            return (await tracker.get_activity_metrics(),
+                    await tracker.get_activity_metrics(START, START + timedelta(minutes=30)),
+                    await tracker.get_activity_metrics(START, START + timedelta(hours=3), attorney_ids=[8, 9]))
+
+        lifetime, first_hour, filtered = asyncio.run(run())
+
+        assert lifetime.total_activities == 121
+        assert lifetime.activities_by_type[ActivityType.DOCUMENT_ACCESSED] == 120
+        assert lifetime.most_active_attorney == 7 and lifetime.activities_by_attorney[8] == 30
+        assert lifetime.error_rate == pytest.approx(1 / 121)
+        assert lifetime.activity_velocity == 60
+        assert first_hour.total_activities == 60 and first_hour.peak_activity_hour == 8
+        assert filtered.activities_by_attorney == {8: 30, 9: 1} and filtered.most_active_attorney == 8
+
+    def test_velocity_alert_fires_once_per_hour(self):
+        tracker = ActivityTracker()
+        tracker.anomaly_thresholds['hourly_activity_threshold'] = 50
+
+        async def run():
+            for i in range(300):
+                await tracker.track_activity(ActivityType.CASE_UPDATED, case_id=1,
+                                             timestamp=START + timedelta(seconds=30 * i))
+
+        asyncio.run(run())
+        alerts = [e for e in tracker.activity_buffer if e.activity_type == ActivityType.SYSTEM_ALERT]
+        assert [a.timestamp.hour for a in alerts] == [8, 9, 10]
+        assert all(a.severity == "warning" for a in alerts)
@@ -0,0 +1,261 @@
+"""
+Unit tests for compiled inference pipelines and PredictiveEngine.batch_predict.
+
+The batch path is checked against the per-row predict() on the same inputs,
+feature contributions against each model's own output (bias plus
+contributions reproduces it), and saved pipelines across a save/load round
+trip.
+"""
+
+import asyncio
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import (
+    GradientBoostingClassifier, GradientBoostingRegressor, RandomForestClassifier, RandomForestRegressor
+)
+from sklearn.linear_model import LinearRegression, LogisticRegression
+
+from src.pattern_detection.inference_pipeline import CompiledPipeline
+from src.pattern_detection.predictive_engine import PredictionModel, PredictiveEngine
+
+CASE_TYPES = ['personal_injury', 'contract', 'employment', 'malpractice']
+JURISDICTIONS = ['federal', 'state_superior', 'state_district']
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def case_rows(count, seed=7):
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            'case_type': CASE_TYPES[rng.integers(len(CASE_TYPES))],
+            'attorney_experience': int(rng.integers(1, 25)),
+            'case_value': float(rng.lognormal(10, 1)),
+            'complexity_score': float(rng.uniform(1, 10)),
+            'jurisdiction': JURISDICTIONS[rng.integers(len(JURISDICTIONS))],
+        }
+        for _ in range(count)
+    ]
+
+
+def settlement_rows(count, seed=11):
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            'case_type': CASE_TYPES[rng.integers(3)],
+            'initial_demand': float(rng.lognormal(11, 0.5)),
+            'case_value': float(rng.lognormal(10, 1)),
+            'attorney_experience': int(rng.integers(1, 25)),
+            'defendant_type': ['individual', 'corporation', 'government'][rng.integers(3)],
+        }
+        for _ in range(count)
+    ]
+
+
+def trained_engine(*model_types):
+    engine = PredictiveEngine()
+    for model_type in model_types:
+        assert 'error' not in run(engine.train_model(model_type))
+    return engine
+
+
+@pytest.fixture(scope="module")
+def engines():
+    # One engine per model: predict() encodes through encoders shared by column
+    # name, which the last model trained refits
+    return {
+        model_type: trained_engine(model_type)
+        for model_type in (PredictionModel.CASE_OUTCOME, PredictionModel.SETTLEMENT_AMOUNT)
+    }
+
+
+@pytest.fixture(scope="module")
+def engine(engines):
+    return engines[PredictionModel.CASE_OUTCOME]
+
+
+def assert_same_prediction(batched, single):
+    assert batched.predicted_value == single.predicted_value
+    assert type(batched.predicted_value) is type(single.predicted_value)
+    assert batched.confidence_score == pytest.approx(single.confidence_score, abs=1e-12)
+    if single.probability_distribution is None:
+        assert batched.probability_distribution is None
+    else:
+        assert batched.probability_distribution.keys() == single.probability_distribution.keys()
+        for label, probability in single.probability_distribution.items():
+            assert batched.probability_distribution[label] == pytest.approx(probability, abs=1e-12)
+    assert batched.feature_importance == single.feature_importance
+    assert batched.explanation == single.explanation
+    assert batched.recommendations == single.recommendations
+    assert batched.risk_factors == single.risk_factors
+    assert batched.target_entity_id == single.target_entity_id
+
+
+@pytest.mark.parametrize("model_type, rows", [
+    (PredictionModel.CASE_OUTCOME, case_rows(40)),
+    (PredictionModel.SETTLEMENT_AMOUNT, settlement_rows(40)),
+])
+def test_batch_predict_matches_per_row_predict(engines, model_type, rows):
+    engine = engines[model_type]
+    ids = list(range(100, 100 + len(rows) - 5))
+    batched = run(engine.batch_predict(model_type, rows, ids))
+    assert len(batched) == len(rows)
+    for i, (row, prediction) in enumerate(zip(rows, batched)):
+        single = run(engine.predict(model_type, row, ids[i] if i < len(ids) else None))
+        assert_same_prediction(prediction, single)
+        contributions = prediction.metadata['feature_contributions']
+        assert 0 < len(contributions) <= 5
+        assert set(contributions) <= set(engine.pipelines[model_type.value].selected_names)
+
+
+def test_unseen_categories_encode_like_predict(engine):
+    rows = case_rows(6)
+    rows[1]['case_type'] = 'antitrust'
+    rows[3]['jurisdiction'] = 'tribal'
+    rows[4]['case_type'] = None
+    batched = run(engine.batch_predict(PredictionModel.CASE_OUTCOME, rows))
+    for row, prediction in zip(rows, batched):
+        assert_same_prediction(prediction, run(engine.predict(PredictionModel.CASE_OUTCOME, row)))
+
+    pipeline = engine.pipelines[PredictionModel.CASE_OUTCOME.value]
+    codes = pipeline._encode('case_type', np.array(['antitrust', 'contract', None], dtype=object))
+    assert codes.tolist() == [0.0, float(pipeline.categories['case_type']['contract']), 0.0]
+
+
+def test_missing_values_take_training_means(engines):
+    pipeline = engines[PredictionModel.SETTLEMENT_AMOUNT].pipelines[PredictionModel.SETTLEMENT_AMOUNT.value]
+    row = settlement_rows(1)[0]
+    filled = dict(row, case_value=None, initial_demand='n/a')
+    explicit = dict(row)
+    for name in ('case_value', 'initial_demand'):
+        explicit[name] = pipeline.fill_values[pipeline.feature_names.index(name)]
+    np.testing.assert_array_equal(pipeline.transform([filled]), pipeline.transform([explicit]))
+
+
+def test_transform_accepts_dataframes(engine):
+    pipeline = engine.pipelines[PredictionModel.CASE_OUTCOME.value]
+    rows = case_rows(25)
+    np.testing.assert_array_equal(pipeline.transform(rows), pipeline.transform(pd.DataFrame(rows)))
+
+
+def test_pipeline_keeps_its_encoders_when_another_model_trains():
+    engine = trained_engine(PredictionModel.CASE_OUTCOME)
+    rows = case_rows(50)
+    before = engine.pipelines[PredictionModel.CASE_OUTCOME.value].run(rows)
+
+    # Settlement data has no 'malpractice' case type and refits the shared encoder
+    assert 'error' not in run(engine.train_model(PredictionModel.SETTLEMENT_AMOUNT))
+    assert 'malpractice' not in engine.encoders['case_type'].classes_
+
+    after = engine.pipelines[PredictionModel.CASE_OUTCOME.value].run(rows)
+    np.testing.assert_array_equal(before.probabilities, after.probabilities)
+
+
+def test_top_contributions_are_largest_by_magnitude(engine):
+    output = engine.pipelines[PredictionModel.CASE_OUTCOME.value].run(case_rows(10))
+    top = output.top_contributions(2)
+    for i, row in enumerate(top):
+        magnitudes = np.sort(np.abs(output.contributions[i]))[::-1]
+        assert [abs(value) for value in row.values()] == pytest.approx(magnitudes[:2].tolist())
+
+
+@pytest.fixture(scope="module")
+def dataset():
+    rng = np.random.default_rng(3)
+    X = rng.normal(size=(400, 4))
+    score = X[:, 0] * 1.5 - X[:, 1] + 0.5 * X[:, 2] * X[:, 3]
+    return {
+        'X': X,
+        'binary': (score > 0).astype(int),
+        'multiclass': np.digitize(score, [-1.0, 1.0]),
+        'regression': score + rng.normal(scale=0.1, size=len(X)),
+    }
+
+
+@pytest.mark.parametrize("model, target", [
+    (RandomForestClassifier(n_estimators=20, random_state=0), 'multiclass'),
+    (RandomForestClassifier(n_estimators=20, random_state=0), 'binary'),
+    (RandomForestRegressor(n_estimators=20, random_state=0), 'regression'),
+    (GradientBoostingClassifier(n_estimators=30, random_state=0), 'multiclass'),
+    (GradientBoostingClassifier(n_estimators=30, random_state=0), 'binary'),
+    (GradientBoostingRegressor(n_estimators=30, random_state=0), 'regression'),
+    (LogisticRegression(max_iter=1000), 'multiclass'),
+    (LogisticRegression(max_iter=1000), 'binary'),
+    (LinearRegression(), 'regression'),
+])
+def test_contributions_decompose_model_output(dataset, model, target):
+    X, y = dataset['X'], dataset[target]
+    model.fit(X, y)
+    pipeline = CompiledPipeline.compile(model, ['a', 'b', 'c', 'd'])
+    explainer = pipeline.explainer
+    contributions = explainer(X)
+
+    if isinstance(model, RandomForestClassifier):
+        expected = model.predict_proba(X)
+    elif isinstance(model, (RandomForestRegressor, LinearRegression)):
+        expected = model.predict(X).reshape(len(X), -1)
+    else:
+        expected = model.decision_function(X) if hasattr(model, 'decision_function') else model.predict(X)
+        expected = expected.reshape(len(X), -1)
+    total = contributions.sum(axis=1)
+
+    if isinstance(model, (GradientBoostingClassifier, GradientBoostingRegressor)):
+        # The initial estimator's prior is a per-output constant outside the trees
+        offset = expected - total
+        np.testing.assert_allclose(offset, np.broadcast_to(offset[0], offset.shape), atol=1e-9)
+    else:
+        np.testing.assert_allclose(explainer.bias + total, expected, atol=1e-9)
+
+    output = pipeline.run(pd.DataFrame(X, columns=pipeline.feature_names))
+    if hasattr(model, 'predict_proba'):
+        np.testing.assert_array_equal(output.predictions, model.predict(X))
+        np.testing.assert_allclose(output.confidence, model.predict_proba(X).max(axis=1))
+    else:
+        np.testing.assert_allclose(output.predictions, model.predict(X))
+
+
+def test_binary_contributions_point_toward_predicted_class(dataset):
+    X, y = dataset['X'], dataset['binary']
+    model = LogisticRegression(max_iter=1000).fit(X, y)
+    output = CompiledPipeline.compile(model, ['a', 'b', 'c', 'd']).run(pd.DataFrame(X, columns=['a', 'b', 'c', 'd']))
+    sign = np.where(output.predictions == 1, 1.0, -1.0)
+    np.testing.assert_allclose(output.contributions, X * model.coef_[0] * sign[:, None])
+
+
+def test_pipelines_survive_save_and_load(engine, tmp_path):
+    path = str(tmp_path / "models.pkl")
+    assert run(engine.save_models(path))
+
+    restored = PredictiveEngine()
+    assert run(restored.load_models(path))
+    assert set(restored.pipelines) == set(engine.pipelines)
+
+    rows = case_rows(30)
+    before = engine.pipelines[PredictionModel.CASE_OUTCOME.value].run(rows)
+    after = restored.pipelines[PredictionModel.CASE_OUTCOME.value].run(rows)
+    np.testing.assert_array_equal(before.predictions, after.predictions)
+    np.testing.assert_array_equal(before.probabilities, after.probabilities)
+    np.testing.assert_array_equal(before.contributions, after.contributions)
+
+
+def test_pipeline_compiled_lazily_for_older_saves(engines):
+    engine = engines[PredictionModel.SETTLEMENT_AMOUNT]
+    restored = PredictiveEngine()
+    restored.models = dict(engine.models)
+    restored.scalers = dict(engine.scalers)
+    restored.encoders = dict(engine.encoders)
+    restored.feature_selectors = dict(engine.feature_selectors)
+
+    rows = settlement_rows(10)
+    batched = run(restored.batch_predict(PredictionModel.SETTLEMENT_AMOUNT, rows))
+    assert PredictionModel.SETTLEMENT_AMOUNT.value in restored.pipelines
+    for row, prediction in zip(rows, batched):
+        assert_same_prediction(prediction, run(engine.predict(PredictionModel.SETTLEMENT_AMOUNT, row)))
+
+
+def test_batch_predict_without_model_returns_empty():
+    assert run(PredictiveEngine().batch_predict(PredictionModel.CASE_OUTCOME, case_rows(3))) == []
@@ -0,0 +1,303 @@
+"""
+Unit tests for the streaming statistics core and AnomalyDetector's use of it.
+
+Windowed moments, sorted windows and ring summaries are checked against
+NumPy over the same samples. Detector tests replay metric streams through
+both the vectorized threshold pass and the previous evaluation loop (deques
+of point dicts, filtered and recomputed per threshold) and require identical
+anomalies.
+"""
+
+import asyncio
+import math
+import random
+import time
+from collections import defaultdict, deque
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from src.pattern_detection.anomaly_detector import AnomalyDetector, AnomalyThreshold
+from src.pattern_detection.streaming_stats import MetricRingBuffer, TimeWindow, to_microseconds
+
+START = datetime(2024, 3, 4, 8, 0, 0)
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+class ReferenceEvaluator:
+    """The previous per-threshold loop over ``deque(maxlen=capacity)`` point dicts."""
+
+    def __init__(self, detector, capacity=1000):
+        self.detector = detector
+        self.time_series_data = defaultdict(lambda: deque(maxlen=capacity))
+
+    async def evaluate(self, data_snapshot, timestamp):
+        for metric_name, value in data_snapshot.items():
+            if isinstance(value, (int, float)):
+                self.time_series_data[metric_name].append({'timestamp': timestamp, 'value': value})
+
+        detected = []
+        for threshold in self.detector.thresholds:
+            if not threshold.is_active:
+                continue
+            cutoff_time = timestamp - timedelta(hours=threshold.lookback_hours)
+            if threshold.metric_name in self.time_series_data:
+                metric_data = [point for point in self.time_series_data[threshold.metric_name]
+                               if point['timestamp'] >= cutoff_time]
+            elif threshold.metric_name in data_snapshot:
+                metric_data = [{'timestamp': timestamp, 'value': data_snapshot[threshold.metric_name]}]
+            else:
+                metric_data = []
+            if not metric_data or len(metric_data) < threshold.min_data_points:
+                continue
+            try:
+                values = [point['value'] for point in metric_data]
+                detected.extend(await self.detector._evaluate_values(threshold, values, timestamp))
+                if len(detected) >= self.detector.max_anomalies_per_cycle:
+                    break
+            except Exception:
+                pass
+        return detected
+
+
+def summarize(anomalies):
+    return [(a.id, a.anomaly_type, a.severity, a.description, a.observed_value, a.expected_value,
+             a.deviation_score, a.confidence_level, a.p_value, a.context) for a in anomalies]
+
+
+def threshold(threshold_id, metric_name, threshold_type, **kwargs):
+    return AnomalyThreshold(threshold_id=threshold_id, name=threshold_id, entity_type="case",
+                            metric_name=metric_name, threshold_type=threshold_type, created_by=0, **kwargs)
+
+
+def mixed_thresholds(metrics, rng):
+    thresholds = []
+    for i, metric in enumerate(metrics):
+        for j in range(3):
+            lookback = rng.choice([1, 6, 24, 72])
+            kind = rng.choice(["statistical", "statistical", "percentile", "absolute"])
+            thresholds.append(threshold(
+                f"{metric}-{j}", metric, kind, lookback_hours=lookback,
+                min_data_points=rng.choice([1, 3, 10]),
+                deviation_threshold=rng.choice([1.0, 2.0, 2.5, 3.0]),
+                percentile_threshold=rng.choice([50.0, 90.0, 95.0, 99.0]),
+                max_value=rng.choice([None, 130.0]), min_value=rng.choice([None, 70.0])))
+    return thresholds
+
+
+def metric_stream(metrics, cycles, rng, start=START):
+    """(snapshot, timestamp) pairs: noisy levels with spikes, steps and constant metrics."""
+    timestamp = start
+    levels = {metric: rng.uniform(50, 150) for metric in metrics}
+    for _ in range(cycles):
+        timestamp += timedelta(minutes=rng.choice([10, 30, 60, 90]))
+        snapshot = {}
+        for k, metric in enumerate(metrics):
+            if rng.random() < 0.1:
+                continue  # Metric missing from this snapshot
+            if k % 7 == 0:
+                value = 100  # Constant (and int)
+            elif rng.random() < 0.03:
+                value = levels[metric] * rng.uniform(2, 5)
+            else:
+                value = rng.gauss(levels[metric], 5)
+            if rng.random() < 0.01:
+                levels[metric] *= 1.5
+            snapshot[metric] = value
+        yield snapshot, timestamp
+
+
+def replay(detector, reference, stream):
+    cycles = fired = 0
+    for snapshot, timestamp in stream:
+        detector._update_time_series(snapshot, timestamp)
+        streamed = run(detector._evaluate_thresholds(snapshot, timestamp))
+        expected = run(reference.evaluate(snapshot, timestamp))
+        assert summarize(streamed) == summarize(expected), timestamp
+        cycles += 1
+        fired += len(expected)
+    return cycles, fired
+
+
+def small_detector(capacity, thresholds):
+    detector = AnomalyDetector()
+    detector.time_series_data = MetricRingBuffer(capacity=capacity)
+    detector.thresholds = thresholds
+    return detector
+
+
+class TestRingBuffer:
+    """Samples wrap within each metric's ring."""
+
+    def test_wraps_and_keeps_order(self):
+        buffer = MetricRingBuffer(capacity=5, initial_rows=1)
+        for i in range(12):
+            buffer.append({"a": i, "b": -i, "label": "x"}, START + timedelta(hours=i))
+
+        assert "label" not in buffer and len(buffer) == 2
+        timestamps, values = buffer.window("a")
+        assert values.tolist() == [7, 8, 9, 10, 11]
+        assert timestamps.tolist() == [to_microseconds(START + timedelta(hours=h)) for h in range(7, 12)]
+        assert [p['value'] for p in buffer.points("b", since=START + timedelta(hours=10))] == [-10, -11]
+        assert buffer.points("a")[-1]['timestamp'] == START + timedelta(hours=11)
+
+    def test_aware_timestamps_round_trip(self):
+        buffer = MetricRingBuffer(capacity=4)
+        eastern = timezone(timedelta(hours=-5))
+        stamp = datetime(2024, 3, 4, 9, 30, 15, 123456, tzinfo=eastern)
+        buffer.append({"a": 1.0}, stamp)
+
+        [point] = buffer.points("a")
+        assert point['timestamp'] == stamp and point['timestamp'].hour == 9
+
+    def test_summary_matches_numpy(self):
+        rng = np.random.default_rng(3)
+        buffer = MetricRingBuffer(capacity=50)
+        for i in range(80):
+            buffer.append({f"m{k}": rng.normal(10, 3) for k in range(6) if i >= k * 10},
+                          START + timedelta(hours=i))
+
+        summary = buffer.summary(min_samples=10)
+        for k in range(6):
+            values = buffer.window(f"m{k}")[1]
+            expected = {'mean': np.mean(values), 'std': np.std(values), 'median': np.median(values),
+                        'p95': np.percentile(values, 95), 'p99': np.percentile(values, 99)}
+            assert {key: summary[f"m{k}"][key] for key in expected} == expected
+            assert summary[f"m{k}"]['sample_size'] == len(values)
+
+
+class TestWindows:
+    """Incremental windows agree with recomputing the window from scratch."""
+
+    def test_moments_and_percentiles_track_the_window(self):
+        rng = np.random.default_rng(5)
+        buffer = MetricRingBuffer(capacity=40, initial_rows=2)
+        lookback = timedelta(hours=12)
+        moments, quantiles = buffer.moments(lookback), buffer.quantiles(lookback)
+        rows = None
+        timestamp = START
+        for i in range(300):
+            timestamp += timedelta(minutes=int(rng.choice([5, 20, 60, 240])))
+            buffer.append({f"m{k}": rng.normal(1e4 * k, 1 + k) for k in range(5)}, timestamp)
+            rows = np.arange(len(buffer))
+            moments.refresh(rows, timestamp)
+            quantiles.refresh(rows, timestamp)
+
+            current = buffer.last_values(rows)
+            cutoffs = quantiles.percentile(rows, np.full(len(rows), 90.0), current)
+            for row in rows.tolist():
+                values = buffer.window(buffer.name(row), since=timestamp - lookback)[1]
+                assert moments.size(rows)[row] == len(values)
+                assert moments.mean[row] == pytest.approx(np.mean(values), rel=1e-12)
+                assert moments.variance(rows)[row] == pytest.approx(np.var(values), rel=1e-9, abs=1e-12)
+                assert quantiles.window_sorted(row).tolist() == sorted(values.tolist())
+                if len(values) > 1:
+                    assert cutoffs[row] == pytest.approx(np.percentile(values[:-1], 90), rel=1e-12)
+
+    def test_out_of_order_rows_are_invalid_until_evicted(self):
+        buffer = MetricRingBuffer(capacity=3)
+        moments = buffer.moments(timedelta(hours=100))
+        validity = []
+        for hour in [0, 1, 2, 1, 3, 4, 5]:
+            buffer.append({"a": float(hour)}, START + timedelta(hours=hour))
+            moments.refresh(np.array([0]), START + timedelta(hours=6))
+            validity.append(bool(moments.valid(np.array([0]))[0]))
+
+        # Invalid while the ring holds both hour 2 and the late hour-1 sample
+        assert validity == [True, True, True, False, False, True, True]
+
+        assert moments.mean[0] == np.mean([3.0, 4.0, 5.0])
+
+    def test_incomplete_window_fails_at_construction(self):
+        class CountOnly(TimeWindow):
+            def _add(self, rows, x):
+                pass
+
+        with pytest.raises(TypeError):
+            CountOnly(MetricRingBuffer(capacity=3), 1)
+
+
+class TestDetectorExactness:
+    """The vectorized pass returns exactly what the per-threshold loop returned."""
+
+    def test_mixed_thresholds_match_reference(self):
+        rng = random.Random(7)
+        metrics = [f"metric_{i}" for i in range(24)]
+        detector = small_detector(60, mixed_thresholds(metrics, rng))
+        reference = ReferenceEvaluator(detector, capacity=60)
+        detector.max_anomalies_per_cycle = 10**6
+
+        cycles, fired = replay(detector, reference, metric_stream(metrics, 400, rng))
+        assert cycles == 400 and fired > 200
+
+    def test_anomaly_cap_keeps_threshold_order(self):
+        rng = random.Random(8)
+        metrics = [f"metric_{i}" for i in range(30)]
+        detector = small_detector(40, mixed_thresholds(metrics, rng))
+        reference = ReferenceEvaluator(detector, capacity=40)
+        detector.max_anomalies_per_cycle = 3
+
+        replay(detector, reference, metric_stream(metrics, 150, rng))
+
+    def test_irregular_streams_match_reference(self):
+        rng = random.Random(9)
+        metrics = ["a", "b", "c", "d"]
+        detector = small_detector(25, mixed_thresholds(metrics + ["never_seen"], rng) + [
+            threshold("label", "label", "statistical", min_data_points=1),
+            threshold("tiny", "a", "percentile", min_data_points=1),
+        ])
+        reference = ReferenceEvaluator(detector, capacity=25)
+        detector.max_anomalies_per_cycle = 10**6
+
+        def stream():
+            timestamp = START
+            for i in range(200):
+                step = rng.choice([30, 60, 60, 60, -45])  # Some samples arrive out of order
+                timestamp += timedelta(minutes=step)
+                snapshot = {"a": rng.gauss(10, 2), "b": rng.choice([1e9 + 0.5, 1e9 + 0.25, 1e9]),
+                            "c": rng.choice([1.0, math.nan, math.inf, 3.0, 2.0]), "d": rng.randint(0, 3),
+                            "label": "pending"}
+                if i == 120:
+                    timestamp -= timedelta(days=3)  # Detection time jumps backwards
+                yield snapshot, timestamp
+
+        replay(detector, reference, stream())
+
+    def test_default_thresholds_through_detect_anomalies(self):
+        rng = random.Random(10)
+        detector = AnomalyDetector()
+        reference = ReferenceEvaluator(AnomalyDetector())
+        timestamp = START
+        for i in range(300):
+            timestamp += timedelta(hours=1)
+            snapshot = {
+                "daily_time_entries": rng.gauss(40, 4) * (4 if i % 50 == 49 else 1),
+                "hourly_rate": rng.choice([350, 375, 400]) * (3 if i == 200 else 1),
+                "duration_days": rng.expovariate(1 / 90),
+                "amount": rng.lognormvariate(5, 0.4),
+                "alerts_per_hour": rng.randint(0, 60),
+                "days_since_contact": rng.randint(0, 40),
+            }
+            expected = asyncio.run(reference.evaluate(snapshot, timestamp))
+            validated = asyncio.run(detector.detect_anomalies(snapshot, timestamp))
+            assert {a.id for a in validated} <= {a.id for a in expected}
+
+        assert len(detector.detected_anomalies) > 20
+        assert set(detector.historical_baselines) == set(snapshot)
+        baseline = detector.historical_baselines["amount"]
+        values = [p['value'] for p in reference.time_series_data["amount"]]
+        assert (baseline['mean'], baseline['p99']) == (np.mean(values), np.percentile(values, 99))
+        assert baseline['sample_size'] == len(values)
+
+    def test_baselines_follow_update_interval(self):
+        detector = AnomalyDetector()
+        for i in range(15):
+            run(detector.detect_anomalies({"amount": float(i)}, START + timedelta(minutes=20 * i)))
+
+        # Samples every 20 minutes, baselines hourly: last refreshed at the 13th sample
+        assert detector.historical_baselines["amount"]['sample_size'] == 13
+        assert detector._baselines_updated_at == START + timedelta(hours=4)
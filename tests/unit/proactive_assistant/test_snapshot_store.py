@@ -0,0 +1,146 @@
+"""
+Unit Tests for the Document Snapshot Store
+
+Tests persisting snapshots and the watcher's high-water mark across restarts,
+the running id aggregates used to skip deletion diffs, the ordered id diff,
+and re-hashing files only when their size or mtime changes.
+"""
+
+import hashlib
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.proactive_assistant.snapshot_store import (
+    DocumentSnapshotStore,
+    hash_file,
+    read_file_state,
+    read_file_states,
+)
+
+
+def make_snapshot(doc_id, file_path=None, **overrides):
+    snapshot = {
+        "id": doc_id,
+        "name": f"Document {doc_id}.pdf",
+        "status": "ready",
+        "document_type": "motion" if doc_id % 3 else "pleading",
+        "file_size": 1000 + doc_id,
+        "case_id": doc_id % 500,
+        "client_id": doc_id % 97,
+        "updated_at": (datetime(2024, 1, 1) + timedelta(seconds=doc_id)).isoformat(),
+        "file_path": file_path,
+        "disk_size": None,
+        "file_mtime_ns": None,
+        "content_hash": None
+    }
+    snapshot.update(overrides)
+    return snapshot
+
+
+@pytest.fixture
+def store_path(tmp_path):
+    return str(tmp_path / "state" / "document_snapshots.db")
+
+
+def test_snapshots_and_state_survive_restart(store_path):
+    store = DocumentSnapshotStore(store_path)
+    assert store.high_water_mark is None and len(store) == 0
+
+    digest = hashlib.sha256(b"complaint").hexdigest()
+    store.apply(
+        [make_snapshot(1), make_snapshot(2, "/files/2.pdf", disk_size=9, file_mtime_ns=123, content_hash=digest)],
+        state={"hwm_updated_at": datetime(2024, 5, 1, 9, 30), "hwm_id": 2}
+    )
+    store.close()
+
+    reopened = DocumentSnapshotStore(store_path)
+    assert len(reopened) == 2 and reopened.id_sum == 3
+    assert reopened.high_water_mark == (datetime(2024, 5, 1, 9, 30), 2)
+    assert reopened.get(2) == make_snapshot(2, "/files/2.pdf", disk_size=9, file_mtime_ns=123, content_hash=digest)
+    assert 1 in reopened and 3 not in reopened
+    assert reopened.get(3) is None
+
+
+def test_apply_keeps_aggregates_in_step(store_path):
+    store = DocumentSnapshotStore(store_path)
+    store.apply([make_snapshot(doc_id) for doc_id in (1, 2, 3, 10)])
+    store.apply([make_snapshot(2, name="Renamed.pdf"), make_snapshot(11)], deleted_ids=[3, 99])
+
+    assert (len(store), store.id_sum) == (4, 1 + 2 + 10 + 11)
+    assert store.get(2)["name"] == "Renamed.pdf"
+    assert store.get_many([1, 2, 3, 4]).keys() == {1, 2}
+
+    # Aggregates are persisted, and rebuilt if the state row is missing
+    store.conn.execute("DELETE FROM watcher_state")
+    store.close()
+    assert (len(DocumentSnapshotStore(store_path)), DocumentSnapshotStore(store_path).id_sum) == (4, 24)
+
+
+def test_failed_apply_leaves_store_unchanged(store_path):
+    store = DocumentSnapshotStore(store_path)
+    store.apply([make_snapshot(1)], state={"sweep_cursor": 0})
+
+    with pytest.raises(Exception):
+        store.apply([make_snapshot(2), {"id": "not an id"}], state={"sweep_cursor": 7})
+
+    assert (len(store), store.id_sum) == (1, 1)
+    assert 2 not in store
+    assert store.get_state("sweep_cursor") == "0"
+
+
+def test_ids_missing_from_walks_both_sides_in_order(store_path):
+    store = DocumentSnapshotStore(store_path)
+    store.apply([make_snapshot(doc_id) for doc_id in range(1, 30001, 3)])
+
+    live = [doc_id for doc_id in range(1, 30001, 3) if doc_id % 7] + [30001, 30004]
+    assert store.ids_missing_from(sorted(live)) == [doc_id for doc_id in range(1, 30001, 3) if doc_id % 7 == 0]
+    assert store.ids_missing_from([]) == list(range(1, 30001, 3))
+    assert list(store.iter_ids(batch_size=1000)) == list(range(1, 30001, 3))
+
+
+def test_iter_after_pages_through_documents_with_files(store_path):
+    store = DocumentSnapshotStore(store_path)
+    store.apply([make_snapshot(doc_id, f"/files/{doc_id}" if doc_id % 2 else None) for doc_id in range(1, 21)])
+
+    first = store.iter_after(0, 4)
+    assert [s["id"] for s in first] == [1, 3, 5, 7]
+    assert [s["id"] for s in store.iter_after(first[-1]["id"], 100)] == [9, 11, 13, 15, 17, 19]
+
+
+def test_hash_file_matches_hashlib(tmp_path):
+    path = tmp_path / "exhibit.bin"
+    content = os.urandom(3 * 1024 * 1024 + 17)
+    path.write_bytes(content)
+
+    assert hash_file(str(path)) == hashlib.sha256(content).hexdigest()
+    assert hash_file(str(tmp_path / "missing.bin")) is None
+
+
+def test_read_file_state_rehashes_only_when_size_or_mtime_change(tmp_path, monkeypatch):
+    path = tmp_path / "brief.txt"
+    path.write_bytes(b"first draft")
+    calls = []
+    monkeypatch.setattr("src.proactive_assistant.snapshot_store.hash_file",
+                        lambda file_path: calls.append(file_path) or "fresh")
+
+    state = read_file_state(str(path))
+    assert calls == [str(path)] and state["disk_size"] == 11
+
+    previous = {"file_path": str(path), **state}
+    assert read_file_state(str(path), previous)["content_hash"] == "fresh"
+    assert len(calls) == 1
+
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    read_file_state(str(path), previous)
+    assert len(calls) == 2
+
+    # A different file at the same size and mtime is hashed too
+    assert read_file_state(str(path), {**previous, "file_path": "/elsewhere"})["content_hash"] == "fresh"
+    assert len(calls) == 3
+
+    assert read_file_state(None) == read_file_state(str(tmp_path / "gone")) == {
+        "disk_size": None, "file_mtime_ns": None, "content_hash": None}
+    assert [s["disk_size"] for s in read_file_states([(str(path), None), (None, None)])] == [11, None]
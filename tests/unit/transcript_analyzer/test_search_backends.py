@@ -0,0 +1,285 @@
+"""
+Unit tests for the transcript search backends.
+
+One table of query cases describes the PostgreSQL behaviour (plainto_tsquery,
+phraseto_tsquery, to_tsquery with AND/OR/NOT, the <N> proximity query and
+pg_trgm similarity) and runs against the embedded FTS5 backend; with
+TRANSCRIPT_TEST_POSTGRES_URL set the same table also runs against PostgreSQL.
+FTS5-specific tests cover incremental updates while segments stream in.
+"""
+
+import asyncio
+import os
+from datetime import datetime
+
+import pytest
+
+from src.transcript_analyzer.search_backends import (
+    SegmentRecord,
+    SQLiteFTSSearchBackend,
+    boolean_expression,
+    trigram_similarity,
+)
+from src.transcript_analyzer.transcript_database import SearchQuery, SearchType, TranscriptDatabase
+from src.transcript_analyzer.vector_index import HashingEmbeddingModel, TranscriptVectorIndex
+
+CORPUS = [
+    # (segment id, speaker, start, end, case, text)
+    ("s1", "JUDGE SMITH", 0.0, 5.0, "case-1", "Objection sustained. The jury will disregard the answer."),
+    ("s2", "MR. JONES", 5.0, 12.0, "case-1", "Objection, your honor, hearsay."),
+    ("s3", "JUDGE SMITH", 12.0, 15.0, "case-1", "Overruled. The witness may answer the question."),
+    ("s4", "MS. LEE", 15.0, 30.0, "case-1", "The defendant signed the contract on the third of May."),
+    ("s5", "WITNESS", 30.0, 41.0, "case-2", "I never saw the contract before the deposition."),
+    ("s6", "MR. JONES", 41.0, 50.0, "case-2", "Move to strike the testimony of the expert witness as hearsay."),
+    ("s7", "MS. LEE", 50.0, 62.0, "case-2", "The expert reviewed medical records and billing documents."),
+    ("s8", "JUDGE SMITH", 62.0, 64.0, "case-2", "Sidebar, counsel."),
+]
+
+PARITY_CASES = [
+    # (name, SearchQuery arguments, expected segment ids)
+    ("full_text_all_terms", dict(query_text="objection hearsay"), {"s2"}),
+    ("full_text_stemming", dict(query_text="objections"), {"s1", "s2"}),
+    ("full_text_stopwords", dict(query_text="the witness"), {"s3", "s5", "s6"}),
+    ("full_text_abbreviation", dict(query_text="obj"), {"s1", "s2"}),
+    ("phrase", dict(query_text="expert witness", search_type=SearchType.PHRASE_EXACT), {"s6"}),
+    ("phrase_order", dict(query_text="witness expert", search_type=SearchType.PHRASE_EXACT), set()),
+    ("phrase_stopwords_trimmed", dict(query_text="the expert witness as",
+                                      search_type=SearchType.PHRASE_EXACT), {"s6"}),
+    ("boolean_or", dict(query_text="sidebar OR deposition", search_type=SearchType.BOOLEAN), {"s5", "s8"}),
+    ("boolean_and_not", dict(query_text="hearsay AND NOT expert", search_type=SearchType.BOOLEAN), {"s2"}),
+    ("boolean_group", dict(query_text="(contract OR testimony) AND hearsay",
+                           search_type=SearchType.BOOLEAN), {"s6"}),
+    ("proximity_within", dict(query_text="expert records", search_type=SearchType.PROXIMITY,
+                              proximity_distance=3), {"s7"}),
+    ("proximity_too_far", dict(query_text="strike hearsay", search_type=SearchType.PROXIMITY,
+                               proximity_distance=2), set()),
+    ("fuzzy", dict(query_text="Sidebar counsel", search_type=SearchType.FUZZY, fuzzy_threshold=0.5), {"s8"}),
+    ("speaker_filter", dict(query_text="hearsay", speakers=["MR. JONES"]), {"s2", "s6"}),
+    ("speaker_context", dict(query_text="witness", search_type=SearchType.SPEAKER_CONTEXT,
+                             speakers=["JUDGE SMITH"]), {"s3"}),
+    ("case_filter", dict(query_text="contract", case_ids=["case-2"]), {"s5"}),
+    ("time_range_overlap", dict(query_text="witness", time_range=(10.0, 20.0)), {"s3"}),
+    ("time_range_boundary", dict(query_text="contract", time_range=(30.0, 30.0)), {"s4", "s5"}),
+]
+CASE_IDS = [case[0] for case in PARITY_CASES]
+
+
+def corpus_records():
+    return [
+        SegmentRecord(
+            segment_id=segment_id, document_id=case, text=text, speaker=speaker, case_id=case,
+            segment_number=i, start_time=start, end_time=end, date_proceeding=datetime(2024, 3, 1)
+        )
+        for i, (segment_id, speaker, start, end, case, text) in enumerate(CORPUS)
+    ]
+
+
+def search_ids(backend, **kwargs):
+    hits = asyncio.run(backend.search(SearchQuery(**kwargs)))
+    return {segment_id for segment_id, _ in hits.hits}
+
+
+@pytest.fixture
+def database():
+    return TranscriptDatabase("sqlite://")
+
+
+@pytest.fixture
+def backend(database):
+    backend = database.search_backend
+    backend.index_segments(corpus_records())
+    yield backend
+    backend.close()
+
+
+@pytest.fixture(scope="module")
+def postgres_database():
+    url = os.environ.get("TRANSCRIPT_TEST_POSTGRES_URL")
+    if not url:
+        pytest.skip("TRANSCRIPT_TEST_POSTGRES_URL not set")
+    database = TranscriptDatabase(url)
+    for case in ("case-1", "case-2"):
+        segments = [
+            dict(speaker=speaker, start_time=start, end_time=end, text=text)
+            for _, speaker, start, end, segment_case, text in CORPUS if segment_case == case
+        ]
+        asyncio.run(database.store_transcript(
+            f"session-{case}", case, " ".join(s["text"] for s in segments), segments,
+            {"date_proceeding": datetime(2024, 3, 1)}
+        ))
+    return database
+
+
+@pytest.mark.parametrize("name,kwargs,expected", PARITY_CASES, ids=CASE_IDS)
+def test_sqlite_fts_matches_postgres_semantics(backend, name, kwargs, expected):
+    assert search_ids(backend, **kwargs) == expected
+
+
+@pytest.mark.parametrize("name,kwargs,expected", PARITY_CASES, ids=CASE_IDS)
+def test_postgres_parity(postgres_database, name, kwargs, expected):
+    # Segment ids differ between the backends; compare the matched texts
+    results = asyncio.run(postgres_database.search_transcripts(SearchQuery(minimum_score=0.0, **kwargs)))
+    texts = {row[-1] for row in CORPUS if row[0] in expected}
+    assert {match.matched_text for match in results.matches} == texts
+
+
+class TestSQLiteFTSSearchBackend:
+    """Ranking, facets and paging of the embedded backend."""
+
+    def test_bm25_ranking_facets_and_paging(self, backend):
+        hits = asyncio.run(backend.search(SearchQuery(query_text="hearsay")))
+
+        assert hits.total == 2
+        assert [segment_id for segment_id, _ in hits.hits] == ["s2", "s6"]  # Shorter segment ranks higher
+        assert hits.hits[0][1] > hits.hits[1][1] > 0
+        assert hits.facets["speakers"] == {"MR. JONES": 2}
+        assert hits.facets["cases"] == {"case-1": 1, "case-2": 1}
+
+        page = asyncio.run(backend.search(SearchQuery(query_text="hearsay", max_results=1, offset=1)))
+        assert page.total == 2
+        assert [segment_id for segment_id, _ in page.hits] == ["s6"]
+
+    def test_queries_without_search_terms_return_nothing(self, backend):
+        assert search_ids(backend, query_text="the of and") == set()
+        assert search_ids(backend, query_text='"', search_type=SearchType.PHRASE_EXACT) == set()
+
+    def test_boolean_translation(self):
+        assert boolean_expression("hearsay & NOT expert") == '"hearsay" NOT "expert"'
+        assert boolean_expression("hearsay or the (jury sidebar)") == '"hearsay" OR ( "jury" AND "sidebar" )'
+        with pytest.raises(ValueError):
+            boolean_expression("NOT hearsay")
+
+    def test_trigram_similarity_matches_pg_trgm(self):
+        # pg_trgm documentation: similarity('word', 'words') = 4 shared / 7 distinct trigrams
+        assert trigram_similarity("word", "words") == pytest.approx(4 / 7)
+        assert trigram_similarity("Sidebar, counsel.", "sidebar counsel") == 1.0
+        assert trigram_similarity("", "counsel") == 0.0
+
+
+class TestIncrementalUpdates:
+    """Segments become searchable as they stream in, edits and deletes apply in place."""
+
+    def test_streamed_segments_are_searchable_immediately(self, backend):
+        assert search_ids(backend, query_text="mistrial") == set()
+
+        backend.index_segments([SegmentRecord("s9", "case-2", "Defense moves for a mistrial.", "MR. JONES",
+                                              case_id="case-2", start_time=64.0, end_time=68.0)])
+        assert search_ids(backend, query_text="mistrial") == {"s9"}
+        assert search_ids(backend, query_text="mistrial", time_range=(65.0, 70.0)) == {"s9"}
+
+    def test_edited_segment_is_reindexed(self, backend):
+        edited = corpus_records()[7]
+        edited.text = "Counsel, approach the bench."
+        edited.speaker = "THE COURT"
+
+        assert backend.index_segments([edited]) == 1
+        assert search_ids(backend, query_text="sidebar") == set()
+        assert search_ids(backend, query_text="bench") == {"s8"}
+        assert search_ids(backend, query_text="court") == {"s8"}
+        assert search_ids(backend, query_text="counsel", speakers=["JUDGE SMITH"]) == set()
+
+    def test_removed_segments_leave_the_index(self, backend):
+        assert backend.remove_segments(["s2", "s6", "missing"]) == 2
+        assert search_ids(backend, query_text="hearsay") == set()
+        assert search_ids(backend, query_text="objection") == {"s1"}
+
+    def test_index_persists_in_database_file(self, tmp_path):
+        path = str(tmp_path / "transcripts.db")
+        backend = SQLiteFTSSearchBackend(path)
+        backend.index_segments(corpus_records())
+        backend.close()
+
+        reopened = SQLiteFTSSearchBackend(path)
+        assert search_ids(reopened, query_text="deposition") == {"s5"}
+        # Raises if the FTS index drifted from its content table
+        reopened._conn.execute("INSERT INTO transcript_search_fts (transcript_search_fts) VALUES ('integrity-check')")
+        reopened.close()
+
+
+class TestTranscriptDatabase:
+    """TranscriptDatabase defaults to the embedded backend off PostgreSQL."""
+
+    def test_store_append_and_search(self, database):
+        segments = [dict(speaker=speaker, start_time=start, end_time=end, text=text)
+                    for _, speaker, start, end, case, text in CORPUS if case == "case-1"]
+        document_id = asyncio.run(database.store_transcript(
+            "session-1", "case-1", " ".join(s["text"] for s in segments), segments
+        ))
+
+        results = asyncio.run(database.search_transcripts(SearchQuery(query_text="objection", minimum_score=0.0)))
+        assert results.total_matches == 2
+        assert {match.speaker for match in results.matches} == {"JUDGE SMITH", "MR. JONES"}
+
+        appended = asyncio.run(database.append_segments(document_id, [
+            dict(speaker="MR. JONES", start_time=31.0, end_time=35.0, text="Renewed objection, your honor.")
+        ]))
+        results = asyncio.run(database.search_transcripts(SearchQuery(query_text="objection", minimum_score=0.0)))
+        assert results.total_matches == 3
+        assert appended[0] in {match.segment_id for match in results.matches}
+
+        with pytest.raises(ValueError):
+            asyncio.run(database.append_segments(appended[0], [dict(text="orphan")]))
+
+    def test_edits_and_deletes_reach_the_index(self, database):
+        segments = [dict(speaker=speaker, start_time=start, end_time=end, text=text)
+                    for _, speaker, start, end, case, text in CORPUS if case == "case-2"]
+        document_id = asyncio.run(database.store_transcript(
+            "session-2", "case-2", " ".join(s["text"] for s in segments), segments
+        ))
+        sidebar = self._segment_ids(database, "sidebar")
+
+        assert asyncio.run(database.update_segment(sidebar[0], {"text": "Counsel, approach the bench."}))
+        assert self._segment_ids(database, "sidebar") == []
+        assert self._segment_ids(database, "bench") == sidebar
+
+        expert = self._segment_ids(database, "expert")
+        assert asyncio.run(database.delete_segments(expert[:1])) == 1
+        assert len(self._segment_ids(database, "expert")) == 1
+
+        assert asyncio.run(database.delete_transcript(document_id))
+        assert self._segment_ids(database, "contract") == []
+        assert len(database.search_backend) == 0
+        assert not asyncio.run(database.delete_transcript(document_id))
+
+    def test_index_is_backfilled_on_open(self, tmp_path):
+        url = f"sqlite:///{tmp_path / 'transcripts.db'}"
+        database = TranscriptDatabase(url)
+        segments = [dict(speaker=speaker, text=text) for _, speaker, _, _, _, text in CORPUS]
+        asyncio.run(database.store_transcript("session-1", "case-1", "", segments))
+
+        # Index lost (or written by an older build without one)
+        database.search_backend.remove_segments(database.search_backend.segment_ids())
+        database.search_backend.index_segments([SegmentRecord("gone", "x", "Orphaned hearsay.")])
+        database.search_backend.close()
+
+        reopened = TranscriptDatabase(url)
+        assert len(reopened.search_backend) == len(CORPUS)
+        assert len(self._segment_ids(reopened, "hearsay")) == 2
+        assert reopened.sync_search_index() == 0
+
+    def test_vector_index_is_backfilled_when_attached(self, tmp_path):
+        url = f"sqlite:///{tmp_path / 'transcripts.db'}"
+        database = TranscriptDatabase(url)
+        segments = [dict(speaker=speaker, text=text) for _, speaker, _, _, _, text in CORPUS]
+        asyncio.run(database.store_transcript("session-1", "case-1", "", segments))
+
+        index = TranscriptVectorIndex(tmp_path / "vectors", model=HashingEmbeddingModel(64))
+        assert not database.vector_index_covers_segments(index)
+        assert database.attach_vector_index(index) == len(CORPUS)
+        assert database.vector_index_covers_segments()
+        assert database.sync_vector_index() == 0
+        index.close()
+
+        # A model change wipes the vectors; reopening re-embeds every segment
+        rebuilt = TranscriptVectorIndex(tmp_path / "vectors", model=HashingEmbeddingModel(32))
+        assert len(rebuilt) == 0
+        rebuilt.upsert([("gone", "Orphaned hearsay.")])
+        reopened = TranscriptDatabase(url, vector_index=rebuilt)
+        assert len(rebuilt) == len(CORPUS) and "gone" not in rebuilt
+        assert set(self._segment_ids(reopened, "hearsay")) <= set(rebuilt.segment_ids())
+        rebuilt.close()
+
+    @staticmethod
+    def _segment_ids(database, text):
+        results = asyncio.run(database.search_transcripts(SearchQuery(query_text=text, minimum_score=0.0)))
+        return [match.segment_id for match in results.matches]
@@ -0,0 +1,224 @@
+"""
+Unit tests for the transcript vector index.
+
+Uses the deterministic hashing embedding model: batched embedding at ingest,
+content-hash change detection, incremental add/remove, persistence across
+reopen and IVF recall against exact search.
+"""
+
+import random
+import statistics
+
+import numpy as np
+import pytest
+
+from src.transcript_analyzer.vector_index import (
+    HashingEmbeddingModel,
+    TranscriptVectorIndex,
+    content_hash,
+)
+
+VOCABULARY = (
+    "objection hearsay witness counsel exhibit foundation court sustained overruled deposition "
+    "testimony plaintiff defendant contract breach damages recess sidebar motion ruling jury "
+    "question answer record redirect cross examination privilege expert opinion document"
+).split()
+
+
+def synthetic_segments(count, seed=0, start=0):
+    rng = random.Random(seed)
+    return [
+        (f"seg-{i}", " ".join(rng.choice(VOCABULARY) for _ in range(rng.randint(8, 20))))
+        for i in range(start, start + count)
+    ]
+
+
+class CountingModel(HashingEmbeddingModel):
+    """Hashing model that records every batch it is asked to embed."""
+
+    def __init__(self, dimension=64):
+        super().__init__(dimension)
+        self.batches = []
+
+    def embed(self, texts):
+        self.batches.append(len(texts))
+        return super().embed(texts)
+
+    @property
+    def embedded(self):
+        return sum(self.batches)
+
+
+def exact_top_k(model, segments, query, k):
+    vectors = model.embed([text for _, text in segments])
+    scores = vectors @ model.embed([query])[0]
+    order = np.argsort(-scores, kind="stable")[:k]
+    return [segments[i][0] for i in order]
+
+
+@pytest.fixture
+def model():
+    return CountingModel()
+
+
+@pytest.fixture
+def index(tmp_path, model):
+    index = TranscriptVectorIndex(tmp_path / "vectors", model=model, batch_size=32)
+    yield index
+    index.close()
+
+
+class TestHashingEmbeddingModel:
+    """The local model is deterministic and meaningful enough to rank."""
+
+    def test_deterministic_and_normalized(self):
+        model = HashingEmbeddingModel(128)
+        first = model.embed(["Objection, hearsay.", "The witness may step down."])
+        second = HashingEmbeddingModel(128).embed(["Objection, hearsay.", "The witness may step down."])
+
+        assert np.array_equal(first, second)
+        assert np.allclose(np.linalg.norm(first, axis=1), 1.0)
+        assert not model.embed([""]).any()
+
+    def test_related_text_scores_higher(self):
+        model = HashingEmbeddingModel(256)
+        query, related, unrelated = model.embed([
+            "objection hearsay sustained",
+            "counsel objection on hearsay grounds, sustained",
+            "the jury will take a recess for lunch",
+        ])
+        assert query @ related > query @ unrelated
+
+
+class TestIngest:
+    """Segments are embedded once, in batches, and only when they change."""
+
+    def test_batched_embedding_and_unchanged_segments_skipped(self, index, model):
+        segments = synthetic_segments(100)
+
+        assert index.upsert(segments) == 100
+        assert model.batches == [32, 32, 32, 4]
+        assert len(index) == 100
+
+        assert index.upsert(segments) == 0
+        assert model.embedded == 100
+
+    def test_changed_segment_is_re_embedded(self, index, model):
+        segments = synthetic_segments(50)
+        index.upsert(segments)
+        model.batches.clear()
+
+        changed = [("seg-7", "objection hearsay sustained")]
+        assert index.upsert(segments[:7] + changed + segments[8:]) == 1
+        assert model.embedded == 1
+        assert index.search("objection hearsay sustained", k=1)[0][0] == "seg-7"
+        assert np.allclose(index.get_vector("seg-7"), model.embed(["objection hearsay sustained"])[0])
+
+    def test_search_matches_exact_ranking(self, index, model):
+        segments = synthetic_segments(300, seed=1)
+        index.upsert(segments)
+
+        for query in ("hearsay objection sustained", "expert opinion document", "jury recess"):
+            hits = index.search(query, k=10)
+            vectors = model.embed([text for _, text in segments])
+            expected = np.sort(vectors @ model.embed([query])[0])[::-1][:10]
+            # Same scores as brute force; ties may be ordered differently
+            assert np.allclose([score for _, score in hits], expected, atol=1e-5)
+            assert exact_top_k(model, segments, query, 1)[0] in {segment_id for segment_id, _ in hits}
+
+    def test_min_score_and_candidate_restriction(self, index):
+        segments = synthetic_segments(200, seed=2)
+        index.upsert(segments)
+
+        assert all(score >= 0.3 for _, score in index.search("hearsay objection", k=50, min_score=0.3))
+
+        candidates = ["seg-3", "seg-50", "seg-199", "missing"]
+        hits = index.search("hearsay objection", k=10, segment_ids=candidates)
+        assert sorted(segment_id for segment_id, _ in hits) == ["seg-199", "seg-3", "seg-50"]
+
+
+class TestIncrementalUpdates:
+    """Removal and slot reuse keep the FAISS index and the vector file consistent."""
+
+    def test_removed_segments_are_not_returned_and_slots_are_reused(self, index):
+        segments = synthetic_segments(100, seed=3)
+        index.upsert(segments)
+        removed = {f"seg-{i}" for i in range(0, 100, 2)}
+
+        assert index.remove(removed | {"missing"}) == 50
+        assert len(index) == 50
+        hits = index.search("objection witness", k=100)
+        assert len(hits) == 50
+        assert not removed & {segment_id for segment_id, _ in hits}
+
+        index.upsert(synthetic_segments(50, seed=4, start=100))
+        assert len(index) == 100
+        assert index._next_slot == 100
+
+    def test_ivf_index_recall_with_updates(self, tmp_path):
+        model = HashingEmbeddingModel(64)
+        index = TranscriptVectorIndex(tmp_path / "ivf", model=model, ivf_threshold=2_000, nprobe=8)
+        segments = synthetic_segments(4_000, seed=5)
+        index.upsert(segments)
+        index.remove([f"seg-{i}" for i in range(0, 4_000, 10)])
+        live = [s for s in segments if s[0] in index]
+
+        assert index._trained_size >= 2_000
+        recalls = []
+        for query, _ in synthetic_segments(20, seed=6):
+            expected = set(exact_top_k(model, live, query, 10))
+            found = {segment_id for segment_id, _ in index.search(query, k=10)}
+            recalls.append(len(expected & found) / 10)
+        assert statistics.mean(recalls) >= 0.8
+        index.close()
+
+
+class TestPersistence:
+    """Vectors survive restarts without re-embedding."""
+
+    def test_reopen_after_close_loads_snapshot(self, tmp_path):
+        root = tmp_path / "vectors"
+        segments = synthetic_segments(500, seed=7)
+        first = TranscriptVectorIndex(root, model=CountingModel())
+        first.upsert(segments)
+        before = first.search("deposition testimony", k=5)
+        first.close()
+
+        model = CountingModel()
+        reopened = TranscriptVectorIndex(root, model=model)
+        assert reopened._index_current
+        assert reopened.upsert(segments) == 0
+        assert model.batches == []
+        assert reopened.search("deposition testimony", k=5) == before
+        reopened.close()
+
+    def test_reopen_without_flush_rebuilds_from_vectors(self, tmp_path):
+        root = tmp_path / "vectors"
+        first = TranscriptVectorIndex(root, model=CountingModel())
+        first.upsert(synthetic_segments(200, seed=8))
+        first.flush()
+        first.upsert([("seg-0", "objection hearsay sustained")])
+        first.remove(["seg-1"])
+        first._vectors.flush()  # Process dies here without a final flush()
+
+        reopened = TranscriptVectorIndex(root, model=CountingModel())
+        assert not reopened._index_current
+        assert len(reopened) == 199
+        assert reopened.search("objection hearsay sustained", k=1)[0][0] == "seg-0"
+        reopened.close()
+
+    def test_model_change_discards_vectors(self, tmp_path):
+        root = tmp_path / "vectors"
+        TranscriptVectorIndex(root, model=HashingEmbeddingModel(64)).close()
+        first = TranscriptVectorIndex(root, model=HashingEmbeddingModel(64))
+        first.upsert(synthetic_segments(10))
+        first.close()
+
+        reopened = TranscriptVectorIndex(root, model=HashingEmbeddingModel(32))
+        assert len(reopened) == 0
+        reopened.close()
+
+
+def test_content_hash_is_stable():
+    assert content_hash("Objection.") == content_hash("Objection.")
+    assert content_hash("Objection.") != content_hash("Objection!")
@@ -0,0 +1,357 @@
+"""
+Unit Tests for the Trial Content Index
+
+Tests tokenizing exhibit numbers and names, prefix matching and ranking,
+incremental re-indexing as exhibits, evidence, witnesses and trial day notes
+change, and that the manager searches return what the previous linear scans
+returned for whole-word queries.
+"""
+
+import random
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from src.trial_prep.digital_trial_notebook import DigitalTrialNotebook
+from src.trial_prep.evidence_manager import (
+    AuthenticityLevel,
+    EvidenceItem,
+    EvidenceManager,
+    EvidenceType,
+    RelevanceScore,
+)
+from src.trial_prep.exhibit_manager import (
+    Exhibit,
+    ExhibitManager,
+    ExhibitParty,
+    ExhibitStatus,
+    ExhibitType,
+)
+from src.trial_prep.trial_content_index import TrialContentIndex, tokenize
+from src.trial_prep.witness_manager import (
+    CredibilityLevel,
+    PreparationStatus,
+    WitnessManager,
+    WitnessProfile,
+    WitnessStatus,
+    WitnessType,
+)
+
+SUBJECTS = ["invoice", "email", "contract", "photograph", "deposition", "ledger", "memo", "diagram",
+            "report", "warranty", "shipment", "inspection", "payroll", "schedule", "letter", "audit"]
+PEOPLE = ["Alvarez", "Brennan", "Chen", "Dubois", "Eriksen", "Fischer", "Garcia", "Haddad", "Ivanova",
+          "Jensen", "Kowalski", "Lindqvist", "Moreau", "Nakamura", "O'Brien", "Patel"]
+NOTE_WORDS = ["objection", "sustained", "overruled", "sidebar", "jury", "credibility", "foundation",
+              "hearsay", "impeachment", "recess", "testimony", "exhibit", "stipulation", "damages",
+              "causation", "timeline", "warranty", "shipment", "inspection", "motion", "limine"]
+
+
+def make_exhibit(n, rng=None):
+    rng = rng or random.Random(n)
+    subject = SUBJECTS[n % len(SUBJECTS)]
+    person = PEOPLE[(n * 7) % len(PEOPLE)]
+    party = ExhibitParty.PLAINTIFF if n % 2 else ExhibitParty.DEFENDANT
+    return Exhibit(
+        exhibit_id=f"ex-{n}",
+        exhibit_number=f"{'P' if n % 2 else 'D'}-{n}",
+        party=party,
+        exhibit_type=ExhibitType.DOCUMENT if n % 5 else ExhibitType.PHOTOGRAPH,
+        title=f"{subject.title()} from {person} #{n}",
+        description=f"{subject} dated {2019 + n % 4} concerning the {SUBJECTS[(n * 3) % len(SUBJECTS)]}",
+        strategic_notes=" ".join(rng.sample(NOTE_WORDS, 3)),
+        importance_level=1 + n % 5,
+        jury_appeal_factor=1 + (n * 3) % 5
+    )
+
+
+def make_evidence(n):
+    return EvidenceItem(
+        evidence_id=f"ev-{n}",
+        evidence_type=EvidenceType.DOCUMENT if n % 3 else EvidenceType.FINANCIAL,
+        title=f"{SUBJECTS[n % len(SUBJECTS)].title()} records {n}",
+        description=f"Produced by {PEOPLE[n % len(PEOPLE)]} in discovery",
+        source=f"{PEOPLE[(n * 5) % len(PEOPLE)]} Holdings",
+        date_created=datetime(2020, 1, 1) + timedelta(days=n),
+        date_collected=datetime(2023, 1, 1),
+        relevance_score=list(RelevanceScore)[n % 5],
+        case_relevance="Shows notice of the defect" if n % 4 == 0 else "",
+        notes=[f"Bates {1000 + n}"],
+        tags={"case-1", SUBJECTS[(n * 3) % len(SUBJECTS)]}
+    )
+
+
+def make_witness(n):
+    return WitnessProfile(
+        witness_id=f"w-{n}",
+        name=f"{['Maria', 'John', 'Aiko', 'Omar'][n % 4]} {PEOPLE[n % len(PEOPLE)]}",
+        witness_type=WitnessType.EXPERT_WITNESS if n % 3 == 0 else WitnessType.FACT_WITNESS,
+        status=WitnessStatus.COOPERATIVE if n % 2 else WitnessStatus.SUBPOENAED,
+        occupation=["engineer", "accountant", "warehouse manager", "physician"][n % 4],
+        relationship_to_case=f"Handled the {SUBJECTS[n % len(SUBJECTS)]}",
+        credibility_level=list(CredibilityLevel)[n % 5],
+        strategic_value=1 + n % 5,
+        notes=[f"Deposed {2021 + n % 3}"]
+    )
+
+
+# The previous linear scans, for parity checks
+
+def legacy_search_exhibits(manager, query, filters=None):
+    results = []
+    query_lower = query.lower()
+    for exhibit in manager.exhibits.values():
+        searchable_text = (
+            f"{exhibit.title} {exhibit.description} {exhibit.strategic_notes} " +
+            f"{exhibit.attorney_notes} {exhibit.trial_notes}"
+        ).lower()
+        if query_lower in searchable_text:
+            if filters:
+                if 'exhibit_type' in filters and exhibit.exhibit_type != filters['exhibit_type']:
+                    continue
+                if 'status' in filters and exhibit.status != filters['status']:
+                    continue
+                if 'party' in filters and exhibit.party != filters['party']:
+                    continue
+                if 'importance_min' in filters and exhibit.importance_level < filters['importance_min']:
+                    continue
+            results.append(exhibit)
+    return sorted(results, key=lambda x: (x.importance_level, x.jury_appeal_factor), reverse=True)
+
+
+def legacy_search_evidence(manager, query, filters=None):
+    results = []
+    query_lower = query.lower()
+    for evidence in manager.evidence_items.values():
+        searchable_text = (
+            f"{evidence.title} {evidence.description} " +
+            f"{evidence.source} {evidence.case_relevance} " +
+            f"{' '.join(evidence.notes)} {' '.join(evidence.tags)}"
+        ).lower()
+        if query_lower in searchable_text:
+            if filters:
+                if 'evidence_type' in filters and evidence.evidence_type != filters['evidence_type']:
+                    continue
+                if 'relevance_min' in filters and evidence.relevance_score.value < filters['relevance_min']:
+                    continue
+                if 'date_from' in filters and evidence.date_created < filters['date_from']:
+                    continue
+                if 'date_to' in filters and evidence.date_created > filters['date_to']:
+                    continue
+            results.append(evidence)
+    return sorted(results, key=lambda x: x.relevance_score.value, reverse=True)
+
+
+def legacy_search_witnesses(manager, query, filters=None):
+    results = []
+    query_lower = query.lower()
+    for witness in manager.witnesses.values():
+        searchable_text = (
+            f"{witness.name} {witness.occupation or ''} " +
+            f"{witness.relationship_to_case} {witness.knowledge_of_facts} " +
+            f"{' '.join(witness.notes)}"
+        ).lower()
+        if query_lower in searchable_text:
+            if filters:
+                if 'witness_type' in filters and witness.witness_type != filters['witness_type']:
+                    continue
+                if 'credibility_min' in filters and witness.credibility_level.value < filters['credibility_min']:
+                    continue
+            results.append(witness)
+    return sorted(results, key=lambda x: (x.strategic_value, x.credibility_level.value), reverse=True)
+
+
+def legacy_search_notebook(notebook, query):
+    query_lower = query.lower()
+    witnesses = [witness_id for witness_id, info in notebook.master_witness_list.items()
+                 if query_lower in info['name'].lower()]
+    exhibits = [exhibit_id for exhibit_id, info in notebook.master_exhibit_list.items()
+                if query_lower in info['exhibit_number'].lower()]
+    days = [day_id for day_id, day in notebook.trial_days.items()
+            if query_lower in f"{day.general_trial_notes} {day.judge_observations} {day.jury_observations}".lower()]
+    return witnesses, exhibits, days
+
+
+@pytest.fixture
+def managers():
+    index = TrialContentIndex()
+    exhibits, evidence, witnesses = ExhibitManager(index), EvidenceManager(index), WitnessManager(index)
+    for n in range(300):
+        exhibits.add_exhibit(make_exhibit(n))
+    for n in range(120):
+        evidence.add_evidence(make_evidence(n))
+    for n in range(40):
+        witnesses.add_witness(make_witness(n))
+    return index, exhibits, evidence, witnesses
+
+
+def keys(items, attribute):
+    return sorted(getattr(item, attribute) for item in items)
+
+
+def test_tokenize_keeps_exhibit_numbers_whole():
+    assert tokenize("Exhibit P-12, O'Brien's memo_v2") == [
+        "exhibit", "p-12", "p", "12", "o'brien's", "o", "brien", "s", "memo", "v2"
+    ]
+
+
+def test_prefix_matches_rank_below_whole_tokens():
+    index = TrialContentIndex()
+    index.index_item('exhibit', 'a', {'title': 'Deposition of the warehouse manager'})
+    index.index_item('exhibit', 'b', {'title': 'Depo transcript'})
+    index.index_item('exhibit', 'c', {'title': 'Warehouse photographs'})
+
+    assert [hit.item_id for hit in index.search("depo")] == ['b', 'a']
+    assert [hit.item_id for hit in index.search("depo ware")] == ['a']
+    assert index.search("deposition photographs") == []
+    assert {hit.item_id for hit in index.search("")} == {'a', 'b', 'c'}
+
+
+def test_reindexing_replaces_and_removes_terms():
+    index = TrialContentIndex()
+    index.index_item('witness', 'w1', {'name': 'Maria Alvarez'})
+    index.index_item('witness', 'w1', {'name': 'Maria Brennan'})
+
+    assert index.search("alvarez") == []
+    assert [hit.item_id for hit in index.search("brenn")] == ['w1']
+    assert "alvarez" not in index.vocabulary
+
+    assert index.remove_item('witness', 'w1')
+    assert index.vocabulary == [] and index.postings == {}
+    assert not index.remove_item('witness', 'w1')
+
+
+def test_attribute_filters():
+    index = TrialContentIndex()
+    for n in range(6):
+        index.index_item('evidence', str(n), {'title': 'Ledger'},
+                         attributes={'relevance': n, 'date': date(2024, 1, 1 + n), 'status': 'open' if n % 2 else 'closed'})
+
+    def ids(**filters):
+        return sorted(hit.item_id for hit in index.search("ledger", filters=filters))
+
+    assert ids(relevance_min=4) == ['4', '5']
+    assert ids(relevance_max=1) == ['0', '1']
+    assert ids(date_from=date(2024, 1, 3), date_to=date(2024, 1, 4)) == ['2', '3']
+    assert ids(status='open') == ['1', '3', '5']
+    assert ids(status={'open', 'closed'}, relevance_min=5) == ['5']
+    assert ids(missing='x') == []
+
+
+@pytest.mark.parametrize("query", ["invoice", "Invoice", "email", "deposition", "overruled", "hearsay",
+                                   "alvarez", "contract 2021", "2020", "sidebar jury", "nothing"])
+def test_exhibit_search_matches_previous_scan(managers, query):
+    _, exhibits, _, _ = managers
+    for filters in [None, {'party': ExhibitParty.PLAINTIFF}, {'importance_min': 4},
+                    {'exhibit_type': ExhibitType.PHOTOGRAPH, 'status': ExhibitStatus.IDENTIFIED}]:
+        found = exhibits.search_exhibits(query, filters)
+        expected = legacy_search_exhibits(exhibits, query, filters) if len(query.split()) == 1 else [
+            exhibit for exhibit in legacy_search_exhibits(exhibits, query.split()[0], filters)
+            if query.split()[1] in f"{exhibit.title} {exhibit.description} {exhibit.strategic_notes}".lower()
+        ]
+        assert keys(found, 'exhibit_id') == keys(expected, 'exhibit_id')
+        assert [(e.importance_level, e.jury_appeal_factor) for e in found] == [
+            (e.importance_level, e.jury_appeal_factor) for e in expected]
+
+
+@pytest.mark.parametrize("query", ["ledger", "records", "patel", "holdings", "defect", "bates", "case-1", "memo"])
+def test_evidence_search_matches_previous_scan(managers, query):
+    _, _, evidence, _ = managers
+    for filters in [None, {'relevance_min': 4}, {'evidence_type': EvidenceType.FINANCIAL},
+                    {'date_from': datetime(2020, 2, 1), 'date_to': datetime(2020, 3, 15)}]:
+        found = evidence.search_evidence(query, filters)
+        expected = legacy_search_evidence(evidence, query, filters)
+        assert keys(found, 'evidence_id') == keys(expected, 'evidence_id')
+        assert [e.relevance_score for e in found] == [e.relevance_score for e in expected]
+
+
+@pytest.mark.parametrize("query", ["maria", "chen", "o'brien", "engineer", "warehouse manager", "payroll", "2022"])
+def test_witness_search_matches_previous_scan(managers, query):
+    _, _, _, witnesses = managers
+    for filters in [None, {'witness_type': WitnessType.EXPERT_WITNESS}, {'credibility_min': 4}]:
+        found = witnesses.search_witnesses(query, filters)
+        expected = legacy_search_witnesses(witnesses, query, filters)
+        assert keys(found, 'witness_id') == keys(expected, 'witness_id')
+
+
+def test_prefixes_and_exhibit_numbers(managers):
+    _, exhibits, _, witnesses = managers
+
+    assert [e.exhibit_number for e in exhibits.search_exhibits("P-217")] == ["P-217"]
+    assert {e.exhibit_number for e in exhibits.search_exhibits("p-21")} == {"P-21"} | {f"P-21{d}" for d in "13579"}
+    assert {w.witness_id for w in witnesses.search_witnesses("kowal")} == {
+        w.witness_id for w in legacy_search_witnesses(witnesses, "kowalski")}
+
+
+def test_manager_updates_reach_the_index(managers):
+    _, exhibits, evidence, witnesses = managers
+
+    exhibits.admit_exhibit("ex-7")
+    assert [e.exhibit_id for e in exhibits.search_exhibits("", {'status': ExhibitStatus.ADMITTED})] == ["ex-7"]
+
+    exhibits.exhibits["ex-8"].trial_notes = "Juror four reacted to the spreadsheet"
+    assert exhibits.search_exhibits("spreadsheet") == []
+    assert exhibits.reindex_exhibit("ex-8")
+    assert [e.exhibit_id for e in exhibits.search_exhibits("spreadsheet")] == ["ex-8"]
+
+    evidence.authenticate_evidence("ev-3", AuthenticityLevel.FORENSIC_VERIFIED, "Dr. Quill", "forensic imaging")
+    assert [e.evidence_id for e in evidence.search_evidence("quill forensic")] == ["ev-3"]
+
+    witnesses.start_witness_preparation("w-5", "case-1")
+    assert [w.witness_id for w in witnesses.search_witnesses(
+        "", {'preparation_status': PreparationStatus.IN_PROGRESS})] == ["w-5"]
+
+
+def test_one_index_serves_all_managers(managers):
+    index, _, _, _ = managers
+
+    kinds = {hit.kind for hit in index.search("patel")}
+    assert kinds == {'exhibit', 'evidence', 'witness'}
+    assert {hit.kind for hit in index.search("patel", kinds=['witness'])} == {'witness'}
+    assert len(index.search("patel", limit=5)) == 5
+    assert index.get_stats()['items_by_kind'] == {'exhibit': 300, 'evidence': 120, 'witness': 40}
+
+
+@pytest.fixture
+def notebook():
+    notebooks = DigitalTrialNotebook()
+    notebook_id = notebooks.create_trial_notebook("case-1", "Acme v. Widget", date(2024, 3, 4), 6,
+                                                 "N.D. Cal.", "Judge Park")
+    day_ids = notebooks.trial_notebooks[notebook_id].day_order
+    notebooks.schedule_witness(notebook_id, day_ids[2], "w-1", "Maria Alvarez", "direct", None)
+    notebooks.schedule_witness(notebook_id, day_ids[3], "w-2", "John Brennan", "cross", None)
+    notebooks.schedule_exhibit(notebook_id, day_ids[2], "ex-1", "P-12", None, "w-1")
+    notebooks.schedule_exhibit(notebook_id, day_ids[3], "ex-2", "P-120", None, "w-2")
+    return notebooks, notebook_id, day_ids
+
+
+def test_notebook_search_matches_previous_scan(notebook):
+    notebooks, notebook_id, day_ids = notebook
+    notebooks.record_day_notes(notebook_id, day_ids[2], general_notes="Hearsay objection to the invoice overruled",
+                               judge_observations="Judge impatient with sidebar requests")
+    notebooks.record_day_notes(notebook_id, day_ids[3], jury_observations="Jury attentive during damages testimony")
+    # Written on the plan directly, as callers did before record_day_notes existed
+    notebooks.trial_notebooks[notebook_id].trial_days[day_ids[4]].general_trial_notes = "Sidebar on the motion in limine"
+
+    for query in ["maria", "brennan", "p-12", "hearsay", "sidebar", "jury", "damages", "limine", "zebra"]:
+        results = notebooks.search_trial_content(notebook_id, query)
+        witnesses, exhibits, days = legacy_search_notebook(notebooks.trial_notebooks[notebook_id], query)
+        assert sorted(w['witness_id'] for w in results['witnesses']) == sorted(witnesses)
+        assert sorted(d['day_id'] for d in results['notes']) == sorted(days)
+        if query != "p-12":
+            assert sorted(e['exhibit_id'] for e in results['exhibits']) == sorted(exhibits)
+
+    # Whole exhibit numbers rank before longer numbers sharing the prefix
+    assert [e['exhibit_number'] for e in notebooks.search_trial_content(notebook_id, "P-12")['exhibits']] == [
+        "P-12", "P-120"]
+    assert "Sidebar" in notebooks.search_trial_content(notebook_id, "sidebar limine")['notes'][0]['relevant_content']
+
+
+def test_notebook_search_is_scoped_to_its_notebook(notebook):
+    notebooks, notebook_id, _ = notebook
+    other_id = notebooks.create_trial_notebook("case-2", "Other", date(2024, 5, 1), 3, "D. Or.", "Judge Lee")
+    other_day = notebooks.trial_notebooks[other_id].day_order[0]
+    notebooks.schedule_witness(other_id, other_day, "w-9", "Maria Chen", "direct", None)
+
+    assert [w['witness_id'] for w in notebooks.search_trial_content(notebook_id, "maria")['witnesses']] == ["w-1"]
+    assert [w['witness_id'] for w in notebooks.search_trial_content(other_id, "maria")['witnesses']] == ["w-9"]
+    assert notebooks.search_trial_content("missing", "maria") == {'error': 'Trial notebook not found'}
@@ -0,0 +1,276 @@
+"""
+Unit tests for the workflow runtime.
+
+Covers DAG compilation and cycle detection, concurrent fan-out and joins,
+skipped decision branches, per-node-type concurrency limits and checkpointed
+resume after an interrupted run.
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from src.workflows import (
+    CompiledWorkflow,
+    ExecutionStatus,
+    NodeType,
+    SQLiteCheckpointStore,
+    WorkflowBuilder,
+    WorkflowCycleError,
+    WorkflowStatus,
+)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SQLiteCheckpointStore(str(tmp_path / "checkpoints.db"))
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def builder(store):
+    return WorkflowBuilder(checkpoint_store=store)
+
+
+def endpoints(workflow):
+    start = next(n for n in workflow.nodes.values() if n.node_type == NodeType.START)
+    end = next(n for n in workflow.nodes.values() if n.node_type == NodeType.END)
+    return start, end
+
+
+async def wide_workflow(builder, width, duration, join_mode="all"):
+    """start -> parallel -> `width` delay branches -> join -> end"""
+    workflow = await builder.create_workflow("Wide", "firm", "tester")
+    start, end = endpoints(workflow)
+    fork = await builder.add_node(workflow.workflow_id, NodeType.PARALLEL, "Fork", {"x": 0, "y": 0})
+    join = await builder.add_node(workflow.workflow_id, NodeType.JOIN, "Join", {"x": 0, "y": 0},
+                                  {"mode": join_mode})
+    await builder.connect_nodes(workflow.workflow_id, start.node_id, fork.node_id)
+    branches = []
+    for i in range(width):
+        delay = await builder.add_node(workflow.workflow_id, NodeType.DELAY, f"Wait {i}", {"x": 0, "y": 0},
+                                       {"duration": duration})
+        await builder.connect_nodes(workflow.workflow_id, fork.node_id, delay.node_id)
+        await builder.connect_nodes(workflow.workflow_id, delay.node_id, join.node_id)
+        branches.append(delay)
+    await builder.connect_nodes(workflow.workflow_id, join.node_id, end.node_id)
+    workflow.status = WorkflowStatus.ACTIVE
+    return workflow, join, branches
+
+
+async def run_to_completion(builder, workflow_id, **kwargs):
+    execution = await builder.execute_workflow(workflow_id, **kwargs)
+    await builder.running_executions[execution.execution_id]
+    return execution
+
+
+class TestCompilation:
+    """Adjacency indexing and cycle detection."""
+
+    @pytest.mark.asyncio
+    async def test_cycle_is_reported(self, builder):
+        workflow = await builder.create_workflow("Loop", "firm", "tester")
+        start, end = endpoints(workflow)
+        a = await builder.add_node(workflow.workflow_id, NodeType.TASK, "A", {"x": 0, "y": 0})
+        b = await builder.add_node(workflow.workflow_id, NodeType.TASK, "B", {"x": 0, "y": 0})
+        await builder.connect_nodes(workflow.workflow_id, start.node_id, a.node_id)
+        await builder.connect_nodes(workflow.workflow_id, a.node_id, b.node_id)
+        await builder.connect_nodes(workflow.workflow_id, b.node_id, a.node_id)
+
+        with pytest.raises(WorkflowCycleError) as excinfo:
+            CompiledWorkflow.compile(workflow)
+        assert {a.node_id, b.node_id} <= set(excinfo.value.node_ids)
+
+        validation = await builder.validate_workflow(workflow.workflow_id)
+        assert "Circular dependency detected in workflow" in validation["errors"]
+
+    @pytest.mark.asyncio
+    async def test_compiled_graph_is_cached_until_the_definition_changes(self, builder):
+        workflow, join, _ = await wide_workflow(builder, 3, 0.001)
+        first = builder._compile(workflow)
+        assert builder._compile(workflow) is first
+        assert len(first.predecessors(join.node_id)) == 3
+
+        await builder.add_node(workflow.workflow_id, NodeType.TASK, "Later", {"x": 0, "y": 0})
+        assert builder._compile(workflow) is not first
+
+
+class TestScheduling:
+    """Concurrency, joins and skipped branches."""
+
+    @pytest.mark.asyncio
+    async def test_branches_run_concurrently_and_join(self, builder):
+        workflow, join, branches = await wide_workflow(builder, 5, 0.1)
+
+        started = time.perf_counter()
+        execution = await run_to_completion(builder, workflow.workflow_id)
+        elapsed = time.perf_counter() - started
+
+        assert execution.status == ExecutionStatus.COMPLETED
+        # Five 0.1 s branches run one at a time would take at least 0.5 s
+        assert elapsed < 0.5
+        assert len(execution.node_executions) == 5 + 4
+        assert sorted(execution.node_executions[join.node_id]["result"]["branches"]) == \
+            sorted(b.node_id for b in branches)
+
+    @pytest.mark.asyncio
+    async def test_untaken_decision_branch_does_not_block_join(self, builder):
+        workflow = await builder.create_workflow("Review", "firm", "tester")
+        start, end = endpoints(workflow)
+        wid = workflow.workflow_id
+        decision = await builder.add_node(wid, NodeType.DECISION, "Urgent?", {"x": 0, "y": 0}, {
+            "decision_logic": {"conditions": [{"field": "priority", "operator": "equals", "value": "high"}]}
+        })
+        urgent = await builder.add_node(wid, NodeType.TASK, "Escalate", {"x": 0, "y": 0})
+        routine = await builder.add_node(wid, NodeType.TASK, "Queue", {"x": 0, "y": 0})
+        after_routine = await builder.add_node(wid, NodeType.TASK, "File", {"x": 0, "y": 0})
+        notify = await builder.add_node(wid, NodeType.NOTIFICATION, "Notify", {"x": 0, "y": 0})
+        join = await builder.add_node(wid, NodeType.JOIN, "Join", {"x": 0, "y": 0})
+
+        await builder.connect_nodes(wid, start.node_id, decision.node_id)
+        await builder.connect_nodes(wid, start.node_id, notify.node_id)
+        await builder.connect_nodes(wid, decision.node_id, urgent.node_id, source_output="yes")
+        await builder.connect_nodes(wid, decision.node_id, routine.node_id, source_output="no")
+        await builder.connect_nodes(wid, routine.node_id, after_routine.node_id)
+        for node in (urgent, after_routine, notify):
+            await builder.connect_nodes(wid, node.node_id, join.node_id)
+        await builder.connect_nodes(wid, join.node_id, end.node_id)
+        workflow.status = WorkflowStatus.ACTIVE
+        workflow.variables = {}
+
+        execution = await builder.execute_workflow(wid)
+        execution.context["priority"] = "high"
+        await builder.running_executions[execution.execution_id]
+
+        assert execution.status == ExecutionStatus.COMPLETED
+        assert urgent.node_id in execution.node_executions
+        assert routine.node_id not in execution.node_executions
+        assert after_routine.node_id not in execution.node_executions
+        assert sorted(execution.node_executions[join.node_id]["result"]["branches"]) == \
+            sorted([urgent.node_id, notify.node_id])
+        assert end.node_id in execution.node_executions
+
+    @pytest.mark.asyncio
+    async def test_join_any_fires_on_first_branch(self, builder):
+        workflow, join, branches = await wide_workflow(builder, 2, 0.001, join_mode="any")
+        branches[1].config["duration"] = 0.3
+        end = endpoints(workflow)[1]
+        order = []
+        original = builder.node_processors[NodeType.END]
+
+        async def record_end(execution, node):
+            order.append(len(execution.node_executions))
+            return await original(execution, node)
+
+        builder.node_processors[NodeType.END] = record_end
+        execution = await run_to_completion(builder, workflow.workflow_id)
+
+        # End ran before the slow branch finished, and the join ran only once
+        assert order == [4]
+        assert execution.node_executions[join.node_id]["result"]["branches"] == [branches[0].node_id]
+        assert branches[1].node_id in execution.node_executions
+        assert end.node_id in execution.node_executions
+
+    @pytest.mark.asyncio
+    async def test_concurrency_limit_per_node_type(self, store):
+        builder = WorkflowBuilder(checkpoint_store=store, concurrency_limits={NodeType.WEBHOOK: 2})
+        workflow = await builder.create_workflow("Hooks", "firm", "tester")
+        start, end = endpoints(workflow)
+        active = peak = 0
+
+        async def slow_webhook(execution, node):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.02)
+            active -= 1
+            return {"output": "output", "status": "sent"}
+
+        builder.node_processors[NodeType.WEBHOOK] = slow_webhook
+        for i in range(8):
+            hook = await builder.add_node(workflow.workflow_id, NodeType.WEBHOOK, f"Hook {i}", {"x": 0, "y": 0},
+                                          {"url": f"https://example.test/{i}"})
+            await builder.connect_nodes(workflow.workflow_id, start.node_id, hook.node_id)
+            await builder.connect_nodes(workflow.workflow_id, hook.node_id, end.node_id)
+        workflow.status = WorkflowStatus.ACTIVE
+
+        execution = await run_to_completion(builder, workflow.workflow_id)
+
+        assert execution.status == ExecutionStatus.COMPLETED
+        assert peak == 2
+
+    @pytest.mark.asyncio
+    async def test_node_failure_fails_execution(self, builder, store):
+        workflow, _, branches = await wide_workflow(builder, 3, 0.001)
+
+        async def broken(execution, node):
+            raise RuntimeError("integration unavailable")
+
+        builder.node_processors[NodeType.JOIN] = broken
+        execution = await run_to_completion(builder, workflow.workflow_id)
+
+        assert execution.status == ExecutionStatus.FAILED
+        assert execution.errors == ["integration unavailable"]
+        assert store.load(execution.execution_id)["status"] == "failed"
+        assert store.unfinished() == []
+
+
+class TestCheckpointing:
+    """Durable progress and resume after restart."""
+
+    @pytest.mark.asyncio
+    async def test_resume_after_interrupted_run(self, tmp_path):
+        path = str(tmp_path / "checkpoints.db")
+        first_store = SQLiteCheckpointStore(path)
+        first = WorkflowBuilder(checkpoint_store=first_store)
+        workflow, join, branches = await wide_workflow(first, 4, 0.001)
+        calls = []
+        stalled = asyncio.Event()
+
+        async def counted_delay(execution, node):
+            calls.append(node.node_id)
+            if node.node_id == branches[3].node_id and not stalled.is_set():
+                await asyncio.Event().wait()
+            return {"output": "output", "status": "completed"}
+
+        first.node_processors[NodeType.DELAY] = counted_delay
+        execution = await first.execute_workflow(workflow.workflow_id, trigger_data={"case_id": "c-1"})
+        task = first.running_executions[execution.execution_id]
+        while len(execution.node_executions) < 5:
+            await asyncio.sleep(0.01)
+
+        # Simulate the process stopping while one branch is still running
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        first_store.close()
+
+        second_store = SQLiteCheckpointStore(path)
+        second = WorkflowBuilder(checkpoint_store=second_store)
+        stalled.set()
+        second.node_processors[NodeType.DELAY] = counted_delay
+        calls.clear()
+
+        assert await second.resume_incomplete_executions() == [execution.execution_id]
+        resumed = second.executions[execution.execution_id]
+        await second.running_executions[execution.execution_id]
+
+        assert resumed.status == ExecutionStatus.COMPLETED
+        assert resumed.trigger_data == {"case_id": "c-1"}
+        assert calls == [branches[3].node_id]
+        assert len(resumed.node_executions) == 4 + 4
+        assert len(resumed.node_executions[join.node_id]["result"]["branches"]) == 4
+        assert second_store.unfinished() == []
+        second_store.close()
+
+    @pytest.mark.asyncio
+    async def test_finished_runs_are_not_resumed(self, builder):
+        workflow, _, _ = await wide_workflow(builder, 2, 0.001)
+        execution = await run_to_completion(builder, workflow.workflow_id)
+
+        with pytest.raises(ValueError):
+            await builder.resume_execution(execution.execution_id)
+        with pytest.raises(ValueError):
+            await builder.resume_execution("missing")